@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+In-memory fake of the Google Drive v3 service used by the Drive tests.
+
+Implements the subset of ``files()`` and ``changes()`` the handlers call,
+including query filtering, pagination, batch requests and a changes feed,
+and counts HTTP round trips so tests can check how many calls an
+operation needs without touching the network. Requests are serialized, so
+one fake can be shared by clients running in several threads.
+"""
+
+import re
+import hashlib
+import itertools
+import threading
+from datetime import datetime, timezone
+
+FOLDER_MIMETYPE = 'application/vnd.google-apps.folder'
+
+
+class FakeHttpError(Exception):
+    """Stands in for googleapiclient.errors.HttpError"""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class FakeRequest:
+    """Unexecuted request; ``execute`` performs it and counts a round trip"""
+
+    def __init__(self, drive, func, *args, **kwargs):
+        self.drive = drive
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.headers = {}
+
+    def perform(self):
+        with self.drive.lock:
+            return self.func(*self.args, **self.kwargs)
+
+    def execute(self):
+        with self.drive.lock:
+            self.drive.round_trips += 1
+            return self.perform()
+
+
+class FakeMediaIoBaseDownload:
+    """Stands in for googleapiclient.http.MediaIoBaseDownload (single chunk)"""
+
+    def __init__(self, fd, request, chunksize=None):
+        self.fd = fd
+        self.request = request
+
+    def next_chunk(self):
+        self.fd.write(self.request.execute())
+        return None, True
+
+
+class FakeBatch:
+    def __init__(self, drive, callback):
+        self.drive = drive
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None, callback=None):
+        if len(self.requests) >= 100:
+            raise ValueError("Drive batches are limited to 100 calls")
+        self.requests.append((request_id or str(len(self.requests)), request, callback))
+
+    def execute(self):
+        self.drive.round_trips += 1
+        self.drive.batch_sizes.append(len(self.requests))
+        for request_id, request, callback in self.requests:
+            try:
+                response, exception = request.perform(), None
+            except Exception as e:
+                response, exception = None, e
+            (callback or self.callback)(request_id, response, exception)
+
+
+def _split_top_level(text, separator):
+    """Split a query on a keyword, ignoring quoted strings and parentheses"""
+    parts, depth, quoted, current, i = [], 0, False, '', 0
+    while i < len(text):
+        char = text[i]
+        if char == '\\' and quoted:
+            current += text[i:i + 2]
+            i += 2
+            continue
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if not quoted and depth == 0 and text.startswith(separator, i):
+            parts.append(current)
+            current = ''
+            i += len(separator)
+            continue
+        current += char
+        i += 1
+    parts.append(current)
+    return [p.strip() for p in parts]
+
+
+def _unquote(value):
+    return value.strip()[1:-1].replace("\\'", "'").replace('\\\\', '\\')
+
+
+class FakeDriveService:
+    """Minimal in-memory Drive service"""
+
+    def __init__(self):
+        self.files_by_id = {}
+        self.contents = {}
+        self.round_trips = 0
+        self.batch_sizes = []
+        self.change_log = []  # list of file IDs, position == change number
+        self._ids = itertools.count(1)
+        self._created_ms = 0
+        self._modified_ms = 0
+        self.lock = threading.RLock()
+
+    # -- test helpers -------------------------------------------------------
+
+    def add_file(self, name, parent_id=None, content=b'', mime_type='application/octet-stream', **extra):
+        file_id = f"id{next(self._ids)}"
+        self.files_by_id[file_id] = {
+            'id': file_id,
+            'name': name,
+            'mimeType': mime_type,
+            'parents': [parent_id] if parent_id else [],
+            'trashed': False,
+            **extra,
+        }
+        self._set_content(file_id, content)
+        # Server-assigned creation time; kept strictly increasing so claims never tie in tests
+        now_ms = max(int(datetime.now(timezone.utc).timestamp() * 1000), self._created_ms + 1)
+        self._created_ms = now_ms
+        self.files_by_id[file_id]['createdTime'] = datetime.fromtimestamp(
+            now_ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        self._record_change(file_id)
+        return file_id
+
+    def modify_file(self, file_id, content):
+        self._set_content(file_id, content)
+        self._record_change(file_id)
+
+    def trash_file(self, file_id):
+        self.files_by_id[file_id]['trashed'] = True
+        self._record_change(file_id)
+
+    def add_folder(self, name, parent_id=None):
+        return self.add_file(name, parent_id, mime_type=FOLDER_MIMETYPE)
+
+    def children(self, parent_id, include_trashed=False):
+        return [f for f in self.files_by_id.values()
+                if parent_id in f['parents'] and (include_trashed or not f['trashed'])]
+
+    def _set_content(self, file_id, content):
+        self.contents[file_id] = content
+        file = self.files_by_id[file_id]
+        file['size'] = str(len(content))
+        file['md5Checksum'] = hashlib.md5(content).hexdigest()
+        # Strictly increasing, so every content change is a new version
+        now_ms = max(int(datetime.now(timezone.utc).timestamp() * 1000), self._modified_ms + 1)
+        self._modified_ms = now_ms
+        file['modifiedTime'] = datetime.fromtimestamp(
+            now_ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    def _record_change(self, file_id):
+        self.change_log.append(file_id)
+
+    # -- service API --------------------------------------------------------
+
+    def files(self):
+        return _FakeFiles(self)
+
+    def changes(self):
+        return _FakeChanges(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    # -- query evaluation ---------------------------------------------------
+
+    def _matches(self, file, query):
+        for clause in _split_top_level(query, ' and '):
+            if clause.startswith('(') and clause.endswith(')'):
+                if not any(self._matches(file, option)
+                           for option in _split_top_level(clause[1:-1], ' or ')):
+                    return False
+            elif not self._match_clause(file, clause):
+                return False
+        return True
+
+    def _match_clause(self, file, clause):
+        match = re.fullmatch(r"('(?:[^'\\]|\\.)*')\s+in\s+parents", clause)
+        if match:
+            return _unquote(match.group(1)) in file['parents']
+        match = re.fullmatch(r"(\w+)\s*(=|!=|contains)\s*(.+)", clause)
+        if not match:
+            raise ValueError(f"Unsupported query clause: {clause}")
+        field, operator, raw = match.groups()
+        if field == 'trashed':
+            value, actual = raw.strip() == 'true', file['trashed']
+        else:
+            value = _unquote(raw)
+            if field == 'fileExtension':
+                actual = file['name'].rsplit('.', 1)[-1] if '.' in file['name'] else ''
+            else:
+                actual = file.get(field, '')
+        if operator == 'contains':
+            return value in actual
+        return (actual == value) if operator == '=' else (actual != value)
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def _get(self, file_id):
+        if file_id not in self.drive.files_by_id:
+            raise FakeHttpError(404, f"File not found: {file_id}")
+        return self.drive.files_by_id[file_id]
+
+    def list(self, q='', fields=None, pageSize=100, pageToken=None, spaces=None, orderBy=None, **kwargs):
+        def run():
+            matches = [dict(f) for f in self.drive.files_by_id.values() if self.drive._matches(f, q)]
+            if orderBy:
+                key, _, direction = orderBy.partition(' ')
+                matches.sort(key=lambda f: f.get(key, ''), reverse=direction == 'desc')
+            start = int(pageToken or 0)
+            response = {'files': matches[start:start + pageSize]}
+            if start + pageSize < len(matches):
+                response['nextPageToken'] = str(start + pageSize)
+            return response
+        return FakeRequest(self.drive, run)
+
+    def get(self, fileId, fields=None, **kwargs):
+        return FakeRequest(self.drive, lambda: dict(self._get(fileId)))
+
+    def get_media(self, fileId, **kwargs):
+        def run():
+            content = self.drive.contents[self._get(fileId)['id']]
+            match = re.fullmatch(r'bytes=(\d+)-(\d+)', request.headers.get('Range', ''))
+            if match:
+                return content[int(match.group(1)):int(match.group(2)) + 1]
+            return content
+        request = FakeRequest(self.drive, run)
+        return request
+
+    def create(self, body=None, media_body=None, fields=None, **kwargs):
+        def run():
+            body_ = dict(body or {})
+            parents = body_.pop('parents', [None])
+            file_id = self.drive.add_file(body_.pop('name'), parents[0],
+                                          mime_type=body_.pop('mimeType', 'application/octet-stream'), **body_)
+            return {'id': file_id, 'createdTime': self.drive.files_by_id[file_id]['createdTime']}
+        return FakeRequest(self.drive, run)
+
+    def copy(self, fileId, body=None, fields=None, **kwargs):
+        def run():
+            source = self._get(fileId)
+            body_ = dict(body or {})
+            parents = body_.pop('parents', source['parents'][:1] or [None])
+            file_id = self.drive.add_file(body_.pop('name', f"Copy of {source['name']}"), parents[0],
+                                          content=self.drive.contents[fileId], mime_type=source['mimeType'])
+            copied = self.drive.files_by_id[file_id]
+            if 'modifiedTime' in body_:
+                copied['modifiedTime'] = body_['modifiedTime']
+            return {'id': file_id, 'modifiedTime': copied['modifiedTime']}
+        return FakeRequest(self.drive, run)
+
+    def update(self, fileId, body=None, addParents=None, removeParents=None, media_body=None, fields=None, **kwargs):
+        def run():
+            file = self._get(fileId)
+            for key, value in (body or {}).items():
+                if key == 'properties':
+                    props = file.setdefault('properties', {})
+                    for prop, prop_value in value.items():
+                        if prop_value is None:
+                            props.pop(prop, None)
+                        else:
+                            props[prop] = prop_value
+                else:
+                    file[key] = value
+            if removeParents:
+                file['parents'] = [p for p in file['parents'] if p not in removeParents.split(',')]
+            if addParents:
+                file['parents'].extend(addParents.split(','))
+            self.drive._record_change(fileId)
+            return {'id': fileId, 'parents': list(file['parents'])}
+        return FakeRequest(self.drive, run)
+
+    def delete(self, fileId, **kwargs):
+        def run():
+            self._get(fileId)
+            del self.drive.files_by_id[fileId]
+            self.drive.contents.pop(fileId, None)
+            self.drive._record_change(fileId)
+            return ''
+        return FakeRequest(self.drive, run)
+
+
+class _FakeChanges:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(self.drive, lambda: {'startPageToken': str(len(self.drive.change_log))})
+
+    def list(self, pageToken, pageSize=100, includeRemoved=True, fields=None, spaces=None, **kwargs):
+        def run():
+            start = int(pageToken)
+            ids = self.drive.change_log[start:start + pageSize]
+            changes = []
+            for file_id in ids:
+                file = self.drive.files_by_id.get(file_id)
+                if file is None:
+                    changes.append({'fileId': file_id, 'removed': True})
+                else:
+                    changes.append({'fileId': file_id, 'removed': False, 'file': dict(file)})
+            end = start + len(ids)
+            if end < len(self.drive.change_log):
+                return {'changes': changes, 'nextPageToken': str(end)}
+            return {'changes': changes, 'newStartPageToken': str(end)}
+        return FakeRequest(self.drive, run)
@@ -1,6 +1,8 @@
 # Add environment variable to disable Google Drive API tokens
 # This prevents automatic token refresh
 import os
+import time
+_process_start = time.perf_counter()  # Reference point for the startup timing report
 os.environ['GOOGLE_DRIVE_NO_AUTO_AUTH'] = '1'
 # Disable stream flushing to prevent invalid argument errors on network drives
 os.environ['PYTHONUNBUFFERED'] = '1'
@@ -76,6 +78,9 @@ logger.info("Importing GUI components")
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from src.gui.main_window import MainWindow
 from src.database.manager import DatabaseManager
+from src.gui.handlers.deferred_startup import startup_timer
+startup_timer.reset(_process_start)
+startup_timer.mark("imports")
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller bundles"""
@@ -94,6 +99,7 @@ def main():
         QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
         
         app = QApplication(sys.argv)
+        startup_timer.mark("QApplication created")
         
         # Load icon via resource_path for bundle support
         icon_path = resource_path('src/gui/icons/app_icon.webp')
@@ -115,6 +121,7 @@ def main():
         
         logger.info("Showing main window")
         window.show()
+        startup_timer.mark("window shown")
         
         # Log screen information
         screen = window.screen()
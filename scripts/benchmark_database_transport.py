@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark the compressed cloud database transport.
+
+Generates a realistic project database, packs it with every available codec
+and reports compression ratio, pack/unpack time and the estimated transfer
+time on a slow field connection compared with a raw upload.
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import importlib.util
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate_benchmark_database import generate_database
+
+# Load the transport module directly so the benchmark does not need the GUI stack
+_spec = importlib.util.spec_from_file_location(
+    "database_transport",
+    Path(__file__).resolve().parent.parent / "src" / "gui" / "handlers" / "database_transport.py")
+database_transport = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(database_transport)
+
+logger = logging.getLogger(__name__)
+
+
+def run_benchmark(num_wells, days, bandwidth_mbps):
+    work_dir = tempfile.mkdtemp(prefix="wlm_transport_bench_")
+    try:
+        db_path = os.path.join(work_dir, "benchmark.db")
+        generate_database(db_path, num_wells=num_wells, days=days)
+        raw_size = os.path.getsize(db_path)
+        bytes_per_second = bandwidth_mbps * 1_000_000 / 8
+        raw_transfer = raw_size / bytes_per_second
+
+        print(f"\nDatabase: {raw_size / (1024*1024):.1f} MB, link: {bandwidth_mbps} Mbit/s "
+              f"(raw transfer {raw_transfer:.1f} s)")
+        print(f"{'codec':<6} {'size MB':>9} {'ratio':>7} {'pack s':>8} {'unpack s':>9} {'transfer s':>11} {'total s':>8}")
+
+        for codec in database_transport.available_codecs():
+            transport_path = os.path.join(work_dir, f"transport.{codec}")
+            restored_path = os.path.join(work_dir, f"restored_{codec}.db")
+
+            start = time.perf_counter()
+            manifest = database_transport.DatabaseTransportCodec(codec, work_dir).pack(db_path, transport_path)
+            pack_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            database_transport.DatabaseTransportCodec.unpack(transport_path, restored_path, manifest)
+            unpack_time = time.perf_counter() - start
+
+            compressed = manifest['compressed_size']
+            transfer = compressed / bytes_per_second
+            print(f"{codec:<6} {compressed / (1024*1024):>9.1f} {raw_size / compressed:>7.2f} "
+                  f"{pack_time:>8.2f} {unpack_time:>9.2f} {transfer:>11.1f} "
+                  f"{pack_time + unpack_time + transfer:>8.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark compressed database transport')
+    parser.add_argument('--wells', type=int, default=20, help='Number of wells to generate')
+    parser.add_argument('--days', type=int, default=365, help='Days of 15-minute data per well')
+    parser.add_argument('--bandwidth', type=float, default=5.0, help='Simulated link speed in Mbit/s')
+    args = parser.parse_args()
+    run_benchmark(args.wells, args.days, args.bandwidth)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Generate a realistic water level database for benchmarks.
+
+The layout follows DatabaseInitializer (wells, transducer locations,
+water_level_readings with 15-minute data, manual readings) so benchmark
+scripts can measure against data that looks like a real project database
+without needing a copy of one.
+"""
+
+import math
+import random
+import sqlite3
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+JULIAN_EPOCH = datetime(1858, 11, 17)  # MJD epoch; JD = MJD + 2400000.5, matching Timestamp.to_julian_date()
+AQUIFERS = ['MEMPHIS', 'FORT PILLOW', 'SHALLOW']
+FIELDS = ['MALLORY', 'DAVIS', 'SHEAHAN', 'LICHTERMAN', 'ALLEN', 'MORTON']
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS wells (
+        well_number TEXT PRIMARY KEY,
+        cae_number TEXT,
+        latitude REAL,
+        longitude REAL,
+        top_of_casing REAL,
+        aquifer TEXT,
+        well_field TEXT,
+        cluster TEXT,
+        county TEXT,
+        data_source TEXT,
+        user_flag TEXT DEFAULT 'unchecked',
+        baro_status TEXT DEFAULT 'no_data',
+        level_status TEXT DEFAULT 'no_data'
+    )''',
+    '''CREATE TABLE IF NOT EXISTS transducer_locations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        serial_number TEXT,
+        well_number TEXT,
+        start_date TIMESTAMP,
+        end_date TIMESTAMP,
+        notes TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS water_level_readings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        well_number TEXT,
+        timestamp_utc TIMESTAMP,
+        julian_timestamp REAL,
+        pressure REAL,
+        water_pressure REAL,
+        water_level REAL,
+        temperature REAL,
+        serial_number TEXT,
+        baro_flag TEXT,
+        level_flag TEXT,
+        processing_date_utc TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        imported_time_range TEXT,
+        UNIQUE (well_number, timestamp_utc)
+    )''',
+    '''CREATE INDEX IF NOT EXISTS idx_water_level_readings_well_flags
+        ON water_level_readings (well_number, baro_flag, level_flag)''',
+    '''CREATE INDEX IF NOT EXISTS idx_water_level_readings_well_time
+        ON water_level_readings (well_number, julian_timestamp)''',
+    '''CREATE TABLE IF NOT EXISTS manual_level_readings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        well_number TEXT,
+        measurement_date_utc TIMESTAMP,
+        dtw_avg REAL,
+        dtw_1 REAL,
+        dtw_2 REAL,
+        tape_error REAL,
+        comments TEXT,
+        water_level REAL,
+        data_source TEXT,
+        collected_by TEXT,
+        is_dry BOOLEAN DEFAULT 0,
+        UNIQUE(well_number, measurement_date_utc)
+    )''',
+]
+
+
+def generate_database(db_path, num_wells=20, days=365, interval_minutes=15, seed=42):
+    """
+    Create a database with synthetic but realistic-looking well data.
+
+    Args:
+        db_path: Path of the database to create (tables are created if missing)
+        num_wells: Number of wells to generate
+        days: Length of each well's record
+        interval_minutes: Logging interval of the transducers
+
+    Returns:
+        Number of water level readings written
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    steps = int(days * 24 * 60 / interval_minutes)
+    total = 0
+
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        for statement in SCHEMA:
+            cursor.execute(statement)
+
+        for w in range(num_wells):
+            well_number = f"TN157_{w + 1:05d}"
+            serial = str(2000000 + w)
+            toc = round(rng.uniform(230, 330), 2)
+            base_level = toc - rng.uniform(20, 120)
+            cursor.execute(
+                "INSERT OR REPLACE INTO wells (well_number, cae_number, latitude, longitude, top_of_casing, "
+                "aquifer, well_field, cluster, county, data_source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (well_number, f"CAE{w + 1:04d}", 35.0 + rng.uniform(0, 0.3), -90.0 + rng.uniform(0, 0.3),
+                 toc, rng.choice(AQUIFERS), rng.choice(FIELDS), f"C{w % 5}", 'SHELBY', 'transducer'))
+            cursor.execute(
+                "INSERT INTO transducer_locations (serial_number, well_number, start_date, end_date) VALUES (?, ?, ?, NULL)",
+                (serial, well_number, start.strftime('%Y-%m-%d %H:%M:%S')))
+
+            imported_range = f"{start:%Y-%m-%d} to {start + timedelta(days=days):%Y-%m-%d}"
+            rows = []
+            level = base_level
+            for i in range(steps):
+                ts = start + timedelta(minutes=interval_minutes * i)
+                # Seasonal cycle, daily pumping signal and a slow random walk
+                level += rng.gauss(0, 0.002)
+                seasonal = 1.5 * math.sin(2 * math.pi * i / (steps or 1))
+                daily = 0.2 * math.sin(2 * math.pi * (ts.hour * 60 + ts.minute) / 1440)
+                water_level = round(level + seasonal + daily, 3)
+                pressure = round(14.5 + rng.gauss(0, 0.05), 3)
+                rows.append((
+                    well_number, ts.strftime('%Y-%m-%d %H:%M:%S'),
+                    (ts - JULIAN_EPOCH).total_seconds() / 86400.0 + 2400000.5,
+                    pressure, round(pressure - 14.5 + (water_level - base_level) / 2.31, 3), water_level,
+                    round(18 + rng.gauss(0, 0.1), 2), serial, 'master', 'default_level', imported_range))
+                if len(rows) >= 10000:
+                    cursor.executemany(
+                        "INSERT OR IGNORE INTO water_level_readings (well_number, timestamp_utc, julian_timestamp, "
+                        "pressure, water_pressure, water_level, temperature, serial_number, baro_flag, level_flag, "
+                        "imported_time_range) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    total += len(rows)
+                    rows = []
+            if rows:
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO water_level_readings (well_number, timestamp_utc, julian_timestamp, "
+                    "pressure, water_pressure, water_level, temperature, serial_number, baro_flag, level_flag, "
+                    "imported_time_range) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                total += len(rows)
+
+            # Monthly manual readings
+            for month in range(max(1, days // 30)):
+                ts = start + timedelta(days=30 * month, hours=10)
+                dtw = round(toc - base_level + rng.gauss(0, 0.05), 2)
+                cursor.execute(
+                    "INSERT OR IGNORE INTO manual_level_readings (well_number, measurement_date_utc, dtw_avg, dtw_1, "
+                    "dtw_2, water_level, data_source, collected_by) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (well_number, ts.strftime('%Y-%m-%d %H:%M:%S'), dtw, dtw, dtw,
+                     round(toc - dtw, 2), 'field', 'benchmark'))
+
+        conn.commit()
+
+    logger.info(f"Generated {total:,} readings for {num_wells} wells in {db_path}")
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a realistic benchmark database')
+    parser.add_argument('db_path', help='Database file to create')
+    parser.add_argument('--wells', type=int, default=20, help='Number of wells')
+    parser.add_argument('--days', type=int, default=365, help='Days of 15-minute data per well')
+    args = parser.parse_args()
+    generate_database(args.db_path, num_wells=args.wells, days=args.days)
@@ -1,53 +1,254 @@
 import sqlite3
 import logging
+import os
+import tempfile
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# Reduced tables with an autoincrement id: new rows are appended above the
+# exported high-water mark, edited or deleted rows are looked up in the change
+# log that triggers on the source keep for them. 'unique' is the source's
+# unique key of tables written with INSERT OR REPLACE, used to log the rows it
+# deletes; readings are never replaced that way, and a trigger on every
+# imported reading would slow imports down by a third.
+ID_TABLES = {
+    'water_level_readings': {
+        'columns': ['well_number', 'timestamp_utc', 'julian_timestamp', 'water_level',
+                    'temperature', 'baro_flag', 'level_flag'],
+    },
+    'manual_level_readings': {
+        'columns': ['well_number', 'measurement_date_utc', 'water_level', 'dtw_avg',
+                    'comments', 'data_source', 'is_dry'],
+        'unique': ['well_number', 'measurement_date_utc'],
+    },
+}
+
+# Change log table in the source database. Every entry has a random nonce, so
+# an update can tell whether the entry it stopped at is still in the same log.
+CHANGE_LOG = 'mobile_export_changes'
+
+# Small reduced tables keyed by well number, compared row by row
+KEYED_TABLES = {
+    'wells': ['well_number', 'cae_number', 'latitude', 'longitude', 'aquifer',
+              'well_field', 'cluster', 'county', 'data_source', 'user_flag', 'created_at'],
+    'well_statistics': ['well_number', 'num_points', 'min_timestamp', 'max_timestamp', 'last_update'],
+}
+
+
+class _ChangeLogGap(Exception):
+    """The source change log does not cover every change since the last export"""
+
+
 class MobileDatabaseReducer:
     """
     Creates a reduced version of the CAESER database optimized for mobile visualization.
     Removes unnecessary columns and includes only essential data for cloud sync.
+
+    The source database is attached to the reduced one and every table is
+    copied with a single INSERT ... SELECT. Reduced readings keep their
+    source ids, so update_reduced_database can bring an existing reduced
+    database up to date by copying only new and changed rows. Changed rows
+    are found in a change log that the export installs in the source: a
+    small table filled by triggers on the reading tables.
     """
-    
+
     def __init__(self, source_db_path: Path, target_db_path: Path):
         self.source_db_path = source_db_path
         self.target_db_path = target_db_path
-    
+
     def create_reduced_database(self, well_number: Optional[str] = None):
         """
         Create a reduced database for mobile visualization.
-        
+
         Args:
             well_number: If provided, only include data for this well
         """
         logger.info(f"Creating reduced database from {self.source_db_path} to {self.target_db_path}")
-        
+        start = time.perf_counter()
+
         # Remove existing target database if it exists
         if self.target_db_path.exists():
             self.target_db_path.unlink()
-        
-        with sqlite3.connect(self.source_db_path) as source_conn:
-            with sqlite3.connect(self.target_db_path) as target_conn:
-                target_cursor = target_conn.cursor()
-                
-                # Create reduced tables
-                self._create_reduced_wells_table(target_cursor)
-                self._create_reduced_water_level_readings_table(target_cursor)
-                self._create_reduced_manual_level_readings_table(target_cursor)
-                self._create_reduced_well_statistics_table(target_cursor)
-                
-                # Copy essential data
-                self._copy_wells_data(source_conn, target_conn, well_number)
-                self._copy_water_level_data(source_conn, target_conn, well_number)
-                self._copy_manual_level_data(source_conn, target_conn, well_number)
-                self._copy_well_statistics_data(source_conn, target_conn, well_number)
-                
-                target_conn.commit()
-                
+
+        target_conn = self._connect_with_source()
+        try:
+            target_cursor = target_conn.cursor()
+            target_cursor.execute("BEGIN")
+
+            # Create reduced tables
+            self._create_reduced_wells_table(target_cursor)
+            self._create_reduced_water_level_readings_table(target_cursor)
+            self._create_reduced_manual_level_readings_table(target_cursor)
+            self._create_reduced_well_statistics_table(target_cursor)
+            self._create_export_state_table(target_cursor)
+
+            # Changes made after this export are logged in the source
+            self._install_change_log(target_cursor)
+
+            # Copy essential data
+            for table in KEYED_TABLES:
+                self._copy_keyed_table(target_cursor, table, well_number)
+            for table in ID_TABLES:
+                self._append_new_rows(target_cursor, table, 0, well_number)
+            self._mark_change_log(target_cursor)
+            for table in ID_TABLES:
+                self._record_export_state(target_cursor, table, well_number)
+
+            # Built after the bulk insert, which is faster than maintaining it row by row
+            self._create_mobile_index(target_cursor)
+            target_cursor.execute("COMMIT")
+        except Exception:
+            if target_conn.in_transaction:
+                target_conn.execute("ROLLBACK")
+            raise
+        finally:
+            target_conn.close()
+
+        logger.debug(f"PERF: Full mobile export took {(time.perf_counter() - start) * 1000:.2f}ms")
         logger.info(f"Reduced database created successfully at {self.target_db_path}")
-    
+
+    def update_reduced_database(self, well_number: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Bring an existing reduced database up to date with the source.
+
+        Readings above each table's high-water mark are appended, older
+        readings the source change log lists as updated or deleted are copied
+        again, and the small well tables are synced row by row. The cost
+        depends on the number of changes, not on the size of the source.
+
+        Falls back to a full rebuild when there is no reduced database from
+        this exporter yet, it was created for a different well filter, or the
+        change log does not continue from the last export (e.g. the source was
+        replaced by another copy).
+
+        Args:
+            well_number: If provided, only include data for this well
+
+        Returns:
+            Per table counts of appended and changed rows
+        """
+        full_rebuild = {'full_rebuild': {'tables': len(ID_TABLES) + len(KEYED_TABLES)}}
+        if not self._can_update(well_number):
+            logger.info("No compatible reduced database to update, creating it from scratch")
+            self.create_reduced_database(well_number)
+            return full_rebuild
+
+        logger.info(f"Updating reduced database {self.target_db_path} from {self.source_db_path}")
+        start = time.perf_counter()
+        stats = {}
+        gap = None
+
+        target_conn = self._connect_with_source()
+        try:
+            target_cursor = target_conn.cursor()
+            target_cursor.execute("BEGIN IMMEDIATE")
+
+            for table in KEYED_TABLES:
+                stats[table] = {'changed': self._sync_keyed_table(target_cursor, table, well_number)}
+
+            positions = []
+            for table in ID_TABLES:
+                high_water, change_seq, change_nonce = target_cursor.execute(
+                    "SELECT high_water, change_seq, change_nonce FROM mobile_export_state WHERE table_name = ?",
+                    (table,)
+                ).fetchone()
+                changed = self._replace_changed_rows(target_cursor, table, high_water, change_seq,
+                                                     change_nonce, well_number)
+                appended = self._append_new_rows(target_cursor, table, high_water, well_number)
+                self._check_row_count(target_cursor, table, well_number)
+                stats[table] = {'appended': appended, 'changed': changed}
+                positions.append(change_seq)
+
+            # Entries before the previous position were already consumed; newer
+            # ones may still be needed by another reduced database of this source
+            target_cursor.execute(f"DELETE FROM src.{CHANGE_LOG} WHERE seq < ?", (min(positions),))
+            self._mark_change_log(target_cursor)
+            for table in ID_TABLES:
+                self._record_export_state(target_cursor, table, well_number)
+            target_cursor.execute("COMMIT")
+        except _ChangeLogGap as e:
+            target_conn.execute("ROLLBACK")
+            gap = e
+        except Exception:
+            if target_conn.in_transaction:
+                target_conn.execute("ROLLBACK")
+            raise
+        finally:
+            target_conn.close()
+
+        if gap is not None:
+            logger.warning(f"{gap}, creating the reduced database from scratch")
+            self.create_reduced_database(well_number)
+            return full_rebuild
+
+        logger.debug(f"PERF: Incremental mobile export took {(time.perf_counter() - start) * 1000:.2f}ms")
+        logger.info(f"Reduced database updated: {stats}")
+        return stats
+
+    def verify_against_full_rebuild(self, well_number: Optional[str] = None) -> Dict[str, int]:
+        """
+        Compare the reduced database with a full rebuild from the current source.
+
+        Returns:
+            Number of rows that differ (missing, extra or changed) per table;
+            all zeros when the reduced database is identical to a full export
+        """
+        fd, rebuild_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            MobileDatabaseReducer(self.source_db_path, Path(rebuild_path)).create_reduced_database(well_number)
+
+            with sqlite3.connect(self.target_db_path) as conn:
+                conn.execute("ATTACH DATABASE ? AS rebuild", (rebuild_path,))
+                differences = {}
+                for table, columns in list(KEYED_TABLES.items()) + [
+                        (table, ['id'] + spec['columns']) for table, spec in ID_TABLES.items()]:
+                    cols = ', '.join(columns)
+                    differences[table] = conn.execute(f'''
+                        SELECT (SELECT COUNT(*) FROM (SELECT {cols} FROM main.{table}
+                                                     EXCEPT SELECT {cols} FROM rebuild.{table}))
+                             + (SELECT COUNT(*) FROM (SELECT {cols} FROM rebuild.{table}
+                                                     EXCEPT SELECT {cols} FROM main.{table}))
+                    ''').fetchone()[0]
+                conn.execute("DETACH DATABASE rebuild")
+
+            if any(differences.values()):
+                logger.warning(f"Reduced database differs from a full rebuild: {differences}")
+            else:
+                logger.info("Reduced database matches a full rebuild")
+            return differences
+        finally:
+            os.unlink(rebuild_path)
+
+    def _connect_with_source(self) -> sqlite3.Connection:
+        """Connection to the reduced database with the source attached as 'src'"""
+        conn = sqlite3.connect(self.target_db_path, isolation_level=None)
+        conn.execute("ATTACH DATABASE ? AS src", (str(self.source_db_path),))
+        return conn
+
+    def _can_update(self, well_number: Optional[str]) -> bool:
+        """Whether the target is a reduced database from this exporter for the same well filter"""
+        if not self.target_db_path.exists():
+            return False
+        try:
+            with sqlite3.connect(self.target_db_path) as conn:
+                rows = conn.execute(
+                    "SELECT table_name, well_filter FROM mobile_export_state WHERE change_seq IS NOT NULL").fetchall()
+        except sqlite3.Error as e:
+            logger.debug(f"Reduced database has no export state: {e}")
+            return False
+        filters = dict(rows)
+        return all(table in filters and filters[table] == well_number for table in ID_TABLES)
+
+    @staticmethod
+    def _well_filter(well_number: Optional[str], prefix: str = 'WHERE'):
+        if well_number:
+            return f' {prefix} well_number = ?', [well_number]
+        return '', []
+
     def _create_reduced_wells_table(self, cursor: sqlite3.Cursor):
         """Create wells table with only essential columns for mobile visualization"""
         cursor.execute('''
@@ -65,7 +266,7 @@ class MobileDatabaseReducer:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-    
+
     def _create_reduced_water_level_readings_table(self, cursor: sqlite3.Cursor):
         """Create water level readings table with only visualization essentials"""
         cursor.execute('''
@@ -81,13 +282,14 @@ class MobileDatabaseReducer:
                 FOREIGN KEY (well_number) REFERENCES wells (well_number)
             )
         ''')
-        
-        # Create optimized index for mobile queries
+
+    def _create_mobile_index(self, cursor: sqlite3.Cursor):
+        """Create optimized index for mobile queries"""
         cursor.execute('''
             CREATE INDEX idx_water_level_mobile
             ON water_level_readings (well_number, julian_timestamp)
         ''')
-    
+
     def _create_reduced_manual_level_readings_table(self, cursor: sqlite3.Cursor):
         """Create manual readings table with essential columns"""
         cursor.execute('''
@@ -103,7 +305,7 @@ class MobileDatabaseReducer:
                 FOREIGN KEY (well_number) REFERENCES wells (well_number)
             )
         ''')
-    
+
     def _create_reduced_well_statistics_table(self, cursor: sqlite3.Cursor):
         """Create well statistics table for mobile optimization"""
         cursor.execute('''
@@ -116,176 +318,197 @@ class MobileDatabaseReducer:
                 FOREIGN KEY (well_number) REFERENCES wells (well_number)
             )
         ''')
-    
-    def _copy_wells_data(self, source_conn: sqlite3.Connection, target_conn: sqlite3.Connection, well_number: Optional[str]):
-        """Copy wells data with reduced columns"""
-        source_cursor = source_conn.cursor()
-        target_cursor = target_conn.cursor()
-        
-        query = '''
-            SELECT well_number, cae_number, latitude, longitude, aquifer, 
-                   well_field, cluster, county, data_source, user_flag, created_at
-            FROM wells
-        '''
-        params = []
-        
-        if well_number:
-            query += ' WHERE well_number = ?'
-            params.append(well_number)
-        
-        source_cursor.execute(query, params)
-        wells_data = source_cursor.fetchall()
-        
-        target_cursor.executemany('''
-            INSERT INTO wells (well_number, cae_number, latitude, longitude, aquifer,
-                             well_field, cluster, county, data_source, user_flag, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', wells_data)
-        
-        logger.info(f"Copied {len(wells_data)} wells")
-    
-    def _copy_water_level_data(self, source_conn: sqlite3.Connection, target_conn: sqlite3.Connection, well_number: Optional[str]):
-        """Copy water level readings with reduced columns"""
-        source_cursor = source_conn.cursor()
-        target_cursor = target_conn.cursor()
-        
-        query = '''
-            SELECT well_number, timestamp_utc, julian_timestamp, water_level, 
-                   temperature, baro_flag, level_flag
-            FROM water_level_readings
-        '''
-        params = []
-        
-        if well_number:
-            query += ' WHERE well_number = ?'
-            params.append(well_number)
-        
-        # Order by timestamp for better mobile performance
-        query += ' ORDER BY well_number, julian_timestamp'
-        
-        source_cursor.execute(query, params)
-        
-        # Process in batches to manage memory
-        batch_size = 10000
-        total_copied = 0
-        
-        while True:
-            batch = source_cursor.fetchmany(batch_size)
-            if not batch:
-                break
-            
-            target_cursor.executemany('''
-                INSERT INTO water_level_readings (well_number, timestamp_utc, julian_timestamp, 
-                                                 water_level, temperature, baro_flag, level_flag)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', batch)
-            
-            total_copied += len(batch)
-            logger.info(f"Copied {total_copied} water level readings...")
-        
-        logger.info(f"Total water level readings copied: {total_copied}")
-    
-    def _copy_manual_level_data(self, source_conn: sqlite3.Connection, target_conn: sqlite3.Connection, well_number: Optional[str]):
-        """Copy manual level readings with reduced columns"""
-        source_cursor = source_conn.cursor()
-        target_cursor = target_conn.cursor()
-        
-        query = '''
-            SELECT well_number, measurement_date_utc, water_level, dtw_avg, 
-                   comments, data_source, is_dry
-            FROM manual_level_readings
-        '''
-        params = []
-        
-        if well_number:
-            query += ' WHERE well_number = ?'
-            params.append(well_number)
-        
-        source_cursor.execute(query, params)
-        manual_data = source_cursor.fetchall()
-        
-        target_cursor.executemany('''
-            INSERT INTO manual_level_readings (well_number, measurement_date_utc, water_level,
-                                             dtw_avg, comments, data_source, is_dry)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', manual_data)
-        
-        logger.info(f"Copied {len(manual_data)} manual level readings")
-    
-    def _copy_well_statistics_data(self, source_conn: sqlite3.Connection, target_conn: sqlite3.Connection, well_number: Optional[str]):
-        """Copy well statistics data"""
-        source_cursor = source_conn.cursor()
-        target_cursor = target_conn.cursor()
-        
-        query = '''
-            SELECT well_number, num_points, min_timestamp, max_timestamp, last_update
-            FROM well_statistics
-        '''
-        params = []
-        
-        if well_number:
-            query += ' WHERE well_number = ?'
-            params.append(well_number)
-        
-        source_cursor.execute(query, params)
-        stats_data = source_cursor.fetchall()
-        
-        if stats_data:
-            target_cursor.executemany('''
-                INSERT INTO well_statistics (well_number, num_points, min_timestamp, 
-                                           max_timestamp, last_update)
-                VALUES (?, ?, ?, ?, ?)
-            ''', stats_data)
-            
-            logger.info(f"Copied {len(stats_data)} well statistics records")
-    
+
+    def _create_export_state_table(self, cursor: sqlite3.Cursor):
+        """Create tables recording how far each reading table has been exported"""
+        cursor.execute('''
+            CREATE TABLE mobile_export_state (
+                table_name TEXT PRIMARY KEY,
+                high_water INTEGER NOT NULL DEFAULT 0,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                well_filter TEXT,
+                change_seq INTEGER,
+                change_nonce BLOB,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _install_change_log(self, cursor: sqlite3.Cursor):
+        """Create the change log and its triggers in the source if they are missing"""
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS src.{CHANGE_LOG} (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                nonce BLOB NOT NULL DEFAULT (randomblob(8))
+            )
+        ''')
+        for table, spec in ID_TABLES.items():
+            log = f"INSERT INTO {CHANGE_LOG} (table_name, row_id)"
+            triggers = {
+                'update': f"""AFTER UPDATE ON {table} BEGIN
+                    {log} VALUES ('{table}', OLD.id);
+                    {log} SELECT '{table}', NEW.id WHERE NEW.id <> OLD.id;
+                END""",
+                'delete': f"AFTER DELETE ON {table} BEGIN {log} VALUES ('{table}', OLD.id); END",
+            }
+            if 'unique' in spec:
+                # Rows deleted by INSERT OR REPLACE fire no delete trigger
+                unique = ' AND '.join(f"{column} = NEW.{column}" for column in spec['unique'])
+                triggers['replace'] = (f"BEFORE INSERT ON {table} "
+                                       f"BEGIN {log} SELECT '{table}', id FROM {table} WHERE {unique}; END")
+            for event, trigger in triggers.items():
+                cursor.execute(f"CREATE TRIGGER IF NOT EXISTS src.{CHANGE_LOG}_{table}_{event} {trigger}")
+
+    def _mark_change_log(self, cursor: sqlite3.Cursor):
+        """Log an entry marking the position of this export, which the next update looks for"""
+        cursor.execute(f"INSERT INTO src.{CHANGE_LOG} (table_name, row_id) VALUES ('', 0)")
+
+    def _copy_keyed_table(self, cursor: sqlite3.Cursor, table: str, well_number: Optional[str]):
+        """Copy a well table with reduced columns"""
+        cols = ', '.join(KEYED_TABLES[table])
+        where, params = self._well_filter(well_number)
+        cursor.execute(f"INSERT INTO main.{table} ({cols}) SELECT {cols} FROM src.{table}{where}", params)
+        logger.info(f"Copied {cursor.rowcount} {table} records")
+
+    def _sync_keyed_table(self, cursor: sqlite3.Cursor, table: str, well_number: Optional[str]) -> int:
+        """Replace rows of a well table that differ from the source, drop rows gone from it"""
+        cols = ', '.join(KEYED_TABLES[table])
+        where, params = self._well_filter(well_number)
+        cursor.execute(f'''
+            DELETE FROM main.{table}
+            WHERE well_number NOT IN (SELECT well_number FROM src.{table}{where})
+        ''', params)
+        removed = cursor.rowcount
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO main.{table} ({cols})
+            SELECT {cols} FROM src.{table}{where}
+            EXCEPT SELECT {cols} FROM main.{table}
+        ''', params)
+        return removed + cursor.rowcount
+
+    def _append_new_rows(self, cursor: sqlite3.Cursor, table: str, high_water: int,
+                         well_number: Optional[str]) -> int:
+        """Copy readings with a source id above the high-water mark"""
+        cols = ', '.join(ID_TABLES[table]['columns'])
+        where, params = self._well_filter(well_number, prefix='AND')
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO main.{table} (id, {cols})
+            SELECT id, {cols} FROM src.{table}
+            WHERE id > ?{where}
+            ORDER BY id
+        ''', [high_water] + params)
+        logger.info(f"Copied {cursor.rowcount} new {table} rows")
+        return cursor.rowcount
+
+    def _replace_changed_rows(self, cursor: sqlite3.Cursor, table: str, high_water: int, change_seq: int,
+                              change_nonce: Optional[bytes], well_number: Optional[str]) -> int:
+        """Re-copy the exported readings the change log lists as updated or deleted since change_seq"""
+        triggers = cursor.execute(
+            "SELECT COUNT(*) FROM src.sqlite_master WHERE type = 'trigger' AND tbl_name = ? AND name LIKE ?",
+            (table, f"{CHANGE_LOG}_%")).fetchone()[0]
+        if triggers < 2 + ('unique' in ID_TABLES[table]):
+            raise _ChangeLogGap(f"The source has no complete change log for {table}")
+        row = cursor.execute(f"SELECT nonce FROM src.{CHANGE_LOG} WHERE seq = ?", (change_seq,)).fetchone()
+        if row is None or row[0] != change_nonce:
+            raise _ChangeLogGap("The source change log does not continue from the last export")
+
+        # Rows above the high-water mark are appended afterwards anyway
+        changed = f"SELECT row_id FROM src.{CHANGE_LOG} WHERE table_name = ? AND seq > ? AND row_id <= ?"
+        changed_params = [table, change_seq, high_water]
+        count = cursor.execute(f"SELECT COUNT(DISTINCT row_id) FROM ({changed})", changed_params).fetchone()[0]
+        if not count:
+            return 0
+
+        cols = ', '.join(ID_TABLES[table]['columns'])
+        where, params = self._well_filter(well_number, prefix='AND')
+        cursor.execute(f"DELETE FROM main.{table} WHERE id IN ({changed})", changed_params)
+        cursor.execute(f'''
+            INSERT INTO main.{table} (id, {cols})
+            SELECT id, {cols} FROM src.{table}
+            WHERE id IN ({changed}){where}
+        ''', changed_params + params)
+        logger.info(f"Copied {count} changed {table} rows")
+        return count
+
+    def _check_row_count(self, cursor: sqlite3.Cursor, table: str, well_number: Optional[str]):
+        """Catch the changes no trigger logs: rows inserted below the high-water mark or replaced by key"""
+        where, params = self._well_filter(well_number)
+        exported = cursor.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+        source = cursor.execute(f"SELECT COUNT(*) FROM src.{table}{where}", params).fetchone()[0]
+        if exported != source:
+            raise _ChangeLogGap(f"The reduced {table} has {exported} rows but the source {source}")
+
+    def _record_export_state(self, cursor: sqlite3.Cursor, table: str, well_number: Optional[str]):
+        """Store the source high-water mark and change log position the reduced table now covers"""
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO mobile_export_state
+                (table_name, high_water, row_count, well_filter, change_seq, change_nonce, updated_at)
+            VALUES (?, (SELECT COALESCE(MAX(id), 0) FROM src.{table}),
+                    (SELECT COUNT(*) FROM main.{table}), ?,
+                    (SELECT MAX(seq) FROM src.{CHANGE_LOG}),
+                    (SELECT nonce FROM src.{CHANGE_LOG} ORDER BY seq DESC LIMIT 1), CURRENT_TIMESTAMP)
+        ''', (table, well_number))
+
     def get_database_size_info(self) -> dict:
         """Get size information about source and target databases"""
         info = {}
-        
+
         # Source database info
         if self.source_db_path.exists():
             info['source_size_mb'] = self.source_db_path.stat().st_size / (1024 * 1024)
-            
+
             with sqlite3.connect(self.source_db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT COUNT(*) FROM water_level_readings")
                 info['source_water_level_count'] = cursor.fetchone()[0]
-                
+
                 cursor.execute("SELECT COUNT(*) FROM manual_level_readings")
                 info['source_manual_count'] = cursor.fetchone()[0]
-        
+
         # Target database info
         if self.target_db_path.exists():
             info['target_size_mb'] = self.target_db_path.stat().st_size / (1024 * 1024)
-            
+
             with sqlite3.connect(self.target_db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT COUNT(*) FROM water_level_readings")
                 info['target_water_level_count'] = cursor.fetchone()[0]
-                
+
                 cursor.execute("SELECT COUNT(*) FROM manual_level_readings")
                 info['target_manual_count'] = cursor.fetchone()[0]
-        
+
         return info
 
 
-def create_mobile_database(source_db_path: str, target_db_path: str, well_number: Optional[str] = None) -> dict:
+def create_mobile_database(source_db_path: str, target_db_path: str, well_number: Optional[str] = None,
+                           incremental: bool = False, verify: bool = False) -> dict:
     """
     Convenience function to create a reduced database for mobile visualization.
-    
+
     Args:
         source_db_path: Path to the source CAESER database
         target_db_path: Path where the reduced database should be created
         well_number: Optional well number to filter data (for testing with single well)
-    
+        incremental: Update an existing reduced database instead of rebuilding it
+        verify: Compare the result with a full rebuild ('verification' in the result)
+
     Returns:
         Dictionary with size reduction information
     """
     source_path = Path(source_db_path)
     target_path = Path(target_db_path)
-    
+
     reducer = MobileDatabaseReducer(source_path, target_path)
-    reducer.create_reduced_database(well_number)
-    
-    return reducer.get_database_size_info()
\ No newline at end of file
+    if incremental:
+        changes = reducer.update_reduced_database(well_number)
+    else:
+        reducer.create_reduced_database(well_number)
+        changes = None
+
+    info = reducer.get_database_size_info()
+    if changes is not None:
+        info['changes'] = changes
+    if verify:
+        info['verification'] = reducer.verify_against_full_rebuild(well_number)
+    return info
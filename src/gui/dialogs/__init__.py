@@ -5,7 +5,24 @@ Created on Fri Jan 17 14:23:55 2025
 @author: bledesma
 """
 
-from .well_dialog import WellDialog
-from .well_import_dialog import WellImportDialog
-from .login_dialog import LoginDialog
-from .user_management_dialog import UserManagementDialog, EditUserDialog
\ No newline at end of file
+import importlib
+
+# Exported dialogs are imported on first access so that opening one dialog
+# module does not import every other dialog at startup
+_EXPORTS = {
+    'WellDialog': '.well_dialog',
+    'WellImportDialog': '.well_import_dialog',
+    'LoginDialog': '.login_dialog',
+    'UserManagementDialog': '.user_management_dialog',
+    'EditUserDialog': '.user_management_dialog',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,7 +1,7 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QComboBox, 
-    QPushButton, QTableWidget, QTableWidgetItem, 
-    QMessageBox, QLabel, QLineEdit, QScrollBar,
+    QPushButton, QTableView, QAbstractItemView,
+    QMessageBox, QLabel, QLineEdit,
     QApplication, QShortcut, QFrame, QFileDialog
 )
 from PyQt5.QtCore import Qt, QTimer
@@ -9,6 +9,7 @@ from PyQt5.QtGui import QKeySequence
 import sqlite3
 from ...database.manager import DatabaseManager
 from ..handlers.style_handler import StyleHandler  # Import the style handler
+from ..handlers.keyset_table_model import KeysetPager, KeysetTableModel
 
 class EditTablesDialog(QDialog):
     def __init__(self, db_manager: DatabaseManager, parent=None):
@@ -16,14 +17,19 @@ class EditTablesDialog(QDialog):
         self.db_manager = db_manager
         
         # Pagination settings
-        self.page_size = 100  # Number of records per page
-        self.current_offset = 0  # Current offset for pagination
+        self.page_size = 500  # Rows fetched per keyset page
         self.total_records = 0  # Total number of records in the table
-        self.is_loading = False  # Flag to prevent multiple loads
         self.current_table = ""  # Current table name
         self.current_well = ""  # Current well number (for water_level_readings)
         self.column_names = []  # Column names for the current table
-        
+        self.model = None  # KeysetTableModel for the current table
+
+        # Debounce the filter so each keystroke does not run a query
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(300)
+        self.filter_timer.timeout.connect(self.apply_filter)
+
         self.setup_ui()
         
     def setup_ui(self):
@@ -121,7 +127,7 @@ class EditTablesDialog(QDialog):
         self.filter_input = QLineEdit()
         self.filter_input.setPlaceholderText("Filter by Well Number or CAE...")
         self.filter_input.setMinimumWidth(250)
-        self.filter_input.textChanged.connect(self.apply_filter)
+        self.filter_input.textChanged.connect(lambda _: self.filter_timer.start())
         
         table_layout.addWidget(filter_label)
         table_layout.addWidget(self.filter_input)
@@ -129,11 +135,11 @@ class EditTablesDialog(QDialog):
         
         layout.addLayout(table_layout)
         
-        # Create table widget with better styling
-        self.table_widget = QTableWidget()
+        # Create table view with better styling; rows come from a lazily fetched model
+        self.table_widget = QTableView()
         self.table_widget.setAlternatingRowColors(True)
         self.table_widget.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: 1px solid #CCDDEE;
                 gridline-color: #E0E8F0;
                 selection-background-color: #3070B0;
@@ -147,26 +153,26 @@ class EditTablesDialog(QDialog):
                 border: none;
                 font-weight: bold;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 4px;
                 border-bottom: 1px solid #E0E8F0;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #3070B0;
                 color: white;
             }
         """)
-        
-        # Enable sorting
-        self.table_widget.setSortingEnabled(True)
-        
+
+        # Sorting is handed to the model, which sorts in SQL on indexed columns
+        self.table_widget.horizontalHeader().setSortIndicatorShown(True)
+        self.table_widget.horizontalHeader().setSectionsClickable(True)
+        self.table_widget.horizontalHeader().sortIndicatorChanged.connect(self.on_sort_changed)
+        self.table_widget.verticalHeader().setDefaultSectionSize(24)
+
         # Enable copy and paste functionality
-        self.table_widget.setSelectionMode(QTableWidget.ExtendedSelection)
-        self.table_widget.setEditTriggers(QTableWidget.DoubleClicked | QTableWidget.EditKeyPressed)
-        
-        # Connect scroll events for lazy loading
-        self.table_widget.verticalScrollBar().valueChanged.connect(self.check_scroll_position)
-        
+        self.table_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table_widget.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed)
+
         # Status label for showing record count and loading status
         self.status_label = QLabel("No data loaded")
         self.status_label.setStyleSheet("""
@@ -246,8 +252,11 @@ class EditTablesDialog(QDialog):
     
     def on_table_changed(self, table_name):
         """Handle table selection changes"""
+        if not self.resolve_pending_edits():
+            self._set_combo_text(self.table_combo, self.current_table)
+            return
         self.current_table = table_name
-        self.current_offset = 0
+        self.current_well = ""
         
         # Show/hide well filter for water_level_readings and telemetry_level_readings tables
         is_water_levels = table_name in ("water_level_readings", "telemetry_level_readings")
@@ -258,34 +267,76 @@ class EditTablesDialog(QDialog):
             # Load well list
             self.load_wells_list()
             # Clear the table
-            self.table_widget.setRowCount(0)
-            self.table_widget.setColumnCount(0)
+            self.set_model(None)
             self.status_label.setText("Select a well to load data")
         else:
             # For other tables, just load the data directly
             self.get_table_structure(table_name)
             self.load_page_data()
     
-    def get_table_structure(self, table_name):
-        """Get table structure (column names) and total record count"""
+    def resolve_pending_edits(self):
+        """Ask to save or discard unsaved edits before they are dropped; False to stay"""
+        if self.model is None or not self.model.pending_edit_count:
+            return True
+        reply = QMessageBox.question(
+            self,
+            "Unsaved Changes",
+            f"{self.model.pending_edit_count} edited rows have not been saved. Save them first?",
+            QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
+            QMessageBox.Cancel
+        )
+        if reply == QMessageBox.Save:
+            try:
+                self.model.commit_edits()
+                self.db_manager.mark_as_modified()
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Error saving changes: {str(e)}")
+                return False
+            return True
+        if reply == QMessageBox.Discard:
+            self.model.discard_edits()
+            return True
+        return False
+
+    def _set_combo_text(self, combo, text):
+        """Select text in a combo box without reloading"""
+        combo.blockSignals(True)
+        combo.setCurrentIndex(max(combo.findText(text), 0))
+        combo.blockSignals(False)
+
+    def set_model(self, model):
+        """Show a new table model, closing the previous one"""
+        old_model = self.model
+        self.model = model
+        self.table_widget.setModel(model)
+        if old_model is not None:
+            old_model.pager.close()
+            old_model.deleteLater()
+        if model is not None:
+            model.rows_loaded.connect(self.update_status)
+            model.edits_changed.connect(lambda _: self.update_status())
+            model.sort_rejected.connect(self.on_sort_rejected)
+    
+    def get_table_structure(self, table_name, equality_filters=None):
+        """Create the keyset model for a table and count its records"""
         try:
             if not self.db_manager.current_db:
                 return
-                
-            with sqlite3.connect(str(self.db_manager.current_db)) as conn:
-                # Get column names
-                cursor = conn.cursor()
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                self.column_names = [info[1] for info in cursor.fetchall()]
-                
-                # Get total record count
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                self.total_records = cursor.fetchone()[0]
-                
-                # Set up table structure
-                self.table_widget.setColumnCount(len(self.column_names))
-                self.table_widget.setHorizontalHeaderLabels(self.column_names)
-                
+            
+            pager = KeysetPager(self.db_manager.current_db, table_name, self.page_size, equality_filters)
+            self.column_names = pager.columns
+            
+            # Water levels open newest first, which the (well_number, timestamp_utc) index delivers
+            if equality_filters and "timestamp_utc" in pager.sortable_columns:
+                pager.set_sort("timestamp_utc", descending=True)
+            pager.set_text_filter(self.filter_input.text())
+            
+            # Get total record count
+            self.total_records = pager.count()
+            
+            self.set_model(KeysetTableModel(pager, self))
+            self.sync_sort_indicator()
+            
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error getting table structure: {str(e)}")
     
@@ -307,156 +358,87 @@ class EditTablesDialog(QDialog):
                     self.well_combo.addItem(well[0])
                 
                 # Clear table while well is not selected
-                self.table_widget.setRowCount(0)
-                self.table_widget.setColumnCount(0)
+                self.set_model(None)
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error loading wells list: {str(e)}")
     
     def load_well_data(self, well_number):
         """Load water level data for a specific well"""
-        if well_number == "-- Select Well --":
+        if not self.resolve_pending_edits():
+            self._set_combo_text(self.well_combo, self.current_well)
+            return
+        if not well_number or well_number == "-- Select Well --":
             # Clear table and return
-            self.table_widget.setRowCount(0)
-            self.table_widget.setColumnCount(0)
+            self.set_model(None)
             self.status_label.setText("Select a well to load data")
             return
             
         self.current_well = well_number
-        self.current_offset = 0
         
-        # Get the table structure for the selected well
-        try:
-            if not self.db_manager.current_db:
-                QMessageBox.warning(self, "Warning", "No database is currently open.")
-                return
-                
-            # Get the column structure for the table
-            with sqlite3.connect(str(self.db_manager.current_db)) as conn:
-                cursor = conn.cursor()
-                cursor.execute(f"PRAGMA table_info({self.current_table})")
-                self.column_names = [info[1] for info in cursor.fetchall()]
-                
-                # Get total count for this well
-                cursor.execute(f"SELECT COUNT(*) FROM {self.current_table} WHERE well_number = ?", 
-                             (well_number,))
-                self.total_records = cursor.fetchone()[0]
-            
-            # Set up the table structure
-            self.table_widget.setColumnCount(len(self.column_names))
-            self.table_widget.setHorizontalHeaderLabels(self.column_names)
-            
-            # Update window title to include well info
-            self.setWindowTitle(f"Edit Tables - {self.current_table} for {well_number}")
-            
-            # Load the first page of data
-            self.load_page_data()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error setting up well data: {str(e)}")
+        if not self.db_manager.current_db:
+            QMessageBox.warning(self, "Warning", "No database is currently open.")
+            return
+        
+        # The well filter is an equality condition the indexes can seek on
+        self.get_table_structure(self.current_table, {"well_number": well_number})
+        
+        # Update window title to include well info
+        self.setWindowTitle(f"Edit Tables - {self.current_table} for {well_number}")
+        
+        self.load_page_data()
     
     def load_page_data(self):
-        """Load a page of data from the current offset"""
-        if self.is_loading:
+        """Show the first page of the current model; later pages are fetched as the view scrolls"""
+        if self.model is None:
+            return
+        self.table_widget.resizeColumnsToContents()
+        self.update_status()
+    
+    def update_status(self, *_):
+        """Show loaded/total counts and pending edits in the status label"""
+        if self.model is None:
+            return
+        loaded = self.model.rowCount()
+        if self.model.pager.text_filter:
+            total_text = f"{loaded} matching records loaded"
+        else:
+            total_text = f"Showing {loaded} of {self.total_records} records"
+        load_message = " (Scroll down for more)" if self.model.canFetchMore() else " (All records loaded)"
+        pending = self.model.pending_edit_count
+        edits_message = f" • {pending} edited rows not saved" if pending else ""
+        self.status_label.setText(f"{total_text}{load_message}{edits_message}")
+    
+    def sync_sort_indicator(self):
+        """Show the model's sort in the header without re-sorting"""
+        if self.model is None:
+            return
+        header = self.table_widget.horizontalHeader()
+        column, descending = self.model.sort_state()
+        header.blockSignals(True)
+        header.setSortIndicator(column, Qt.DescendingOrder if descending else Qt.AscendingOrder)
+        header.blockSignals(False)
+    
+    def on_sort_changed(self, column, order):
+        """Sort in SQL when a header is clicked"""
+        if self.model is None:
             return
-            
-        self.is_loading = True
         QApplication.setOverrideCursor(Qt.WaitCursor)
-        self.status_label.setText(f"Loading... ({self.current_offset+1}-{min(self.current_offset+self.page_size, self.total_records)} of {self.total_records})")
-        
         try:
-            if not self.db_manager.current_db:
-                self.is_loading = False
-                QApplication.restoreOverrideCursor()
-                return
-                
-            with sqlite3.connect(str(self.db_manager.current_db)) as conn:
-                cursor = conn.cursor()
-                
-                if self.current_table in ("water_level_readings", "telemetry_level_readings") and self.current_well:
-                    # Load data for a specific well with pagination
-                    query = f"""
-                        SELECT * FROM {self.current_table} 
-                        WHERE well_number = ? 
-                        ORDER BY timestamp_utc DESC 
-                        LIMIT ? OFFSET ?
-                    """
-                    cursor.execute(query, (self.current_well, self.page_size, self.current_offset))
-                else:
-                    # Load data for any other table with pagination
-                    query = f"""
-                        SELECT * FROM {self.current_table} 
-                        LIMIT ? OFFSET ?
-                    """
-                    cursor.execute(query, (self.page_size, self.current_offset))
-                
-                # Fetch data
-                data = cursor.fetchall()
-                
-                # Preserve existing rows if this is not the first page
-                existing_rows = self.table_widget.rowCount()
-                if self.current_offset == 0:
-                    self.table_widget.setRowCount(len(data))
-                    row_offset = 0
-                else:
-                    self.table_widget.setRowCount(existing_rows + len(data))
-                    row_offset = existing_rows
-                
-                # Fill data
-                for i, row_data in enumerate(data):
-                    row_index = row_offset + i
-                    for col, value in enumerate(row_data):
-                        item = QTableWidgetItem(str(value) if value is not None else "")
-                        # Added styling for cells with NULL values
-                        if value is None:
-                            item.setBackground(Qt.lightGray)
-                            item.setForeground(Qt.darkGray)
-                        self.table_widget.setItem(row_index, col, item)
-                
-                # Adjust column widths only on first load
-                if self.current_offset == 0:
-                    self.table_widget.resizeColumnsToContents()
-                
-                # Update status label with better formatting
-                loaded_records = min(self.current_offset + self.page_size, self.total_records)
-                if self.current_offset + self.page_size < self.total_records:
-                    load_message = f" (Scroll down for more)"
-                else:
-                    load_message = f" (All records loaded)"
-                    
-                self.status_label.setText(
-                    f"Showing {self.table_widget.rowCount()} of {self.total_records} records • "
-                    f"{loaded_records} loaded{load_message}"
-                )
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error loading data: {str(e)}")
-            
+            self.model.sort(column, order)
         finally:
-            self.is_loading = False
             QApplication.restoreOverrideCursor()
+        self.update_status()
     
-    def check_scroll_position(self, value):
-        """Check scroll position and load more data if necessary"""
-        if self.is_loading:
-            return
-            
-        scroll_bar = self.table_widget.verticalScrollBar()
-        
-        # If scrolled near the bottom (within 20% of the end) and more data is available
-        if (value > scroll_bar.maximum() * 0.8 and 
-            self.current_offset + self.page_size < self.total_records):
-            
-            # Load the next page
-            self.current_offset += self.page_size
-            
-            # Use a short timer to prevent multiple loads when scrolling quickly
-            QTimer.singleShot(100, self.load_page_data)
+    def on_sort_rejected(self, column_name):
+        """Keep the previous sort for columns without an index"""
+        self.sync_sort_indicator()
+        sortable = ", ".join(self.model.pager.sortable_columns)
+        self.status_label.setText(f"'{column_name}' is not indexed and cannot be sorted. Sortable columns: {sortable}")
     
     def load_table_data(self, table_name):
         """Reset and load first page of table data"""
         self.current_table = table_name
-        self.current_offset = 0
         self.current_well = ""
         
         self.get_table_structure(table_name)
@@ -466,58 +448,31 @@ class EditTablesDialog(QDialog):
         self.setWindowTitle(f"Edit Tables")
     
     def save_changes(self):
-        """Save changes to the database"""
+        """Save pending edits to the database in one transaction"""
         try:
             if not self.db_manager.current_db:
                 QMessageBox.warning(self, "Warning", "No database is currently open.")
                 return
+            
+            if self.model is None or not self.model.pending_edit_count:
+                QMessageBox.information(self, "No Changes", "There are no edited rows to save.")
+                return
 
             reply = QMessageBox.question(
                 self,
                 "Confirm Save",
-                "Are you sure you want to save changes to the database?",
+                f"Are you sure you want to save changes to {self.model.pending_edit_count} rows?",
                 QMessageBox.Yes | QMessageBox.No,
                 QMessageBox.No
             )
             
             if reply == QMessageBox.Yes:
                 # Show temporary status message
-                original_status = self.status_label.text()
                 self.status_label.setText("Saving changes to database...")
                 self.status_label.setStyleSheet("color: #3070B0; font-weight: bold;")
                 QApplication.processEvents()  # Update UI immediately
                 
-                # Get current table name
-                table_name = self.table_combo.currentText()
-                
-                # Connect to the database using the path
-                with sqlite3.connect(str(self.db_manager.current_db)) as conn:
-                    cursor = conn.cursor()
-                    
-                    # Get column names
-                    columns = []
-                    for col in range(self.table_widget.columnCount()):
-                        columns.append(self.table_widget.horizontalHeaderItem(col).text())
-                    
-                    # Prepare data for update
-                    for row in range(self.table_widget.rowCount()):
-                        row_data = []
-                        for col in range(self.table_widget.columnCount()):
-                            item = self.table_widget.item(row, col)
-                            value = item.text() if item else None
-                            row_data.append(value)
-                        
-                        # Update database
-                        update_query = f"UPDATE {table_name} SET "
-                        update_query += ", ".join([f"{col} = ?" for col in columns[1:]])
-                        update_query += f" WHERE {columns[0]} = ?"
-                        
-                        # Reorder values to put primary key at the end
-                        values = row_data[1:] + [row_data[0]]
-                        
-                        cursor.execute(update_query, values)
-                    
-                    conn.commit()
+                updated = self.model.commit_edits()
                 
                 # Mark database as modified
                 self.db_manager.mark_as_modified()
@@ -526,35 +481,32 @@ class EditTablesDialog(QDialog):
                 self.status_label.setText("Changes saved successfully!")
                 self.status_label.setStyleSheet("color: green; font-weight: bold;")
                 
-                # Set a timer to restore the original status message after 3 seconds
-                QTimer.singleShot(3000, lambda: self.status_label.setText(original_status))
+                # Set a timer to restore the status message after 3 seconds
+                QTimer.singleShot(3000, self.update_status)
                 QTimer.singleShot(3000, lambda: self.status_label.setStyleSheet("font-style: italic; color: #555555;"))
                 
-                QMessageBox.information(self, "Success", "Changes saved successfully!")
+                QMessageBox.information(self, "Success", f"Changes saved successfully! ({updated} rows updated)")
         
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error saving changes: {str(e)}")
 
     def apply_filter(self):
-        """Apply filter to the table"""
-        filter_text = self.filter_input.text().lower()
-        
-        for row in range(self.table_widget.rowCount()):
-            show_row = False
-            
-            # Check all columns for the filter text
-            for col in range(self.table_widget.columnCount()):
-                item = self.table_widget.item(row, col)
-                if item and filter_text in item.text().lower():
-                    show_row = True
-                    break
-            
-            self.table_widget.setRowHidden(row, not show_row)
+        """Apply the text filter in SQL and reload from the first page"""
+        if self.model is None:
+            return
+        try:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            self.model.set_text_filter(self.filter_input.text())
+            self.update_status()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error applying filter: {str(e)}")
+        finally:
+            QApplication.restoreOverrideCursor()
 
     def delete_selected_row(self):
         """Delete the selected row from the database"""
-        current_row = self.table_widget.currentRow()
-        if current_row < 0:
+        current_row = self.table_widget.currentIndex().row()
+        if self.model is None or current_row < 0:
             QMessageBox.warning(self, "Warning", "Please select a row to delete")
             return
 
@@ -569,25 +521,14 @@ class EditTablesDialog(QDialog):
         if reply == QMessageBox.Yes:
             try:
                 # Show temporary status message
-                original_status = self.status_label.text()
                 self.status_label.setText("Deleting row...")
                 self.status_label.setStyleSheet("color: #B03050; font-weight: bold;")
                 QApplication.processEvents()  # Update UI immediately
                 
-                # Get the primary key (first column) value
-                primary_key_value = self.table_widget.item(current_row, 0).text()
-                table_name = self.table_combo.currentText()
-                primary_key_column = self.table_widget.horizontalHeaderItem(0).text()
-
-                # Delete from database
-                with sqlite3.connect(str(self.db_manager.current_db)) as conn:
-                    cursor = conn.cursor()
-                    delete_query = f"DELETE FROM {table_name} WHERE {primary_key_column} = ?"
-                    cursor.execute(delete_query, (primary_key_value,))
-                    conn.commit()
-
-                # Remove row from table widget
-                self.table_widget.removeRow(current_row)
+                # Delete by rowid, which identifies the row even without a primary key column
+                if not self.model.delete_row(current_row):
+                    raise Exception("Row no longer exists in the database")
+                self.total_records = max(self.total_records - 1, 0)
                 
                 # Mark database as modified
                 self.db_manager.mark_as_modified()
@@ -596,8 +537,8 @@ class EditTablesDialog(QDialog):
                 self.status_label.setText("Row deleted successfully!")
                 self.status_label.setStyleSheet("color: green; font-weight: bold;")
                 
-                # Set a timer to restore the original status message after 3 seconds
-                QTimer.singleShot(3000, lambda: self.status_label.setText(original_status))
+                # Set a timer to restore the status message after 3 seconds
+                QTimer.singleShot(3000, self.update_status)
                 QTimer.singleShot(3000, lambda: self.status_label.setStyleSheet("font-style: italic; color: #555555;"))
                 
                 QMessageBox.information(self, "Success", "Row deleted successfully!")
@@ -607,39 +548,30 @@ class EditTablesDialog(QDialog):
 
     def copy_selection(self):
         """Copy selected cells to clipboard in Excel-compatible format"""
-        selected_ranges = self.table_widget.selectedRanges()
-        if not selected_ranges:
+        if self.model is None:
+            return
+        selected = self.table_widget.selectionModel().selectedIndexes()
+        if not selected:
             return
             
         # Find the overall bounds of all selections
-        min_row = min(range_item.topRow() for range_item in selected_ranges)
-        max_row = max(range_item.bottomRow() for range_item in selected_ranges)
-        min_col = min(range_item.leftColumn() for range_item in selected_ranges)
-        max_col = max(range_item.rightColumn() for range_item in selected_ranges)
+        cells = {(index.row(), index.column()) for index in selected}
+        min_row = min(row for row, _ in cells)
+        max_row = max(row for row, _ in cells)
+        min_col = min(col for _, col in cells)
+        max_col = max(col for _, col in cells)
         
-        # Create a matrix to store the data
+        # Fill the matrix with selected cells; gaps between selections stay empty
         matrix = []
-        
-        # Fill the matrix with data from all selected ranges
         for row in range(min_row, max_row + 1):
-            row_data = []
-            for col in range(min_col, max_col + 1):
-                # Check if the current cell is within any of the selected ranges
-                cell_selected = any(
-                    range_item.topRow() <= row <= range_item.bottomRow() and
-                    range_item.leftColumn() <= col <= range_item.rightColumn()
-                    for range_item in selected_ranges
-                )
-                
-                if cell_selected:
-                    item = self.table_widget.item(row, col)
-                    row_data.append(item.text() if item else "")
-                else:
-                    row_data.append("")
-            matrix.append(row_data)
+            values = self.model.row_values(row)
+            matrix.append([
+                ("" if values[col] is None else str(values[col])) if (row, col) in cells else ""
+                for col in range(min_col, max_col + 1)
+            ])
         
         # Convert matrix to clipboard text (tab-separated for Excel compatibility)
-        clipboard_text = "\n".join("\t".join(str(cell) for cell in row) for row in matrix)
+        clipboard_text = "\n".join("\t".join(row) for row in matrix)
         
         # Set clipboard content
         clipboard = QApplication.clipboard()
@@ -647,19 +579,21 @@ class EditTablesDialog(QDialog):
         
     def paste_selection(self):
         """Paste data from clipboard to selected cells with Excel-like behavior"""
+        if self.model is None:
+            return
         clipboard = QApplication.clipboard()
         clipboard_text = clipboard.text()
         if not clipboard_text:
             return
             
         # Get the current selection
-        selected_ranges = self.table_widget.selectedRanges()
-        if not selected_ranges:
+        selected_ranges = self.table_widget.selectionModel().selection()
+        if selected_ranges.isEmpty():
             return
         
         # Parse clipboard data
         rows = clipboard_text.split("\n")
-        parsed_data = [row.split("\t") for row in rows if row.strip()]
+        parsed_data = [row.rstrip("\r").split("\t") for row in rows if row.strip()]
         
         if not parsed_data:
             return
@@ -667,61 +601,31 @@ class EditTablesDialog(QDialog):
         # Get dimensions of clipboard data
         clipboard_rows = len(parsed_data)
         clipboard_cols = len(parsed_data[0])
+        row_count = self.model.rowCount()
+        col_count = self.model.columnCount()
         
-        # Special case: Single cell copied to multiple cells
-        is_single_cell = clipboard_rows == 1 and clipboard_cols == 1
-        
-        # For each selected range
+        # Pasted values are staged as pending edits; a single cell fills the whole range
         for range_item in selected_ranges:
-            start_row = range_item.topRow()
-            start_col = range_item.leftColumn()
-            range_rows = range_item.rowCount()
-            range_cols = range_item.columnCount()
-            
-            if is_single_cell:
-                # Fill all selected cells with the single value
-                single_value = parsed_data[0][0]
-                for row in range(start_row, start_row + range_rows):
-                    for col in range(start_col, start_col + range_cols):
-                        if row < self.table_widget.rowCount() and col < self.table_widget.columnCount():
-                            item = self.table_widget.item(row, col)
-                            if not item:
-                                item = QTableWidgetItem()
-                                self.table_widget.setItem(row, col, item)
-                            item.setText(single_value)
-            else:
-                # Fill the range with repeating pattern from clipboard
-                for i in range(range_rows):
-                    for j in range(range_cols):
-                        # Calculate source indices with wrapping
-                        source_row = i % clipboard_rows
-                        source_col = j % clipboard_cols
-                        
-                        # Calculate target position
-                        target_row = start_row + i
-                        target_col = start_col + j
-                        
-                        # Check bounds
-                        if (target_row >= self.table_widget.rowCount() or 
-                            target_col >= self.table_widget.columnCount()):
-                            continue
-                        
-                        # Get value from clipboard data
-                        value = parsed_data[source_row][source_col]
-                        
-                        # Update or create item
-                        item = self.table_widget.item(target_row, target_col)
-                        if not item:
-                            item = QTableWidgetItem()
-                            self.table_widget.setItem(target_row, target_col, item)
-                        item.setText(value)
-        
-        # Mark database as modified
-        self.db_manager.mark_as_modified()
+            for target_row in range(range_item.top(), range_item.bottom() + 1):
+                for target_col in range(range_item.left(), range_item.right() + 1):
+                    if target_row >= row_count or target_col >= col_count:
+                        continue
+                    i = target_row - range_item.top()
+                    j = target_col - range_item.left()
+                    source_row = parsed_data[i % clipboard_rows]
+                    value = source_row[j % clipboard_cols] if j % clipboard_cols < len(source_row) else ""
+                    self.model.set_value(target_row, target_col, value)
+        
+        self.model.dataChanged.emit(self.model.index(0, 0), self.model.index(row_count - 1, col_count - 1))
+        self.update_status()
 
     def export_to_csv(self):
-        """Export the current table data to a CSV file"""
+        """Export every row matching the current well and filter to a CSV file"""
         try:
+            if self.model is None:
+                QMessageBox.warning(self, "Warning", "No table data to export.")
+                return
+            
             # Get the current table name for the default filename
             table_name = self.table_combo.currentText()
             if self.current_well:
@@ -739,37 +643,26 @@ class EditTablesDialog(QDialog):
                 return
                 
             # Show temporary status message
-            original_status = self.status_label.text()
             self.status_label.setText("Exporting to CSV...")
             self.status_label.setStyleSheet("color: #3070B0; font-weight: bold;")
             QApplication.processEvents()
             
-            # Get headers
-            headers = []
-            for col in range(self.table_widget.columnCount()):
-                headers.append(self.table_widget.horizontalHeaderItem(col).text())
-            
-            # Write to CSV
+            # Stream rows from the database rather than only the ones loaded in the view
             with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
                 import csv
                 writer = csv.writer(csvfile)
-                writer.writerow(headers)  # Write headers
-                
-                # Write data rows (only visible rows)
-                for row in range(self.table_widget.rowCount()):
-                    if not self.table_widget.isRowHidden(row):
-                        row_data = []
-                        for col in range(self.table_widget.columnCount()):
-                            item = self.table_widget.item(row, col)
-                            row_data.append(item.text() if item else "")
-                        writer.writerow(row_data)
+                writer.writerow(self.column_names)  # Write headers
+                written = 0
+                for values in self.model.iter_all_rows():
+                    writer.writerow(["" if value is None else value for value in values])
+                    written += 1
             
             # Restore status label style but with success message
-            self.status_label.setText("Export completed successfully!")
+            self.status_label.setText(f"Exported {written} records to CSV successfully!")
             self.status_label.setStyleSheet("color: green; font-weight: bold;")
             
-            # Set a timer to restore the original status message after 3 seconds
-            QTimer.singleShot(3000, lambda: self.status_label.setText(original_status))
+            # Set a timer to restore the status message after 3 seconds
+            QTimer.singleShot(3000, self.update_status)
             QTimer.singleShot(3000, lambda: self.status_label.setStyleSheet("font-style: italic; color: #555555;"))
             
             QMessageBox.information(self, "Success", "Table exported to CSV successfully!")
@@ -777,6 +670,14 @@ class EditTablesDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error exporting to CSV: {str(e)}")
 
+    def closeEvent(self, event):
+        """Close the model's database connection with the dialog"""
+        if not self.resolve_pending_edits():
+            event.ignore()
+            return
+        self.set_model(None)
+        super().closeEvent(event)
+
     def load_legacy_tables(self):
         """Load data from legacy CSV files into the database"""
         # List of tables to update
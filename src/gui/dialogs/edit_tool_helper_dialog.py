@@ -3,7 +3,7 @@ import uuid
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QGroupBox, 
     QLabel, QPushButton, QSpinBox, QDoubleSpinBox,
-    QSlider, QCheckBox, QButtonGroup, QRadioButton
+    QSlider, QCheckBox, QButtonGroup, QRadioButton, QListWidget, QListWidgetItem
 )
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 
@@ -96,7 +96,9 @@ class SpikeFixHelperDialog(EditToolHelperDialog):
             "4. The pair will be added to the list below.<br>"
             "5. Repeat to select as many pairs as needed.<br>"
             "6. Click 'Apply' to interpolate all pairs at once.<br>"
-            "<br>ESC or 'Cancel Selection' will exit selection mode but keep the dialog open."
+            "<br>ESC or 'Cancel Selection' will exit selection mode but keep the dialog open.<br>"
+            "<br>'Auto-Detect Spikes' scans the whole series and previews candidate spikes; "
+            "'Apply' accepts the checked ones together with any selected pairs."
         )
         instructions.setWordWrap(True)
         instructions.setStyleSheet("background-color: #f0f0f0; padding: 10px; border-radius: 5px;")
@@ -121,15 +123,32 @@ class SpikeFixHelperDialog(EditToolHelperDialog):
         self.pairs_label.setStyleSheet("background-color: #f9f9f9; border: 1px solid #ccc; padding: 5px;")
         self.pairs_label.setWordWrap(True)
         
+        # Automatic detection over the whole series
+        self.auto_detect_btn = QPushButton("Auto-Detect Spikes")
+        self.auto_detect_btn.setStyleSheet("background-color: #e0e8f8;")
+        self.auto_detect_btn.clicked.connect(self._auto_detect)
+        
+        self.detection_label = QLabel("")
+        self.detection_label.setStyleSheet("font-style: italic; color: #666;")
+        self.detection_label.setWordWrap(True)
+        
+        # One checkable row per detected spike, all accepted by default
+        self.detection_list = QListWidget()
+        self.detection_list.setMaximumHeight(150)
+        self.detection_list.hide()
+        
         # Create button layout
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.selection_mode_btn)
         button_layout.addWidget(self.remove_last_pair_btn)
+        button_layout.addWidget(self.auto_detect_btn)
         
         # Add to layout
         params_layout.addWidget(instructions)
         params_layout.addLayout(button_layout)
         params_layout.addWidget(self.status_label)
+        params_layout.addWidget(self.detection_label)
+        params_layout.addWidget(self.detection_list)
         params_layout.addWidget(QLabel("<b>Selected Pairs:</b>"))
         params_layout.addWidget(self.pairs_label)
         
@@ -163,6 +182,31 @@ class SpikeFixHelperDialog(EditToolHelperDialog):
             if self.parent():
                 self.parent().cancel_spike_point_selection()
         
+    def _auto_detect(self):
+        """Ask the main dialog to run spike detection over the whole series"""
+        if self.parent():
+            self.parent().auto_detect_spikes(self)
+    
+    def set_detection_summary(self, text):
+        self.detection_label.setText(text)
+    
+    def set_detected_groups(self, groups):
+        """Show detected spikes as checkable rows; groups is a list of (key, label)"""
+        self.detection_list.clear()
+        for key, label in groups:
+            item = QListWidgetItem(label)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            item.setData(Qt.UserRole, key)
+            self.detection_list.addItem(item)
+        self.detection_list.setVisible(bool(groups))
+    
+    def accepted_groups(self):
+        """Keys of the detected spikes that are still checked"""
+        return [self.detection_list.item(i).data(Qt.UserRole)
+                for i in range(self.detection_list.count())
+                if self.detection_list.item(i).checkState() == Qt.Checked]
+        
     def set_selected_point(self, timestamp, level):
         """Set a selected point from the main dialog. Handles first/second point logic."""
         if self.current_point is None:
@@ -212,6 +256,8 @@ class SpikeFixHelperDialog(EditToolHelperDialog):
         self.current_point = None
         self._update_pairs_label()
         self.remove_last_pair_btn.setEnabled(False)
+        self.detection_label.setText("")
+        self.set_detected_groups([])
         self.status_label.setText("All pairs cleared.")
 
 class CompensationHelperDialog(EditToolHelperDialog):
@@ -9,7 +9,7 @@ from PyQt5.QtWidgets import (
     QProgressDialog, QSplitter  # Add QSplitter here
 )
 from PyQt5.QtCore import Qt, QTimer  # Add QTimer here
-from PyQt5.QtGui import QFont, QIcon
+from PyQt5.QtGui import QFont, QIcon, QKeySequence
 from PyQt5.QtWidgets import QAbstractSpinBox
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
 from matplotlib.figure import Figure
@@ -18,6 +18,10 @@ import matplotlib.dates as mdates
 import sqlite3
 from typing import List
 from .edit_tool_helper_dialog import SpikeFixHelperDialog, CompensationHelperDialog, BaselineHelperDialog
+from ..handlers.water_level_bulk_commit import BulkCommitWorker, JournalRestoreWorker, build_update_frame
+from ..handlers.spike_detection import SpikeDetector
+from ..handlers.segment_compensation import SegmentCompensationEngine
+from ..handlers.water_level_edit_journal import EditJournal, SCOPE_SESSION, SCOPE_COMMITTED, ACTION_UNDO, ACTION_REDO
 import numpy as np
 import matplotlib.patches
 import uuid
@@ -25,6 +29,8 @@ import copy
 
 logger = logging.getLogger(__name__)
 
+PREVIEW_MAX_POINTS = 20000  # Preview lines are thinned to about this many points
+
 class WaterLevelEditDialog(QDialog):
     def __init__(self, transducer_data=None, manual_data=None, master_baro_data=None, parent=None, db_path=None):
         super().__init__(parent)
@@ -106,12 +112,13 @@ class WaterLevelEditDialog(QDialog):
             'edits': []
         }
         
-        # Store original session data for reset functionality
-        self.original_session_data = {
-            'transducer_data': self.transducer_data.copy() if not self.transducer_data.empty else pd.DataFrame(),
-            'manual_data': self.manual_data.copy() if not self.manual_data.empty else pd.DataFrame(),
-            'plot_data': self.plot_data.copy() if not self.plot_data.empty else pd.DataFrame()
-        }
+        # Edits are journaled (only changed ranges and their before/after values),
+        # which backs undo/redo and reset; committed edits stay revertible in the
+        # project database, session edits are dropped when the dialog closes
+        self.edit_journal = EditJournal(db_path)
+        self._restore_worker = None
+        self.wrote_database = False  # A commit, revert or re-apply changed the database
+        self._compensation_engine = None  # Built on first use, dropped when the data changes
         
         # Track active instances
         self.active_instances = {}
@@ -522,6 +529,16 @@ class WaterLevelEditDialog(QDialog):
         self.reset_all_edits_action.setToolTip("Reset all edits made in this session")
         self.reset_all_edits_action.triggered.connect(self.reset_all_edits)
         
+        self.undo_action = self.toolbar.addAction("Undo")
+        self.undo_action.setToolTip("Undo the last edit (after a commit, revert the last committed edits)")
+        self.undo_action.setShortcut(QKeySequence.Undo)
+        self.undo_action.triggered.connect(self.undo_edit)
+        self.redo_action = self.toolbar.addAction("Redo")
+        self.redo_action.setToolTip("Redo the last undone edit")
+        self.redo_action.setShortcut(QKeySequence.Redo)
+        self.redo_action.triggered.connect(self.redo_edit)
+        self._update_undo_actions()
+        
         plot_content_layout.addWidget(self.toolbar)
         plot_content_layout.addWidget(self.canvas)
         
@@ -1055,159 +1072,64 @@ class WaterLevelEditDialog(QDialog):
             # Close any open helper dialogs first
             self.close_helper_dialogs()
             
-            # Find records that have been modified by any of the three methods
-            baro_mod_mask = self.transducer_data['baro_flag_mod'] == 'master_mod'  # Compensation
-            level_mod_mask = self.transducer_data['level_flag_mod'] == 'level_mod'  # Baseline adjustment
-            spike_mod_mask = self.transducer_data['spike_flag'] == 'spike_corrected'  # Spike fix
+            # Pick the value and flags to write for every modified record in one
+            # vectorized pass (compensation, then baseline adjustment, then spike fix)
+            update_frame = build_update_frame(self.transducer_data)
             
-            # Combine all modification masks to get all modified records
-            modified_mask = baro_mod_mask | level_mod_mask | spike_mod_mask
-            valid_well_mask = ~self.transducer_data['well_number'].isna()
-            update_mask = modified_mask & valid_well_mask
-            modified_data = self.transducer_data[update_mask].copy()
-            
-            if modified_data.empty:
+            if update_frame.empty:
                 QMessageBox.information(self, "No Changes", "No data with changes to apply.")
                 return
                 
             # Show confirmation dialog
-            num_records = len(modified_data)
+            num_records = len(update_frame)
             confirm_msg = f"Are you sure you want to update {num_records} records in the database?\n\n" \
                           f"This will update water levels and their corresponding flags."
             
             if QMessageBox.question(self, 'Confirm Changes', confirm_msg, 
                                   QMessageBox.Yes | QMessageBox.No) == QMessageBox.No:
                 return
+            
+            # Check database path
+            if not self.db_path:
+                raise ValueError("No database path provided")
                 
             # Create progress dialog
-            progress = QProgressDialog("Updating database...", "Cancel", 0, num_records, self)
+            progress = QProgressDialog("Updating database...", "Cancel", 0, 100, self)
             progress.setWindowModality(Qt.WindowModal)
             progress.setWindowTitle("Applying Changes")
             progress.setMinimumDuration(0)  # Show immediately
             progress.setValue(0)  # Start at 0
             progress.show()
             
-            try:
-                # Check database path
-                if not self.db_path:
-                    raise ValueError("No database path provided")
-                    
-                # Connect and start transaction
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-
-                # Log the start of the process
-                logger.info(f"Starting database update for {num_records} records")
-                
-                # Process in smaller batches to update progress more frequently
-                batch_size = 100  # Process 100 records at a time
-                records_updated = 0
-                total_updated = 0
-                
-                # Prepare all update data first
-                update_data = []
-                for index, row in modified_data.iterrows():
-                    # Determine which water level and flags to use based on priority
-                    if row['baro_flag_mod'] == 'master_mod':
-                        water_level = row['water_level_master_corrected']
-                        baro_flag = 'master_corrected'
-                        level_flag = 'master_level_corrected' if row['level_flag_baro_mod'] == 'master_mod' else row['level_flag']
-                    elif row['level_flag_mod'] == 'level_mod':
-                        water_level = row['water_level_level_corrected']
-                        level_flag = 'level_corrected'
-                        baro_flag = row['baro_flag']
-                    else:  # spike correction
-                        water_level = row['water_level_spike_corrected']
-                        level_flag = 'spike_corrected'
-                        baro_flag = row['baro_flag']
-                        
-                    # Format timestamp
-                    timestamp_utc = row['timestamp_utc'].strftime('%Y-%m-%d %H:%M:%S') if isinstance(row['timestamp_utc'], pd.Timestamp) else str(row['timestamp_utc'])
-                    
-                    # Add to batch update data
-                    update_data.append((water_level, level_flag, baro_flag, str(row['well_number']).strip(), timestamp_utc))
-                    
-                    # Update progress more frequently
-                    records_updated += 1
-                    if records_updated % 10 == 0:  # Update UI every 10 records during preparation
-                        progress.setValue(records_updated)
-                        QApplication.processEvents()
-                        
-                    # Check for cancellation
-                    if progress.wasCanceled():
-                        conn.rollback()
-                        conn.close()
-                        progress.close()
-                        logger.info("Update operation canceled by user")
-                        QMessageBox.information(self, "Operation Canceled", "Database update was canceled.")
-                        return
-                
-                # Now execute the updates in batches
-                logger.info(f"Processing updates in batches of {batch_size}")
-                for i in range(0, len(update_data), batch_size):
-                    batch = update_data[i:i+batch_size]
-                    
-                    # Execute batch update
-                    cursor.executemany("""
-                        UPDATE water_level_readings 
-                        SET water_level = ?, level_flag = ?, baro_flag = ?
-                        WHERE well_number = ? AND timestamp_utc = ?
-                    """, batch)
-                    
-                    # Count records affected in this batch
-                    batch_affected = cursor.rowcount if cursor.rowcount >= 0 else len(batch)
-                    total_updated += batch_affected
-                    
-                    # Update progress
-                    current_progress = min(i + batch_size, num_records)
-                    progress.setValue(current_progress)
-                    logger.debug(f"Progress: {current_progress}/{num_records} records processed")
-                    QApplication.processEvents()
-                    
-                    # Check for cancellation
-                    if progress.wasCanceled():
-                        conn.rollback()
-                        conn.close()
-                        progress.close()
-                        logger.info("Update operation canceled by user")
-                        QMessageBox.information(self, "Operation Canceled", "Database update was canceled.")
-                        return
-                
-                # Ensure progress bar reaches 100% before commit
-                progress.setValue(num_records)
-                QApplication.processEvents()
-                logger.info("All records processed, committing transaction")
-                
-                # Commit transaction
-                conn.commit()
-                
-                # Update per-well flag summary in wells table after edits
-                try:
-                    from ...database.models.water_level import WaterLevelModel
-                    model = WaterLevelModel(self.db_path)
-                    for wn in modified_data['well_number'].unique():
-                        model.update_well_flags(wn)
-                except Exception as e:
-                    logger.error(f"Error updating well flags after edit: {e}")
-                
-                # Use total_updated for the success message
-                logger.info(f"Database updated successfully. {total_updated} records affected.")
-                QMessageBox.information(self, "Changes Applied", 
-                                      f"Successfully updated {total_updated} records in the database.")
-                
-                # Close everything
-                conn.close()
+            # Stage and apply the updates in one transaction on a worker thread
+            logger.info(f"Starting database update for {num_records} records")
+            worker = BulkCommitWorker(self.db_path, update_frame, parent=self,
+                                      journal=self.edit_journal, session_id=self.session_id)
+            self._commit_worker = worker
+            worker.progress.connect(progress.setValue)
+            progress.canceled.connect(worker.cancel)
+            
+            def on_finished(result):
                 progress.close()
+                logger.info(f"Database updated successfully. {result.rows_updated} records affected.")
+                self.wrote_database = True
+                QMessageBox.information(self, "Changes Applied", result.summary_text())
                 self.close_helper_dialogs()  # Ensure helper dialogs are closed
                 self.accept()
-                
-            except Exception as e:
-                if 'conn' in locals():
-                    conn.rollback()
-                    conn.close()
+            
+            def on_cancelled():
                 progress.close()
-                logger.error(f"Database update error: {e}", exc_info=True)
-                raise e
+                logger.info("Update operation canceled by user")
+                QMessageBox.information(self, "Operation Canceled", "Database update was canceled.")
+            
+            def on_failed(message):
+                progress.close()
+                QMessageBox.critical(self, "Error", f"Failed to apply changes: {message}")
+            
+            worker.finished_ok.connect(on_finished)
+            worker.cancelled.connect(on_cancelled)
+            worker.failed.connect(on_failed)
+            worker.start()
                 
         except Exception as e:
             logger.error(f"Error applying changes to database: {e}", exc_info=True)
@@ -1346,9 +1268,10 @@ class WaterLevelEditDialog(QDialog):
             params = self.spike_helper.get_current_parameters()
             pairs = params.get("pairs", [])
             interval_minutes = params.get("interval_minutes", 15)
-            if not pairs:
+            detected = getattr(self, 'detected_spikes', None)
+            if not pairs and not detected:
                 QApplication.restoreOverrideCursor()
-                QMessageBox.warning(self, "Warning", "Please select at least one pair of points.")
+                QMessageBox.warning(self, "Warning", "Please select at least one pair of points or auto-detect spikes.")
                 return
             
             # Track changes for this instance
@@ -1415,14 +1338,33 @@ class WaterLevelEditDialog(QDialog):
             # Apply changes using the new tracking system
             if changes:
                 self.apply_instance_edits(self.spike_helper.instance_id, 'spike_fix', changes)
+            
+            # Accepted auto-detected spikes are tracked as their own instance
+            detected_count = 0
+            if detected:
+                accepted = self.spike_helper.accepted_groups()
+                auto_changes = {}
+                for entry, (index, result) in enumerate(detected):
+                    kept = result.select(group_id for e, group_id in accepted if e == entry)
+                    auto_changes.update(
+                        (idx, {'water_level_spike_corrected': level, 'spike_flag': 'spike_corrected'})
+                        for idx, level in zip(index[kept.positions], kept.suggested)
+                    )
+                if auto_changes:
+                    self.apply_instance_edits(f"{self.spike_helper.instance_id}-auto", 'spike_fix', auto_changes)
+                detected_count = len(auto_changes)
+                self.detected_spikes = None
                 
             self.ax.legend(loc='upper right')
             self.canvas.draw()
             QApplication.restoreOverrideCursor()
+            message = f"Added linear interpolation for {len(pairs)} pairs."
+            if detected_count:
+                message += f"\nFixed {detected_count} auto-detected spike readings."
             QMessageBox.information(
                 self, 
                 "Interpolation Added", 
-                f"Added linear interpolation for {len(pairs)} pairs.\nClick 'Apply Changes' on the main dialog to save to database."
+                f"{message}\nClick 'Apply Changes' on the main dialog to save to database."
             )
             # Reset helper dialog state for next use
             if hasattr(self.spike_helper, 'clear_all'):
@@ -1432,6 +1374,69 @@ class WaterLevelEditDialog(QDialog):
             QApplication.restoreOverrideCursor()
             QMessageBox.critical(self, "Error", f"Failed to apply spike fix: {str(e)}")
 
+    def auto_detect_spikes(self, helper_dialog):
+        """Run spike detection over each well's series and preview the suggested fixes"""
+        try:
+            if self.transducer_data.empty:
+                return
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            
+            # Remove previous preview lines
+            if hasattr(self, 'spike_lines') and self.spike_lines:
+                for line in self.spike_lines:
+                    try: line.remove()
+                    except: pass
+            self.spike_lines = []
+            
+            # One (row index, result) entry per well with detections; the
+            # helper lists each group so it can be accepted or left out
+            detector = SpikeDetector()
+            detected = []
+            rows = []
+            wells = (self.transducer_data['well_number'].unique()
+                     if 'well_number' in self.transducer_data.columns else [None])
+            for well in wells:
+                well_data = self.transducer_data
+                if well is not None:
+                    well_data = well_data[well_data['well_number'] == well]
+                well_data = well_data.sort_values('timestamp_utc')
+                result = detector.detect(well_data['timestamp_utc'], well_data['water_level'].to_numpy())
+                if result.empty:
+                    continue
+                entry = len(detected)
+                detected.append((well_data.index, result))
+                for group in result.groups.itertuples():
+                    label = (f"{group.start_time:%Y-%m-%d %H:%M}: {group.n_points} readings, "
+                             f"{group.max_deviation:.2f} ft ({group.reason})")
+                    rows.append(((entry, group.group_id), f"{well}, {label}" if well is not None else label))
+            
+            self.detected_spikes = detected or None
+            reading_count = sum(len(result.positions) for _, result in detected)
+            if detected:
+                indices = np.concatenate([index[result.positions] for index, result in detected])
+                suggested = np.concatenate([result.suggested for _, result in detected])
+                times = self.transducer_data.loc[indices, 'timestamp_utc']
+                spikes = self.ax.scatter(times, self.transducer_data.loc[indices, 'water_level'],
+                                         color='orange', s=30, zorder=5, label='Detected spikes')
+                fixes = self.ax.scatter(times, suggested,
+                                        color='green', marker='x', s=30, zorder=5, label='Suggested fix')
+                self.spike_lines.extend([spikes, fixes])
+                self.ax.legend(loc='upper right')
+            self.canvas.draw()
+            QApplication.restoreOverrideCursor()
+            
+            helper_dialog.set_detected_groups(rows)
+            if detected:
+                helper_dialog.set_detection_summary(
+                    f"Detected {len(rows)} spikes ({reading_count} readings). "
+                    "Uncheck any to leave out, then click 'Apply'.")
+            else:
+                helper_dialog.set_detection_summary("No spikes detected.")
+        except Exception as e:
+            logger.error(f"Error detecting spikes: {e}", exc_info=True)
+            QApplication.restoreOverrideCursor()
+            QMessageBox.critical(self, "Error", f"Failed to detect spikes: {str(e)}")
+
     def reset_spike_fix(self):
         """Reset all spike corrected data back to original values and clear pairs"""
         try:
@@ -1489,8 +1494,10 @@ class WaterLevelEditDialog(QDialog):
                 except: pass
             self.spike_lines = []
         # Reset edits for this instance
+        self.detected_spikes = None
         if hasattr(self, 'spike_helper') and self.spike_helper:
             self.reset_instance_edits(self.spike_helper.instance_id)
+            self.reset_instance_edits(f"{self.spike_helper.instance_id}-auto")
         # Clear helper dialog list
         if hasattr(self, 'spike_helper') and hasattr(self.spike_helper, 'clear_all'):
             self.spike_helper.clear_all()
@@ -1515,11 +1522,67 @@ class WaterLevelEditDialog(QDialog):
         logger.debug("Baseline helper buttons connected")
         self.baseline_helper.show()
 
+    def _get_compensation_engine(self):
+        """Segment index of the current data; rebuilt only after the data changes"""
+        if self._compensation_engine is None:
+            self._compensation_engine = SegmentCompensationEngine(
+                self.transducer_data, self.manual_data, self.baro_data)
+        return self._compensation_engine
+    
+    def _selected_transducer_index(self):
+        """Index labels of the selected transducer readings"""
+        if self.selected_data is None or self.selected_data.empty:
+            return pd.Index([])
+        # First check for our custom marker column
+        if 'data_source_type' in self.selected_data.columns:
+            transducer_mask = self.selected_data['data_source_type'] == 'Transducer'
+        # Then try the regular data_source column
+        elif 'data_source' in self.selected_data.columns:
+            transducer_mask = self.selected_data['data_source'].str.contains('Transducer', case=False, na=False)
+        else:
+            # If data_source column doesn't exist, use the transducer_data DataFrame indices
+            transducer_mask = self.selected_data.index.isin(self.transducer_data.index)
+        return self.selected_data.index[transducer_mask]
+    
+    def _compensation_positions(self, engine, mode):
+        if mode == "selection":
+            return engine.positions_for(self._selected_transducer_index())
+        # For missing ranges, only use data where baro_flag is not master or master_corrected
+        return engine.missing_positions()
+    
+    def _clear_compensation_lines(self):
+        if self.compensation_line_handles:
+            for line in self.compensation_line_handles:
+                if line:
+                    try:
+                        line.remove()
+                    except Exception as e:
+                        logger.error(f"Error removing compensation line: {e}")
+            self.compensation_line_handles = []
+    
+    def _draw_compensation_line(self, result, label):
+        """Draw the compensated readings of a CompensationResult (thinned for large wells)"""
+        times = pd.to_datetime(result.timestamps[result.baro_mod])
+        levels = result.master_corrected[result.baro_mod]
+        step = max(1, len(times) // PREVIEW_MAX_POINTS)
+        line_handle, = self.ax.plot(
+            times[::step],
+            levels[::step],
+            color='green',
+            linestyle='--',
+            linewidth=2,
+            label=label,
+            zorder=6
+        )
+        self.compensation_line_handles = [line_handle]
+        self.ax.legend(loc='upper right')
+        self.canvas.draw()
+    
     def preview_compensation(self, params):
-        """Preview compensation with given parameters"""
+        """Preview compensation with given parameters (the data only changes on Apply)"""
         try:
             # Clear any existing compensation preview lines
-            self.reset_compensation()
+            self._clear_compensation_lines()
             logger.debug(f"Previewing compensation with params: {params}")
             
             # Get mode from the compensation helper dialog parameters
@@ -1530,384 +1593,22 @@ class WaterLevelEditDialog(QDialog):
             if not show_preview:
                 logger.debug("Preview disabled, skipping")
                 return
-
-            # Get the working dataset based on mode
-            if mode == "selection":
-                if self.selected_data is None or self.selected_data.empty:
-                    logger.debug("No data selected for compensation preview.")
-                    return
-                df = self.selected_data.copy()
-            elif mode == "missing":
-                # For missing ranges, only get data where baro_flag is not master
-                df = self.plot_data[self.plot_data['baro_flag'] != 'master'].copy()
             
-            if df.empty:
+            engine = self._get_compensation_engine()
+            positions = self._compensation_positions(engine, mode)
+            if len(positions) == 0:
                 logger.debug("No data found to preview compensation.")
                 return
-
-            # Filter to only include transducer data (not manual readings)
-            # First check for our custom marker column
-            if 'data_source_type' in df.columns:
-                transducer_mask = df['data_source_type'] == 'Transducer'
-            # Then try the regular data_source column
-            elif 'data_source' in df.columns:
-                transducer_mask = df['data_source'].str.contains('Transducer', case=False, na=False)
-            else:
-                # If data_source column doesn't exist, use the transducer_data DataFrame indices
-                transducer_mask = df.index.isin(self.transducer_data.index)
-                
-            df = df[transducer_mask]
-            
-            logger.debug(f"Working dataset size for preview: {len(df)}")
-            
-            # Get the master baro data for the time range
-            master_data = self.plot_data[
-                (self.plot_data['baro_flag'] == 'master') &
-                (self.plot_data['timestamp_utc'] >= df['timestamp_utc'].min()) &
-                (self.plot_data['timestamp_utc'] <= df['timestamp_utc'].max())
-            ].copy()
-
-            logger.debug(f"Master baro data size: {len(master_data)}")
-            
-            # Check if master data is empty and handle gracefully
-            if master_data.empty:
+            if engine.baro_count(positions) == 0:
                 logger.debug("No master baro data available for compensation preview.")
                 return
             
-            # Check if pressure column exists in master data
-            if 'pressure' not in master_data.columns:
-                logger.warning("Master baro data doesn't contain 'pressure' column")
-                return
-
-            # Sort both datasets by timestamp
-            df = df.sort_values('timestamp_utc')
-            master_data = master_data.sort_values('timestamp_utc')
-            
-            # Interpolate master baro data to match our timestamps
-            master_baro_interp = np.interp(
-                mdates.date2num(df['timestamp_utc']),
-                mdates.date2num(master_data['timestamp_utc']),
-                master_data['pressure']
-            )
-            
-            # Constants
-            PSI_TO_FEET_OF_WATER = 2.31  # 1 PSI = 2.31 feet of water
-            STANDARD_PRESSURE = 14.7  # Standard atmospheric pressure in PSI
-
-            # Calculate the barometric correction in feet of water
-            baro_correction_feet = (master_baro_interp - STANDARD_PRESSURE) * PSI_TO_FEET_OF_WATER
-            
-            # Calculate corrected water level
-            corrected_levels = df['water_level'] - baro_correction_feet
-
-            # Update the data in the water_level_master_corrected column but DON'T update flags yet
-            df['water_level_master_corrected'] = corrected_levels
-            
-            # Save indices for later use
-            indices_to_update = df.index
-            
-            # Update the main transducer_data DataFrame with corrected levels
-            self.transducer_data.loc[indices_to_update, 'water_level_master_corrected'] = corrected_levels
-            
-            # Also update the combined plot_data (for backwards compatibility)
-            self.plot_data.loc[indices_to_update, 'water_level_master_corrected'] = corrected_levels
-            
-            # STEP 2: SEGMENTATION AND LEVELING
-            # Identify segments now, before flagging any data as master_corrected
-            segments = self._identify_segments(self.transducer_data)
-            logger.debug(f"Found {len(segments)} segments for leveling")
-            
-            # For each segment, apply the appropriate level adjustment
-            for i, segment in enumerate(segments):
-                # Skip segments that already have master/master_corrected flags
-                if segment['baro_flag'].isin(['master', 'master_corrected']).all():
-                    logger.debug(f"Segment {i+1} already has master/master_corrected flags, skipping")
-                    continue
-                    
-                logger.debug(f"Processing segment {i+1}: {len(segment)} points from "
-                            f"{segment['timestamp_utc'].min()} to {segment['timestamp_utc'].max()}")
-                
-                # Apply the leveling using the 3-tier priority system
-                segment_indices = segment.index
-                adjustment = 0.0
-                level_method = "none"
-                
-                # Priority 1: Check for master/master_corrected data within 1 hour of segment start
-                adjustment, level_method = self._find_reference_level_start(segment)
-                
-                # Priority 2: If no reference found, check for master/master_corrected data within 1 hour of segment end
-                if adjustment == 0.0 and level_method == "none":
-                    adjustment, level_method = self._find_reference_level_end(segment)
-                
-                # Priority 3: If still no reference found, use manual readings
-                if adjustment == 0.0 and level_method == "none":
-                    adjustment, level_method = self._find_manual_level_references(segment)
-                
-                # Apply adjustment if we found a reference
-                if level_method != "none":
-                    # Update the water level values
-                    self.transducer_data.loc[segment_indices, 'water_level_master_corrected'] += adjustment
-                    self.plot_data.loc[segment_indices, 'water_level_master_corrected'] += adjustment
-                    
-                    # Keep track that this segment was leveled (for flagging in step 3)
-                    self.transducer_data.loc[segment_indices, '_needs_level_flag'] = True
-                    self.plot_data.loc[segment_indices, '_needs_level_flag'] = True
-                    
-                    logger.debug(f"Applied level adjustment of {adjustment:.3f} ft to segment {i+1} "
-                                f"using method: {level_method}")
-                else:
-                    logger.debug(f"No reference level found for segment {i+1}, left unleveled")
-            
-            # STEP 3: FLAGS - Update only the modification flags
-            # Set 'baro_flag_mod' to 'master_mod' for all compensated data
-            self.transducer_data.loc[indices_to_update, 'baro_flag_mod'] = 'master_mod'
-            self.plot_data.loc[indices_to_update, 'baro_flag_mod'] = 'master_mod'
-            
-            # Set 'level_flag_baro_mod' to 'master_mod' for leveled data
-            # First make sure the temporary flag column exists
-            if '_needs_level_flag' not in self.transducer_data.columns:
-                self.transducer_data['_needs_level_flag'] = False
-            if '_needs_level_flag' not in self.plot_data.columns:
-                self.plot_data['_needs_level_flag'] = False
-            
-            # Then update level flags where needed
-            level_mask = self.transducer_data['_needs_level_flag'] == True
-            self.transducer_data.loc[level_mask, 'level_flag_baro_mod'] = 'master_mod'
-            self.plot_data.loc[level_mask, 'level_flag_baro_mod'] = 'master_mod'
-            
-            # Clear the temporary column
-            self.transducer_data.drop('_needs_level_flag', axis=1, inplace=True, errors='ignore')
-            self.plot_data.drop('_needs_level_flag', axis=1, inplace=True, errors='ignore')
-
-            # Clear existing compensation lines
-            if self.compensation_line_handles:
-                for line in self.compensation_line_handles:
-                    if line:
-                        try:
-                            line.remove()
-                        except Exception as e:
-                            logger.error(f"Error removing compensation line: {e}")
-                self.compensation_line_handles = []
-            
-            # Draw the applied line directly with green color
-            # Use the updated water_level_master_corrected that includes leveling adjustments
-            line_handle, = self.ax.plot(
-                self.transducer_data.loc[indices_to_update, 'timestamp_utc'],
-                self.transducer_data.loc[indices_to_update, 'water_level_master_corrected'],
-                color='green',
-                linestyle='--',
-                linewidth=2,
-                label="Applied: Master Baro Corrected",
-                zorder=6
-            )
-            
-            self.compensation_line_handles = [line_handle]
-            
-            # Update the legend and redraw
-            self.ax.legend(loc='upper right')
-            self.canvas.draw()
-
-            logger.debug(f"Applied compensation to {len(df)} points")
-
-        except Exception as e:
-            logger.error(f"Error applying compensation: {e}", exc_info=True)
-            # Use always-on-top message box
-            msg_box = QMessageBox(self)
-            msg_box.setIcon(QMessageBox.Critical)
-            msg_box.setWindowTitle("Error")
-            msg_box.setText(f"Failed to apply compensation: {str(e)}")
-            msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowStaysOnTopHint)
-            msg_box.exec_()
+            result = engine.compensate(positions)
+            self._draw_compensation_line(result, "Preview: Master Baro Corrected")
+            logger.debug(f"Previewed compensation of {len(positions)} points")
 
-    def _identify_segments(self, data: pd.DataFrame) -> List[pd.DataFrame]:
-        """
-        Identify segments where baro_flag is different from master or master_corrected.
-        Returns a list of DataFrames, each containing a consecutive segment.
-        """
-        try:
-            # Check if data is valid
-            if data.empty:
-                return []
-            
-            # Ensure data is sorted by timestamp
-            data = data.sort_values('timestamp_utc')
-            
-            # Create mask for non-master/non-master_corrected points
-            non_master_mask = ~data['baro_flag'].isin(['master', 'master_corrected'])
-            
-            # Check if we have any qualifying data
-            if not non_master_mask.any():
-                return []
-                
-            # Find transitions (where flag status changes)
-            transitions = non_master_mask.astype(int).diff().fillna(0).astype(int)
-            
-            # Get segment start indices (where transitions == 1)
-            starts = data.index[transitions == 1].tolist()
-            
-            # Get segment end indices (where transitions == -1)
-            ends = data.index[transitions == -1].tolist()
-            
-            # Handle case where data starts with non-master data
-            if non_master_mask.iloc[0]:
-                starts.insert(0, data.index[0])
-                
-            # Handle case where data ends with non-master data
-            if non_master_mask.iloc[-1]:
-                ends.append(data.index[-1])
-            
-            # Create segments
-            segments = []
-            for i in range(min(len(starts), len(ends))):
-                segment = data.loc[starts[i]:ends[i]]
-                if not segment.empty:
-                    segments.append(segment)
-            
-            return segments
-        except Exception as e:
-            logger.error(f"Error identifying segments: {e}")
-            return []
-            
-    def _find_reference_level_start(self, segment: pd.DataFrame) -> (float, str):
-        """
-        Find reference level using data near the segment start.
-        Returns a tuple of (adjustment value, method).
-        """
-        try:
-            # Get the timestamp of the first point in the segment
-            start_time = segment['timestamp_utc'].min()
-            
-            # Define the time window (1 hour before the start)
-            window_start = start_time - pd.Timedelta(hours=1)
-            window_end = start_time
-            
-            # Find master/master_corrected data in the window
-            reference_mask = (
-                (self.transducer_data['timestamp_utc'] >= window_start) &
-                (self.transducer_data['timestamp_utc'] <= window_end) &
-                (self.transducer_data['baro_flag'].isin(['master', 'master_corrected']))
-            )
-            
-            reference_data = self.transducer_data[reference_mask]
-            
-            if not reference_data.empty:
-                # Get the closest reference point to segment start
-                time_diffs = abs(reference_data['timestamp_utc'] - start_time)
-                closest_idx = time_diffs.idxmin()
-                reference_point = reference_data.loc[closest_idx]
-                
-                # Get the closest segment point to the reference
-                first_segment_point = segment.iloc[0]
-                
-                # Calculate the level difference
-                level_diff = reference_point['water_level_master_corrected'] - first_segment_point['water_level_master_corrected']
-                
-                logger.debug(f"Found reference at start: {reference_point['timestamp_utc']} "
-                          f"(diff: {(reference_point['timestamp_utc'] - start_time).total_seconds()/60:.1f} min), "
-                          f"adjustment: {level_diff:.3f} ft")
-                
-                return level_diff, "start_reference"
-            
-            return 0.0, "none"
-        except Exception as e:
-            logger.error(f"Error finding reference level at start: {e}")
-            return 0.0, "none"
-            
-    def _find_reference_level_end(self, segment: pd.DataFrame) -> (float, str):
-        """
-        Find reference level using data near the segment end.
-        Returns a tuple of (adjustment value, method).
-        """
-        try:
-            # Get the timestamp of the last point in the segment
-            end_time = segment['timestamp_utc'].max()
-            
-            # Define the time window (1 hour after the end)
-            window_start = end_time
-            window_end = end_time + pd.Timedelta(hours=1)
-            
-            # Find master/master_corrected data in the window
-            reference_mask = (
-                (self.transducer_data['timestamp_utc'] >= window_start) &
-                (self.transducer_data['timestamp_utc'] <= window_end) &
-                (self.transducer_data['baro_flag'].isin(['master', 'master_corrected']))
-            )
-            
-            reference_data = self.transducer_data[reference_mask]
-            
-            if not reference_data.empty:
-                # Get the closest reference point to segment end
-                time_diffs = abs(reference_data['timestamp_utc'] - end_time)
-                closest_idx = time_diffs.idxmin()
-                reference_point = reference_data.loc[closest_idx]
-                
-                # Get the last segment point
-                last_segment_point = segment.iloc[-1]
-                
-                # Calculate the level difference
-                level_diff = reference_point['water_level_master_corrected'] - last_segment_point['water_level_master_corrected']
-                
-                logger.debug(f"Found reference at end: {reference_point['timestamp_utc']} "
-                          f"(diff: {(reference_point['timestamp_utc'] - end_time).total_seconds()/60:.1f} min), "
-                          f"adjustment: {level_diff:.3f} ft")
-                
-                return level_diff, "end_reference"
-            
-            return 0.0, "none"
-        except Exception as e:
-            logger.error(f"Error finding reference level at end: {e}")
-            return 0.0, "none"
-    
-    def _find_manual_level_references(self, segment: pd.DataFrame) -> (float, str):
-        """
-        Find reference level using manual readings near the segment.
-        Returns a tuple of (adjustment value, method).
-        """
-        try:
-            # Get segment time range
-            start_time = segment['timestamp_utc'].min()
-            end_time = segment['timestamp_utc'].max()
-            
-            # Define expanded time window (±1 hour around segment)
-            window_start = start_time - pd.Timedelta(hours=1)
-            window_end = end_time + pd.Timedelta(hours=1)
-            
-            # Find manual readings in the window
-            if not self.manual_data.empty:
-                manual_mask = (
-                    (self.manual_data['timestamp_utc'] >= window_start) &
-                    (self.manual_data['timestamp_utc'] <= window_end)
-                )
-                manual_readings = self.manual_data[manual_mask]
-                
-                if not manual_readings.empty:
-                    # For each manual reading, find the closest segment point and calculate difference
-                    dh_values = []
-                    
-                    for _, manual_row in manual_readings.iterrows():
-                        # Find closest segment point in time
-                        time_diffs = abs(segment['timestamp_utc'] - manual_row['timestamp_utc'])
-                        closest_idx = time_diffs.idxmin()
-                        closest_point = segment.loc[closest_idx]
-                        
-                        # Calculate level difference
-                        dh = manual_row['water_level'] - closest_point['water_level_master_corrected']
-                        dh_values.append(dh)
-                        
-                        logger.debug(f"Manual reading at {manual_row['timestamp_utc']} matched with segment point at "
-                                  f"{closest_point['timestamp_utc']} (diff: {time_diffs.min().total_seconds()/60:.1f} min, "
-                                  f"level diff: {dh:.3f} ft)")
-                    
-                    # Calculate average difference
-                    if dh_values:
-                        avg_dh = sum(dh_values) / len(dh_values)
-                        logger.debug(f"Using average of {len(dh_values)} manual readings: {avg_dh:.3f} ft")
-                        return avg_dh, "manual_readings"
-            
-            return 0.0, "none"
         except Exception as e:
-            logger.error(f"Error finding manual level references: {e}")
-            return 0.0, "none"
+            logger.error(f"Error previewing compensation: {e}", exc_info=True)
 
     def reset_compensation(self):
         """Reset compensation for the current instance"""
@@ -2308,53 +2009,98 @@ class WaterLevelEditDialog(QDialog):
             self.baseline_helper.close()
             self.baseline_helper = None
     
-    def register_edit(self, instance_id, method, affected_indices, original_values, modified_values):
-        """Register an edit from a helper dialog instance"""
-        edit_record = {
-            'instance_id': instance_id,
-            'method': method,
-            'timestamp': datetime.now(),
-            'affected_indices': affected_indices.tolist() if hasattr(affected_indices, 'tolist') else list(affected_indices),
-            'original_values': original_values,
-            'modified_values': modified_values,
-            'is_applied': True
-        }
+    def register_edit(self, instance_id, method, batch_id, n_rows):
+        """Register a journaled edit from a helper dialog instance"""
+        for edit in self.edit_history['edits']:
+            if edit['instance_id'] == instance_id:
+                edit['batch_ids'].append(batch_id)
+                edit['n_rows'] += n_rows
+                edit['timestamp'] = datetime.now()
+                break
+        else:
+            self.edit_history['edits'].append({
+                'instance_id': instance_id,
+                'method': method,
+                'timestamp': datetime.now(),
+                'batch_ids': [batch_id],
+                'n_rows': n_rows,
+            })
+        logger.debug(f"Registered edit for instance {instance_id}, method: {method}, affecting {n_rows} rows")
+    
+    def _set_edit_values(self, column, values):
+        """Write per-row values (Series indexed like transducer_data) to transducer_data and plot_data"""
+        values = values[values.index.isin(self.transducer_data.index)]
+        if values.empty:
+            return
+        self._compensation_engine = None
+        self.transducer_data.loc[values.index, column] = values.to_numpy()
+        plot_mask = self.plot_data.index.isin(values.index)
+        if plot_mask.any():
+            self.plot_data.loc[plot_mask, column] = self.plot_data.index[plot_mask].map(values).to_numpy()
+    
+    def apply_instance_edits(self, instance_id, method, changes):
+        """
+        Apply edits from a specific helper instance and record them in the edit journal.
         
-        # Remove any existing edit with the same instance_id
-        self.edit_history['edits'] = [e for e in self.edit_history['edits'] if e['instance_id'] != instance_id]
+        Args:
+            instance_id: Helper dialog instance
+            method: Edit method name
+            changes: {index: {column: value}}
+        """
+        index = pd.Index([idx for idx in changes if idx in self.transducer_data.index])
+        columns = sorted({col for idx in index for col in changes[idx]})
+        new_values = {
+            col: pd.Series({idx: changes[idx][col] for idx in index if col in changes[idx]}, dtype=object).infer_objects()
+            for col in columns
+        }
+        self._apply_edit_columns(instance_id, method, index, new_values)
+    
+    def apply_instance_column_edits(self, instance_id, method, index, values):
+        """
+        Vectorized form of apply_instance_edits.
         
-        # Add the new edit
-        self.edit_history['edits'].append(edit_record)
-        logger.debug(f"Registered edit for instance {instance_id}, method: {method}, affecting {len(affected_indices)} rows")
+        Args:
+            instance_id: Helper dialog instance
+            method: Edit method name
+            index: Transducer data index labels of the edited rows
+            values: {column: array aligned with index, or a scalar for every row}
+        """
+        index = pd.Index(index)
+        known = index.isin(self.transducer_data.index)
+        new_values = {}
+        for col, column_values in values.items():
+            if np.ndim(column_values) == 0:
+                column_values = np.full(len(index), column_values, dtype=object)
+            new_values[col] = pd.Series(np.asarray(column_values)[known], index=index[known]).infer_objects()
+        self._apply_edit_columns(instance_id, method, index[known], new_values)
     
-    def apply_instance_edits(self, instance_id, method, changes):
-        """Apply edits from a specific helper instance"""
+    def _apply_edit_columns(self, instance_id, method, index, new_values):
+        """Write new column values for some of the rows in ``index`` and journal the change"""
         try:
-            # Store original values before applying changes
-            affected_indices = list(changes.keys())
-            original_values = {}
-            
-            for idx in affected_indices:
-                original_values[idx] = {
-                    'water_level': self.transducer_data.loc[idx, 'water_level'] if idx in self.transducer_data.index else None,
-                    'water_level_spike_corrected': self.transducer_data.loc[idx, 'water_level_spike_corrected'] if idx in self.transducer_data.index else None,
-                    'water_level_master_corrected': self.transducer_data.loc[idx, 'water_level_master_corrected'] if idx in self.transducer_data.index else None,
-                    'water_level_level_corrected': self.transducer_data.loc[idx, 'water_level_level_corrected'] if idx in self.transducer_data.index else None,
-                    'baro_flag_mod': self.transducer_data.loc[idx, 'baro_flag_mod'] if idx in self.transducer_data.index else None,
-                    'level_flag_mod': self.transducer_data.loc[idx, 'level_flag_mod'] if idx in self.transducer_data.index else None,
-                    'spike_flag': self.transducer_data.loc[idx, 'spike_flag'] if idx in self.transducer_data.index else None,
-                }
-            
-            # Apply the changes
-            for idx, change_data in changes.items():
-                for col, value in change_data.items():
-                    if idx in self.transducer_data.index:
-                        self.transducer_data.loc[idx, col] = value
-                    if idx in self.plot_data.index:
-                        self.plot_data.loc[idx, col] = value
+            if index.empty:
+                return
             
-            # Register the edit
-            self.register_edit(instance_id, method, affected_indices, original_values, changes)
+            before, after = {}, {}
+            for col, values in new_values.items():
+                if col in self.transducer_data.columns:
+                    current = self.transducer_data.loc[index, col]
+                else:
+                    current = pd.Series(None, index=index, dtype=object)
+                updated = current.astype(object).copy()
+                updated.loc[values.index] = values.to_numpy()
+                before[col], after[col] = current.to_numpy(), updated.infer_objects().to_numpy()
+                
+                # Apply the changes
+                self._set_edit_values(col, values)
+            
+            # Journal only the rows that changed
+            batch_id = self.edit_journal.record(
+                self.session_id, SCOPE_SESSION, method, self.transducer_data.loc[index, 'timestamp_utc'],
+                before, after, keys=index.to_numpy(), instance_id=instance_id,
+                well_number=self._journal_well_number())
+            if batch_id is not None:
+                self.register_edit(instance_id, method, batch_id, len(index))
+            self._update_undo_actions()
             
             # Update the plot
             self.update_plot()
@@ -2363,35 +2109,183 @@ class WaterLevelEditDialog(QDialog):
             logger.error(f"Error applying instance edits: {e}", exc_info=True)
             raise
     
+    def _journal_well_number(self):
+        """The well being edited, when the dialog holds a single well"""
+        if 'well_number' in self.transducer_data.columns:
+            wells = self.transducer_data['well_number'].dropna().unique()
+            if len(wells) == 1:
+                return str(wells[0])
+        return None
+    
+    def _edited_wells(self):
+        if 'well_number' not in self.transducer_data.columns:
+            return []
+        return [str(well) for well in self.transducer_data['well_number'].dropna().unique()]
+    
+    def _restore_session_batch(self, batch, side):
+        """Write one side of a session batch back to the in-memory data"""
+        batch = self.edit_journal.load(batch)
+        if batch.keys is None:
+            return
+        for col, values in batch.values(side).items():
+            self._set_edit_values(col, pd.Series(values, index=batch.keys).infer_objects())
+    
+    def _undo_session_batches(self, batches):
+        for batch in batches:
+            self._restore_session_batch(batch, 'before')
+            self.edit_journal.mark(batch.batch_id, ACTION_UNDO)
+    
+    def _patch_committed_readings(self, batch, side):
+        """Show a reverted/re-applied commit without reloading the well"""
+        if batch.timestamps is None or 'well_number' not in self.transducer_data.columns:
+            return
+        values = batch.values(side)
+        lookup = pd.DataFrame({col: values[col] for col in values},
+                              index=pd.MultiIndex.from_arrays([np.full(len(batch.timestamps), batch.well_number),
+                                                               pd.to_datetime(batch.timestamps)]))
+        keys = pd.MultiIndex.from_arrays([self.transducer_data['well_number'].astype(str),
+                                          pd.to_datetime(self.transducer_data['timestamp_utc'])])
+        matched = keys.isin(lookup.index)
+        if not matched.any():
+            return
+        rows = lookup.reindex(keys[matched])
+        index = self.transducer_data.index[matched]
+        for col in values:
+            self._set_edit_values(col, pd.Series(rows[col].to_numpy(), index=index).infer_objects())
+        # The readings now match the database again
+        for corrected in ('water_level_master_corrected', 'water_level_level_corrected', 'water_level_spike_corrected'):
+            self._set_edit_values(corrected, pd.Series(rows['water_level'].to_numpy(), index=index).infer_objects())
+        self._set_edit_values('baro_flag_mod', pd.Series(rows['baro_flag'].to_numpy(), index=index))
+        self._set_edit_values('level_flag_mod', pd.Series(rows['level_flag'].to_numpy(), index=index))
+        self._set_edit_values('level_flag_baro_mod', pd.Series(rows['level_flag'].to_numpy(), index=index))
+        self._set_edit_values('spike_flag', pd.Series('none', index=index))
+    
+    def _update_undo_actions(self):
+        if not hasattr(self, 'undo_action'):
+            return
+        try:
+            wells = self._edited_wells()
+            can_undo = bool(self.edit_journal.undo_stack(SCOPE_SESSION, self.session_id)) or \
+                bool(wells and self.db_path and self.edit_journal.undo_stack(SCOPE_COMMITTED, wells=wells))
+            can_redo = bool(self.edit_journal.redo_stack(SCOPE_SESSION, self.session_id)) or \
+                bool(wells and self.db_path and self.edit_journal.redo_stack(SCOPE_COMMITTED, wells=wells))
+        except Exception as e:
+            logger.error(f"Error reading edit journal: {e}")
+            can_undo = can_redo = False
+        self.undo_action.setEnabled(can_undo)
+        self.redo_action.setEnabled(can_redo)
+    
+    def undo_edit(self):
+        """Undo the last edit of this session, or revert the last committed edit batch"""
+        try:
+            session_batches = self.edit_journal.undo_stack(SCOPE_SESSION, self.session_id)
+            if session_batches:
+                self._undo_session_batches(session_batches[:1])
+                logger.info(f"Undid {session_batches[0].method} edit ({session_batches[0].n_rows} readings)")
+            else:
+                wells = self._edited_wells()
+                committed = self.edit_journal.undo_stack(SCOPE_COMMITTED, wells=wells) if wells and self.db_path else []
+                if not committed:
+                    return
+                batch = committed[0]
+                reply = QMessageBox.question(
+                    self, 'Revert Committed Edits',
+                    f"Revert the edits committed for well {batch.well_number} on {batch.created_at} "
+                    f"({batch.n_rows} readings)?\n\nThis changes the database.",
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+                if reply != QMessageBox.Yes:
+                    return
+                self._write_committed_batch(batch, 'before')
+                return
+            self._update_undo_actions()
+            self.update_plot()
+        except Exception as e:
+            logger.error(f"Error undoing edit: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to undo: {str(e)}")
+    
+    def redo_edit(self):
+        """Redo the last undone edit of this session, or re-apply the last reverted commit"""
+        try:
+            session_batches = self.edit_journal.redo_stack(SCOPE_SESSION, self.session_id)
+            if session_batches:
+                batch = session_batches[0]
+                self._restore_session_batch(batch, 'after')
+                self.edit_journal.mark(batch.batch_id, ACTION_REDO)
+                logger.info(f"Redid {batch.method} edit ({batch.n_rows} readings)")
+            else:
+                wells = self._edited_wells()
+                committed = self.edit_journal.redo_stack(SCOPE_COMMITTED, wells=wells) if wells and self.db_path else []
+                if not committed:
+                    return
+                self._write_committed_batch(committed[0], 'after')
+                return
+            self._update_undo_actions()
+            self.update_plot()
+        except Exception as e:
+            logger.error(f"Error redoing edit: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to redo: {str(e)}")
+    
+    def _write_committed_batch(self, batch, side):
+        """Revert ('before') or re-apply ('after') a committed batch on a worker thread"""
+        if self._restore_worker is not None:
+            return
+        self.undo_action.setEnabled(False)
+        self.redo_action.setEnabled(False)
+        worker = JournalRestoreWorker(self.edit_journal, batch, side, parent=self)
+        self._restore_worker = worker
+        
+        def on_finished(batch, written, skipped):
+            self._restore_worker = None
+            self.wrote_database = self.wrote_database or written > 0
+            self._patch_committed_readings(batch, side)
+            if side == 'before':
+                title, message = "Revert Complete", f"Reverted {written} readings."
+                if skipped:
+                    message += f"\n{skipped} readings were changed after that commit and were left as they are."
+            else:
+                title, message = "Redo Complete", f"Re-applied {written} committed readings."
+                if skipped:
+                    message += f"\n{skipped} readings were changed since and were left as they are."
+            self._update_undo_actions()
+            self.update_plot()
+            QMessageBox.information(self, title, message)
+        
+        def on_failed(error):
+            self._restore_worker = None
+            self._update_undo_actions()
+            action = "undo" if side == 'before' else "redo"
+            QMessageBox.critical(self, "Error", f"Failed to {action}: {error}")
+        
+        worker.finished_ok.connect(on_finished)
+        worker.failed.connect(on_failed)
+        worker.start()
+    
+    def done(self, result):
+        """Drop the session's journaled edits once the dialog closes: they were committed or discarded"""
+        if self._restore_worker is not None:
+            self._restore_worker.wait()
+        try:
+            self.edit_journal.clear_session(self.session_id)
+        except Exception as e:
+            logger.error(f"Error clearing the edit journal: {e}")
+        super().done(result)
+    
     def reset_instance_edits(self, instance_id):
         """Reset only edits from a specific instance"""
         try:
-            # Find the edit record
-            edit_record = None
-            for edit in self.edit_history['edits']:
-                if edit['instance_id'] == instance_id:
-                    edit_record = edit
-                    break
-            
-            if not edit_record:
+            batches = self.edit_journal.undo_stack(SCOPE_SESSION, self.session_id, instance_id=instance_id)
+            if not batches:
                 logger.warning(f"No edit record found for instance {instance_id}")
                 return
             
-            # Restore original values
-            for idx, original_data in edit_record['original_values'].items():
-                idx = int(idx) if isinstance(idx, str) else idx
-                
-                for col, value in original_data.items():
-                    if value is not None:
-                        if idx in self.transducer_data.index:
-                            self.transducer_data.loc[idx, col] = value
-                        if idx in self.plot_data.index:
-                            self.plot_data.loc[idx, col] = value
+            # Restore values from the journal, newest edit first
+            self._undo_session_batches(batches)
             
             # Remove the edit from history
             self.edit_history['edits'] = [e for e in self.edit_history['edits'] if e['instance_id'] != instance_id]
             
             logger.debug(f"Reset edits for instance {instance_id}")
+            self._update_undo_actions()
             
             # Update the plot
             self.update_plot()
@@ -2406,19 +2300,18 @@ class WaterLevelEditDialog(QDialog):
             reply = QMessageBox.question(
                 self, 
                 'Reset All Edits', 
-                'Are you sure you want to reset all edits made in this session?\nThis action cannot be undone.',
+                'Are you sure you want to reset all edits made in this session?\nThey can be restored one by one with Redo.',
                 QMessageBox.Yes | QMessageBox.No,
                 QMessageBox.No
             )
             
             if reply == QMessageBox.Yes:
-                # Restore original data
-                self.transducer_data = self.original_session_data['transducer_data'].copy()
-                self.manual_data = self.original_session_data['manual_data'].copy()
-                self.plot_data = self.original_session_data['plot_data'].copy()
+                # Undo every journaled edit of this session, newest first
+                self._undo_session_batches(self.edit_journal.undo_stack(SCOPE_SESSION, self.session_id))
                 
                 # Clear edit history
                 self.edit_history['edits'] = []
+                self._update_undo_actions()
                 
                 # Clear any preview lines or annotations
                 if hasattr(self, 'spike_lines') and self.spike_lines:
@@ -2588,8 +2481,6 @@ class WaterLevelEditDialog(QDialog):
     def apply_compensation_changes(self):
         """Apply compensation changes by correcting water level based on master baro data"""
         try:
-            # Track changes for this instance
-            changes = {}
             # Get mode from the compensation helper dialog parameters
             params = self.compensation_helper.get_current_parameters()
             
@@ -2600,34 +2491,20 @@ class WaterLevelEditDialog(QDialog):
             mode = params.get("mode", "missing")
             logger.debug(f"Compensation mode: {mode}")
             
-            if mode == "selection":
-                if self.selected_data is None or self.selected_data.empty:
-                    # Use always-on-top message box
-                    msg_box = QMessageBox(self)
-                    msg_box.setIcon(QMessageBox.Warning)
-                    msg_box.setWindowTitle("Error")
-                    msg_box.setText("No data selected for compensation.")
-                    msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowStaysOnTopHint)
-                    msg_box.exec_()
-                    return
-                    
-                # Keep only transducer data from selection
-                # First check for our custom marker column
-                if 'data_source_type' in self.selected_data.columns:
-                    transducer_mask = self.selected_data['data_source_type'] == 'Transducer'
-                # Then try the regular data_source column
-                elif 'data_source' in self.selected_data.columns:
-                    transducer_mask = self.selected_data['data_source'].str.contains('Transducer', case=False, na=False)
-                else:
-                    # If data_source column doesn't exist, use the transducer_data DataFrame indices
-                    transducer_mask = self.selected_data.index.isin(self.transducer_data.index)
-                
-                df = self.selected_data[transducer_mask].copy()
-            elif mode == "missing":
-                # For missing ranges, only get data where baro_flag is not master or master_corrected
-                df = self.transducer_data[~self.transducer_data['baro_flag'].isin(['master', 'master_corrected'])].copy()
+            if mode == "selection" and (self.selected_data is None or self.selected_data.empty):
+                # Use always-on-top message box
+                msg_box = QMessageBox(self)
+                msg_box.setIcon(QMessageBox.Warning)
+                msg_box.setWindowTitle("Error")
+                msg_box.setText("No data selected for compensation.")
+                msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowStaysOnTopHint)
+                msg_box.exec_()
+                return
             
-            if df.empty:
+            engine = self._get_compensation_engine()
+            positions = self._compensation_positions(engine, mode)
+            
+            if len(positions) == 0:
                 # Use always-on-top message box
                 msg_box = QMessageBox(self)
                 msg_box.setIcon(QMessageBox.Warning)
@@ -2637,181 +2514,40 @@ class WaterLevelEditDialog(QDialog):
                 msg_box.exec_()
                 return
                 
-            logger.debug(f"Working dataset size: {len(df)}")
-
-            # Get the master baro data in the proper time range
-            if not self.baro_data.empty:
-                # Filter master baro data by timestamp range only (without using baro_flag)
-                master_baro_mask = (self.baro_data['timestamp_utc'] >= df['timestamp_utc'].min()) & \
-                                  (self.baro_data['timestamp_utc'] <= df['timestamp_utc'].max())
-                master_data = self.baro_data[master_baro_mask].copy()
-            else:
-                master_data = pd.DataFrame()
-
-            logger.debug(f"Master baro data size: {len(master_data)}")
+            logger.debug(f"Working dataset size: {len(positions)}")
             
-            # Check if master data exists before continuing
-            if master_data.empty:
-                QMessageBox.warning(self, "Error", 
-                                "No master barometric data available in the selected range. "
-                                "Cannot perform compensation without master barometric data.")
-                return
-                
             # Check if pressure column exists
-            if 'pressure' not in master_data.columns:
+            if not self.baro_data.empty and 'pressure' not in self.baro_data.columns:
                 QMessageBox.warning(self, "Error", 
                                 "Master barometric data doesn't contain pressure readings. "
                                 "Cannot perform compensation without pressure data.")
                 return
-
-            # STEP 1: COMPENSATION - Calculate and apply barometric compensation
-            # Sort both datasets by timestamp
-            df = df.sort_values('timestamp_utc')
-            master_data = master_data.sort_values('timestamp_utc')
-            
-            # Interpolate master baro data to match our timestamps
-            master_baro_interp = np.interp(
-                mdates.date2num(df['timestamp_utc']),
-                mdates.date2num(master_data['timestamp_utc']),
-                master_data['pressure']
-            )
-            
-            # Constants
-            PSI_TO_FEET_OF_WATER = 2.31  # 1 PSI = 2.31 feet of water
-            STANDARD_PRESSURE = 14.7  # Standard atmospheric pressure in PSI
-
-            # Calculate the barometric correction in feet of water
-            baro_correction_feet = (master_baro_interp - STANDARD_PRESSURE) * PSI_TO_FEET_OF_WATER
-            
-            # Calculate corrected water level
-            corrected_levels = df['water_level'] - baro_correction_feet
-
-            # Update the data in the water_level_master_corrected column but DON'T update flags yet
-            df['water_level_master_corrected'] = corrected_levels
-            
-            # Save indices for later use
-            indices_to_update = df.index
-            
-            # Update the main transducer_data DataFrame with corrected levels
-            self.transducer_data.loc[indices_to_update, 'water_level_master_corrected'] = corrected_levels
             
-            # Also update the combined plot_data (for backwards compatibility)
-            self.plot_data.loc[indices_to_update, 'water_level_master_corrected'] = corrected_levels
-            
-            # STEP 2: SEGMENTATION AND LEVELING
-            # Identify segments now, before flagging any data as master_corrected
-            segments = self._identify_segments(self.transducer_data)
-            logger.debug(f"Found {len(segments)} segments for leveling")
+            # Check if master data exists before continuing
+            if engine.baro_count(positions) == 0:
+                QMessageBox.warning(self, "Error", 
+                                "No master barometric data available in the selected range. "
+                                "Cannot perform compensation without master barometric data.")
+                return
             
-            # For each segment, apply the appropriate level adjustment
-            for i, segment in enumerate(segments):
-                # Skip segments that already have master/master_corrected flags
-                if segment['baro_flag'].isin(['master', 'master_corrected']).all():
-                    logger.debug(f"Segment {i+1} already has master/master_corrected flags, skipping")
-                    continue
-                    
-                logger.debug(f"Processing segment {i+1}: {len(segment)} points from "
-                            f"{segment['timestamp_utc'].min()} to {segment['timestamp_utc'].max()}")
-                
-                # Apply the leveling using the 3-tier priority system
-                segment_indices = segment.index
-                adjustment = 0.0
-                level_method = "none"
-                
-                # Priority 1: Check for master/master_corrected data within 1 hour of segment start
-                adjustment, level_method = self._find_reference_level_start(segment)
-                
-                # Priority 2: If no reference found, check for master/master_corrected data within 1 hour of segment end
-                if adjustment == 0.0 and level_method == "none":
-                    adjustment, level_method = self._find_reference_level_end(segment)
-                
-                # Priority 3: If still no reference found, use manual readings
-                if adjustment == 0.0 and level_method == "none":
-                    adjustment, level_method = self._find_manual_level_references(segment)
-                
-                # Apply adjustment if we found a reference
-                if level_method != "none":
-                    # Update the water level values
-                    self.transducer_data.loc[segment_indices, 'water_level_master_corrected'] += adjustment
-                    self.plot_data.loc[segment_indices, 'water_level_master_corrected'] += adjustment
-                    
-                    # Keep track that this segment was leveled (for flagging in step 3)
-                    self.transducer_data.loc[segment_indices, '_needs_level_flag'] = True
-                    self.plot_data.loc[segment_indices, '_needs_level_flag'] = True
-                    
-                    logger.debug(f"Applied level adjustment of {adjustment:.3f} ft to segment {i+1} "
-                                f"using method: {level_method}")
-                else:
-                    logger.debug(f"No reference level found for segment {i+1}, left unleveled")
-            
-            # STEP 3: FLAGS - Update only the modification flags
-            # Set 'baro_flag_mod' to 'master_mod' for all compensated data
-            self.transducer_data.loc[indices_to_update, 'baro_flag_mod'] = 'master_mod'
-            self.plot_data.loc[indices_to_update, 'baro_flag_mod'] = 'master_mod'
-            
-            # Set 'level_flag_baro_mod' to 'master_mod' for leveled data
-            # First make sure the temporary flag column exists
-            if '_needs_level_flag' not in self.transducer_data.columns:
-                self.transducer_data['_needs_level_flag'] = False
-            if '_needs_level_flag' not in self.plot_data.columns:
-                self.plot_data['_needs_level_flag'] = False
-            
-            # Then update level flags where needed
-            level_mask = self.transducer_data['_needs_level_flag'] == True
-            self.transducer_data.loc[level_mask, 'level_flag_baro_mod'] = 'master_mod'
-            self.plot_data.loc[level_mask, 'level_flag_baro_mod'] = 'master_mod'
-            
-            # Clear the temporary column
-            self.transducer_data.drop('_needs_level_flag', axis=1, inplace=True, errors='ignore')
-            self.plot_data.drop('_needs_level_flag', axis=1, inplace=True, errors='ignore')
-
-            # Clear existing compensation lines
-            if self.compensation_line_handles:
-                for line in self.compensation_line_handles:
-                    if line:
-                        try:
-                            line.remove()
-                        except Exception as e:
-                            logger.error(f"Error removing compensation line: {e}")
-                self.compensation_line_handles = []
+            # Compensation, segmentation and leveling in one vectorized pass
+            result = engine.compensate(positions)
+            for segment in result.segments.itertuples():
+                logger.debug(f"Segment {segment.start} to {segment.end} ({segment.n_points} points): "
+                             f"adjustment {segment.adjustment:.3f} ft using method: {segment.method}")
+            
+            # Update only the modification flags, not the original flags
+            current_flags = self.transducer_data.loc[result.index, ['baro_flag_mod', 'level_flag_baro_mod']]
+            self.apply_instance_column_edits(self.compensation_helper.instance_id, 'compensation', result.index, {
+                'water_level_master_corrected': result.master_corrected,
+                'baro_flag_mod': np.where(result.baro_mod, 'master_mod', current_flags['baro_flag_mod'].to_numpy()),
+                'level_flag_baro_mod': np.where(result.level_mod, 'master_mod',
+                                                current_flags['level_flag_baro_mod'].to_numpy()),
+            })
             
             # Draw the applied line directly with green color
-            # Use the updated water_level_master_corrected that includes leveling adjustments
-            line_handle, = self.ax.plot(
-                self.transducer_data.loc[indices_to_update, 'timestamp_utc'],
-                self.transducer_data.loc[indices_to_update, 'water_level_master_corrected'],
-                color='green',
-                linestyle='--',
-                linewidth=2,
-                label="Applied: Master Baro Corrected",
-                zorder=6
-            )
-            
-            self.compensation_line_handles = [line_handle]
-            
-            # Update the legend and redraw
-            self.ax.legend(loc='upper right')
-            self.canvas.draw()
-
-            logger.debug(f"Applied compensation to {len(df)} points")
-            
-            # Track all changes for this instance  
-            for idx in indices_to_update:
-                changes[idx] = {
-                    'water_level_master_corrected': self.transducer_data.loc[idx, 'water_level_master_corrected'],
-                    'baro_flag_mod': 'master_mod'
-                }
-            
-            # Also track level flag changes
-            if level_mask.any():
-                for idx in self.transducer_data[level_mask].index:
-                    if idx not in changes:
-                        changes[idx] = {}
-                    changes[idx]['level_flag_baro_mod'] = 'master_mod'
-            
-            # Apply changes using the new tracking system
-            if changes:
-                self.apply_instance_edits(self.compensation_helper.instance_id, 'compensation', changes)
+            self._draw_compensation_line(result, "Applied: Master Baro Corrected")
+            logger.debug(f"Applied compensation to {len(positions)} points")
 
         except Exception as e:
             logger.error(f"Error applying compensation: {e}", exc_info=True)
@@ -2830,137 +2566,31 @@ class WaterLevelEditDialog(QDialog):
         pass
 
     def apply_baseline_changes(self):
-        """Apply baseline changes - SIMPLIFIED VERSION"""
+        """Apply a baseline offset to the selected readings, or to the visible range"""
         try:
             # Get parameters
             params = self.baseline_helper.get_current_parameters()
-            adjustment = params.get("adjustment_value", 0.0)
-            
-            if adjustment == 0:
-                QMessageBox.information(self, "Info", "No adjustment to apply (0.0 ft)")
-                return
+            engine = self._get_compensation_engine()
             
             # Check if there's a selection first
-            if self.selected_data is not None and not self.selected_data.empty:
-                # Use selected data
-                if 'data_source_type' in self.selected_data.columns:
-                    transducer_mask = self.selected_data['data_source_type'] == 'Transducer'
-                else:
-                    transducer_mask = self.selected_data.index.isin(self.transducer_data.index)
-                visible_data = self.selected_data[transducer_mask]
+            has_selection = self.selected_data is not None and not self.selected_data.empty
+            if has_selection:
+                positions = engine.positions_for(self._selected_transducer_index())
             else:
                 # No selection - use visible range
                 xlim = self.ax.get_xlim()
                 x_min = matplotlib.dates.num2date(xlim[0]).replace(tzinfo=None)
                 x_max = matplotlib.dates.num2date(xlim[1]).replace(tzinfo=None)
-                
-                # Find transducer data in visible range
-                mask = (self.transducer_data['timestamp_utc'] >= x_min) & \
-                       (self.transducer_data['timestamp_utc'] <= x_max)
-                visible_data = self.transducer_data[mask]
+                positions = engine.positions_in_range(x_min, x_max)
             
-            if visible_data.empty:
+            if len(positions) == 0:
                 QMessageBox.warning(self, "Error", "No transducer data in visible range")
                 return
             
-            # Simple adjustment - add to water_level_level_corrected
-            indices = visible_data.index
-            self.transducer_data.loc[indices, 'water_level_level_corrected'] = \
-                self.transducer_data.loc[indices, 'water_level'] + adjustment
-            
-            # Also update plot_data if indices exist there
-            common_indices = indices.intersection(self.plot_data.index)
-            if len(common_indices) > 0:
-                self.plot_data.loc[common_indices, 'water_level_level_corrected'] = \
-                    self.plot_data.loc[common_indices, 'water_level'] + adjustment
-            
-            # Simple plot update - just add a new line for adjusted data
-            adjusted_data = visible_data.copy()
-            adjusted_data['water_level'] = adjusted_data['water_level'] + adjustment
-            
-            # Plot the adjusted line in green
-            self.ax.plot(adjusted_data['timestamp_utc'], 
-                        adjusted_data['water_level'], 
-                        'g-', 
-                        label=f'Baseline Adjusted (+{adjustment} ft)',
-                        linewidth=2,
-                        alpha=0.8)
-            
-            # Store reference to this line so we can remove it later
-            if not hasattr(self, 'baseline_lines'):
-                self.baseline_lines = []
-            self.baseline_lines.append(self.ax.lines[-1])  # Last added line
-            
-            # Update legend and refresh
-            self.ax.legend()
-            self.canvas.draw()
-            
-            # Log success instead of showing dialog
-            if self.selected_data is not None and not self.selected_data.empty:
-                logger.info(f"Applied {adjustment} ft adjustment to {len(visible_data)} selected points")
-            else:
-                logger.info(f"Applied {adjustment} ft adjustment to {len(visible_data)} points in visible range")
-            
-        except Exception as e:
-            logger.error(f"Error in baseline adjustment: {e}", exc_info=True)
-            QMessageBox.critical(self, "Error", f"Baseline adjustment failed: {str(e)}")
-            
-            # Get working copy of selected data
-            df = self.selected_data.copy()
-            
-            # Calculate adjustment based on method
-            if params["method"] == "manual":
-                # Filter selected transducer data
-                # First check for our custom marker column
-                if 'data_source_type' in df.columns:
-                    transducer_mask = df['data_source_type'] == 'Transducer'
-                # Then try the regular data_source column
-                elif 'data_source' in df.columns:
-                    transducer_mask = df['data_source'].str.contains('Transducer', case=False, na=False)
-                else:
-                    # If data_source column doesn't exist, assume all data in transducer_data is transducer data
-                    transducer_mask = df.index.isin(self.transducer_data.index)
-                    
-                transducer_data = df[transducer_mask]
-                
-                logger.debug(f"Found {len(transducer_data)} transducer data points")
-                # Check if we have transducer data
-                if transducer_data.empty:
-                    logger.debug("No transducer data found - showing error")
-                    msg_box = QMessageBox(self)
-                    msg_box.setWindowTitle("Error")
-                    msg_box.setText("No transducer data found in selected range.")
-                    msg_box.setIcon(QMessageBox.Warning)
-                    msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowStaysOnTopHint)
-                    msg_box.exec_()
-                    return
-                
-                # For manual method, expand the time range by 1 hour on each side to find manual measurements
-                min_time = df['timestamp_utc'].min()
-                max_time = df['timestamp_utc'].max()
-                
-                # Expand time range by 1 hour in each direction for manual measurements only
-                expanded_min_time = min_time - pd.Timedelta(hours=1)
-                expanded_max_time = max_time + pd.Timedelta(hours=1)
-                
-                logger.debug("Searching for manual measurements")
-                # Use self.manual_data directly instead of filtering from plot_data
-                manual_readings = []
-                
-                logger.debug(f"Manual data available: {not self.manual_data.empty}, length: {len(self.manual_data) if not self.manual_data.empty else 0}")
-                # Only use manual_data source which was provided separately to the dialog
-                if not self.manual_data.empty:
-                    expanded_mask = (self.manual_data['timestamp_utc'] >= expanded_min_time) & \
-                                   (self.manual_data['timestamp_utc'] <= expanded_max_time)
-                    
-                    manual_from_manual_data = self.manual_data[expanded_mask].copy()
-                    if not manual_from_manual_data.empty:
-                        manual_readings.append(manual_from_manual_data)
-                
-                # Combine manual readings
-                manual_data = pd.concat(manual_readings) if manual_readings else pd.DataFrame()
-                
-                if manual_data.empty:
+            if params.get("method") == "manual":
+                # Manual measurements within ±1 hour of the range, matched to the closest reading
+                adjustment, n_manual = engine.manual_offset(positions)
+                if adjustment is None:
                     # Create message box that stays on top
                     msg_box = QMessageBox(self)
                     msg_box.setWindowTitle("Error")
@@ -2969,137 +2599,49 @@ class WaterLevelEditDialog(QDialog):
                     msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowStaysOnTopHint)
                     msg_box.exec_()
                     return
-                
-                # Log the data we're working with
-                logger.debug(f"Using {len(manual_data)} manual measurements from expanded range")
-                logger.debug(f"Using {len(transducer_data)} transducer readings from selected range")
-                
-                # Calculate differences between manual and closest transducer readings
-                dh_values = []
-                matches = []  # Store match details for a single summary log
-                for _, manual_row in manual_data.iterrows():
-                    time_diff = abs(transducer_data['timestamp_utc'] - manual_row['timestamp_utc'])
-                    if time_diff.empty:
-                        continue
-                    closest_idx = time_diff.idxmin()
-                    closest_transducer = transducer_data.loc[closest_idx]
-                    # Use original water_level for calculation
-                    dh = manual_row['water_level'] - closest_transducer['water_level']
-                    dh_values.append(dh)
-                    
-                    # Store match info for summary instead of logging each one
-                    time_difference_minutes = time_diff.min().total_seconds() / 60
-                    matches.append({
-                        'manual_time': manual_row['timestamp_utc'],
-                        'transducer_time': closest_transducer['timestamp_utc'],
-                        'time_diff_min': time_difference_minutes,
-                        'dh': dh
-                    })
-                
-                # Log a single summary of all matches (much less verbose)
-                if matches:
-                    logger.debug(f"Manual-Transducer matches summary:")
-                    for i, match in enumerate(matches, 1):
-                        logger.debug(f"  Match {i}: Manual at {match['manual_time']} → Transducer at {match['transducer_time']} "
-                                    f"(diff: {match['time_diff_min']:.1f} min, dh: {match['dh']:.3f} ft)")
-                
-                if not dh_values:
-                    # Create message box that stays on top
-                    msg_box = QMessageBox(self)
-                    msg_box.setWindowTitle("Error")
-                    msg_box.setText("Could not calculate adjustment values from manual readings.")
-                    msg_box.setIcon(QMessageBox.Warning)
-                    msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowStaysOnTopHint)
-                    msg_box.exec_()
-                    return
-                
-                adjustment = np.mean(dh_values)
-                logger.debug(f"Calculated manual adjustment (average of {len(dh_values)} differences): {adjustment:.3f} ft")
+                logger.debug(f"Calculated manual adjustment (average of {n_manual} differences): {adjustment:.3f} ft")
             else:  # Free leveling
-                adjustment = params["adjustment_value"]
+                adjustment = params.get("adjustment_value", 0.0)
                 logger.debug(f"Using free adjustment value: {adjustment:.3f} ft")
-                # For free leveling, filter for transducer data only
-                # First check for our custom marker column
-                if 'data_source_type' in df.columns:
-                    transducer_mask = df['data_source_type'] == 'Transducer'
-                # Then try the regular data_source column
-                elif 'data_source' in df.columns:
-                    transducer_mask = df['data_source'].str.contains('Transducer', case=False, na=False)
-                else:
-                    # If data_source column doesn't exist, assume all data in transducer_data is transducer data
-                    transducer_mask = df.index.isin(self.transducer_data.index)
-                    
-                transducer_data = df[transducer_mask]
-                
-                if transducer_data.empty:
-                    # Create message box that stays on top
-                    msg_box = QMessageBox(self)
-                    msg_box.setWindowTitle("Error")
-                    msg_box.setText("No transducer data found in selected range.")
-                    msg_box.setIcon(QMessageBox.Warning)
-                    msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowStaysOnTopHint)
-                    msg_box.exec_()
-                    return
-            
-            # Sort data by timestamp for better line plotting
-            transducer_data = transducer_data.sort_values('timestamp_utc')
-            
-            if not transducer_data.empty:
-                # Plot just the adjusted data (dashed line)
-                adjusted_levels = transducer_data['water_level'] + adjustment
-                adjusted_line, = self.ax.plot(
-                    transducer_data['timestamp_utc'],
-                    adjusted_levels,
-                    color='green',
-                    linestyle='--',
-                    linewidth=2,
-                    label=f"Adjusted Level ({adjustment:.3f} ft)",
-                    zorder=6
-                )
-                
-                # Store the adjusted line
-                self.baseline_preview_line = adjusted_line
-                
-            # Update the water_level_level_corrected column for actual plot updates
-            indices_to_update = transducer_data.index
-            self.plot_data.loc[indices_to_update, 'water_level_level_corrected'] = \
-                self.plot_data.loc[indices_to_update, 'water_level'] + adjustment
             
-            # Update only the modification flag, not the original flag
-            self.plot_data.loc[indices_to_update, 'level_flag_mod'] = 'level_mod'
+            if adjustment == 0:
+                QMessageBox.information(self, "Info", "No adjustment to apply (0.0 ft)")
+                return
             
-            # Also update the transducer_data DataFrame
-            self.transducer_data.loc[indices_to_update, 'water_level_level_corrected'] = \
-                self.transducer_data.loc[indices_to_update, 'water_level'] + adjustment
-            self.transducer_data.loc[indices_to_update, 'level_flag_mod'] = 'level_mod'
+            # Offset the original water level and mark the readings for commit
+            index, adjusted_levels = engine.baseline(positions, adjustment)
+            self.apply_instance_column_edits(self.baseline_helper.instance_id, 'baseline', index, {
+                'water_level_level_corrected': adjusted_levels,
+                'level_flag_mod': 'level_mod',
+            })
             
-            # Track changes for this instance
-            changes = {}
-            for idx in indices_to_update:
-                changes[idx] = {
-                    'water_level_level_corrected': self.transducer_data.loc[idx, 'water_level_level_corrected'],
-                    'level_flag_mod': 'level_mod'
-                }
+            # Plot the adjusted line in green
+            times = engine.timestamps(positions)
+            step = max(1, len(times) // PREVIEW_MAX_POINTS)
+            adjusted_line, = self.ax.plot(times[::step], 
+                                          adjusted_levels[::step], 
+                                          'g-', 
+                                          label=f'Baseline Adjusted ({adjustment:+.3f} ft)',
+                                          linewidth=2,
+                                          alpha=0.8)
             
-            # Apply changes using the new tracking system
-            if changes:
-                self.apply_instance_edits(self.baseline_helper.instance_id, 'baseline', changes)
+            # Store reference to this line so we can remove it later
+            if not hasattr(self, 'baseline_lines'):
+                self.baseline_lines = []
+            self.baseline_lines.append(adjusted_line)
             
-            # Update the legend and redraw
-            self.ax.legend(loc='upper right')
+            # Update legend and refresh
+            self.ax.legend()
             self.canvas.draw()
             
-            logger.debug(f"Baseline adjustment of {adjustment:.3f} ft applied to {len(transducer_data)} points")
+            if has_selection:
+                logger.info(f"Applied {adjustment:.3f} ft adjustment to {len(index)} selected points")
+            else:
+                logger.info(f"Applied {adjustment:.3f} ft adjustment to {len(index)} points in visible range")
             
         except Exception as e:
-            logger.error(f"Error applying baseline changes: {e}", exc_info=True)
-            # Display error message
-            msg_box = QMessageBox(self)
-            msg_box.setWindowTitle("Error")
-            msg_box.setText(f"Error applying baseline changes: {str(e)}")
-            msg_box.setIcon(QMessageBox.Critical)
-            msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowStaysOnTopHint)
-            msg_box.exec_()
+            logger.error(f"Error in baseline adjustment: {e}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Baseline adjustment failed: {str(e)}")
 
     def set_start_to_first_point(self):
         """Set the start date to the first point in the plot data and update the span selector"""
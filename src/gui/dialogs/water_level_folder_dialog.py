@@ -9,6 +9,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from ..handlers.water_level_folder_handler import WaterLevelFolderProcessor
+from ..handlers.level_alignment import WellReferenceContext
 from .water_level_preview_dialog import WaterLevelPreviewDialog
 from .water_level_progress_dialog import WaterLevelProgressDialog
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
@@ -1019,8 +1020,9 @@ class WaterLevelFolderDialog(QDialog):
                     if not comparison_vector.empty:
                         progress_dialog.log_message(f"Found {len(comparison_vector)} existing readings in range")
                     
-                    # Initialize new_data_vector with correct columns
-                    new_data_vector = pd.DataFrame(columns=[
+                    # Processed files, concatenated once the well is done
+                    segments = []
+                    template = pd.DataFrame(columns=[
                         'timestamp_utc', 'pressure', 'water_pressure', 'water_level',
                         'temperature', 'insertion_level', 'insertion_time',
                         'baro_source', 'baro_flag', 'level_flag', 'level_details'
@@ -1034,6 +1036,9 @@ class WaterLevelFolderDialog(QDialog):
                     if not manual_readings.empty:
                         progress_dialog.log_message(f"Found {len(manual_readings)} manual readings in range")
                     
+                    # Manual readings are indexed once and shared by all files of the well
+                    context = WellReferenceContext(manual_readings)
+                    
                     # Process files in chronological order
                     for idx, file_path in enumerate(well_data['files'], 1):
                         if progress_dialog.was_canceled():
@@ -1095,22 +1100,22 @@ class WaterLevelFolderDialog(QDialog):
                                 comparison_vector['timestamp_utc'] = pd.to_datetime(comparison_vector['timestamp_utc'])
                                 df['timestamp_utc'] = pd.to_datetime(df['timestamp_utc'])
                                 mask = comparison_vector['timestamp_utc'] < df['timestamp_utc'].min()
-                                ref_data_for_level = comparison_vector[mask][['timestamp_utc', 'water_level']].copy()
+                                ref_data_for_level = comparison_vector[mask][['timestamp_utc', 'water_level']]
                                 progress_dialog.log_message(f"Using {len(ref_data_for_level)} reference points from existing data")
                         else:
                             # For subsequent files, use only the last few readings from previous file
-                            if not new_data_vector.empty and 'timestamp_utc' in new_data_vector.columns and 'water_level' in new_data_vector.columns:
-                                ref_data_for_level = new_data_vector.tail(10)[['timestamp_utc', 'water_level']].copy()
+                            if segments:
+                                ref_data_for_level = pd.concat(segments[-10:]).tail(10)[['timestamp_utc', 'water_level']].copy()
                                 ref_data_for_level['timestamp_utc'] = pd.to_datetime(ref_data_for_level['timestamp_utc'])
                                 progress_dialog.log_message(f"Using {len(ref_data_for_level)} reference points from previous file")
+                        context.set_levels(ref_data_for_level)
                         
                         # Get insertion level
                         insertion_info = self.processor.processor.determine_insertion_level(
                             df,
                             well_data['well_info'],
-                            manual_readings,
-                            ref_data_for_level,
-                            is_folder_import=True  # This is folder import
+                            is_folder_import=True,  # This is folder import
+                            context=context
                         )
                         logger.debug(f"Determined insertion level in {(pd.Timestamp.now() - level_start_time).total_seconds():.2f} seconds")
                         
@@ -1121,8 +1126,7 @@ class WaterLevelFolderDialog(QDialog):
                         progress_dialog.log_message("\nApplying insertion level")
                         df = self.processor.processor._apply_insertion_level(df, insertion_info)
                         
-                        # Append to new_data_vector
-                        new_data_vector = pd.concat([new_data_vector, df])
+                        segments.append(df)
                         
                         file_time = (pd.Timestamp.now() - file_start_time).total_seconds()
                         logger.debug(f"Processed file {file_name} in {file_time:.2f} seconds ({len(df)} readings)")
@@ -1133,6 +1137,7 @@ class WaterLevelFolderDialog(QDialog):
                         QApplication.processEvents()  # Keep UI responsive
 
                     # Store processed data
+                    new_data_vector = pd.concat([template] + segments) if segments else template
                     if not new_data_vector.empty:
                         well_data['processed_data'] = new_data_vector.sort_values('timestamp_utc')
                         well_data['has_been_processed'] = True
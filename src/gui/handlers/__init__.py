@@ -5,7 +5,23 @@ Created on Fri Jan 17 14:23:55 2025
 @author: bledesma
 """
 
-from .solinst_reader import SolinstReader
-from .water_level_single_handler import WaterLevelHandler
-from .water_level_folder_handler import WaterLevelFolderProcessor
-from .user_auth_service import UserAuthService
\ No newline at end of file
+import importlib
+
+# Exported classes are imported on first access so that importing any handler
+# module does not pull in pandas and the import handlers at startup
+_EXPORTS = {
+    'SolinstReader': '.solinst_reader',
+    'WaterLevelHandler': '.water_level_single_handler',
+    'WaterLevelFolderProcessor': '.water_level_folder_handler',
+    'UserAuthService': '.user_auth_service',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import sqlite3
 import tempfile
 import shutil
 import time
@@ -10,12 +11,23 @@ from typing import List, Dict, Optional, Tuple
 from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload, MediaIoBaseUpload
 from .draft_manager import DraftManager
 from .version_manager import VersionManager
+from .database_transport import (
+    DatabaseTransportCodec, DecompressingWriter, CODEC_RAW, CODEC_MIMETYPES,
+    COMPRESSION_SETTING, COMPRESSION_OFF, resolve_codec,
+    manifest_from_properties, manifest_to_properties
+)
+from .cloud_lock_service import CloudLockService, DriveLockBackend, PROJECT_LOCK, UPLOAD_LOCK, DEFAULT_TTL_SECONDS
 from googleapiclient.errors import HttpError
 import io
 import uuid
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_LOCK_WAIT_SECONDS = 30  # Uploads are short; wait for another user's to finish
+# Tables left as they are on Drive when merging: SQLite internals, and the edit
+# journal, whose ranges and events refer to batch IDs that a merge renumbers
+MERGE_SKIPPED_TABLE_PREFIXES = ('sqlite_', 'edit_journal_')
+
 class CloudDatabaseHandler:
     """Handles cloud database operations for project-based databases in Google Drive"""
     
@@ -34,6 +46,9 @@ class CloudDatabaseHandler:
         self.cache_dir = self._get_cache_directory()
         self.draft_manager = DraftManager(self.cache_dir)  # Initialize draft manager
         self.version_manager = VersionManager(self.cache_dir)  # Initialize version manager
+        self.lock_services = {}  # database_id -> CloudLockService holding this client's leases
+        self.upload_lock_wait = UPLOAD_LOCK_WAIT_SECONDS
+        self.last_save_merged = False  # The last save merged other users' changes into the local copy
         
     def get_projects_folder_id(self):
         """Get the projects folder ID from settings"""
@@ -143,6 +158,7 @@ class CloudDatabaseHandler:
                             'database_name': db_info['name'],
                             'database_id': db_info['id'],
                             'modified_time': db_info.get('modifiedTime', ''),
+                            'transport_manifest': db_info['transport_manifest'],
                             'locked_by': db_info.get('locked_by'),
                             'lock_time': db_info.get('lock_time')
                         })
@@ -192,6 +208,7 @@ class CloudDatabaseHandler:
                 'id': db_file['id'],
                 'name': db_file['name'],
                 'modifiedTime': db_file['modifiedTime'],
+                'transport_manifest': manifest_from_properties(properties),
                 **lock_info
             }
             
@@ -262,17 +279,20 @@ class CloudDatabaseHandler:
             
             # Try alternative download method for better performance
             start_time = time.time()
-            
+            manifest = project_info.get('transport_manifest') or {'codec': CODEC_RAW}
+
             try:
                 # Alternative 1: Try to get file metadata first
-                file_metadata = service.files().get(fileId=project_info['database_id'], fields="size").execute()
+                file_metadata = service.files().get(fileId=project_info['database_id'], fields="size, properties").execute()
                 file_size = int(file_metadata.get('size', 0))
-                logger.info(f"Database file size: {file_size / (1024*1024):.1f} MB")
-                
-                # Download to cached location first
+                manifest = manifest_from_properties(file_metadata.get('properties'))
+                logger.info(f"Database file size: {file_size / (1024*1024):.1f} MB ({manifest['codec']} transport)")
+
+                # Download to cached location first, decompressing on the fly
                 request = service.files().get_media(fileId=project_info['database_id'])
                 with open(cached_path, 'wb') as f:
-                    downloader = MediaIoBaseDownload(f, request, chunksize=8*1024*1024)  # 8MB chunks
+                    sink = DecompressingWriter(manifest['codec'], f)
+                    downloader = MediaIoBaseDownload(sink, request, chunksize=8*1024*1024)  # 8MB chunks
                     done = False
                     downloaded_bytes = 0
                     last_log_time = start_time
@@ -296,20 +316,24 @@ class CloudDatabaseHandler:
                                 logger.info(f"Download: {progress}% ({downloaded_bytes/(1024*1024):.1f}/{file_size/(1024*1024):.1f} MB) - Speed: {speed_mbps:.1f} MB/s")
                                 last_log_time = current_time
                                 last_progress = progress
-                                
+
+                    sink.verify(manifest)
+
             except Exception as download_error:
                 logger.error(f"Error during optimized download: {download_error}")
                 # Fallback to original method
                 request = service.files().get_media(fileId=project_info['database_id'])
-                with open(temp_path, 'wb') as f:
-                    downloader = MediaIoBaseDownload(f, request, chunksize=4*1024*1024)
+                with open(cached_path, 'wb') as f:
+                    sink = DecompressingWriter(manifest['codec'], f)
+                    downloader = MediaIoBaseDownload(sink, request, chunksize=4*1024*1024)
                     done = False
                     while not done:
                         status, done = downloader.next_chunk()
                         if status:
                             progress = int(status.progress() * 100)
                             logger.info(f"Download progress: {progress}% (fallback method)")
-                            
+                    sink.verify(manifest)
+
             elapsed_total = time.time() - start_time
             logger.info(f"Download completed in {elapsed_total:.1f} seconds")
             
@@ -334,7 +358,8 @@ class CloudDatabaseHandler:
             
     def save_database(self, project_name: str, project_info: Dict, 
                      temp_db_path: str, user_name: str, changes_desc: str, 
-                     change_tracker=None, progress_callback=None) -> bool:
+                     change_tracker=None, progress_callback=None, base_version: Optional[str] = None,
+                     allow_merge: bool = False) -> bool:
         """
         Save database to cloud with backup and change tracking.
         
@@ -346,15 +371,72 @@ class CloudDatabaseHandler:
             changes_desc: Description of changes
             change_tracker: Optional ChangeTracker instance for detailed change logging
             progress_callback: Optional callback for progress updates (progress_percent, message)
+            base_version: Drive modifiedTime of the version the local copy was loaded from
+                (default: project_info['modified_time']); if the database on Drive has
+                changed since, the save is refused unless it can be merged
+            allow_merge: Every local change lies in a well or table this client holds
+                a lease on, so those partitions can be merged into a newer version on Drive
             
         Returns:
             True if successful, False otherwise
         """
+        self.last_save_merged = False
         try:
             service = self.drive_service.get_service()
             if not service:
                 return False
-                
+            
+            # Edits are covered by well and table leases; the upload replaces the
+            # whole file, so it only needs to be kept apart from other uploads
+            lock_service = self.get_lock_service(project_info, user_name)
+            if lock_service is not None:
+                lost = [lease for lease in lock_service.leases.values() if lease.lost]
+                if lost:
+                    logger.error(f"Lock '{lost[0].key}' on {project_name} was lost ({lost[0].lost_reason}); "
+                                 f"reload the project before saving so other changes are not overwritten")
+                    for lease in lost:
+                        lock_service.leases.pop(lease.key, None)
+                    return False
+                if not self.acquire_lock(project_info, user_name, key=UPLOAD_LOCK, wait=self.upload_lock_wait):
+                    is_locked, locked_by, _ = self.check_lock(project_info, user_name, key=UPLOAD_LOCK)
+                    logger.error(f"Cannot save {project_name}: project is locked by {locked_by}")
+                    return False
+            
+            try:
+                return self._save_database_locked(service, project_name, project_info, temp_db_path, user_name,
+                                                  changes_desc, change_tracker, progress_callback, base_version,
+                                                  allow_merge)
+            finally:
+                if lock_service is not None:
+                    self._release_lock(service, project_info, UPLOAD_LOCK)
+            
+        except Exception as e:
+            logger.error(f"Error saving database: {e}")
+            return False
+    
+    def _save_database_locked(self, service, project_name: str, project_info: Dict, temp_db_path: str,
+                              user_name: str, changes_desc: str, change_tracker=None, progress_callback=None,
+                              base_version: Optional[str] = None, allow_merge: bool = False) -> bool:
+        """Backup, upload and log a save while holding the upload lock"""
+        upload_path = temp_db_path
+        try:
+            # 0. Never overwrite a version the local copy was not loaded from; the
+            #    wells and tables this client holds leases on can be merged into it
+            base_version = base_version or project_info.get('modified_time')
+            remote_version = self._get_remote_version(service, project_info)
+            if base_version and remote_version != base_version:
+                partitions = self._held_partitions(project_info) if allow_merge else []
+                if not partitions:
+                    logger.error(f"{project_name} was changed on Drive since it was loaded "
+                                 f"({base_version} -> {remote_version or 'unknown'}); reload the project "
+                                 f"before saving so those changes are not overwritten")
+                    return False
+                if progress_callback:
+                    progress_callback(5, "Merging changes saved by others...")
+                upload_path = self._merge_into_remote(service, project_info, temp_db_path, partitions)
+                if not upload_path:
+                    return False
+            
             # 1. Create backup of current database
             if progress_callback:
                 progress_callback(10, "Creating backup...")
@@ -364,9 +446,19 @@ class CloudDatabaseHandler:
             # 2. Upload new database (this is the main time-consuming operation)
             if progress_callback:
                 progress_callback(20, "Starting database upload...")
-            if not self._upload_database(service, project_info, temp_db_path, progress_callback):
+            lock_service = self.lock_services.get(project_info.get('database_id'))
+            if lock_service is not None and not lock_service.is_held(UPLOAD_LOCK):
+                logger.error("Upload lock expired or was taken over before upload; not overwriting")
+                return False
+            if not self._upload_database(service, project_info, upload_path, progress_callback):
                 logger.error("Failed to upload database")
                 return False
+            if upload_path != temp_db_path:
+                # The local copy becomes the merged version that was uploaded
+                shutil.copyfile(upload_path, temp_db_path)
+                self.last_save_merged = True
+            # The upload is the version later saves from this copy build on
+            project_info['modified_time'] = self._get_remote_version(service, project_info) or remote_version
                 
             # 3. Update change log
             if progress_callback:
@@ -384,9 +476,6 @@ class CloudDatabaseHandler:
                 progress_callback(98, "Cleaning up old backups...")
             self._cleanup_backups(service, project_info)
             
-            # 6. Release lock
-            self._release_lock(service, project_info)
-            
             if progress_callback:
                 progress_callback(100, "Save completed successfully!")
             logger.info(f"Successfully saved database for project: {project_name}")
@@ -395,6 +484,101 @@ class CloudDatabaseHandler:
         except Exception as e:
             logger.error(f"Error saving database: {e}")
             return False
+        finally:
+            if upload_path != temp_db_path and os.path.exists(upload_path):
+                os.remove(upload_path)
+    
+    def _held_partitions(self, project_info: Dict) -> List[str]:
+        """Well and table lock keys this client holds on a project"""
+        lock_service = self.lock_services.get(project_info.get('database_id'))
+        if lock_service is None:
+            return []
+        return sorted(key for key in list(lock_service.leases)
+                      if key not in (PROJECT_LOCK, UPLOAD_LOCK) and self.holds_lock(project_info, key))
+    
+    def _merge_into_remote(self, service, project_info: Dict, temp_db_path: str,
+                           partitions: List[str]) -> Optional[str]:
+        """
+        Merge the local copy's leased wells and tables into the version on Drive.
+        
+        Everything outside those partitions is kept as other users saved it.
+        Rows of a merged well get new row IDs, since the local copy and Drive may
+        have handed out the same IDs to different rows since the copy was loaded.
+        
+        Returns:
+            Path of the merged database, or None on failure
+        """
+        merged_path = f"{temp_db_path}.merge"
+        try:
+            file_metadata = service.files().get(fileId=project_info['database_id'], fields='properties').execute()
+            manifest = manifest_from_properties(file_metadata.get('properties'))
+            request = service.files().get_media(fileId=project_info['database_id'])
+            with open(merged_path, 'wb') as f:
+                sink = DecompressingWriter(manifest['codec'], f)
+                downloader = MediaIoBaseDownload(sink, request, chunksize=8*1024*1024)
+                done = False
+                while not done:
+                    _, done = downloader.next_chunk()
+                sink.verify(manifest)
+            
+            conn = sqlite3.connect(merged_path)
+            try:
+                conn.execute("ATTACH DATABASE ? AS local", (temp_db_path,))
+                tables = self._merge_tables(conn)
+                with conn:
+                    for key in partitions:
+                        kind, _, name = key.partition(':')
+                        for table, columns, row_id in tables:
+                            if kind == 'well' and 'well_number' in columns:
+                                copied = [c for c in columns if c != row_id]
+                                where, params = "WHERE well_number = ?", (name,)
+                            elif kind == 'table' and table == name:
+                                copied, where, params = columns, "", ()
+                            else:
+                                continue
+                            column_list = ', '.join(f'"{c}"' for c in copied)
+                            conn.execute(f'DELETE FROM main."{table}" {where}', params)
+                            conn.execute(f'INSERT INTO main."{table}" ({column_list}) '
+                                         f'SELECT {column_list} FROM local."{table}" {where}', params)
+                conn.execute("DETACH DATABASE local")
+            finally:
+                conn.close()
+            logger.info(f"Merged {', '.join(partitions)} into the version of the database on Drive")
+            return merged_path
+        except Exception as e:
+            logger.error(f"Error merging changes into the database on Drive: {e}")
+            if os.path.exists(merged_path):
+                os.remove(merged_path)
+            return None
+    
+    @staticmethod
+    def _merge_tables(conn: sqlite3.Connection) -> List[Tuple[str, List[str], Optional[str]]]:
+        """(table, shared columns, rowid alias column) for every table in both databases"""
+        def table_names(schema):
+            return [row[0] for row in conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")]
+        
+        remote = set(table_names('main'))
+        tables = []
+        for table in table_names('local'):
+            if table not in remote or table.startswith(MERGE_SKIPPED_TABLE_PREFIXES):
+                continue
+            remote_columns = {row[1] for row in conn.execute(f'PRAGMA main.table_info("{table}")')}
+            info = conn.execute(f'PRAGMA local.table_info("{table}")').fetchall()
+            columns = [row[1] for row in info if row[1] in remote_columns]
+            # A single INTEGER PRIMARY KEY is an alias of the rowid
+            primary = [row for row in info if row[5]]
+            row_id = primary[0][1] if len(primary) == 1 and primary[0][2].upper() == 'INTEGER' else None
+            tables.append((table, columns, row_id))
+        return tables
+            
+    def _get_remote_version(self, service, project_info: Dict) -> Optional[str]:
+        """Current modifiedTime of the project database on Drive"""
+        try:
+            file = service.files().get(fileId=project_info['database_id'], fields='modifiedTime').execute()
+            return file.get('modifiedTime')
+        except Exception as e:
+            logger.warning(f"Could not read the database version on Drive: {e}")
+            return None
             
     def _create_backup(self, service, project_info: Dict, user_name: str) -> bool:
         """Create a backup of the current database"""
@@ -414,7 +598,11 @@ class CloudDatabaseHandler:
                 'name': backup_name,
                 'parents': [backup_folder_id]
             }
-            
+            # Keep the transport manifest so compressed backups can be restored
+            manifest = project_info.get('transport_manifest') or {'codec': CODEC_RAW}
+            if manifest['codec'] != CODEC_RAW:
+                body['properties'] = manifest_to_properties(manifest)
+
             service.files().copy(
                 fileId=project_info['database_id'],
                 body=body
@@ -452,19 +640,44 @@ class CloudDatabaseHandler:
             logger.error(f"Error creating backup folder: {e}")
             return None
             
+    def _prepare_transport_file(self, temp_db_path: str, progress_callback=None) -> Tuple[str, Dict]:
+        """
+        Compress the database for upload when cloud_db_compression is enabled.
+
+        Returns:
+            Tuple of (path to upload, transport manifest)
+        """
+        codec = resolve_codec(self.settings_handler.get_setting(COMPRESSION_SETTING, COMPRESSION_OFF))
+        if codec == CODEC_RAW:
+            return temp_db_path, {'codec': CODEC_RAW}
+
+        if progress_callback:
+            progress_callback(15, f"Compressing database ({codec})...")
+        transport_path = os.path.join(self.cache_dir, f"upload_{uuid.uuid4().hex[:8]}.db.{codec}")
+        manifest = DatabaseTransportCodec(codec, self.cache_dir).pack(temp_db_path, transport_path)
+        return transport_path, manifest
+
     def _upload_database(self, service, project_info: Dict, temp_db_path: str, progress_callback=None) -> bool:
         """Upload the database file"""
+        transport_path = temp_db_path
         try:
             import os
-            file_size = os.path.getsize(temp_db_path)
-            logger.info(f"Starting database upload: {file_size} bytes")
+            transport_path, manifest = self._prepare_transport_file(temp_db_path, progress_callback)
+            file_size = os.path.getsize(transport_path)
+            logger.info(f"Starting database upload: {file_size} bytes ({manifest['codec']} transport)")
             
             media = MediaFileUpload(
-                temp_db_path,
-                mimetype='application/x-sqlite3',
+                transport_path,
+                mimetype=CODEC_MIMETYPES[manifest['codec']],
                 resumable=True,
                 chunksize=1024*1024  # 1MB chunks for better progress
             )
+
+            # Record the manifest (or clear a stale one) in the file properties
+            previous = project_info.get('transport_manifest') or {'codec': CODEC_RAW}
+            update_kwargs = {}
+            if manifest['codec'] != CODEC_RAW or previous['codec'] != CODEC_RAW:
+                update_kwargs['body'] = {'properties': manifest_to_properties(manifest)}
             
             # Update existing file with timeout
             import socket
@@ -474,7 +687,8 @@ class CloudDatabaseHandler:
             try:
                 request = service.files().update(
                     fileId=project_info['database_id'],
-                    media_body=media
+                    media_body=media,
+                    **update_kwargs
                 )
                 
                 response = None
@@ -502,6 +716,7 @@ class CloudDatabaseHandler:
             finally:
                 socket.setdefaulttimeout(original_timeout)
             
+            project_info['transport_manifest'] = manifest
             logger.info("Database uploaded successfully")
             return True
             
@@ -510,6 +725,9 @@ class CloudDatabaseHandler:
             import traceback
             logger.error(f"Upload error details: {traceback.format_exc()}")
             return False
+        finally:
+            if transport_path != temp_db_path and os.path.exists(transport_path):
+                os.remove(transport_path)
             
     def _update_change_log(self, service, project_info: Dict, user_name: str, changes_desc: str):
         """Update the change log file"""
@@ -603,14 +821,81 @@ class CloudDatabaseHandler:
         except Exception as e:
             logger.error(f"Error cleaning backups: {e}")
             
-    def check_lock(self, project_info: Dict) -> Tuple[bool, Optional[str], Optional[str]]:
+    def _get_or_create_locks_folder(self, service, db_folder_id: str) -> Optional[str]:
+        """Get or create the folder holding lease records"""
+        try:
+            query = f"'{db_folder_id}' in parents and name='locks' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+            response = service.files().list(q=query, fields="files(id)").execute()
+            files = response.get('files', [])
+            
+            if files:
+                return files[0]['id']
+                
+            folder_metadata = {
+                'name': 'locks',
+                'mimeType': 'application/vnd.google-apps.folder',
+                'parents': [db_folder_id]
+            }
+            
+            folder = service.files().create(body=folder_metadata, fields='id').execute()
+            return folder.get('id')
+            
+        except Exception as e:
+            logger.error(f"Error creating locks folder: {e}")
+            return None
+    
+    def get_lock_service(self, project_info: Dict, user_name: str) -> Optional[CloudLockService]:
+        """
+        Get the lease-based lock service for a project.
+        
+        Leases live in a 'locks' folder next to the database and are renewed
+        by a heartbeat thread, so a crashed client's lock expires after
+        cloud_lock_ttl_seconds.
+        """
+        database_id = project_info.get('database_id')
+        if not database_id or not project_info.get('db_folder_id'):
+            return None
+        lock_service = self.lock_services.get(database_id)
+        if lock_service is not None:
+            if not lock_service.leases:
+                lock_service.holder = user_name
+            return lock_service
+        
+        service = self.drive_service.get_service()
+        if not service:
+            return None
+        locks_folder_id = self._get_or_create_locks_folder(service, project_info['db_folder_id'])
+        if not locks_folder_id:
+            return None
+        ttl = float(self.settings_handler.get_setting("cloud_lock_ttl_seconds", DEFAULT_TTL_SECONDS))
+        # The heartbeat renews from its own thread and gets its own Drive service
+        backend = DriveLockBackend(service, locks_folder_id, service_factory=self.drive_service.build_service)
+        lock_service = CloudLockService(backend, user_name, ttl=ttl)
+        self.lock_services[database_id] = lock_service
+        return lock_service
+    
+    def check_lock(self, project_info: Dict, user_name: Optional[str] = None,
+                   key: str = PROJECT_LOCK) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Check if database is locked by another user.
         
+        Args:
+            project_info: Project information dictionary
+            user_name: Current user; leases held by this client never count as locked
+            key: PROJECT_LOCK or a partition key (see cloud_lock_service.well_lock_key)
+        
         Returns:
             Tuple of (is_locked, user_name, lock_time)
         """
         try:
+            lock_service = self.get_lock_service(project_info, user_name or '')
+            if lock_service is not None:
+                record = lock_service.check(key)
+                if record is None:
+                    return False, None, None
+                return True, record.holder, datetime.fromtimestamp(record.expires_at).isoformat()
+            
+            # Legacy lock properties on the database file
             if 'locked_by' not in project_info:
                 return False, None, None
                 
@@ -628,38 +913,88 @@ class CloudDatabaseHandler:
             logger.error(f"Error checking lock: {e}")
             return False, None, None
             
-    def acquire_lock(self, project_info: Dict, user_name: str) -> bool:
-        """Try to acquire lock on database"""
+    def acquire_lock(self, project_info: Dict, user_name: str, key: str = PROJECT_LOCK,
+                     steal: bool = False, on_lost=None, wait: float = 0) -> bool:
+        """
+        Try to acquire a lease on the project or on one partition of it.
+        
+        Args:
+            project_info: Project information dictionary
+            user_name: Name of the user taking the lock
+            key: PROJECT_LOCK, or a well/table key for partitioned edits
+            steal: Take the lock over from its current holder
+            on_lost: Called with the Lease if it later expires or is stolen
+            wait: Seconds to keep retrying while another user holds the lock
+        """
         try:
             service = self.drive_service.get_service()
             if not service:
                 return False
-                
-            # Set custom properties for lock
-            properties = {
-                'locked_by': user_name,
-                'lock_time': datetime.now().isoformat()
-            }
             
-            service.files().update(
-                fileId=project_info['database_id'],
-                body={'properties': properties}
-            ).execute()
+            lock_service = self.get_lock_service(project_info, user_name)
+            if lock_service is None:
+                logger.error("Cannot acquire lock: project has no databases folder")
+                return False
+            if lock_service.acquire(key, steal=steal, wait=wait, on_lost=on_lost) is None:
+                return False
+            
+            if key == PROJECT_LOCK:
+                # Mirror the holder on the database file for the project list's lock indicator
+                service.files().update(
+                    fileId=project_info['database_id'],
+                    body={'properties': {'locked_by': user_name, 'lock_time': datetime.now().isoformat()}}
+                ).execute()
             
             return True
             
         except Exception as e:
             logger.error(f"Error acquiring lock: {e}")
             return False
+    
+    def hold_lock(self, project_info: Dict, user_name: str, key: str,
+                  on_lost=None) -> Tuple[bool, Optional[str]]:
+        """
+        Take a well or table lease and keep it until release_lock is called.
+        
+        Edits hold the lease of what they change from the first edit until the
+        changes are saved or the project is closed, so two users never edit the
+        same well, and saves can merge each user's wells into the other's.
+        
+        Returns:
+            (True, None) if the lease is held, or (False, holder) if another user has it
+        """
+        if self.acquire_lock(project_info, user_name, key=key, on_lost=on_lost):
+            return True, None
+        is_locked, locked_by, _ = self.check_lock(project_info, user_name, key=key)
+        return False, locked_by if is_locked else None
+    
+    def holds_lock(self, project_info: Dict, key: str) -> bool:
+        """True if this client holds a live lease on ``key``"""
+        lock_service = self.lock_services.get(project_info.get('database_id'))
+        return lock_service is not None and lock_service.is_held(key)
+    
+    def release_lock(self, project_info: Dict, key: Optional[str] = None):
+        """Release one lease held on a project, or all of them if no key is given"""
+        service = self.drive_service.get_service()
+        if service:
+            self._release_lock(service, project_info, key)
             
-    def _release_lock(self, service, project_info: Dict):
+    def _release_lock(self, service, project_info: Dict, key: Optional[str] = PROJECT_LOCK):
         """Release lock on database"""
         try:
-            # Clear lock properties
-            service.files().update(
-                fileId=project_info['database_id'],
-                body={'properties': {}}
-            ).execute()
+            lock_service = self.lock_services.get(project_info.get('database_id'))
+            if lock_service is not None:
+                if key is None:
+                    lock_service.release_all()
+                else:
+                    lock_service.release(key)
+            
+            if key in (None, PROJECT_LOCK):
+                # Clear lock properties (null removes a property)
+                service.files().update(
+                    fileId=project_info['database_id'],
+                    body={'properties': {'locked_by': None, 'lock_time': None}}
+                ).execute()
             
         except Exception as e:
             logger.error(f"Error releasing lock: {e}")
@@ -738,6 +1073,13 @@ class CloudDatabaseHandler:
                 logger.error(f"Error cleaning up temp file {temp_file}: {e}")
                 
         self.temp_files.clear()
+        
+        # Give up any leases still held so other users are not blocked until they expire
+        for lock_service in self.lock_services.values():
+            try:
+                lock_service.release_all()
+            except Exception as e:
+                logger.error(f"Error releasing locks: {e}")
     
     # Draft Management Methods
     def has_draft(self, project_name: str) -> bool:
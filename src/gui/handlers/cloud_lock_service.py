@@ -0,0 +1,424 @@
+"""
+Cloud Lock Service
+
+Lease-based locks for cloud projects.
+
+A lock is a lease with a time to live: the holder renews it from a
+background heartbeat thread, and a lease whose holder crashed or lost
+connectivity simply expires instead of blocking the project forever.
+
+Every claim is written as its own lease record (creating a record never
+conflicts), then all records for the project are listed. Among unexpired
+claims that conflict, the oldest one wins; losers delete their record and
+report who holds the lock. A holder can be displaced in two ways: its lease
+expires, or another user steals the lock explicitly. Either way its next
+heartbeat finds the record gone, marks the lease as lost and
+notifies the owner. Saves check the lease before uploading, so a displaced
+holder cannot overwrite the new holder's work.
+
+Locks can be taken on the whole project (``PROJECT_LOCK``) or on a partition
+such as one well (``well_lock_key``) or table (``table_lock_key``). Partition
+locks only conflict with the same partition and with the project lock, so
+technicians working on different wells do not serialize on one lock. Uploads
+of the database file take ``UPLOAD_LOCK`` for just the upload, which keeps
+two uploads apart without waiting for anyone's editing session to end.
+
+The storage is pluggable: ``DriveLockBackend`` keeps the records in a
+``locks`` folder next to the project database and ``LocalLockBackend``
+keeps them in a directory (a shared folder, or a temp dir in tests).
+The heartbeat renews from its own thread, so ``DriveLockBackend`` gives every
+thread other than its creator a Drive service of its own.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_LOCK = 'project'
+UPLOAD_LOCK = 'upload'  # Held while the database file is merged and uploaded
+DEFAULT_TTL_SECONDS = 120
+CLOCK_SKEW_SECONDS = 30  # Grace before another machine's lease counts as expired
+
+
+def well_lock_key(well_number: str) -> str:
+    """Lock key for a single well"""
+    return f"well:{well_number}"
+
+
+def table_lock_key(table_name: str) -> str:
+    """Lock key for a single table"""
+    return f"table:{table_name}"
+
+
+def keys_conflict(key_a: str, key_b: str) -> bool:
+    """Two locks conflict if they are the same partition or either is the project lock"""
+    return key_a == key_b or PROJECT_LOCK in (key_a, key_b)
+
+
+class LeaseGone(Exception):
+    """The lease record no longer exists (expired and cleaned up, or stolen)"""
+
+
+@dataclass
+class LeaseRecord:
+    """A lease record as stored by a backend"""
+    ref: str  # Backend reference (Drive file ID or file path)
+    key: str
+    holder: str
+    lease_id: str
+    expires_at: float
+    created: str  # Sortable creation stamp assigned by the backend
+    stolen_from: str = ''
+
+    def is_expired(self, now: float) -> bool:
+        return now > self.expires_at + CLOCK_SKEW_SECONDS
+
+    def sort_key(self):
+        return (self.created, self.lease_id)
+
+
+@dataclass
+class Lease:
+    """A lock held by this client"""
+    key: str
+    holder: str
+    lease_id: str
+    ref: str
+    expires_at: float
+    lost: bool = False
+    lost_reason: str = ''
+    on_lost: Optional[Callable] = field(default=None, repr=False)
+
+
+class LocalLockBackend:
+    """Lease records as JSON files in a directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._sequence = 0
+
+    def create(self, key: str, holder: str, lease_id: str, expires_at: float, stolen_from: str = '') -> LeaseRecord:
+        self._sequence += 1
+        # Nanosecond wall clock plus a per-process sequence keeps stamps unique and ordered
+        created = f"{time.time_ns():020d}-{self._sequence:06d}"
+        path = os.path.join(self.directory, f"{lease_id}.lease")
+        record = LeaseRecord(path, key, holder, lease_id, expires_at, created, stolen_from)
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({k: v for k, v in record.__dict__.items() if k != 'ref'}, f)
+        return record
+
+    def list(self) -> List[LeaseRecord]:
+        records = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.lease'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'r') as f:
+                    records.append(LeaseRecord(ref=path, **json.load(f)))
+            except (OSError, ValueError, TypeError):
+                continue  # Deleted or half written; the next listing sees it
+        return records
+
+    def renew(self, ref: str, expires_at: float):
+        try:
+            with open(ref, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise LeaseGone(ref)
+        data['expires_at'] = expires_at
+        temp_path = f"{ref}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        if not os.path.exists(ref):
+            os.remove(temp_path)
+            raise LeaseGone(ref)
+        os.replace(temp_path, ref)
+
+    def delete(self, ref: str):
+        try:
+            os.remove(ref)
+        except FileNotFoundError:
+            pass
+
+
+class DriveLockBackend:
+    """Lease records as small property-only files in a Drive folder"""
+
+    def __init__(self, service, folder_id: str, service_factory: Optional[Callable] = None):
+        """
+        Args:
+            service: Drive service of the thread creating the backend
+            folder_id: Folder holding the lease records
+            service_factory: Builds a separate Drive service for each other
+                thread (the heartbeat); a googleapiclient service wraps one
+                httplib2.Http, which must not be shared between threads
+        """
+        self.service = service
+        self.folder_id = folder_id
+        self.service_factory = service_factory
+        self._owner_thread = threading.get_ident()
+        self._local = threading.local()
+
+    def _drive(self):
+        """The Drive service to use from the calling thread"""
+        if self.service_factory is None or threading.get_ident() == self._owner_thread:
+            return self.service
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = self.service_factory()
+        return service
+
+    def create(self, key: str, holder: str, lease_id: str, expires_at: float, stolen_from: str = '') -> LeaseRecord:
+        properties = {
+            'lock_key': key,
+            'holder': holder,
+            'lease_id': lease_id,
+            'expires_at': f"{expires_at:.3f}",
+            'stolen_from': stolen_from,
+        }
+        result = self._drive().files().create(
+            body={'name': f"{lease_id}.lease", 'parents': [self.folder_id],
+                  'mimeType': 'application/json', 'properties': properties},
+            fields='id, createdTime'
+        ).execute()
+        return LeaseRecord(result['id'], key, holder, lease_id, expires_at,
+                           result.get('createdTime', ''), stolen_from)
+
+    def list(self) -> List[LeaseRecord]:
+        records = []
+        page_token = None
+        while True:
+            kwargs = {
+                'q': f"'{self.folder_id}' in parents and trashed = false",
+                'fields': 'nextPageToken, files(id, createdTime, properties)',
+                'pageSize': 1000,
+            }
+            if page_token:
+                kwargs['pageToken'] = page_token
+            response = self._drive().files().list(**kwargs).execute()
+            for file in response.get('files', []):
+                props = file.get('properties', {})
+                if 'lease_id' not in props:
+                    continue
+                records.append(LeaseRecord(
+                    ref=file['id'],
+                    key=props.get('lock_key', PROJECT_LOCK),
+                    holder=props.get('holder', ''),
+                    lease_id=props['lease_id'],
+                    expires_at=float(props.get('expires_at', 0)),
+                    created=file.get('createdTime', ''),
+                    stolen_from=props.get('stolen_from', ''),
+                ))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return records
+
+    def renew(self, ref: str, expires_at: float):
+        try:
+            self._drive().files().update(
+                fileId=ref, body={'properties': {'expires_at': f"{expires_at:.3f}"}}, fields='id'
+            ).execute()
+        except Exception as e:
+            status = getattr(getattr(e, 'resp', None), 'status', getattr(e, 'status', None))
+            if status == 404:
+                raise LeaseGone(ref)
+            raise
+
+    def delete(self, ref: str):
+        try:
+            self._drive().files().delete(fileId=ref).execute()
+        except Exception as e:
+            logger.debug(f"Lease record {ref} already gone: {e}")
+
+
+class CloudLockService:
+    """Acquires, renews and releases lease-based locks for one project"""
+
+    def __init__(self, backend, holder: str, ttl: float = DEFAULT_TTL_SECONDS,
+                 heartbeat_interval: Optional[float] = None, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            backend: LocalLockBackend, DriveLockBackend or compatible object
+            holder: Name of the user taking locks
+            ttl: Lease time to live in seconds
+            heartbeat_interval: Seconds between renewals (default: a third of the TTL)
+            clock: Time source, replaceable in tests
+        """
+        self.backend = backend
+        self.holder = holder
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval or ttl / 3
+        self.clock = clock
+        self.leases: Dict[str, Lease] = {}
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._heartbeat_thread = None
+
+    # ------------------------------------------------------------------
+    # Acquiring and releasing
+    # ------------------------------------------------------------------
+
+    def _blocking_records(self, key: str) -> List[LeaseRecord]:
+        """Unexpired lease records that conflict with ``key``, oldest first"""
+        now = self.clock()
+        blocking = []
+        for record in self.backend.list():
+            if record.is_expired(now):
+                self.backend.delete(record.ref)  # Clean up after crashed holders
+                continue
+            if keys_conflict(record.key, key):
+                blocking.append(record)
+        return sorted(blocking, key=LeaseRecord.sort_key)
+
+    def check_all(self, key: str = PROJECT_LOCK) -> List[LeaseRecord]:
+        """Every unexpired lease of other holders that blocks ``key``, oldest first"""
+        own = {lease.lease_id for lease in self.leases.values()}
+        return [r for r in self._blocking_records(key) if r.lease_id not in own]
+
+    def check(self, key: str = PROJECT_LOCK) -> Optional[LeaseRecord]:
+        """The oldest unexpired lease held by someone else that blocks ``key``, if any"""
+        blockers = self.check_all(key)
+        return blockers[0] if blockers else None
+
+    def acquire(self, key: str = PROJECT_LOCK, steal: bool = False, wait: float = 0,
+                on_lost: Optional[Callable] = None) -> Optional[Lease]:
+        """
+        Try to take the lock ``key``.
+
+        Args:
+            key: PROJECT_LOCK or a partition key from well_lock_key/table_lock_key
+            steal: Remove conflicting leases of other holders first
+            wait: Seconds to keep retrying while the lock is held elsewhere
+            on_lost: Called with the Lease if it later expires or is stolen
+
+        Returns:
+            The Lease, or None if another holder has the lock
+        """
+        with self._lock:
+            lease = self.leases.get(key)
+            if lease is not None and not lease.lost:
+                return lease
+
+        deadline = self.clock() + wait
+        while True:
+            stolen_from = ''
+            if steal:
+                for record in self.check_all(key):
+                    logger.warning(f"Stealing lock '{record.key}' from {record.holder}")
+                    self.backend.delete(record.ref)
+                    stolen_from = stolen_from or record.holder
+
+            lease_id = uuid.uuid4().hex
+            record = self.backend.create(key, self.holder, lease_id, self.clock() + self.ttl, stolen_from)
+            # Claims created in the same instant both withdraw and retry, so the
+            # outcome never depends on two clients seeing different orderings
+            blockers = [r for r in self.check_all(key)
+                        if r.lease_id != lease_id and r.created <= record.created]
+            if not blockers:
+                lease = Lease(key, self.holder, lease_id, record.ref, record.expires_at, on_lost=on_lost)
+                with self._lock:
+                    self.leases[key] = lease
+                self.start_heartbeat()
+                logger.info(f"Acquired lock '{key}' for {self.holder}")
+                return lease
+
+            # Someone claimed first; withdraw our claim
+            self.backend.delete(record.ref)
+            if self.clock() >= deadline:
+                logger.info(f"Lock '{key}' is held by {blockers[0].holder}")
+                return None
+            time.sleep(random.uniform(0.05, 0.5))
+
+    def release(self, key: str = PROJECT_LOCK):
+        """Release a lock held by this client"""
+        with self._lock:
+            lease = self.leases.pop(key, None)
+        if lease is not None:
+            self.backend.delete(lease.ref)
+            logger.info(f"Released lock '{key}'")
+        if not self.leases:
+            self.stop_heartbeat()
+
+    def release_all(self):
+        for key in list(self.leases):
+            self.release(key)
+
+    def is_held(self, key: str = PROJECT_LOCK) -> bool:
+        """True if this client holds ``key`` and the lease has not been lost"""
+        lease = self.leases.get(key)
+        return lease is not None and not lease.lost and self.clock() < lease.expires_at
+
+    # ------------------------------------------------------------------
+    # Heartbeat
+    # ------------------------------------------------------------------
+
+    def _mark_lost(self, lease: Lease, reason: str):
+        if lease.lost:
+            return
+        lease.lost = True
+        lease.lost_reason = reason
+        logger.warning(f"Lost lock '{lease.key}': {reason}")
+        if lease.on_lost:
+            try:
+                lease.on_lost(lease)
+            except Exception as e:
+                logger.error(f"Error in lock lost callback: {e}")
+
+    def renew_all(self):
+        """Extend every held lease and detect leases that were stolen or expired"""
+        with self._lock:
+            leases = [lease for lease in self.leases.values() if not lease.lost]
+        for lease in leases:
+            if self.clock() > lease.expires_at:
+                self._mark_lost(lease, "lease expired before it could be renewed")
+                continue
+            expires_at = self.clock() + self.ttl
+            try:
+                self.backend.renew(lease.ref, expires_at)
+            except LeaseGone:
+                self._mark_lost(lease, "lease was removed (stolen or expired)")
+                continue
+            except Exception as e:
+                # Transient error; retry on the next beat while the lease is still valid
+                logger.warning(f"Could not renew lock '{lease.key}': {e}")
+                continue
+            lease.expires_at = expires_at
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(self.heartbeat_interval):
+            try:
+                self.renew_all()
+            except Exception as e:
+                logger.error(f"Error in lock heartbeat: {e}")
+
+    def start_heartbeat(self):
+        """Start the background renewal thread if it is not running"""
+        if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="CloudLockHeartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def stop_heartbeat(self):
+        self._stop_event.set()
+        thread = self._heartbeat_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._heartbeat_thread = None
+
+    @staticmethod
+    def describe(record: LeaseRecord) -> str:
+        """Human readable 'user (until HH:MM)' text for a lease record"""
+        return f"{record.holder} (until {datetime.fromtimestamp(record.expires_at).strftime('%H:%M')})"
@@ -0,0 +1,247 @@
+"""
+Database Transport
+
+Compressed transport codec for uploading and downloading SQLite databases
+to and from Google Drive.
+
+A database is first snapshotted with ``VACUUM INTO`` (which drops free pages
+and defragments tables) and then streamed through zstd when the optional
+``zstandard`` package is installed, or through stdlib gzip otherwise.
+The codec and the checksum of the uncompressed snapshot are recorded in a
+small manifest that is stored as Drive file properties next to the upload,
+so a download can decompress straight into the cache file and verify it.
+"""
+
+import os
+import gzip
+import hashlib
+import logging
+import sqlite3
+import zlib
+from typing import Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_RAW = "raw"
+CODEC_GZIP = "gzip"
+CODEC_ZSTD = "zstd"
+
+# Setting values accepted for "cloud_db_compression"
+COMPRESSION_SETTING = "cloud_db_compression"
+COMPRESSION_OFF = "off"
+COMPRESSION_AUTO = "auto"
+
+# Drive file properties used to store the manifest (values must be strings)
+MANIFEST_PROPERTIES = ("transport_codec", "transport_sha256", "transport_size")
+
+CODEC_MIMETYPES = {
+    CODEC_RAW: "application/x-sqlite3",
+    CODEC_GZIP: "application/gzip",
+    CODEC_ZSTD: "application/zstd",
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class TransportChecksumError(Exception):
+    """Raised when a decompressed database does not match its manifest"""
+
+
+def available_codecs():
+    """Return the codecs that can be used in this environment"""
+    codecs = [CODEC_RAW, CODEC_GZIP]
+    if zstandard is not None:
+        codecs.append(CODEC_ZSTD)
+    return codecs
+
+
+def resolve_codec(setting_value: Optional[str]) -> str:
+    """
+    Map the ``cloud_db_compression`` setting to a concrete codec.
+
+    "off" (the default) keeps the legacy raw uploads, "auto" prefers zstd and
+    falls back to gzip, and an explicit codec name is honoured when available.
+    """
+    value = (setting_value or COMPRESSION_OFF).lower()
+    if value in (COMPRESSION_OFF, CODEC_RAW, "none", "false"):
+        return CODEC_RAW
+    if value == CODEC_ZSTD and zstandard is None:
+        logger.warning("zstandard is not installed, falling back to gzip transport")
+        return CODEC_GZIP
+    if value in (CODEC_ZSTD, CODEC_GZIP):
+        return value
+    return CODEC_ZSTD if zstandard is not None else CODEC_GZIP
+
+
+def manifest_to_properties(manifest: Dict) -> Dict:
+    """Convert a manifest to Drive file properties"""
+    if manifest.get('codec', CODEC_RAW) == CODEC_RAW:
+        # Clear any stale manifest left by an earlier compressed upload
+        return {key: None for key in MANIFEST_PROPERTIES}
+    return {
+        'transport_codec': manifest['codec'],
+        'transport_sha256': manifest['sha256'],
+        'transport_size': str(manifest['size']),
+    }
+
+
+def manifest_from_properties(properties: Optional[Dict]) -> Dict:
+    """Read a manifest back from Drive file properties"""
+    properties = properties or {}
+    codec = properties.get('transport_codec') or CODEC_RAW
+    manifest = {'codec': codec}
+    if codec != CODEC_RAW:
+        manifest['sha256'] = properties.get('transport_sha256', '')
+        manifest['size'] = int(properties.get('transport_size') or 0)
+    return manifest
+
+
+def _open_compressor(codec: str, fileobj):
+    """Wrap a binary file object with a streaming compressor"""
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd transport requested but zstandard is not installed")
+        return zstandard.ZstdCompressor(level=10, threads=-1).stream_writer(fileobj, closefd=False)
+    if codec == CODEC_GZIP:
+        return gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=6, mtime=0)
+    raise ValueError(f"Unknown transport codec: {codec}")
+
+
+class DecompressingWriter:
+    """
+    File-like sink that decompresses whatever is written to it.
+
+    Suitable as the target of ``MediaIoBaseDownload`` so compressed bytes are
+    never stored on disk: each downloaded chunk is decompressed directly into
+    the destination file while the checksum of the output is computed.
+    """
+
+    def __init__(self, codec: str, dest_file):
+        self.codec = codec
+        self.dest_file = dest_file
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ValueError("Database was uploaded with zstd but zstandard is not installed")
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        elif codec == CODEC_GZIP:
+            self._decompressor = zlib.decompressobj(wbits=31)
+        elif codec == CODEC_RAW:
+            self._decompressor = None
+        else:
+            raise ValueError(f"Unknown transport codec: {codec}")
+
+    def _emit(self, data: bytes):
+        if data:
+            self.dest_file.write(data)
+            self.hasher.update(data)
+            self.size += len(data)
+
+    def write(self, data: bytes) -> int:
+        if self._decompressor is None:
+            self._emit(data)
+        else:
+            self._emit(self._decompressor.decompress(data))
+        return len(data)
+
+    def flush(self):
+        if self.codec == CODEC_GZIP:
+            self._emit(self._decompressor.flush())
+        self.dest_file.flush()
+
+    def verify(self, manifest: Dict):
+        """Check the decompressed output against the manifest"""
+        self.flush()
+        if self.codec == CODEC_RAW:
+            return
+        expected = manifest.get('sha256')
+        if expected and expected != self.hasher.hexdigest():
+            raise TransportChecksumError(
+                f"Checksum mismatch after {self.codec} download "
+                f"({self.size} bytes, expected {manifest.get('size')})")
+
+
+class DatabaseTransportCodec:
+    """Packs databases into compressed transport files and unpacks them again"""
+
+    def __init__(self, codec: str = CODEC_GZIP, work_dir: Optional[str] = None):
+        self.codec = codec
+        self.work_dir = work_dir
+
+    def snapshot(self, db_path: str, snapshot_path: str) -> str:
+        """Write a compact, consistent copy of the database with VACUUM INTO"""
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("VACUUM INTO ?", (snapshot_path,))
+        finally:
+            conn.close()
+        return snapshot_path
+
+    def pack(self, db_path: str, output_path: str) -> Dict:
+        """
+        Snapshot and compress a database.
+
+        Args:
+            db_path: Path to the SQLite database to upload
+            output_path: Where to write the transport file
+
+        Returns:
+            Manifest dictionary with codec, sha256 and size of the snapshot
+            plus the compressed size
+        """
+        work_dir = self.work_dir or os.path.dirname(os.path.abspath(output_path))
+        snapshot_path = os.path.join(work_dir, os.path.basename(output_path) + ".snapshot")
+        try:
+            self.snapshot(db_path, snapshot_path)
+            hasher = hashlib.sha256()
+            size = 0
+            with open(snapshot_path, 'rb') as src, open(output_path, 'wb') as dst:
+                if self.codec == CODEC_RAW:
+                    writer = dst
+                else:
+                    writer = _open_compressor(self.codec, dst)
+                try:
+                    while True:
+                        chunk = src.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        writer.write(chunk)
+                finally:
+                    if writer is not dst:
+                        writer.close()
+        finally:
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+
+        manifest = {
+            'codec': self.codec,
+            'sha256': hasher.hexdigest(),
+            'size': size,
+            'compressed_size': os.path.getsize(output_path),
+        }
+        logger.info(f"Packed database with {self.codec}: {size / (1024*1024):.1f} MB -> "
+                    f"{manifest['compressed_size'] / (1024*1024):.1f} MB")
+        return manifest
+
+    @staticmethod
+    def unpack(transport_path: str, dest_path: str, manifest: Dict) -> str:
+        """Decompress a transport file on disk into ``dest_path`` and verify it"""
+        with open(transport_path, 'rb') as src, open(dest_path, 'wb') as dst:
+            writer = DecompressingWriter(manifest.get('codec', CODEC_RAW), dst)
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+            writer.verify(manifest)
+        return dest_path
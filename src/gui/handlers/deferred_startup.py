@@ -0,0 +1,225 @@
+"""
+Deferred Startup
+
+Helpers that keep expensive work off the path to the first usable window.
+
+* ``StartupTimer`` records how long each startup phase took, logs a report
+  once the application is interactive and appends it to a JSON lines file so
+  startup regressions can be compared between runs.
+* ``LazyTabLoader`` adds a lightweight placeholder for each main window tab
+  and only constructs the real tab (and imports its module, with QtWebEngine,
+  matplotlib, the recharge methods, ...) the first time it is shown or
+  requested with ``ensure``.
+* ``StartupStages`` runs the remaining initialization steps one per event
+  loop turn after the window has been painted, so the UI stays responsive
+  between steps.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QLabel, QVBoxLayout, QWidget
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORT_HISTORY = 200
+
+
+class StartupTimer:
+    """Collects startup phase durations relative to process start"""
+
+    def __init__(self, start: Optional[float] = None):
+        self.reset(start)
+
+    def reset(self, start: Optional[float] = None):
+        self.start = start if start is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float, float]] = []   # (name, started at, duration) in seconds
+        self.marks: List[Tuple[str, float]] = []           # (name, elapsed) in seconds
+        self.user_wait = 0.0                               # Time spent waiting on the user (login)
+        self.reported = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def mark(self, name: str):
+        """Record a point in time, e.g. 'window shown'"""
+        self.marks.append((name, self.elapsed()))
+
+    @contextmanager
+    def phase(self, name: str, user_wait: bool = False):
+        """Time a block; user_wait phases are excluded from the interactive time"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            self.phases.append((name, started - self.start, duration))
+            if user_wait:
+                self.user_wait += duration
+
+    def as_dict(self) -> dict:
+        marks = dict(self.marks)
+        interactive = marks.get('interactive', self.elapsed())
+        return {
+            'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'interactive_ms': round((interactive - self.user_wait) * 1000, 1),
+            'user_wait_ms': round(self.user_wait * 1000, 1),
+            'marks_ms': {name: round(t * 1000, 1) for name, t in self.marks},
+            'phases_ms': [{'name': name, 'start': round(s * 1000, 1), 'duration': round(d * 1000, 1)}
+                          for name, s, d in self.phases],
+        }
+
+    def format_report(self) -> str:
+        data = self.as_dict()
+        lines = [f"PERF: Total startup time to interactive: {data['interactive_ms']:.0f}ms "
+                 f"(excluding {data['user_wait_ms']:.0f}ms waiting for login)"]
+        for phase in sorted(data['phases_ms'], key=lambda p: p['start']):
+            lines.append(f"  {phase['start']:8.0f}ms  {phase['duration']:8.0f}ms  {phase['name']}")
+        return "\n".join(lines)
+
+    def report(self, history_path: Optional[Path] = None):
+        """Log the report once and append it to the history file"""
+        if self.reported:
+            return
+        self.reported = True
+        logger.info(self.format_report())
+        if history_path is None:
+            return
+        try:
+            history_path = Path(history_path)
+            history_path.parent.mkdir(parents=True, exist_ok=True)
+            lines = history_path.read_text(encoding='utf-8').splitlines() if history_path.exists() else []
+            lines = lines[-(MAX_REPORT_HISTORY - 1):] + [json.dumps(self.as_dict())]
+            history_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+        except Exception as e:
+            logger.warning(f"Could not write startup timing history: {e}")
+
+
+# Shared by main.py (process start, imports) and the main window (everything after)
+startup_timer = StartupTimer()
+
+
+class LazyTabLoader(QObject):
+    """Builds main window tabs the first time they are needed"""
+
+    tab_built = pyqtSignal(str, object)  # key, tab widget
+
+    def __init__(self, tab_widget, tabs: Dict[str, QWidget], timer: Optional[StartupTimer] = None,
+                 parent=None):
+        super().__init__(parent)
+        self.tab_widget = tab_widget
+        self.tabs = tabs  # Shared with the main window; only holds built tabs
+        self.timer = timer or startup_timer
+        self.active = False  # Tabs are not built on selection until activate()
+        self._factories: Dict[str, Callable[[], QWidget]] = {}
+        self._placeholders: Dict[str, QWidget] = {}
+        self._titles: Dict[str, str] = {}
+        self._building = set()
+
+    def add_tab(self, key: str, title: str, factory: Callable[[], QWidget]) -> int:
+        """Add a placeholder page whose content is created by factory on first use"""
+        placeholder = QWidget()
+        layout = QVBoxLayout(placeholder)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self._factories[key] = factory
+        self._placeholders[key] = placeholder
+        self._titles[key] = title
+        return self.tab_widget.addTab(placeholder, title)
+
+    def index_of(self, key: str) -> int:
+        placeholder = self._placeholders.get(key)
+        return self.tab_widget.indexOf(placeholder) if placeholder is not None else -1
+
+    def key_at(self, index: int) -> Optional[str]:
+        widget = self.tab_widget.widget(index)
+        for key, placeholder in self._placeholders.items():
+            if placeholder is widget:
+                return key
+        return None
+
+    def is_built(self, key: str) -> bool:
+        return key in self.tabs
+
+    def pending(self) -> List[str]:
+        return [key for key in self._factories if key not in self.tabs]
+
+    def activate(self):
+        """Start building tabs on selection, beginning with the current one"""
+        self.active = True
+        self.ensure_index(self.tab_widget.currentIndex())
+
+    def ensure_index(self, index: int) -> Optional[QWidget]:
+        if not self.active or index < 0:
+            return None
+        key = self.key_at(index)
+        return self.ensure(key) if key else None
+
+    def ensure(self, key: str) -> Optional[QWidget]:
+        """Return the tab for key, building it now if it does not exist yet"""
+        if key in self.tabs:
+            return self.tabs[key]
+        if key not in self._factories or key in self._building:
+            return None
+
+        self._building.add(key)
+        placeholder = self._placeholders[key]
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            with self.timer.phase(f"build {key} tab"):
+                tab = self._factories[key]()
+            placeholder.layout().addWidget(tab)
+            self.tabs[key] = tab
+            logger.debug(f"Built {key} tab on first use")
+            self.tab_built.emit(key, tab)
+            return tab
+        except Exception as e:
+            logger.error(f"Error loading {self._titles[key]} tab: {e}", exc_info=True)
+            error_label = QLabel(f"Error loading tab content: {str(e)}")
+            error_label.setStyleSheet("color: red;")
+            placeholder.layout().addWidget(error_label)
+            self._factories.pop(key)  # Do not retry on every tab change
+            return None
+        finally:
+            self._building.discard(key)
+            QApplication.restoreOverrideCursor()
+
+
+class StartupStages(QObject):
+    """Runs initialization steps one per event loop turn, each timed"""
+
+    finished = pyqtSignal()
+
+    def __init__(self, timer: Optional[StartupTimer] = None, parent=None):
+        super().__init__(parent)
+        self.timer = timer or startup_timer
+        self._stages: List[Tuple[str, Callable[[], None]]] = []
+        self.started = False
+
+    def add(self, name: str, func: Callable[[], None]):
+        self._stages.append((name, func))
+
+    def start(self):
+        """Begin running stages; call after the window has been shown"""
+        if self.started:
+            return
+        self.started = True
+        self.timer.mark('first paint')
+        QTimer.singleShot(0, self._run_next)
+
+    def _run_next(self):
+        if not self._stages:
+            self.timer.mark('interactive')
+            self.finished.emit()
+            return
+        name, func = self._stages.pop(0)
+        try:
+            with self.timer.phase(name):
+                func()
+        except Exception as e:
+            logger.error(f"Startup stage '{name}' failed: {e}", exc_info=True)
+        QTimer.singleShot(0, self._run_next)
@@ -0,0 +1,188 @@
+"""
+Deployment Index
+
+Interval index of transducer deployments (rows of ``transducer_locations``)
+for assigning logger files to wells by serial number and time range.
+
+Deployments are grouped by serial number and sorted by start date once, with
+their dates parsed up front. A file's well is found with two binary searches:
+deployments starting after the file ends are cut off by ``bisect`` on the
+start dates, and deployments ending before the file starts by ``bisect`` on
+the running maximum of the end dates. Only the few deployments left are
+checked for overlap, so matching does not depend on the size of the table.
+
+When several deployments overlap a file, the one listed first in the source
+wins, as with the previous linear search. ``overlaps`` and ``gaps`` report
+deployments of one transducer that overlap each other and periods between
+deployments that no deployment covers.
+"""
+
+import csv
+import logging
+import sqlite3
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_date(value) -> Optional[datetime]:
+    """Parse a deployment or file date; None if empty or unreadable"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        # Dates entered in the app may be stored without a time or with fractions
+        return datetime.fromisoformat(str(value).strip())
+
+
+@dataclass(frozen=True)
+class Deployment:
+    serial_number: str
+    well_number: str
+    start: datetime
+    end: datetime  # datetime.max while the transducer is still in the well
+    order: int     # Position in the source, for resolving overlaps
+
+
+class _SerialDeployments:
+    """Deployments of one transducer sorted by start"""
+
+    def __init__(self, deployments: List[Deployment]):
+        self.deployments = sorted(deployments, key=lambda d: (d.start, d.order))
+        self.starts = [d.start for d in self.deployments]
+        self.max_ends = list(accumulate((d.end for d in self.deployments), max))
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Deployment]:
+        """Deployments overlapping [start, end], in source order"""
+        hi = bisect_right(self.starts, end)
+        lo = bisect_left(self.max_ends, start, 0, hi)
+        matches = [d for d in self.deployments[lo:hi] if d.end >= start]
+        return sorted(matches, key=lambda d: d.order)
+
+
+class DeploymentIndex:
+    """Transducer deployments indexed by serial number and time"""
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        by_serial = defaultdict(list)
+        self.skipped = 0
+        for order, record in enumerate(records):
+            serial_number = record.get('serial_number') or ''
+            try:
+                start = parse_date(record.get('start_date'))
+                end = parse_date(record.get('end_date')) or datetime.max
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Skipping location {record}: {e}")
+                self.skipped += 1
+                continue
+            if not serial_number or start is None:
+                logger.warning(f"Skipping location without serial number or start date: {record}")
+                self.skipped += 1
+                continue
+            by_serial[serial_number].append(
+                Deployment(serial_number, record.get('well_number') or '', start, end, order))
+        self._serials = {serial: _SerialDeployments(items) for serial, items in by_serial.items()}
+
+    @classmethod
+    def from_csv(cls, file_path: str) -> 'DeploymentIndex':
+        """Load a transducer locations CSV (serial_number, well_number, start_date, end_date)"""
+        with open(file_path, 'r', encoding='utf-8') as csvfile:
+            return cls(csv.DictReader(csvfile))
+
+    @classmethod
+    def from_database(cls, db_path: str) -> 'DeploymentIndex':
+        """Load the transducer_locations table of a water levels database"""
+        with sqlite3.connect(db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT serial_number, well_number, start_date, end_date
+                FROM transducer_locations
+                ORDER BY id
+            """).fetchall()
+        return cls(dict(row) for row in rows)
+
+    @classmethod
+    def load(cls, path: str) -> 'DeploymentIndex':
+        """Load from a database (.db) or a locations CSV"""
+        if str(path).lower().endswith(('.db', '.sqlite', '.sqlite3')):
+            return cls.from_database(path)
+        return cls.from_csv(path)
+
+    def __len__(self) -> int:
+        return sum(len(s.deployments) for s in self._serials.values())
+
+    def deployments(self, serial_number: str) -> List[Deployment]:
+        serial = self._serials.get(serial_number)
+        return list(serial.deployments) if serial else []
+
+    def find_deployments(self, serial_number: str, start_time, stop_time) -> List[Deployment]:
+        """All deployments of the transducer overlapping the time range, in source order"""
+        serial = self._serials.get(serial_number)
+        if serial is None:
+            return []
+        try:
+            start, end = parse_date(start_time), parse_date(stop_time)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid time range {start_time} to {stop_time}: {e}")
+            return []
+        if start is None or end is None:
+            return []
+        return serial.overlapping(start, end)
+
+    def find_well(self, serial_number: str, start_time, stop_time) -> Optional[str]:
+        """Well of the first listed deployment overlapping the time range"""
+        if not start_time or not stop_time or not serial_number:
+            logger.warning("Missing required time range or serial number data")
+            return None
+        matches = self.find_deployments(serial_number, start_time, stop_time)
+        return matches[0].well_number if matches else None
+
+    def is_ambiguous(self, serial_number: str, start_time, stop_time) -> bool:
+        """Whether the time range overlaps deployments in more than one well"""
+        return len({d.well_number for d in self.find_deployments(serial_number, start_time, stop_time)}) > 1
+
+    def overlaps(self) -> List[Dict[str, Any]]:
+        """Pairs of deployments of the same transducer that overlap in time"""
+        found = []
+        for serial_number, serial in self._serials.items():
+            items = serial.deployments
+            for i, first in enumerate(items):
+                # Sorted by start, so later deployments overlap only while they start before this one ends
+                for second in items[i + 1:]:
+                    if second.start > first.end:
+                        break
+                    found.append({
+                        'serial_number': serial_number,
+                        'well_number': first.well_number,
+                        'other_well_number': second.well_number,
+                        'start': second.start,
+                        'end': min(first.end, second.end),
+                    })
+        return found
+
+    def gaps(self, min_gap: timedelta = timedelta(0)) -> List[Dict[str, Any]]:
+        """Periods between consecutive deployments of a transducer that no deployment covers"""
+        found = []
+        for serial_number, serial in self._serials.items():
+            items = serial.deployments
+            for i in range(1, len(items)):
+                covered_until = serial.max_ends[i - 1]
+                if items[i].start - covered_until > min_gap:
+                    found.append({
+                        'serial_number': serial_number,
+                        'after_well_number': max(items[:i], key=lambda d: d.end).well_number,
+                        'before_well_number': items[i].well_number,
+                        'start': covered_until,
+                        'end': items[i].start,
+                    })
+        return found
@@ -0,0 +1,272 @@
+"""
+Drive Batch Operations
+
+Coalesces Google Drive API calls into batch requests and memoizes folder
+lookups for the lifetime of a session.
+
+Field data consolidation, run folder organization and the XLE monitor all
+copy, move and rename many files into a handful of month folders. Issued one
+at a time that costs one HTTP round trip per call plus a folder lookup per
+file. This layer queues metadata operations and sends them in batches of up
+to 100 calls per round trip, resolves each folder once, lists folders with
+full pagination and exposes Drive's ``changes.list`` feed for incremental
+listings.
+
+Media uploads and downloads cannot be batched by the Drive API and are left
+to the callers.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIMETYPE = 'application/vnd.google-apps.folder'
+MAX_BATCH_SIZE = 100  # Drive API limit per batch request
+
+
+def _escape_query_value(value: str) -> str:
+    """Escape a value for use inside a single-quoted Drive query string"""
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+
+class DriveBatchOperations:
+    """Batched Drive metadata operations with per-session folder caching"""
+
+    def __init__(self, service, batch_size: int = MAX_BATCH_SIZE):
+        """
+        Args:
+            service: Authenticated googleapiclient Drive v3 service
+            batch_size: Calls per batch request (capped at the Drive limit of 100)
+        """
+        self.service = service
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self._pending: List[Tuple[str, object, Optional[Callable]]] = []
+        self._folder_cache: Dict[Tuple[str, str], str] = {}
+        self._primed_parents = set()
+        self._next_request_id = 0
+        self.round_trips = 0
+        self.calls = 0
+
+    # ------------------------------------------------------------------
+    # Batching
+    # ------------------------------------------------------------------
+
+    def queue(self, request, callback: Optional[Callable] = None) -> str:
+        """
+        Queue a Drive request for the next batch.
+
+        Args:
+            request: Unexecuted HttpRequest (e.g. ``service.files().copy(...)``)
+            callback: Optional ``callback(response, exception)`` called after the
+                batch containing this request has been sent
+
+        Returns:
+            Request ID that can be used to look up the result of ``flush``
+        """
+        request_id = str(self._next_request_id)
+        self._next_request_id += 1
+        self._pending.append((request_id, request, callback))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return request_id
+
+    def copy(self, file_id: str, body: Dict, callback: Optional[Callable] = None, fields: str = 'id') -> str:
+        """Queue a file copy"""
+        return self.queue(self.service.files().copy(fileId=file_id, body=body, fields=fields), callback)
+
+    def update(self, file_id: str, body: Optional[Dict] = None, callback: Optional[Callable] = None,
+               add_parents: Optional[str] = None, remove_parents: Optional[str] = None,
+               fields: str = 'id, parents') -> str:
+        """Queue a metadata update (rename and/or move)"""
+        kwargs = {'fileId': file_id, 'fields': fields}
+        if body:
+            kwargs['body'] = body
+        if add_parents:
+            kwargs['addParents'] = add_parents
+        if remove_parents:
+            kwargs['removeParents'] = remove_parents
+        return self.queue(self.service.files().update(**kwargs), callback)
+
+    def move(self, file_id: str, new_parent_id: str, old_parent_id: str,
+             callback: Optional[Callable] = None, new_name: Optional[str] = None) -> str:
+        """Queue a move between folders, optionally renaming the file"""
+        body = {'name': new_name} if new_name else None
+        return self.update(file_id, body=body, callback=callback,
+                           add_parents=new_parent_id, remove_parents=old_parent_id)
+
+    def delete(self, file_id: str, callback: Optional[Callable] = None) -> str:
+        """Queue a file deletion"""
+        return self.queue(self.service.files().delete(fileId=file_id), callback)
+
+    def flush(self) -> Dict[str, Tuple[Optional[Dict], Optional[Exception]]]:
+        """
+        Send all queued requests.
+
+        Returns:
+            Dict mapping request ID to ``(response, exception)``
+        """
+        results = {}
+        while self._pending:
+            chunk = self._pending[:self.batch_size]
+            self._pending = self._pending[self.batch_size:]
+            callbacks = {request_id: callback for request_id, _, callback in chunk}
+
+            def on_response(request_id, response, exception):
+                results[request_id] = (response, exception)
+                if exception is not None:
+                    logger.warning(f"Batched Drive call {request_id} failed: {exception}")
+
+            if len(chunk) == 1:
+                # A single call does not need the multipart batch envelope
+                request_id, request, _ = chunk[0]
+                try:
+                    on_response(request_id, request.execute(), None)
+                except Exception as e:
+                    on_response(request_id, None, e)
+            else:
+                batch = self.service.new_batch_http_request(callback=on_response)
+                for request_id, request, _ in chunk:
+                    batch.add(request, request_id=request_id)
+                try:
+                    batch.execute()
+                except Exception as e:
+                    logger.error(f"Batch request failed: {e}")
+                    for request_id, _, _ in chunk:
+                        results.setdefault(request_id, (None, e))
+
+            self.round_trips += 1
+            self.calls += len(chunk)
+
+            for request_id, callback in callbacks.items():
+                if callback:
+                    response, exception = results.get(request_id, (None, None))
+                    try:
+                        callback(response, exception)
+                    except Exception as e:
+                        logger.error(f"Error in batch callback for request {request_id}: {e}")
+
+        return results
+
+    # ------------------------------------------------------------------
+    # Listing and folder resolution
+    # ------------------------------------------------------------------
+
+    def list_files(self, query: str, fields: str = 'id, name', page_size: int = 1000,
+                   order_by: Optional[str] = None) -> List[Dict]:
+        """Run a files.list query and follow every page of results"""
+        files = []
+        page_token = None
+        while True:
+            kwargs = {
+                'q': query,
+                'spaces': 'drive',
+                'fields': f'nextPageToken, files({fields})',
+                'pageSize': page_size,
+            }
+            if order_by:
+                kwargs['orderBy'] = order_by
+            if page_token:
+                kwargs['pageToken'] = page_token
+            response = self.service.files().list(**kwargs).execute()
+            self.round_trips += 1
+            self.calls += 1
+            files.extend(response.get('files', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def list_children(self, parent_id: str, fields: str = 'id, name',
+                      extra_query: str = '', folders_only: bool = False) -> List[Dict]:
+        """List every non-trashed child of a folder"""
+        query = f"'{parent_id}' in parents and trashed = false"
+        if folders_only:
+            query += f" and mimeType = '{FOLDER_MIMETYPE}'"
+        if extra_query:
+            query += f" and {extra_query}"
+        return self.list_files(query, fields=fields)
+
+    def prime_folders(self, parent_id: str):
+        """Cache the IDs of every subfolder of ``parent_id`` with one listing"""
+        if parent_id in self._primed_parents:
+            return
+        for folder in self.list_children(parent_id, folders_only=True):
+            # Keep the first match like the single-lookup helpers did
+            self._folder_cache.setdefault((parent_id, folder['name']), folder['id'])
+        self._primed_parents.add(parent_id)
+
+    def resolve_folder(self, parent_id: str, name: str, create: bool = True) -> Optional[str]:
+        """
+        Get the ID of folder ``name`` inside ``parent_id``, creating it if needed.
+
+        Results are cached for the session so repeated lookups of the same
+        month folder cost nothing.
+        """
+        key = (parent_id, name)
+        if key in self._folder_cache:
+            return self._folder_cache[key]
+
+        if parent_id not in self._primed_parents:
+            query = (f"'{parent_id}' in parents and name = '{_escape_query_value(name)}' "
+                     f"and mimeType = '{FOLDER_MIMETYPE}' and trashed = false")
+            folders = self.list_files(query, fields='id, name', page_size=10)
+            if folders:
+                self._folder_cache[key] = folders[0]['id']
+                return folders[0]['id']
+
+        if not create:
+            return None
+
+        folder = self.service.files().create(
+            body={'name': name, 'mimeType': FOLDER_MIMETYPE, 'parents': [parent_id]},
+            fields='id'
+        ).execute()
+        self.round_trips += 1
+        self.calls += 1
+        self._folder_cache[key] = folder['id']
+        logger.info(f"Created folder '{name}' in {parent_id}: {folder['id']}")
+        return folder['id']
+
+    def forget_folder(self, parent_id: str, name: str):
+        """Drop a cached folder ID (e.g. after the folder was trashed)"""
+        self._folder_cache.pop((parent_id, name), None)
+
+    # ------------------------------------------------------------------
+    # Incremental listing via the changes feed
+    # ------------------------------------------------------------------
+
+    def get_start_page_token(self) -> str:
+        """Get a token marking the current position of the changes feed"""
+        response = self.service.changes().getStartPageToken().execute()
+        self.round_trips += 1
+        self.calls += 1
+        return response['startPageToken']
+
+    def list_changes(self, page_token: str,
+                     fields: str = 'fileId, removed, file(id, name, parents, trashed, md5Checksum, modifiedTime, size, mimeType)'
+                     ) -> Tuple[List[Dict], str]:
+        """
+        Fetch every change since ``page_token``.
+
+        Returns:
+            Tuple of (changes, token to pass on the next call)
+        """
+        changes = []
+        while True:
+            response = self.service.changes().list(
+                pageToken=page_token,
+                spaces='drive',
+                pageSize=1000,
+                includeRemoved=True,
+                fields=f'nextPageToken, newStartPageToken, changes({fields})'
+            ).execute()
+            self.round_trips += 1
+            self.calls += 1
+            changes.extend(response.get('changes', []))
+            if 'newStartPageToken' in response:
+                return changes, response['newStartPageToken']
+            page_token = response['nextPageToken']
+
+    def stats(self) -> str:
+        """Short summary of the API usage of this session"""
+        return f"{self.calls} Drive calls in {self.round_trips} round trips"
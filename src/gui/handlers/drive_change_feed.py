@@ -0,0 +1,231 @@
+"""
+Drive Change Feed
+
+Persisted, incremental view of the files in watched Google Drive folders.
+
+The first sync of a folder lists it completely (following every page) into a
+local SQLite catalog. Afterwards only Drive's ``changes.list`` feed is read,
+starting from the page token saved by the previous sync, so each check costs
+one or two round trips no matter how many files the folders hold. Each file
+is stored with its md5Checksum, and callers mark files as processed with the
+checksum they handled, so only new or modified files are downloaded and
+parsed again, even after a restart.
+"""
+
+import os
+import logging
+import sqlite3
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from .drive_batch_operations import DriveBatchOperations
+
+logger = logging.getLogger(__name__)
+
+FILE_FIELDS = 'id, name, parents, trashed, md5Checksum, modifiedTime, size, mimeType'
+
+
+def default_catalog_path(settings_handler=None) -> str:
+    """Catalog location: the databases temp folder if configured, else the system temp dir"""
+    if settings_handler is not None:
+        local_db_directory = settings_handler.get_setting("local_db_directory", None)
+        if local_db_directory:
+            cache_dir = os.path.join(local_db_directory, "temp")
+            os.makedirs(cache_dir, exist_ok=True)
+            return os.path.join(cache_dir, "drive_catalog.db")
+    cache_dir = os.path.join(tempfile.gettempdir(), 'water_levels_temp')
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, "drive_catalog.db")
+
+
+class DriveChangeFeed:
+    """SQLite catalog of watched Drive folders kept current through changes.list"""
+
+    def __init__(self, service, catalog_path: str, drive_ops: Optional[DriveBatchOperations] = None):
+        """
+        Args:
+            service: Authenticated googleapiclient Drive v3 service
+            catalog_path: SQLite file holding the catalog and the page token
+            drive_ops: Optional shared DriveBatchOperations for the same service
+        """
+        self.service = service
+        self.catalog_path = catalog_path
+        self.drive_ops = drive_ops or DriveBatchOperations(service)
+        self._init_catalog()
+
+    def _connect(self):
+        return sqlite3.connect(self.catalog_path)
+
+    def _init_catalog(self):
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS drive_files (
+                    file_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    parent_id TEXT,
+                    md5_checksum TEXT,
+                    modified_time TEXT,
+                    size INTEGER,
+                    processed_md5 TEXT,
+                    processed_at TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_drive_files_parent
+                ON drive_files (parent_id, name)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS watched_folders (
+                    folder_id TEXT PRIMARY KEY,
+                    seeded_at TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS feed_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+    # ------------------------------------------------------------------
+    # Syncing
+    # ------------------------------------------------------------------
+
+    def _get_state(self, conn, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM feed_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, conn, key: str, value: str):
+        conn.execute("INSERT OR REPLACE INTO feed_state (key, value) VALUES (?, ?)", (key, value))
+
+    def _upsert(self, conn, file: Dict, parent_id: str) -> bool:
+        """Insert or update a catalog row; returns True if the file is new or its content changed"""
+        row = conn.execute("SELECT md5_checksum FROM drive_files WHERE file_id = ?", (file['id'],)).fetchone()
+        conn.execute('''
+            INSERT INTO drive_files (file_id, name, parent_id, md5_checksum, modified_time, size)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(file_id) DO UPDATE SET
+                name = excluded.name,
+                parent_id = excluded.parent_id,
+                md5_checksum = excluded.md5_checksum,
+                modified_time = excluded.modified_time,
+                size = excluded.size
+        ''', (file['id'], file.get('name'), parent_id, file.get('md5Checksum'),
+              file.get('modifiedTime'), int(file.get('size') or 0)))
+        return row is None or row[0] != file.get('md5Checksum')
+
+    def _seed_folder(self, conn, folder_id: str) -> List[Dict]:
+        """Fully list a folder into the catalog"""
+        files = self.drive_ops.list_children(folder_id, fields=FILE_FIELDS)
+        conn.execute("DELETE FROM drive_files WHERE parent_id = ?", (folder_id,))
+        for file in files:
+            self._upsert(conn, file, folder_id)
+        conn.execute("INSERT OR REPLACE INTO watched_folders (folder_id, seeded_at) VALUES (?, ?)",
+                     (folder_id, datetime.now().isoformat()))
+        logger.info(f"Seeded Drive catalog with {len(files)} files from folder {folder_id}")
+        return files
+
+    def sync(self, folder_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Bring the catalog up to date for the given folders.
+
+        Folders seen for the first time are listed in full; everything else
+        is updated from the changes feed.
+
+        Returns:
+            Dict mapping folder ID to the IDs of files that are new or whose
+            content changed since the previous sync
+        """
+        folder_ids = [f for f in dict.fromkeys(folder_ids) if f]
+        changed = {folder_id: [] for folder_id in folder_ids}
+
+        with self._connect() as conn:
+            watched = {row[0] for row in conn.execute("SELECT folder_id FROM watched_folders")}
+            token = self._get_state(conn, 'page_token')
+
+            if token is None:
+                # No feed position yet: take one before listing so nothing is missed
+                conn.execute("DELETE FROM drive_files")
+                conn.execute("DELETE FROM watched_folders")
+                watched = set()
+                token = self.drive_ops.get_start_page_token()
+            else:
+                changes, token = self.drive_ops.list_changes(token)
+                self._apply_changes(conn, changes, watched, changed)
+
+            for folder_id in folder_ids:
+                if folder_id not in watched:
+                    changed[folder_id] = [f['id'] for f in self._seed_folder(conn, folder_id)]
+
+            self._set_state(conn, 'page_token', token)
+
+        return changed
+
+    def _apply_changes(self, conn, changes: List[Dict], watched: set, changed: Dict[str, List[str]]):
+        for change in changes:
+            file_id = change.get('fileId')
+            file = change.get('file') or {}
+            parent_id = next((p for p in file.get('parents', []) if p in watched), None)
+
+            if change.get('removed') or file.get('trashed') or parent_id is None:
+                # Deleted, trashed or moved out of every watched folder
+                conn.execute("DELETE FROM drive_files WHERE file_id = ?", (file_id,))
+                continue
+
+            if self._upsert(conn, file, parent_id) and parent_id in changed:
+                if file_id not in changed[parent_id]:
+                    changed[parent_id].append(file_id)
+
+    def reset(self):
+        """Forget the feed position and catalog so the next sync relists everything"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM drive_files")
+            conn.execute("DELETE FROM watched_folders")
+            conn.execute("DELETE FROM feed_state")
+
+    # ------------------------------------------------------------------
+    # Catalog queries
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _row_to_file(row) -> Dict:
+        return {
+            'id': row[0],
+            'name': row[1],
+            'parent_id': row[2],
+            'md5Checksum': row[3],
+            'modifiedTime': row[4],
+            'size': row[5],
+            'processed_md5': row[6],
+        }
+
+    def _query(self, where: str, params: tuple) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(f'''
+                SELECT file_id, name, parent_id, md5_checksum, modified_time, size, processed_md5
+                FROM drive_files WHERE {where} ORDER BY name
+            ''', params).fetchall()
+        return [self._row_to_file(row) for row in rows]
+
+    def list_folder(self, folder_id: str, extension: Optional[str] = None) -> List[Dict]:
+        """All catalogued files in a folder, optionally filtered by extension"""
+        if extension:
+            return self._query("parent_id = ? AND name LIKE ?", (folder_id, f"%.{extension}"))
+        return self._query("parent_id = ?", (folder_id,))
+
+    def pending_files(self, folder_id: str, extension: Optional[str] = None) -> List[Dict]:
+        """Files that have not been processed with their current content"""
+        where = "parent_id = ? AND (processed_md5 IS NULL OR processed_md5 != IFNULL(md5_checksum, ''))"
+        params = (folder_id,)
+        if extension:
+            where += " AND name LIKE ?"
+            params += (f"%.{extension}",)
+        return self._query(where, params)
+
+    def mark_processed(self, file_id: str, md5_checksum: Optional[str]):
+        """Record that a file was processed with the given content checksum"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE drive_files SET processed_md5 = ?, processed_at = ? WHERE file_id = ?",
+                (md5_checksum or '', datetime.now().isoformat(), file_id))
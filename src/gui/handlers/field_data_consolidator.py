@@ -6,6 +6,8 @@ from pathlib import Path
 import json
 import tempfile
 import io
+from .drive_batch_operations import DriveBatchOperations
+from .xle_file_cache import XleFileCache, default_cache_dir
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,8 @@ class FieldDataConsolidator:
         self.drive_service = drive_service
         self.settings_handler = settings_handler
         self.consolidated_folder_id = None
+        self.drive_ops = DriveBatchOperations(drive_service)  # Batched calls and folder cache for this session
+        self.xle_cache = None  # Created on first use
         
     def get_or_create_consolidated_folder(self):
         """Get or create the FIELD_DATA_CONSOLIDATED folder in water_levels_monitoring"""
@@ -64,25 +68,9 @@ class FieldDataConsolidator:
                 if not self.get_or_create_consolidated_folder():
                     return None
             
-            # Check if monthly folder exists
-            query = f"'{self.consolidated_folder_id}' in parents and name='{year_month}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = self.drive_service.files().list(q=query, fields="files(id, name)").execute()
-            folders = results.get('files', [])
-            
-            if folders:
-                folder_id = folders[0]['id']
-                logger.debug(f"Found existing monthly folder {year_month}: {folder_id}")
-            else:
-                # Create the monthly folder
-                folder_metadata = {
-                    'name': year_month,
-                    'mimeType': 'application/vnd.google-apps.folder',
-                    'parents': [self.consolidated_folder_id]
-                }
-                folder = self.drive_service.files().create(body=folder_metadata, fields='id').execute()
-                folder_id = folder.get('id')
-                logger.info(f"Created monthly folder {year_month}: {folder_id}")
-            
+            # Lookups are cached for the session, so each month is resolved once
+            folder_id = self.drive_ops.resolve_folder(self.consolidated_folder_id, year_month)
+            logger.debug(f"Using monthly folder {year_month}: {folder_id}")
             return folder_id
             
         except Exception as e:
@@ -139,66 +127,48 @@ class FieldDataConsolidator:
             logger.error(f"Error extracting date from filename {filename}: {e}")
             return None
     
+    def _get_xle_cache(self):
+        """Cache of XLE headers and reading ranges, keyed by Drive file ID and md5"""
+        if self.xle_cache is None:
+            self.xle_cache = XleFileCache(self.drive_service, default_cache_dir(self.settings_handler))
+        return self.xle_cache
+    
     def generate_corrected_filename(self, file_info):
         """Generate corrected filename by reading actual XLE data"""
         try:
-            import tempfile
-            import io
-            from ..handlers.solinst_reader import SolinstReader
-            
-            # Download file to memory
-            logger.debug(f"Downloading {file_info['name']} to read actual dates...")
-            request = self.drive_service.files().get_media(fileId=file_info['id'])
-            file_content = io.BytesIO()
-            
-            # Use the media download functionality
-            from googleapiclient.http import MediaIoBaseDownload
-            downloader = MediaIoBaseDownload(file_content, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            
-            file_content.seek(0)
-            
-            # Write to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.xle', delete=False) as tmp_file:
-                tmp_file.write(file_content.read())
-                tmp_path = tmp_file.name
-            
-            try:
-                # Read XLE file to get actual data
-                reader = SolinstReader()
-                df, metadata = reader.read_xle(Path(tmp_path))
+            # Only the header and the first/last readings are needed; for large
+            # files just the head and tail are downloaded, and unchanged files
+            # are served from the local cache
+            logger.debug(f"Reading header and date range of {file_info['name']}...")
+            summary = self._get_xle_cache().get_summary(
+                file_info['id'], file_info.get('md5_checksum'), file_info.get('size'))
+            if summary is None:
+                raise ValueError("File could not be read")
+            
+            # Get actual first and last dates from data
+            if summary.has_data:
+                first_date = summary.first_reading
+                last_date = summary.last_reading
+                metadata = summary.metadata
                 
-                # Get actual first and last dates from data
-                if not df.empty and 'timestamp' in df.columns:
-                    first_date = df['timestamp'].min()
-                    last_date = df['timestamp'].max()
-                    
-                    # Get location from metadata (not from filename!)
-                    location = metadata.location.strip()
-                    
-                    # Remove any problematic characters from location
-                    location = location.replace(':', '').replace('/', '_').replace('\\', '_')
-                    
-                    # Format: Location_YYYY_MM_DD_To_YYYY_MM_DD.xle
-                    # Using actual data dates, not the metadata start/stop times
-                    new_filename = f"{location}_{first_date.strftime('%Y_%m_%d')}_To_{last_date.strftime('%Y_%m_%d')}.xle"
-                    
-                    logger.info(f"Generated new filename from metadata: {new_filename} (original: {file_info['name']})")
-                    logger.debug(f"  Location from metadata: {metadata.location}")
-                    logger.debug(f"  Data date range: {first_date} to {last_date}")
-                    
-                    return new_filename
-                else:
-                    logger.warning(f"No data found in {file_info['name']}, using original name")
-                    return file_info['name']
-                    
-            finally:
-                # Clean up temp file
-                import os
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+                # Get location from metadata (not from filename!)
+                location = metadata.location.strip()
+                
+                # Remove any problematic characters from location
+                location = location.replace(':', '').replace('/', '_').replace('\\', '_')
+                
+                # Format: Location_YYYY_MM_DD_To_YYYY_MM_DD.xle
+                # Using actual data dates, not the metadata start/stop times
+                new_filename = f"{location}_{first_date.strftime('%Y_%m_%d')}_To_{last_date.strftime('%Y_%m_%d')}.xle"
+                
+                logger.info(f"Generated new filename from metadata: {new_filename} (original: {file_info['name']})")
+                logger.debug(f"  Location from metadata: {metadata.location}")
+                logger.debug(f"  Data date range: {first_date} to {last_date}")
+                
+                return new_filename
+            else:
+                logger.warning(f"No data found in {file_info['name']}, using original name")
+                return file_info['name']
                     
         except Exception as e:
             logger.error(f"Error generating corrected filename for {file_info['name']}: {e}")
@@ -225,13 +195,7 @@ class FieldDataConsolidator:
             query = f"'{folder_id}' in parents and name contains '.xle' and trashed=false"
             logger.debug(f"Searching for XLE files with query: {query}")
             
-            results = self.drive_service.files().list(
-                q=query,
-                fields="files(id, name, modifiedTime, size)",
-                pageSize=1000  # Ensure we get all files
-            ).execute()
-            
-            files = results.get('files', [])
+            files = self.drive_ops.list_files(query, fields="id, name, modifiedTime, size, md5Checksum")
             logger.info(f"Found {len(files)} XLE files in main folder {folder_id}")
             if files:
                 for file in files:
@@ -245,6 +209,7 @@ class FieldDataConsolidator:
                         'name': file['name'],
                         'modified_time': file['modifiedTime'],
                         'size': file.get('size', 0),
+                        'md5_checksum': file.get('md5Checksum'),
                         **date_info
                     }
                     xle_files.append(file_info)
@@ -299,26 +264,77 @@ class FieldDataConsolidator:
             logger.error(f"Error copying file {file_info['name']}: {e}")
             return None
     
-    def get_or_create_archived_folder(self, source_folder_id):
-        """Get or create an 'archived' folder in the source folder"""
+    def _queue_copy_to_consolidated(self, file_info, target_folder_id, target_contents, archive_queue):
+        """Batched counterpart of copy_file_to_consolidated used during consolidation"""
         try:
-            # Check if archived folder already exists
-            query = f"'{source_folder_id}' in parents and name='archived' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = self.drive_service.files().list(q=query, fields="files(id)").execute()
-            folders = results.get('files', [])
+            new_filename = self.generate_corrected_filename(file_info)
             
-            if folders:
-                return folders[0]['id']
+            # List each monthly folder once instead of querying per file
+            if target_folder_id not in target_contents:
+                target_contents[target_folder_id] = {
+                    f['name']: f for f in self.drive_ops.list_children(target_folder_id, fields='id, name, modifiedTime')
+                }
+            existing_file = target_contents[target_folder_id].get(new_filename)
             
-            # Create archived folder
-            folder_metadata = {
-                'name': 'archived',
-                'mimeType': 'application/vnd.google-apps.folder',
-                'parents': [source_folder_id]
-            }
-            folder = self.drive_service.files().create(body=folder_metadata, fields='id').execute()
-            logger.info(f"Created 'archived' folder in {source_folder_id}")
-            return folder.get('id')
+            if existing_file:
+                # File exists, check if it's newer
+                existing_modified = datetime.fromisoformat(existing_file['modifiedTime'].replace('Z', '+00:00'))
+                source_modified = datetime.fromisoformat(file_info['modified_time'].replace('Z', '+00:00'))
+                
+                if source_modified <= existing_modified:
+                    logger.debug(f"File {new_filename} already up to date in consolidated folder")
+                    archive_queue.append(file_info)
+                    return
+                
+                logger.info(f"Updating existing file {new_filename} with newer version")
+                if existing_file['id'] is None:
+                    # Still a queued copy; send it to learn the ID to delete
+                    self.drive_ops.flush()
+                if existing_file['id']:
+                    self.drive_ops.delete(existing_file['id'])
+            
+            # Until the batch is sent a later field file with the same name is
+            # compared against the version being copied
+            pending = {'id': None, 'modifiedTime': file_info['modified_time']}
+            target_contents[target_folder_id][new_filename] = pending
+            
+            def on_copied(response, exception):
+                if exception is None and response:
+                    logger.info(f"Copied {file_info['name']} as {new_filename} to consolidated folder")
+                    pending.update(id=response['id'], modifiedTime=response['modifiedTime'])
+                    archive_queue.append(file_info)
+                else:
+                    logger.error(f"Error copying file {file_info['name']}: {exception}")
+                    if target_contents[target_folder_id].get(new_filename) is pending:
+                        del target_contents[target_folder_id][new_filename]
+            
+            # The copy keeps the modification time of the field file, so later
+            # runs compare like with like
+            self.drive_ops.copy(file_info['id'],
+                                {'name': new_filename, 'parents': [target_folder_id],
+                                 'modifiedTime': file_info['modified_time']},
+                                callback=on_copied, fields='id, modifiedTime')
+            
+        except Exception as e:
+            logger.error(f"Error copying file {file_info['name']}: {e}")
+    
+    def _archive_callback(self, file_info, progress_callback):
+        """Build the batch callback reporting the archive move of one file"""
+        def on_moved(response, exception):
+            if exception is None:
+                logger.info(f"Moved {file_info['name']} to archived folder")
+                if progress_callback:
+                    progress_callback(f"✓ Completed {file_info['name']}", 90)
+            else:
+                logger.warning(f"Failed to move {file_info['name']} to archived folder: {exception}")
+                if progress_callback:
+                    progress_callback(f"⚠ Warning: Could not archive {file_info['name']}", 90)
+        return on_moved
+    
+    def get_or_create_archived_folder(self, source_folder_id):
+        """Get or create an 'archived' folder in the source folder"""
+        try:
+            return self.drive_ops.resolve_folder(source_folder_id, 'archived')
             
         except Exception as e:
             logger.error(f"Error creating archived folder: {e}")
@@ -394,12 +410,17 @@ class FieldDataConsolidator:
             
             logger.info(f"Found {total_files} total XLE files to process")
             
-            # Second pass: organize and copy files
+            # Month folders are listed once instead of looked up for every file
+            self.drive_ops.prime_folders(self.consolidated_folder_id)
+            target_contents = {}  # monthly folder ID -> {file name: existing file}
+            archive_queue = []  # files whose consolidated copy is in place
+            
+            # Second pass: determine target names and queue the copies
             for file_info in all_files:
                 file_num = processed_files + 1
+                progress = 30 + int((processed_files / total_files) * 50)
                 
                 if progress_callback:
-                    progress = 30 + int((processed_files / total_files) * 60)
                     progress_callback(f"Processing file {file_num}/{total_files}: {file_info['name']}", progress)
                 
                 # Get or create monthly folder
@@ -411,32 +432,29 @@ class FieldDataConsolidator:
                 
                 target_folder_id = monthly_folders[year_month]
                 if target_folder_id:
-                    # Copy file to consolidated folder
                     if progress_callback:
                         progress_callback(f"Reading {file_info['name']} to determine actual dates...", progress)
                     
-                    copied_file_id = self.copy_file_to_consolidated(file_info, target_folder_id)
-                    
-                    if copied_file_id:
-                        if progress_callback:
-                            progress_callback(f"Moving {file_info['name']} to archived folder...", progress)
-                        
-                        # Move original file to archived folder
-                        source_folder_id = file_info['source_folder_id']
-                        archived_folder_id = field_folder_archives.get(source_folder_id)
-                        
-                        if archived_folder_id:
-                            if self.move_to_archived(file_info['id'], source_folder_id, archived_folder_id):
-                                logger.info(f"Moved {file_info['name']} to archived folder")
-                                if progress_callback:
-                                    progress_callback(f"✓ Completed {file_info['name']}", progress)
-                            else:
-                                logger.warning(f"Failed to move {file_info['name']} to archived folder")
-                                if progress_callback:
-                                    progress_callback(f"⚠ Warning: Could not archive {file_info['name']}", progress)
+                    self._queue_copy_to_consolidated(file_info, target_folder_id, target_contents, archive_queue)
                 
                 processed_files += 1
             
+            if progress_callback:
+                progress_callback("Copying files to consolidated folder...", 80)
+            self.drive_ops.flush()
+            
+            # Third pass: move originals to their archived folder in batches
+            if progress_callback:
+                progress_callback(f"Moving {len(archive_queue)} files to archived folders...", 90)
+            for file_info in archive_queue:
+                source_folder_id = file_info['source_folder_id']
+                archived_folder_id = field_folder_archives.get(source_folder_id)
+                if archived_folder_id:
+                    self.drive_ops.move(file_info['id'], archived_folder_id, source_folder_id,
+                                        callback=self._archive_callback(file_info, progress_callback))
+            self.drive_ops.flush()
+            logger.info(f"Consolidation used {self.drive_ops.stats()}")
+            
             if progress_callback:
                 summary = f"✓ Consolidation complete! Processed {processed_files} files into {len(monthly_folders)} monthly folders"
                 progress_callback(summary, 100)
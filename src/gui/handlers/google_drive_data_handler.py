@@ -4,9 +4,10 @@ import tempfile
 import shutil
 import zipfile
 from pathlib import Path
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
+from googleapiclient.http import MediaFileUpload
 import io
 from .google_drive_service import GoogleDriveService
+from .xle_file_cache import XleFileCache, default_cache_dir
 import json  # Added for pretty-printing API responses
 
 logger = logging.getLogger(__name__)
@@ -24,6 +25,7 @@ class GoogleDriveDataHandler:
         self.local_data_path = None
         self.drive_data_id = None
         self.folder_id = None
+        self.file_cache = None
         # Remove hardcoded runs folder ID - we'll find it dynamically based on project context
         
     def authenticate(self):
@@ -152,7 +154,10 @@ class GoogleDriveDataHandler:
                 
                 # Download folder contents recursively
                 logger.warning(f"Starting download of folder contents from {data_folder['id']} to {local_path}")
+                file_cache = self._get_file_cache(service)
                 self._download_folder_contents(service, data_folder['id'], local_path)
+                file_cache.prune()
+                logger.info(f"Downloaded {file_cache.downloaded_bytes} bytes from Drive")
                 
                 self.local_data_path = local_path
                 logger.warning(f"Download COMPLETED. Data folder saved to {local_path}")
@@ -179,9 +184,20 @@ class GoogleDriveDataHandler:
             logger.warning(f"Error in download_data_folder outer try block: {e}", exc_info=True)
             return None
             
+    def _get_file_cache(self, service):
+        """Get the local cache of Drive file bytes, shared with the XLE monitor"""
+        if self.file_cache is None or self.file_cache.service is not service:
+            max_mb = self.settings_handler.get_setting("xle_cache_max_mb", 500)
+            self.file_cache = XleFileCache(service, default_cache_dir(self.settings_handler),
+                                           max_bytes=int(max_mb) * 1024 * 1024)
+        return self.file_cache
+    
     def _download_folder_contents(self, service, folder_id, local_path):
         """
         Recursively download contents of a folder.
+        
+        Files are served from the local cache while their md5Checksum is
+        unchanged and downloaded only on a miss.
         """
         try:
             # List all files and folders in current folder
@@ -189,7 +205,7 @@ class GoogleDriveDataHandler:
             query = f"'{folder_id}' in parents and trashed = false"
             results = service.files().list(
                 q=query,
-                fields="files(id, name, mimeType, size)",
+                fields="files(id, name, mimeType, size, md5Checksum)",
                 pageSize=1000
             ).execute()
             
@@ -206,15 +222,12 @@ class GoogleDriveDataHandler:
                     os.makedirs(item_path, exist_ok=True)
                     self._download_folder_contents(service, item['id'], item_path)
                 else:
-                    # Download file
+                    # Download file, or reuse the cached bytes of this version
                     logger.warning(f"Downloading file: {item['name']} (ID: {item['id']}) to {item_path}")
-                    request = service.files().get_media(fileId=item['id'])
-                    
-                    with open(item_path, 'wb') as f:
-                        downloader = MediaIoBaseDownload(f, request)
-                        done = False
-                        while not done:
-                            status, done = downloader.next_chunk()
+                    cached_path = self._get_file_cache(service).get_local_file(item['id'], item.get('md5Checksum'))
+                    if not cached_path:
+                        raise IOError(f"Could not download {item['name']} (ID: {item['id']})")
+                    shutil.copyfile(cached_path, item_path)
                     
                     # Verify file was downloaded correctly
                     if item_path.exists():
@@ -7,6 +7,11 @@ from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
 import io
 import json
 from .google_drive_service import GoogleDriveService
+from .database_transport import (
+    DatabaseTransportCodec, DecompressingWriter, CODEC_RAW, CODEC_MIMETYPES,
+    COMPRESSION_SETTING, COMPRESSION_OFF, resolve_codec,
+    manifest_from_properties, manifest_to_properties
+)
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +52,7 @@ class GoogleDriveDatabaseHandler:
             query = f"name = '{db_name}' and '{self.folder_id}' in parents and trashed = false"
             results = service.files().list(
                 q=query,
-                fields="files(id, name, modifiedTime)",
+                fields="files(id, name, modifiedTime, properties)",
                 spaces='drive'
             ).execute()
             
@@ -100,15 +105,18 @@ class GoogleDriveDatabaseHandler:
                 
             local_path = Path(local_dir) / local_db_name
             
-            # Download the file
+            # Download the file, decompressing straight into the local copy
+            manifest = manifest_from_properties(db_file.get('properties'))
             request = service.files().get_media(fileId=self.drive_db_id)
             
             with open(local_path, 'wb') as f:
-                downloader = MediaIoBaseDownload(f, request)
+                sink = DecompressingWriter(manifest['codec'], f)
+                downloader = MediaIoBaseDownload(sink, request)
                 done = False
                 while not done:
                     status, done = downloader.next_chunk()
                     logger.debug(f"Download progress: {int(status.progress() * 100)}%")
+                sink.verify(manifest)
             
             logger.info(f"Downloaded database to {local_path}")
             self.local_db_path = local_path
@@ -134,6 +142,7 @@ class GoogleDriveDatabaseHandler:
                 return False
             service = self.drive_service.get_service()
                 
+        upload_path = None
         try:
             if not local_path and self.local_db_path:
                 local_path = self.local_db_path
@@ -146,12 +155,20 @@ class GoogleDriveDatabaseHandler:
             db_name = os.path.basename(local_path)
             db_file = self.find_database(db_name)
             
+            # Compress for transport if enabled in settings
+            upload_path, manifest = self._prepare_upload(local_path)
+            media = MediaFileUpload(upload_path, mimetype=CODEC_MIMETYPES[manifest['codec']], resumable=True)
+            
             if db_file:
                 # Update existing file
-                media = MediaFileUpload(local_path, resumable=True)
+                previous = manifest_from_properties(db_file.get('properties'))
+                update_kwargs = {}
+                if manifest['codec'] != CODEC_RAW or previous['codec'] != CODEC_RAW:
+                    update_kwargs['body'] = {'properties': manifest_to_properties(manifest)}
                 service.files().update(
                     fileId=self.drive_db_id,
-                    media_body=media
+                    media_body=media,
+                    **update_kwargs
                 ).execute()
                 logger.info(f"Updated database {db_name} in Google Drive")
             else:
@@ -160,7 +177,8 @@ class GoogleDriveDatabaseHandler:
                     'name': db_name,
                     'parents': [self.folder_id]
                 }
-                media = MediaFileUpload(local_path, resumable=True)
+                if manifest['codec'] != CODEC_RAW:
+                    file_metadata['properties'] = manifest_to_properties(manifest)
                 file = service.files().create(
                     body=file_metadata,
                     media_body=media,
@@ -174,6 +192,18 @@ class GoogleDriveDatabaseHandler:
         except Exception as e:
             logger.error(f"Error uploading database: {e}")
             return False
+        finally:
+            if upload_path and upload_path != local_path and os.path.exists(upload_path):
+                os.remove(upload_path)
+    
+    def _prepare_upload(self, local_path):
+        """Return the file to upload and its transport manifest"""
+        codec = resolve_codec(self.settings_handler.get_setting(COMPRESSION_SETTING, COMPRESSION_OFF))
+        if codec == CODEC_RAW:
+            return local_path, {'codec': CODEC_RAW}
+        transport_path = f"{local_path}.upload.{codec}"
+        manifest = DatabaseTransportCodec(codec).pack(str(local_path), transport_path)
+        return transport_path, manifest
     
     def create_database(self, db_name="CAESER_GENERAL.db", local_dir=None):
         """
@@ -3,11 +3,11 @@ import logging
 from pathlib import Path
 import json
 from datetime import datetime, timedelta
-from googleapiclient.http import MediaIoBaseDownload
-import io
-import tempfile
 from ..handlers.solinst_reader import SolinstReader
 from .google_drive_service import GoogleDriveService
+from .drive_batch_operations import DriveBatchOperations
+from .drive_change_feed import DriveChangeFeed, default_catalog_path
+from .xle_file_cache import XleFileCache, default_cache_dir
 import pandas as pd
 
 logger = logging.getLogger(__name__)
@@ -27,6 +27,9 @@ class GoogleDriveMonitor:
         self.all_folder_id = None
         self.runs_folder_id = None
         self.processed_files = set()  # Keep track of processed files
+        self.drive_ops = None  # Batched Drive calls, folder IDs cached for the session
+        self.change_feed = None  # Persisted catalog of the monitored folder
+        self.xle_cache = None  # Downloaded XLE bytes and parsed headers by file ID + md5
         
     def authenticate(self, client_secret_path=None):
         """Authenticate with Google Drive."""
@@ -45,7 +48,34 @@ class GoogleDriveMonitor:
     def set_folder_id(self, folder_id):
         """Set the folder ID to monitor."""
         self.folder_id = folder_id
-        
+    
+    def _get_drive_ops(self):
+        """Get the batch operations layer for the current Drive service."""
+        service = self.drive_service.get_service()
+        if service is None:
+            return None
+        if self.drive_ops is None or self.drive_ops.service is not service:
+            self.drive_ops = DriveBatchOperations(service)
+            self.change_feed = None
+            self.xle_cache = None
+        return self.drive_ops
+    
+    def _get_change_feed(self):
+        """Get the change feed that tracks which files were already processed."""
+        drive_ops = self._get_drive_ops()
+        if self.change_feed is None and drive_ops is not None:
+            self.change_feed = DriveChangeFeed(drive_ops.service, default_catalog_path(self.settings_handler), drive_ops)
+        return self.change_feed
+    
+    def _get_xle_cache(self):
+        """Get the local cache of downloaded and parsed XLE files."""
+        drive_ops = self._get_drive_ops()
+        if self.xle_cache is None and drive_ops is not None:
+            max_mb = self.settings_handler.get_setting("xle_cache_max_mb", 500) if self.settings_handler else 500
+            self.xle_cache = XleFileCache(drive_ops.service, default_cache_dir(self.settings_handler),
+                                          self.solinst_reader, max_bytes=int(max_mb) * 1024 * 1024)
+        return self.xle_cache
+    
     def initialize_folders(self):
         """Initialize or create the 'all' and 'runs' folders in the main folder."""
         if not self.folder_id:
@@ -58,43 +88,13 @@ class GoogleDriveMonitor:
             return False
             
         try:
-            # Check if 'all' folder exists
-            query = f"name = 'all' and '{self.folder_id}' in parents and trashed = false and mimeType = 'application/vnd.google-apps.folder'"
-            results = service.files().list(q=query, spaces='drive').execute()
-            all_folders = results.get('files', [])
-            
-            if all_folders:
-                self.all_folder_id = all_folders[0]['id']
-                logger.info(f"Found existing 'all' folder: {self.all_folder_id}")
-            else:
-                # Create 'all' folder
-                folder_metadata = {
-                    'name': 'all',
-                    'mimeType': 'application/vnd.google-apps.folder',
-                    'parents': [self.folder_id]
-                }
-                all_folder = service.files().create(body=folder_metadata, fields='id').execute()
-                self.all_folder_id = all_folder.get('id')
-                logger.info(f"Created 'all' folder: {self.all_folder_id}")
-            
-            # Check if 'runs' folder exists
-            query = f"name = 'runs' and '{self.folder_id}' in parents and trashed = false and mimeType = 'application/vnd.google-apps.folder'"
-            results = service.files().list(q=query, spaces='drive').execute()
-            runs_folders = results.get('files', [])
+            # Get or create the 'all' and 'runs' folders (cached after the first check)
+            drive_ops = self._get_drive_ops()
+            self.all_folder_id = drive_ops.resolve_folder(self.folder_id, 'all')
+            logger.info(f"Using 'all' folder: {self.all_folder_id}")
             
-            if runs_folders:
-                self.runs_folder_id = runs_folders[0]['id']
-                logger.info(f"Found existing 'runs' folder: {self.runs_folder_id}")
-            else:
-                # Create 'runs' folder
-                folder_metadata = {
-                    'name': 'runs',
-                    'mimeType': 'application/vnd.google-apps.folder',
-                    'parents': [self.folder_id]
-                }
-                runs_folder = service.files().create(body=folder_metadata, fields='id').execute()
-                self.runs_folder_id = runs_folder.get('id')
-                logger.info(f"Created 'runs' folder: {self.runs_folder_id}")
+            self.runs_folder_id = drive_ops.resolve_folder(self.folder_id, 'runs')
+            logger.info(f"Using 'runs' folder: {self.runs_folder_id}")
                 
             return True
             
@@ -113,11 +113,13 @@ class GoogleDriveMonitor:
             if not self.initialize_folders():
                 return None
             
-            service = self.drive_service.get_service()
+            drive_ops = self._get_drive_ops()
             
-            # Get all XLE files in the main folder
-            query = f"'{self.folder_id}' in parents and trashed = false and fileExtension = 'xle'"
-            files = service.files().list(q=query, fields="files(id, name)").execute().get('files', [])
+            # Get XLE files that are new or changed since they were last processed.
+            # The catalog is persisted, so a restart does not reprocess everything.
+            change_feed = self._get_change_feed()
+            change_feed.sync([self.folder_id])
+            files = change_feed.pending_files(self.folder_id, 'xle')
             
             if not files:
                 logger.info("No new XLE files found")
@@ -126,76 +128,54 @@ class GoogleDriveMonitor:
             logger.info(f"Found {len(files)} XLE files to process")
             
             processed_files_dict = {}
+            xle_cache = self._get_xle_cache()
             
             for file in files:
                 if file['id'] in self.processed_files:
                     continue
                 
-                temp_file = self._download_file(file['id'])
-                if not temp_file:
+                # Header and first/last readings; only the head and tail of
+                # large files are downloaded, and unchanged files are not parsed again
+                summary = xle_cache.get_summary(file['id'], file['md5Checksum'], file.get('size'))
+                if summary is None:
                     continue
                 
-                try:
-                    # Read XLE file metadata and data
-                    df, metadata = self.solinst_reader.read_xle(temp_file)
-                    
-                    # Add debug logging
-                    logger.debug(f"DataFrame columns: {df.columns}")
-                    logger.debug(f"DataFrame first few rows: \n{df.head()}")
-                    
-                    # Get actual start and end dates from the timestamp_utc column
-                    if not df.empty:
-                        actual_start = df['timestamp_utc'].min()
-                        actual_end = df['timestamp_utc'].max()
-                        logger.debug(f"Start: {actual_start}, End: {actual_end}")
-                    else:
-                        logger.warning(f"No data found in file {file['id']}")
-                        continue
-                    
-                    # Generate new file name using actual dates
-                    new_name = self._generate_file_name(metadata, actual_start, actual_end)
-                    
-                    # Move to 'all' folder with new name
-                    service.files().update(
-                        fileId=file['id'],
-                        body={'name': new_name},
-                        addParents=self.all_folder_id,
-                        removeParents=self.folder_id,
-                        fields='id, parents'
-                    ).execute()
-                    
-                    # Process run folders using actual end date
-                    start_month = actual_end.strftime("%Y_%m")
-                    
-                    folder_id = self.create_run_folder(start_month)  # This will get or create a single folder
-                    if folder_id:
-                        # Copy file to the folder
-                        logger.info(f"Copying {new_name} to run folder {folder_id}")
-                        service.files().copy(
-                            fileId=file['id'],
-                            body={
-                                'name': new_name,
-                                'parents': [folder_id]
-                            }
-                        ).execute()
-                    
-                    # Track processed file
-                    location = metadata.location.strip().upper()
-                    if location not in processed_files_dict:
-                        processed_files_dict[location] = []
-                    
-                    processed_files_dict[location].append({
-                        'file_name': new_name,
-                        'start_date': actual_start,
-                        'end_date': actual_end,
-                        'file_id': file['id']
-                    })
-                    
-                    self.processed_files.add(file['id'])
-                    
-                finally:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
+                # Get actual start and end dates (UTC) from the readings
+                if summary.has_data:
+                    actual_start = summary.start_utc
+                    actual_end = summary.end_utc
+                    logger.debug(f"Start: {actual_start}, End: {actual_end}")
+                else:
+                    logger.warning(f"No data found in file {file['id']}")
+                    change_feed.mark_processed(file['id'], file['md5Checksum'])
+                    continue
+                
+                metadata = summary.metadata
+                
+                # Generate new file name using actual dates
+                new_name = self._generate_file_name(metadata, actual_start, actual_end)
+                
+                # Queue the move to 'all' folder with new name
+                drive_ops.move(
+                    file['id'], self.all_folder_id, self.folder_id, new_name=new_name,
+                    callback=self._processed_callback(
+                        processed_files_dict, file, new_name, metadata, actual_start, actual_end)
+                )
+                
+                # Process run folders using actual end date
+                start_month = actual_end.strftime("%Y_%m")
+                
+                folder_id = self.create_run_folder(start_month)  # Resolved once per month
+                if folder_id:
+                    # Queue the copy to the run folder
+                    logger.info(f"Copying {new_name} to run folder {folder_id}")
+                    drive_ops.copy(file['id'], {'name': new_name, 'parents': [folder_id]})
+            
+            # Send the queued renames, moves and copies in batches
+            drive_ops.flush()
+            logger.info(f"XLE check used {drive_ops.stats()}, "
+                        f"{xle_cache.downloaded_bytes / 1024:.0f} KB of XLE data downloaded")
+            xle_cache.prune()
                     
             return processed_files_dict
             
@@ -203,30 +183,27 @@ class GoogleDriveMonitor:
             logger.error(f"Error checking for new files: {e}")
             return None
     
-    def _download_file(self, file_id):
-        """Download a file from Google Drive to a temporary location."""
-        service = self.drive_service.get_service()
-        if not service:
-            return None
-            
-        try:
-            # Create a temporary file
-            fd, temp_path = tempfile.mkstemp(suffix='.xle')
-            os.close(fd)
-            
-            # Download the file
-            request = service.files().get_media(fileId=file_id)
-            with open(temp_path, 'wb') as f:
-                downloader = MediaIoBaseDownload(f, request)
-                done = False
-                while not done:
-                    status, done = downloader.next_chunk()
-            
-            return temp_path
-            
-        except Exception as e:
-            logger.error(f"Error downloading file: {e}")
-            return None
+    def _processed_callback(self, processed_files_dict, file, new_name, metadata, actual_start, actual_end):
+        """Build the batch callback that records a file once its move succeeded."""
+        file_id = file['id']
+        
+        def on_moved(response, exception):
+            if exception is not None:
+                logger.error(f"Error moving {new_name} to 'all' folder: {exception}")
+                return
+            
+            # Track processed file
+            location = metadata.location.strip().upper()
+            processed_files_dict.setdefault(location, []).append({
+                'file_name': new_name,
+                'start_date': actual_start,
+                'end_date': actual_end,
+                'file_id': file_id,
+                'md5_checksum': file.get('md5Checksum')
+            })
+            self.processed_files.add(file_id)
+            self.change_feed.mark_processed(file_id, file.get('md5Checksum'))
+        return on_moved
     
     def _generate_file_name(self, metadata, actual_start, actual_end):
         """Generate a standardized file name based on metadata and actual data dates."""
@@ -253,41 +230,9 @@ class GoogleDriveMonitor:
     def create_run_folder(self, folder_name):
         """Get or create a folder in the runs directory"""
         try:
-            # Look for folder in runs folder, explicitly check not trashed
-            query = f"'{self.runs_folder_id}' in parents and name = '{folder_name}' and trashed = false"
-            logger.debug(f"Looking for active folder '{folder_name}' in runs folder")
-            
-            results = self.drive_service.get_service().files().list(
-                q=query, 
-                spaces='drive',
-                fields='files(id, name, trashed)',
-                pageSize=1
-            ).execute()
-            
-            if results.get('files'):
-                folder = results['files'][0]
-                if folder.get('trashed', False):
-                    logger.warning(f"Found folder '{folder_name}' but it's in trash. Creating new one.")
-                    # Fall through to create new folder
-                else:
-                    logger.info(f"Using existing folder: {folder_name}")
-                    return folder['id']
-            
-            # Create new folder in runs folder
-            file_metadata = {
-                'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder',
-                'parents': [self.runs_folder_id]
-            }
-            
-            folder = self.drive_service.get_service().files().create(
-                body=file_metadata, 
-                fields='id'
-            ).execute()
-            
-            logger.info(f"Created new folder: {folder_name}")
-            return folder['id']
+            # Trashed folders are excluded, and the result is cached for the session
+            return self._get_drive_ops().resolve_folder(self.runs_folder_id, folder_name)
             
         except Exception as e:
             logger.error(f"Error with run folder '{folder_name}': {e}")
-            return None 
\ No newline at end of file
+            return None
@@ -2,8 +2,6 @@ import os
 import logging
 import json
 from pathlib import Path
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 
 logger = logging.getLogger(__name__)
 
@@ -101,6 +99,10 @@ class GoogleDriveService:
                 self.authenticated = False
                 return False
             
+            # The Google client libraries are slow to import; load them on first authentication
+            from google.oauth2 import service_account
+            from googleapiclient.discovery import build
+            
             # Load service account credentials
             self.credentials = service_account.Credentials.from_service_account_file(
                 service_account_path,
@@ -135,6 +137,21 @@ class GoogleDriveService:
             if not self.authenticate():
                 return None
         return self.service
+    
+    def build_service(self):
+        """
+        Build a separate Drive service with its own HTTP connection.
+        
+        A service and its httplib2.Http must not be shared between threads, so
+        background threads (e.g. the cloud lock heartbeat) use their own.
+        
+        Returns:
+            A new service, or None if not authenticated
+        """
+        if not self.get_service():
+            return None
+        from googleapiclient.discovery import build
+        return build('drive', 'v3', credentials=self.credentials)
         
     def get_service_account_email(self):
         """Get the service account email address"""
@@ -0,0 +1,437 @@
+"""
+Keyset Table Model
+
+Virtual, lazily fetched view of a database table for the table editor.
+
+``KeysetPager`` pages through a table with keyset (seek) pagination instead
+of ``LIMIT/OFFSET``: every page continues from the sort value and rowid of
+the last row already loaded, so reading page 10,000 costs the same index
+seek as reading page 1. Sorting is only offered on columns an index can
+deliver in order (after any equality filter, such as the well number), and
+the text filter is pushed down to SQL as a ``LIKE`` on every column.
+
+NULLs sort first ascending and last descending in SQLite, and a range
+condition never matches them, so a sorted scan runs in two phases (NULL
+rows and non-NULL rows), each of which is a plain index range.
+
+``KeysetTableModel`` exposes the pager to a QTableView through Qt's
+``canFetchMore``/``fetchMore`` protocol, keeps edits pending until
+``commit_edits`` writes them in one transaction, and only ever holds the
+raw row tuples it has fetched - no per-cell item objects.
+"""
+
+import logging
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QColor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+ROWID = 'rowid'
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name for use in SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def escape_like(text: str) -> str:
+    """Escape LIKE wildcards so the filter text matches literally"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class KeysetPager:
+    """Seek-paginated reads and batched writes against one table"""
+
+    def __init__(self, db_path: str, table: str, page_size: int = DEFAULT_PAGE_SIZE,
+                 equality_filters: Optional[Dict[str, Any]] = None):
+        self.db_path = str(db_path)
+        self.table = table
+        self.page_size = page_size
+        self.conn = sqlite3.connect(self.db_path)
+
+        info = self.conn.execute(f"PRAGMA table_info({quote_identifier(table)})").fetchall()
+        self.columns = [row[1] for row in info]
+        # An INTEGER PRIMARY KEY column is an alias for the rowid
+        pk_columns = [row for row in info if row[5]]
+        self.rowid_alias = (pk_columns[0][1] if len(pk_columns) == 1
+                            and pk_columns[0][2].upper() == 'INTEGER' else None)
+
+        self.equality_filters = dict(equality_filters or {})
+        self.text_filter = ''
+        self.sort_column: Optional[str] = None
+        self.descending = False
+        self.sortable_columns = self._find_sortable_columns()
+        self.reset()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # ------------------------------------------------------------------
+    # Query state
+    # ------------------------------------------------------------------
+
+    def _find_sortable_columns(self) -> List[str]:
+        """Columns an index returns in order once the equality filters are applied"""
+        sortable = [self.rowid_alias] if self.rowid_alias else []
+        bound = set(self.equality_filters)
+        for index in self.conn.execute(f"PRAGMA index_list({quote_identifier(self.table)})").fetchall():
+            if len(index) > 4 and index[4]:
+                continue  # Partial indexes do not cover every row
+            index_columns = [row[2] for row in
+                             self.conn.execute(f"PRAGMA index_info({quote_identifier(index[1])})").fetchall()]
+            for column in index_columns:
+                if column is None:
+                    break  # Expression index
+                if column in bound:
+                    continue
+                if column not in sortable:
+                    sortable.append(column)
+                break
+        return sortable
+
+    def is_sortable(self, column: Optional[str]) -> bool:
+        return column is None or column in self.sortable_columns
+
+    def set_sort(self, column: Optional[str], descending: bool = False) -> bool:
+        """Sort on an indexed column (None sorts by rowid); returns False if not indexed"""
+        if not self.is_sortable(column):
+            return False
+        if column == self.rowid_alias:
+            column = None
+        self.sort_column = column
+        self.descending = descending
+        self.reset()
+        return True
+
+    def set_text_filter(self, text: str):
+        self.text_filter = text.strip()
+        self.reset()
+
+    def reset(self):
+        """Restart paging from the first row"""
+        self._phase = 0
+        self._last: Optional[Tuple[Any, int]] = None
+        self.exhausted = False
+
+    @property
+    def has_more(self) -> bool:
+        return not self.exhausted
+
+    def _base_where(self) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        for column, value in self.equality_filters.items():
+            clauses.append(f"{quote_identifier(column)} = ?")
+            params.append(value)
+        if self.text_filter:
+            pattern = f"%{escape_like(self.text_filter)}%"
+            clauses.append("(" + " OR ".join(f"{quote_identifier(c)} LIKE ? ESCAPE '\\'"
+                                             for c in self.columns) + ")")
+            params.extend([pattern] * len(self.columns))
+        return clauses, params
+
+    def _phases(self) -> List[str]:
+        """Scan phases in display order: 'rows' for a rowid sort, else 'null'/'value'"""
+        if self.sort_column is None:
+            return ['rows']
+        return ['value', 'null'] if self.descending else ['null', 'value']
+
+    def _phase_query(self, phase: str, last: Optional[Tuple[Any, int]], limit: int) -> Tuple[str, List[Any]]:
+        clauses, params = self._base_where()
+        direction = 'DESC' if self.descending else 'ASC'
+        after = '<' if self.descending else '>'
+        if phase == 'rows':
+            order = f"rowid {direction}"
+            if last is not None:
+                clauses.append(f"rowid {after} ?")
+                params.append(last[1])
+        else:
+            column = quote_identifier(self.sort_column)
+            if phase == 'null':
+                clauses.append(f"{column} IS NULL")
+                order = f"rowid {direction}"
+                if last is not None:
+                    clauses.append(f"rowid {after} ?")
+                    params.append(last[1])
+            else:
+                order = f"{column} {direction}, rowid {direction}"
+                if last is None:
+                    clauses.append(f"{column} IS NOT NULL")
+                else:
+                    # The bare range lets the index seek; the OR only breaks ties
+                    clauses.append(f"{column} {after}= ? AND ({column} {after} ? OR rowid {after} ?)")
+                    params.extend([last[0], last[0], last[1]])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        select = ', '.join(quote_identifier(c) for c in self.columns)
+        sql = f"SELECT rowid, {select} FROM {quote_identifier(self.table)} {where} ORDER BY {order} LIMIT ?"
+        return sql, params + [limit]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def next_page(self, limit: Optional[int] = None) -> List[tuple]:
+        """Fetch the next rows as (rowid, col1, col2, ...) tuples"""
+        limit = limit or self.page_size
+        rows: List[tuple] = []
+        phases = self._phases()
+        sort_position = self.columns.index(self.sort_column) + 1 if self.sort_column else None
+        while len(rows) < limit and self._phase < len(phases):
+            sql, params = self._phase_query(phases[self._phase], self._last, limit - len(rows))
+            page = self.conn.execute(sql, params).fetchall()
+            rows.extend(page)
+            if page:
+                last = page[-1]
+                self._last = (last[sort_position] if sort_position else None, last[0])
+            if len(rows) < limit:
+                self._phase += 1
+                self._last = None
+        if self._phase >= len(phases):
+            self.exhausted = True
+        return rows
+
+    def iter_rows(self, batch_size: Optional[int] = None) -> Iterator[tuple]:
+        """Stream every row matching the current sort and filters"""
+        self.reset()
+        while self.has_more:
+            yield from self.next_page(batch_size)
+
+    def count(self) -> int:
+        clauses, params = self._base_where()
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self.conn.execute(f"SELECT COUNT(*) FROM {quote_identifier(self.table)} {where}", params).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def update_rows(self, edits: Dict[int, Dict[str, Any]]) -> int:
+        """
+        Write edited cells in one transaction.
+
+        Args:
+            edits: {rowid: {column: value}}; rows sharing the same set of
+                edited columns are written with a single executemany
+
+        Returns:
+            Number of rows updated
+        """
+        grouped: Dict[Tuple[str, ...], List[tuple]] = {}
+        for rowid, changes in edits.items():
+            columns = tuple(sorted(changes))
+            grouped.setdefault(columns, []).append(tuple(changes[c] for c in columns) + (rowid,))
+
+        table = quote_identifier(self.table)
+        updated = 0
+        with self.conn:
+            for columns, values in grouped.items():
+                assignments = ', '.join(f"{quote_identifier(c)} = ?" for c in columns)
+                cursor = self.conn.executemany(f"UPDATE {table} SET {assignments} WHERE rowid = ?", values)
+                updated += cursor.rowcount
+        return updated
+
+    def delete_rows(self, rowids: List[int]) -> int:
+        with self.conn:
+            cursor = self.conn.executemany(f"DELETE FROM {quote_identifier(self.table)} WHERE rowid = ?",
+                                           [(rowid,) for rowid in rowids])
+        return cursor.rowcount
+
+
+class KeysetTableModel(QAbstractTableModel):
+    """Lazily fetched, editable table model backed by a KeysetPager"""
+
+    rows_loaded = pyqtSignal(int)       # Number of rows fetched so far
+    sort_rejected = pyqtSignal(str)     # Column that has no index to sort on
+    edits_changed = pyqtSignal(int)     # Number of rows with pending edits
+
+    PENDING_COLOR = QColor('#FFF4C0')
+
+    def __init__(self, pager: KeysetPager, parent=None):
+        super().__init__(parent)
+        self.pager = pager
+        self._rows: List[list] = []
+        self._pending: Dict[int, Dict[int, Any]] = {}  # {rowid: {column index: value}}
+        self.reload()
+
+    # ------------------------------------------------------------------
+    # Qt model interface
+    # ------------------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.pager.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.pager.columns[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        pending = self._pending.get(row[0], {})
+        column = index.column()
+        edited = column in pending
+        value = pending[column] if edited else row[column + 1]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return '' if value is None else str(value)
+        if role == Qt.BackgroundRole:
+            if edited:
+                return self.PENDING_COLOR
+            if value is None:
+                return QColor(Qt.lightGray)
+        if role == Qt.ForegroundRole and value is None:
+            return QColor(Qt.darkGray)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        self.set_value(index.row(), index.column(), value)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole, Qt.BackgroundRole])
+        return True
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.pager.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.pager.has_more:
+            return
+        rows = self.pager.next_page()
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(list(row) for row in rows)
+            self.endInsertRows()
+        self.rows_loaded.emit(len(self._rows))
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        name = self.pager.columns[column]
+        descending = order == Qt.DescendingOrder
+        current = self.pager.sort_column or self.pager.rowid_alias
+        if name == current and descending == self.pager.descending:
+            return
+        if not self.pager.set_sort(name, descending):
+            self.sort_rejected.emit(name)
+            return
+        self.reload()
+
+    # ------------------------------------------------------------------
+    # Loading and filtering
+    # ------------------------------------------------------------------
+
+    def reload(self):
+        """Drop fetched rows and fetch the first page again; pending edits are kept"""
+        self.beginResetModel()
+        self.pager.reset()
+        self._rows = [list(row) for row in self.pager.next_page()]
+        self.endResetModel()
+        self.rows_loaded.emit(len(self._rows))
+
+    def set_text_filter(self, text: str):
+        self.pager.set_text_filter(text)
+        self.reload()
+
+    def sort_state(self) -> Tuple[int, bool]:
+        """Current sort as (column index, descending)"""
+        name = self.pager.sort_column or self.pager.rowid_alias
+        return (self.pager.columns.index(name) if name in self.pager.columns else -1), self.pager.descending
+
+    def row_values(self, row: int) -> List[Any]:
+        """Displayed values of a fetched row, including pending edits"""
+        values = list(self._rows[row][1:])
+        for column, value in self._pending.get(self._rows[row][0], {}).items():
+            values[column] = value
+        return values
+
+    def iter_all_rows(self) -> Iterator[List[Any]]:
+        """Every row matching the filter, with pending edits applied; fetched rows are not disturbed"""
+        export = KeysetPager(self.pager.db_path, self.pager.table, self.pager.page_size * 10,
+                             self.pager.equality_filters)
+        try:
+            export.text_filter = self.pager.text_filter
+            export.set_sort(self.pager.sort_column, self.pager.descending)
+            for row in export.iter_rows():
+                values = list(row[1:])
+                for column, value in self._pending.get(row[0], {}).items():
+                    values[column] = value
+                yield values
+        finally:
+            export.close()
+
+    # ------------------------------------------------------------------
+    # Edits
+    # ------------------------------------------------------------------
+
+    def set_value(self, row: int, column: int, value):
+        """Stage an edit; an empty string stages NULL"""
+        if value == '':
+            value = None
+        rowid = self._rows[row][0]
+        original = self._rows[row][column + 1]
+        pending = self._pending.setdefault(rowid, {})
+        if value == original or (value is not None and original is not None and str(value) == str(original)):
+            pending.pop(column, None)
+            if not pending:
+                del self._pending[rowid]
+        else:
+            pending[column] = value
+        self.edits_changed.emit(len(self._pending))
+
+    @property
+    def pending_edit_count(self) -> int:
+        return len(self._pending)
+
+    def discard_edits(self):
+        self._pending.clear()
+        self.edits_changed.emit(0)
+        if self._rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, self.columnCount() - 1))
+
+    def commit_edits(self) -> int:
+        """
+        Write all pending edits in one transaction.
+
+        Values are passed through as entered; SQLite column affinity turns
+        numeric text into INTEGER/REAL for numeric columns.
+
+        Returns:
+            Number of rows updated
+        """
+        if not self._pending:
+            return 0
+        columns = self.pager.columns
+        edits = {rowid: {columns[c]: v for c, v in changes.items()} for rowid, changes in self._pending.items()}
+        updated = self.pager.update_rows(edits)
+
+        # Fold the written values into the fetched rows
+        for row in self._rows:
+            for column, value in self._pending.get(row[0], {}).items():
+                row[column + 1] = value
+        self._pending.clear()
+        self.edits_changed.emit(0)
+        logger.info(f"Committed edits to {updated} rows of {self.pager.table}")
+        return updated
+
+    def delete_row(self, row: int) -> bool:
+        rowid = self._rows[row][0]
+        if not self.pager.delete_rows([rowid]):
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+        self._pending.pop(rowid, None)
+        self.edits_changed.emit(len(self._pending))
+        return True
@@ -0,0 +1,217 @@
+"""
+Level Alignment
+
+Insertion level (dh) determination for transducer segments against the
+manual measurements and existing water levels of a well, as used by
+``WaterLevelProcessor.determine_insertion_level``.
+
+``WellReferenceContext`` is loaded once per well for a whole batch of files.
+It converts the manual readings and existing levels to sorted int64
+nanosecond arrays, so each lookup is a ``searchsorted`` (an as-of join)
+instead of filtering and re-sorting DataFrames per file:
+
+* the manual reading used for a segment is the one closest to the segment
+  end, preferring readings inside the segment, within one hour either side;
+* the transducer reading paired with it is the nearest one in time;
+* otherwise the latest known level before the segment start is carried
+  over ("predicted"), where processed segments of the batch are added to
+  the context as they are aligned, so later files continue from earlier
+  ones;
+* otherwise top of casing minus 30 ft is used ("default_level").
+
+Ties resolve to the earliest row, as ``idxmin``/``idxmax`` did.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANUAL_WINDOW = pd.Timedelta(hours=1)  # Manual readings this close to a segment can set its level
+DEFAULT_DEPTH_BELOW_TOC = 30           # ft, level used when there is nothing to align to
+
+_NAT = np.iinfo(np.int64).min
+
+
+def _to_ns(values) -> np.ndarray:
+    """Timestamps as int64 nanoseconds; NaT becomes the int64 minimum"""
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def _ns(timestamp) -> int:
+    return pd.Timestamp(timestamp).as_unit('ns').value
+
+
+def nearest_position(times_ns: np.ndarray, target_ns: int) -> int:
+    """Position of the reading closest to target (first on ties, NaT never chosen)"""
+    valid = times_ns != _NAT
+    distances = np.abs(times_ns.astype(np.float64) - float(target_ns))
+    distances[~valid] = np.inf
+    return int(np.argmin(distances))
+
+
+class _SortedLevels:
+    """Levels sorted by time with their positions in the source frame"""
+
+    def __init__(self, times, levels):
+        times_ns = _to_ns(times)
+        valid = np.flatnonzero(times_ns != _NAT)
+        order = valid[np.argsort(times_ns[valid], kind='stable')]
+        self.times = times_ns[order]
+        self.positions = order
+        self.source_times = pd.Series(times).reset_index(drop=True)
+        self.source_levels = pd.Series(levels).reset_index(drop=True)
+
+    def latest_before(self, start_ns: int) -> Optional[Tuple[int, int]]:
+        """(time, source position) of the latest row strictly before start"""
+        idx = np.searchsorted(self.times, start_ns, side='left') - 1
+        if idx < 0:
+            return None
+        first = np.searchsorted(self.times, self.times[idx], side='left')
+        return int(self.times[idx]), int(self.positions[first])
+
+
+class WellReferenceContext:
+    """Manual readings and known levels of one well, shared by all files of a batch"""
+
+    def __init__(self, manual_readings: Optional[pd.DataFrame] = None,
+                 existing_data: Optional[pd.DataFrame] = None):
+        self.manual_dates = pd.Series(dtype='datetime64[ns]')
+        self.manual_levels = pd.Series(dtype=float)
+        if manual_readings is not None and not manual_readings.empty:
+            self.manual_dates = pd.to_datetime(manual_readings['measurement_date_utc']).reset_index(drop=True)
+            self.manual_levels = manual_readings['water_level'].reset_index(drop=True)
+        self._manual_ns = _to_ns(self.manual_dates) if len(self.manual_dates) else np.array([], dtype=np.int64)
+
+        self._blocks: List[_SortedLevels] = []
+        self.existing_count = 0
+        self.set_levels(existing_data)
+
+    @property
+    def has_levels(self) -> bool:
+        return bool(self._blocks)
+
+    def set_levels(self, existing_data: Optional[pd.DataFrame]):
+        """Replace the known levels, keeping the indexed manual readings"""
+        self._blocks = []
+        self.existing_count = 0
+        if existing_data is not None and not existing_data.empty:
+            self.existing_count = len(existing_data)
+            self._blocks.append(_SortedLevels(existing_data['timestamp_utc'], existing_data['water_level']))
+
+    def add_levels(self, df: pd.DataFrame):
+        """Make an aligned segment available as reference for the following segments"""
+        if not df.empty and 'water_level' in df.columns:
+            self._blocks.append(_SortedLevels(df['timestamp_utc'], df['water_level']))
+
+    def select_manual(self, start, end) -> Optional[Tuple[pd.Timestamp, float, bool]]:
+        """(time, level, inside segment) of the manual reading that sets the segment level"""
+        if not len(self._manual_ns):
+            return None
+        start_ns, end_ns = _ns(start), _ns(end)
+        times = self._manual_ns
+        valid = times != _NAT
+        in_window = valid & (times >= _ns(start - MANUAL_WINDOW)) & (times <= _ns(end + MANUAL_WINDOW))
+        if not in_window.any():
+            return None
+
+        in_segment = in_window & (times >= start_ns) & (times <= end_ns)
+        candidates = in_segment if in_segment.any() else in_window
+        distances = np.abs(times.astype(np.float64) - float(end_ns))
+        distances[~candidates] = np.inf
+        pos = int(np.argmin(distances))
+        return self.manual_dates.iloc[pos], self.manual_levels.iloc[pos], bool(in_segment.any())
+
+    def manual_window_count(self, start, end) -> int:
+        if not len(self._manual_ns):
+            return 0
+        times = self._manual_ns
+        return int(((times != _NAT) & (times >= _ns(start - MANUAL_WINDOW))
+                    & (times <= _ns(end + MANUAL_WINDOW))).sum())
+
+    def latest_before(self, start) -> Optional[Tuple[pd.Timestamp, float]]:
+        """(time, level) of the latest known level strictly before start"""
+        start_ns = _ns(start)
+        best = None
+        for block in self._blocks:
+            found = block.latest_before(start_ns)
+            if found is not None and (best is None or found[0] > best[0]):
+                best = (found[0], block, found[1])
+        if best is None:
+            return None
+        _, block, pos = best
+        return block.source_times.iloc[pos], block.source_levels.iloc[pos]
+
+
+def insertion_level(df: pd.DataFrame, well_info: Dict, context: WellReferenceContext,
+                    progress_dialog=None) -> Dict:
+    """dh for one segment; see determine_insertion_level for the returned dict"""
+    new_start = pd.to_datetime(df['timestamp_utc'].iloc[0])
+    new_end = pd.to_datetime(df['timestamp_utc'].iloc[-1])
+    logger.debug(f"Determining dh for data segment from {new_start} to {new_end}")
+
+    # Case 1: manual reading within the data range (±1 hour)
+    selected = context.select_manual(new_start, new_end)
+    if selected is not None:
+        selected_time, selected_level, in_segment = selected
+        logger.debug(f"Found {context.manual_window_count(new_start, new_end)} manual readings in time window")
+        if progress_dialog:
+            if in_segment:
+                progress_dialog.log_message(f"Found manual reading within segment, closest to end: {selected_time}")
+            else:
+                progress_dialog.log_message(f"Using closest manual reading to segment end: {selected_time}")
+
+        # Closest transducer reading to the selected manual reading
+        pos = nearest_position(_to_ns(df['timestamp_utc']), _ns(selected_time))
+        closest_pressure = df['water_pressure'].iloc[pos]
+        closest_time = df['timestamp_utc'].iloc[pos]
+        dh = selected_level - closest_pressure
+
+        if progress_dialog:
+            progress_dialog.log_message(
+                f"Manual reading: {selected_level:.2f} ft at {selected_time}, "
+                f"closest pressure: {closest_pressure:.2f} ft at {closest_time}, dh: {dh:.2f} ft"
+            )
+        return {
+            'dh': float(dh),
+            'method': 'manual_readings',
+            'method_details': f"Single manual reading at {selected_time} (dh={dh:.2f})"
+        }
+
+    start_pressure = df.loc[df['timestamp_utc'] == new_start, 'water_pressure'].iloc[0]
+
+    # Case 2: latest known level before the segment
+    if context.has_levels:
+        if progress_dialog and context.existing_count:
+            progress_dialog.log_message(f"Found {context.existing_count} existing readings to check")
+        latest = context.latest_before(new_start)
+        if latest is not None:
+            latest_time, latest_level = latest
+            time_gap = (new_start - latest_time).total_seconds() / 3600
+            dh = latest_level - start_pressure
+
+            if progress_dialog:
+                progress_dialog.log_message(f"Using existing level {latest_level:.2f} ft from {latest_time}")
+                progress_dialog.log_message(f"Time gap: {time_gap:.2f} hours, Calculated dh: {dh:.2f} ft")
+            return {
+                'dh': float(dh),
+                'method': 'predicted',
+                'method_details': f"Predicted from existing data with {time_gap:.2f}h gap"
+            }
+
+    # Case 3: default fallback using TOC-30
+    default_level = float(well_info['top_of_casing']) - DEFAULT_DEPTH_BELOW_TOC
+    dh = default_level - start_pressure
+
+    if progress_dialog:
+        progress_dialog.log_message(f"Using default level (TOC-30): {default_level:.2f} ft")
+        progress_dialog.log_message(f"Calculated dh: {dh:.2f} ft")
+    return {
+        'dh': float(dh),
+        'method': 'default_level',
+        'method_details': f"Default level from top of casing ({well_info['top_of_casing']})"
+    }
+
@@ -0,0 +1,351 @@
+"""
+Live Map
+
+A Leaflet map page that is loaded into a QWebEngineView once and then kept
+up to date through QWebChannel, instead of saving a complete folium HTML
+file and reloading the view on every refresh.
+
+* ``well_feature`` builds the compact GeoJSON point feature for one well:
+  rounded coordinates plus the pin colors, label and popup HTML.
+* ``GeoJsonDiffer`` remembers the features currently shown and turns a new
+  feature list into an add / update / remove diff, so switching a run or a
+  database only sends the wells that changed.
+* ``LiveMapController`` owns the page and the channel. Diffs made before the
+  page has finished loading are folded into a single snapshot that is sent
+  once the page reports ready (also after a reload of the render process).
+  Markers are clustered with Leaflet.markercluster, so large well sets stay
+  responsive.
+* ``FileCache`` keeps values derived from files (run JSON, well coordinates)
+  until one of the files changes on disk.
+"""
+
+import html
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from PyQt5.QtCore import QFile, QIODevice, QObject, QUrl, pyqtSignal, pyqtSlot
+from PyQt5.QtWebChannel import QWebChannel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CENTER = (35.1495, -90.0490)  # Memphis
+DEFAULT_ZOOM = 10
+SINGLE_WELL_ZOOM = 13
+CLUSTER_UNTIL_ZOOM = 15  # Markers are shown individually from this zoom level on
+COORDINATE_DIGITS = 6    # About 0.1 m, plenty for well locations
+
+LEAFLET_CDN = "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist"
+MARKERCLUSTER_CDN = "https://cdn.jsdelivr.net/npm/leaflet.markercluster@1.5.3/dist"
+
+_MAP_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<link rel="stylesheet" href="%(leaflet)s/leaflet.css">
+<link rel="stylesheet" href="%(cluster)s/MarkerCluster.css">
+<link rel="stylesheet" href="%(cluster)s/MarkerCluster.Default.css">
+<script src="%(leaflet)s/leaflet.js"></script>
+<script src="%(cluster)s/leaflet.markercluster.js"></script>
+<script>%(qwebchannel)s</script>
+<style>
+html, body, #map { height: 100%%; width: 100%%; margin: 0; padding: 0; }
+.live-pin { background: none; border: none; }
+.live-pin-label {
+    position: absolute; width: 100%%; text-align: center; top: 40px;
+    font: bold 12px Arial, sans-serif; color: black; white-space: nowrap;
+    text-shadow: -1px -1px 0 white, 1px -1px 0 white, -1px 1px 0 white, 1px 1px 0 white;
+}
+</style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+var defaultView = {center: [%(lat)f, %(lon)f], zoom: %(zoom)d};
+var map = L.map('map', {preferCanvas: true}).setView(defaultView.center, defaultView.zoom);
+L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+    maxZoom: 19, attribution: '&copy; OpenStreetMap contributors'
+}).addTo(map);
+var markers = L.markerClusterGroup({
+    chunkedLoading: true, showCoverageOnHover: false, disableClusteringAtZoom: %(cluster_zoom)d
+});
+map.addLayer(markers);
+var layers = {};
+var bridge = null;
+
+function selectWell(wellNumber) {
+    if (bridge) { bridge.wellSelected(String(wellNumber)); }
+}
+
+function pinIcon(props) {
+    var colors = props.colors || ['#38aadd'];
+    var label = props.label ? '<div class="live-pin-label">' + props.label + '</div>' : '';
+    var svg;
+    if (colors.length > 1) {
+        // Split pin: left and right halves show two independent statuses
+        svg = '<svg width="40" height="40" viewBox="0 0 40 40">' +
+              '<path d="M20 38 L2 2 L20 2 Z" fill="' + colors[0] + '" stroke="black" stroke-width="1"/>' +
+              '<path d="M20 38 L38 2 L20 2 Z" fill="' + colors[1] + '" stroke="black" stroke-width="1"/>' +
+              '<line x1="20" y1="2" x2="20" y2="38" stroke="black" stroke-width="0.5"/></svg>';
+    } else {
+        svg = '<svg width="40" height="40" viewBox="0 0 40 40">' +
+              '<path d="M20 39 C20 39 6 24 6 15 C6 7 12.5 1 20 1 C27.5 1 34 7 34 15 C34 24 20 39 20 39 Z" ' +
+              'fill="' + colors[0] + '" stroke="#333" stroke-width="1"/>' +
+              '<circle cx="20" cy="15" r="5" fill="white"/></svg>';
+    }
+    return L.divIcon({
+        className: 'live-pin', html: '<div style="position: relative;">' + svg + label + '</div>',
+        iconSize: [40, 40], iconAnchor: [20, 38], popupAnchor: [0, -30]
+    });
+}
+
+function toLatLng(feature) {
+    return L.latLng(feature.geometry.coordinates[1], feature.geometry.coordinates[0]);
+}
+
+function createMarker(feature) {
+    var marker = L.marker(toLatLng(feature), {icon: pinIcon(feature.properties)});
+    if (feature.properties.popup) {
+        marker.bindPopup(feature.properties.popup, {maxWidth: 350});
+    }
+    marker.feature = feature;
+    return marker;
+}
+
+function fitToMarkers() {
+    var ids = Object.keys(layers);
+    if (ids.length === 0) {
+        map.setView(defaultView.center, defaultView.zoom);
+    } else if (ids.length === 1) {
+        map.setView(layers[ids[0]].getLatLng(), %(single_zoom)d);
+    } else {
+        map.fitBounds(markers.getBounds(), {padding: [20, 20]});
+    }
+}
+
+function applyDiff(message) {
+    var diff = JSON.parse(message);
+    var removed = [], added = [];
+    if (diff.reset) {
+        markers.clearLayers();
+        layers = {};
+    }
+    (diff.remove || []).forEach(function (id) {
+        if (layers[id]) { removed.push(layers[id]); delete layers[id]; }
+    });
+    (diff.update || []).forEach(function (feature) {
+        var marker = layers[feature.id];
+        if (marker && marker.getLatLng().equals(toLatLng(feature))) {
+            // Same place: restyle in place so an open popup stays open
+            marker.feature = feature;
+            marker.setIcon(pinIcon(feature.properties));
+            if (marker.getPopup()) { marker.setPopupContent(feature.properties.popup || ''); }
+            else if (feature.properties.popup) { marker.bindPopup(feature.properties.popup, {maxWidth: 350}); }
+        } else {
+            if (marker) { removed.push(marker); }
+            layers[feature.id] = createMarker(feature);
+            added.push(layers[feature.id]);
+        }
+    });
+    (diff.add || []).forEach(function (feature) {
+        if (layers[feature.id]) { removed.push(layers[feature.id]); }
+        layers[feature.id] = createMarker(feature);
+        added.push(layers[feature.id]);
+    });
+    if (removed.length) { markers.removeLayers(removed); }
+    if (added.length) { markers.addLayers(added); }
+    if (diff.fit) { fitToMarkers(); }
+}
+
+new QWebChannel(qt.webChannelTransport, function (channel) {
+    bridge = channel.objects.mapBridge;
+    bridge.diffReady.connect(applyDiff);
+    bridge.pageReady();
+});
+</script>
+</body>
+</html>
+"""
+
+
+def _qwebchannel_js() -> str:
+    """qwebchannel.js from the Qt resources, inlined so the page needs no qrc access"""
+    qwebchannel_js = QFile(':/qtwebchannel/qwebchannel.js')
+    if not qwebchannel_js.open(QIODevice.ReadOnly):
+        logger.error("Could not open qwebchannel.js resource file")
+        return ""
+    try:
+        return str(qwebchannel_js.readAll(), 'utf-8')
+    finally:
+        qwebchannel_js.close()
+
+
+def build_map_page(qwebchannel_js: str, center: Sequence[float] = DEFAULT_CENTER,
+                   zoom: int = DEFAULT_ZOOM) -> str:
+    """Return the static map page; markers are only ever added through diffs"""
+    return _MAP_PAGE % {
+        'leaflet': LEAFLET_CDN, 'cluster': MARKERCLUSTER_CDN, 'qwebchannel': qwebchannel_js,
+        'lat': center[0], 'lon': center[1], 'zoom': zoom,
+        'single_zoom': SINGLE_WELL_ZOOM, 'cluster_zoom': CLUSTER_UNTIL_ZOOM,
+    }
+
+
+def well_feature(well_number: str, latitude: float, longitude: float, colors: Sequence[str],
+                 popup: str = "", label: Optional[str] = None) -> dict:
+    """GeoJSON point for one well; two colors draw the split status pin"""
+    properties: Dict[str, Any] = {'colors': list(colors)}
+    if popup:
+        properties['popup'] = popup
+    if label:
+        properties['label'] = html.escape(str(label))
+    return {
+        'type': 'Feature',
+        'id': str(well_number),
+        'geometry': {'type': 'Point',
+                     'coordinates': [round(float(longitude), COORDINATE_DIGITS),
+                                     round(float(latitude), COORDINATE_DIGITS)]},
+        'properties': properties,
+    }
+
+
+def select_well_link(well_number: str, text: str = "View Data") -> str:
+    """Popup link that reports the well back to Python through the channel"""
+    argument = html.escape(json.dumps(str(well_number)), quote=True)
+    return f"<a href='#' onclick=\"selectWell({argument}); return false;\">{html.escape(text)}</a>"
+
+
+def encode_diff(diff: dict) -> str:
+    """Compact JSON for the channel, leaving out empty parts"""
+    return json.dumps({key: value for key, value in diff.items() if value}, separators=(',', ':'))
+
+
+class GeoJsonDiffer:
+    """Tracks the features on the map and diffs new feature sets against them"""
+
+    def __init__(self):
+        self.features: Dict[str, dict] = {}
+
+    def diff(self, features: Iterable[dict]) -> dict:
+        """Make features the current set and return what changed"""
+        new = {feature['id']: feature for feature in features}
+        old = self.features
+        diff = {
+            'add': [feature for key, feature in new.items() if key not in old],
+            'update': [feature for key, feature in new.items() if key in old and old[key] != feature],
+            'remove': [key for key in old if key not in new],
+        }
+        self.features = new
+        return diff
+
+    def snapshot(self) -> dict:
+        """Diff that replaces whatever the page shows with the current set"""
+        return {'reset': True, 'add': list(self.features.values()), 'update': [], 'remove': []}
+
+    @staticmethod
+    def is_empty(diff: dict) -> bool:
+        return not (diff.get('reset') or diff.get('add') or diff.get('update') or diff.get('remove'))
+
+
+class FileCache:
+    """Values derived from files, reloaded only when one of the files changes"""
+
+    def __init__(self):
+        self._entries: Dict[Any, tuple] = {}
+
+    @staticmethod
+    def _signature(paths: Iterable[str]) -> tuple:
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def get(self, key, paths: Iterable[str], loader: Callable[[], Any]):
+        """Return the cached value for key, calling loader if any path changed"""
+        signature = self._signature(paths)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        value = loader()
+        self._entries[key] = (signature, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+class MapBridge(QObject):
+    """Object shared with the page as ``mapBridge``"""
+
+    diffReady = pyqtSignal(str)     # Python -> page: encoded diff
+    page_ready = pyqtSignal()
+    well_selected = pyqtSignal(str)
+
+    @pyqtSlot()
+    def pageReady(self):
+        self.page_ready.emit()
+
+    @pyqtSlot(str)
+    def wellSelected(self, well_number):
+        self.well_selected.emit(well_number)
+
+
+class LiveMapController(QObject):
+    """Loads the map page once and keeps its markers in sync with set_features"""
+
+    well_selected = pyqtSignal(str)
+
+    def __init__(self, view, parent=None, center: Sequence[float] = DEFAULT_CENTER,
+                 zoom: int = DEFAULT_ZOOM):
+        super().__init__(parent)
+        self.view = view
+        self.differ = GeoJsonDiffer()
+        self.ready = False
+        self._fit_on_ready = False
+
+        self.bridge = MapBridge(self)
+        self.bridge.page_ready.connect(self._on_page_ready)
+        self.bridge.well_selected.connect(self.well_selected)
+        self.channel = QWebChannel(self)
+        self.channel.registerObject("mapBridge", self.bridge)
+        self.view.page().setWebChannel(self.channel)
+        self.view.loadStarted.connect(self._on_load_started)
+
+        base_url = QUrl.fromLocalFile(os.path.join(tempfile.gettempdir(), ''))
+        self.view.setHtml(build_map_page(_qwebchannel_js(), center, zoom), base_url)
+
+    def set_features(self, features: Iterable[dict], fit: bool = False):
+        """Show exactly these features, sending only the difference to the page"""
+        start = time.perf_counter()
+        diff = self.differ.diff(features)
+        if not self.ready:
+            self._fit_on_ready = self._fit_on_ready or fit
+            return
+        if fit:
+            diff['fit'] = True
+        elif GeoJsonDiffer.is_empty(diff):
+            return
+        self.bridge.diffReady.emit(encode_diff(diff))
+        logger.debug(f"PERF: Map diff +{len(diff['add'])} ~{len(diff['update'])} -{len(diff['remove'])} "
+                     f"sent in {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    def clear(self, fit: bool = False):
+        self.set_features([], fit=fit)
+
+    def _on_load_started(self):
+        self.ready = False
+
+    def _on_page_ready(self):
+        self.ready = True
+        snapshot = self.differ.snapshot()
+        snapshot['fit'] = self._fit_on_ready or bool(snapshot['add'])
+        self._fit_on_ready = False
+        self.bridge.diffReady.emit(encode_diff(snapshot))
+        logger.debug(f"Map page ready, sent {len(snapshot['add'])} wells")
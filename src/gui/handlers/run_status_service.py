@@ -0,0 +1,241 @@
+"""
+Run Status Service
+
+Per-well status for a water level run, computed with a few grouped queries
+instead of a query and a table scan per well:
+
+* the latest transducer reading of each well (water_level_readings),
+* the latest manual reading inside the run window (manual_level_readings),
+* the baro / level flags stored on the wells table.
+
+The wells of a run are passed as one JSON array parameter and each latest
+row is found with a MAX() seek on the (well_number, timestamp) unique index,
+so the cost grows with the number of wells in the run, not with the number
+of readings in the database.
+
+Results are cached per run on a persistent connection. The cache is dropped
+when ``PRAGMA data_version`` reports a commit from any other connection (an
+import, an edit, a Drive sync writing data) or when ``invalidate`` is
+called, so switching between runs is a dictionary lookup until the data
+changes.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RUN_WINDOW_DAYS = 60  # Manual readings are looked for up to two months after the run month starts
+
+_LATEST_TRANSDUCER_SQL = """
+    SELECT r.well_number, r.timestamp_utc, r.water_level, r.temperature, r.serial_number
+    FROM json_each(?) AS j
+    JOIN water_level_readings r
+      ON r.well_number = j.value
+     AND r.timestamp_utc = (SELECT MAX(timestamp_utc) FROM water_level_readings
+                            WHERE well_number = j.value)
+"""
+
+_LATEST_MANUAL_SQL = """
+    SELECT m.well_number, m.measurement_date_utc, m.water_level, m.dtw_avg, m.collected_by, m.comments
+    FROM json_each(?) AS j
+    JOIN manual_level_readings m
+      ON m.well_number = j.value
+     AND m.measurement_date_utc = (SELECT MAX(measurement_date_utc) FROM manual_level_readings
+                                   WHERE well_number = j.value
+                                   AND measurement_date_utc >= ? AND measurement_date_utc <= ?)
+"""
+
+_WELL_FLAGS_SQL = """
+    SELECT w.well_number, w.baro_status, w.level_status
+    FROM json_each(?) AS j
+    JOIN wells w ON w.well_number = j.value
+"""
+
+
+def _parse_utc(value) -> Optional[datetime]:
+    """Database timestamp text to a naive UTC datetime"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('T', ' ').rstrip('Z'))
+    except ValueError:
+        logger.debug(f"Unparseable timestamp in run status: {value}")
+        return None
+
+
+def run_window(run_id: str) -> Tuple[str, str]:
+    """UTC bounds for manual readings of a run, e.g. '2025-02 ...' -> Feb 1 to 60 days later"""
+    year, month = map(int, run_id.split()[0].split('-'))
+    run_start = datetime(year, month, 1)
+    run_end = run_start + timedelta(days=RUN_WINDOW_DAYS)
+    # Run dates are local calendar days
+    start_utc = run_start.replace(hour=0, minute=0, second=0).astimezone(timezone.utc)
+    end_utc = run_end.replace(hour=23, minute=59, second=59).astimezone(timezone.utc)
+    return start_utc.strftime('%Y-%m-%d %H:%M:%S'), end_utc.strftime('%Y-%m-%d %H:%M:%S')
+
+
+@dataclass
+class TransducerReading:
+    timestamp_utc: Optional[datetime]
+    water_level: Optional[float]
+    temperature: Optional[float]
+    serial_number: Optional[str]
+
+
+@dataclass
+class ManualReading:
+    measurement_date_utc: Optional[datetime]
+    water_level: Optional[float]
+    dtw_avg: Optional[float]
+    collected_by: Optional[str]
+    comments: str = ''
+
+
+@dataclass
+class WellRunStatus:
+    well_number: str
+    transducer: Optional[TransducerReading] = None  # Latest reading overall
+    manual: Optional[ManualReading] = None          # Latest reading in the run window
+    baro_status: Optional[str] = None
+    level_status: Optional[str] = None
+
+
+@dataclass
+class RunStatus:
+    run_id: str
+    window: Tuple[str, str]
+    wells: Dict[str, WellRunStatus] = field(default_factory=dict)
+    computed_in_ms: float = 0.0
+
+    @property
+    def manual_count(self) -> int:
+        return sum(1 for status in self.wells.values() if status.manual is not None)
+
+    @property
+    def manual_coverage(self) -> float:
+        """Fraction of the run's wells with a manual reading in the run window"""
+        return self.manual_count / len(self.wells) if self.wells else 0.0
+
+
+class RunStatusService:
+    """Computes and caches RunStatus objects for one database"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version = None
+        self._cache: Dict[Tuple[str, Tuple[str, ...]], RunStatus] = {}
+        self.set_database(db_path)
+
+    def set_database(self, db_path: Optional[str]):
+        """Switch databases; cached results of the previous one are dropped"""
+        if db_path == self.db_path:
+            return
+        self.close()
+        self.db_path = db_path
+
+    def invalidate(self):
+        """Drop all cached runs, e.g. after data was imported through this process"""
+        self._cache.clear()
+
+    def close(self):
+        self.invalidate()
+        self._data_version = None
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error as e:
+                logger.debug(f"Error closing run status connection: {e}")
+            self._conn = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.db_path:
+            # Only reads in autocommit mode, so no lock is held between queries
+            self._conn = sqlite3.connect(self.db_path)
+        return self._conn
+
+    def _check_data_version(self, conn: sqlite3.Connection):
+        """Clear the cache if another connection committed since the last check"""
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            if self._data_version is not None:
+                logger.debug("Run status cache invalidated by a database change")
+            self._cache.clear()
+            self._data_version = version
+
+    def latest_transducer_readings(self, well_numbers: Iterable[str]) -> Dict[str, TransducerReading]:
+        conn = self._connection()
+        if conn is None:
+            return {}
+        try:
+            rows = conn.execute(_LATEST_TRANSDUCER_SQL, (json.dumps(list(well_numbers)),)).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Could not fetch latest transducer readings (missing table?): {e}")
+            return {}
+        return {well: TransducerReading(_parse_utc(ts), level, temperature, serial)
+                for well, ts, level, temperature, serial in rows}
+
+    def latest_manual_readings(self, well_numbers: Iterable[str], start_utc: str,
+                               end_utc: str) -> Dict[str, ManualReading]:
+        conn = self._connection()
+        if conn is None:
+            return {}
+        try:
+            rows = conn.execute(_LATEST_MANUAL_SQL,
+                                (json.dumps(list(well_numbers)), start_utc, end_utc)).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Could not fetch manual readings (missing table?): {e}")
+            return {}
+        return {well: ManualReading(_parse_utc(date), level, dtw, collected_by, comments or '')
+                for well, date, level, dtw, collected_by, comments in rows}
+
+    def well_flags(self, well_numbers: Iterable[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        conn = self._connection()
+        if conn is None:
+            return {}
+        try:
+            rows = conn.execute(_WELL_FLAGS_SQL, (json.dumps(list(well_numbers)),)).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Wells table has no status flags: {e}")
+            return {}
+        return {well: (baro_status, level_status) for well, baro_status, level_status in rows}
+
+    def run_status(self, run_id: str, well_numbers: Iterable[str]) -> Optional[RunStatus]:
+        """Status of every well in the run, from the cache while the database is unchanged"""
+        well_numbers = tuple(dict.fromkeys(str(well) for well in well_numbers))
+        try:
+            conn = self._connection()
+            if conn is None:
+                return None
+            self._check_data_version(conn)
+
+            key = (run_id, well_numbers)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+            start = time.perf_counter()
+            window = run_window(run_id)
+            transducer = self.latest_transducer_readings(well_numbers)
+            manual = self.latest_manual_readings(well_numbers, *window)
+            flags = self.well_flags(well_numbers)
+
+            status = RunStatus(run_id, window)
+            for well in well_numbers:
+                baro_status, level_status = flags.get(well, (None, None))
+                status.wells[well] = WellRunStatus(well, transducer.get(well), manual.get(well),
+                                                   baro_status, level_status)
+            status.computed_in_ms = (time.perf_counter() - start) * 1000
+            self._cache[key] = status
+            logger.debug(f"PERF: Run status for {run_id} ({len(well_numbers)} wells) computed in "
+                         f"{status.computed_in_ms:.2f}ms")
+            return status
+        except Exception as e:
+            logger.error(f"Error computing run status for {run_id}: {e}", exc_info=True)
+            return None
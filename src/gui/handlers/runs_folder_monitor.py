@@ -9,11 +9,13 @@ from datetime import datetime
 from pathlib import Path
 import json
 import sqlite3  # Add import for SQLite
+from .drive_batch_operations import DriveBatchOperations
+from .drive_change_feed import DriveChangeFeed, default_catalog_path
 
 logger = logging.getLogger(__name__)
 
 class RunsFolderMonitor:
-    def __init__(self, folder_id=None, db_path=None):
+    def __init__(self, folder_id=None, db_path=None, catalog_path=None):
         # Use consolidated folder if available, otherwise fall back to hardcoded default
         self.folder_id = folder_id or "1FhCJH6KuvHcdFSpn0PxY8k9_-62vjmKj"
         logger.info(f"RunsFolderMonitor initialized with folder_id: {self.folder_id}")
@@ -25,6 +27,23 @@ class RunsFolderMonitor:
         self.logger = logger  # Use the module's logger
         # Initialize mapping
         self.location_to_well_mapping = {}
+        self.drive_ops = None  # Batched Drive calls, folder IDs cached for the session
+        self.catalog_path = catalog_path or default_catalog_path()
+        self.change_feed = None  # Persisted catalog of the month folders
+        
+    def _get_drive_ops(self):
+        """Get the batch operations layer for the current service."""
+        if self.drive_ops is None or self.drive_ops.service is not self.service:
+            self.drive_ops = DriveBatchOperations(self.service)
+            self.change_feed = None
+        return self.drive_ops
+        
+    def _get_change_feed(self):
+        """Get the change feed keeping the month folder listings current."""
+        drive_ops = self._get_drive_ops()
+        if self.change_feed is None:
+            self.change_feed = DriveChangeFeed(self.service, self.catalog_path, drive_ops)
+        return self.change_feed
         
     def set_authenticated_service(self, service):
         """Set an already authenticated Google Drive service."""
@@ -166,23 +185,26 @@ class RunsFolderMonitor:
             logger.error(f"Error getting month folders: {e}")
             return {}
 
-    def scan_xle_files(self, folder_id):
+    def _list_xle_files(self, folder_id, sync=True):
+        """List every XLE file in a folder from the change-feed catalog"""
+        try:
+            change_feed = self._get_change_feed()
+            if sync:
+                change_feed.sync([folder_id])
+            return change_feed.list_folder(folder_id, 'xle')
+        except Exception as e:
+            # Fall back to a full (paginated) listing if the catalog is unavailable
+            logger.warning(f"Change feed unavailable, listing folder {folder_id} directly: {e}")
+            query = f"'{folder_id}' in parents and fileExtension = 'xle' and trashed = false"
+            return self._get_drive_ops().list_files(query, fields='id, name, description, modifiedTime')
+
+    def scan_xle_files(self, folder_id, sync=True):
         """Scan XLE files in a folder and return dict mapping CAE -> latest reading date"""
         try:
             readings = {}
             logger.debug(f"Scanning folder {folder_id} for XLE files")
             
-            query = f"'{folder_id}' in parents and fileExtension = 'xle' and trashed = false"
-            logger.debug(f"Using query: {query}")
-            
-            results = self.service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name, description, modifiedTime)',
-                pageSize=1000
-            ).execute()
-
-            files = results.get('files', [])
+            files = self._list_xle_files(folder_id, sync)
             logger.debug(f"Found {len(files)} XLE files in folder {folder_id}")
             
             for file in files:
@@ -320,11 +342,19 @@ class RunsFolderMonitor:
             # Get relevant folders
             folders = self.get_month_folders(year_month)
             
+            # Bring both folders up to date with a single change-feed sync
+            synced = False
+            try:
+                self._get_change_feed().sync(folders.values())
+                synced = True
+            except Exception as e:
+                logger.warning(f"Could not sync Drive change feed: {e}")
+            
             # Combine readings from both folders
             all_readings = {}
             for folder_id in folders.values():
                 if folder_id is not None:  # Only scan folders that exist
-                    readings = self.scan_xle_files(folder_id)
+                    readings = self.scan_xle_files(folder_id, sync=not synced)
                     for location, data in readings.items():
                         if location not in all_readings or data['date'] > all_readings[location]['date']:
                             all_readings[location] = data
@@ -338,26 +368,7 @@ class RunsFolderMonitor:
     def get_folder_for_file(self, filename):
         """Get the correct folder ID for a file based on its end date in filename"""
         try:
-            # P-210_2024_08_12_To_2025_02_10.xle -> 2025-02
-            end_date = filename.split('_To_')[1].split('.')[0]  # Gets 2025_02_10
-            date_parts = end_date.split('_')[:2]  # Gets ['2025', '02']
-            folder_name = '-'.join(date_parts)    # Gets 2025-02
-            
-            # Check if folder exists
-            query = f"'{self.folder_id}' in parents and name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder'"
-            results = self.service.files().list(q=query, spaces='drive', fields='files(id)').execute()
-            
-            if results.get('files'):
-                return results['files'][0]['id']
-            
-            # Create folder if it doesn't exist
-            file_metadata = {
-                'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder',
-                'parents': [self.folder_id]
-            }
-            folder = self.service.files().create(body=file_metadata, fields='id').execute()
-            return folder['id']
+            return self.get_or_create_month_folder(self._month_folder_name(filename))
             
         except Exception as e:
             logger.error(f"Error getting folder for file {filename}: {e}")
@@ -366,35 +377,25 @@ class RunsFolderMonitor:
     def get_or_create_month_folder(self, folder_name):
         """Get or create a single folder for a month (no suffixes)"""
         try:
-            # First try to find existing folder
-            query = f"'{self.folder_id}' in parents and name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder'"
-            results = self.service.files().list(q=query, spaces='drive', fields='files(id)').execute()
-            
-            if results.get('files'):
-                logger.debug(f"Found existing folder {folder_name}")
-                return results['files'][0]['id']
-            
-            # If folder doesn't exist, create it (exactly once)
-            logger.debug(f"Creating new folder {folder_name}")
-            file_metadata = {
-                'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder',
-                'parents': [self.folder_id]
-            }
-            folder = self.service.files().create(body=file_metadata, fields='id').execute()
-            return folder['id']
+            # Resolved once per session; created only if it doesn't exist yet
+            return self._get_drive_ops().resolve_folder(self.folder_id, folder_name)
             
         except Exception as e:
             logger.error(f"Error with folder {folder_name}: {e}")
             return None
 
+    def _month_folder_name(self, filename):
+        """Month folder name (YYYY-MM) for a file based on its end date"""
+        # P-210_2024_08_12_To_2025_02_10.xle -> 2025-02
+        end_date = filename.split('_To_')[1].split('.')[0]  # Gets 2025_02_10
+        date_parts = end_date.split('_')[:2]  # Gets ['2025', '02']
+        return '-'.join(date_parts)    # Gets 2025-02
+
     def move_file_to_month_folder(self, file_id, filename):
         """Move a file to its correct month folder"""
         try:
             # Get month from filename end date
-            end_date = filename.split('_To_')[1].split('.')[0]  # Gets 2025_02_10
-            date_parts = end_date.split('_')[:2]  # Gets ['2025', '02']
-            folder_name = '-'.join(date_parts)    # Gets 2025-02
+            folder_name = self._month_folder_name(filename)
             
             folder_id = self.get_or_create_month_folder(folder_name)
             if not folder_id:
@@ -0,0 +1,299 @@
+"""
+Segment Compensation
+
+Segment-indexed barometric compensation and leveling for the water level
+edit dialog.
+
+``SegmentCompensationEngine`` sorts a dialog's transducer series once and
+indexes everything the compensation tools look up: the runs of readings
+without master baro data (segments), the master/master_corrected readings
+used as level references, the manual readings used as anchors and the
+master barometric pressure series. Compensation, leveling and baseline
+offsets are then NumPy operations over index ranges, so a preview on a
+multi-million reading well takes milliseconds and nothing is mutated until
+the dialog applies the result.
+
+Leveling follows the edit dialog's three-tier priority for each segment:
+
+1. The master/master_corrected reading closest before the segment start,
+   within one hour.
+2. The master/master_corrected reading closest after the segment end,
+   within one hour.
+3. The mean difference between manual readings within one hour of the
+   segment and the segment reading closest to each of them.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PSI_TO_FEET_OF_WATER = 2.31  # 1 PSI = 2.31 feet of water
+STANDARD_PRESSURE = 14.7  # Standard atmospheric pressure in PSI
+REFERENCE_WINDOW = pd.Timedelta(hours=1)
+MASTER_FLAGS = ('master', 'master_corrected')
+
+METHOD_START = 'start_reference'
+METHOD_END = 'end_reference'
+METHOD_MANUAL = 'manual_readings'
+METHOD_NONE = 'none'
+
+
+def _as_ns(values) -> np.ndarray:
+    return pd.to_datetime(pd.Series(values)).to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+
+@dataclass
+class CompensationResult:
+    """Values to write for a compensation, over the readings it changes"""
+    index: pd.Index                   # Transducer data index labels, in time order
+    master_corrected: np.ndarray      # New water_level_master_corrected
+    baro_mod: np.ndarray              # Compensated readings (baro_flag_mod -> master_mod)
+    level_mod: np.ndarray             # Leveled readings (level_flag_baro_mod -> master_mod)
+    segments: pd.DataFrame            # start, end, n_points, adjustment, method per segment
+    timestamps: np.ndarray = None     # Reading times, for plotting
+
+    @property
+    def empty(self) -> bool:
+        return len(self.index) == 0
+
+
+class SegmentCompensationEngine:
+    """Index of one dialog's transducer series for compensation and leveling"""
+
+    def __init__(self, transducer_data: pd.DataFrame, manual_data: Optional[pd.DataFrame] = None,
+                 master_baro_data: Optional[pd.DataFrame] = None):
+        data = transducer_data
+        order = np.argsort(_as_ns(data['timestamp_utc']), kind='stable') if len(data) else np.array([], dtype=int)
+        self.index = data.index[order]
+        self.times = _as_ns(data['timestamp_utc'])[order] if len(data) else np.array([], dtype=np.int64)
+        self.water_level = data['water_level'].to_numpy(dtype=float)[order]
+        master_corrected = data['water_level_master_corrected'] if 'water_level_master_corrected' in data else data['water_level']
+        self.master_corrected = master_corrected.to_numpy(dtype=float)[order]
+        self.is_master = data['baro_flag'].isin(MASTER_FLAGS).to_numpy()[order] if 'baro_flag' in data \
+            else np.zeros(len(data), dtype=bool)
+        self._position_of = pd.Series(np.arange(len(self.index)), index=self.index)
+
+        # Segments: runs of readings without master baro data ([start, stop) positions)
+        edges = np.diff(np.concatenate(([0], (~self.is_master).astype(np.int8), [0])))
+        self.segment_starts = np.flatnonzero(edges == 1)
+        self.segment_stops = np.flatnonzero(edges == -1)
+
+        # Level references
+        self.master_positions = np.flatnonzero(self.is_master)
+        self.master_times = self.times[self.master_positions]
+
+        # Manual anchors
+        if manual_data is not None and not manual_data.empty:
+            manual = manual_data.dropna(subset=['timestamp_utc', 'water_level'])
+            manual_times = _as_ns(manual['timestamp_utc'])
+            manual_order = np.argsort(manual_times, kind='stable')
+            self.manual_times = manual_times[manual_order]
+            self.manual_levels = manual['water_level'].to_numpy(dtype=float)[manual_order]
+        else:
+            self.manual_times = np.array([], dtype=np.int64)
+            self.manual_levels = np.array([], dtype=float)
+
+        # Master barometric pressure
+        if master_baro_data is not None and not master_baro_data.empty and 'pressure' in master_baro_data:
+            baro = master_baro_data.dropna(subset=['timestamp_utc', 'pressure'])
+            baro_times = _as_ns(baro['timestamp_utc'])
+            baro_order = np.argsort(baro_times, kind='stable')
+            self.baro_times = baro_times[baro_order]
+            self.baro_pressure = baro['pressure'].to_numpy(dtype=float)[baro_order]
+        else:
+            self.baro_times = np.array([], dtype=np.int64)
+            self.baro_pressure = np.array([], dtype=float)
+
+        self._window = REFERENCE_WINDOW.value
+        logger.debug(f"Compensation engine: {len(self.index)} readings, {len(self.segment_starts)} segments, "
+                     f"{len(self.manual_times)} manual readings, {len(self.baro_times)} baro readings")
+
+    # ------------------------------------------------------------------
+    # Selecting readings
+    # ------------------------------------------------------------------
+
+    def _normalize(self, positions) -> np.ndarray:
+        """Sorted, unique positions (a boolean mask is cheaper than np.unique here)"""
+        mask = np.zeros(len(self.times), dtype=bool)
+        mask[np.asarray(positions, dtype=np.int64)] = True
+        return np.flatnonzero(mask)
+
+    def positions_for(self, index) -> np.ndarray:
+        """Sorted positions of the given transducer index labels (unknown labels are ignored)"""
+        index = pd.Index(index)
+        positions = self._position_of.reindex(index[index.isin(self._position_of.index)]).to_numpy()
+        return self._normalize(positions)
+
+    def positions_in_range(self, start, end) -> np.ndarray:
+        """Positions of the readings with start <= time <= end"""
+        lo = np.searchsorted(self.times, pd.Timestamp(start).value, 'left')
+        hi = np.searchsorted(self.times, pd.Timestamp(end).value, 'right')
+        return np.arange(lo, hi)
+
+    def missing_positions(self) -> np.ndarray:
+        """Positions of the readings without master baro data"""
+        return np.flatnonzero(~self.is_master)
+
+    def baro_count(self, positions: np.ndarray) -> int:
+        """Number of master baro readings within the time range of ``positions``"""
+        if len(positions) == 0:
+            return 0
+        lo = np.searchsorted(self.baro_times, self.times[positions[0]], 'left')
+        hi = np.searchsorted(self.baro_times, self.times[positions[-1]], 'right')
+        return int(hi - lo)
+
+    def timestamps(self, positions: np.ndarray) -> pd.DatetimeIndex:
+        return pd.to_datetime(self.times[positions])
+
+    # ------------------------------------------------------------------
+    # Compensation and leveling
+    # ------------------------------------------------------------------
+
+    def baro_correction(self, positions: np.ndarray) -> np.ndarray:
+        """Barometric correction in feet of water for the given readings"""
+        pressure = np.interp(self.times[positions], self.baro_times, self.baro_pressure)
+        return (pressure - STANDARD_PRESSURE) * PSI_TO_FEET_OF_WATER
+
+    def _manual_segment_offsets(self, corrected: np.ndarray, starts: np.ndarray,
+                                stops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean manual-minus-transducer difference per segment, and whether a segment has any"""
+        n_segments = len(starts)
+        if n_segments == 0 or len(self.manual_times) == 0:
+            return np.zeros(n_segments), np.zeros(n_segments, dtype=bool)
+
+        lo = np.searchsorted(self.manual_times, self.times[starts] - self._window, 'left')
+        hi = np.searchsorted(self.manual_times, self.times[stops - 1] + self._window, 'right')
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(n_segments), np.zeros(n_segments, dtype=bool)
+
+        # One (segment, manual reading) pair per match
+        pair_segment = np.repeat(np.arange(n_segments), counts)
+        pair_manual = np.repeat(lo, counts) + (np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts))
+        manual_times = self.manual_times[pair_manual]
+
+        # Closest segment reading; on a tie the earlier reading wins
+        seg_start, seg_last = starts[pair_segment], stops[pair_segment] - 1
+        after = np.clip(np.searchsorted(self.times, manual_times, 'left'), seg_start, seg_last)
+        before = np.clip(after - 1, seg_start, seg_last)
+        closest = np.where(np.abs(self.times[before] - manual_times) <= np.abs(self.times[after] - manual_times),
+                           before, after)
+
+        dh = self.manual_levels[pair_manual] - corrected[closest]
+        sums = np.bincount(pair_segment, weights=dh, minlength=n_segments)
+        return np.divide(sums, counts, out=np.zeros(n_segments), where=counts > 0), counts > 0
+
+    def compensate(self, positions: np.ndarray) -> CompensationResult:
+        """
+        Compensate the given readings with master baro pressure and level the
+        segments they belong to.
+
+        Args:
+            positions: Sorted positions to compensate (see positions_for / missing_positions)
+        """
+        n = len(self.times)
+        positions = self._normalize(positions)
+        corrected = self.master_corrected.copy()
+        corrected[positions] = self.water_level[positions] - self.baro_correction(positions)
+
+        # Segments containing compensated readings
+        compensated = np.zeros(n, dtype=bool)
+        compensated[positions] = True
+        starts, stops = self.segment_starts, self.segment_stops
+        compensated_before = np.concatenate(([0], np.cumsum(compensated)))
+        touched = compensated_before[stops] - compensated_before[starts] > 0
+        starts, stops = starts[touched], stops[touched]
+
+        n_segments = len(starts)
+        adjustment = np.zeros(n_segments)
+        method = np.full(n_segments, METHOD_NONE, dtype=object)
+        if n_segments:
+            # Priority 1: master reading closest before the segment start, within the window
+            first_times = self.times[starts]
+            start_ref = np.searchsorted(self.master_times, first_times, 'right') - 1
+            start_ref_c = np.clip(start_ref, 0, max(len(self.master_times) - 1, 0))
+            has_start = (start_ref >= 0) & (len(self.master_times) > 0)
+            if len(self.master_times):
+                has_start &= self.master_times[start_ref_c] >= first_times - self._window
+                start_adj = corrected[self.master_positions[start_ref_c]] - corrected[starts]
+            else:
+                start_adj = np.zeros(n_segments)
+
+            # Priority 2: master reading closest after the segment end, within the window
+            last_times = self.times[stops - 1]
+            end_ref = np.searchsorted(self.master_times, last_times, 'left')
+            end_ref_c = np.clip(end_ref, 0, max(len(self.master_times) - 1, 0))
+            has_end = end_ref < len(self.master_times)
+            if len(self.master_times):
+                has_end &= self.master_times[end_ref_c] <= last_times + self._window
+                end_adj = corrected[self.master_positions[end_ref_c]] - corrected[stops - 1]
+            else:
+                end_adj = np.zeros(n_segments)
+
+            # Priority 3: manual readings around the segment
+            manual_adj, has_manual = self._manual_segment_offsets(corrected, starts, stops)
+
+            adjustment = np.select([has_start, has_end, has_manual], [start_adj, end_adj, manual_adj], 0.0)
+            method = np.select([has_start, has_end, has_manual], [METHOD_START, METHOD_END, METHOD_MANUAL],
+                               METHOD_NONE).astype(object)
+
+        # Spread each leveled segment's offset over its readings with a difference array
+        leveled = method != METHOD_NONE
+        delta = np.zeros(n + 1)
+        np.add.at(delta, starts[leveled], adjustment[leveled])
+        np.add.at(delta, stops[leveled], -adjustment[leveled])
+        corrected += np.cumsum(delta)[:n]
+        level_count = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(level_count, starts[leveled], 1)
+        np.add.at(level_count, stops[leveled], -1)
+        level_mod = np.cumsum(level_count)[:n] > 0
+
+        rows = np.flatnonzero(compensated | level_mod)
+        segments = pd.DataFrame({
+            'start': pd.to_datetime(self.times[starts]),
+            'end': pd.to_datetime(self.times[stops - 1]),
+            'n_points': stops - starts,
+            'adjustment': adjustment,
+            'method': method,
+        })
+        logger.debug(f"Compensated {len(positions)} readings; leveled {int(leveled.sum())} of {n_segments} segments")
+        return CompensationResult(self.index[rows], corrected[rows], compensated[rows], level_mod[rows],
+                                  segments, self.times[rows])
+
+    # ------------------------------------------------------------------
+    # Baseline adjustment
+    # ------------------------------------------------------------------
+
+    def manual_offset(self, positions: np.ndarray) -> Tuple[Optional[float], int]:
+        """
+        Mean difference between manual readings within one hour of the given
+        readings and the closest of those readings (original water level).
+
+        Returns:
+            (adjustment, number of manual readings), or (None, 0) if none are found
+        """
+        positions = self._normalize(positions)
+        if len(positions) == 0 or len(self.manual_times) == 0:
+            return None, 0
+        times = self.times[positions]
+        lo = np.searchsorted(self.manual_times, times[0] - self._window, 'left')
+        hi = np.searchsorted(self.manual_times, times[-1] + self._window, 'right')
+        if hi <= lo:
+            return None, 0
+        manual_times = self.manual_times[lo:hi]
+        after = np.clip(np.searchsorted(times, manual_times, 'left'), 0, len(times) - 1)
+        before = np.clip(after - 1, 0, len(times) - 1)
+        closest = np.where(np.abs(times[before] - manual_times) <= np.abs(times[after] - manual_times), before, after)
+        dh = self.manual_levels[lo:hi] - self.water_level[positions[closest]]
+        return float(np.mean(dh)), int(hi - lo)
+
+    def baseline(self, positions: np.ndarray, adjustment: float) -> Tuple[pd.Index, np.ndarray]:
+        """Index labels and water_level_level_corrected values for a baseline offset"""
+        positions = self._normalize(positions)
+        return self.index[positions], self.water_level[positions] + adjustment
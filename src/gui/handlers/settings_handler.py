@@ -91,7 +91,10 @@ class SettingsHandler:
             "barologger_watch_folder": str(Path.cwd()),  # Add barologger watch folder default
             "water_level_watch_folder": str(Path.cwd()),  # Add water level watch folder default
             "field_data_folders": ["1-0UspcEy9NJjFzMHk7egilqKh-FwhVJW"],  # Field laptop Solinst folders (correct folder ID)
-            "consolidated_field_data_folder": ""  # Will be set to water_levels_monitoring/FIELD_DATA_CONSOLIDATED
+            "consolidated_field_data_folder": "",  # Will be set to water_levels_monitoring/FIELD_DATA_CONSOLIDATED
+            "cloud_db_compression": "off",  # Transport codec for cloud databases: off, auto, zstd or gzip
+            "xle_cache_max_mb": 500,  # Size limit of the local cache of XLE files downloaded from Drive
+            "cloud_lock_ttl_seconds": 120  # Lease time of cloud project locks; renewed by a heartbeat
         }
         
         # Force update the folder ID if it's set to the wrong value
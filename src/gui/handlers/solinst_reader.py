@@ -6,6 +6,7 @@ import logging
 from pathlib import Path
 from typing import Tuple, Dict
 from io import StringIO
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -251,6 +252,60 @@ class SolinstReader:
             logger.error(f"Error reading XLE file {file_path}: {e}")
             raise
             
+    def read_xle_bounds(self, head: str, tail: str) -> Tuple[SolinstMetadata, pd.Timestamp, pd.Timestamp, int]:
+        """
+        Read metadata and the first/last reading times from the start and end of an XLE file.
+
+        ``head`` must run from the start of the file past the first complete
+        ``<Log>`` element and ``tail`` must contain the last one, so renaming
+        does not need the whole file. Metadata times are converted to UTC as in
+        ``read_xle``.
+
+        Returns:
+            Tuple of (metadata, first reading, last reading, UTC offset in hours);
+            the reading times are the logger's local times
+
+        Raises:
+            ValueError: If the header or a reading cannot be found
+        """
+        data_pos = head.find('<Data>')
+        root_match = re.search(r'<([A-Za-z_][\w.-]*)[^>]*>', re.sub(r'<\?.*?\?>', '', head[:data_pos], count=1))
+        if data_pos < 0 or not root_match:
+            raise ValueError("XLE header not found")
+        header_xml = f"{head[:data_pos]}</{root_match.group(1)}>"
+        try:
+            root = ET.fromstring(header_xml)
+        except ET.ParseError:
+            # Same temperature unit fix as get_file_metadata
+            root = ET.fromstring(re.sub(r'<Unit>([^<]*?)C</Unit>', r'<Unit>C</Unit>', header_xml))
+        metadata = self._extract_metadata(root)
+
+        first = self._find_log_time(head[data_pos:], last=False)
+        last = self._find_log_time(tail, last=True)
+        if first is None or last is None:
+            raise ValueError("No complete readings found")
+
+        offset = self._get_utc_offset(metadata.start_time)
+        metadata.start_time = metadata.start_time + timedelta(hours=offset)
+        metadata.stop_time = metadata.stop_time + timedelta(hours=offset)
+        return metadata, first, last, offset
+
+    @staticmethod
+    def _find_log_time(text: str, last: bool):
+        """Timestamp of the first (or last) complete <Log> element in a fragment of an XLE file"""
+        blocks = re.findall(r'<Log\b[^>]*>(.*?)</Log>', text, re.DOTALL)
+        for block in (reversed(blocks) if last else blocks):
+            date_match = re.search(r'<Date>(.*?)</Date>', block)
+            time_match = re.search(r'<Time>(.*?)</Time>', block)
+            if not date_match or not time_match:
+                continue
+            if "END OF" in date_match.group(1) or "END OF" in time_match.group(1):
+                continue
+            timestamp = pd.to_datetime(f"{date_match.group(1)} {time_match.group(1)}", errors='coerce')
+            if not pd.isna(timestamp):
+                return timestamp
+        return None
+
     def _get_dst_dates(self, year: int) -> Tuple[datetime, datetime]:
         """Get DST transition dates for a year"""
         # Spring forward (second Sunday in March)
@@ -0,0 +1,232 @@
+"""
+Spike Detection
+
+Headless, vectorized spike detection for transducer water level series.
+
+A reading is a spike candidate when either test fires:
+
+* Rolling median / MAD: its deviation from the centered rolling median is
+  large compared with the local median absolute deviation (robust z-score)
+  and larger than an absolute floor.
+* Rate of change: the series jumps away faster than ``max_rate`` and comes
+  back just as fast, with the two jumps in opposite directions.
+
+Consecutive candidates form a group. The step-change test then separates
+spikes from real level shifts: a group is only proposed when the readings
+on both sides of it agree to within ``step_threshold``, i.e. the series
+returns to where it was. The suggested fix linearly interpolates, by time,
+between those two anchor readings, which is what the manual spike tool does
+for a selected pair of points.
+
+The tests run chunk by chunk over sorted windows and keep only the
+candidate positions, so besides the input (and a copy of it when readings
+are missing) memory is set by ``chunk_size``: about 120 MB at the default
+of one million readings. A 10 million reading series takes a few seconds.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+MAD_SCALE = 1.4826  # MAD to standard deviation for normally distributed noise
+
+
+@dataclass
+class SpikeDetectionParams:
+    """Tuning parameters for SpikeDetector"""
+    window: int = 9                  # Readings in the rolling median window (odd)
+    mad_threshold: float = 6.0       # Robust z-score above which a reading is a candidate
+    min_deviation: float = 0.05      # ft; smaller deviations are never spikes
+    max_rate: float = 0.5            # ft per hour for the rate-of-change test
+    step_threshold: float = 0.1      # ft; anchors further apart than this mean a level shift
+    max_group_length: int = 8        # Longer runs of candidates are not treated as spikes
+    max_gap_minutes: float = 120.0   # A data gap longer than this splits groups
+    chunk_size: int = 1_000_000      # Readings per chunk of rolling statistics
+
+
+@dataclass
+class SpikeDetectionResult:
+    """Candidate spike groups and their suggested fixes"""
+    groups: pd.DataFrame       # One row per group
+    positions: np.ndarray      # Positions (in the input series) of every reading to fix
+    group_ids: np.ndarray      # Group of each entry in ``positions``
+    suggested: np.ndarray      # Suggested water level for each entry in ``positions``
+
+    @property
+    def empty(self) -> bool:
+        return self.groups.empty
+
+    def select(self, group_ids) -> 'SpikeDetectionResult':
+        """Keep only the given groups (e.g. the ones accepted in the dialog)"""
+        keep_groups = self.groups['group_id'].isin(list(group_ids))
+        keep = np.isin(self.group_ids, self.groups.loc[keep_groups, 'group_id'].to_numpy())
+        return SpikeDetectionResult(self.groups[keep_groups].reset_index(drop=True),
+                                    self.positions[keep], self.group_ids[keep], self.suggested[keep])
+
+    def to_pairs(self) -> List[Tuple[Tuple[pd.Timestamp, float], Tuple[pd.Timestamp, float]]]:
+        """Anchor pairs in the format of SpikeFixHelperDialog.pairs"""
+        return [((row.anchor_start_time, row.anchor_start_level), (row.anchor_end_time, row.anchor_end_level))
+                for row in self.groups.itertuples()]
+
+
+GROUP_COLUMNS = ['group_id', 'start_time', 'end_time', 'n_points', 'max_deviation', 'reason',
+                 'anchor_start_time', 'anchor_start_level', 'anchor_end_time', 'anchor_end_level']
+
+
+class SpikeDetector:
+    """Finds spike groups in a single well's series in one vectorized pass"""
+
+    def __init__(self, params: Optional[SpikeDetectionParams] = None):
+        self.params = params or SpikeDetectionParams()
+        if self.params.window % 2 == 0:
+            self.params.window += 1
+
+    # ------------------------------------------------------------------
+    # Rolling statistics
+    # ------------------------------------------------------------------
+
+    def _rolling_median(self, values: np.ndarray) -> np.ndarray:
+        """Centered rolling median with edge padding"""
+        half = self.params.window // 2
+        windows = sliding_window_view(np.pad(values, half, mode='edge'), self.params.window)
+        return np.sort(windows, axis=1)[:, half]
+
+    def _candidates(self, times_hours: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Boolean masks for the MAD test and the rate test over a stretch of the series"""
+        p = self.params
+        deviation = values - self._rolling_median(values)
+        abs_dev = np.abs(deviation)
+        mad = self._rolling_median(abs_dev) * MAD_SCALE
+        mad_flag = (abs_dev > p.min_deviation) & (abs_dev > p.mad_threshold * mad)
+
+        rate_flag = np.zeros(len(values), dtype=bool)
+        if len(values) >= 3:
+            dt = np.diff(times_hours)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rate = np.where(dt > 0, np.diff(values) / dt, 0.0)
+            rate_in, rate_out = rate[:-1], rate[1:]
+            rate_flag[1:-1] = ((np.abs(rate_in) > p.max_rate) & (np.abs(rate_out) > p.max_rate)
+                               & (np.sign(rate_in) != np.sign(rate_out))
+                               & (abs_dev[1:-1] > p.min_deviation))
+        return mad_flag, rate_flag
+
+    def _scan(self, t_ns: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Candidate positions and their MAD / rate flags, computed chunk by chunk.
+
+        Each chunk is read with enough neighbours on both sides for the median
+        of the deviations, so the flags are the same as in a single pass.
+        """
+        p = self.params
+        halo = 2 * (p.window // 2) + 1
+        found_idx, found_mad, found_rate = [], [], []
+        for start in range(0, len(values), p.chunk_size):
+            stop = min(start + p.chunk_size, len(values))
+            lo, hi = max(0, start - halo), min(len(values), stop + halo)
+            mad_flag, rate_flag = self._candidates((t_ns[lo:hi] - t_ns[0]) / 3.6e12, values[lo:hi])
+            mad_flag, rate_flag = mad_flag[start - lo:stop - lo], rate_flag[start - lo:stop - lo]
+            found = np.flatnonzero(mad_flag | rate_flag)
+            found_idx.append(found + start)
+            found_mad.append(mad_flag[found])
+            found_rate.append(rate_flag[found])
+        return np.concatenate(found_idx), np.concatenate(found_mad), np.concatenate(found_rate)
+
+    # ------------------------------------------------------------------
+    # Detection
+    # ------------------------------------------------------------------
+
+    def detect(self, timestamps, values) -> SpikeDetectionResult:
+        """
+        Detect spike groups in one well's series.
+
+        Args:
+            timestamps: Reading times (sorted ascending)
+            values: Water levels
+
+        Returns:
+            SpikeDetectionResult; positions refer to the input order
+        """
+        p = self.params
+        times = pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype='datetime64[ns]')
+        values = np.asarray(values, dtype=float)
+
+        # Work on the readings that have a value; positions map back to the input
+        missing = np.isnan(values)
+        empty = SpikeDetectionResult(pd.DataFrame(columns=GROUP_COLUMNS), np.array([], dtype=np.int64),
+                                     np.array([], dtype=np.int64), np.array([], dtype=float))
+        if len(values) - np.count_nonzero(missing) < p.window:
+            return empty
+        v, valid_positions = values, None
+        if missing.any():
+            valid_positions = np.flatnonzero(~missing)
+            v, times = values[valid_positions], times[valid_positions]
+        t_ns = times.view(np.int64)
+
+        def hours(positions):
+            return (t_ns[positions] - t_ns[0]) / 3.6e12
+
+        idx, mad_flag, rate_flag = self._scan(t_ns, v)
+        if len(idx) == 0:
+            return empty
+
+        # Group consecutive candidates; a long data gap also splits groups
+        gap_hours = p.max_gap_minutes / 60.0
+        breaks = (np.diff(idx) != 1) | (np.diff(hours(idx)) > gap_hours)
+        group_start = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+        group_end = np.concatenate((group_start[1:], [len(idx)])) - 1
+        first, last = idx[group_start], idx[group_end]
+        n_points = last - first + 1
+
+        # Anchors are the readings just outside each group
+        anchor_before, anchor_after = first - 1, last + 1
+        ok = (anchor_before >= 0) & (anchor_after < len(v)) & (n_points <= p.max_group_length)
+        anchor_before_c = np.clip(anchor_before, 0, len(v) - 1)
+        anchor_after_c = np.clip(anchor_after, 0, len(v) - 1)
+        ok &= (hours(first) - hours(anchor_before_c) <= gap_hours)
+        ok &= (hours(anchor_after_c) - hours(last) <= gap_hours)
+        # Step-change test: the series must come back, otherwise it is a level shift
+        ok &= np.abs(v[anchor_after_c] - v[anchor_before_c]) <= p.step_threshold
+
+        first, last = first[ok], last[ok]
+        anchor_before, anchor_after = anchor_before_c[ok], anchor_after_c[ok]
+        n_points = n_points[ok]
+        if len(first) == 0:
+            return empty
+        group_ids = np.arange(len(first))
+
+        # A group is a run of consecutive candidates, so its members are its candidates
+        in_group = np.repeat(ok, group_end - group_start + 1)
+        members, mad_flag, rate_flag = idx[in_group], mad_flag[in_group], rate_flag[in_group]
+        member_group = np.repeat(group_ids, n_points)
+
+        # Linear interpolation by time between the anchors
+        t0, t1 = hours(anchor_before)[member_group], hours(anchor_after)[member_group]
+        l0, l1 = v[anchor_before][member_group], v[anchor_after][member_group]
+        fraction = np.where(t1 > t0, (hours(members) - t0) / np.where(t1 > t0, t1 - t0, 1), 0.0)
+        suggested = l0 + fraction * (l1 - l0)
+
+        max_dev = np.maximum.reduceat(np.abs(v[members] - suggested), np.cumsum(n_points) - n_points)
+        by_mad = np.add.reduceat(mad_flag.astype(int), np.cumsum(n_points) - n_points) > 0
+        by_rate = np.add.reduceat(rate_flag.astype(int), np.cumsum(n_points) - n_points) > 0
+        reason = np.where(by_mad & by_rate, 'mad+rate', np.where(by_mad, 'mad', 'rate'))
+
+        groups = pd.DataFrame({
+            'group_id': group_ids,
+            'start_time': pd.to_datetime(times[first]),
+            'end_time': pd.to_datetime(times[last]),
+            'n_points': n_points,
+            'max_deviation': max_dev,
+            'reason': reason,
+            'anchor_start_time': pd.to_datetime(times[anchor_before]),
+            'anchor_start_level': v[anchor_before],
+            'anchor_end_time': pd.to_datetime(times[anchor_after]),
+            'anchor_end_level': v[anchor_after],
+        })
+        logger.info(f"Spike detection: {len(groups)} groups, {len(members)} readings in {len(v)}")
+        positions = members if valid_positions is None else valid_positions[members]
+        return SpikeDetectionResult(groups, positions, member_group, suggested)
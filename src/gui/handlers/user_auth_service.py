@@ -3,9 +3,6 @@ import logging
 import os
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 import io
 import shutil
 from ...database.user_repository import UserRepository
@@ -187,6 +184,7 @@ class UserAuthService:
                     logger.error(f"Failed to create backup of users file: {backup_error}")
             
             try:
+                from googleapiclient.http import MediaIoBaseDownload
                 request = service.files().get_media(fileId=file_id)
                 file_handle = io.BytesIO()
                 downloader = MediaIoBaseDownload(file_handle, request)
@@ -237,6 +235,7 @@ class UserAuthService:
                 'mimeType': 'application/json'
             }
             
+            from googleapiclient.http import MediaFileUpload
             media = MediaFileUpload(
                 self.local_users_path,
                 mimetype='application/json',
@@ -0,0 +1,322 @@
+"""
+Water Level Bulk Commit
+
+Set-based commit of edited transducer readings.
+
+The edit dialog marks corrected readings with modification flags
+(compensation, baseline adjustment, spike fix). Instead of walking the rows
+one by one, the values and flags to write are picked with vectorized masks,
+staged in a temporary table and applied with a single ``UPDATE ... FROM``
+join inside one transaction. ``BulkCommitWorker`` runs the commit off the UI
+thread and can be cancelled at any point before the transaction commits.
+When given an EditJournal, the commit is journaled in the same transaction so
+it can be reverted later; ``JournalRestoreWorker`` reverts or re-applies a
+journaled commit off the UI thread.
+"""
+
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import QThread, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+STAGE_CHUNK_SIZE = 5000
+METHOD_COMPENSATION = 'compensation'
+METHOD_BASELINE = 'baseline'
+METHOD_SPIKE = 'spike'
+
+
+class BulkCommitCancelled(Exception):
+    """The commit was cancelled and rolled back"""
+
+
+@dataclass
+class BulkCommitResult:
+    """Exact counts of the readings changed by a bulk commit"""
+    staged: int = 0
+    rows_updated: int = 0
+    by_method: Dict[str, int] = field(default_factory=dict)
+    by_level_flag: Dict[str, int] = field(default_factory=dict)
+    by_baro_flag: Dict[str, int] = field(default_factory=dict)
+    wells: list = field(default_factory=list)
+    journal_batches: list = field(default_factory=list)
+
+    def summary_text(self) -> str:
+        lines = [f"Updated {self.rows_updated} of {self.staged} edited records."]
+        labels = {METHOD_COMPENSATION: "Compensation", METHOD_BASELINE: "Baseline adjustment",
+                  METHOD_SPIKE: "Spike fix"}
+        for method, count in self.by_method.items():
+            lines.append(f"  {labels.get(method, method)}: {count}")
+        if self.by_level_flag:
+            lines.append("Level flags: " + ", ".join(f"{flag} {count}" for flag, count in self.by_level_flag.items()))
+        if self.by_baro_flag:
+            lines.append("Baro flags: " + ", ".join(f"{flag} {count}" for flag, count in self.by_baro_flag.items()))
+        return "\n".join(lines)
+
+
+def build_update_frame(transducer_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pick the value and flags to write for every modified reading.
+
+    Priority matches the edit tools: compensation, then baseline adjustment,
+    then spike fix.
+
+    Returns:
+        DataFrame with well_number, timestamp_utc (database text format),
+        water_level, level_flag, baro_flag and method columns
+    """
+    columns = ['well_number', 'timestamp_utc', 'water_level', 'level_flag', 'baro_flag', 'method']
+    if transducer_data.empty:
+        return pd.DataFrame(columns=columns)
+
+    data = transducer_data
+    baro_mod = (data['baro_flag_mod'] == 'master_mod').to_numpy()
+    level_mod = (data['level_flag_mod'] == 'level_mod').to_numpy()
+    spike_mod = (data['spike_flag'] == 'spike_corrected').to_numpy() if 'spike_flag' in data else np.zeros(len(data), bool)
+    update_mask = (baro_mod | level_mod | spike_mod) & data['well_number'].notna().to_numpy()
+    if not update_mask.any():
+        return pd.DataFrame(columns=columns)
+
+    data = data[update_mask]
+    baro_mod, level_mod = baro_mod[update_mask], level_mod[update_mask]
+    conditions = [baro_mod, ~baro_mod & level_mod]
+
+    water_level = np.select(conditions, [
+        data['water_level_master_corrected'].to_numpy(dtype=float),
+        data['water_level_level_corrected'].to_numpy(dtype=float),
+    ], default=data['water_level_spike_corrected'].to_numpy(dtype=float))
+
+    master_level_flag = np.where((data['level_flag_baro_mod'] == 'master_mod').to_numpy(),
+                                 'master_level_corrected', data['level_flag'].astype(object).to_numpy())
+    level_flag = np.select(conditions, [master_level_flag, 'level_corrected'], default='spike_corrected')
+    baro_flag = np.where(baro_mod, 'master_corrected', data['baro_flag'].astype(object).to_numpy())
+    method = np.select(conditions, [METHOD_COMPENSATION, METHOD_BASELINE], default=METHOD_SPIKE)
+
+    timestamps = data['timestamp_utc']
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = timestamps.dt.strftime('%Y-%m-%d %H:%M:%S')
+    else:
+        timestamps = timestamps.map(lambda value: value.strftime('%Y-%m-%d %H:%M:%S')
+                                    if isinstance(value, pd.Timestamp) else str(value))
+
+    frame = pd.DataFrame({
+        'well_number': data['well_number'].astype(str).str.strip().to_numpy(),
+        'timestamp_utc': timestamps.to_numpy(),
+        'water_level': water_level,
+        'level_flag': level_flag.astype(object),
+        'baro_flag': baro_flag.astype(object),
+        'method': method.astype(object),
+    })
+    # The same reading can appear twice in the dialog data; the last edit wins
+    return frame.drop_duplicates(subset=['well_number', 'timestamp_utc'], keep='last').reset_index(drop=True)
+
+
+class BulkCommitEngine:
+    """Stages edited readings in a temp table and applies them with one join"""
+
+    def __init__(self, db_path: str, journal=None, session_id: Optional[str] = None):
+        self.db_path = db_path
+        self.journal = journal
+        self.session_id = session_id
+        self._conn = None
+        self._cancelled = False
+
+    def cancel(self):
+        """Request cancellation; interrupts a running statement"""
+        self._cancelled = True
+        conn = self._conn
+        if conn is not None:
+            try:
+                conn.interrupt()
+            except Exception:
+                pass
+
+    def _check_cancelled(self):
+        if self._cancelled:
+            raise BulkCommitCancelled()
+
+    def apply(self, updates: pd.DataFrame, progress_callback: Optional[Callable[[int], None]] = None) -> BulkCommitResult:
+        """
+        Apply the rows of ``build_update_frame`` in a single transaction.
+
+        Args:
+            updates: Frame from build_update_frame
+            progress_callback: Optional callback receiving 0-100
+
+        Raises:
+            BulkCommitCancelled: If cancelled; nothing is written
+        """
+        result = BulkCommitResult(staged=len(updates))
+        if updates.empty:
+            return result
+
+        def report(value):
+            if progress_callback:
+                progress_callback(int(value))
+
+        self._conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn = self._conn
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS staged_level_updates (
+                    well_number TEXT NOT NULL,
+                    timestamp_utc TEXT NOT NULL,
+                    water_level REAL,
+                    level_flag TEXT,
+                    baro_flag TEXT,
+                    method TEXT,
+                    PRIMARY KEY (well_number, timestamp_utc)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("DELETE FROM staged_level_updates")  # Opens the transaction
+
+            # Stage (the only step proportional to Python-side work)
+            rows = list(updates[['well_number', 'timestamp_utc', 'water_level',
+                                 'level_flag', 'baro_flag', 'method']].itertuples(index=False, name=None))
+            for start in range(0, len(rows), STAGE_CHUNK_SIZE):
+                self._check_cancelled()
+                cursor.executemany("INSERT OR REPLACE INTO staged_level_updates VALUES (?, ?, ?, ?, ?, ?)",
+                                   rows[start:start + STAGE_CHUNK_SIZE])
+                report(60 * min(start + STAGE_CHUNK_SIZE, len(rows)) / len(rows))
+
+            # Exact summary of the readings that will change
+            self._check_cancelled()
+            matched = cursor.execute("""
+                SELECT s.method, s.level_flag, s.baro_flag, s.well_number, COUNT(*)
+                FROM staged_level_updates s
+                JOIN water_level_readings w
+                  ON w.well_number = s.well_number AND w.timestamp_utc = s.timestamp_utc
+                GROUP BY s.method, s.level_flag, s.baro_flag, s.well_number
+            """).fetchall()
+            wells = set()
+            for method, level_flag, baro_flag, well_number, count in matched:
+                result.by_method[method] = result.by_method.get(method, 0) + count
+                result.by_level_flag[level_flag] = result.by_level_flag.get(level_flag, 0) + count
+                result.by_baro_flag[baro_flag] = result.by_baro_flag.get(baro_flag, 0) + count
+                wells.add(well_number)
+            result.wells = sorted(wells)
+            report(70)
+
+            # Journal the before/after values so the commit can be reverted
+            if self.journal is not None:
+                self._check_cancelled()
+                result.journal_batches = self.journal.record_commit(conn, self.session_id or '', 'staged_level_updates')
+            report(80)
+
+            self._check_cancelled()
+            if sqlite3.sqlite_version_info >= (3, 33, 0):
+                cursor.execute("""
+                    UPDATE water_level_readings
+                    SET water_level = s.water_level, level_flag = s.level_flag, baro_flag = s.baro_flag
+                    FROM staged_level_updates AS s
+                    WHERE water_level_readings.well_number = s.well_number
+                      AND water_level_readings.timestamp_utc = s.timestamp_utc
+                """)
+            else:
+                cursor.execute("""
+                    UPDATE water_level_readings
+                    SET (water_level, level_flag, baro_flag) = (
+                        SELECT s.water_level, s.level_flag, s.baro_flag FROM staged_level_updates s
+                        WHERE s.well_number = water_level_readings.well_number
+                          AND s.timestamp_utc = water_level_readings.timestamp_utc)
+                    WHERE (well_number, timestamp_utc) IN (SELECT well_number, timestamp_utc FROM staged_level_updates)
+                """)
+            result.rows_updated = cursor.rowcount
+            report(95)
+
+            self._check_cancelled()
+            conn.commit()
+            report(100)
+            logger.info(f"Bulk commit updated {result.rows_updated} of {result.staged} edited readings")
+            return result
+
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            if self._cancelled:
+                raise BulkCommitCancelled() from e
+            raise
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._conn = None
+            conn.close()
+
+
+class BulkCommitWorker(QThread):
+    """Runs a BulkCommitEngine commit off the UI thread"""
+
+    progress = pyqtSignal(int)
+    finished_ok = pyqtSignal(object)  # BulkCommitResult
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, db_path: str, updates: pd.DataFrame, update_well_flags: bool = True, parent=None,
+                 journal=None, session_id: Optional[str] = None):
+        super().__init__(parent)
+        self.engine = BulkCommitEngine(db_path, journal, session_id)
+        self.db_path = db_path
+        self.updates = updates
+        self.update_well_flags = update_well_flags
+
+    def cancel(self):
+        self.engine.cancel()
+
+    def run(self):
+        try:
+            result = self.engine.apply(self.updates, self.progress.emit)
+        except BulkCommitCancelled:
+            logger.info("Bulk commit cancelled; no changes written")
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            logger.error(f"Bulk commit failed: {e}", exc_info=True)
+            self.failed.emit(str(e))
+            return
+
+        if self.update_well_flags:
+            # Update per-well flag summary in wells table after edits
+            try:
+                from ...database.models.water_level import WaterLevelModel
+                model = WaterLevelModel(self.db_path)
+                for well_number in result.wells:
+                    model.update_well_flags(well_number)
+            except Exception as e:
+                logger.error(f"Error updating well flags after edit: {e}")
+
+        self.finished_ok.emit(result)
+
+
+class JournalRestoreWorker(QThread):
+    """Writes one side of a committed journal batch back to the database off the UI thread"""
+
+    finished_ok = pyqtSignal(object, int, int)  # loaded batch, readings written, readings skipped
+    failed = pyqtSignal(str)
+
+    def __init__(self, journal, batch, side: str, parent=None):
+        """
+        Args:
+            journal: EditJournal holding the batch
+            batch: Committed JournalBatch
+            side: 'before' to revert the commit, 'after' to re-apply it
+        """
+        super().__init__(parent)
+        self.journal = journal
+        self.batch = batch
+        self.side = side
+
+    def run(self):
+        try:
+            batch = self.journal.load(self.batch)
+            written, skipped = self.journal.write_committed(batch, self.side)
+        except Exception as e:
+            logger.error(f"Writing committed batch {self.batch.batch_id} back failed: {e}", exc_info=True)
+            self.failed.emit(str(e))
+            return
+        self.finished_ok.emit(batch, written, skipped)
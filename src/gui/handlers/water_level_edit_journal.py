@@ -0,0 +1,553 @@
+"""
+Water Level Edit Journal
+
+Append-only journal of water level edits.
+
+Every edit is recorded as a batch holding only the readings that actually
+changed, split into contiguous time ranges. Each range stores the reading
+timestamps and the before/after values of the edited columns as a compressed
+numpy archive, so a baseline shift over a year of 15-minute data costs a few
+kilobytes instead of a copy of the whole well.
+
+Batches have two scopes:
+
+* ``session``: edits made in the edit dialog and not yet committed. Rows are
+  keyed by the dialog's DataFrame index and undo/redo restore the in-memory
+  columns. They are kept in an in-memory database, never in the project
+  database, and are dropped with ``clear_session`` when the dialog closes.
+* ``committed``: readings written to ``water_level_readings`` by a commit,
+  stored in the project database. Rows are keyed by well and timestamp;
+  undo/redo write the values back to the table, skipping readings that were
+  changed again since. Only the latest ``MAX_COMMITTED_BATCHES`` batches of
+  each well are kept.
+
+Within a batch's lifetime nothing is updated. Undo, redo and the discarding
+of a redo branch by a new edit are appended as events; the latest event of a
+batch is its state.
+"""
+
+import io
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SCOPE_SESSION = 'session'
+SCOPE_COMMITTED = 'committed'
+
+ACTION_RECORD = 'record'
+ACTION_UNDO = 'undo'
+ACTION_REDO = 'redo'
+ACTION_DISCARD = 'discard'
+
+# Columns written back to water_level_readings for committed batches
+COMMITTED_COLUMNS = ('water_level', 'level_flag', 'baro_flag')
+
+STAGE_CHUNK_SIZE = 5000
+
+# Committed batches kept per well; older ones can no longer be reverted
+MAX_COMMITTED_BATCHES = 20
+
+
+@dataclass
+class JournalBatch:
+    """A journaled edit with its changed rows"""
+    batch_id: int
+    session_id: str
+    scope: str
+    method: str
+    instance_id: Optional[str]
+    well_number: Optional[str]
+    n_rows: int
+    created_at: str
+    state: str = ACTION_RECORD
+    keys: np.ndarray = None                 # DataFrame index labels (session scope)
+    timestamps: np.ndarray = None           # datetime64[s]
+    before: Dict[str, np.ndarray] = field(default_factory=dict)
+    after: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def is_applied(self) -> bool:
+        return self.state in (ACTION_RECORD, ACTION_REDO)
+
+    def values(self, side: str) -> Dict[str, np.ndarray]:
+        return self.before if side == 'before' else self.after
+
+
+def _to_column_array(values) -> np.ndarray:
+    """Normalize a column to float64, or to object for flags and text"""
+    series = pd.Series(values).infer_objects()
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float)
+    return series.astype(object).where(series.notna(), None).to_numpy()
+
+
+def _changed_mask(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    if before.dtype.kind == 'f' and after.dtype.kind == 'f':
+        return ~((before == after) | (np.isnan(before) & np.isnan(after)))
+    before_null, after_null = pd.isna(before), pd.isna(after)
+    equal = np.array([b == a for b, a in zip(before, after)], dtype=bool) if len(before) else np.zeros(0, bool)
+    return ~((equal & ~before_null & ~after_null) | (before_null & after_null))
+
+
+def _pack(arrays: Dict[str, np.ndarray]) -> bytes:
+    """Compress arrays without pickling; text columns are stored with a null mask"""
+    packed = {}
+    for name, values in arrays.items():
+        if values.dtype == object:
+            nulls = pd.isna(values)
+            packed[f'{name}__text'] = np.array(['' if null else str(value) for value, null in zip(values, nulls)],
+                                               dtype=str)
+            packed[f'{name}__null'] = nulls
+        else:
+            packed[name] = values
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **packed)
+    return buffer.getvalue()
+
+
+def _unpack(blob: bytes) -> Dict[str, np.ndarray]:
+    arrays = {}
+    with np.load(io.BytesIO(blob), allow_pickle=False) as archive:
+        for name in archive.files:
+            if name.endswith('__null'):
+                continue
+            if name.endswith('__text'):
+                base = name[:-len('__text')]
+                values = archive[name].astype(object)
+                values[archive[f'{base}__null']] = None
+                arrays[base] = values
+            else:
+                arrays[name] = archive[name]
+    return arrays
+
+
+def _contiguous_ranges(positions: np.ndarray) -> List[Tuple[int, int]]:
+    """Split sorted positions into runs of consecutive values, as [start, stop) slices of ``positions``"""
+    if len(positions) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(positions)]))
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+def _db_timestamp(values: np.ndarray) -> np.ndarray:
+    return pd.to_datetime(values).strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+
+
+class EditJournal:
+    """Edit journal: session batches in memory, committed batches in the project database"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Args:
+            db_path: Project database; committed batches are kept in memory too when None
+        """
+        self.db_path = db_path
+        self._memory_conn = sqlite3.connect(':memory:')
+        self._tables_ready = False
+        # Index labels that are not integers, stored by their position in this list
+        self._key_labels: List = []
+        self._key_codes: Dict = {}
+
+    # ------------------------------------------------------------------
+    # Connection and schema
+    # ------------------------------------------------------------------
+
+    def _connect(self, scope: str = SCOPE_COMMITTED) -> sqlite3.Connection:
+        if scope == SCOPE_SESSION or not self.db_path:
+            return self._memory_conn
+        return sqlite3.connect(self.db_path, timeout=30.0)
+
+    def _close(self, conn: sqlite3.Connection):
+        if conn is not self._memory_conn:
+            conn.close()
+
+    def ensure_tables(self, conn: sqlite3.Connection):
+        if self._tables_ready and conn is self._memory_conn:
+            return
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS edit_journal_batches (
+                batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                method TEXT,
+                instance_id TEXT,
+                well_number TEXT,
+                n_rows INTEGER,
+                created_at TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS edit_journal_ranges (
+                batch_id INTEGER NOT NULL,
+                range_no INTEGER NOT NULL,
+                start_utc TEXT,
+                end_utc TEXT,
+                n_rows INTEGER,
+                payload BLOB,
+                PRIMARY KEY (batch_id, range_no)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS edit_journal_events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                created_at TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_edit_journal_events_batch '
+                     'ON edit_journal_events (batch_id, event_id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_edit_journal_batches_scope '
+                     'ON edit_journal_batches (scope, session_id, well_number)')
+        if conn is self._memory_conn:
+            self._tables_ready = True
+
+    @staticmethod
+    def _delete_batches(conn: sqlite3.Connection, where: str, params: tuple) -> int:
+        """Delete the batches matching ``where`` with their ranges and events"""
+        batch_ids = [row[0] for row in conn.execute(
+            f"SELECT batch_id FROM edit_journal_batches WHERE {where}", params).fetchall()]
+        if batch_ids:
+            for table in ('edit_journal_ranges', 'edit_journal_events', 'edit_journal_batches'):
+                conn.executemany(f"DELETE FROM {table} WHERE batch_id = ?", [(b,) for b in batch_ids])
+        return len(batch_ids)
+
+    def _encode_keys(self, keys: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """
+        Integer codes for DataFrame index labels.
+
+        Integer labels are stored as they are. Any other labels (timestamps,
+        strings) get codes that only this journal can map back, which is
+        enough for session batches that live as long as the journal.
+
+        Returns:
+            (codes, whether the codes are mapped labels)
+        """
+        if keys.dtype.kind in 'iu':
+            return keys.astype(np.int64), False
+        codes = np.empty(len(keys), dtype=np.int64)
+        for i, label in enumerate(keys.tolist()):
+            code = self._key_codes.get(label)
+            if code is None:
+                code = self._key_codes[label] = len(self._key_labels)
+                self._key_labels.append(label)
+            codes[i] = code
+        return codes, True
+
+    def _decode_keys(self, codes: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(codes), dtype=object)
+        labels[:] = [self._key_labels[code] for code in codes.tolist()]
+        return labels
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, session_id: str, scope: str, method: str, timestamps,
+               before: Dict[str, np.ndarray], after: Dict[str, np.ndarray], keys=None,
+               instance_id: Optional[str] = None, well_number: Optional[str] = None,
+               conn: Optional[sqlite3.Connection] = None) -> Optional[int]:
+        """
+        Record an edit, keeping only the rows where a column changed.
+
+        Recording a new edit discards the redo branch of the same session
+        (session scope) or well (committed scope).
+
+        Args:
+            session_id: Edit dialog session
+            scope: SCOPE_SESSION or SCOPE_COMMITTED
+            method: Edit tool ('spike_fix', 'compensation', 'baseline', 'commit', ...)
+            timestamps: Reading time of each row
+            before, after: Column name -> values for each row
+            keys: DataFrame index label of each row (session scope)
+            instance_id: Helper dialog instance that made the edit
+            well_number: Well of the rows (committed scope)
+            conn: Open connection to record inside the caller's transaction
+
+        Returns:
+            The batch id, or None if nothing changed
+        """
+        timestamps = pd.to_datetime(pd.Series(timestamps)).to_numpy().astype('datetime64[s]')
+        before = {col: _to_column_array(values) for col, values in before.items()}
+        after = {col: _to_column_array(after[col]) for col in before}
+        changed = np.zeros(len(timestamps), dtype=bool)
+        for col in before:
+            changed |= _changed_mask(before[col], after[col])
+        if not changed.any():
+            return None
+
+        # Time order makes ranges contiguous in the well's series
+        rows = np.flatnonzero(changed)
+        rows = rows[np.argsort(timestamps[rows], kind='stable')]
+        mapped_keys = False
+        if keys is not None:
+            if scope != SCOPE_SESSION:
+                raise ValueError("Only session batches are keyed by DataFrame index labels")
+            keys, mapped_keys = self._encode_keys(np.asarray(keys)[rows])
+
+        own_conn = conn is None
+        conn = conn or self._connect(scope)
+        try:
+            self.ensure_tables(conn)
+            now = datetime.now().isoformat(timespec='seconds')
+            self._discard_redo_branch(conn, scope, session_id, well_number, now)
+            cursor = conn.execute(
+                "INSERT INTO edit_journal_batches (session_id, scope, method, instance_id, well_number, n_rows, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, scope, method, instance_id, well_number, len(rows), now))
+            batch_id = cursor.lastrowid
+
+            # Ranges of consecutive readings (consecutive index labels in session scope)
+            order = keys if keys is not None else rows
+            range_rows = []
+            for range_no, (start, stop) in enumerate(_contiguous_ranges(np.asarray(order))):
+                part = rows[start:stop]
+                arrays = {'timestamps': timestamps[part].astype(np.int64)}
+                if keys is not None:
+                    arrays['key_codes' if mapped_keys else 'keys'] = keys[start:stop]
+                for col in before:
+                    arrays[f'{col}__before'] = before[col][part]
+                    arrays[f'{col}__after'] = after[col][part]
+                start_utc, end_utc = _db_timestamp(timestamps[part][[0, -1]])
+                range_rows.append((batch_id, range_no, start_utc, end_utc, len(part), _pack(arrays)))
+            conn.executemany("INSERT INTO edit_journal_ranges VALUES (?, ?, ?, ?, ?, ?)", range_rows)
+            conn.execute("INSERT INTO edit_journal_events (batch_id, action, created_at) VALUES (?, ?, ?)",
+                         (batch_id, ACTION_RECORD, now))
+            if scope == SCOPE_COMMITTED and well_number:
+                self._delete_batches(conn, '''
+                    scope = ? AND well_number = ? AND batch_id NOT IN (
+                        SELECT batch_id FROM edit_journal_batches WHERE scope = ? AND well_number = ?
+                        ORDER BY batch_id DESC LIMIT ?)
+                ''', (scope, well_number, scope, well_number, MAX_COMMITTED_BATCHES))
+            if own_conn:
+                conn.commit()
+            logger.debug(f"Journaled {method} batch {batch_id}: {len(rows)} rows in {len(range_rows)} ranges")
+            return batch_id
+        except Exception:
+            if own_conn:
+                conn.rollback()
+            raise
+        finally:
+            if own_conn:
+                self._close(conn)
+
+    def _discard_redo_branch(self, conn, scope, session_id, well_number, now):
+        undone = self._batches(conn, scope, session_id if scope == SCOPE_SESSION else None,
+                               [well_number] if scope == SCOPE_COMMITTED and well_number else None,
+                               states=(ACTION_UNDO,))
+        conn.executemany("INSERT INTO edit_journal_events (batch_id, action, created_at) VALUES (?, ?, ?)",
+                         [(batch.batch_id, ACTION_DISCARD, now) for batch in undone])
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _batches(self, conn, scope, session_id=None, wells=None, states=None,
+                 instance_id=None) -> List[JournalBatch]:
+        """Batches with their current state, most recently touched first"""
+        self.ensure_tables(conn)
+        query = '''
+            SELECT b.batch_id, b.session_id, b.scope, b.method, b.instance_id, b.well_number,
+                   b.n_rows, b.created_at, e.action
+            FROM edit_journal_batches b
+            JOIN (SELECT batch_id, MAX(event_id) AS last_event FROM edit_journal_events GROUP BY batch_id) last
+              ON last.batch_id = b.batch_id
+            JOIN edit_journal_events e ON e.event_id = last.last_event
+            WHERE b.scope = ?
+        '''
+        params = [scope]
+        if session_id is not None:
+            query += " AND b.session_id = ?"
+            params.append(session_id)
+        if instance_id is not None:
+            query += " AND b.instance_id = ?"
+            params.append(instance_id)
+        if wells:
+            query += f" AND b.well_number IN ({','.join('?' * len(wells))})"
+            params.extend(wells)
+        if states:
+            query += f" AND e.action IN ({','.join('?' * len(states))})"
+            params.extend(states)
+        query += " ORDER BY last.last_event DESC"
+        return [JournalBatch(*row[:8], state=row[8]) for row in conn.execute(query, params).fetchall()]
+
+    def _query(self, scope, *args, **kwargs) -> List[JournalBatch]:
+        conn = self._connect(scope)
+        try:
+            return self._batches(conn, scope, *args, **kwargs)
+        finally:
+            self._close(conn)
+
+    def undo_stack(self, scope: str, session_id: Optional[str] = None, wells: Optional[List[str]] = None,
+                   instance_id: Optional[str] = None) -> List[JournalBatch]:
+        """Applied batches, the next one to undo first"""
+        return self._query(scope, session_id, wells, (ACTION_RECORD, ACTION_REDO), instance_id)
+
+    def redo_stack(self, scope: str, session_id: Optional[str] = None,
+                   wells: Optional[List[str]] = None) -> List[JournalBatch]:
+        """Undone batches that can still be redone, the next one to redo first"""
+        return self._query(scope, session_id, wells, (ACTION_UNDO,))
+
+    def load(self, batch: JournalBatch) -> JournalBatch:
+        """Fill in the changed rows of a batch"""
+        conn = self._connect(batch.scope)
+        try:
+            blobs = conn.execute("SELECT payload FROM edit_journal_ranges WHERE batch_id = ? ORDER BY range_no",
+                                 (batch.batch_id,)).fetchall()
+        finally:
+            self._close(conn)
+        parts = [_unpack(blob) for (blob,) in blobs]
+        if not parts:
+            return batch
+        batch.timestamps = np.concatenate([p['timestamps'] for p in parts]).astype('datetime64[s]')
+        if 'keys' in parts[0]:
+            batch.keys = np.concatenate([p['keys'] for p in parts])
+        elif 'key_codes' in parts[0]:
+            batch.keys = self._decode_keys(np.concatenate([p['key_codes'] for p in parts]))
+        for name in parts[0]:
+            if name.endswith('__before') or name.endswith('__after'):
+                col, side = name.rsplit('__', 1)
+                values = np.concatenate([p[name] for p in parts])
+                (batch.before if side == 'before' else batch.after)[col] = values
+        return batch
+
+    def mark(self, batch_id: int, action: str, conn: Optional[sqlite3.Connection] = None,
+             scope: str = SCOPE_SESSION):
+        """Append an undo/redo event for a batch"""
+        own_conn = conn is None
+        conn = conn or self._connect(scope)
+        try:
+            self.ensure_tables(conn)
+            conn.execute("INSERT INTO edit_journal_events (batch_id, action, created_at) VALUES (?, ?, ?)",
+                         (batch_id, action, datetime.now().isoformat(timespec='seconds')))
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                self._close(conn)
+
+    def clear_session(self, session_id: str):
+        """Drop every batch of an edit session, when its edits were committed or discarded"""
+        conn = self._connect(SCOPE_SESSION)
+        self.ensure_tables(conn)
+        removed = self._delete_batches(conn, "scope = ? AND session_id = ?", (SCOPE_SESSION, session_id))
+        conn.commit()
+        if removed:
+            logger.debug(f"Cleared {removed} journaled edits of session {session_id}")
+
+    # ------------------------------------------------------------------
+    # Committed batches
+    # ------------------------------------------------------------------
+
+    def record_commit(self, conn: sqlite3.Connection, session_id: str, staged_table: str) -> List[int]:
+        """
+        Journal a commit from its staging table, inside the commit's transaction.
+
+        The staging table must have well_number, timestamp_utc and the
+        COMMITTED_COLUMNS; the current table values are the "before" side.
+        """
+        # Earlier versions kept session batches in the project database
+        self.ensure_tables(conn)
+        self._delete_batches(conn, "scope = ?", (SCOPE_SESSION,))
+        rows = conn.execute(f'''
+            SELECT s.well_number, s.timestamp_utc,
+                   w.water_level, w.level_flag, w.baro_flag,
+                   s.water_level, s.level_flag, s.baro_flag
+            FROM {staged_table} s
+            JOIN water_level_readings w
+              ON w.well_number = s.well_number AND w.timestamp_utc = s.timestamp_utc
+        ''').fetchall()
+        if not rows:
+            return []
+        frame = pd.DataFrame(rows, columns=['well_number', 'timestamp_utc', *[f'{c}__before' for c in COMMITTED_COLUMNS],
+                                            *[f'{c}__after' for c in COMMITTED_COLUMNS]])
+        batch_ids = []
+        for well_number, well_rows in frame.groupby('well_number', sort=True):
+            batch_id = self.record(
+                session_id, SCOPE_COMMITTED, 'commit', well_rows['timestamp_utc'],
+                {c: well_rows[f'{c}__before'] for c in COMMITTED_COLUMNS},
+                {c: well_rows[f'{c}__after'] for c in COMMITTED_COLUMNS},
+                well_number=well_number, conn=conn)
+            if batch_id is not None:
+                batch_ids.append(batch_id)
+        return batch_ids
+
+    def write_committed(self, batch: JournalBatch, side: str) -> Tuple[int, int]:
+        """
+        Write one side of a committed batch back to water_level_readings.
+
+        Only readings that still hold the other side's values are written, so
+        later edits are never overwritten.
+
+        Args:
+            batch: Committed batch (loaded or not)
+            side: 'before' to undo, 'after' to redo
+
+        Returns:
+            (rows written, rows skipped because they changed since)
+        """
+        if batch.timestamps is None:
+            batch = self.load(batch)
+        target = batch.values(side)
+        expected = batch.values('after' if side == 'before' else 'before')
+        timestamps = _db_timestamp(batch.timestamps)
+
+        conn = self._connect(SCOPE_COMMITTED)
+        try:
+            self.ensure_tables(conn)
+            conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS journal_restore (
+                    timestamp_utc TEXT PRIMARY KEY,
+                    water_level REAL, level_flag TEXT, baro_flag TEXT,
+                    expected_level REAL, expected_level_flag TEXT, expected_baro_flag TEXT
+                ) WITHOUT ROWID
+            ''')
+            conn.execute("DELETE FROM journal_restore")
+            rows = list(zip(timestamps.tolist(),
+                            *[_python_values(target[c]) for c in COMMITTED_COLUMNS],
+                            *[_python_values(expected[c]) for c in COMMITTED_COLUMNS]))
+            for start in range(0, len(rows), STAGE_CHUNK_SIZE):
+                conn.executemany("INSERT OR REPLACE INTO journal_restore VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 rows[start:start + STAGE_CHUNK_SIZE])
+            cursor = conn.execute('''
+                UPDATE water_level_readings
+                SET (water_level, level_flag, baro_flag) = (
+                    SELECT r.water_level, r.level_flag, r.baro_flag FROM journal_restore r
+                    WHERE r.timestamp_utc = water_level_readings.timestamp_utc)
+                WHERE well_number = ? AND EXISTS (
+                    SELECT 1 FROM journal_restore r
+                    WHERE r.timestamp_utc = water_level_readings.timestamp_utc
+                      AND water_level_readings.water_level IS r.expected_level
+                      AND water_level_readings.level_flag IS r.expected_level_flag
+                      AND water_level_readings.baro_flag IS r.expected_baro_flag)
+            ''', (batch.well_number,))
+            written = cursor.rowcount
+            conn.execute("INSERT INTO edit_journal_events (batch_id, action, created_at) VALUES (?, ?, ?)",
+                         (batch.batch_id, ACTION_UNDO if side == 'before' else ACTION_REDO,
+                          datetime.now().isoformat(timespec='seconds')))
+            conn.commit()
+            skipped = len(rows) - written
+            logger.info(f"{'Reverted' if side == 'before' else 'Re-applied'} committed batch {batch.batch_id}: "
+                        f"{written} readings written, {skipped} skipped (changed since)")
+            return written, skipped
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._close(conn)
+
+
+def _python_values(values: np.ndarray) -> list:
+    """Plain Python values for sqlite3 (NaN becomes NULL)"""
+    if values.dtype.kind == 'f':
+        return [None if np.isnan(v) else float(v) for v in values]
+    return [None if v is None else str(v) for v in values]
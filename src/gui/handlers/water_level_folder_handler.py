@@ -16,6 +16,7 @@ from .solinst_reader import SolinstReader
 from ...database.models.water_level import WaterLevelModel
 from ..dialogs.water_level_progress_dialog import WaterLevelProgressDialog
 from .water_level_processor import WaterLevelProcessor
+from .level_alignment import WellReferenceContext
 from PyQt5.QtWidgets import QApplication, QMessageBox
 import numpy as np
 
@@ -286,7 +287,10 @@ class WaterLevelFolderProcessor:
                     # Store barometric data in well_data for reuse with each file
                     well_data['baro_coverage'] = baro_coverage
                     
-                    new_data_vector = pd.DataFrame()
+                    # Reference data is indexed once per well; each processed file is
+                    # added to it so the next file can continue from its levels
+                    context = WellReferenceContext(manual_readings, existing_data)
+                    segments = []
                     
                     # Initialize organizer fresh for each well
                     organizer = XLEFileOrganizer(app_root_dir)
@@ -345,30 +349,18 @@ class WaterLevelFolderProcessor:
                             # - For first file: use manual readings and existing data from database
                             # - For subsequent files: use manual readings and already processed data segments
                             
-                            # Combine existing data from database with already processed segments
-                            combined_reference_data = existing_data.copy() if not existing_data.empty else pd.DataFrame()
-                            
-                            if not new_data_vector.empty:
-                                # If we've already processed some files, use them as reference too
-                                if combined_reference_data.empty:
-                                    combined_reference_data = new_data_vector
-                                else:
-                                    combined_reference_data = pd.concat([combined_reference_data, new_data_vector])
-                                    combined_reference_data = combined_reference_data.sort_values('timestamp_utc')
-                            
                             # This ensures the processor will first check manual readings within the segment,
-                            # then prior existing data (which now includes previously processed segments)
+                            # then prior existing data (which includes previously processed segments)
                             df = self.processor.process_data(
                                 df, 
                                 well_data['well_info'],
-                                manual_readings,
-                                combined_reference_data,
-                                is_folder_import=True
+                                is_folder_import=True,
+                                context=context
                             )
                             
                             # Add to processed data
-                            new_data_vector = pd.concat([new_data_vector, df])
-                            new_data_vector = new_data_vector.sort_values('timestamp_utc')
+                            context.add_levels(df)
+                            segments.append(df)
                             
                             processing_time = (pd.Timestamp.now() - file_start_time).total_seconds()
                             progress_dialog.log_message(f"Processed {len(df)} readings in {processing_time:.1f} seconds")
@@ -386,6 +378,9 @@ class WaterLevelFolderProcessor:
                             continue
                     
                     # Store processed data
+                    new_data_vector = pd.DataFrame()
+                    if segments:
+                        new_data_vector = pd.concat(segments).sort_values('timestamp_utc', kind='stable')
                     if not new_data_vector.empty:
                         well_data['processed_data'] = new_data_vector
                         well_data['has_been_processed'] = True
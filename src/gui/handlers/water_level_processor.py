@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Optional, Tuple, List
 from .solinst_reader import SolinstReader
+from .level_alignment import WellReferenceContext, insertion_level
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -185,9 +186,13 @@ class WaterLevelProcessor:
                                 manual_readings: pd.DataFrame = None,
                                 existing_data: pd.DataFrame = None,
                                 is_folder_import: bool = False,
-                                progress_dialog = None) -> Dict:
+                                progress_dialog = None,
+                                context: Optional[WellReferenceContext] = None) -> Dict:
         """Determine the height difference (dh) to apply to water pressure readings.
         
+        A WellReferenceContext built once per well can be passed instead of
+        manual_readings/existing_data when many files of a well are processed.
+        
         Returns:
             Dict containing:
                 - dh: float, the height difference to apply
@@ -195,123 +200,9 @@ class WaterLevelProcessor:
                 - method_details: str, description of the calculation
         """
         try:
-            # Get first and last timestamp of new data segment
-            new_start = pd.to_datetime(df['timestamp_utc'].iloc[0])
-            new_end = pd.to_datetime(df['timestamp_utc'].iloc[-1])
-            logger.debug(f"Determining dh for data segment from {new_start} to {new_end}")
-            
-            # Case 1: Check manual readings within the data range (±1 hour)
-            if manual_readings is not None and not manual_readings.empty:
-                # Define the time range: ±1 hour from the imported data
-                window_start = new_start - timedelta(hours=1)
-                window_end = new_end + timedelta(hours=1)
-                
-                valid_readings = manual_readings[
-                    (manual_readings['measurement_date_utc'] >= window_start) &
-                    (manual_readings['measurement_date_utc'] <= window_end)
-                ]
-                
-                if not valid_readings.empty:
-                    logger.debug(f"Found {len(valid_readings)} manual readings in time window")
-                    
-                    # First, check for readings within the segment itself
-                    segment_readings = valid_readings[
-                        (valid_readings['measurement_date_utc'] >= new_start) &
-                        (valid_readings['measurement_date_utc'] <= new_end)
-                    ]
-                    
-                    selected_reading = None
-                    selected_time = None
-                    selected_level = None
-                    
-                    if not segment_readings.empty:
-                        # Prioritize readings within the segment, closest to the end
-                        time_to_end = abs(segment_readings['measurement_date_utc'] - new_end)
-                        closest_idx = time_to_end.idxmin()
-                        selected_reading = segment_readings.loc[closest_idx]
-                        selected_time = selected_reading['measurement_date_utc']
-                        selected_level = selected_reading['water_level']
-                        
-                        if progress_dialog:
-                            progress_dialog.log_message(f"Found manual reading within segment, closest to end: {selected_time}")
-                    else:
-                        # If no readings in segment, look at ±1 hour window
-                        # Use reading closest to end of segment
-                        time_to_end = abs(valid_readings['measurement_date_utc'] - new_end)
-                        closest_idx = time_to_end.idxmin()
-                        selected_reading = valid_readings.loc[closest_idx]
-                        selected_time = selected_reading['measurement_date_utc']
-                        selected_level = selected_reading['water_level']
-                        
-                        if progress_dialog:
-                            progress_dialog.log_message(f"Using closest manual reading to segment end: {selected_time}")
-                    
-                    # Find closest transducer reading to the selected manual reading
-                    time_diffs = abs(df['timestamp_utc'] - selected_time)
-                    closest_idx = time_diffs.idxmin()
-                    closest_pressure = df.loc[closest_idx, 'water_pressure']
-                    closest_time = df.loc[closest_idx, 'timestamp_utc']
-                    
-                    # Calculate dh using this single manual reading
-                    dh = selected_level - closest_pressure
-                    
-                    if progress_dialog:
-                        progress_dialog.log_message(
-                            f"Manual reading: {selected_level:.2f} ft at {selected_time}, "
-                            f"closest pressure: {closest_pressure:.2f} ft at {closest_time}, dh: {dh:.2f} ft"
-                        )
-                    
-                    return {
-                        'dh': float(dh),
-                        'method': 'manual_readings',
-                        'method_details': f"Single manual reading at {selected_time} (dh={dh:.2f})"
-                    }
-            
-            # Case 2: Check existing data for readings before segment
-            if existing_data is not None and not existing_data.empty:
-                if progress_dialog:
-                    progress_dialog.log_message(f"Found {len(existing_data)} existing readings to check")
-                
-                # Look for readings before our segment (predicted method)
-                before_segment = existing_data[existing_data['timestamp_utc'] < new_start]
-                
-                if not before_segment.empty:
-                    # Find the most recent reading before our segment
-                    latest_idx = before_segment['timestamp_utc'].idxmax()
-                    latest_level = before_segment.loc[latest_idx, 'water_level']
-                    latest_time = before_segment.loc[latest_idx, 'timestamp_utc']
-                    
-                    # Calculate time gap in hours
-                    time_gap = (new_start - latest_time).total_seconds() / 3600
-                    
-                    # Calculate dh using water pressure at start of new segment
-                    start_pressure = df.loc[df['timestamp_utc'] == new_start, 'water_pressure'].iloc[0]
-                    dh = latest_level - start_pressure
-                    
-                    if progress_dialog:
-                        progress_dialog.log_message(f"Using existing level {latest_level:.2f} ft from {latest_time}")
-                        progress_dialog.log_message(f"Time gap: {time_gap:.2f} hours, Calculated dh: {dh:.2f} ft")
-                    
-                    return {
-                        'dh': float(dh),
-                        'method': 'predicted',
-                        'method_details': f"Predicted from existing data with {time_gap:.2f}h gap"
-                    }
-            
-            # Case 3: Default fallback using TOC-30
-            default_level = float(well_info['top_of_casing']) - 30
-            start_pressure = df.loc[df['timestamp_utc'] == new_start, 'water_pressure'].iloc[0]
-            dh = default_level - start_pressure
-            
-            if progress_dialog:
-                progress_dialog.log_message(f"Using default level (TOC-30): {default_level:.2f} ft")
-                progress_dialog.log_message(f"Calculated dh: {dh:.2f} ft")
-            
-            return {
-                'dh': float(dh),
-                'method': 'default_level',
-                'method_details': f"Default level from top of casing ({well_info['top_of_casing']})"
-            }
+            if context is None:
+                context = WellReferenceContext(manual_readings, existing_data)
+            return insertion_level(df, well_info, context, progress_dialog)
                 
         except Exception as e:
             logger.error(f"Error determining insertion level: {e}", exc_info=True)
@@ -319,6 +210,7 @@ class WaterLevelProcessor:
                 progress_dialog.log_message(f"Error determining insertion level: {e}")
             
             # Even on error, return a consistent structure
+            new_start = pd.to_datetime(df['timestamp_utc'].iloc[0])
             default_level = float(well_info['top_of_casing']) - 30
             start_pressure = df.loc[df['timestamp_utc'] == new_start, 'water_pressure'].iloc[0]
             dh = default_level - start_pressure
@@ -534,8 +426,13 @@ class WaterLevelProcessor:
     def process_data(self, df: pd.DataFrame, well_info: Dict,
                     manual_readings: pd.DataFrame = None,
                     existing_data: pd.DataFrame = None,
-                    is_folder_import: bool = False) -> pd.DataFrame:
-        """Process water level data"""
+                    is_folder_import: bool = False,
+                    context: Optional[WellReferenceContext] = None) -> pd.DataFrame:
+        """Process water level data
+        
+        With a context, the insertion level comes from the well's preloaded
+        reference data and manual_readings/existing_data are not needed.
+        """
         try:
             df = df.copy()
             
@@ -619,7 +516,8 @@ class WaterLevelProcessor:
                 well_info,
                 manual_readings,
                 existing_data,
-                is_folder_import
+                is_folder_import,
+                context=context
             )
             
             # Calculate water levels
@@ -781,10 +679,10 @@ class WaterLevelProcessor:
                             
                         # Get reference level from after boundary period
                         reference_level = df[~start_mask]['pressure'].iloc[0]
-                        for idx in start_segment.index[anomalies]:
-                            # Linear interpolation towards reference
-                            time_diff = (df.loc[idx, 'timestamp_utc'] - start_boundary).total_seconds() / 3600
-                            df.loc[idx, 'pressure'] = reference_level + (typical_rate * time_diff)
+                        # Linear interpolation towards reference
+                        idx = start_segment.index[anomalies]
+                        hours = (df.loc[idx, 'timestamp_utc'] - start_boundary).dt.total_seconds() / 3600
+                        df.loc[idx, 'pressure'] = reference_level + (typical_rate * hours)
                 
                 # Process end boundary (last 15 minutes) - similar logic
                 end_mask = df['timestamp_utc'] >= end_boundary
@@ -799,9 +697,9 @@ class WaterLevelProcessor:
                             progress_dialog.log_message(f"Found {anomalies.sum()} anomalies at end")
                             
                         reference_level = df[~end_mask]['pressure'].iloc[-1]
-                        for idx in end_segment.index[anomalies]:
-                            time_diff = (df.loc[idx, 'timestamp_utc'] - end_boundary).total_seconds() / 3600
-                            df.loc[idx, 'pressure'] = reference_level + (typical_rate * time_diff)
+                        idx = end_segment.index[anomalies]
+                        hours = (df.loc[idx, 'timestamp_utc'] - end_boundary).dt.total_seconds() / 3600
+                        df.loc[idx, 'pressure'] = reference_level + (typical_rate * hours)
             
             if progress_dialog:
                 progress_dialog.log_message(f"\nFinal range: {df['pressure'].min():.2f} to {df['pressure'].max():.2f} PSI")
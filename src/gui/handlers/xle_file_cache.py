@@ -0,0 +1,286 @@
+"""
+XLE File Cache
+
+Local cache of XLE files stored on Google Drive, keyed by Drive file ID and
+md5Checksum.
+
+Renaming a logger file and sorting it into a run folder only needs the
+header (serial number, location, units) and the first and last reading
+times. For files larger than a head plus a tail range, only those two ranges
+are downloaded and parsed. The parsed summary is kept next to the bytes, so
+the same file is never parsed twice while its content is unchanged. A full
+import asks for the local file and reuses the cached bytes when the whole
+file is already there, downloading only once otherwise.
+"""
+
+import os
+import io
+import json
+import glob
+import logging
+import tempfile
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+from googleapiclient.http import MediaIoBaseDownload
+
+from .solinst_reader import SolinstReader, SolinstMetadata
+
+logger = logging.getLogger(__name__)
+
+HEAD_BYTES = 64 * 1024  # Header plus the first readings
+TAIL_BYTES = 16 * 1024  # Last readings and the closing tags
+
+
+def default_cache_dir(settings_handler=None) -> str:
+    """Cache location: the databases temp folder if configured, else the system temp dir"""
+    base_dir = None
+    if settings_handler is not None:
+        local_db_directory = settings_handler.get_setting("local_db_directory", None)
+        if local_db_directory:
+            base_dir = os.path.join(local_db_directory, "temp")
+    if base_dir is None:
+        base_dir = os.path.join(tempfile.gettempdir(), 'water_levels_temp')
+    cache_dir = os.path.join(base_dir, "xle_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+@dataclass
+class XleFileSummary:
+    """Parsed header and reading range of a cached XLE file"""
+    metadata: SolinstMetadata  # Times converted to UTC like SolinstReader.read_xle
+    first_reading: Optional[pd.Timestamp]  # Logger local time
+    last_reading: Optional[pd.Timestamp]
+    utc_offset_hours: int = 0
+
+    @property
+    def has_data(self) -> bool:
+        return self.first_reading is not None and self.last_reading is not None
+
+    @property
+    def start_utc(self) -> Optional[pd.Timestamp]:
+        return self.first_reading + pd.Timedelta(hours=self.utc_offset_hours) if self.has_data else None
+
+    @property
+    def end_utc(self) -> Optional[pd.Timestamp]:
+        return self.last_reading + pd.Timedelta(hours=self.utc_offset_hours) if self.has_data else None
+
+    def to_dict(self) -> dict:
+        metadata = asdict(self.metadata)
+        metadata['start_time'] = self.metadata.start_time.isoformat()
+        metadata['stop_time'] = self.metadata.stop_time.isoformat()
+        return {
+            'metadata': metadata,
+            'first_reading': self.first_reading.isoformat() if self.first_reading is not None else None,
+            'last_reading': self.last_reading.isoformat() if self.last_reading is not None else None,
+            'utc_offset_hours': self.utc_offset_hours,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'XleFileSummary':
+        metadata = dict(data['metadata'])
+        metadata['start_time'] = datetime.fromisoformat(metadata['start_time'])
+        metadata['stop_time'] = datetime.fromisoformat(metadata['stop_time'])
+        return cls(
+            metadata=SolinstMetadata(**metadata),
+            first_reading=pd.Timestamp(data['first_reading']) if data.get('first_reading') else None,
+            last_reading=pd.Timestamp(data['last_reading']) if data.get('last_reading') else None,
+            utc_offset_hours=data.get('utc_offset_hours', 0),
+        )
+
+
+class XleFileCache:
+    """Downloads, parses and caches XLE files by Drive file ID and md5Checksum"""
+
+    def __init__(self, service, cache_dir: str, reader: Optional[SolinstReader] = None,
+                 max_bytes: Optional[int] = None):
+        """
+        Args:
+            service: Authenticated googleapiclient Drive v3 service
+            cache_dir: Directory holding the cached bytes and summaries
+            reader: SolinstReader used for parsing
+            max_bytes: Optional size limit enforced by ``prune``
+        """
+        self.service = service
+        self.cache_dir = cache_dir
+        self.reader = reader or SolinstReader()
+        self.max_bytes = max_bytes
+        self.downloaded_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Cache layout
+    # ------------------------------------------------------------------
+
+    def _path(self, file_id: str, md5_checksum: Optional[str], suffix: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_id}_{md5_checksum or 'nomd5'}{suffix}")
+
+    def _discard_stale(self, file_id: str, md5_checksum: Optional[str]):
+        """Remove cache entries for older content of the same file"""
+        keep = f"{file_id}_{md5_checksum or 'nomd5'}."
+        for path in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{glob.escape(file_id)}_*")):
+            if not os.path.basename(path).startswith(keep):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _write(self, path: str, data: bytes):
+        temp_path = f"{path}.part"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    # ------------------------------------------------------------------
+    # Downloads
+    # ------------------------------------------------------------------
+
+    def _download_range(self, file_id: str, start: int, end: int) -> bytes:
+        """Download bytes ``start``..``end`` (inclusive) of a file"""
+        request = self.service.files().get_media(fileId=file_id)
+        request.headers['Range'] = f"bytes={start}-{end}"
+        data = request.execute()
+        self.downloaded_bytes += len(data)
+        return data
+
+    def _download_full(self, file_id: str) -> bytes:
+        request = self.service.files().get_media(fileId=file_id)
+        buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(buffer, request)
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+        data = buffer.getvalue()
+        self.downloaded_bytes += len(data)
+        return data
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get_summary(self, file_id: str, md5_checksum: Optional[str], size=None) -> Optional[XleFileSummary]:
+        """
+        Get the parsed header and reading range of a Drive XLE file.
+
+        Served from the cache when this content was parsed before; otherwise
+        only the head and tail of large files are downloaded.
+
+        Returns:
+            XleFileSummary, or None if the file could not be read
+        """
+        summary_path = self._path(file_id, md5_checksum, '.json')
+        if md5_checksum and os.path.exists(summary_path):
+            try:
+                with open(summary_path, 'r') as f:
+                    return XleFileSummary.from_dict(json.load(f))
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable cache entry {summary_path}: {e}")
+
+        self._discard_stale(file_id, md5_checksum)
+        try:
+            size = int(size or 0)
+            summary = None
+            if size > HEAD_BYTES + TAIL_BYTES:
+                head = self._download_range(file_id, 0, HEAD_BYTES - 1)
+                tail = self._download_range(file_id, size - TAIL_BYTES, size - 1)
+                summary = self._parse_ranges(file_id, head, tail)
+            if summary is None:
+                summary = self._parse_full(file_id, self.get_local_file(file_id, md5_checksum))
+            if summary is None:
+                return None
+
+            self._write(summary_path, json.dumps(summary.to_dict()).encode('utf-8'))
+            return summary
+
+        except Exception as e:
+            logger.error(f"Error reading XLE file {file_id} from Drive: {e}")
+            return None
+
+    def get_local_file(self, file_id: str, md5_checksum: Optional[str]) -> Optional[str]:
+        """
+        Path of a complete local copy of a Drive file.
+
+        The cached copy is reused while the checksum matches, so a file that
+        was already downloaded for renaming is not downloaded again for import.
+        Files without a checksum are always downloaded.
+        """
+        path = self._path(file_id, md5_checksum, '.xle')
+        if md5_checksum and os.path.exists(path):
+            return path
+        try:
+            self._discard_stale(file_id, md5_checksum)
+            self._write(path, self._download_full(file_id))
+            return path
+        except Exception as e:
+            logger.error(f"Error downloading XLE file {file_id}: {e}")
+            return None
+
+    def prune(self, max_bytes: Optional[int] = None):
+        """Delete the least recently used cached files until the cache fits ``max_bytes``"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return
+        entries = []
+        for path in glob.glob(os.path.join(glob.escape(self.cache_dir), '*.xle')):
+            stat = os.stat(path)
+            entries.append((stat.st_atime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                # Summaries are tiny and stay cached, only the bytes are dropped
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        for encoding in ('utf-8', 'latin1'):
+            try:
+                return data.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+        return data.decode('utf-8', errors='replace')
+
+    def _parse_ranges(self, file_id: str, head: bytes, tail: bytes) -> Optional[XleFileSummary]:
+        """Parse the head and tail ranges; None if they do not hold enough of the file"""
+        # Cut at element boundaries so a split multi-byte character cannot break decoding
+        head_end = head.find(b'</Log>')
+        tail_start = tail.find(b'<Log')
+        if head_end < 0 or tail_start < 0:
+            return None
+        try:
+            metadata, first, last, offset = self.reader.read_xle_bounds(
+                self._decode(head[:head_end + len(b'</Log>')]), self._decode(tail[tail_start:]))
+        except Exception as e:
+            logger.debug(f"Partial parse of {file_id} failed, downloading the whole file: {e}")
+            return None
+        return XleFileSummary(metadata, first, last, offset)
+
+    def _parse_full(self, file_id: str, path: Optional[str]) -> Optional[XleFileSummary]:
+        if not path:
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            summary = self._parse_ranges(file_id, data, data)
+            if summary is not None:
+                return summary
+            # No readings, or a layout the fragment parser does not handle
+            df, metadata = self.reader.read_xle(path)
+        except Exception as e:
+            logger.error(f"Error parsing XLE file {file_id}: {e}")
+            return None
+        if df.empty:
+            return XleFileSummary(metadata, None, None, 0)
+        offset = int((df['timestamp_utc'].iloc[0] - df['timestamp'].iloc[0]) / pd.Timedelta(hours=1))
+        return XleFileSummary(metadata, df['timestamp'].min(), df['timestamp'].max(), offset)
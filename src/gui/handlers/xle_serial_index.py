@@ -0,0 +1,411 @@
+"""
+XLE Serial Index
+
+Persistent index of the logger files (XLE and Solinst CSV exports) in archive
+folders, used to find every file of a transducer serial number without
+opening the files again.
+
+Each file is summarized from its header only: for XLE files the first and
+last few kilobytes are parsed with ``SolinstReader.read_xle_bounds`` (serial
+number, location, model and the logged time range); for CSV exports the
+metadata lines and the first and last data rows are read. Summaries are
+stored in SQLite keyed by path together with the file's size and mtime, so
+a refresh only scans new or modified files and drops deleted ones. Scans of
+many files run in a process pool.
+
+Searches are answered from the index: the distinct serial numbers under a
+folder are matched with the same rules as before (case, punctuation and
+digit-only matching) and only the matching rows are loaded.
+"""
+
+import os
+import re
+import sqlite3
+import logging
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .solinst_reader import SolinstReader
+
+logger = logging.getLogger(__name__)
+
+HEAD_BYTES = 64 * 1024  # Header plus the first readings
+TAIL_BYTES = 16 * 1024  # Last readings and the closing tags
+CSV_HEADER_LINES = 20
+PARALLEL_MIN_FILES = 64  # Smaller refreshes are scanned in-process
+COMMIT_EVERY = 500
+
+FILE_TYPES = {'.xle': 'XLE', '.csv': 'CSV'}
+
+# Serial numbers in CSV file names, most specific first
+_CSV_SERIAL_PATTERNS = [r'(\d{7})', r'_(\d{6,8})_', r'-(\d{6,8})-']
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        folder TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        file_type TEXT NOT NULL,
+        serial_number TEXT NOT NULL DEFAULT '',
+        location TEXT NOT NULL DEFAULT '',
+        model TEXT NOT NULL DEFAULT '',
+        start_time TEXT,
+        stop_time TEXT,
+        num_log INTEGER NOT NULL DEFAULT 0,
+        error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_files_folder ON files (folder);
+    CREATE INDEX IF NOT EXISTS idx_files_serial ON files (serial_number);
+"""
+
+
+def default_index_path() -> str:
+    base_dir = os.path.join(tempfile.gettempdir(), 'water_levels_temp')
+    os.makedirs(base_dir, exist_ok=True)
+    return os.path.join(base_dir, 'xle_serial_index.db')
+
+
+def is_serial_match(file_serial: str, search_serial: str) -> bool:
+    """Flexible serial number matching (case, containment, punctuation, digits only)"""
+    if not file_serial or not search_serial:
+        return False
+
+    file_serial = file_serial.strip().upper()
+    search_serial = search_serial.strip().upper()
+    if file_serial == search_serial:
+        return True
+    if search_serial in file_serial or file_serial in search_serial:
+        return True
+
+    if re.sub(r'\W+', '', file_serial) == re.sub(r'\W+', '', search_serial):
+        return True
+
+    file_digits = ''.join(c for c in file_serial if c.isdigit())
+    search_digits = ''.join(c for c in search_serial if c.isdigit())
+    return bool(file_digits and search_digits and file_digits == search_digits)
+
+
+@dataclass
+class IndexedFile:
+    """Header summary of one logger file"""
+    path: str
+    file_type: str
+    size: int
+    mtime_ns: int
+    serial_number: str = ''
+    location: str = ''
+    model: str = ''
+    start_time: Optional[datetime] = None  # UTC for XLE files, as logged for CSV files
+    stop_time: Optional[datetime] = None
+    num_log: int = 0
+    error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def _row(self) -> tuple:
+        return (self.path, os.path.dirname(self.path), self.size, self.mtime_ns, self.file_type,
+                self.serial_number, self.location, self.model,
+                self.start_time.isoformat(sep=' ') if self.start_time else None,
+                self.stop_time.isoformat(sep=' ') if self.stop_time else None,
+                self.num_log, self.error)
+
+    @classmethod
+    def _from_row(cls, row: sqlite3.Row) -> 'IndexedFile':
+        return cls(row['path'], row['file_type'], row['size'], row['mtime_ns'], row['serial_number'],
+                   row['location'], row['model'],
+                   datetime.fromisoformat(row['start_time']) if row['start_time'] else None,
+                   datetime.fromisoformat(row['stop_time']) if row['stop_time'] else None,
+                   row['num_log'], row['error'])
+
+
+def _decode(data: bytes) -> str:
+    for encoding in ('utf-8', 'latin1'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8', errors='replace')
+
+
+def _read_head_tail(path: str, size: int) -> Tuple[bytes, bytes]:
+    with open(path, 'rb') as f:
+        if size <= HEAD_BYTES + TAIL_BYTES:
+            data = f.read()
+            return data, data
+        head = f.read(HEAD_BYTES)
+        f.seek(-TAIL_BYTES, os.SEEK_END)
+        return head, f.read()
+
+
+def read_xle_fragments(path: str, size: int) -> Tuple[str, str]:
+    """Head (through the first reading) and tail (from a complete reading) of an XLE file.
+
+    Raises:
+        ValueError: If the head or tail holds no complete reading
+    """
+    head, tail = _read_head_tail(path, size)
+    head_end = head.find(b'</Log>')
+    tail_start = tail.find(b'<Log')
+    if head_end < 0 or tail_start < 0:
+        raise ValueError("No complete readings in the head or tail")
+    return _decode(head[:head_end + len(b'</Log>')]), _decode(tail[tail_start:])
+
+
+def read_xle_header(path: str, size: int, reader: Optional[SolinstReader] = None) -> dict:
+    """Header fields of an XLE file from its first and last kilobytes"""
+    reader = reader or SolinstReader()
+    try:
+        metadata, _, _, _ = reader.read_xle_bounds(*read_xle_fragments(path, size))
+    except Exception as e:
+        # No readings, or a layout the fragment parser does not handle
+        logger.debug(f"Header parse of {path} failed, reading the whole file: {e}")
+        _, metadata = reader.read_xle(Path(path))
+    return {
+        'serial_number': (metadata.serial_number or '').strip(),
+        'location': metadata.location or '',
+        'model': metadata.instrument_type or '',
+        'start_time': metadata.start_time,
+        'stop_time': metadata.stop_time,
+        'num_log': metadata.num_log or 0,
+    }
+
+
+def _csv_timestamp(cells: List[str], date_idx: Optional[int], time_idx: Optional[int]):
+    try:
+        if date_idx is None:
+            return None
+        text = cells[date_idx].strip()
+        if time_idx is not None:
+            text = f"{text} {cells[time_idx].strip()}"
+        timestamp = pd.to_datetime(text, errors='coerce')
+        return None if pd.isna(timestamp) else timestamp.to_pydatetime()
+    except IndexError:
+        return None
+
+
+def read_csv_header(path: str, size: int) -> dict:
+    """Header fields of a Solinst CSV export from its metadata lines and first/last rows"""
+    fields = {'serial_number': '', 'location': '', 'model': 'Levelogger',
+              'start_time': None, 'stop_time': None, 'num_log': 0}
+    for pattern in _CSV_SERIAL_PATTERNS:
+        match = re.search(pattern, os.path.basename(path))
+        if match:
+            fields['serial_number'] = match.group(1)
+            break
+
+    head, tail = _read_head_tail(path, size)
+    lines = _decode(head).splitlines()
+
+    header_row = None
+    for i, line in enumerate(lines[:CSV_HEADER_LINES]):
+        upper = line.upper()
+        cells = [cell.strip().upper() for cell in line.split(',')]
+        if any(cell in ('DATE', 'TIME', 'LEVEL', 'TEMPERATURE') for cell in cells):
+            header_row = i
+            break
+        value = line.split(':', 1)[1].strip() if ':' in line else None
+        if 'SERIAL' in upper:
+            if value is None:
+                match = re.search(r'serial.*?(\d+)', line, re.IGNORECASE)
+                if match:
+                    fields['serial_number'] = match.group(1)
+            elif any(c.isdigit() for c in value):
+                fields['serial_number'] = value
+        elif 'LOCATION' in upper and value is not None:
+            fields['location'] = value
+    if header_row is None:
+        return fields
+
+    columns = [cell.strip().upper() for cell in lines[header_row].split(',')]
+    date_idx = next((i for i, c in enumerate(columns) if 'DATE' in c), None)
+    time_idx = next((i for i, c in enumerate(columns) if 'TIME' in c and 'DATE' not in c), None)
+    data_lines = [line for line in lines[header_row + 1:] if line.strip()]
+    if data_lines:
+        first_cells = data_lines[0].split(',')
+        fields['start_time'] = _csv_timestamp(first_cells, date_idx, time_idx)
+        if not fields['serial_number']:
+            for i, column in enumerate(columns):
+                if any(x in column for x in ('SERIAL', 'ID', 'NUMBER')) and i < len(first_cells):
+                    match = re.search(r'(\d{6,8})', first_cells[i])
+                    if match:
+                        fields['serial_number'] = match.group(1)
+                        break
+    tail_lines = [line for line in _decode(tail).splitlines() if line.strip()]
+    if tail_lines:
+        fields['stop_time'] = _csv_timestamp(tail_lines[-1].split(','), date_idx, time_idx)
+
+    # Row count without parsing: every line after the column header is a reading
+    with open(path, 'rb') as f:
+        newlines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+    total_lines = newlines + (0 if tail.endswith(b'\n') else 1)
+    fields['num_log'] = max(total_lines - header_row - 1, 0)
+    return fields
+
+
+def scan_file(path: str, size: int, mtime_ns: int) -> IndexedFile:
+    """Summarize one file; parse failures are recorded rather than raised"""
+    file_type = FILE_TYPES.get(os.path.splitext(path)[1].lower(), '')
+    entry = IndexedFile(path, file_type, size, mtime_ns)
+    try:
+        fields = read_xle_header(path, size) if file_type == 'XLE' else read_csv_header(path, size)
+    except Exception as e:
+        entry.error = str(e) or type(e).__name__
+        return entry
+    for key, value in fields.items():
+        setattr(entry, key, value)
+    return entry
+
+
+def _scan_batch(files: List[Tuple[str, int, int]]) -> List[IndexedFile]:
+    return [scan_file(*item) for item in files]
+
+
+def list_files(root: str, recursive: bool = True,
+               suffixes: Iterable[str] = tuple(FILE_TYPES)) -> Dict[str, Tuple[int, int]]:
+    """path -> (size, mtime_ns) of the logger files under root"""
+    suffixes = tuple(s.lower() for s in suffixes)
+    found = {}
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                stack.append(entry.path)
+                        elif entry.name.lower().endswith(suffixes):
+                            stat = entry.stat()
+                            found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError as e:
+                        logger.debug(f"Skipping {entry.path}: {e}")
+        except OSError as e:
+            logger.warning(f"Cannot list {folder}: {e}")
+    return found
+
+
+class XleSerialIndex:
+    """SQLite index of logger file headers, refreshed incrementally per folder"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or default_index_path()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    @staticmethod
+    def _normalize(root) -> str:
+        return os.path.abspath(str(root))
+
+    def _scope(self, root: str, recursive: bool) -> Tuple[str, list]:
+        """WHERE clause for the files under root (a primary key range when recursive)"""
+        if not recursive:
+            return "folder = ?", [root]
+        prefix = root.rstrip(os.sep) + os.sep
+        return "path >= ? AND path < ?", [prefix, prefix[:-1] + chr(ord(os.sep) + 1)]
+
+    def refresh(self, root, recursive: bool = True,
+                progress: Optional[Callable[[int, int], None]] = None,
+                cancelled: Optional[Callable[[], bool]] = None,
+                workers: Optional[int] = None) -> Dict[str, int]:
+        """Bring the index for root up to date; returns counts of scanned, removed and unchanged files"""
+        start = time.perf_counter()
+        root = self._normalize(root)
+        on_disk = list_files(root, recursive)
+
+        where, params = self._scope(root, recursive)
+        indexed = {row['path']: (row['size'], row['mtime_ns']) for row in
+                   self._conn.execute(f"SELECT path, size, mtime_ns FROM files WHERE {where}", params)}
+        removed = [path for path in indexed if path not in on_disk]
+        pending = [(path, size, mtime) for path, (size, mtime) in on_disk.items()
+                   if indexed.get(path) != (size, mtime)]
+
+        with self._conn:
+            self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+
+        scanned = 0
+        total = len(pending)
+        batch = []
+
+        def store(entries: List[IndexedFile]):
+            nonlocal scanned
+            batch.extend(entries)
+            scanned += len(entries)
+            if len(batch) >= COMMIT_EVERY:
+                self._store(batch)
+                batch.clear()
+            if progress:
+                progress(scanned, total)
+
+        if total < PARALLEL_MIN_FILES or workers == 1:
+            for item in pending:
+                if cancelled and cancelled():
+                    break
+                store([scan_file(*item)])
+        else:
+            workers = workers or min(8, os.cpu_count() or 1)
+            chunk = max(1, min(64, total // (workers * 4)))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_scan_batch, pending[i:i + chunk]) for i in range(0, total, chunk)]
+                for future in as_completed(futures):
+                    if cancelled and cancelled():
+                        for other in futures:
+                            other.cancel()
+                        break
+                    store(future.result())
+        self._store(batch)
+
+        logger.debug(f"PERF: Indexed {scanned} of {total} changed files under {root} "
+                     f"({len(removed)} removed) in {(time.perf_counter() - start) * 1000:.2f}ms")
+        return {'scanned': scanned, 'removed': len(removed), 'unchanged': len(on_disk) - total}
+
+    def _store(self, entries: List[IndexedFile]):
+        if not entries:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, folder, size, mtime_ns, file_type, serial_number, location, "
+                "model, start_time, stop_time, num_log, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [entry._row() for entry in entries])
+
+    def search(self, root, serial_number: str, recursive: bool = True,
+               file_types: Iterable[str] = ('XLE', 'CSV')) -> List[IndexedFile]:
+        """Indexed files under root whose serial number matches"""
+        start = time.perf_counter()
+        root = self._normalize(root)
+        where, params = self._scope(root, recursive)
+        file_types = list(file_types)
+        where += f" AND file_type IN ({', '.join('?' * len(file_types))})"
+        params += file_types
+
+        serials = [row[0] for row in self._conn.execute(
+            f"SELECT DISTINCT serial_number FROM files WHERE {where}", params)]
+        matching = [serial for serial in serials if is_serial_match(serial, serial_number)]
+        if not matching:
+            return []
+        rows = self._conn.execute(
+            f"SELECT * FROM files WHERE {where} AND serial_number IN ({', '.join('?' * len(matching))}) "
+            f"ORDER BY path", params + matching).fetchall()
+        logger.debug(f"PERF: Serial search for {serial_number} found {len(rows)} files in "
+                     f"{(time.perf_counter() - start) * 1000:.2f}ms")
+        return [IndexedFile._from_row(row) for row in rows]
+
+    def count(self, root, recursive: bool = True, file_types: Iterable[str] = ('XLE', 'CSV')) -> int:
+        where, params = self._scope(self._normalize(root), recursive)
+        file_types = list(file_types)
+        where += f" AND file_type IN ({', '.join('?' * len(file_types))})"
+        return self._conn.execute(f"SELECT COUNT(*) FROM files WHERE {where}", params + file_types).fetchone()[0]
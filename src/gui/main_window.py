@@ -6,9 +6,7 @@ import shutil
 import subprocess  # Add this import for the subprocess module
 import time
 from pathlib import Path
-import pandas as pd
 import logging
-import matplotlib
 from PyQt5.QtGui import QIcon, QResizeEvent, QMoveEvent, QScreen
 from PyQt5.QtWidgets import (
     QAction, QDialog, QProgressDialog, QMainWindow, QInputDialog, QTabWidget, 
@@ -16,45 +14,44 @@ from PyQt5.QtWidgets import (
     QPushButton, QFileDialog, QMessageBox, QSizePolicy, QMenu,
     QFrame  # Added QFrame to the imports
 )
-from PyQt5.QtCore import QTimer, Qt, QUrl, QEvent
+from PyQt5.QtCore import QTimer, Qt, QUrl, QEvent, pyqtSignal
 from PyQt5.QtWidgets import QApplication
 import json
-from googleapiclient.http import MediaIoBaseDownload
-from .handlers.auto_update_handler import AutoUpdateHandler
-# Configure matplotlib once at startup
-matplotlib.rcParams['font.family'] = 'DejaVu Sans'
-matplotlib.rcParams['font.size'] = 10
-
-from .tabs.database_tab import DatabaseTab
-from .tabs.barologger_tab import BarologgerTab
-from .tabs.water_level_tab import WaterLevelTab
-from .tabs.recharge.recharge_tab import RechargeTab
-from .tabs.water_level_runs_tab import WaterLevelRunsTab
+
+# Tabs, the Google API client, matplotlib and rarely used dialogs are
+# imported where they are first needed to keep startup fast
 from ..database.manager import DatabaseManager
 from .handlers.settings_handler import SettingsHandler
-# Legacy Google Drive dialog - replaced by UnifiedCredentialsDialog
-# from .dialogs.google_drive_settings_dialog import GoogleDriveSettingsDialog
-from .dialogs.monet_settings_dialog import MonetSettingsDialog  # Import the new dialog
-from .handlers.google_drive_db_handler import GoogleDriveDatabaseHandler
 from .handlers.google_drive_service import GoogleDriveService
-from .handlers.cloud_database_handler import CloudDatabaseHandler
 from .handlers.user_auth_service import UserAuthService
 from .dialogs.login_dialog import LoginDialog
-from .dialogs.user_management_dialog import UserManagementDialog
-from .dialogs.save_to_cloud_dialog import SaveToCloudDialog
 from .handlers.progress_dialog_handler import progress_dialog
 from .handlers.style_handler import StyleHandler  # Import the style handler
-from .dialogs.application_help_system import ApplicationHelpSystem
 from .handlers.auto_updater import AutoUpdater
-from .handlers.version_checker import VersionChecker
-from .dialogs.unified_credentials_dialog import UnifiedCredentialsDialog
-from .dialogs.draft_selection_dialog import DraftSelectionDialog
+from .handlers.deferred_startup import LazyTabLoader, StartupStages, startup_timer
+from .handlers.cloud_lock_service import well_lock_key
 
 logger = logging.getLogger(__name__)
 
+_matplotlib_configured = False
+
+
+def _configure_matplotlib():
+    """Apply the application's matplotlib defaults before the first plot is created"""
+    global _matplotlib_configured
+    if _matplotlib_configured:
+        return
+    import matplotlib
+    matplotlib.rcParams['font.family'] = 'DejaVu Sans'
+    matplotlib.rcParams['font.size'] = 10
+    _matplotlib_configured = True
+
+
 class MainWindow(QMainWindow):
     """Main application window with tab-based interface for water level monitoring."""
     
+    cloud_lock_lost = pyqtSignal(str, str)  # Lock key, reason; emitted from the lock heartbeat thread
+    
     def __init__(self):
         """Initialize the main window"""
         super().__init__()
@@ -77,6 +74,10 @@ class MainWindow(QMainWindow):
         if hasattr(self.db_manager, 'database_modified'):
             self.db_manager.database_modified.connect(self.mark_database_modified)
         
+        # Leases on the open cloud project: a lost lease blocks cloud saves
+        self.cloud_lock_lost.connect(self._on_cloud_lock_lost)
+        self._reset_cloud_lock_state()
+        
         # Initialize Google Drive service
         self.drive_service = GoogleDriveService.get_instance(self.settings_handler)
         
@@ -91,6 +92,8 @@ class MainWindow(QMainWindow):
         config_dir = Path.cwd() / "config"
         config_dir.mkdir(exist_ok=True)  # Ensure config directory exists
         users_db_path = config_dir / "users.db"
+        # Resolved now because the working directory changes to the database folder later
+        self._startup_history_path = config_dir / "startup_timings.jsonl"
         logger.info(f"Using users database path: {users_db_path}")
         self.user_auth_service = UserAuthService.get_instance(self.drive_service, self.settings_handler, str(users_db_path))
         
@@ -138,8 +141,11 @@ class MainWindow(QMainWindow):
         # Progress dialog will be created after successful login
         self.progress_dialog = None
         
-        # Show login dialog
-        if not self.show_login_dialog():
+        # Show login dialog (time spent typing credentials is not startup time)
+        startup_timer.mark("main window built")
+        with startup_timer.phase("login dialog", user_wait=True):
+            logged_in = self.show_login_dialog()
+        if not logged_in:
             # Exit if login fails
             sys.exit(0)
             
@@ -163,17 +169,30 @@ class MainWindow(QMainWindow):
         # Log successful initialization
         self.logger.info("Main window initialized successfully")
         
-        # Initialize Google Drive with service account (no user login needed)
+        # The remaining startup work runs in stages once the window has been painted
+        self.startup_stages = StartupStages(startup_timer, self)
+        self.startup_stages.add("build current tab", self.tab_loader.activate)
+        self.startup_stages.add("authenticate Google Drive", self._stage_authenticate_google_drive)
+        self.startup_stages.add("finish initialization", self._finish_initialization)
+        self.startup_stages.finished.connect(
+            lambda: startup_timer.report(self._startup_history_path))
         self.progress_dialog.setValue(20)
         self.progress_dialog.setLabelText("Initializing Google Drive...")
+    
+    def showEvent(self, event):
+        """Start the deferred startup stages after the window is first shown"""
+        super().showEvent(event)
+        if hasattr(self, 'startup_stages') and not self.startup_stages.started:
+            # A zero timeout fires after the pending paint events are processed
+            QTimer.singleShot(0, self.startup_stages.start)
+    
+    def _stage_authenticate_google_drive(self):
+        """Authenticate Google Drive with the service account (no user login needed)"""
         # Pass force=True to ensure authentication happens
-        QTimer.singleShot(100, lambda: self.authenticate_google_drive(force=True))
-        
-        self.progress_dialog.setValue(40)
-        self.progress_dialog.setLabelText("Setting up application menu...")
-        
-        # Schedule the progress dialog to close and load database
-        QTimer.singleShot(500, self._finish_initialization)
+        self.authenticate_google_drive(force=True)
+        if self.progress_dialog:
+            self.progress_dialog.setValue(40)
+            self.progress_dialog.setLabelText("Setting up application menu...")
     
     def show_login_dialog(self):
         """Show the login dialog and handle authentication"""
@@ -321,6 +340,8 @@ class MainWindow(QMainWindow):
                     self.settings_handler.set_setting("google_drive_folder_id", folder_id)
                 
                 # Initialize Google Drive database handler
+                from .handlers.google_drive_db_handler import GoogleDriveDatabaseHandler
+                from .handlers.cloud_database_handler import CloudDatabaseHandler
                 self.drive_db_handler = GoogleDriveDatabaseHandler(self.settings_handler)
                 if self.drive_db_handler.authenticate():
                     logger.info("Successfully authenticated with Google Drive")
@@ -571,7 +592,9 @@ class MainWindow(QMainWindow):
         """)
         self.tab_widget.currentChanged.connect(self._handle_tab_change)
         
-        # Add tabs
+        # Add tabs; each is built the first time it is shown
+        self.tab_loader = LazyTabLoader(self.tab_widget, self._tabs, startup_timer, self)
+        self.tab_loader.tab_built.connect(self._on_tab_built)
         self._add_database_tab()
         self._add_barologger_tab()
         self._add_water_level_tab()
@@ -954,6 +977,7 @@ class MainWindow(QMainWindow):
             return
         
         # Reset cloud state
+        self._release_cloud_project_lock()
         self.db_manager.reset_cloud_state()
         self._update_cloud_ui(False)
         
@@ -994,6 +1018,7 @@ class MainWindow(QMainWindow):
                     return  # Save failed, don't switch
             elif reply == QMessageBox.Cancel:
                 return
+        self._release_cloud_project_lock()
                 
         # Get project info
         cloud_projects = self.cloud_db_handler.list_projects()
@@ -1017,6 +1042,7 @@ class MainWindow(QMainWindow):
             draft_info = self.cloud_db_handler.get_draft_info(project_name)
             
             # Show enhanced draft selection dialog
+            from .dialogs.draft_selection_dialog import DraftSelectionDialog
             dialog = DraftSelectionDialog(
                 project_name,
                 draft_info,
@@ -1075,6 +1101,7 @@ class MainWindow(QMainWindow):
                             
                             # Update UI
                             self._update_cloud_ui(True, project_name)
+                            self._reset_cloud_lock_state()
                             
                             # Determine display name and complete opening
                             version_status = version_comparison.get('message', '')
@@ -1134,8 +1161,11 @@ class MainWindow(QMainWindow):
         # Open as cloud database
         self.db_manager.open_cloud_database(temp_path, project_name, project_info)
         
-        # Store download time for draft version tracking
-        self.db_manager.cloud_download_time = project_info.get('modified_time', '')
+        # Store the version the copy came from; saves are refused once Drive has moved past it
+        if prefer_draft and has_draft:
+            self.db_manager.cloud_download_time = draft_info.get('original_download_time') or ''
+        else:
+            self.db_manager.cloud_download_time = project_info.get('modified_time', '')
         
         # Update version tracking for downloaded database
         if not prefer_draft:  # Only track downloads, not draft loads
@@ -1157,6 +1187,7 @@ class MainWindow(QMainWindow):
         
         # Update UI for cloud mode
         self._update_cloud_ui(True, project_name)
+        self._reset_cloud_lock_state()
         
         # Determine display name based on whether draft was loaded
         if prefer_draft and has_draft:
@@ -1254,6 +1285,68 @@ class MainWindow(QMainWindow):
         else:
             self.save_cloud_btn.setVisible(False)
             self.cloud_mode_label.setText("")
+    
+    def _reset_cloud_lock_state(self):
+        """Forget the edits and lost leases of the previous cloud project"""
+        self._cloud_save_blocked = None  # Lease that was lost, if any
+        self._cloud_edited_wells = set()  # Wells with unsaved edits made under their lease
+        self._cloud_edits_outside_leases = False  # Unsaved edits no lease covers; saves cannot merge them
+    
+    def _is_open_cloud_project(self) -> bool:
+        return bool(getattr(self, 'cloud_db_handler', None) and self.db_manager.is_cloud_database
+                    and self.db_manager.cloud_project_info)
+    
+    def hold_cloud_well_lock(self, well_number: str) -> bool:
+        """
+        Take the lease on a well of the open cloud project before editing it.
+        
+        Returns:
+            False if another user is editing the well (the user has been told)
+        """
+        if not self._is_open_cloud_project():
+            return True
+        current_user = self.user_auth_service.current_user or "Unknown User"
+        held, holder = self.cloud_db_handler.hold_lock(
+            self.db_manager.cloud_project_info, current_user, well_lock_key(well_number),
+            on_lost=lambda lease: self.cloud_lock_lost.emit(lease.key, lease.lost_reason))
+        if not held and holder:
+            QMessageBox.information(
+                self, "Well In Use",
+                f"Well {well_number} is being edited by {holder}.\n\n"
+                "Try again after they save their changes or close the project.")
+            return False
+        return True
+    
+    def end_cloud_well_edit(self, well_number: str, changed: bool):
+        """Keep a well's lease until its edits are saved to the cloud, or give it up if nothing changed"""
+        if not self._is_open_cloud_project():
+            return
+        project_info = self.db_manager.cloud_project_info
+        key = well_lock_key(well_number)
+        if changed:
+            leased = self.cloud_db_handler.holds_lock(project_info, key)
+            if leased:
+                self._cloud_edited_wells.add(well_number)
+            self.mark_database_modified(outside_leases=not leased)
+        elif well_number not in self._cloud_edited_wells:
+            self.cloud_db_handler.release_lock(project_info, key)
+    
+    def _on_cloud_lock_lost(self, key: str, reason: str):
+        """Block cloud saves after a lease on the open project expired or was taken over"""
+        if not self._is_open_cloud_project():
+            return
+        self._cloud_save_blocked = key
+        self.save_cloud_btn.setEnabled(False)
+        QMessageBox.warning(
+            self, "Cloud Lock Lost",
+            f"Your lock on {key.replace(':', ' ')} was lost: {reason}.\n\n"
+            "Another user may be editing it, so saving to the cloud is disabled. "
+            "Reopen the project before making further changes.")
+    
+    def _release_cloud_project_lock(self):
+        """Give up the leases held on the open cloud project"""
+        if self.cloud_db_handler and self.db_manager.is_cloud_database and self.db_manager.cloud_project_info:
+            self.cloud_db_handler.release_lock(self.db_manager.cloud_project_info)
                     
     def _update_runs_tab_style(self, is_enabled: bool):
         """Update the visual style of the runs tab based on enabled/disabled state"""
@@ -1319,11 +1412,19 @@ class MainWindow(QMainWindow):
         if not self.db_manager.is_cloud_modified:
             QMessageBox.information(self, "No Changes", "No changes to save.")
             return True
+        
+        if self._cloud_save_blocked:
+            QMessageBox.warning(
+                self, "Cloud Save Blocked",
+                f"Your lock on {self._cloud_save_blocked.replace(':', ' ')} was lost, so these changes "
+                "could overwrite another user's work.\n\nReopen the project before saving to the cloud.")
+            return False
             
         # Get current user
         current_user = self.user_auth_service.current_user or "Unknown User"
         
         # Show save dialog
+        from .dialogs.save_to_cloud_dialog import SaveToCloudDialog
         dialog = SaveToCloudDialog(
             self.db_manager.cloud_project_name,
             current_user,
@@ -1361,12 +1462,27 @@ class MainWindow(QMainWindow):
             current_user,
             changes_desc,
             self.db_manager.change_tracker,
-            save_progress_callback
+            save_progress_callback,
+            base_version=getattr(self.db_manager, 'cloud_download_time', None),
+            allow_merge=not self._cloud_edits_outside_leases
         )
         
         progress_dialog.close()
         
         if success:
+            # The edits are uploaded, so their well leases are no longer needed
+            self._release_cloud_project_lock()
+            self._cloud_edited_wells.clear()
+            self._cloud_edits_outside_leases = False
+            if self.cloud_db_handler.last_save_merged:
+                # The local copy now includes changes other users saved
+                for tab_name in ("database", "water_level"):
+                    if tab_name in self._tabs:
+                        try:
+                            self._tabs[tab_name].refresh_data()
+                        except Exception as e:
+                            logger.debug(f"{tab_name} tab refresh after merge: {e}")
+            
             # Update UI
             self.db_manager.is_cloud_modified = False
             self.save_cloud_btn.setEnabled(False)
@@ -1383,18 +1499,20 @@ class MainWindow(QMainWindow):
             
             # Get ACTUAL Google Drive timestamp after upload (not generated timestamp)
             try:
-                # Small delay to ensure Google Drive has processed the upload
-                import time
-                time.sleep(1)
-                
-                # Get fresh project list to get latest timestamps
-                cloud_projects = self.cloud_db_handler.list_projects()
-                actual_cloud_time = None
-                for project in cloud_projects:
-                    if project['name'] == self.db_manager.cloud_project_name:
-                        actual_cloud_time = project.get('modified_time', '')
-                        break
-                
+                # save_database records the uploaded version in the project info
+                actual_cloud_time = self.db_manager.cloud_project_info.get('modified_time')
+                if not actual_cloud_time:
+                    # Small delay to ensure Google Drive has processed the upload
+                    import time
+                    time.sleep(1)
+
+                    # Get fresh project list to get latest timestamps
+                    cloud_projects = self.cloud_db_handler.list_projects()
+                    for project in cloud_projects:
+                        if project['name'] == self.db_manager.cloud_project_name:
+                            actual_cloud_time = project.get('modified_time', '')
+                            break
+
                 if actual_cloud_time:
                     self.db_manager.cloud_download_time = actual_cloud_time
                     
@@ -1494,151 +1612,30 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Sync Failed", 
                               "Failed to sync database with Google Drive. Please try again later.")
 
+    def _on_tab_built(self, key, tab):
+        """Bring a tab built after a database was opened up to date with it"""
+        if key == "recharge" and self.db_manager.current_db:
+            try:
+                tab.sync_database_selection("CAESER_GENERAL")
+            except Exception as e:
+                logger.debug(f"Recharge tab refresh: {e}")
+
     def _handle_tab_change(self, index):
-        """Handle tab changes with lazy loading of content."""
+        """Build a tab's content the first time it is shown."""
         # First check if we're in cleanup mode or if tab_widget has been deleted
         if not hasattr(self, 'tab_widget') or self.tab_widget is None:
             logger.debug("Tab widget no longer exists, skipping tab change handling")
             return
-
-        # Check if we're in initialization phase
-        if self._initialization_phase:
-            logger.debug(f"Tab change during initialization phase, skipping progress dialog for tab {index}")
-            return
         
-        if index not in self._tabs:
-            tab_widget = self.tab_widget.widget(index)
-            if tab_widget is None:
-                logger.debug(f"No widget found for tab index {index}, skipping")
-                return
-            
-            if tab_widget.layout() is None:
-                # Show loading indicator
-                progress = QProgressDialog(f"Loading tab content...", None, 0, 100, self)
-                progress.setWindowTitle("Loading")
-                progress.setWindowModality(Qt.WindowModal)
-                progress.setCancelButton(None)
-                # Set fixed size to prevent random expansion
-                progress.setFixedSize(400, 100)
-                # Ensure consistent styling
-                progress.setStyleSheet("""
-                    QProgressDialog {
-                        background-color: #f0f0f0;
-                        border: 1px solid #ccc;
-                        border-radius: 5px;
-                    }
-                    QProgressBar {
-                        border: 1px solid #aaa;
-                        border-radius: 3px;
-                        background-color: #fff;
-                        text-align: center;
-                    }
-                    QProgressBar::chunk {
-                        background-color: #2196F3;
-                        width: 10px;
-                        margin: 0.5px;
-                    }
-                """)
-                progress.setValue(10)
-                
-                tab_layout = QVBoxLayout(tab_widget)
-                
-                # Create appropriate tab content
-                try:
-                    progress.setValue(30)
-                    tab_content = None
-                    if index == 0:
-                        progress.setLabelText("Loading Wells tab...")
-                        tab_content = DatabaseTab(self.db_manager)
-                    elif index == 1:
-                        progress.setLabelText("Loading Barometric Data tab...")
-                        tab_content = BarologgerTab(self.db_manager)
-                        progress.setValue(50)
-                        # The barologger tab will handle its own data loading in initial_data_load
-                    elif index == 2:
-                        progress.setLabelText("Loading Water Levels tab...")
-                        tab_content = WaterLevelTab(self.db_manager)
-                    elif index == 3:
-                        progress.setLabelText("Loading Runs tab...")
-                        tab_content = WaterLevelRunsTab(self.db_manager)
-                    
-                    progress.setValue(70)
-                    
-                    if tab_content:
-                        tab_layout.addWidget(tab_content)
-                        self._tabs[index] = tab_content
-                        logger.debug(f"Loaded tab content for index {index}")
-                    
-                    progress.setValue(100)
-                    # Add a small delay before closing to make progress visible
-                    QTimer.singleShot(300, progress.close)
-                    
-                except Exception as e:
-                    logger.error(f"Error loading tab content for index {index}: {e}")
-                    error_label = QLabel(f"Error loading tab content: {str(e)}")
-                    error_label.setStyleSheet("color: red;")
-                    tab_layout.addWidget(error_label)
-                    progress.close()
-        else:
-            # Tab already loaded, show a progress dialog for data refresh
-            tab_content = self._tabs[index]
-            
-            # Show loading indicator for data refresh
-            progress = QProgressDialog(f"Refreshing tab data...", None, 0, 100, self)
-            progress.setWindowTitle("Loading")
-            progress.setWindowModality(Qt.WindowModal)
-            progress.setCancelButton(None)
-            progress.setFixedSize(400, 100)
-            progress.setStyleSheet("""
-                QProgressDialog {
-                    background-color: #f0f0f0;
-                    border: 1px solid #ccc;
-                    border-radius: 5px;
-                }
-                QProgressBar {
-                    border: 1px solid #aaa;
-                    border-radius: 3px;
-                    background-color: #fff;
-                    text-align: center;
-                }
-                QProgressBar::chunk {
-                    background-color: #2196F3;
-                    width: 10px;
-                    margin: 0.5px;
-                }
-            """)
-            progress.setValue(10)
-            
-            try:
-                # Update progress
-                progress.setValue(30)
-                
-                # Set appropriate label based on tab type
-                if index == 0:
-                    progress.setLabelText("Refreshing Wells data...")
-                elif index == 1:
-                    progress.setLabelText("Refreshing Barometric data...")
-                elif index == 2:
-                    progress.setLabelText("Refreshing Water Levels data...")
-                elif index == 3:
-                    progress.setLabelText("Refreshing Runs data...")
-                
-                # Update progress
-                progress.setValue(50)
-                
-                # Let the tab handle its own refresh if it has a refresh method
-                if hasattr(tab_content, 'refresh_data') and callable(tab_content.refresh_data):
-                    tab_content.refresh_data()
-                
-                # Update progress
-                progress.setValue(100)
-                # Add a small delay before closing to make progress visible
-                QTimer.singleShot(300, progress.close)
-                
-            except Exception as e:
-                logger.error(f"Error refreshing tab content for index {index}: {e}")
-                progress.close()
-                QMessageBox.warning(self, "Refresh Error", f"Error refreshing tab data: {str(e)}")
+        # Before the first paint the loader is inactive; the startup stages build the current tab
+        if not hasattr(self, 'tab_loader'):
+            return
+        key = self.tab_loader.key_at(index)
+        if key and not self.tab_loader.is_built(key) and self.tab_loader.active:
+            self.status_bar.showMessage(f"Loading {self.tab_widget.tabText(index)} tab...")
+            QApplication.processEvents()
+            self.tab_loader.ensure(key)
+            self.status_bar.clearMessage()
 
     def center_window(self):
         """Center the window on the current screen."""
@@ -1686,6 +1683,7 @@ class MainWindow(QMainWindow):
             
             # Clean up cloud database resources
             if hasattr(self, 'cloud_db_handler') and self.cloud_db_handler:
+                self._release_cloud_project_lock()
                 self.cloud_db_handler.cleanup_temp_files()
                 
             # Explicitly disconnect from Google Drive before closing
@@ -2174,6 +2172,7 @@ class MainWindow(QMainWindow):
 
     def open_monet_settings(self):
         """Open the Monet API settings dialog"""
+        from .dialogs.monet_settings_dialog import MonetSettingsDialog
         dialog = MonetSettingsDialog(self.settings_handler, self)
         if dialog.exec_() == QDialog.Accepted:
             # Update the Monet status after saving settings
@@ -2193,6 +2192,7 @@ class MainWindow(QMainWindow):
     def auto_sync_barologgers(self):
         """Run guided or automatic sync for barologger XLE files with Google Drive integration"""
         # Initialize handler if needed
+        from .handlers.auto_update_handler import AutoUpdateHandler
         if self.auto_update_handler is None:
             self.auto_update_handler = AutoUpdateHandler(
                 parent=self, 
@@ -2202,12 +2202,16 @@ class MainWindow(QMainWindow):
                 tabs=self._tabs
             )
         
+        # The handler processes files through the barologger tab
+        self.tab_loader.ensure("barologger")
+        
         # Delegate to the handler
         self.auto_update_handler.auto_sync_barologgers()
     
     def auto_sync_water_levels(self):
         """Run guided or automatic sync for water level XLE files with Google Drive integration"""
         # Initialize handler if needed
+        from .handlers.auto_update_handler import AutoUpdateHandler
         if self.auto_update_handler is None:
             self.auto_update_handler = AutoUpdateHandler(
                 parent=self, 
@@ -2217,6 +2221,9 @@ class MainWindow(QMainWindow):
                 tabs=self._tabs
             )
         
+        # The handler processes files through the water level tab
+        self.tab_loader.ensure("water_level")
+        
         # Delegate to the handler
         self.auto_update_handler.auto_sync_water_levels()
     
@@ -2257,6 +2264,7 @@ class MainWindow(QMainWindow):
     def show_user_management(self):
         """Show the user management dialog"""
         try:
+            from .dialogs.user_management_dialog import UserManagementDialog
             dialog = UserManagementDialog(self.user_auth_service, self)
             dialog.exec_()
         except Exception as e:
@@ -2758,7 +2766,7 @@ class MainWindow(QMainWindow):
                         self.status_bar.showMessage("Database folder changed. Select a database from the dropdown to load it.", 5000)
                     
                     # Switch to Database tab
-                    index = self.tab_widget.indexOf(self._tabs.get("database"))
+                    index = self.tab_loader.index_of("database")
                     if index != -1:
                         self.tab_widget.setCurrentIndex(index)
                         
@@ -2772,34 +2780,43 @@ class MainWindow(QMainWindow):
 
     def _add_database_tab(self):
         """Add the database tab"""
-        tab = DatabaseTab(self.db_manager)
-        self._tabs["database"] = tab
-        self.tab_widget.addTab(tab, "Wells")
+        def create():
+            _configure_matplotlib()
+            from .tabs.database_tab import DatabaseTab
+            return DatabaseTab(self.db_manager)
+        self.tab_loader.add_tab("database", "Wells", create)
         
     def _add_barologger_tab(self):
         """Add the barologger tab"""
-        tab = BarologgerTab(self.db_manager)
-        self._tabs["barologger"] = tab
-        self.tab_widget.addTab(tab, "Barometric Data")
+        def create():
+            _configure_matplotlib()
+            from .tabs.barologger_tab import BarologgerTab
+            return BarologgerTab(self.db_manager)
+        self.tab_loader.add_tab("barologger", "Barometric Data", create)
         
     def _add_water_level_tab(self):
         """Add the water level tab"""
-        tab = WaterLevelTab(self.db_manager)
-        self._tabs["water_level"] = tab
-        self.tab_widget.addTab(tab, "Water Levels")
+        def create():
+            _configure_matplotlib()
+            from .tabs.water_level_tab import WaterLevelTab
+            return WaterLevelTab(self.db_manager)
+        self.tab_loader.add_tab("water_level", "Water Levels", create)
         
     def _add_recharge_tab(self):
         """Add the recharge tab"""
-        tab = RechargeTab(self.db_manager)
-        self._tabs["recharge"] = tab
-        self.tab_widget.addTab(tab, "Recharge")
+        def create():
+            _configure_matplotlib()
+            from .tabs.recharge.recharge_tab import RechargeTab
+            return RechargeTab(self.db_manager)
+        self.tab_loader.add_tab("recharge", "Recharge", create)
         
     def _add_water_level_runs_tab(self):
         """Add the water level runs tab"""
         # Always add the Runs tab, removing the guest check
-        tab = WaterLevelRunsTab(self.db_manager)
-        self._tabs["water_level_runs"] = tab
-        self.tab_widget.addTab(tab, "Runs")
+        def create():
+            from .tabs.water_level_runs_tab import WaterLevelRunsTab
+            return WaterLevelRunsTab(self.db_manager)
+        self.tab_loader.add_tab("water_level_runs", "Runs", create)
 
     def _finish_initialization(self):
         """Complete the initialization process after the UI is shown"""
@@ -2959,6 +2976,7 @@ class MainWindow(QMainWindow):
             self.progress_dialog.setLabelText("Finalizing application setup...")
             
             # Initialize AutoUpdateHandler now that tabs are setup
+            from .handlers.auto_update_handler import AutoUpdateHandler
             if self.auto_update_handler is None:
                 self.auto_update_handler = AutoUpdateHandler(
                     parent=self, 
@@ -3016,6 +3034,7 @@ class MainWindow(QMainWindow):
     def open_help_system(self):
         """Open the application help system"""
         try:
+            from .dialogs.application_help_system import ApplicationHelpSystem
             help_system = ApplicationHelpSystem(self)
             help_system.show()
             logger.info("Application help system opened")
@@ -3128,6 +3147,7 @@ Click 'Check for Updates' in the Update menu to manually check for newer version
     def _check_credentials_on_startup(self):
         """Check for Google Drive credentials on startup"""
         try:
+            from .dialogs.unified_credentials_dialog import UnifiedCredentialsDialog
             if not UnifiedCredentialsDialog.check_credentials_configured(self.settings_handler):
                 logger.info("Google Drive credentials not configured, showing setup dialog")
                 
@@ -3154,6 +3174,7 @@ Click 'Check for Updates' in the Update menu to manually check for newer version
     def setup_credentials(self):
         """Open unified credentials setup dialog manually"""
         try:
+            from .dialogs.unified_credentials_dialog import UnifiedCredentialsDialog
             dialog = UnifiedCredentialsDialog(self.settings_handler, self)
             result = dialog.exec_()
             
@@ -3172,6 +3193,8 @@ Click 'Check for Updates' in the Update menu to manually check for newer version
                         logger.info("Reinitializing Google Drive components after credential setup")
                         
                         # Initialize Cloud database handler
+                        from .handlers.cloud_database_handler import CloudDatabaseHandler
+                        from .handlers.google_drive_db_handler import GoogleDriveDatabaseHandler
                         self.cloud_db_handler = CloudDatabaseHandler(self.drive_service, self.settings_handler)
                         
                         # Initialize Google Drive database handler
@@ -3226,13 +3249,21 @@ Click 'Check for Updates' in the Update menu to manually check for newer version
             logger.error(f"Error opening credentials setup: {e}")
             QMessageBox.critical(self, "Error", f"Failed to open credentials setup: {str(e)}")
 
-    def mark_database_modified(self):
-        """Mark the current database as having unsaved changes."""
+    def mark_database_modified(self, outside_leases: bool = True):
+        """
+        Mark the current database as having unsaved changes.
+        
+        Args:
+            outside_leases: The change is not covered by a well lease, so a cloud
+                save cannot merge it into a newer version on Drive
+        """
         if self.db_manager and self.db_manager.current_db:
             # Handle cloud database modifications
             if self.db_manager.is_cloud_database:
                 self.db_manager.is_cloud_modified = True
-                self.save_cloud_btn.setEnabled(True)
+                if outside_leases:
+                    self._cloud_edits_outside_leases = True
+                self.save_cloud_btn.setEnabled(not self._cloud_save_blocked)
                 self.cloud_mode_label.setText(f"Cloud: {self.db_manager.cloud_project_name} (MODIFIED)")
             elif self.db_manager.is_google_drive_db:
                 self.db_manager._modified_since_sync = True
@@ -1,7 +1,6 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QComboBox, QLabel, QGroupBox
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from PyQt5.QtCore import QUrl, QTimer  # Add QTimer
-from folium import Map, Marker, Icon  # Add Icon import
 from io import BytesIO
 import base64
 import sqlite3
@@ -20,17 +19,28 @@ import logging
 import subprocess
 import json
 import sys
+import html
 from ..dialogs.application_help_system import ApplicationHelpSystem
+from ..handlers.live_map import LiveMapController, select_well_link, well_feature
 
 logger = logging.getLogger(__name__)
 
+# Leaflet awesome-markers palette, as used by the folium icons this map replaced
+MARKER_COLORS = {
+    'green': '#72b026',
+    'red': '#d63e2a',
+    'orange': '#f69730',
+    'purple': '#d252b9',
+    'blue': '#38aadd',
+}
+
 class DatabaseTab(QWidget):
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db_manager = db_manager
         self.db_manager.database_changed.connect(self.sync_database_selection)
         self.current_dir = Path(__file__).parent.parent.parent.parent
-        self.current_map_file = None  # Track current map file
+        self._map_database = None  # Database whose wells the map was last fitted to
         self.init_ui()
 
     def init_ui(self):
@@ -42,8 +52,9 @@ class DatabaseTab(QWidget):
         self.map_view = QWebEngineView()
         self.map_view.setMinimumSize(800, 500)
         
-        # Set up web channel BEFORE loading the map
-        self.setup_web_channel()
+        # The map page is loaded once, wells are then sent to it as diffs
+        self.live_map = LiveMapController(self.map_view, self)
+        self.live_map.well_selected.connect(self.open_data_visualizer)
         
         layout.addWidget(self.map_view, stretch=1)
         self.setLayout(layout)
@@ -100,77 +111,6 @@ class DatabaseTab(QWidget):
     
         self.load_existing_databases()
 
-    def setup_web_channel(self):
-        """Setup communication between folium map and PyQt to send well data."""
-        from PyQt5.QtWebChannel import QWebChannel
-        from PyQt5.QtCore import QObject, pyqtSlot
-    
-        class WebBridge(QObject):
-            """Bridge class to handle messages from JavaScript."""
-            def __init__(self, parent):
-                super().__init__(parent)
-                self.parent = parent
-    
-            @pyqtSlot(str)
-            def sendData(self, well_number):
-                """Handle well selection and update the graph."""
-                # Update the graph in the tab
-                self.parent.update_graph(well_number)
-                
-                # Also open the data visualizer dialog with this well pre-selected
-                self.parent.open_data_visualizer(well_number)
-    
-        self.bridge = WebBridge(self)
-        self.channel = QWebChannel()
-        self.channel.registerObject("pywebchannel", self.bridge)
-        self.map_view.page().setWebChannel(self.channel)
-        
-        # Connect to the loadFinished signal to inject JavaScript after page load
-        self.map_view.loadFinished.connect(self._inject_web_channel_js)
-
-    def _inject_web_channel_js(self, ok):
-        """Inject the QWebChannel JavaScript code after the page is loaded."""
-        if ok:
-            try:
-                # First inject the QWebChannel JavaScript library
-                from PyQt5.QtCore import QFile, QIODevice
-                from PyQt5.QtWebChannel import QWebChannel
-                
-                # Find the qwebchannel.js file from PyQt resources
-                qwebchannel_js = QFile(':/qtwebchannel/qwebchannel.js')
-                if qwebchannel_js.open(QIODevice.ReadOnly):
-                    # Read the JavaScript content
-                    js_bytes = qwebchannel_js.readAll()
-                    js_string = str(js_bytes, 'utf-8')
-                    qwebchannel_js.close()
-                    
-                    # First inject the QWebChannel library JavaScript
-                    self.map_view.page().runJavaScript(js_string)
-                    logger.debug("Injected QWebChannel JavaScript library")
-                    
-                    # Then inject our connection code with a slight delay to ensure the library is loaded
-                    QTimer.singleShot(200, lambda: self._inject_connection_code())
-                else:
-                    logger.error("Could not open qwebchannel.js resource file")
-                    # Try to inject connection code directly anyway
-                    self._inject_connection_code()
-            except Exception as e:
-                logger.error(f"Error injecting web channel JS: {e}")
-    
-    def _inject_connection_code(self):
-        """Inject the code to connect to our Python object after library is loaded."""
-        try:
-            # Inject JavaScript to connect the bridge
-            js_code = """
-                new QWebChannel(qt.webChannelTransport, function(channel) {
-                    window.pywebchannel = channel.objects.pywebchannel;
-                });
-            """
-            self.map_view.page().runJavaScript(js_code)
-            logger.debug("Injected QWebChannel connection code")
-        except Exception as e:
-            logger.error(f"Error injecting connection code: {e}")
-
     def load_existing_databases(self):
         """This method is no longer needed"""
         pass
@@ -232,410 +172,119 @@ class DatabaseTab(QWidget):
             return []
 
     def display_map(self, well_data):
-        """Display map with better error handling and file cleanup"""
+        """Send the wells of the current database to the map as a diff"""
         import time
         start_time = time.time()
         logger.debug(f"PERF: Starting map display with {len(well_data)} wells")
-        
+
+        # Only re-fit the view when the database changed, a refresh keeps the user's zoom
+        database_changed = self.db_manager.current_db != self._map_database
+        self._map_database = self.db_manager.current_db
+
         try:
-            # Clean up previous map file if it exists
-            cleanup_start = time.time()
-            self._cleanup_previous_map()
-            cleanup_end = time.time()
-            logger.debug(f"PERF: Previous map cleanup took {(cleanup_end - cleanup_start)*1000:.2f}ms")
-
-            # Create a folium map (initial center/zoom will be adjusted to fit wells)
-            map_create_start = time.time()
-            m = Map(
-                location=[35.1495, -90.0490],
-                zoom_start=10,
-                prefer_canvas=True  # Add this for better performance
-            )
-            map_create_end = time.time()
-            logger.debug(f"PERF: Folium map creation took {(map_create_end - map_create_start)*1000:.2f}ms")
-
-            # Fetch well stats using the well_statistics table instead of slow JOIN
             stats_query_start = time.time()
-            try:
-                # Use the WellModel to get statistics - much faster query
-                from src.database.models.well import WellModel
-                well_model = WellModel(self.db_manager.current_db)
-                
-                # Get well data including the flag status stored in the wells table
-                with sqlite3.connect(self.db_manager.current_db) as conn:
-                    conn.row_factory = sqlite3.Row
-                    cursor = conn.cursor()
-                    # Include the baro_status and level_status columns from the wells table
-                    cursor.execute("""
-                        SELECT w.well_number, w.cae_number, w.latitude, w.longitude,
-                               w.baro_status, w.level_status, 
-                               ws.num_points, ws.min_timestamp, ws.max_timestamp
-                        FROM wells w
-                        LEFT JOIN well_statistics ws ON w.well_number = ws.well_number
-                        WHERE w.latitude IS NOT NULL AND w.longitude IS NOT NULL
-                    """)
-                    well_stats = cursor.fetchall()
-                
-                stats_query_end = time.time()
-                logger.debug(f"PERF: Retrieved well stats for map in {(stats_query_end - stats_query_start)*1000:.2f}ms")
-                
-                # No well data available
-                if not well_stats:
-                    logger.debug("No well data available for map")
-                    self._show_empty_map()
-                    return
-            except Exception as e:
-                logger.warning(f"PERF: Could not fetch well stats from statistics table: {e}")
-                logger.warning("PERF: Falling back to the slower query method")
-                
-                # Fallback to the older, slower method
-                with sqlite3.connect(self.db_manager.current_db) as conn:
-                    cursor = conn.cursor()
-                    try:
-                        # Check if we have water_level_readings table, if not, use basic well info
-                        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='water_level_readings'")
-                        if not cursor.fetchone():
-                            logger.warning("PERF: water_level_readings table does not exist, using basic well data")
-                            cursor.execute("""
-                                SELECT w.well_number, w.cae_number, w.latitude, w.longitude,
-                                       0 AS num_points, NULL AS min_ts, NULL AS max_ts
-                                FROM wells w
-                                WHERE w.latitude IS NOT NULL AND w.longitude IS NOT NULL
-                            """)
-                        else:
-                            cursor.execute("""
-                                SELECT w.well_number, w.cae_number, w.latitude, w.longitude,
-                                       COUNT(l.timestamp_utc) AS num_points,
-                                       MIN(l.timestamp_utc) AS min_ts,
-                                       MAX(l.timestamp_utc) AS max_ts
-                                FROM wells w
-                                LEFT JOIN water_level_readings l ON w.well_number = l.well_number
-                                WHERE w.latitude IS NOT NULL AND w.longitude IS NOT NULL
-                                GROUP BY w.well_number, w.cae_number, w.latitude, w.longitude
-                            """)
-                        well_stats = cursor.fetchall()
-                        logger.debug(f"PERF: Found detailed stats for {len(well_stats)} wells using slow query")
-                    except sqlite3.OperationalError as e:
-                        logger.warning(f"PERF: Could not fetch well stats (missing table?): {e}")
-                        
-                        # Last resort: just get basic well data without statistics
-                        try:
-                            cursor.execute("""
-                                SELECT well_number, cae_number, latitude, longitude,
-                                       0 AS num_points, NULL AS min_ts, NULL AS max_ts
-                                FROM wells
-                                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
-                            """)
-                            well_stats = cursor.fetchall()
-                            logger.debug(f"PERF: Falling back to basic well data for {len(well_stats)} wells")
-                        except Exception as inner_e:
-                            logger.error(f"PERF: Could not fetch even basic well data: {inner_e}")
-                            well_stats = []
+            well_stats = self._fetch_well_stats()
             stats_query_end = time.time()
             logger.debug(f"PERF: Well stats query took {(stats_query_end - stats_query_start)*1000:.2f}ms")
 
-            # Add markers and format map
-            markers_start = time.time()
-            if well_stats:
-                # Determine map bounds
-                lats = [row[2] for row in well_stats]
-                lons = [row[3] for row in well_stats]
-                # Add markers with enriched popup
-                for well in well_stats:
-                    well_number, cae_number, lat, lon, baro_status, level_status, num_points, min_ts, max_ts = well
-                    data_status = 'Has Data' if num_points else 'No Data'
-                    date_range = f"{min_ts} to {max_ts}" if num_points else 'N/A'
-                    
-                    # Determine marker color based on flags from wells table
-                    if baro_status == 'all_master' and level_status == 'no_default':
-                        marker_color = 'green'  # All good
-                    elif baro_status == 'has_non_master' and level_status == 'default_level':
-                        marker_color = 'red'    # Both flags have issues
-                    elif baro_status == 'has_non_master':
-                        marker_color = 'orange' # Baro issue
-                    elif level_status == 'default_level':
-                        marker_color = 'purple' # Level issue
-                    else:
-                        marker_color = 'blue'   # Default or no data
-                    
-                    popup_content = f"""
-                    <b>Well:</b> {well_number}<br>
-                    <b>CAE:</b> {cae_number or 'N/A'}<br>
-                    <b>Data Status:</b> {data_status}<br>
-                    <b>Date Range:</b> {date_range}<br>
-                    <b>Baro Status:</b> {baro_status}<br>
-                    <b>Level Status:</b> {level_status}<br>
-                    """
-                    popup_html = f"""
-                        <div style='font-family: Arial, sans-serif;'>
-                            {popup_content}
-                            <a href='#' onclick="
-                                window.selectedWellNumber = '{well_number}';
-                                console.log('Well selected:', window.selectedWellNumber);
-                                return false;
-                            ">
-                                View Data
-                            </a>
-                        </div>
-                    """
-                    Marker([lat, lon], popup=popup_html, icon=Icon(color=marker_color)).add_to(m)
-                # Adjust map view: if only one well, center and set closer zoom, else fit bounds
-                if len(well_stats) == 1:
-                    # Single well, center and zoom in
-                    m.location = [lats[0], lons[0]]
-                    m.zoom_start = 13
-                else:
-                    # Multiple wells, fit bounds to show all markers
-                    m.fit_bounds([[min(lats), min(lons)], [max(lats), max(lons)]])
-            else:
-                Marker(
-                    location=[35.1495, -90.0490],
-                    popup="No wells loaded yet",
-                    icon=Icon(color='red')
-                ).add_to(m)
-            markers_end = time.time()
-            logger.debug(f"PERF: Adding {len(well_stats) if well_stats else 0} markers took {(markers_end - markers_start)*1000:.2f}ms")
-
-            # Save to temp file with unique name to avoid caching
-            save_start = time.time()
-            temp_dir = tempfile.gettempdir()
-            timestamp = int(time.time())
-            temp_map_path = os.path.join(temp_dir, f"map_{timestamp}.html")
-            m.save(temp_map_path)
-            save_end = time.time()
-            logger.debug(f"PERF: Saving map to {temp_map_path} took {(save_end - save_start)*1000:.2f}ms")
-            
-            # Modify the HTML file to add our simple API
-            script_start = time.time()
-            with open(temp_map_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-                
-            # Inject a simple JavaScript API that doesn't rely on QWebChannel
-            injection_script = """
-            <script>
-            // Global variable to store selected well
-            window.selectedWellNumber = null;
-            
-            // Function called by Qt to check if a well was selected
-            function checkSelectedWell() {
-                var selected = window.selectedWellNumber;
-                // Reset after reading
-                if (selected) {
-                    console.log("Returning selected well:", selected);
-                    window.selectedWellNumber = null;
-                    return selected;
-                }
-                return "";
-            }
-            </script>
-            </body>
-            """
-            
-            # Replace the closing body tag with our script
-            html_content = html_content.replace("</body>", injection_script)
-            
-            # Write the modified HTML back to the file
-            with open(temp_map_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            script_end = time.time()
-            logger.debug(f"PERF: Modifying HTML and adding scripts took {(script_end - script_start)*1000:.2f}ms")
-
-            # Store current map file path
-            self.current_map_file = temp_map_path
-
-            # Safely disconnect any existing loadFinished connections
-            disconnect_start = time.time()
-            try:
-                self.map_view.loadFinished.disconnect()
-            except TypeError:
-                # Ignore if no connections exist
-                pass
-            disconnect_end = time.time()
-            logger.debug(f"PERF: Disconnecting signals took {(disconnect_end - disconnect_start)*1000:.2f}ms")
-            
-            # Connect to loadFinished for both QWebChannel and polling setup
-            load_start = time.time()
-            self.map_view.loadFinished.connect(self._on_map_loaded)
-            self.map_view.setUrl(QUrl.fromLocalFile(temp_map_path))
-            load_end = time.time()
-            logger.debug(f"PERF: Setting up map URL took {(load_end - load_start)*1000:.2f}ms")
+            features = [self._well_feature(*well) for well in well_stats]
+            self.live_map.set_features(features, fit=database_changed)
 
             total_time = time.time() - start_time
-            logger.debug(f"PERF: Total map display preparation took {total_time*1000:.2f}ms")
+            logger.debug(f"PERF: Total map update for {len(features)} wells took {total_time*1000:.2f}ms")
 
         except Exception as e:
             error_time = time.time() - start_time
-            # Log full stack trace
             logger.error(f"PERF: Error displaying map after {error_time*1000:.2f}ms: {e}", exc_info=True)
-            # Show error message in the map view for debugging
-            self.map_view.setHtml(
-                f"<h3 style='color: red; text-align: center;'>"  \
-                f"Error loading map: {e}"  \
-                "</h3>"
-            )
-
-    def _on_map_loaded(self, ok):
-        """Handle map load completion by setting up both QWebChannel and polling."""
-        import time
-        start_time = time.time()
-        logger.debug(f"PERF: Map load finished with result: {ok}")
-        
-        if ok:
-            try:
-                # First inject the QWebChannel JavaScript
-                webchannel_start = time.time()
-                self._inject_web_channel_js(ok)
-                webchannel_end = time.time()
-                logger.debug(f"PERF: Web channel JavaScript injection took {(webchannel_end - webchannel_start)*1000:.2f}ms")
-                
-                # Then set up polling
-                polling_start = time.time()
-                self._setup_map_polling()
-                polling_end = time.time()
-                logger.debug(f"PERF: Setting up map polling took {(polling_end - polling_start)*1000:.2f}ms")
-                
-                # Safely disconnect the signal
-                disconnect_start = time.time()
-                try:
-                    self.map_view.loadFinished.disconnect(self._on_map_loaded)
-                except TypeError:
-                    # Ignore if signal is not connected
-                    pass
-                disconnect_end = time.time()
-                logger.debug(f"PERF: Disconnecting load signal took {(disconnect_end - disconnect_start)*1000:.2f}ms")
-                
-                total_time = time.time() - start_time
-                logger.debug(f"PERF: Total map load handling took {total_time*1000:.2f}ms")
-                
-            except Exception as e:
-                logger.error(f"PERF: Error in _on_map_loaded: {e}")
-        else:
-            logger.warning("PERF: Map failed to load properly")
+            self.live_map.clear()
 
-    def _cleanup_previous_map(self):
-        """Clean up previous map file with error handling"""
-        if self.current_map_file and os.path.exists(self.current_map_file):
-            try:
-                os.unlink(self.current_map_file)
-            except (PermissionError, OSError) as e:
-                logger.debug(f"Could not remove old map file: {e}")
-                # Not critical, file will be cleaned up later
-
-    def _schedule_cleanup(self):
-        """Schedule cleanup of current map file after it's loaded"""
-        if self.current_map_file:
-            # Disconnect the signal
-            self.map_view.loadFinished.disconnect()
-            # Schedule cleanup with longer delay
-            QTimer.singleShot(5000, self._delayed_cleanup)
-
-    def _delayed_cleanup(self):
-        """Attempt to clean up map file after delay"""
-        if self.current_map_file and os.path.exists(self.current_map_file):
+    def _fetch_well_stats(self):
+        """Rows of (well_number, cae_number, lat, lon, baro_status, level_status, num_points, min_ts, max_ts)"""
+        if not self.db_manager or not self.db_manager.current_db:
+            return []
+
+        with sqlite3.connect(self.db_manager.current_db) as conn:
+            cursor = conn.cursor()
             try:
-                os.unlink(self.current_map_file)
-                self.current_map_file = None
-            except (PermissionError, OSError) as e:
-                logger.debug(f"Delayed cleanup failed: {e}")
-                # Not critical if it fails
-
-    def _setup_map_polling(self):
-        """Set up polling for well selection."""
-        import time
-        start_time = time.time()
-        logger.debug("PERF: Setting up map polling")
-        
-        try:
-            # First check if our JavaScript function is available
-            js_check_start = time.time()
-            self.map_view.page().runJavaScript(
-                "typeof checkSelectedWell === 'function'",
-                self._check_well_selection_function
-            )
-            js_check_end = time.time()
-            logger.debug(f"PERF: JavaScript function check initiated in {(js_check_end - js_check_start)*1000:.2f}ms")
-            
-            # Create the polling timer
-            timer_start = time.time()
-            if not hasattr(self, 'polling_timer'):
-                self.polling_timer = QTimer(self)
-                self.polling_timer.setInterval(500)  # Check every 500ms
-                self.polling_timer.timeout.connect(self._poll_for_well_selection)
-            
-            # Start the timer
-            self.polling_timer.start()
-            timer_end = time.time()
-            logger.debug(f"PERF: Polling timer setup took {(timer_end - timer_start)*1000:.2f}ms")
-            
-            total_time = time.time() - start_time
-            logger.debug(f"PERF: Total map polling setup took {total_time*1000:.2f}ms")
-        except Exception as e:
-            logger.error(f"PERF: Error setting up map polling: {e}")
+                # The well_statistics table avoids a slow JOIN over all readings
+                cursor.execute("""
+                    SELECT w.well_number, w.cae_number, w.latitude, w.longitude,
+                           w.baro_status, w.level_status,
+                           ws.num_points, ws.min_timestamp, ws.max_timestamp
+                    FROM wells w
+                    LEFT JOIN well_statistics ws ON w.well_number = ws.well_number
+                    WHERE w.latitude IS NOT NULL AND w.longitude IS NOT NULL
+                """)
+                return cursor.fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"PERF: Could not fetch well stats from statistics table: {e}")
+                logger.warning("PERF: Falling back to the slower query method")
 
-    def _poll_for_well_selection(self):
-        """Poll the map for well selection."""
-        import time
-        start_time = time.time()
-        
-        try:
-            # Run the JavaScript to check for selected well
-            self.map_view.page().runJavaScript(
-                "checkSelectedWell()",
-                self._handle_well_selection
-            )
-            
-            end_time = time.time()
-            # Only log if it takes more than 20ms to avoid excessive logging
-            if (end_time - start_time) * 1000 > 20:
-                logger.debug(f"PERF: Map polling took {(end_time - start_time)*1000:.2f}ms")
-        except Exception as e:
-            logger.error(f"PERF: Error polling for well selection: {e}")
+            try:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='water_level_readings'")
+                if cursor.fetchone():
+                    cursor.execute("""
+                        SELECT w.well_number, w.cae_number, w.latitude, w.longitude,
+                               NULL AS baro_status, NULL AS level_status,
+                               COUNT(l.timestamp_utc) AS num_points,
+                               MIN(l.timestamp_utc) AS min_ts,
+                               MAX(l.timestamp_utc) AS max_ts
+                        FROM wells w
+                        LEFT JOIN water_level_readings l ON w.well_number = l.well_number
+                        WHERE w.latitude IS NOT NULL AND w.longitude IS NOT NULL
+                        GROUP BY w.well_number, w.cae_number, w.latitude, w.longitude
+                    """)
+                    return cursor.fetchall()
+                logger.warning("PERF: water_level_readings table does not exist, using basic well data")
+            except sqlite3.OperationalError as e:
+                logger.warning(f"PERF: Could not fetch well stats (missing table?): {e}")
 
-    def _check_well_selection_function(self, function_exists):
-        """Check if the well selection function exists in the map."""
-        import time
-        start_time = time.time()
-        
-        if function_exists:
-            logger.debug("PERF: checkSelectedWell function exists in map")
-        else:
-            logger.warning("PERF: checkSelectedWell function does not exist in map")
-            # Try to inject it again or handle the error
+            # Last resort: just get basic well data without statistics
             try:
-                # Simplified version of the function for injection
-                self.map_view.page().runJavaScript("""
-                    window.selectedWellNumber = null;
-                    function checkSelectedWell() {
-                        var selected = window.selectedWellNumber;
-                        if (selected) {
-                            window.selectedWellNumber = null;
-                            return selected;
-                        }
-                        return "";
-                    }
+                cursor.execute("""
+                    SELECT well_number, cae_number, latitude, longitude,
+                           NULL AS baro_status, NULL AS level_status,
+                           0 AS num_points, NULL AS min_ts, NULL AS max_ts
+                    FROM wells
+                    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
                 """)
-                logger.debug("PERF: Attempted to inject checkSelectedWell function")
+                return cursor.fetchall()
             except Exception as e:
-                logger.error(f"PERF: Error injecting JavaScript function: {e}")
-        
-        total_time = time.time() - start_time
-        if total_time * 1000 > 10:  # Only log if slow
-            logger.debug(f"PERF: Well selection function check took {total_time*1000:.2f}ms")
-
-    def _handle_well_selection(self, well_number):
-        """Handle well selection from JavaScript"""
-        if well_number and well_number.strip():
-            logger.debug(f"Well selected from map: {well_number}")
-            # Skip updating the graph - just open the visualizer
-            self.open_data_visualizer(well_number)
+                logger.error(f"PERF: Could not fetch even basic well data: {e}")
+                return []
+
+    def _well_feature(self, well_number, cae_number, lat, lon, baro_status, level_status,
+                      num_points, min_ts, max_ts):
+        """Map feature for one well, colored by the flags stored in the wells table"""
+        if baro_status == 'all_master' and level_status == 'no_default':
+            marker_color = MARKER_COLORS['green']   # All good
+        elif baro_status == 'has_non_master' and level_status == 'default_level':
+            marker_color = MARKER_COLORS['red']     # Both flags have issues
+        elif baro_status == 'has_non_master':
+            marker_color = MARKER_COLORS['orange']  # Baro issue
+        elif level_status == 'default_level':
+            marker_color = MARKER_COLORS['purple']  # Level issue
+        else:
+            marker_color = MARKER_COLORS['blue']    # Default or no data
+
+        data_status = 'Has Data' if num_points else 'No Data'
+        date_range = f"{min_ts} to {max_ts}" if num_points else 'N/A'
+        popup_html = f"""
+            <div style='font-family: Arial, sans-serif;'>
+                <b>Well:</b> {html.escape(str(well_number))}<br>
+                <b>CAE:</b> {html.escape(str(cae_number or 'N/A'))}<br>
+                <b>Data Status:</b> {data_status}<br>
+                <b>Date Range:</b> {date_range}<br>
+                <b>Baro Status:</b> {baro_status}<br>
+                <b>Level Status:</b> {level_status}<br>
+                {select_well_link(well_number)}
+            </div>
+        """
+        return well_feature(well_number, lat, lon, [marker_color], popup_html)
 
     def cleanup(self):
         """Clean up resources before closing"""
-        self._cleanup_previous_map()
-        
-        # Stop polling timer if it exists
-        if hasattr(self, 'polling_timer') and self.polling_timer.isActive():
-            self.polling_timer.stop()
+        self.live_map.clear()
 
     def update_graph(self, well_number):
         """Fetch water level data for the selected well and update the graph."""
@@ -815,11 +464,7 @@ class DatabaseTab(QWidget):
             if self.layout():
                 self.layout().update()
                 self.layout().activate()
-                
-            # Refresh the map if it's already loaded
-            if hasattr(self, 'current_map_file') and self.current_map_file:
-                self.load_wells()
-                
+
         except Exception as e:
             logger.error(f"Error updating DatabaseTab for screen change: {e}")
 
@@ -17,14 +17,14 @@ import pytz
 import os
 import tempfile
 import json
-import folium
-from folium import plugins
-import branca
 from ..handlers.google_drive_monitor import GoogleDriveMonitor
 from ..handlers.field_data_consolidator import FieldDataConsolidator
 from pathlib import Path
 import traceback
 from ..handlers.runs_folder_monitor import RunsFolderMonitor
+from ..handlers.drive_batch_operations import DriveBatchOperations
+from ..handlers.live_map import FileCache, LiveMapController, well_feature
+from ..handlers.run_status_service import RunStatusService
 import base64
 
 logger = logging.getLogger(__name__)
@@ -332,6 +332,14 @@ class WaterLevelRunsTab(QWidget):
         if hasattr(self.db_manager, 'database_changed'):
             self.db_manager.database_changed.connect(self.on_database_changed)
             logger.debug("Connected to database_changed signal")
+
+        # Per-run well status from grouped queries, cached until the data changes
+        self.status_service = RunStatusService(self.db_manager.current_db)
+        if hasattr(self.db_manager, 'database_modified'):
+            self.db_manager.database_modified.connect(self.status_service.invalidate)
+        if hasattr(self.db_manager, 'database_synced'):
+            # A synced database may have been replaced on disk; reopen on next use
+            self.db_manager.database_synced.connect(lambda _: self.status_service.close())
         
         self.setup_ui()
         self.load_existing_runs()
@@ -342,6 +350,7 @@ class WaterLevelRunsTab(QWidget):
         
         # Clear current selection
         self.current_run_id = None
+        self.status_service.set_database(self.db_manager.current_db)
         
         # Reload runs from both local and cloud sources
         self.load_existing_runs()
@@ -457,7 +466,7 @@ class WaterLevelRunsTab(QWidget):
         table_layout.addWidget(self.wells_table)
         self.tab_widget.addTab(table_tab, "Wells Table")
         
-        # Create map tab with folium map
+        # Create map tab; the page is loaded once and markers are sent to it as diffs
         map_tab = QWidget()
         map_layout = QVBoxLayout(map_tab)
         
@@ -467,7 +476,9 @@ class WaterLevelRunsTab(QWidget):
         map_layout.addWidget(self.map_view)
         
         # Initialize the map centered on Memphis
-        self.init_map()
+        self.live_map = LiveMapController(self.map_view, self)
+        self._map_file_cache = FileCache()  # Run JSON and well coordinates, until the files change
+        self._map_run_id = None  # Run the map view was last fitted to
         
         self.tab_widget.addTab(map_tab, "Map")
         
@@ -788,6 +799,9 @@ class WaterLevelRunsTab(QWidget):
                     # JSON file doesn't exist, continue with basic display (cloud-only mode)
                     logger.info(f"Run JSON file not found: {run_json_path} - using cloud-only mode")
                     run_data = None
+                
+                # Latest database readings for wells without transducer data in the run
+                run_status = self.status_service.run_status(run_id, [well['well_number'] for well in wells])
                     
                 for row, well in enumerate(wells):
                     well_number = well['well_number']
@@ -840,10 +854,10 @@ class WaterLevelRunsTab(QWidget):
                             self.wells_table.setItem(row, 5, QTableWidgetItem(wl_text))  # Column index adjusted
                         except Exception as e:
                             logger.error(f"Error formatting date {date_str}: {e}")
-                            self.wells_table.setItem(row, 5, QTableWidgetItem(well['last_wl']))  # Column index adjusted
+                            self.wells_table.setItem(row, 5, QTableWidgetItem(self._last_wl_text(well, run_status)))
                     else:
-                        # Use default text if no transducer data
-                        self.wells_table.setItem(row, 5, QTableWidgetItem(well['last_wl']))  # Column index adjusted
+                        # Use the latest reading in the database if no transducer data
+                        self.wells_table.setItem(row, 5, QTableWidgetItem(self._last_wl_text(well, run_status)))
                     
                     # Update Manual reading display if manual data is present in JSON
                     if well_status.get('manual_data_date') is not None and well_status.get('manual_record') is not None:
@@ -925,6 +939,16 @@ class WaterLevelRunsTab(QWidget):
                 # when local storage is unavailable
                 logger.info("Skipping manual readings status update in fallback mode")
 
+    def _last_wl_text(self, well, run_status):
+        """Latest transducer reading in the database, or the text stored when the run was created"""
+        status = run_status.wells.get(well['well_number']) if run_status else None
+        reading = status.transducer if status else None
+        if reading is None or reading.timestamp_utc is None or reading.water_level is None:
+            return well['last_wl']
+        local_dt = pytz.UTC.localize(reading.timestamp_utc).astimezone(pytz.timezone('America/Chicago'))
+        temperature = f" | T: {reading.temperature:.1f}°C" if reading.temperature is not None else ""
+        return f"{local_dt.strftime('%Y-%m-%d %I:%M %p')} | {reading.water_level:.2f} ft{temperature}"
+
     def load_existing_runs(self):
         """Load existing runs from both local storage and cloud storage"""
         logger.info("Loading existing runs from local and cloud sources...")
@@ -1233,220 +1257,120 @@ class WaterLevelRunsTab(QWidget):
             return False
 
     def init_map(self):
-        """Initialize the folium map centered on Memphis"""
-        memphis_coords = [35.1495, -90.0490]
-        self.folium_map = folium.Map(
-            location=memphis_coords,
-            zoom_start=10,
-            tiles='OpenStreetMap'
-        )
-        
-        # Save map to temporary HTML file with unique name
-        temp_dir = tempfile.gettempdir()
-        timestamp = int(time.time())
-        map_path = os.path.join(temp_dir, f"water_level_map_{timestamp}.html")
-        self.folium_map.save(map_path)
-        
-        # Connect loadFinished to ensure QWebChannel is loaded if needed
-        self.map_view.loadFinished.connect(self._on_map_loaded)
-        
-        # Display the map
-        self.map_view.setUrl(QUrl.fromLocalFile(map_path))
-        
-    def _on_map_loaded(self, ok):
-        """Handle map load completion and ensure QWebChannel is loaded."""
-        if ok:
-            try:
-                # Disconnect to avoid multiple connections
-                self.map_view.loadFinished.disconnect(self._on_map_loaded)
-            except TypeError:
-                # Ignore if not connected
-                pass
-                
-            # Inject QWebChannel library if needed (for future use)
-            # This prevents "QWebChannel is not defined" errors
-            self._inject_qwebchannel_if_needed()
-    
-    def _inject_qwebchannel_if_needed(self):
-        """Inject the QWebChannel JavaScript library if needed."""
-        try:
-            from PyQt5.QtCore import QFile, QIODevice
-            
-            # Check if the page already has QWebChannel defined
-            check_js = "typeof QWebChannel !== 'undefined'"
-            self.map_view.page().runJavaScript(check_js, self._handle_qwebchannel_check)
-        except Exception as e:
-            logger.error(f"Error checking for QWebChannel: {e}")
-    
-    def _handle_qwebchannel_check(self, qwebchannel_exists):
-        """Handle the result of checking if QWebChannel exists."""
-        if not qwebchannel_exists:
-            try:
-                # Find the qwebchannel.js file from PyQt resources
-                from PyQt5.QtCore import QFile, QIODevice
-                qwebchannel_js = QFile(':/qtwebchannel/qwebchannel.js')
-                if qwebchannel_js.open(QIODevice.ReadOnly):
-                    # Read the JavaScript content
-                    js_bytes = qwebchannel_js.readAll()
-                    js_string = str(js_bytes, 'utf-8')
-                    qwebchannel_js.close()
-                    
-                    # Inject the QWebChannel library JavaScript
-                    self.map_view.page().runJavaScript(js_string)
-                    logger.debug("Injected QWebChannel JavaScript library in runs tab")
-            except Exception as e:
-                logger.error(f"Error injecting QWebChannel JS: {e}")
+        """Reset the map to its initial state: no markers, centered on Memphis"""
+        self._map_run_id = None
+        self.live_map.clear(fit=True)
+
+    def _well_coordinates(self):
+        """{well_number: (latitude, longitude)} for the current database, cached until it changes"""
+        db_path = self.db_manager.current_db
+
+        def load():
+            with sqlite3.connect(db_path) as conn:
+                rows = conn.execute("""
+                    SELECT well_number, latitude, longitude
+                    FROM wells
+                    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+                """).fetchall()
+            return {well_number: (lat, lon) for well_number, lat, lon in rows}
+
+        return self._map_file_cache.get(('coordinates', db_path), [db_path, f"{db_path}-wal"], load)
+
+    def _load_json_cached(self, path):
+        def load():
+            with open(path, 'r') as f:
+                return json.load(f)
+        return self._map_file_cache.get(path, [path], load)
+
+    def _table_status_colors(self):
+        """{well_number: (transducer color, manual color)} from the status icons in the wells table"""
+        colors = {}
+        for row in range(self.wells_table.rowCount()):
+            well_item = self.wells_table.item(row, 2)
+            transducer_item = self.wells_table.item(row, 0)
+            manual_item = self.wells_table.item(row, 1)
+            if not (well_item and transducer_item and manual_item):
+                continue
+            # Map the stored color names (defaulting to "red" if not set) to hex colors
+            colors[well_item.text()] = (
+                '#28a745' if transducer_item.data(Qt.UserRole) == "green" else '#e63946',
+                '#28a745' if manual_item.data(Qt.UserRole) == "green" else '#e63946',
+            )
+        return colors
 
     def update_map_markers(self, run_id):
         """Update map markers based on well status"""
         if not run_id or run_id == "Select Run":
             return
-        
-        # Clear existing markers
-        self.init_map()
-        
-        # Get well coordinates and status from database
+
+        start_time = time.time()
         try:
-            with sqlite3.connect(self.db_manager.current_db) as conn:
-                wells_query = """
-                    SELECT well_number, latitude, longitude
-                    FROM wells
-                    WHERE well_number IN ({})
-                """.format(','.join(['?'] * len(self.runs[run_id])))
-                
-                well_numbers = [well['well_number'] for well in self.runs[run_id]]
-                wells_df = pd.read_sql(wells_query, conn, params=well_numbers)
-                
-                # Load current run status from temp directory
-                import tempfile
-                temp_dir = tempfile.gettempdir()
-                run_dir = os.path.join(temp_dir, 'water_levels_temp', 'runs', run_id)
-                
-                # Check if files exist in temp directory, if not skip map update
-                run_json_path = os.path.join(run_dir, 'water_level_run.json')
-                wells_json_path = os.path.join(run_dir, 'wells_data.json')
-                
-                if not (os.path.exists(run_json_path) and os.path.exists(wells_json_path)):
-                    logger.info(f"Run data not available in temp directory for {run_id} - skipping map update")
-                    return
-                
-                with open(run_json_path, 'r') as f:
-                    run_data = json.load(f)
-                with open(wells_json_path, 'r') as f:
-                    wells_data = json.load(f)
-                
-                # Add markers for each well
-                for _, well in wells_df.iterrows():
-                    well_number = well['well_number']
-                    well_status = run_data['runs'][0]['well_status'].get(well_number, {})
-                    well_info = wells_data.get(well_number, {})
-                    
-                    # Set default colors to red (warning)
-                    transducer_color = '#e63946'  # Default to red
-                    manual_color = '#e63946'      # Default to red
-                    
-                    # Find the corresponding row in the table to get status colors
-                    for row in range(self.wells_table.rowCount()):
-                        if self.wells_table.item(row, 2).text() == well_number:
-                            # Get the icons from the table
-                            transducer_item = self.wells_table.item(row, 0)
-                            manual_item = self.wells_table.item(row, 1)
-                            
-                            # Get the stored color names (defaulting to "red" if not set)
-                            trans_color_name = transducer_item.data(Qt.UserRole) if transducer_item.data(Qt.UserRole) else "red"
-                            manual_color_name = manual_item.data(Qt.UserRole) if manual_item.data(Qt.UserRole) else "red"
-                            
-                            # Map color names to hex colors
-                            transducer_color = '#28a745' if trans_color_name == "green" else '#e63946'
-                            manual_color = '#28a745' if manual_color_name == "green" else '#e63946'
-                            
-                            break
-                    
-                    # Create HTML for a pin using SVG triangles (flipped to point down)
-                    html_content = f"""
-                        <div style="position: relative; text-align: center;">
-                            <svg width="40" height="40" viewBox="0 0 40 40">
-                                <!-- Left triangle (transducer status) -->
-                                <path d="M20 38 L2 2 L20 2 Z" 
-                                    fill="{transducer_color}" 
-                                    stroke="black" 
-                                    stroke-width="1" />
-                                
-                                <!-- Right triangle (manual status) -->
-                                <path d="M20 38 L38 2 L20 2 Z" 
-                                    fill="{manual_color}" 
-                                    stroke="black" 
-                                    stroke-width="1" />
-                                    
-                                <!-- Center line to clearly separate the triangles -->
-                                <line x1="20" y1="2" x2="20" y2="38" 
-                                    stroke="black" 
-                                    stroke-width="0.5" />
-                            </svg>
-                            <div style="position: absolute; width: 100%; text-align: center; top: 40px; 
-                                      font-size: 12px; font-weight: bold; color: black; 
-                                      text-shadow: -1px -1px 0 white, 1px -1px 0 white, -1px 1px 0 white, 1px 1px 0 white;">
-                                {well_info.get('cae_number', 'N/A')}
-                            </div>
-                        </div>
-                    """
-                    
-                    # Create a DivIcon with the HTML content
-                    icon = folium.DivIcon(
-                        icon_size=(40, 40),
-                        icon_anchor=(20, 38),  # Bottom center of the pin
-                        popup_anchor=(0, -20),  # Center above the pin
-                        html=html_content,
-                        class_name="custom-pin"  # This removes the default leaflet-div-icon class styling
-                    )
-                    
-                    # Format transducer data for popup - modified to show only date
-                    transducer_text = "No data"
-                    if well_status.get('tranducer_data_date'):
-                        try:
-                            date_obj = datetime.strptime(well_status['tranducer_data_date'], '%Y-%m-%d %H:%M:%S')
-                            # Modified to show only date without time
-                            transducer_text = f"{date_obj.strftime('%Y-%m-%d')} | From XLE file"
-                        except:
-                            transducer_text = well_status['tranducer_data_date']
-                    
-                    # Format manual reading data for popup - modified to show only date
-                    manual_text = "No data"
-                    if well_status.get('manual_data_date') and well_status.get('manual_record'):
-                        try:
-                            date_obj = datetime.strptime(well_status['manual_data_date'], '%Y-%m-%d %H:%M:%S')
-                            manual_record = well_status['manual_record']
-                            # Modified to show only date without time
-                            manual_text = (f"{date_obj.strftime('%Y-%m-%d')} | "
-                                          f"{manual_record.get('water_level', 0):.2f} ft | "
-                                          f"DTW: {manual_record.get('dtw', 0):.2f} ft")
-                        except:
-                            manual_text = well_status['manual_data_date']
-                    
-                    # Create popup content - removed Last Visit field and updated format
-                    popup_html = f"""
-                        <div style='width: 300px'>
-                            <h4>{well_number}</h4>
-                            <p><b>Status:</b> {'Visited' if well_status.get('visited', False) else 'Pending'}</p>
-                            <p><b>Last WL Reading:</b> {transducer_text}</p>
-                            <p><b>Last Manual Reading:</b> {manual_text}</p>
-                        </div>
-                    """
-                    
-                    # Add marker to map
-                    folium.Marker(
-                        location=[well['latitude'], well['longitude']],
-                        popup=folium.Popup(popup_html, max_width=350),
-                        icon=icon
-                    ).add_to(self.folium_map)
-                
-                # Update the map view with unique temp file
-                temp_dir = tempfile.gettempdir()
-                timestamp = int(time.time())
-                temp_map_path = os.path.join(temp_dir, f"water_level_map_{timestamp}.html")
-                self.folium_map.save(temp_map_path)
-                self.map_view.setUrl(QUrl.fromLocalFile(temp_map_path))
-                
+            coordinates = self._well_coordinates()
+
+            # Load current run status from temp directory
+            temp_dir = tempfile.gettempdir()
+            run_dir = os.path.join(temp_dir, 'water_levels_temp', 'runs', run_id)
+            run_json_path = os.path.join(run_dir, 'water_level_run.json')
+            wells_json_path = os.path.join(run_dir, 'wells_data.json')
+
+            if not (os.path.exists(run_json_path) and os.path.exists(wells_json_path)):
+                logger.info(f"Run data not available in temp directory for {run_id} - clearing map markers")
+                self.init_map()
+                return
+
+            run_data = self._load_json_cached(run_json_path)
+            wells_data = self._load_json_cached(wells_json_path)
+            run_status = run_data['runs'][0]['well_status']
+            table_colors = self._table_status_colors()
+
+            features = []
+            for well in self.runs[run_id]:
+                well_number = well['well_number']
+                if well_number not in coordinates:
+                    continue
+                latitude, longitude = coordinates[well_number]
+                well_status = run_status.get(well_number, {})
+                well_info = wells_data.get(well_number, {})
+                # Left half is the transducer status, right half the manual reading status
+                colors = table_colors.get(well_number, ('#e63946', '#e63946'))
+
+                # Format transducer data for popup - only the date
+                transducer_text = "No data"
+                if well_status.get('tranducer_data_date'):
+                    try:
+                        date_obj = datetime.strptime(well_status['tranducer_data_date'], '%Y-%m-%d %H:%M:%S')
+                        transducer_text = f"{date_obj.strftime('%Y-%m-%d')} | From XLE file"
+                    except:
+                        transducer_text = well_status['tranducer_data_date']
+
+                # Format manual reading data for popup - only the date
+                manual_text = "No data"
+                if well_status.get('manual_data_date') and well_status.get('manual_record'):
+                    try:
+                        date_obj = datetime.strptime(well_status['manual_data_date'], '%Y-%m-%d %H:%M:%S')
+                        manual_record = well_status['manual_record']
+                        manual_text = (f"{date_obj.strftime('%Y-%m-%d')} | "
+                                      f"{manual_record.get('water_level', 0):.2f} ft | "
+                                      f"DTW: {manual_record.get('dtw', 0):.2f} ft")
+                    except:
+                        manual_text = well_status['manual_data_date']
+
+                popup_html = f"""
+                    <div style='width: 300px'>
+                        <h4>{well_number}</h4>
+                        <p><b>Status:</b> {'Visited' if well_status.get('visited', False) else 'Pending'}</p>
+                        <p><b>Last WL Reading:</b> {transducer_text}</p>
+                        <p><b>Last Manual Reading:</b> {manual_text}</p>
+                    </div>
+                """
+                features.append(well_feature(well_number, latitude, longitude, colors, popup_html,
+                                             label=well_info.get('cae_number', 'N/A')))
+
+            # Fit the view when switching runs; status refreshes keep the user's zoom
+            self.live_map.set_features(features, fit=run_id != self._map_run_id)
+            self._map_run_id = run_id
+            logger.debug(f"PERF: Map markers for run {run_id} updated in {(time.time() - start_time)*1000:.2f}ms")
+
         except Exception as e:
             logger.error(f"Error updating map markers: {e}")
 
@@ -1723,75 +1647,40 @@ class WaterLevelRunsTab(QWidget):
         # Continue with local file processing only if we have valid run_data
         if run_data:
             try:
-                # Initialize the location to well mapping if needed
-                if not hasattr(self.runs_monitor, 'location_to_well_mapping') or not self.runs_monitor.location_to_well_mapping:
-                    # Set the database path and load the mapping
-                    self.runs_monitor.db_path = self.db_manager.current_db
-                    self.runs_monitor.location_to_well_mapping = self.runs_monitor.get_location_to_well_mapping()
-                    logger.debug(f"Initialized location to well mapping with {len(self.runs_monitor.location_to_well_mapping)} entries")
-                
-                # Create a reverse mapping (well number to location code)
-                well_to_location = {}
-                for loc, well_num in self.runs_monitor.location_to_well_mapping.items():
-                    well_to_location[well_num] = loc
+                well_status_map = run_data['runs'][0]['well_status']
+                matches = self._match_latest_readings(well_status_map.keys(), latest_readings)
+                table_rows = self._table_rows()
                 
                 # Track whether we've made any changes that need to be saved
                 changes_made = False
                 
-                # For each well in the run
-                for well_number, well_status in run_data['runs'][0]['well_status'].items():
-                    # Check if we have a location code for this well
-                    location_code = well_to_location.get(well_number)
-                
-                    if location_code:
-                        logger.debug(f"Found location code '{location_code}' for well {well_number}")
-                        
-                        # Normalize the location code for comparison
-                        normalized_loc = location_code.replace('-', '').replace(' ', '').upper()
-                        
-                        # Look for this location in the latest readings
-                        matched_loc = None
-                        for reading_loc in latest_readings.keys():
-                            normalized_reading_loc = reading_loc.replace('-', '').replace(' ', '').upper()
-                            if normalized_reading_loc == normalized_loc:
-                                matched_loc = reading_loc
-                                break
-                        
-                        # If we found a match, update the well status
-                        if matched_loc:
-                            reading_info = latest_readings[matched_loc]
-                            reading_date = reading_info['date']
-                            
-                            logger.debug(f"Matched well {well_number} with reading from {matched_loc} on date {reading_date}")
-                            
-                            # Get the file info - handle both possible key names (file_name from Google Drive or file_path from local files)
-                            file_info = reading_info.get('file_name', reading_info.get('file_path', 'Unknown file'))
-                            
-                            # Update the well status with the transducer data
-                            well_status['visited'] = True
-                            well_status['tranducer_data_date'] = reading_date.strftime('%Y-%m-%d %H:%M:%S')
-                            well_status['tranducer_record'] = {
-                                'file_info': file_info,  # Using a consistent key name
-                                'location': matched_loc,
-                                'date': reading_date.strftime('%Y-%m-%d %H:%M:%S')
-                            }
-                            changes_made = True
-                            
-                            # Update the table UI as well
-                            for row in range(self.wells_table.rowCount()):
-                                if self.wells_table.item(row, 2).text() == well_number:
-                                    # Update transducer status icon
-                                    transducer_item = QTableWidgetItem()
-                                    transducer_item.setIcon(self.create_flag_icon("green"))
-                                    transducer_item.setTextAlignment(Qt.AlignCenter)
-                                    transducer_item.setData(Qt.UserRole, "green")
-                                    self.wells_table.setItem(row, 0, transducer_item)
-                                    
-                                    # Update Last WL Reading column
-                                    local_dt = reading_date.strftime('%Y-%m-%d %I:%M %p')
-                                    wl_text = f"{local_dt} | From XLE file ({matched_loc})"
-                                    self.wells_table.setItem(row, 5, QTableWidgetItem(wl_text))
-                                    break
+                for well_number, (matched_loc, reading_info) in matches.items():
+                    reading_date = reading_info['date']
+                    logger.debug(f"Matched well {well_number} with reading from {matched_loc} on date {reading_date}")
+                    
+                    # Get the file info - handle both possible key names (file_name from Google Drive or file_path from local files)
+                    file_info = reading_info.get('file_name', reading_info.get('file_path', 'Unknown file'))
+                    
+                    # Update the well status with the transducer data
+                    well_status = well_status_map[well_number]
+                    transducer_record = {
+                        'file_info': file_info,  # Using a consistent key name
+                        'location': matched_loc,
+                        'date': reading_date.strftime('%Y-%m-%d %H:%M:%S')
+                    }
+                    if not well_status.get('visited') or well_status.get('tranducer_record') != transducer_record:
+                        well_status['visited'] = True
+                        well_status['tranducer_data_date'] = transducer_record['date']
+                        well_status['tranducer_record'] = transducer_record
+                        changes_made = True
+                    
+                    # Update the table UI as well
+                    row = table_rows.get(well_number)
+                    if row is not None:
+                        self._set_status_item(row, 0, "green")
+                        local_dt = reading_date.strftime('%Y-%m-%d %I:%M %p')
+                        wl_text = f"{local_dt} | From XLE file ({matched_loc})"
+                        self.wells_table.setItem(row, 5, QTableWidgetItem(wl_text))
                 
                 # Save changes to JSON if any were made
                 if changes_made:
@@ -1808,207 +1697,53 @@ class WaterLevelRunsTab(QWidget):
             # Cloud-only mode: Update UI without local file operations
             logger.info("Cloud-only mode: Updating UI with latest readings")
             try:
-                # Initialize the location to well mapping if needed
-                if not hasattr(self.runs_monitor, 'location_to_well_mapping') or not self.runs_monitor.location_to_well_mapping:
-                    # Set the database path and load the mapping
-                    self.runs_monitor.db_path = self.db_manager.current_db
-                    self.runs_monitor.location_to_well_mapping = self.runs_monitor.get_location_to_well_mapping()
-                    logger.debug(f"Initialized location to well mapping with {len(self.runs_monitor.location_to_well_mapping)} entries")
+                matches = self._match_latest_readings([well['well_number'] for well in wells], latest_readings)
+                table_rows = self._table_rows()
                 
-                # Create a reverse mapping (well number to location code)
-                well_to_location = {}
-                for loc, well_num in self.runs_monitor.location_to_well_mapping.items():
-                    well_to_location[well_num] = loc
-                
-                # Update UI for each well in the current run
-                for well in wells:
-                    well_number = well['well_number']
+                for well_number, (matched_loc, reading_info) in matches.items():
+                    reading_date = reading_info['date']
+                    logger.debug(f"Matched well {well_number} with reading from {matched_loc} on date {reading_date}")
                     
-                    # Check if we have a location code for this well
-                    location_code = well_to_location.get(well_number)
-                
-                    if location_code:
-                        logger.debug(f"Found location code '{location_code}' for well {well_number}")
-                        
-                        # Normalize the location code for comparison
-                        normalized_loc = location_code.replace('-', '').replace(' ', '').upper()
-                        
-                        # Look for this location in the latest readings
-                        matched_loc = None
-                        for reading_loc in latest_readings.keys():
-                            normalized_reading_loc = reading_loc.replace('-', '').replace(' ', '').upper()
-                            if normalized_reading_loc == normalized_loc:
-                                matched_loc = reading_loc
-                                break
-                        
-                        # If we found a match, update the UI
-                        if matched_loc:
-                            reading_info = latest_readings[matched_loc]
-                            reading_date = reading_info['date']
-                            
-                            logger.debug(f"Matched well {well_number} with reading from {matched_loc} on date {reading_date}")
-                            
-                            # Update the table UI
-                            for row in range(self.wells_table.rowCount()):
-                                if self.wells_table.item(row, 2).text() == well_number:
-                                    # Update transducer status icon
-                                    transducer_item = QTableWidgetItem()
-                                    transducer_item.setIcon(self.create_flag_icon("green"))
-                                    transducer_item.setTextAlignment(Qt.AlignCenter)
-                                    transducer_item.setData(Qt.UserRole, "green")
-                                    self.wells_table.setItem(row, 0, transducer_item)
-                                    
-                                    # Update Last WL Reading column
-                                    local_dt = reading_date.strftime('%Y-%m-%d %I:%M %p')
-                                    wl_text = f"{local_dt} | From XLE file ({matched_loc}) [Cloud-only]"
-                                    self.wells_table.setItem(row, 5, QTableWidgetItem(wl_text))
-                                    break
-                        else:
-                            logger.debug(f"No reading found for well {well_number} (location: {location_code})")
-                    else:
-                        logger.debug(f"No location code found for well {well_number}")
+                    row = table_rows.get(well_number)
+                    if row is not None:
+                        self._set_status_item(row, 0, "green")
+                        local_dt = reading_date.strftime('%Y-%m-%d %I:%M %p')
+                        wl_text = f"{local_dt} | From XLE file ({matched_loc}) [Cloud-only]"
+                        self.wells_table.setItem(row, 5, QTableWidgetItem(wl_text))
                         
             except Exception as e:
                 logger.error(f"Error updating UI in cloud-only mode: {e}", exc_info=True)
 
-    def update_manual_readings_status(self, run_id):
-        """Update manual readings status for wells in the current run and update the JSON file"""
-        if not run_id or run_id == "Select Run":
-            return
-        
-        try:
-            # Get the run start date from the run JSON in temp directory
-            import tempfile
-            temp_dir = tempfile.gettempdir()
-            run_dir = os.path.join(temp_dir, 'water_levels_temp', 'runs', run_id)
-            run_json_path = os.path.join(run_dir, 'water_level_run.json')
-            
-            with open(run_json_path, 'r') as f:
-                run_data = json.load(f)
-            
-            # Track whether we've made any changes that need to be saved
-            changes_made = False
-            
-            # Extract year and month from run_id (e.g., "2025-02" -> 2025, 2)
-            year, month = map(int, run_id.split()[0].split('-'))
-            
-            # Set start date to first day of the month
-            run_start = datetime(year, month, 1)
-            run_end = run_start + timedelta(days=60)  # Look for readings up to 2 months aheadd
-            
-            # Convert to UTC for database comparison
-            run_start_utc = run_start.replace(hour=0, minute=0, second=0).astimezone(pytz.UTC)
-            run_end_utc = run_end.replace(hour=23, minute=59, second=59).astimezone(pytz.UTC)
-            
-            logger.debug(f"Checking manual readings between {run_start_utc} and {run_end_utc}")
-            
-            # Query manual readings for the relevant period
-            with sqlite3.connect(self.db_manager.current_db) as conn:
-                query = """
-                    SELECT 
-                        well_number,
-                        measurement_date_utc,
-                        water_level,
-                        dtw_avg,
-                        collected_by,
-                        comments
-                    FROM manual_level_readings
-                    WHERE measurement_date_utc >= ?
-                    AND measurement_date_utc <= ?
-                    AND well_number IN ({})
-                    ORDER BY measurement_date_utc DESC
-                """.format(','.join(['?'] * len(self.runs[run_id])))
-                
-                well_numbers = [well['well_number'] for well in self.runs[run_id]]
-                params = [run_start_utc.strftime('%Y-%m-%d %H:%M:%S'), 
-                        run_end_utc.strftime('%Y-%m-%d %H:%M:%S')] + well_numbers
-                
-                logger.debug(f"SQL Query: {query}")
-                logger.debug(f"Query parameters: {params}")
-                
-                manual_readings = pd.read_sql(query, conn, params=params, 
-                                            parse_dates=['measurement_date_utc'])
-                
-                logger.debug(f"Found {len(manual_readings)} manual readings")
-                if not manual_readings.empty:
-                    logger.debug("Sample of readings found:")
-                    logger.debug(manual_readings[['well_number', 'measurement_date_utc']].to_string())
-                
-                    # Process all readings first, grouping by well number to find the most recent
-                    well_readings = {}
-                    for _, row in manual_readings.iterrows():
-                        well_num = row['well_number']
-                        
-                        # If we don't have this well yet, or this reading is newer
-                        if (well_num not in well_readings or 
-                            row['measurement_date_utc'] > well_readings[well_num]['date']):
-                            
-                            # Store all needed data from this reading
-                            well_readings[well_num] = {
-                                'date': row['measurement_date_utc'],
-                                'water_level': float(row['water_level']),
-                                'dtw': float(row['dtw_avg']),
-                                'collected_by': row['collected_by'],
-                                'comments': row['comments'] if pd.notnull(row['comments']) else ''
-                            }
-                
-                # Now update the JSON file with the collected readings
-                for well_num, reading in well_readings.items():
-                    if well_num in run_data['runs'][0]['well_status']:
-                        # Get the well status object
-                        well_status = run_data['runs'][0]['well_status'][well_num]
-                        
-                        # Update it with manual reading data
-                        well_status['visited'] = True
-                        well_status['manual_data_date'] = reading['date'].strftime('%Y-%m-%d %H:%M:%S')
-                        well_status['manual_record'] = {
-                            'water_level': reading['water_level'],
-                            'dtw': reading['dtw'],
-                            'collected_by': reading['collected_by'],
-                            'comments': reading['comments']
-                        }
-                        changes_made = True
-                        logger.debug(f"Updated well {well_num} with manual reading from {reading['date']}")
-                
-                # Then update the table display
-                for row in range(self.wells_table.rowCount()):
-                    well_number = self.wells_table.item(row, 2).text()
-                    
-                    if well_number in well_readings:
-                        # Get the reading for this well
-                        reading = well_readings[well_number]
-                        
-                        # Update icon to green
-                        manual_item = QTableWidgetItem()
-                        manual_item.setIcon(self.create_flag_icon("green"))
-                        manual_item.setTextAlignment(Qt.AlignCenter)
-                        manual_item.setData(Qt.UserRole, "green")
-                        self.wells_table.setItem(row, 1, manual_item)
-                        
-                        # Format text for display
-                        local_dt = reading['date'].tz_localize('UTC').tz_convert('America/Chicago')
-                        manual_text = (f"{local_dt.strftime('%Y-%m-%d %I:%M %p')} | "
-                                    f"{reading['water_level']:.2f} ft | "
-                                    f"DTW: {reading['dtw']:.2f} ft | "
-                                    f"By: {reading['collected_by']}")
-                                    
-                        # Update the text in the table
-                        self.wells_table.setItem(row, 6, QTableWidgetItem(manual_text))
-                
-            # Save changes to JSON if any were made
-            if changes_made:
-                logger.debug(f"Saving changes to {run_json_path}")
-                with open(run_json_path, 'w') as f:
-                    json.dump(run_data, f, indent=4)
-                logger.info(f"Updated run data in {run_json_path} with manual readings")
-                
-                # Sync changes to cloud if this is a cloud run
-                self.sync_run_to_cloud(run_id)
+    def _match_latest_readings(self, well_numbers, latest_readings):
+        """{well_number: (location, reading)} for wells whose location code has a latest reading"""
+        # Initialize the location to well mapping if needed
+        if not getattr(self.runs_monitor, 'location_to_well_mapping', None):
+            # Set the database path and load the mapping
+            self.runs_monitor.db_path = self.db_manager.current_db
+            self.runs_monitor.location_to_well_mapping = self.runs_monitor.get_location_to_well_mapping()
+            logger.debug(f"Initialized location to well mapping with {len(self.runs_monitor.location_to_well_mapping)} entries")
+        
+        def normalize(code):
+            return code.replace('-', '').replace(' ', '').upper()
+        
+        # Reverse mapping (well number to location code) and normalized reading locations
+        well_to_location = {well_num: loc for loc, well_num in self.runs_monitor.location_to_well_mapping.items()}
+        readings_by_code = {}
+        for reading_loc in latest_readings:
+            readings_by_code.setdefault(normalize(reading_loc), reading_loc)
+        
+        matches = {}
+        for well_number in well_numbers:
+            location_code = well_to_location.get(well_number)
+            if not location_code:
+                logger.debug(f"No location code found for well {well_number}")
+                continue
+            matched_loc = readings_by_code.get(normalize(location_code))
+            if matched_loc:
+                matches[well_number] = (matched_loc, latest_readings[matched_loc])
             else:
-                logger.debug("No changes made to JSON file")
-                
-        except Exception as e:
-            logger.error(f"Error updating manual readings status: {e}", exc_info=True)
+                logger.debug(f"No reading found for well {well_number} (location: {location_code})")
+        return matches
 
     def refresh_data(self):
         """Refresh the runs data."""
@@ -2040,6 +1775,7 @@ class WaterLevelRunsTab(QWidget):
             self.map_view.setUrl(QUrl('about:blank'))
         
         # Clear any stored data
+        self.status_service.close()
         self.runs.clear()
         self.selected_wells = [] 
 
@@ -2095,6 +1831,12 @@ class WaterLevelRunsTab(QWidget):
             logger.error(f"Error in upload_run_to_drive: {e}")
             return False 
 
+    def _get_drive_ops(self, service):
+        """Get the Drive batch layer for this session (folder IDs are cached across uploads)"""
+        if getattr(self, '_drive_ops', None) is None or self._drive_ops.service is not service:
+            self._drive_ops = DriveBatchOperations(service)
+        return self._drive_ops
+    
     def _find_or_create_project_runs_folder(self, service, project_name):
         """Find or create the WATER_LEVEL_RUNS folder for a project"""
         try:
@@ -2103,46 +1845,24 @@ class WaterLevelRunsTab(QWidget):
             if not main_folder_id:
                 return None
             
-            # Find Projects folder
-            query = f"'{main_folder_id}' in parents and name='Projects' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = service.files().list(q=query, fields="files(id)").execute()
-            projects_folders = results.get('files', [])
+            drive_ops = self._get_drive_ops(service)
             
-            if not projects_folders:
+            # Find Projects folder
+            projects_folder_id = drive_ops.resolve_folder(main_folder_id, 'Projects', create=False)
+            if not projects_folder_id:
                 logger.error("Projects folder not found")
                 return None
             
-            projects_folder_id = projects_folders[0]['id']
-            
             # Find project folder
-            query = f"'{projects_folder_id}' in parents and name='{project_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = service.files().list(q=query, fields="files(id)").execute()
-            project_folders = results.get('files', [])
-            
-            if not project_folders:
+            project_folder_id = drive_ops.resolve_folder(projects_folder_id, project_name, create=False)
+            if not project_folder_id:
                 logger.error(f"Project folder {project_name} not found")
                 return None
             
-            project_folder_id = project_folders[0]['id']
-            
             # Find or create WATER_LEVEL_RUNS folder
-            query = f"'{project_folder_id}' in parents and name='WATER_LEVEL_RUNS' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = service.files().list(q=query, fields="files(id)").execute()
-            runs_folders = results.get('files', [])
-            
-            if runs_folders:
-                logger.info(f"Found existing WATER_LEVEL_RUNS folder for {project_name}")
-                return runs_folders[0]['id']
-            else:
-                # Create WATER_LEVEL_RUNS folder
-                folder_metadata = {
-                    'name': 'WATER_LEVEL_RUNS',
-                    'mimeType': 'application/vnd.google-apps.folder',
-                    'parents': [project_folder_id]
-                }
-                folder = service.files().create(body=folder_metadata, fields='id').execute()
-                logger.info(f"Created WATER_LEVEL_RUNS folder for {project_name}")
-                return folder.get('id')
+            runs_folder_id = drive_ops.resolve_folder(project_folder_id, 'WATER_LEVEL_RUNS')
+            logger.info(f"Using WATER_LEVEL_RUNS folder for {project_name}")
+            return runs_folder_id
                 
         except Exception as e:
             logger.error(f"Error finding/creating project runs folder: {e}")
@@ -2154,24 +1874,9 @@ class WaterLevelRunsTab(QWidget):
             # Extract month from run_id (e.g., "2025-06" from "2025-06" or "2025-06 (2)")
             month_folder_name = run_id.split()[0]  # Gets "2025-06"
             
-            # Find existing folder
-            query = f"'{runs_folder_id}' in parents and name='{month_folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = service.files().list(q=query, fields="files(id)").execute()
-            month_folders = results.get('files', [])
-            
-            if month_folders:
-                logger.info(f"Found existing month folder {month_folder_name}")
-                return month_folders[0]['id']
-            else:
-                # Create month folder
-                folder_metadata = {
-                    'name': month_folder_name,
-                    'mimeType': 'application/vnd.google-apps.folder',
-                    'parents': [runs_folder_id]
-                }
-                folder = service.files().create(body=folder_metadata, fields='id').execute()
-                logger.info(f"Created month folder {month_folder_name}")
-                return folder.get('id')
+            month_folder_id = self._get_drive_ops(service).resolve_folder(runs_folder_id, month_folder_name)
+            logger.info(f"Using month folder {month_folder_name}")
+            return month_folder_id
                 
         except Exception as e:
             logger.error(f"Error finding/creating month folder: {e}")
@@ -2192,6 +1897,11 @@ class WaterLevelRunsTab(QWidget):
             
             success_count = 0
             
+            # One listing of the month folder instead of a lookup per file
+            existing_ids = {}
+            for existing in self._get_drive_ops(service).list_children(month_folder_id):
+                existing_ids.setdefault(existing['name'], existing['id'])
+            
             for filename, mimetype in files_to_upload:
                 local_path = os.path.join(run_dir, filename)
                 
@@ -2199,15 +1909,10 @@ class WaterLevelRunsTab(QWidget):
                     logger.warning(f"Local file not found: {local_path}")
                     continue
                 
-                # Check if file already exists in Google Drive
-                query = f"'{month_folder_id}' in parents and name='{filename}' and trashed=false"
-                results = service.files().list(q=query, fields="files(id)").execute()
-                existing_files = results.get('files', [])
-                
                 try:
-                    if existing_files:
+                    if filename in existing_ids:
                         # Update existing file
-                        file_id = existing_files[0]['id']
+                        file_id = existing_ids[filename]
                         from googleapiclient.http import MediaFileUpload
                         media = MediaFileUpload(local_path, mimetype=mimetype)
                         service.files().update(fileId=file_id, media_body=media).execute()
@@ -2269,6 +1974,22 @@ class WaterLevelRunsTab(QWidget):
             logger.error("Could not find water_level_tab to update Monet data")
             QMessageBox.warning(self, "Error", "Could not access Monet data update functionality") 
 
+    def _table_rows(self):
+        """{well_number: row} for the wells table"""
+        rows = {}
+        for row in range(self.wells_table.rowCount()):
+            item = self.wells_table.item(row, 2)
+            if item:
+                rows[item.text()] = row
+        return rows
+
+    def _set_status_item(self, row, column, color):
+        item = QTableWidgetItem()
+        item.setIcon(self.create_flag_icon(color))
+        item.setTextAlignment(Qt.AlignCenter)
+        item.setData(Qt.UserRole, color)
+        self.wells_table.setItem(row, column, item)
+
     def update_manual_readings_status(self, run_id):
         """Update manual readings status for wells in the current run and update the JSON file"""
         if not run_id or run_id == "Select Run":
@@ -2297,7 +2018,6 @@ class WaterLevelRunsTab(QWidget):
             
         try:
             # Try to load existing run data
-            run_data = None
             if os.path.exists(run_json_path):
                 with open(run_json_path, 'r') as f:
                     run_data = json.load(f)
@@ -2305,118 +2025,52 @@ class WaterLevelRunsTab(QWidget):
                 logger.warning(f"Run JSON file not found: {run_json_path}. Cannot update manual readings.")
                 return
             
-            # Track whether we've made any changes that need to be saved
-            changes_made = False
-            
-            # Extract year and month from run_id (e.g., "2025-02" -> 2025, 2)
-            year, month = map(int, run_id.split()[0].split('-'))
-            
-            # Set start date to first day of the month
-            run_start = datetime(year, month, 1)
-            run_end = run_start + timedelta(days=60)  # Look for readings up to 2 months ahead
-            
-            # Convert to UTC for database comparison
-            run_start_utc = run_start.replace(hour=0, minute=0, second=0).astimezone(pytz.UTC)
-            run_end_utc = run_end.replace(hour=23, minute=59, second=59).astimezone(pytz.UTC)
-            
-            logger.debug(f"Checking manual readings between {run_start_utc} and {run_end_utc}")
+            # Latest manual reading per well in the run window, from the cached run status
+            well_numbers = [well['well_number'] for well in self.runs[run_id]]
+            run_status = self.status_service.run_status(run_id, well_numbers)
+            if run_status is None:
+                return
+            logger.debug(f"Manual readings for {run_status.manual_count} of {len(run_status.wells)} wells "
+                         f"between {run_status.window[0]} and {run_status.window[1]}")
             
-            # Query manual readings for the relevant period
-            with sqlite3.connect(self.db_manager.current_db) as conn:
-                query = """
-                    SELECT 
-                        well_number,
-                        measurement_date_utc,
-                        water_level,
-                        dtw_avg,
-                        collected_by,
-                        comments
-                    FROM manual_level_readings
-                    WHERE measurement_date_utc >= ?
-                    AND measurement_date_utc <= ?
-                    AND well_number IN ({})
-                    ORDER BY measurement_date_utc DESC
-                """.format(','.join(['?'] * len(self.runs[run_id])))
-                
-                well_numbers = [well['well_number'] for well in self.runs[run_id]]
-                params = [run_start_utc.strftime('%Y-%m-%d %H:%M:%S'), 
-                        run_end_utc.strftime('%Y-%m-%d %H:%M:%S')] + well_numbers
-                
-                logger.debug(f"SQL Query: {query}")
-                logger.debug(f"Query parameters: {params}")
-                
-                manual_readings = pd.read_sql(query, conn, params=params, 
-                                            parse_dates=['measurement_date_utc'])
-                
-                logger.debug(f"Found {len(manual_readings)} manual readings")
-                
-                # Initialize well_readings dictionary (empty if no readings found)
-                well_readings = {}
-                
-                if not manual_readings.empty:
-                    logger.debug("Sample of readings found:")
-                    logger.debug(manual_readings[['well_number', 'measurement_date_utc']].to_string())
-                
-                    # Process all readings first, grouping by well number to find the most recent
-                    well_readings = {}
-                    for _, row in manual_readings.iterrows():
-                        well_num = row['well_number']
-                        
-                        # If we don't have this well yet, or this reading is newer
-                        if (well_num not in well_readings or 
-                            row['measurement_date_utc'] > well_readings[well_num]['date']):
-                            
-                            # Store all needed data from this reading
-                            well_readings[well_num] = {
-                                'date': row['measurement_date_utc'],
-                                'water_level': float(row['water_level']),
-                                'dtw': float(row['dtw_avg']),
-                                'collected_by': row['collected_by'],
-                                'comments': row['comments'] if pd.notnull(row['comments']) else ''
-                            }
-                
-                # Now update the JSON file with the collected readings
-                for well_num, reading in well_readings.items():
-                    if well_num in run_data['runs'][0]['well_status']:
-                        # Get the well status object
-                        well_status = run_data['runs'][0]['well_status'][well_num]
-                        
-                        # Update it with manual reading data
+            # Update the JSON file and the table display in one pass
+            changes_made = False
+            well_status_map = run_data['runs'][0]['well_status']
+            table_rows = self._table_rows()
+            central = pytz.timezone('America/Chicago')
+            for well_num, status in run_status.wells.items():
+                reading = status.manual
+                if reading is None or reading.measurement_date_utc is None:
+                    continue
+                water_level = float(reading.water_level or 0)
+                dtw = float(reading.dtw_avg or 0)
+                
+                if well_num in well_status_map:
+                    manual_record = {
+                        'water_level': water_level,
+                        'dtw': dtw,
+                        'collected_by': reading.collected_by,
+                        'comments': reading.comments
+                    }
+                    manual_date = reading.measurement_date_utc.strftime('%Y-%m-%d %H:%M:%S')
+                    well_status = well_status_map[well_num]
+                    if (not well_status.get('visited') or well_status.get('manual_data_date') != manual_date
+                            or well_status.get('manual_record') != manual_record):
                         well_status['visited'] = True
-                        well_status['manual_data_date'] = reading['date'].strftime('%Y-%m-%d %H:%M:%S')
-                        well_status['manual_record'] = {
-                            'water_level': reading['water_level'],
-                            'dtw': reading['dtw'],
-                            'collected_by': reading['collected_by'],
-                            'comments': reading['comments']
-                        }
+                        well_status['manual_data_date'] = manual_date
+                        well_status['manual_record'] = manual_record
                         changes_made = True
-                        logger.debug(f"Updated well {well_num} with manual reading from {reading['date']}")
-                
-                # Then update the table display
-                for row in range(self.wells_table.rowCount()):
-                    well_number = self.wells_table.item(row, 2).text()
-                    
-                    if well_number in well_readings:
-                        # Get the reading for this well
-                        reading = well_readings[well_number]
-                        
-                        # Update icon to green
-                        manual_item = QTableWidgetItem()
-                        manual_item.setIcon(self.create_flag_icon("green"))
-                        manual_item.setTextAlignment(Qt.AlignCenter)
-                        manual_item.setData(Qt.UserRole, "green")
-                        self.wells_table.setItem(row, 1, manual_item)
-                        
-                        # Format text for display
-                        local_dt = reading['date'].tz_localize('UTC').tz_convert('America/Chicago')
-                        manual_text = (f"{local_dt.strftime('%Y-%m-%d %I:%M %p')} | "
-                                    f"{reading['water_level']:.2f} ft | "
-                                    f"DTW: {reading['dtw']:.2f} ft | "
-                                    f"By: {reading['collected_by']}")
-                                    
-                        # Update the text in the table
-                        self.wells_table.setItem(row, 6, QTableWidgetItem(manual_text))
+                        logger.debug(f"Updated well {well_num} with manual reading from {manual_date}")
+                
+                row = table_rows.get(well_num)
+                if row is not None:
+                    self._set_status_item(row, 1, "green")
+                    local_dt = pytz.UTC.localize(reading.measurement_date_utc).astimezone(central)
+                    manual_text = (f"{local_dt.strftime('%Y-%m-%d %I:%M %p')} | "
+                                   f"{water_level:.2f} ft | "
+                                   f"DTW: {dtw:.2f} ft | "
+                                   f"By: {reading.collected_by}")
+                    self.wells_table.setItem(row, 6, QTableWidgetItem(manual_text))
                 
             # Save changes to JSON if any were made
             if changes_made:
@@ -2534,28 +2188,27 @@ class WaterLevelRunsTab(QWidget):
         """
         Check for manual readings in the database for the wells in the run
         """
-        # ...existing code...
-        
-        # For each manual reading found
-        for _, row in readings_df.iterrows():
-            well_number = row['well_number']
-            
-            # Check if this well is in the run
-            if well_number in run_data['well_status']:
-                # Update the well status with the manual reading
-                run_data['well_status'][well_number]['visited'] = True
-                run_data['well_status'][well_number]['manual_data_date'] = row['measurement_date_utc']
-                run_data['well_status'][well_number]['manual_record'] = {
-                    'water_level': row['water_level'],
-                    'dtw_avg': row['dtw_avg'],
-                    'collected_by': row['collected_by'],
-                    'comments': row['comments']
-                }
-                changes_made = True
+        well_status_map = run_data['well_status']
+        readings = self.status_service.latest_manual_readings(list(well_status_map), start_date, end_date)
+        
+        changes_made = False
+        for well_number, reading in readings.items():
+            # Update the well status with the manual reading
+            well_status = well_status_map[well_number]
+            well_status['visited'] = True
+            well_status['manual_data_date'] = (reading.measurement_date_utc.strftime('%Y-%m-%d %H:%M:%S')
+                                               if reading.measurement_date_utc else None)
+            well_status['manual_record'] = {
+                'water_level': reading.water_level,
+                'dtw_avg': reading.dtw_avg,
+                'collected_by': reading.collected_by,
+                'comments': reading.comments
+            }
+            changes_made = True
         
         # Log changes
         if changes_made:
-            self.logger.debug(f"Updated JSON file with {sum(1 for w in run_data['well_status'].values() if w['manual_record'])} manual readings")
+            logger.debug(f"Updated JSON file with {len(readings)} manual readings")
         
         return changes_made
 
@@ -1808,6 +1808,12 @@ class WaterLevelTab(QWidget):
             QMessageBox.information(self, "Information", 
                                  "Multiple wells selected. Only the first well will be edited.")
             selected_wells = [selected_wells[0]]
+        
+        # On a cloud project the well is leased while it has unsaved edits
+        main_window = self.window()
+        if hasattr(main_window, 'hold_cloud_well_lock') and not main_window.hold_cloud_well_lock(selected_wells[0]):
+            return
+        wrote_database = False
             
         try:
             # Get the plot data for the selected well, including master baro data
@@ -1839,7 +1845,9 @@ class WaterLevelTab(QWidget):
                 db_path=self.db_manager.current_db
             )
             
-            if dialog.exec_() == QDialog.Accepted:
+            accepted = dialog.exec_() == QDialog.Accepted
+            wrote_database = dialog.wrote_database
+            if accepted:
                 # Handle the edited data here
                 self.update_plot()
                 # Refresh wells table to show updated flag status
@@ -1848,6 +1856,9 @@ class WaterLevelTab(QWidget):
         except Exception as e:
             logger.error(f"Error opening edit dialog: {e}")
             QMessageBox.critical(self, "Error", f"Failed to open edit dialog: {str(e)}")
+        finally:
+            if hasattr(main_window, 'end_cloud_well_edit'):
+                main_window.end_cloud_well_edit(selected_wells[0], wrote_database)
     
     def update_for_screen(self, screen):
         """Update layout for the current screen"""
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test script for the batch conversion engine of the Solinst converters.
+
+Checks that the streamed XLE output is identical to the previous minidom
+pretty-printed documents, that parallel and in-process batches write the
+same files, that up-to-date outputs are skipped unless forced, that failures
+are reported per file without leaving partial outputs, and that the unit
+converter converts in place.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+import xml.dom.minidom
+import xml.etree.ElementTree as ET
+from copy import deepcopy
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+
+from batch_converter import (CONVERTED, FAILED, UNCHANGED, UP_TO_DATE, XmlStreamWriter, atomic_output,
+                             convert_batch, find_files)
+from csv_to_xle_converter import CsvToXleConverter
+from solinst_lev_to_xle_converter import LevToXleConverter, convert_lev_file, xle_path_for
+from solinst_unit_converter import UnitConverter
+from src.gui.handlers.solinst_reader import SolinstReader
+
+from test_xle_file_cache import make_xle
+
+
+def make_lev(serial='2079142', readings=200, unit='m'):
+    rows = [f"2024/03/15 {i // 4 % 24:02d}:{i % 4 * 15:02d}:00.0     {10 + i * 0.001:.4f}      8.{i % 10}"
+            for i in range(readings)]
+    return f"""Data file for DataLogger.
+==============================================================================
+COMPANY   : Test & Co
+LICENSE   :
+DATE      : 03/15/24
+TIME      : 10:00:00
+FILENAME  : field.lev
+CREATED BY : Solinst
+===========================   BEGINNING OF DATA     ==========================
+[Instrument info]
+Instrument type   = LT_EDGE_M10
+Instrument state  = STOPPED
+Serial number     = 100-{serial} 2
+Channel           = 2
+FW                = 3.004
+[Channel 1]
+Identification    = LEVEL
+[Channel 2]
+Identification    = TEMPERATURE
+[Instrument info from data header]
+Location          = WELL <A>
+Sample Rate       = 900
+Sample Mode       = 0
+Start Time        = 15/03/2024 00:00:00
+Stop Time         = 16/03/2024 00:00:00
+[CHANNEL 1 from data header]
+Identification    = LEVEL
+Unit              = {unit}
+[CHANNEL 2 from data header]
+Identification    = TEMPERATURE
+Unit              = Deg C
+[Data]
+{readings}
+{chr(10).join(rows)}
+END OF DATA FILE OF DATALOGGER FOR WINDOWS
+"""
+
+
+def make_csv(readings=100):
+    rows = [f"3/15/2024,{1 + i // 60 % 12}:{i % 60:02d}:00 PM,0,{10 + i * 0.01:.3f},8.5" for i in range(readings)]
+    return "\n".join(["Serial_number:", "2123456", "Project ID:", "P & Q", "Location:", "WELL-1",
+                      "Date,Time,ms,LEVEL,TEMPERATURE"] + rows) + "\n"
+
+
+def _folder(files):
+    root = tempfile.mkdtemp(prefix='batch_convert_test_')
+    for name, content in files.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    return root
+
+
+def _legacy_and_streamed(converter, parsed):
+    """Previous minidom output and the streamed output of the same document"""
+    root, logs = converter._create_xle_tree(parsed)
+    logs = list(logs)
+    legacy_root = deepcopy(root)
+    legacy_root.find('Data').extend(deepcopy(logs))
+    legacy = xml.dom.minidom.parseString(ET.tostring(legacy_root, encoding='unicode')).toprettyxml(indent="    ")
+    stream = StringIO()
+    XmlStreamWriter(stream).write_document(root, {'Data': iter(logs)})
+    return legacy, stream.getvalue()
+
+
+def test_streamed_xml_matches_minidom_output():
+    root = _folder({'a.lev': make_lev(), 'b.csv': make_csv(), 'empty.lev': make_lev(readings=0)})
+    lev = LevToXleConverter()
+    for name in ['a.lev', 'empty.lev']:
+        legacy, streamed = _legacy_and_streamed(lev, lev._parse_lev_file(os.path.join(root, name)))
+        assert streamed == legacy
+    csv_converter = CsvToXleConverter()
+    legacy, streamed = _legacy_and_streamed(csv_converter, csv_converter._parse_csv_file(os.path.join(root, 'b.csv')))
+    assert streamed == legacy and '&amp;' in streamed
+
+    # Converted files read back as XLE
+    for path in [csv_converter.convert_file(os.path.join(root, 'b.csv')), lev.convert_file(os.path.join(root, 'a.lev'))]:
+        df, metadata = SolinstReader().read_xle(Path(path))
+        assert len(df) in (100, 200) and metadata.serial_number in ('2123456', '2079142')
+
+
+def test_parallel_batch_matches_in_process_batch():
+    files = {f"site{i % 3}/{i}.lev": make_lev(serial=f"20{i:05d}", readings=50 + i) for i in range(24)}
+    files['site0/bad.lev'] = make_lev(readings=10)
+    serial_root, parallel_root = _folder(files), _folder(files)
+    for root in (serial_root, parallel_root):
+        os.mkdir(os.path.join(root, 'site0', 'bad.xle'))  # Output cannot be written
+
+    serial = LevToXleConverter().convert_folder(serial_root, workers=1)
+    done = []
+    parallel = LevToXleConverter().convert_folder(parallel_root, workers=3,
+                                                  progress=lambda d, t, r: done.append((d, t)))
+    assert done[-1] == (25, 25)
+    assert serial.count(CONVERTED) == parallel.count(CONVERTED) == 24
+    assert [(r.source, r.status) for r in parallel.failures] == [(os.path.join(parallel_root, 'site0', 'bad.lev'),
+                                                                   FAILED)]
+    for output in serial.outputs:
+        other = os.path.join(parallel_root, os.path.relpath(output, serial_root))
+        assert open(output).read() == open(other).read()
+    assert not [name for name in os.listdir(os.path.join(parallel_root, 'site0')) if name.endswith('.tmp')]
+
+
+def test_up_to_date_outputs_are_skipped():
+    root = _folder({f"{i}.lev": make_lev(readings=20) for i in range(4)})
+    converter = LevToXleConverter()
+    assert len(converter.scan_and_convert(root, workers=1)) == 4
+
+    report = converter.convert_folder(root, workers=1)
+    assert report.count(UP_TO_DATE) == 4 and report.outputs == []
+
+    # A newer source is converted again, and force converts everything
+    source = os.path.join(root, '2.lev')
+    os.utime(source, (time.time() + 10, time.time() + 10))
+    report = converter.convert_folder(root, workers=1)
+    assert report.outputs == [xle_path_for(source)]
+    assert converter.convert_folder(root, workers=1, force=True).count(CONVERTED) == 4
+
+    report_path = os.path.join(root, 'report.csv')
+    report.write_csv(report_path)
+    assert open(report_path).read().count('up_to_date') == 3
+
+
+def test_failed_write_leaves_no_partial_output():
+    target = os.path.join(tempfile.mkdtemp(), 'out.xle')
+
+    def logs():
+        yield ET.Element('Log')
+        raise ValueError("bad reading")
+
+    try:
+        with atomic_output(target) as f:
+            XmlStreamWriter(f).write_document(ET.Element('Body_xle'), {'Body_xle': logs()})
+        assert False, "write did not fail"
+    except ValueError:
+        pass
+    assert os.listdir(os.path.dirname(target)) == []
+
+    report = convert_batch(convert_lev_file, [os.path.join(os.path.dirname(target), 'missing.lev')], workers=1)
+    assert report.results[0].status == FAILED and 'missing.lev' in report.results[0].error
+
+
+def test_unit_converter_converts_in_place():
+    feet = make_xle(readings=30).decode('utf-8')
+    meters = feet.replace('<Unit>ft</Unit>', '<Unit>m</Unit>')
+    root = _folder({'ft.xle': feet, 'm.xle': meters, 'broken.xle': '<Body_xle>'})
+
+    stats = UnitConverter().convert_directory(root, workers=1)
+    assert stats == {'total': 3, 'converted': 1, 'already_ft': 1, 'errors': 1}
+
+    tree = ET.parse(os.path.join(root, 'm.xle'))
+    assert tree.find('.//Ch1_data_header/Unit').text == 'ft'
+    values = [float(e.text) for e in tree.getroot().iter('ch1')]
+    originals = [float(v) for v in re.findall(r'<ch1>(.*?)</ch1>', meters)]
+    assert all(abs(v - o * 3.28084) < 1e-5 for v, o in zip(values, originals))
+    assert open(os.path.join(root, 'ft.xle'), encoding='utf-8').read() == feet
+
+    # Second run finds everything in feet
+    report = UnitConverter().convert_folder(root, workers=1)
+    assert report.count(UNCHANGED) == 2
+    assert find_files(root, '.XLE') == sorted(os.path.join(root, n) for n in ['broken.xle', 'ft.xle', 'm.xle'])
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
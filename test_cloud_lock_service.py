@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Test script for lease-based cloud project locks.
+
+Runs CloudLockService against LocalLockBackend (temp directory) with a
+controllable clock, and against DriveLockBackend on FakeDriveService, to
+check blocking, per-well partitions, lease expiry, stealing and heartbeats,
+that two CloudDatabaseHandlers saving the same project never overwrite
+each other's upload, and that saves merge the wells each user holds a lease on.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import threading
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_drive_service import FakeDriveService, FakeMediaIoBaseDownload
+from src.gui.handlers.cloud_lock_service import (
+    CloudLockService, LocalLockBackend, DriveLockBackend, PROJECT_LOCK, UPLOAD_LOCK,
+    CLOCK_SKEW_SECONDS, well_lock_key
+)
+from src.gui.handlers import cloud_database_handler
+from src.gui.handlers.cloud_database_handler import CloudDatabaseHandler
+
+cloud_database_handler.MediaIoBaseDownload = FakeMediaIoBaseDownload
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _clients(*names, ttl=60):
+    directory = tempfile.mkdtemp(prefix='locks_test_')
+    clock = FakeClock()
+    return clock, [CloudLockService(LocalLockBackend(directory), name, ttl=ttl, clock=clock) for name in names]
+
+
+def test_second_client_is_blocked_until_release():
+    clock, (alice, bob) = _clients('alice', 'bob')
+    try:
+        assert alice.acquire() is not None
+        assert bob.acquire() is None
+        assert bob.check().holder == 'alice'
+        assert alice.check() is None  # Own leases never block
+
+        alice.release()
+        assert bob.acquire() is not None
+    finally:
+        alice.release_all()
+        bob.release_all()
+
+
+def test_well_partitions_do_not_serialize():
+    clock, (alice, bob) = _clients('alice', 'bob')
+    try:
+        assert alice.acquire(well_lock_key('WELL-1')) is not None
+        assert bob.acquire(well_lock_key('WELL-2')) is not None
+        assert bob.acquire(well_lock_key('WELL-1')) is None
+        assert bob.acquire(PROJECT_LOCK) is None  # Project lock conflicts with every partition
+
+        alice.release(well_lock_key('WELL-1'))
+        assert alice.acquire(PROJECT_LOCK) is None  # Bob still holds WELL-2
+    finally:
+        alice.release_all()
+        bob.release_all()
+
+
+def test_crashed_holder_lease_expires():
+    clock, (alice, bob) = _clients('alice', 'bob', ttl=60)
+    lost = []
+    try:
+        alice.acquire(on_lost=lost.append)
+        alice.stop_heartbeat()  # Alice "crashes": no more renewals
+
+        clock.now += 60 + CLOCK_SKEW_SECONDS + 1
+        assert bob.acquire() is not None
+
+        # Alice comes back; her heartbeat must notice she no longer holds the lock
+        alice.renew_all()
+        assert lost and lost[0].lost
+        assert not alice.is_held()
+    finally:
+        alice.release_all()
+        bob.release_all()
+
+
+def test_renewed_lease_does_not_expire():
+    clock, (alice, bob) = _clients('alice', 'bob', ttl=60)
+    try:
+        alice.acquire()
+        alice.stop_heartbeat()
+        for _ in range(10):
+            clock.now += 30
+            alice.renew_all()
+        assert alice.is_held()
+        assert bob.acquire() is None
+    finally:
+        alice.release_all()
+        bob.release_all()
+
+
+def test_stealing_notifies_previous_holder():
+    clock, (alice, bob) = _clients('alice', 'bob')
+    lost = []
+    try:
+        alice.acquire(on_lost=lost.append)
+        lease = bob.acquire(steal=True)
+        assert lease is not None
+
+        alice.renew_all()
+        assert lost and 'stolen' in lost[0].lost_reason
+        assert not alice.is_held()
+        record = alice.check()
+        assert record.holder == 'bob' and record.stolen_from == 'alice'
+    finally:
+        alice.release_all()
+        bob.release_all()
+
+
+def test_heartbeat_thread_renews_in_background():
+    directory = tempfile.mkdtemp(prefix='locks_test_')
+    alice = CloudLockService(LocalLockBackend(directory), 'alice', ttl=0.5, heartbeat_interval=0.05)
+    try:
+        lease = alice.acquire()
+        first_expiry = lease.expires_at
+        time.sleep(0.7)
+        assert alice.is_held()
+        assert lease.expires_at > first_expiry
+    finally:
+        alice.release_all()
+    assert alice._heartbeat_thread is None
+
+
+def test_drive_backend():
+    drive = FakeDriveService()
+    locks_folder = drive.add_folder('locks')
+    clock = FakeClock()
+    alice = CloudLockService(DriveLockBackend(drive, locks_folder), 'alice', clock=clock)
+    bob = CloudLockService(DriveLockBackend(drive, locks_folder), 'bob', clock=clock)
+    try:
+        assert alice.acquire() is not None
+        assert bob.acquire() is None
+        assert len(drive.children(locks_folder)) == 1  # Bob's losing claim was withdrawn
+
+        bob.acquire(steal=True)
+        alice.renew_all()
+        assert not alice.is_held() and bob.is_held()
+    finally:
+        alice.release_all()
+        bob.release_all()
+    assert drive.children(locks_folder) == []
+
+
+class _ThreadRecordingService:
+    """Drive service wrapper recording the threads that use it"""
+
+    def __init__(self, drive):
+        self.drive = drive
+        self.threads = set()
+
+    def files(self):
+        self.threads.add(threading.get_ident())
+        return self.drive.files()
+
+
+def test_heartbeat_uses_its_own_drive_service():
+    drive = FakeDriveService()
+    locks_folder = drive.add_folder('locks')
+    owner = _ThreadRecordingService(drive)
+    built = []
+
+    def build_service():
+        built.append(_ThreadRecordingService(drive))
+        return built[-1]
+
+    backend = DriveLockBackend(owner, locks_folder, service_factory=build_service)
+    alice = CloudLockService(backend, 'alice', ttl=0.5, heartbeat_interval=0.05)
+    try:
+        lease = alice.acquire()
+        first_expiry = lease.expires_at
+        time.sleep(0.3)
+        assert lease.expires_at > first_expiry
+        assert owner.threads == {threading.get_ident()}
+        assert len(built) == 1 and built[0].threads == {alice._heartbeat_thread.ident}
+    finally:
+        alice.release_all()
+
+
+def _cloud_handlers(drive, *names):
+    settings = {"local_db_directory": tempfile.mkdtemp(prefix='locks_test_')}
+    settings_handler = MagicMock()
+    settings_handler.get_setting.side_effect = lambda key, default=None: settings.get(key, default)
+    drive_service = MagicMock()
+    drive_service.get_service.return_value = drive
+    drive_service.build_service.return_value = drive
+    handlers = [CloudDatabaseHandler(drive_service, settings_handler) for _ in names]
+    for handler in handlers:
+        handler.upload_lock_wait = 5
+
+    def uploader(name):
+        def upload(service, project_info, temp_db_path, progress_callback=None):
+            time.sleep(0.05)  # Give the other client time to interleave
+            drive.modify_file(project_info['database_id'], name.encode())
+            return True
+        return upload
+
+    for name, handler in zip(names, handlers):
+        handler._upload_database = uploader(name)
+    return handlers
+
+
+def _project(drive):
+    db_folder = drive.add_folder('databases')
+    database_id = drive.add_file('project.db', db_folder, content=b'db')
+    return database_id, db_folder
+
+
+def test_cloud_handler_save_refuses_when_locked_elsewhere():
+    drive = FakeDriveService()
+    database_id, db_folder = _project(drive)
+    project_info = {'database_id': database_id, 'db_folder_id': db_folder}
+
+    alice, bob = _cloud_handlers(drive, 'alice', 'bob')
+    try:
+        assert alice.acquire_lock(project_info, 'alice')
+        assert drive.files_by_id[database_id]['properties']['locked_by'] == 'alice'
+        assert bob.check_lock(project_info, 'bob')[:2] == (True, 'alice')
+        bob.upload_lock_wait = 0
+        assert not bob.save_database('project', project_info, 'unused.db', 'bob', 'edit')
+
+        alice.release_lock(project_info)
+        assert 'locked_by' not in drive.files_by_id[database_id]['properties']
+        assert bob.check_lock(project_info, 'bob')[0] is False
+    finally:
+        alice.cleanup_temp_files()
+        bob.cleanup_temp_files()
+
+
+def test_racing_cloud_handlers_never_overwrite_each_other():
+    drive = FakeDriveService()
+    database_id, db_folder = _project(drive)
+    loaded = drive.files_by_id[database_id]['modifiedTime']
+    alice, bob = _cloud_handlers(drive, 'alice', 'bob')
+    infos = {name: {'database_id': database_id, 'db_folder_id': db_folder, 'modified_time': loaded}
+             for name in ('alice', 'bob')}
+    results = {}
+    barrier = threading.Barrier(2)
+
+    def save(name, handler):
+        barrier.wait()
+        results[name] = handler.save_database('project', infos[name], 'unused.db', name, 'edit')
+
+    try:
+        threads = [threading.Thread(target=save, args=item) for item in (('alice', alice), ('bob', bob))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results.values()) == [False, True]
+        winner = next(name for name, saved in results.items() if saved)
+        loser = 'bob' if winner == 'alice' else 'alice'
+        assert drive.contents[database_id] == winner.encode()
+
+        # Once the lock is free the loser is still refused: its copy predates the upload
+        handler = bob if loser == 'bob' else alice
+        assert not handler.save_database('project', infos[loser], 'unused.db', loser, 'edit')
+        assert drive.contents[database_id] == winner.encode()
+        assert infos[winner]['modified_time'] == drive.files_by_id[database_id]['modifiedTime']
+    finally:
+        alice.cleanup_temp_files()
+        bob.cleanup_temp_files()
+
+
+def _make_project_db(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE wells (well_number TEXT PRIMARY KEY, user_flag TEXT)")
+        conn.execute("CREATE TABLE water_level_readings (id INTEGER PRIMARY KEY, well_number TEXT, "
+                     "timestamp_utc TEXT, water_level REAL)")
+        conn.executemany("INSERT INTO wells VALUES (?, 'ok')", [('W-1',), ('W-2',)])
+        conn.executemany("INSERT INTO water_level_readings (well_number, timestamp_utc, water_level) VALUES (?, ?, 1.0)",
+                         [(well, f"2025-01-0{day} 00:00:00") for day in (1, 2) for well in ('W-1', 'W-2')])
+
+
+def _readings(path, well):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT timestamp_utc, water_level FROM water_level_readings "
+                            "WHERE well_number = ? ORDER BY timestamp_utc", (well,)).fetchall()
+
+
+def _file_uploader(drive):
+    def upload(service, project_info, temp_db_path, progress_callback=None):
+        with open(temp_db_path, 'rb') as f:
+            drive.modify_file(project_info['database_id'], f.read())
+        return True
+    return upload
+
+
+def test_saves_merge_the_wells_each_user_holds():
+    directory = tempfile.mkdtemp(prefix='locks_test_')
+    original = os.path.join(directory, 'project.db')
+    _make_project_db(original)
+    drive = FakeDriveService()
+    db_folder = drive.add_folder('databases')
+    with open(original, 'rb') as f:
+        database_id = drive.add_file('project.db', db_folder, content=f.read())
+    loaded = drive.files_by_id[database_id]['modifiedTime']
+
+    alice, bob = _cloud_handlers(drive, 'alice', 'bob')
+    infos, copies = {}, {}
+    for name, handler in (('alice', alice), ('bob', bob)):
+        handler._upload_database = _file_uploader(drive)
+        infos[name] = {'database_id': database_id, 'db_folder_id': db_folder, 'modified_time': loaded}
+        copies[name] = os.path.join(directory, f'{name}.db')
+        with open(copies[name], 'wb') as f:
+            f.write(drive.contents[database_id])
+    try:
+        # Editing a well takes its lease; nobody holds the project while it is open
+        assert alice.hold_lock(infos['alice'], 'alice', well_lock_key('W-1')) == (True, None)
+        assert bob.hold_lock(infos['bob'], 'bob', well_lock_key('W-1')) == (False, 'alice')
+        assert bob.hold_lock(infos['bob'], 'bob', well_lock_key('W-2')) == (True, None)
+
+        # Both add a reading, so both copies hand out the same new row ID
+        for name, well, level in (('alice', 'W-1', 5.0), ('bob', 'W-2', 7.0)):
+            with sqlite3.connect(copies[name]) as conn:
+                conn.execute("UPDATE water_level_readings SET water_level = ? WHERE well_number = ?", (level, well))
+                conn.execute("INSERT INTO water_level_readings (well_number, timestamp_utc, water_level) "
+                             "VALUES (?, '2025-01-03 00:00:00', ?)", (well, level))
+
+        assert alice.save_database('project', infos['alice'], copies['alice'], 'alice', 'W-1', allow_merge=True)
+        assert not alice.last_save_merged
+        assert not alice.holds_lock(infos['alice'], UPLOAD_LOCK)
+
+        # Bob's copy is stale; edits outside his leases cannot be merged
+        assert not bob.save_database('project', infos['bob'], copies['bob'], 'bob', 'W-2')
+        assert bob.save_database('project', infos['bob'], copies['bob'], 'bob', 'W-2', allow_merge=True)
+        assert bob.last_save_merged
+
+        uploaded = os.path.join(directory, 'uploaded.db')
+        with open(uploaded, 'wb') as f:
+            f.write(drive.contents[database_id])
+        for path in (uploaded, copies['bob']):
+            assert _readings(path, 'W-1') == _readings(copies['alice'], 'W-1')
+            assert [level for _, level in _readings(path, 'W-1')] == [5.0] * 3
+            assert [level for _, level in _readings(path, 'W-2')] == [7.0] * 3
+        assert not os.path.exists(f"{copies['bob']}.merge")
+        assert infos['bob']['modified_time'] == drive.files_by_id[database_id]['modifiedTime']
+    finally:
+        alice.release_lock(infos['alice'])
+        bob.release_lock(infos['bob'])
+        alice.cleanup_temp_files()
+        bob.cleanup_temp_files()
+
+
+def test_lost_well_lease_blocks_the_save():
+    drive = FakeDriveService()
+    database_id, db_folder = _project(drive)
+    loaded = drive.files_by_id[database_id]['modifiedTime']
+    alice, bob = _cloud_handlers(drive, 'alice', 'bob')
+    alice_info = {'database_id': database_id, 'db_folder_id': db_folder, 'modified_time': loaded}
+    bob_info = dict(alice_info)
+    lost = []
+    try:
+        assert alice.hold_lock(alice_info, 'alice', well_lock_key('W-1'), on_lost=lost.append) == (True, None)
+        assert bob.acquire_lock(bob_info, 'bob', key=well_lock_key('W-1'), steal=True)
+        alice.lock_services[database_id].renew_all()
+        assert [lease.key for lease in lost] == [well_lock_key('W-1')]
+
+        assert not alice.save_database('project', alice_info, 'unused.db', 'alice', 'edit', allow_merge=True)
+        assert drive.contents[database_id] == b'db'
+    finally:
+        alice.release_lock(alice_info)
+        bob.release_lock(bob_info)
+        alice.cleanup_temp_files()
+        bob.cleanup_temp_files()
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
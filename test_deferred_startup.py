@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for the deferred startup helpers.
+
+Checks the StartupTimer report (login time is excluded from the interactive
+time, history is capped) and that importing the handler and dialog packages
+no longer imports pandas or the import handlers.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers import deferred_startup
+from src.gui.handlers.deferred_startup import StartupTimer
+
+
+def test_report_excludes_user_wait():
+    timer = StartupTimer()
+    with timer.phase("login dialog", user_wait=True):
+        time.sleep(0.05)
+    with timer.phase("build database tab"):
+        time.sleep(0.01)
+    timer.mark("interactive")
+
+    data = timer.as_dict()
+
+    assert data['user_wait_ms'] >= 50
+    assert data['interactive_ms'] < data['marks_ms']['interactive'] - 45
+    assert [p['name'] for p in data['phases_ms']] == ["login dialog", "build database tab"]
+    assert "build database tab" in timer.format_report()
+
+
+def test_report_history_is_appended_and_capped():
+    history = Path(tempfile.mkdtemp()) / "config" / "startup_timings.jsonl"
+    original_cap = deferred_startup.MAX_REPORT_HISTORY
+    deferred_startup.MAX_REPORT_HISTORY = 3
+    try:
+        for run in range(5):
+            timer = StartupTimer()
+            timer.mark("interactive")
+            timer.report(history)
+            timer.report(history)  # Only reported once per timer
+    finally:
+        deferred_startup.MAX_REPORT_HISTORY = original_cap
+
+    lines = history.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 3
+    assert all('interactive_ms' in json.loads(line) for line in lines)
+
+
+def test_package_imports_stay_light():
+    code = ("import sys; import src.gui.handlers, src.gui.dialogs; "
+            "print('pandas' in sys.modules, 'src.gui.handlers.water_level_single_handler' in sys.modules)")
+    root = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.split() == ['False', 'False']
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
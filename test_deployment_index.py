@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for the transducer deployment index.
+
+Compares DeploymentIndex.find_well with the previous linear search of the
+transducer locations on a randomized set of deployments and files, checks
+loading from a locations CSV and from the transducer_locations table, the
+overlap and gap reports, and that matching a large archive is fast.
+"""
+
+import csv
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers.deployment_index import DeploymentIndex
+
+FMT = '%Y-%m-%d %H:%M:%S'
+
+
+def _legacy_find_well(locations, serial_number, start_time, stop_time):
+    """_find_well_for_time_range of the missing files organizer (without logging)"""
+    if not start_time or not stop_time or not serial_number:
+        return None
+    try:
+        file_start = datetime.strptime(start_time, FMT)
+        file_end = datetime.strptime(stop_time, FMT)
+        for location in [loc for loc in locations if loc.get('serial_number', '') == serial_number]:
+            try:
+                if not location.get('start_date', ''):
+                    continue
+                loc_start = datetime.strptime(location['start_date'], FMT)
+                end_date = location.get('end_date', '')
+                loc_end = datetime.strptime(end_date, FMT) if end_date else datetime.max
+                if file_start <= loc_end and file_end >= loc_start:
+                    return location.get('well_number', '')
+            except (ValueError, TypeError):
+                continue
+        return None
+    except Exception:
+        return None
+
+
+def _locations(rng, serials=40):
+    locations = []
+    for s in range(serials):
+        current = datetime(2015, 1, 1) + timedelta(days=rng.randint(0, 300))
+        for d in range(rng.randint(1, 12)):
+            length = timedelta(days=rng.randint(20, 400))
+            end = current + length
+            locations.append({'serial_number': f"21{s:05d}", 'well_number': f"W-{rng.randint(1, 60)}",
+                              'start_date': current.strftime(FMT),
+                              'end_date': '' if d == 11 or rng.random() < 0.05 else end.strftime(FMT)})
+            # Occasional overlapping re-deployment or gap
+            current = end + timedelta(days=rng.choice([-30, 0, 0, 0, 5, 90]))
+    locations.append({'serial_number': '2100001', 'well_number': 'BAD', 'start_date': 'not a date', 'end_date': ''})
+    locations.append({'serial_number': '2100002', 'well_number': 'NOSTART', 'start_date': '', 'end_date': ''})
+    rng.shuffle(locations)
+    return locations
+
+
+def _files(rng, count):
+    for _ in range(count):
+        start = datetime(2014, 6, 1) + timedelta(hours=rng.randint(0, 24 * 365 * 12))
+        stop = start + timedelta(hours=rng.randint(0, 24 * 120))
+        yield f"21{rng.randint(0, 45):05d}", start.strftime(FMT), stop.strftime(FMT)
+
+
+def test_matches_linear_search():
+    rng = random.Random(3)
+    locations = _locations(rng)
+    index = DeploymentIndex(locations)
+    assert index.skipped == 2
+    matched = 0
+    for serial, start, stop in list(_files(rng, 5000)) + [('2100003', '', '2020-01-01 00:00:00')]:
+        expected = _legacy_find_well(locations, serial, start, stop)
+        assert index.find_well(serial, start, stop) == expected, (serial, start, stop)
+        matched += expected is not None
+    assert 1000 < matched < 5000
+
+
+def test_loads_from_csv_and_database():
+    rng = random.Random(5)
+    locations = [loc for loc in _locations(rng, serials=10) if loc['well_number'] not in ('BAD', 'NOSTART')]
+    folder = tempfile.mkdtemp()
+    csv_path = os.path.join(folder, 'locations.csv')
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['serial_number', 'well_number', 'start_date', 'end_date'])
+        writer.writeheader()
+        writer.writerows(locations)
+    db_path = os.path.join(folder, 'levels.db')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE transducer_locations (id INTEGER PRIMARY KEY AUTOINCREMENT, serial_number TEXT, "
+                     "well_number TEXT, start_date TIMESTAMP, end_date TIMESTAMP, notes TEXT)")
+        conn.executemany("INSERT INTO transducer_locations (serial_number, well_number, start_date, end_date) "
+                         "VALUES (?, ?, ?, ?)", [(l['serial_number'], l['well_number'], l['start_date'],
+                                                  l['end_date'] or None) for l in locations])
+        # Installation dates entered without a time
+        conn.execute("INSERT INTO transducer_locations (serial_number, well_number, start_date) "
+                     "VALUES ('2199999', 'W-NEW', '2024-05-01')")
+
+    from_csv, from_db = DeploymentIndex.load(csv_path), DeploymentIndex.load(db_path)
+    assert len(from_csv) == len(locations) and len(from_db) == len(locations) + 1
+    for serial, start, stop in _files(rng, 1000):
+        assert from_csv.find_well(serial, start, stop) == from_db.find_well(serial, start, stop)
+    assert from_db.find_well('2199999', '2024-05-01 12:00:00', '2024-06-01 00:00:00') == 'W-NEW'
+
+
+def test_reports_overlaps_and_gaps():
+    index = DeploymentIndex([
+        {'serial_number': 'A', 'well_number': 'W-1', 'start_date': '2020-01-01 00:00:00', 'end_date': '2020-06-01 00:00:00'},
+        {'serial_number': 'A', 'well_number': 'W-2', 'start_date': '2020-05-01 00:00:00', 'end_date': '2020-09-01 00:00:00'},
+        {'serial_number': 'A', 'well_number': 'W-3', 'start_date': '2020-10-01 00:00:00', 'end_date': ''},
+        {'serial_number': 'B', 'well_number': 'W-4', 'start_date': '2021-01-01 00:00:00', 'end_date': '2021-02-01 00:00:00'},
+    ])
+    assert index.overlaps() == [{'serial_number': 'A', 'well_number': 'W-1', 'other_well_number': 'W-2',
+                                 'start': datetime(2020, 5, 1), 'end': datetime(2020, 6, 1)}]
+    assert index.gaps() == [{'serial_number': 'A', 'after_well_number': 'W-2', 'before_well_number': 'W-3',
+                             'start': datetime(2020, 9, 1), 'end': datetime(2020, 10, 1)}]
+    assert index.gaps(min_gap=timedelta(days=60)) == []
+
+    assert index.is_ambiguous('A', '2020-05-15 00:00:00', '2020-05-20 00:00:00')
+    assert index.find_well('A', '2020-05-15 00:00:00', '2020-05-20 00:00:00') == 'W-1'
+    assert not index.is_ambiguous('A', '2021-05-15 00:00:00', '2030-01-01 00:00:00')
+    assert index.find_well('A', '2020-09-10 00:00:00', '2020-09-20 00:00:00') is None
+
+
+def test_large_archive_is_fast():
+    rng = random.Random(9)
+    locations = _locations(rng, serials=2000)
+    files = list(_files(rng, 100_000))
+    start = time.perf_counter()
+    index = DeploymentIndex(locations)
+    wells = [index.find_well(*file) for file in files]
+    elapsed = time.perf_counter() - start
+    assert sum(w is not None for w in wells) > 1000
+    assert elapsed < 10, f"matching 100k files took {elapsed:.2f}s"
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
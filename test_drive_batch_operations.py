@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for batched Google Drive operations.
+
+Runs DriveBatchOperations and FieldDataConsolidator against the in-memory
+FakeDriveService and checks that calls are coalesced into batches, folder
+lookups are memoized and listings follow every page.
+"""
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_drive_service import FakeDriveService
+from src.gui.handlers.drive_batch_operations import DriveBatchOperations
+from src.gui.handlers.field_data_consolidator import FieldDataConsolidator
+
+
+def test_batches_are_capped_at_100_calls():
+    drive = FakeDriveService()
+    source = drive.add_folder('source')
+    target = drive.add_folder('target')
+    file_ids = [drive.add_file(f"file_{i}.xle", source, content=b'x') for i in range(250)]
+    ops = DriveBatchOperations(drive)
+    drive.round_trips = 0
+
+    copied = []
+    for file_id in file_ids:
+        ops.copy(file_id, {'name': f"copy_{file_id}", 'parents': [target]},
+                 callback=lambda response, exception: copied.append(response['id']))
+    ops.flush()
+
+    assert drive.batch_sizes == [100, 100, 50]
+    assert drive.round_trips == 3
+    assert len(copied) == 250
+    assert len(drive.children(target)) == 250
+
+
+def test_failed_calls_are_reported_per_request():
+    drive = FakeDriveService()
+    folder = drive.add_folder('folder')
+    good = drive.add_file('good.xle', folder)
+    ops = DriveBatchOperations(drive)
+
+    good_id = ops.delete(good)
+    bad_id = ops.delete('missing')
+    results = ops.flush()
+
+    assert results[good_id][1] is None
+    assert results[bad_id][1] is not None
+
+
+def test_folder_resolution_is_memoized():
+    drive = FakeDriveService()
+    parent = drive.add_folder('FIELD_DATA_CONSOLIDATED')
+    existing = drive.add_folder('2025-01', parent)
+    ops = DriveBatchOperations(drive)
+    drive.round_trips = 0
+
+    assert ops.resolve_folder(parent, '2025-01') == existing
+    created = ops.resolve_folder(parent, '2025-02')
+    trips_after_first_lookups = drive.round_trips
+    for _ in range(50):
+        assert ops.resolve_folder(parent, '2025-01') == existing
+        assert ops.resolve_folder(parent, '2025-02') == created
+
+    assert trips_after_first_lookups == 3  # one list, one list + create
+    assert drive.round_trips == trips_after_first_lookups
+    assert ops.resolve_folder(parent, '2025-03', create=False) is None
+
+
+def test_listing_follows_every_page():
+    drive = FakeDriveService()
+    folder = drive.add_folder('2025-05')
+    for i in range(2500):
+        drive.add_file(f"P-{i}_2025_04_01_To_2025_05_01.xle", folder)
+    ops = DriveBatchOperations(drive)
+    drive.round_trips = 0
+
+    files = ops.list_children(folder, extra_query="fileExtension = 'xle'")
+
+    assert len(files) == 2500
+    assert drive.round_trips == 3
+
+
+def test_consolidation_uses_few_round_trips():
+    drive = FakeDriveService()
+    main_folder = drive.add_folder('water_levels_monitoring')
+    field_folder = drive.add_folder('field_laptop')
+    for i in range(300):
+        drive.add_file(f"{2000000 + i}_WELL-{i}_2025_04_28_To_05_22.xle", field_folder, content=b'<xle/>',
+                       modifiedTime='2025-05-22T10:00:00.000Z')
+
+    settings = {"google_drive_folder_id": main_folder, "field_data_folders": [field_folder]}
+    settings_handler = MagicMock()
+    settings_handler.get_setting.side_effect = lambda key, default=None: settings.get(key, default)
+
+    consolidator = FieldDataConsolidator(drive, settings_handler)
+    # Renaming needs the XLE contents; that download is not under test here
+    consolidator.generate_corrected_filename = lambda file_info: file_info['name']
+    drive.round_trips = 0
+
+    assert consolidator.consolidate_field_data()
+
+    consolidated = drive.children(settings_handler.set_setting.call_args[0][1])
+    month_folder = [f for f in consolidated if f['name'] == '2025-05'][0]
+    archived = [f for f in drive.children(field_folder) if f['name'] == 'archived'][0]
+    assert len(drive.children(month_folder['id'])) == 300
+    assert len(drive.children(archived['id'])) == 300
+    assert drive.round_trips < 20, drive.round_trips
+
+
+
+def test_consolidation_keeps_newest_of_same_named_field_files():
+    drive = FakeDriveService()
+    main_folder = drive.add_folder('water_levels_monitoring')
+    field_folders = [drive.add_folder('laptop_a'), drive.add_folder('laptop_b')]
+    versions = {}
+    for folder, first, second in zip(field_folders, ('10', '12'), ('12', '10')):
+        for name, day in (('A', first), ('B', second)):
+            file_id = drive.add_file(f"2000000_{name}_2025_04_28_To_05_22.xle", folder, content=day.encode())
+            drive.files_by_id[file_id]['modifiedTime'] = f'2025-05-{day}T10:00:00.000Z'
+            versions.setdefault(name, []).append(file_id)
+
+    settings = {"google_drive_folder_id": main_folder, "field_data_folders": field_folders}
+    settings_handler = MagicMock()
+    settings_handler.get_setting.side_effect = lambda key, default=None: settings.get(key, default)
+    consolidator = FieldDataConsolidator(drive, settings_handler)
+    consolidator.generate_corrected_filename = lambda file_info: file_info['name']
+
+    assert consolidator.consolidate_field_data()
+
+    consolidated = drive.children(settings_handler.set_setting.call_args[0][1])
+    month_folder = [f for f in consolidated if f['name'] == '2025-05'][0]
+    copies = {f['name'].split('_')[1]: f for f in drive.children(month_folder['id'])}
+    assert sorted(copies) == ['A', 'B']
+    for name, copy in copies.items():
+        # The newer field file wins whichever folder it came from
+        assert drive.contents[copy['id']] == b'12'
+        assert copy['modifiedTime'] == '2025-05-12T10:00:00.000Z'
+    for folder in field_folders:
+        assert [f['name'] for f in drive.children(folder)] == ['archived']
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
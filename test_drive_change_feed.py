@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the persisted Drive change feed.
+
+Checks against FakeDriveService that folder listings are complete across
+pages, that later syncs only read the changes feed, and that the processed
+state survives a restart so only new or modified XLE files are fetched.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_drive_service import FakeDriveService
+from src.gui.handlers.drive_change_feed import DriveChangeFeed
+from src.gui.handlers.runs_folder_monitor import RunsFolderMonitor
+
+
+def _catalog_path():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.remove(path)
+    return path
+
+
+def test_first_sync_lists_every_page():
+    drive = FakeDriveService()
+    folder = drive.add_folder('2025-05')
+    for i in range(2500):
+        drive.add_file(f"W{i}_2025_04_01_To_2025_05_{i % 28 + 1:02d}.xle", folder, content=str(i).encode())
+    drive.add_file('notes.txt', folder)
+
+    feed = DriveChangeFeed(drive, _catalog_path())
+    changed = feed.sync([folder])
+
+    assert len(changed[folder]) == 2501
+    assert len(feed.list_folder(folder, 'xle')) == 2500
+
+
+def test_later_syncs_read_only_the_changes_feed():
+    drive = FakeDriveService()
+    folder = drive.add_folder('incoming')
+    existing = [drive.add_file(f"W{i}_2025_04_01_To_05_01.xle", folder, content=b'old') for i in range(50)]
+    feed = DriveChangeFeed(drive, _catalog_path())
+    feed.sync([folder])
+
+    drive.round_trips = 0
+    assert feed.sync([folder]) == {folder: []}
+    assert drive.round_trips == 1
+
+    new_file = drive.add_file("W99_2025_04_01_To_05_01.xle", folder, content=b'new')
+    drive.modify_file(existing[0], b'changed')
+    drive.trash_file(existing[1])
+    changed = feed.sync([folder])
+
+    assert sorted(changed[folder]) == sorted([new_file, existing[0]])
+    names = {f['id'] for f in feed.list_folder(folder, 'xle')}
+    assert new_file in names and existing[1] not in names
+    assert len(names) == 50
+
+
+def test_processed_state_survives_restart():
+    drive = FakeDriveService()
+    folder = drive.add_folder('incoming')
+    first = drive.add_file("A_2025_04_01_To_05_01.xle", folder, content=b'a')
+    second = drive.add_file("B_2025_04_01_To_05_01.xle", folder, content=b'b')
+    catalog = _catalog_path()
+
+    feed = DriveChangeFeed(drive, catalog)
+    feed.sync([folder])
+    for file in feed.pending_files(folder, 'xle'):
+        feed.mark_processed(file['id'], file['md5Checksum'])
+
+    # New process, same catalog
+    restarted = DriveChangeFeed(drive, catalog)
+    restarted.sync([folder])
+    assert restarted.pending_files(folder, 'xle') == []
+
+    drive.modify_file(second, b'b2')
+    restarted.sync([folder])
+    assert [f['id'] for f in restarted.pending_files(folder, 'xle')] == [second]
+    assert first not in [f['id'] for f in restarted.pending_files(folder)]
+
+
+def test_runs_monitor_scans_complete_month_folders():
+    drive = FakeDriveService()
+    consolidated = drive.add_folder('FIELD_DATA_CONSOLIDATED')
+    month = drive.add_folder('2025-05', consolidated)
+    for i in range(1500):
+        drive.add_file(f"LOC{i}_2025_04_01_To_2025_05_20.xle", month)
+
+    monitor = RunsFolderMonitor(folder_id=consolidated, catalog_path=_catalog_path())
+    monitor.service = drive
+    readings = monitor.get_latest_readings('2025-05')
+
+    assert len(readings) == 1500
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
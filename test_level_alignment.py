@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test script for the insertion level alignment engine.
+
+Compares WaterLevelProcessor.determine_insertion_level and
+correct_boundary_readings with the previous DataFrame-filtering versions on a
+randomized corpus of segments, manual readings and existing levels, and checks
+that a folder-sized batch of one well is aligned against one shared context.
+"""
+
+import os
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers.level_alignment import WellReferenceContext, insertion_level
+from src.gui.handlers.water_level_processor import WaterLevelProcessor
+
+WELL_INFO = {'top_of_casing': 250.0}
+
+
+def _legacy_insertion_level(df, well_info, manual_readings, existing_data):
+    """determine_insertion_level before the alignment engine (without logging)"""
+    new_start = pd.to_datetime(df['timestamp_utc'].iloc[0])
+    new_end = pd.to_datetime(df['timestamp_utc'].iloc[-1])
+    if manual_readings is not None and not manual_readings.empty:
+        valid = manual_readings[(manual_readings['measurement_date_utc'] >= new_start - timedelta(hours=1)) &
+                                (manual_readings['measurement_date_utc'] <= new_end + timedelta(hours=1))]
+        if not valid.empty:
+            segment = valid[(valid['measurement_date_utc'] >= new_start) & (valid['measurement_date_utc'] <= new_end)]
+            candidates = segment if not segment.empty else valid
+            reading = candidates.loc[abs(candidates['measurement_date_utc'] - new_end).idxmin()]
+            selected_time, selected_level = reading['measurement_date_utc'], reading['water_level']
+            closest_idx = abs(df['timestamp_utc'] - selected_time).idxmin()
+            dh = selected_level - df.loc[closest_idx, 'water_pressure']
+            return {'dh': float(dh), 'method': 'manual_readings',
+                    'method_details': f"Single manual reading at {selected_time} (dh={dh:.2f})"}
+    if existing_data is not None and not existing_data.empty:
+        before = existing_data[existing_data['timestamp_utc'] < new_start]
+        if not before.empty:
+            latest_idx = before['timestamp_utc'].idxmax()
+            time_gap = (new_start - before.loc[latest_idx, 'timestamp_utc']).total_seconds() / 3600
+            start_pressure = df.loc[df['timestamp_utc'] == new_start, 'water_pressure'].iloc[0]
+            dh = before.loc[latest_idx, 'water_level'] - start_pressure
+            return {'dh': float(dh), 'method': 'predicted',
+                    'method_details': f"Predicted from existing data with {time_gap:.2f}h gap"}
+    start_pressure = df.loc[df['timestamp_utc'] == new_start, 'water_pressure'].iloc[0]
+    dh = float(well_info['top_of_casing']) - 30 - start_pressure
+    return {'dh': float(dh), 'method': 'default_level',
+            'method_details': f"Default level from top of casing ({well_info['top_of_casing']})"}
+
+
+def _legacy_boundary_correction(df):
+    """correct_boundary_readings before vectorization (one df.loc write per reading)"""
+    df = df.copy().sort_values('timestamp_utc').reset_index(drop=True)
+    start_time, end_time = df['timestamp_utc'].min(), df['timestamp_utc'].max()
+    start_boundary = start_time + timedelta(minutes=15)
+    end_boundary = end_time - timedelta(minutes=15)
+    reference_start = start_time + timedelta(hours=1)
+    reference = df[(df['timestamp_utc'] >= reference_start) &
+                   (df['timestamp_utc'] <= reference_start + timedelta(hours=1))]
+    if reference.empty:
+        return df
+    pressure_diff = reference['pressure'].diff()
+    typical_rate = pressure_diff[~pressure_diff.isnull()].median()
+    threshold = 3 * abs(typical_rate)
+    for mask, boundary, position in ((df['timestamp_utc'] <= start_boundary, start_boundary, 0),
+                                     (None, end_boundary, -1)):
+        if mask is None:
+            mask = df['timestamp_utc'] >= end_boundary
+        segment = df[mask]
+        rates = segment['pressure'].diff() / (segment['timestamp_utc'].diff().dt.total_seconds() / 3600)
+        anomalies = abs(rates) > threshold
+        if anomalies.any():
+            reference_level = df[~mask]['pressure'].iloc[position]
+            for idx in segment.index[anomalies]:
+                hours = (df.loc[idx, 'timestamp_utc'] - boundary).total_seconds() / 3600
+                df.loc[idx, 'pressure'] = reference_level + typical_rate * hours
+    return df
+
+
+def _segment(rng, start, rows, freq='15min'):
+    timestamps = pd.date_range(start, periods=rows, freq=freq)
+    pressure = 20 + np.cumsum(rng.normal(0, 0.02, rows))
+    return pd.DataFrame({'timestamp_utc': timestamps, 'pressure': pressure,
+                         'water_pressure': pressure - 14.7, 'temperature': 12.0})
+
+
+def _process_folder(processor, segments, context):
+    """The per-file loop of the folder import: process each file, then add it to the context"""
+    processed = []
+    for df in segments:
+        df = df.assign(baro_source='standard_pressure', baro_flag='standard')
+        df = processor.process_data(df, WELL_INFO, is_folder_import=True, context=context)
+        context.add_levels(df)
+        processed.append(df)
+    return processed
+
+
+def _corpus(seed=11, cases=300):
+    rng = np.random.default_rng(seed)
+    base = pd.Timestamp('2024-01-01')
+    for _ in range(cases):
+        start = base + pd.Timedelta(hours=int(rng.integers(0, 24 * 300)))
+        df = _segment(rng, start, int(rng.integers(2, 400)))
+        end = df['timestamp_utc'].iloc[-1]
+
+        # Manual readings around, inside and far from the segment; some on exact ties
+        offsets = rng.integers(-180, int((end - start).total_seconds() // 60) + 180, int(rng.integers(0, 5)))
+        manual_times = [start + pd.Timedelta(minutes=int(m)) for m in offsets]
+        if rng.random() < 0.2:
+            manual_times += [end + pd.Timedelta(minutes=30), end - pd.Timedelta(minutes=30)]
+        if rng.random() < 0.3:
+            manual_times = [start - pd.Timedelta(days=3)]
+        manual = pd.DataFrame({'measurement_date_utc': pd.to_datetime(manual_times, unit='ns'),
+                               'water_level': rng.normal(200, 2, len(manual_times))})
+        manual.index = rng.permutation(len(manual)) + 50
+
+        existing = None
+        if rng.random() < 0.7:
+            existing_times = start + pd.to_timedelta(rng.integers(-3 * 60, 3 * 60, int(rng.integers(1, 40))), unit='min')
+            existing = pd.DataFrame({'timestamp_utc': existing_times, 'water_level': rng.normal(200, 2, len(existing_times))})
+            if rng.random() < 0.2:
+                existing = pd.concat([existing, existing.head(1).assign(water_level=1.0)])  # Duplicate timestamp
+            existing.index = rng.permutation(len(existing))
+        yield df, manual, existing
+
+
+def test_insertion_level_matches_previous_logic():
+    processor = WaterLevelProcessor(water_level_model=None)
+    methods = set()
+    for df, manual, existing in _corpus():
+        expected = _legacy_insertion_level(df, WELL_INFO, manual, existing)
+        result = processor.determine_insertion_level(df, WELL_INFO, manual, existing)
+        assert result == expected, (result, expected)
+        methods.add(result['method'])
+    assert methods == {'manual_readings', 'predicted', 'default_level'}
+
+
+def test_boundary_correction_matches_previous_logic():
+    processor = WaterLevelProcessor(water_level_model=None)
+    rng = np.random.default_rng(5)
+    corrected = 0
+    for rows in [3, 8, 20, 200, 1000]:
+        for freq in ['1min', '5min', '15min']:
+            df = _segment(rng, '2025-03-01', rows, freq)
+            df.loc[:2, 'pressure'] += rng.normal(0, 2, 3)
+            df.loc[rows - 3:, 'pressure'] -= rng.normal(0, 2, 3)
+            df = df.sample(frac=1, random_state=rows)  # Unsorted input
+            expected = _legacy_boundary_correction(df)
+            result = processor.correct_boundary_readings(df)
+            pd.testing.assert_frame_equal(result, expected)
+            corrected += int((result['pressure'] != df.sort_values('timestamp_utc')['pressure'].values).sum())
+    assert corrected > 0
+
+
+def test_batch_uses_previous_segments():
+    rng = np.random.default_rng(2)
+    segments = [_segment(rng, pd.Timestamp('2025-01-01') + pd.Timedelta(days=7 * i), 96 * 6) for i in range(4)]
+    manual = pd.DataFrame({'measurement_date_utc': [segments[0]['timestamp_utc'].iloc[-1]], 'water_level': [180.0]})
+    context = WellReferenceContext(manual)
+
+    aligned = _process_folder(WaterLevelProcessor(water_level_model=None), segments, context)
+    assert [df['level_flag'].iloc[0] for df in aligned] == ['manual_readings', 'predicted', 'predicted', 'predicted']
+    # Each file starts from the last level of the file before it
+    for previous, current in zip(aligned, aligned[1:]):
+        dh = previous['water_level'].iloc[-1] - current['water_pressure'].iloc[0]
+        assert abs(current['water_level'].iloc[0] - current['water_pressure'].iloc[0] - dh) < 1e-9
+
+    # Without the manual reading the first file falls back to the default level
+    assert insertion_level(segments[0], WELL_INFO, WellReferenceContext())['method'] == 'default_level'
+
+
+def test_large_batch_is_fast():
+    rng = np.random.default_rng(8)
+    existing = _segment(rng, '2023-01-01', 200_000).assign(water_level=lambda d: d['water_pressure'] + 180)
+    manual = pd.DataFrame({'measurement_date_utc': pd.date_range('2023-01-01', periods=2000, freq='D'),
+                           'water_level': rng.normal(180, 1, 2000)})
+    segments = [_segment(rng, pd.Timestamp('2030-06-01 00:07') + pd.Timedelta(days=20 * i), 1900)
+                for i in range(50)]
+
+    start = time.perf_counter()
+    context = WellReferenceContext(manual, existing)
+    aligned = _process_folder(WaterLevelProcessor(water_level_model=None), segments, context)
+    elapsed = time.perf_counter() - start
+    assert len(aligned) == 50 and all((df['level_flag'] == 'predicted').all() for df in aligned)
+    assert elapsed < 2, f"aligning 50 files took {elapsed:.2f}s"
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the live map helpers.
+
+Checks that GeoJsonDiffer only sends the wells that changed between two
+feature sets, that diffs and features stay compact, that diffing a large
+well set is fast, and that FileCache reloads a value only after its file
+changed.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers.live_map import (FileCache, GeoJsonDiffer, build_map_page, encode_diff,
+                                       select_well_link, well_feature)
+
+
+def _features(count, color='#28a745', offset=0.0):
+    return [well_feature(f"W-{i}", 35 + i / 1e4 + offset, -90 - i / 1e4, [color, '#e63946'],
+                         popup=f"<h4>W-{i}</h4>", label=f"CAE-{i}")
+            for i in range(count)]
+
+
+def test_diff_contains_only_changes():
+    differ = GeoJsonDiffer()
+    first = differ.diff(_features(5))
+    assert len(first['add']) == 5 and not first['update'] and not first['remove']
+
+    changed = _features(4)
+    changed[1] = well_feature("W-1", 35.0001, -90.0001, ['#e63946', '#e63946'], popup="<h4>W-1</h4>",
+                              label="CAE-1")
+    changed.append(well_feature("W-9", 36, -91, ['#38aadd']))
+    diff = differ.diff(changed)
+    assert [f['id'] for f in diff['add']] == ["W-9"]
+    assert [f['id'] for f in diff['update']] == ["W-1"]
+    assert diff['remove'] == ["W-4"]
+
+    assert GeoJsonDiffer.is_empty(differ.diff(changed))
+    snapshot = differ.snapshot()
+    assert snapshot['reset'] and len(snapshot['add']) == 5
+
+
+def test_features_and_diffs_are_compact():
+    feature = well_feature(101, 35.123456789, -90.987654321, ['#72b026'], label="<b>")
+    assert feature['id'] == "101"
+    assert feature['geometry']['coordinates'] == [-90.987654, 35.123457]
+    assert feature['properties'] == {'colors': ['#72b026'], 'label': '&lt;b&gt;'}
+
+    message = encode_diff({'add': [], 'update': [], 'remove': ["W-1"], 'fit': True})
+    assert message == '{"remove":["W-1"],"fit":true}'
+
+    link = select_well_link("O'Neil \"1\"")
+    assert 'selectWell(&quot;O&#x27;Neil \\&quot;1\\&quot;&quot;)' in link  # Quotes cannot end the attribute
+
+
+def test_large_well_set_diffs_quickly():
+    differ = GeoJsonDiffer()
+    differ.diff(_features(20_000))
+    switched = _features(20_000, color='#e63946')[:15_000]
+
+    start = time.perf_counter()
+    diff = differ.diff(switched)
+    message = encode_diff(diff)
+    elapsed = time.perf_counter() - start
+
+    assert len(diff['update']) == 15_000 and len(diff['remove']) == 5_000
+    assert len(json.loads(message)['update']) == 15_000
+    assert elapsed < 2, f"diff took {elapsed:.2f}s"
+
+
+def test_map_page_clusters_markers():
+    page = build_map_page("/* qwebchannel */")
+    assert "markerClusterGroup" in page and "bridge.diffReady.connect(applyDiff)" in page
+    assert "/* qwebchannel */" in page and "%" not in page.replace("100%", "")
+
+
+def test_file_cache_reloads_after_change():
+    path = os.path.join(tempfile.mkdtemp(), "water_level_run.json")
+    with open(path, 'w') as f:
+        json.dump({'visited': False}, f)
+
+    loads = []
+
+    def load():
+        loads.append(path)
+        with open(path) as f:
+            return json.load(f)
+
+    cache = FileCache()
+    assert cache.get(path, [path], load) == {'visited': False}
+    assert cache.get(path, [path], load) == {'visited': False}
+    assert len(loads) == 1
+
+    with open(path, 'w') as f:
+        json.dump({'visited': True}, f)
+    os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert cache.get(path, [path], load) == {'visited': True}
+    assert len(loads) == 2
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental mobile database export.
+
+Checks that update_reduced_database appends new readings, copies the ones
+the source change log lists as edited or deleted and syncs the well tables so
+the result is identical to a full rebuild, that it falls back to a full
+rebuild for a different well filter or a source without the change log, and
+that a small update costs less than a plain copy of the source.
+"""
+
+import os
+import shutil
+import sys
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.database.mobile_db_reducer import MobileDatabaseReducer, create_mobile_database
+
+
+def _make_source(wells=5, readings_per_well=2000):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    with sqlite3.connect(path) as conn:
+        conn.executescript('''
+            CREATE TABLE wells (well_number TEXT PRIMARY KEY, cae_number TEXT, latitude REAL, longitude REAL,
+                                aquifer TEXT, well_field TEXT, cluster TEXT, county TEXT, data_source TEXT,
+                                user_flag TEXT, created_at TIMESTAMP, notes TEXT);
+            CREATE TABLE water_level_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, well_number TEXT, timestamp_utc TIMESTAMP,
+                julian_timestamp REAL, pressure REAL, water_pressure REAL, water_level REAL, temperature REAL,
+                serial_number TEXT, baro_flag TEXT, level_flag TEXT, UNIQUE (well_number, timestamp_utc));
+            CREATE INDEX idx_water_level_readings_well_time ON water_level_readings (well_number, julian_timestamp);
+            CREATE TABLE manual_level_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, well_number TEXT, measurement_date_utc TIMESTAMP,
+                dtw_avg REAL, comments TEXT, water_level REAL, data_source TEXT, collected_by TEXT,
+                is_dry BOOLEAN DEFAULT 0, UNIQUE (well_number, measurement_date_utc));
+            CREATE TABLE well_statistics (well_number TEXT PRIMARY KEY, num_points INTEGER, min_timestamp TEXT,
+                                          max_timestamp TEXT, last_update TEXT);
+        ''')
+        conn.executemany("INSERT INTO wells VALUES (?, ?, ?, ?, 'MS', 'F', NULL, 'Shelby', 'caeser', "
+                         "'unchecked', '2024-01-01', 'long notes')",
+                         [(f"W-{w}", f"CAE-{w}", 35 + w / 100, -90 - w / 100) for w in range(wells)])
+        _add_readings(conn, [f"W-{w}" for w in range(wells)], 0, readings_per_well)
+        conn.executemany("INSERT INTO manual_level_readings (well_number, measurement_date_utc, dtw_avg, "
+                         "water_level, data_source) VALUES (?, ?, 10.5, 200.25, 'field')",
+                         [(f"W-{w}", f"2025-0{m}-15 12:00:00") for w in range(wells) for m in range(1, 6)])
+        conn.execute("INSERT INTO well_statistics SELECT well_number, COUNT(*), MIN(timestamp_utc), "
+                     "MAX(timestamp_utc), '2025-06-01' FROM water_level_readings GROUP BY well_number")
+    return path
+
+
+def _add_readings(conn, wells, first, count):
+    conn.executemany(
+        "INSERT INTO water_level_readings (well_number, timestamp_utc, julian_timestamp, pressure, water_level, "
+        "temperature, baro_flag, level_flag) VALUES (?, datetime('2025-01-01', ? || ' minutes'), "
+        "julianday(datetime('2025-01-01', ? || ' minutes')), 20.0, ?, 15.5, 'master', 'predicted')",
+        [(well, r * 15, r * 15, 200 + r / 1000) for well in wells for r in range(first, first + count)])
+
+
+def _target():
+    return Path(tempfile.mkdtemp()) / 'mobile.db'
+
+
+def test_update_matches_full_rebuild():
+    source = _make_source(wells=4, readings_per_well=3000)
+    reducer = MobileDatabaseReducer(Path(source), _target())
+    reducer.create_reduced_database()
+    assert not any(reducer.verify_against_full_rebuild().values())
+
+    with sqlite3.connect(source) as conn:
+        _add_readings(conn, ["W-1"], 3000, 500)                                  # Import
+        conn.execute("UPDATE water_level_readings SET water_level = water_level + 0.5 "
+                     "WHERE well_number = 'W-2' AND id % 1000 = 7")              # Edit
+        conn.execute("UPDATE water_level_readings SET level_flag = 'manual_readings' WHERE id = 42")
+        conn.execute("DELETE FROM water_level_readings WHERE id BETWEEN 9000 AND 9010")
+        conn.execute("UPDATE manual_level_readings SET comments = 'dry' WHERE id = 3")
+        conn.execute("INSERT INTO wells (well_number, cae_number) VALUES ('W-new', 'CAE-new')")
+        conn.execute("UPDATE wells SET latitude = 36.5 WHERE well_number = 'W-0'")
+        conn.execute("UPDATE wells SET notes = 'not exported' WHERE well_number = 'W-3'")
+        conn.execute("DELETE FROM well_statistics WHERE well_number = 'W-3'")
+
+    stats = reducer.update_reduced_database()
+    assert stats['water_level_readings'] == {'appended': 500, 'changed': 3 + 1 + 11}
+    assert stats['manual_level_readings'] == {'appended': 0, 'changed': 1}
+    assert stats['wells']['changed'] == 2 and stats['well_statistics']['changed'] == 1
+    assert not any(reducer.verify_against_full_rebuild().values())
+
+    # Nothing changed since: nothing is copied
+    stats = reducer.update_reduced_database()
+    assert stats['water_level_readings'] == {'appended': 0, 'changed': 0}
+    assert stats['wells']['changed'] == 0
+
+
+def test_edits_that_keep_sums_and_lengths_are_found():
+    source = _make_source(wells=3, readings_per_well=2000)
+    reducer = MobileDatabaseReducer(Path(source), _target())
+    reducer.create_reduced_database()
+
+    edits = [
+        # Same-length text edit
+        ("UPDATE water_level_readings SET baro_flag = 'manual' WHERE id = 17", 1),
+        # Readings moved to another well with a same-length number
+        ("UPDATE water_level_readings SET well_number = 'W-9' WHERE id BETWEEN 2100 AND 2102", 3),
+        # Values swapped between two rows
+        ("UPDATE water_level_readings SET water_level = CASE id WHEN 4500 THEN "
+         "(SELECT water_level FROM water_level_readings WHERE id = 4501) ELSE "
+         "(SELECT water_level FROM water_level_readings WHERE id = 4500) END WHERE id IN (4500, 4501)", 2),
+        ("DELETE FROM water_level_readings WHERE id = 300", 1),
+    ]
+    for edit, changed in edits:
+        with sqlite3.connect(source) as conn:
+            conn.execute(edit)
+        stats = reducer.update_reduced_database()
+        assert stats['water_level_readings']['changed'] == changed, (edit, stats)
+        assert not any(reducer.verify_against_full_rebuild().values()), edit
+
+    # Manual readings are saved with INSERT OR REPLACE, which fires no delete trigger
+    with sqlite3.connect(source) as conn:
+        conn.execute("INSERT OR REPLACE INTO manual_level_readings (well_number, measurement_date_utc, water_level) "
+                     "SELECT well_number, measurement_date_utc, -1 FROM manual_level_readings WHERE id = 4")
+    stats = reducer.update_reduced_database()
+    assert stats['manual_level_readings'] == {'appended': 1, 'changed': 1}
+    assert not any(reducer.verify_against_full_rebuild().values())
+
+    # Readings replaced that way or inserted below the high-water mark are
+    # caught by the row count and rebuilt
+    for edit in ["INSERT OR REPLACE INTO water_level_readings (well_number, timestamp_utc, water_level) "
+                 "SELECT well_number, timestamp_utc, -1 FROM water_level_readings WHERE id = 500",
+                 "INSERT INTO water_level_readings (id, well_number, timestamp_utc, water_level) "
+                 "VALUES (300, 'W-0', '1999-01-01 00:00:00', 5)"]:
+        with sqlite3.connect(source) as conn:
+            conn.execute(edit)
+        assert 'full_rebuild' in reducer.update_reduced_database(), edit
+        assert not any(reducer.verify_against_full_rebuild().values()), edit
+
+
+def test_source_without_the_change_log_is_rebuilt():
+    source = _make_source(wells=2, readings_per_well=500)
+    reducer = MobileDatabaseReducer(Path(source), _target())
+    reducer.create_reduced_database()
+    with sqlite3.connect(source) as conn:
+        conn.execute("UPDATE water_level_readings SET water_level = 0 WHERE id = 10")
+        conn.execute("DELETE FROM mobile_export_changes")
+    assert 'full_rebuild' in reducer.update_reduced_database()
+    assert not any(reducer.verify_against_full_rebuild().values())
+
+    # Replaced by a copy from before the first export
+    other = _make_source(wells=2, readings_per_well=500)
+    shutil.copyfile(other, source)
+    with sqlite3.connect(source) as conn:
+        conn.execute("UPDATE water_level_readings SET water_level = 0 WHERE id = 20")
+    assert 'full_rebuild' in reducer.update_reduced_database()
+    assert not any(reducer.verify_against_full_rebuild().values())
+    assert reducer.update_reduced_database()['water_level_readings'] == {'appended': 0, 'changed': 0}
+
+
+def test_well_filter_and_fallback():
+    source = _make_source(wells=3, readings_per_well=100)
+    target = _target()
+    info = create_mobile_database(source, str(target), well_number='W-1', incremental=True, verify=True)
+    assert info['changes'] == {'full_rebuild': {'tables': 4}}
+    assert info['target_water_level_count'] == 100 and not any(info['verification'].values())
+
+    with sqlite3.connect(source) as conn:
+        _add_readings(conn, ["W-1", "W-2"], 100, 10)
+    info = create_mobile_database(source, str(target), well_number='W-1', incremental=True, verify=True)
+    assert info['changes']['water_level_readings']['appended'] == 10
+    assert info['target_water_level_count'] == 110 and not any(info['verification'].values())
+
+    # Another filter cannot be updated in place
+    info = create_mobile_database(source, str(target), incremental=True)
+    assert 'full_rebuild' in info['changes'] and info["target_water_level_count"] == 320
+
+
+def _plain_copy(source):
+    """Time of the cheapest full export: one INSERT ... SELECT per reading table and the index"""
+    start = time.perf_counter()
+    conn = sqlite3.connect(_target(), isolation_level=None)
+    conn.execute("ATTACH DATABASE ? AS src", (source,))
+    conn.execute("BEGIN")
+    for table in ('water_level_readings', 'manual_level_readings'):
+        conn.execute(f"CREATE TABLE {table} AS SELECT * FROM src.{table}")
+    conn.execute("CREATE INDEX idx_copy ON water_level_readings (well_number, julian_timestamp)")
+    conn.execute("COMMIT")
+    conn.close()
+    return time.perf_counter() - start
+
+
+def test_small_update_is_cheaper_than_full_export():
+    source = _make_source(wells=40, readings_per_well=10000)
+    reducer = MobileDatabaseReducer(Path(source), _target())
+    reducer.create_reduced_database()
+
+    with sqlite3.connect(source) as conn:
+        _add_readings(conn, ["W-5"], 10000, 96)
+        conn.execute("UPDATE water_level_readings SET water_level = 0 WHERE id % 5000 = 1")
+    start = time.perf_counter()
+    stats = reducer.update_reduced_database()
+    incremental = time.perf_counter() - start
+
+    copy = _plain_copy(source)
+    assert stats['water_level_readings'] == {'appended': 96, 'changed': 80}
+    assert incremental < copy / 5, f"incremental {incremental:.3f}s vs plain copy {copy:.3f}s"
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
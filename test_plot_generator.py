@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for parallel plot generation from organized XLE files.
+
+Checks that min/max decimation keeps the extremes of a series, that plots are
+drawn in worker processes with a timed report, that unchanged plots are
+skipped, and that a changed folder re-reads only its changed files.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+
+from solinst_plot_generator import MANIFEST_NAME, PlotGenerator, decimate_min_max
+
+from test_xle_file_cache import make_xle
+
+
+def make_baro(serial, start, readings=2000):
+    return (make_xle(serial=serial, start=start, readings=readings).decode('utf-8')
+            .replace('<Model_number>M10', '<Model_number>M1.5').replace('<Unit>ft</Unit>', '<Unit>kPa</Unit>', 1))
+
+
+def make_organized_folder():
+    root = Path(tempfile.mkdtemp(prefix='plot_generator_test_'))
+    files = {}
+    for s in range(2):
+        for f in range(3):
+            files[f"Barologgers/10{s}/baro_{f}.xle"] = make_baro(f"10{s}", datetime(2025, 1 + f * 2, 1))
+    for s in range(3):
+        for f in range(4):
+            files[f"Leveloggers/20{s}/level_{f}.xle"] = make_xle(serial=f"20{s}", start=datetime(2025, 1 + f * 2, 1),
+                                                                 readings=3000 + s)
+    files["Leveloggers/203/broken.xle"] = "<Body_xle>"
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content if isinstance(content, bytes) else content.encode('utf-8'))
+    return root
+
+
+def test_decimation_keeps_extremes():
+    n = 100000
+    x = np.datetime64('2025-01-01') + np.arange(n) * np.timedelta64(15, 'm')
+    y = np.sin(np.arange(n) / 500.0)
+    y[12345], y[67890] = 50.0, -50.0  # Spikes
+    y[200:300] = np.nan
+
+    dx, dy = decimate_min_max(x, y, 1200)
+    assert len(dy) <= 2 * 1200 + 2
+    assert np.all(np.diff(dx.astype('int64')) > 0)
+    assert dx[0] == x[0] and dx[-1] == x[-1]
+    assert np.nanmax(dy) == 50.0 and np.nanmin(dy) == -50.0
+
+    short = np.arange(10.0)
+    assert decimate_min_max(short, short, 1200)[1] is short
+
+
+def test_parallel_plots_and_report():
+    root = make_organized_folder()
+    done = []
+    stats = PlotGenerator(workers=2).generate_plots(str(root), progress=lambda d, t, name: done.append((d, t)))
+
+    assert stats['barologger_plots'] == 2 and stats['levelogger_plots'] == 4
+    assert stats['files_processed'] == 19 and stats['errors'] == 1
+    assert done[-1] == (6, 6)
+    for name in ['Barologgers/100', 'Barologgers/101', 'Leveloggers/200', 'Leveloggers/203']:
+        assert (root / 'plots' / f"{name}.png").read_bytes()[:8] == b'\x89PNG\r\n\x1a\n'
+
+    result = stats['report']['leveloggers']['200']
+    assert result['files_plotted'] == 4 and result['points_drawn'] < result['points_read'] == 12000
+    report = (root / 'plots' / 'plot_report.txt').read_text(encoding='utf-8')
+    assert 'Elapsed time:' in report and 'SLOWEST PLOTS' in report and 'broken.xle' in report
+
+    # Same results in this process
+    serial = PlotGenerator(workers=1).generate_plots(str(root), force=True)
+    assert serial['report']['leveloggers']['201']['files_plotted'] == result['files_plotted']
+    assert serial['report']['barologgers']['100']['cached_files'] == 3
+
+
+def test_unchanged_plots_are_skipped():
+    root = make_organized_folder()
+    generator = PlotGenerator(workers=1)
+    generator.generate_plots(str(root))
+    assert (root / 'plots' / MANIFEST_NAME).exists()
+
+    stats = generator.generate_plots(str(root))
+    assert stats['plots_skipped'] == 6 and stats['levelogger_plots'] == 0
+    assert stats['report']['barologgers']['101']['skipped']
+
+    # A changed file redraws its plot, reading only that file
+    changed = root / 'Leveloggers' / '202' / 'level_1.xle'
+    changed.write_bytes(make_xle(serial='202', start=datetime(2025, 3, 1), readings=500))
+    stats = generator.generate_plots(str(root))
+    result = stats['report']['leveloggers']['202']
+    assert not result.get('skipped') and result['cached_files'] == 3 and result['points_read'] == 3 * 3002 + 500
+    assert stats['plots_skipped'] == 5
+    assert 'Unchanged (skipped)' in (root / 'plots' / 'plot_report.txt').read_text(encoding='utf-8')
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
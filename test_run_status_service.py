@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for the run status service.
+
+Checks that the grouped queries return the latest transducer reading and the
+latest manual reading inside the run window for every well in a run, that
+results are cached per run and dropped when another connection commits, and
+that the latest-row lookups are index seeks.
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers import run_status_service
+from src.gui.handlers.run_status_service import RunStatusService, run_window
+
+
+def _make_db(wells=300, readings_per_well=200):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    with sqlite3.connect(path) as conn:
+        conn.executescript('''
+            CREATE TABLE wells (well_number TEXT PRIMARY KEY, baro_status TEXT, level_status TEXT);
+            CREATE TABLE water_level_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, well_number TEXT, timestamp_utc TIMESTAMP,
+                water_level REAL, temperature REAL, serial_number TEXT,
+                UNIQUE (well_number, timestamp_utc));
+            CREATE TABLE manual_level_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, well_number TEXT, measurement_date_utc TIMESTAMP,
+                dtw_avg REAL, comments TEXT, water_level REAL, collected_by TEXT,
+                UNIQUE (well_number, measurement_date_utc));
+        ''')
+        conn.executemany("INSERT INTO wells VALUES (?, ?, ?)",
+                         [(f"W-{w}", 'all_master' if w % 2 else 'has_non_master', 'no_default')
+                          for w in range(wells)])
+        conn.executemany(
+            "INSERT INTO water_level_readings (well_number, timestamp_utc, water_level, temperature, serial_number) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(f"W-{w}", f"2025-01-{1 + r % 28:02d} {r // 28:02d}:{w % 60:02d}:00", 100 + r, 15.5, f"SN{w}")
+             for w in range(wells) for r in range(readings_per_well)])
+        # Manual readings before, inside and after the 2025-02 run window; odd wells have none in it
+        manual = []
+        for w in range(wells):
+            manual.append((f"W-{w}", "2024-12-15 12:00:00", 5.0, 'old', 90.0, 'AB'))
+            if w % 2 == 0:
+                manual.append((f"W-{w}", "2025-02-10 15:00:00", 6.0, 'mid', 91.0, 'CD'))
+                manual.append((f"W-{w}", "2025-03-20 15:00:00", 7.0, None, 92.0, 'EF'))
+            manual.append((f"W-{w}", "2025-09-01 12:00:00", 8.0, 'late', 93.0, 'GH'))
+        conn.executemany(
+            "INSERT INTO manual_level_readings (well_number, measurement_date_utc, dtw_avg, comments, "
+            "water_level, collected_by) VALUES (?, ?, ?, ?, ?, ?)", manual)
+    return path
+
+
+def test_status_matches_per_well_queries():
+    path = _make_db(wells=20, readings_per_well=50)
+    wells = [f"W-{w}" for w in range(20)] + ["W-missing"]
+    service = RunStatusService(path)
+    status = service.run_status("2025-02 Monthly", wells)
+    start, end = run_window("2025-02 Monthly")
+
+    with sqlite3.connect(path) as conn:
+        for well in wells[:-1]:
+            ts, level = conn.execute("SELECT timestamp_utc, water_level FROM water_level_readings "
+                                     "WHERE well_number = ? ORDER BY timestamp_utc DESC LIMIT 1", (well,)).fetchone()
+            assert str(status.wells[well].transducer.timestamp_utc) == ts
+            assert status.wells[well].transducer.water_level == level
+            manual = conn.execute("SELECT measurement_date_utc, collected_by FROM manual_level_readings "
+                                  "WHERE well_number = ? AND measurement_date_utc BETWEEN ? AND ? "
+                                  "ORDER BY measurement_date_utc DESC LIMIT 1", (well, start, end)).fetchone()
+            if manual is None:
+                assert status.wells[well].manual is None
+            else:
+                assert str(status.wells[well].manual.measurement_date_utc) == manual[0]
+                assert status.wells[well].manual.collected_by == manual[1]
+                assert status.wells[well].manual.comments == ''  # NULL comments become ''
+
+    assert status.wells["W-1"].baro_status == 'all_master'
+    missing = status.wells["W-missing"]
+    assert missing.transducer is None and missing.manual is None and missing.baro_status is None
+    assert status.manual_count == 10 and abs(status.manual_coverage - 10 / 21) < 1e-9
+    service.close()
+
+
+def test_cache_is_dropped_when_data_changes():
+    path = _make_db(wells=4, readings_per_well=5)
+    service = RunStatusService(path)
+    wells = ["W-0", "W-1"]
+    first = service.run_status("2025-02 Monthly", wells)
+    assert service.run_status("2025-02 Monthly", wells) is first
+
+    # An import through another connection
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO manual_level_readings (well_number, measurement_date_utc, water_level, "
+                     "dtw_avg, collected_by) VALUES ('W-1', '2025-02-20 10:00:00', 1.0, 2.0, 'XY')")
+    second = service.run_status("2025-02 Monthly", wells)
+    assert second is not first
+    assert second.wells["W-1"].manual.collected_by == 'XY'
+
+    service.invalidate()
+    assert service.run_status("2025-02 Monthly", wells) is not second
+    service.set_database(None)
+    assert service.run_status("2025-02 Monthly", wells) is None
+
+
+def test_latest_rows_are_index_seeks():
+    path = _make_db(wells=2, readings_per_well=2)
+    with sqlite3.connect(path) as conn:
+        for sql, params in [(run_status_service._LATEST_TRANSDUCER_SQL, ('[]',)),
+                            (run_status_service._LATEST_MANUAL_SQL, ('[]', 'a', 'b'))]:
+            plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            assert not any(step.startswith('SCAN') and 'VIRTUAL TABLE' not in step for step in plan), plan
+
+
+def test_large_run_is_fast():
+    path = _make_db(wells=500, readings_per_well=400)
+    service = RunStatusService(path)
+    wells = [f"W-{w}" for w in range(500)]
+
+    start = time.perf_counter()
+    status = service.run_status("2025-02 Monthly", wells)
+    elapsed = time.perf_counter() - start
+    assert len(status.wells) == 500
+    assert elapsed < 1, f"run status took {elapsed:.2f}s"
+
+    start = time.perf_counter()
+    service.run_status("2025-02 Monthly", wells)
+    assert time.perf_counter() - start < 0.05  # Cached
+    service.close()
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
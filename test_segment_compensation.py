@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script for the segment-indexed compensation engine.
+
+Compares SegmentCompensationEngine with a direct, loop-based version of the
+edit dialog's compensation and leveling rules (per-segment DataFrame slices)
+and checks that previews on a multi-million reading well stay interactive.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers.segment_compensation import (
+    SegmentCompensationEngine, PSI_TO_FEET_OF_WATER, STANDARD_PRESSURE, MASTER_FLAGS
+)
+
+
+def _make_data(rows=3000, seed=3):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range('2025-01-01', periods=rows, freq='15min')
+    transducer = pd.DataFrame({
+        'timestamp_utc': timestamps,
+        'water_level': 100 + np.cumsum(rng.normal(0, 0.01, rows)),
+        'baro_flag': 'master',
+    })
+    # Shuffle the index order to make sure nothing relies on it
+    transducer.index = rng.permutation(rows) + 1000
+    for start, stop in [(200, 400), (1000, 1100), (1500, 2200), (2900, 3000)]:
+        transducer.iloc[start:stop, transducer.columns.get_loc('baro_flag')] = 'standard'
+    transducer['water_level_master_corrected'] = transducer['water_level']
+    manual = pd.DataFrame({
+        'timestamp_utc': timestamps[[1600, 2100, 2950]] + pd.Timedelta(minutes=5),
+        'water_level': [99.0, 99.2, 98.7],
+    })
+    baro = pd.DataFrame({
+        'timestamp_utc': pd.date_range('2024-12-31', periods=rows // 4 + 20, freq='h'),
+        'pressure': 14.7 + rng.normal(0, 0.1, rows // 4 + 20),
+    })
+    # The segment at 1000 only has a master reference after it; the one at 1500 has none
+    transducer.iloc[990:1000, transducer.columns.get_loc('timestamp_utc')] -= pd.Timedelta(hours=5)
+    transducer.iloc[1490:1500, transducer.columns.get_loc('timestamp_utc')] -= pd.Timedelta(hours=5)
+    transducer.iloc[2200:2210, transducer.columns.get_loc('timestamp_utc')] += pd.Timedelta(hours=5)
+    return transducer, manual, baro
+
+
+def _reference(transducer, manual, baro):
+    """Loop-based compensation and leveling, one DataFrame slice per segment"""
+    data = transducer.sort_values('timestamp_utc').copy()
+    non_master = ~data['baro_flag'].isin(MASTER_FLAGS)
+    df = data[non_master]
+    pressure = np.interp(df['timestamp_utc'].astype('int64'), baro['timestamp_utc'].astype('int64'), baro['pressure'])
+    data.loc[df.index, 'water_level_master_corrected'] = df['water_level'] - (pressure - STANDARD_PRESSURE) * PSI_TO_FEET_OF_WATER
+
+    run_id = (non_master != non_master.shift()).cumsum()
+    hour = pd.Timedelta(hours=1)
+    masters = data[~non_master]
+    leveled = pd.Series(False, index=data.index)
+    for _, segment in data[non_master].groupby(run_id[non_master]):
+        start, end = segment['timestamp_utc'].min(), segment['timestamp_utc'].max()
+        before = masters[(masters['timestamp_utc'] >= start - hour) & (masters['timestamp_utc'] <= start)]
+        after = masters[(masters['timestamp_utc'] >= end) & (masters['timestamp_utc'] <= end + hour)]
+        nearby = manual[(manual['timestamp_utc'] >= start - hour) & (manual['timestamp_utc'] <= end + hour)]
+        corrected = data.loc[segment.index, 'water_level_master_corrected']
+        if not before.empty:
+            ref = before.loc[(start - before['timestamp_utc']).idxmin()]
+            adjustment = ref['water_level_master_corrected'] - corrected.iloc[0]
+        elif not after.empty:
+            ref = after.loc[(after['timestamp_utc'] - end).idxmin()]
+            adjustment = ref['water_level_master_corrected'] - corrected.iloc[-1]
+        elif not nearby.empty:
+            dh = []
+            for _, reading in nearby.iterrows():
+                closest = (segment['timestamp_utc'] - reading['timestamp_utc']).abs().idxmin()
+                dh.append(reading['water_level'] - corrected[closest])
+            adjustment = np.mean(dh)
+        else:
+            continue
+        data.loc[segment.index, 'water_level_master_corrected'] += adjustment
+        leveled[segment.index] = True
+    return data['water_level_master_corrected'], leveled
+
+
+def test_matches_loop_reference():
+    transducer, manual, baro = _make_data()
+    engine = SegmentCompensationEngine(transducer, manual, baro)
+    result = engine.compensate(engine.missing_positions())
+    expected, leveled = _reference(transducer, manual, baro)
+
+    assert set(result.segments['method']) == {'start_reference', 'end_reference', 'manual_readings'}
+    assert list(result.segments['method']).count('end_reference') == 1
+    got = pd.Series(result.master_corrected, index=result.index)
+    assert np.allclose(got, expected.reindex(result.index))
+    assert set(result.index[result.level_mod]) == set(leveled[leveled].index)
+    # Only readings without master data change
+    assert not transducer.loc[result.index, 'baro_flag'].isin(MASTER_FLAGS).any()
+
+
+def test_selection_only_levels_touched_segments():
+    transducer, manual, baro = _make_data()
+    engine = SegmentCompensationEngine(transducer, manual, baro)
+    selected = transducer.sort_values('timestamp_utc').index[1010:1020]
+
+    result = engine.compensate(engine.positions_for(selected))
+
+    assert len(result.segments) == 1
+    assert result.baro_mod.sum() == 10
+    assert result.level_mod.sum() == 100  # The whole segment is leveled
+
+
+def test_manual_offset_and_baseline():
+    transducer, manual, baro = _make_data()
+    engine = SegmentCompensationEngine(transducer, manual, baro)
+    positions = engine.positions_in_range('2025-01-17 00:00', '2025-01-22 00:00')
+
+    adjustment, count = engine.manual_offset(positions)
+    assert count == 1
+    ordered = transducer.sort_values('timestamp_utc')
+    closest = (ordered['timestamp_utc'] - manual['timestamp_utc'][0]).abs().idxmin()
+    assert abs(adjustment - (99.0 - ordered.loc[closest, 'water_level'])) < 1e-12
+
+    index, levels = engine.baseline(positions, 0.5)
+    assert np.allclose(levels, transducer.loc[index, 'water_level'] + 0.5)
+    assert engine.manual_offset(engine.positions_in_range('2025-01-02', '2025-01-03')) == (None, 0)
+
+
+def test_preview_is_interactive_on_large_wells():
+    rows = 2_000_000
+    timestamps = pd.date_range('2020-01-01', periods=rows, freq='15min')
+    flags = np.where((np.arange(rows) // 5000) % 3 == 0, 'standard', 'master')
+    transducer = pd.DataFrame({'timestamp_utc': timestamps, 'water_level': np.linspace(100, 90, rows),
+                               'baro_flag': flags})
+    transducer['water_level_master_corrected'] = transducer['water_level']
+    baro = pd.DataFrame({'timestamp_utc': pd.date_range('2020-01-01', periods=rows // 4, freq='h'),
+                         'pressure': 14.7})
+    engine = SegmentCompensationEngine(transducer, None, baro)
+
+    start = time.perf_counter()
+    result = engine.compensate(engine.missing_positions())
+    elapsed = time.perf_counter() - start
+
+    assert result.level_mod.sum() == (~transducer['baro_flag'].isin(MASTER_FLAGS)).sum()
+    assert elapsed < 1.0, f"compensation took {elapsed:.2f}s"
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized spike detection engine.
+
+Injects isolated spikes, a short multi-reading spike and a real level shift
+into a synthetic transducer series and checks that SpikeDetector proposes
+only the spikes, with fixes interpolated between the anchor readings.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers.spike_detection import SpikeDetector, SpikeDetectionParams
+
+
+def _make_series(rows=5000, seed=1):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range('2025-01-01', periods=rows, freq='15min')
+    levels = 100 + 0.5 * np.sin(np.arange(rows) / 400) + rng.normal(0, 0.005, rows)
+    return timestamps, levels
+
+
+def test_detects_injected_spikes_and_suggests_interpolation():
+    timestamps, levels = _make_series()
+    clean = levels.copy()
+    levels[1000] += 2.0
+    levels[2500] -= 1.5
+    levels[3000:3003] += 0.8  # Three-reading spike
+
+    result = SpikeDetector().detect(timestamps, levels)
+
+    assert set(result.positions) == {1000, 2500, 3000, 3001, 3002}
+    assert len(result.groups) == 3
+    assert list(result.groups['n_points']) == [1, 1, 3]
+    # The fix lands back on the clean series, within the noise
+    assert np.all(np.abs(result.suggested - clean[result.positions]) < 0.05)
+    assert result.to_pairs()[0][0] == (timestamps[999], levels[999])
+
+
+def test_level_shift_is_not_a_spike():
+    timestamps, levels = _make_series()
+    levels[2000:] += 1.0  # Transducer re-hung: a real step change
+
+    result = SpikeDetector().detect(timestamps, levels)
+
+    assert result.empty
+
+
+def test_nan_readings_are_skipped():
+    timestamps, levels = _make_series()
+    levels[100:110] = np.nan
+    levels[400] += 3.0
+
+    result = SpikeDetector().detect(timestamps, levels)
+
+    assert list(result.positions) == [400]
+
+
+def test_select_keeps_only_accepted_groups():
+    timestamps, levels = _make_series()
+    levels[[1000, 2000, 3000]] += 2.0
+    result = SpikeDetector().detect(timestamps, levels)
+
+    accepted = result.select([1])
+
+    assert list(accepted.positions) == [2000]
+    assert len(accepted.to_pairs()) == 1
+
+
+def test_chunked_statistics_match_single_pass():
+    timestamps, levels = _make_series(rows=20000)
+    levels[::997] += 1.0
+    single = SpikeDetector().detect(timestamps, levels)
+    chunked = SpikeDetector(SpikeDetectionParams(chunk_size=1234)).detect(timestamps, levels)
+
+    assert np.array_equal(single.positions, chunked.positions)
+    assert np.allclose(single.suggested, chunked.suggested)
+
+
+def test_memory_is_set_by_chunk_size():
+    rows = 2_000_000
+    timestamps, levels = _make_series(rows=rows)
+    levels[::5000] += 1.0
+    detector = SpikeDetector(SpikeDetectionParams(chunk_size=100_000))
+
+    tracemalloc.start()
+    try:
+        result = detector.detect(timestamps, levels)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert len(result.groups) == rows // 5000 - 1
+    # Full-length working arrays would take several times the input
+    assert peak < 4 * levels.nbytes, f"peak {peak / 1e6:.0f} MB for a {levels.nbytes / 1e6:.0f} MB series"
+
+
+def test_large_series_is_fast():
+    rows = 2_000_000
+    timestamps, levels = _make_series(rows=rows)
+    levels[::5000] += 1.0
+
+    start = time.perf_counter()
+    result = SpikeDetector().detect(timestamps, levels)
+    elapsed = time.perf_counter() - start
+
+    assert len(result.groups) == rows // 5000 - 1  # The first reading has no leading anchor
+    assert elapsed < 10, f"detection took {elapsed:.1f}s"
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
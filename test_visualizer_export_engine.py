@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the Visualizer's streaming export engine.
+
+Checks that chunked series match the cached ones, that per-well, long and
+wide CSV exports hold the same values as pandas gives from full loads, that
+manual readings are exported with the date range applied, and that a
+cancelled export leaves no partial files.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools', 'Visualizer'))
+
+from export_engine import ExportEngine, PARTIAL_SUFFIX, downsample_rule
+from query_service import TimeSeriesQueryService
+
+from test_visualizer_query_service import make_database
+
+
+def make_export_database():
+    path = make_database()
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE manual_level_readings (well_number TEXT, measurement_date_utc TEXT, water_level REAL)")
+        conn.executemany("INSERT INTO manual_level_readings VALUES (?, ?, ?)",
+                         [('W1', '2024-01-05 10:00:00', 99.0), ('W1', '2024-02-05 10:00:00', 98.0)])
+    return path
+
+
+def test_downsample_rule():
+    assert downsample_rule('1 Hour') == '1h'
+    assert downsample_rule('30 Min') == '30min'
+    assert downsample_rule('1 Week') == 'W-MON'
+    assert downsample_rule('No Downsampling') is None
+    assert downsample_rule(None) is None
+
+
+def test_chunks_match_series():
+    service = TimeSeriesQueryService.for_database(make_export_database())
+    for resolution, aggregate in ((None, 'mean'), ('6h', 'max'), ('1D', 'median'), ('W-MON', 'mean')):
+        chunks = list(service.iter_series('W1', resolution=resolution, aggregate=aggregate, chunk_rows=37))
+        assert len(chunks) > 1
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True),
+                                      service.get_series('W1', resolution=resolution, aggregate=aggregate),
+                                      check_freq=False)
+
+
+def test_per_well_and_manual_export():
+    path = make_export_database()
+    output_dir = tempfile.mkdtemp(prefix='export_engine_test_')
+    progress = []
+    stats = ExportEngine(path, chunk_rows=500).export(
+        ['W1', 'T1', 'MISSING'], output_dir, include_manual=True, end='2024-01-31',
+        file_names={'W1': 'W1 (CAE1)'}, progress=lambda percent, message: progress.append(percent))
+
+    assert stats['wells_exported'] == 2 and stats['wells_without_data'] == ['MISSING']
+    assert sorted(os.listdir(output_dir)) == ['T1.csv', 'W1 (CAE1).csv', 'W1 (CAE1)_manual.csv']
+    assert progress == sorted(progress) and progress[-1] == 100
+
+    exported = pd.read_csv(os.path.join(output_dir, 'W1 (CAE1).csv'), parse_dates=['timestamp_utc'])
+    expected = TimeSeriesQueryService.for_database(path).get_series('W1', end='2024-01-31')
+    assert len(exported) == len(expected) == stats['rows'] - 48
+    np.testing.assert_allclose(exported['water_level'].to_numpy(), expected['water_level'].to_numpy())
+
+    # Only the manual reading inside the date range
+    manual = pd.read_csv(os.path.join(output_dir, 'W1 (CAE1)_manual.csv'))
+    assert manual['water_level'].tolist() == [99.0]
+
+
+def test_long_and_wide_layouts():
+    path = make_export_database()
+    service = TimeSeriesQueryService.for_database(path)
+    output_dir = tempfile.mkdtemp(prefix='export_engine_test_')
+    engine = ExportEngine(path, chunk_rows=100)
+
+    engine.export(['W1', 'T1'], output_dir, layout='long', resolution='1h', base_name='long')
+    long = pd.read_csv(os.path.join(output_dir, 'long.csv'))
+    assert list(long.columns[:2]) == ['well_number', 'timestamp_utc']
+    assert long.groupby('well_number').size().to_dict() == {
+        'T1': 48, 'W1': len(service.get_series('W1', resolution='1h'))}
+
+    engine.export(['W1', 'T1'], output_dir, layout='wide', resolution='1h', base_name='wide')
+    wide = pd.read_csv(os.path.join(output_dir, 'wide.csv'), parse_dates=['timestamp_utc'])
+    expected = pd.concat([service.get_series(well, resolution='1h').set_index('timestamp_utc').add_prefix(f'{well}_')
+                          for well in ('W1', 'T1')], axis=1).sort_index()
+    assert list(wide.columns) == ['timestamp_utc'] + list(expected.columns)
+    assert (wide['timestamp_utc'].to_numpy() == expected.index.to_numpy()).all()
+    np.testing.assert_allclose(wide[expected.columns].to_numpy(), expected.to_numpy())
+
+
+def test_cancelled_export_leaves_no_partial_files():
+    path = make_export_database()
+    output_dir = tempfile.mkdtemp(prefix='export_engine_test_')
+    polls = []
+
+    def cancelled():
+        polls.append(1)
+        return len(polls) > 3
+
+    stats = ExportEngine(path, chunk_rows=100).export(['W1'], output_dir, cancelled=cancelled)
+    assert stats['cancelled'] and not stats['files']
+    assert not any(name.endswith(PARTIAL_SUFFIX) for name in os.listdir(output_dir))
+    assert os.listdir(output_dir) == []
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
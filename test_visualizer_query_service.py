@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script for the Visualizer's shared time-series query service.
+
+Checks that fixed-width resolutions averaged in SQL match pandas' resampling
+(empty buckets included), that date-only end dates include their whole day,
+that telemetry wells read their own table, that the date bounds come from
+SQL, that cached series stay within the memory budget and are returned
+as copies, and that writes by another connection (in WAL mode too) clear
+the cache.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools', 'Visualizer'))
+
+import query_service
+from query_service import TimeSeriesQueryService, resolution_seconds
+
+
+def make_database(readings=5000):
+    """A database with a transducer well (with a two-day gap) and a telemetry well"""
+    path = os.path.join(tempfile.mkdtemp(prefix='query_service_test_'), 'levels.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE wells (well_number TEXT PRIMARY KEY, cae_number TEXT, data_source TEXT);
+        CREATE TABLE water_level_readings (well_number TEXT, timestamp_utc TEXT, water_level REAL, temperature REAL);
+        CREATE TABLE telemetry_level_readings (well_number TEXT, timestamp_utc TEXT, water_level REAL);
+        CREATE INDEX idx_wlr ON water_level_readings (well_number, timestamp_utc);
+    """)
+    conn.executemany("INSERT INTO wells VALUES (?, ?, ?)",
+                     [('W1', 'CAE1', 'transducer'), ('T1', 'CAE2', 'telemetry')])
+    start = datetime(2024, 1, 1, 0, 7)
+    rows = []
+    for i in range(readings):
+        timestamp = start + timedelta(minutes=15 * i)
+        if datetime(2024, 1, 10) <= timestamp < datetime(2024, 1, 12):
+            continue
+        rows.append(('W1', timestamp.strftime('%Y-%m-%d %H:%M:%S'), 100 + np.sin(i / 50), 10 + i % 7))
+    conn.executemany("INSERT INTO water_level_readings VALUES (?, ?, ?, ?)", rows)
+    conn.executemany("INSERT INTO telemetry_level_readings VALUES (?, ?, ?)",
+                     [('T1', (start + timedelta(hours=i)).strftime('%Y-%m-%d %H:%M:%S'), 50.0 + i)
+                      for i in range(48)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def raw_frame(path, well='W1'):
+    with sqlite3.connect(path) as conn:
+        df = pd.read_sql_query("SELECT timestamp_utc, water_level, temperature FROM water_level_readings "
+                               "WHERE well_number = ? ORDER BY timestamp_utc", conn, params=(well,))
+    df['timestamp_utc'] = pd.to_datetime(df['timestamp_utc'])
+    return df.set_index('timestamp_utc')
+
+
+def test_resolution_seconds():
+    assert resolution_seconds('1D') == 86400
+    assert resolution_seconds('6H') == 6 * 3600
+    assert resolution_seconds('30min') == 1800
+    assert resolution_seconds('W-MON') is None
+    assert resolution_seconds('7h') is None
+    assert resolution_seconds(None) is None
+
+
+def test_sql_resolution_matches_pandas():
+    path = make_database()
+    service = TimeSeriesQueryService.for_database(path)
+    expected_raw = raw_frame(path)
+    for resolution, pandas_rule in (('1D', '1D'), ('6H', '6h'), ('W-MON', 'W-MON')):
+        series = service.get_series('W1', resolution=resolution)
+        expected = expected_raw.resample(pandas_rule).mean()
+        assert len(series) == len(expected), resolution
+        assert (series['timestamp_utc'].values == expected.index.values).all(), resolution
+        np.testing.assert_allclose(series['water_level'].to_numpy(), expected['water_level'].to_numpy())
+    # Days inside the gap are empty buckets
+    daily = service.get_series('W1', resolution='1D').set_index('timestamp_utc')
+    assert np.isnan(daily.loc['2024-01-10', 'water_level'])
+
+
+def test_date_only_end_includes_whole_day():
+    path = make_database()
+    service = TimeSeriesQueryService.for_database(path)
+    series = service.get_series('W1', start='2024-01-02', end='2024-01-03')
+    assert series['timestamp_utc'].min() >= pd.Timestamp('2024-01-02')
+    assert series['timestamp_utc'].max() == pd.Timestamp('2024-01-03 23:52')
+    assert len(series) == 2 * 96
+
+    first, last = service.get_date_bounds('W1')
+    expected = raw_frame(path).index
+    assert first == expected.min() and last == expected.max()
+
+
+def test_telemetry_well_reads_telemetry_table():
+    path = make_database()
+    service = TimeSeriesQueryService.for_database(path)
+    series = service.get_series('T1')
+    assert len(series) == 48
+    assert series['water_level'].iloc[-1] == 97.0
+    # The telemetry table has no temperature column
+    assert series['temperature'].isna().all()
+    assert service.get_well_row('T1', ['cae_number', 'aquifer']) == {'well_number': 'T1', 'cae_number': 'CAE2'}
+
+
+def test_cache_budget_and_copies():
+    path = make_database()
+    service = TimeSeriesQueryService.for_database(path)
+    series = service.get_series('W1')
+    series['water_level'] = 0.0
+    assert service.get_series('W1')['water_level'].iloc[0] != 0.0
+
+    hits = service.cache_stats()['hits']
+    service.get_series('W1')
+    assert service.cache_stats()['hits'] == hits + 1
+
+    try:
+        # A budget smaller than one raw series only keeps the small results
+        query_service.set_memory_budget(0.05)
+        service.get_series('W1')
+        service.get_series('W1', resolution='1D')
+        stats = service.cache_stats()
+        assert stats['size_mb'] <= 0.05
+        assert service.clear('W1') >= 1
+    finally:
+        query_service.set_memory_budget(query_service.DEFAULT_MEMORY_BUDGET_MB)
+
+
+def test_wal_writes_clear_the_cache():
+    path = make_database()
+    writer = sqlite3.connect(path)
+    try:
+        writer.execute('PRAGMA journal_mode = WAL')
+        service = TimeSeriesQueryService.for_database(path)
+        before = len(service.get_series('T1'))
+        stat = os.stat(path)
+
+        # The writer stays open, so the commit stays in the -wal file
+        writer.execute("INSERT INTO telemetry_level_readings VALUES ('T1', '2024-01-03 00:00:00', 1.0)")
+        writer.commit()
+        assert (os.stat(path).st_mtime_ns, os.stat(path).st_size) == (stat.st_mtime_ns, stat.st_size)
+
+        assert len(service.get_series('T1')) == before + 1
+        hits = service.cache_stats()['hits']
+        service.get_series('T1')
+        assert service.cache_stats()['hits'] == hits + 1  # Unchanged since: served from the cache
+    finally:
+        writer.close()
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
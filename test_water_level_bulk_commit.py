@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the set-based commit of edited water level readings.
+
+Checks that build_update_frame picks the same values and flags as the old
+row-by-row loop in WaterLevelEditDialog.apply_changes, that BulkCommitEngine
+writes them with exact per-flag counts, and that cancelling leaves the
+database untouched.
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers.water_level_bulk_commit import (
+    BulkCommitEngine, BulkCommitCancelled, build_update_frame,
+    METHOD_COMPENSATION, METHOD_BASELINE, METHOD_SPIKE
+)
+
+
+def _make_data(rows=2000):
+    timestamps = pd.date_range('2025-01-01', periods=rows, freq='15min')
+    data = pd.DataFrame({
+        'well_number': 'W-1',
+        'timestamp_utc': timestamps,
+        'water_level': np.linspace(100, 101, rows),
+        'baro_flag': 'standard',
+        'level_flag': 'default_level',
+        'spike_flag': 'none',
+        'baro_flag_mod': 'standard',
+        'level_flag_mod': 'default_level',
+        'level_flag_baro_mod': 'default_level',
+    })
+    data['water_level_master_corrected'] = data['water_level'] + 0.5
+    data['water_level_level_corrected'] = data['water_level'] - 0.25
+    data['water_level_spike_corrected'] = data['water_level'] + 0.01
+    # Compensation on the first 300 readings, half with a master level fix
+    data.loc[:299, 'baro_flag_mod'] = 'master_mod'
+    data.loc[:149, 'level_flag_baro_mod'] = 'master_mod'
+    # Baseline adjustment overlapping the compensation
+    data.loc[250:799, 'level_flag_mod'] = 'level_mod'
+    # Spikes
+    data.loc[[900, 901, 1500, 250], 'spike_flag'] = 'spike_corrected'
+    return data
+
+
+def _make_db(data):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    with sqlite3.connect(path) as conn:
+        conn.execute('''
+            CREATE TABLE water_level_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                well_number TEXT, timestamp_utc TIMESTAMP, water_level REAL,
+                baro_flag TEXT, level_flag TEXT,
+                UNIQUE(well_number, timestamp_utc))
+        ''')
+        conn.executemany(
+            "INSERT INTO water_level_readings (well_number, timestamp_utc, water_level, baro_flag, level_flag) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(r.well_number, r.timestamp_utc.strftime('%Y-%m-%d %H:%M:%S'), r.water_level, r.baro_flag, r.level_flag)
+             for r in data.itertuples()])
+    return path
+
+
+def _row_by_row(data):
+    """The selection logic of the previous apply_changes loop"""
+    mask = ((data['baro_flag_mod'] == 'master_mod') | (data['level_flag_mod'] == 'level_mod')
+            | (data['spike_flag'] == 'spike_corrected')) & ~data['well_number'].isna()
+    expected = {}
+    for _, row in data[mask].iterrows():
+        if row['baro_flag_mod'] == 'master_mod':
+            values = (row['water_level_master_corrected'],
+                      'master_level_corrected' if row['level_flag_baro_mod'] == 'master_mod' else row['level_flag'],
+                      'master_corrected')
+        elif row['level_flag_mod'] == 'level_mod':
+            values = (row['water_level_level_corrected'], 'level_corrected', row['baro_flag'])
+        else:
+            values = (row['water_level_spike_corrected'], 'spike_corrected', row['baro_flag'])
+        expected[(row['well_number'], row['timestamp_utc'].strftime('%Y-%m-%d %H:%M:%S'))] = values
+    return expected
+
+
+def test_update_frame_matches_row_by_row_selection():
+    data = _make_data()
+    frame = build_update_frame(data)
+    expected = _row_by_row(data)
+
+    assert len(frame) == len(expected)
+    for row in frame.itertuples():
+        water_level, level_flag, baro_flag = expected[(row.well_number, row.timestamp_utc)]
+        assert abs(row.water_level - water_level) < 1e-12
+        assert (row.level_flag, row.baro_flag) == (level_flag, baro_flag)
+
+
+def test_bulk_commit_writes_and_counts_exactly():
+    data = _make_data()
+    db_path = _make_db(data)
+    frame = build_update_frame(data)
+    # A reading that is no longer in the database must not be counted
+    frame.loc[len(frame)] = ['W-1', '1999-01-01 00:00:00', 1.0, 'spike_corrected', 'standard', METHOD_SPIKE]
+    progress = []
+
+    result = BulkCommitEngine(db_path).apply(frame, progress.append)
+
+    assert result.staged == len(frame)
+    assert result.rows_updated == len(frame) - 1
+    assert result.by_method == {METHOD_COMPENSATION: 300, METHOD_BASELINE: 500, METHOD_SPIKE: 3}
+    assert result.by_baro_flag == {'master_corrected': 300, 'standard': 503}
+    assert result.by_level_flag['master_level_corrected'] == 150
+    assert result.wells == ['W-1']
+    assert progress[-1] == 100
+
+    expected = _row_by_row(data)
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT well_number, timestamp_utc, water_level, level_flag, baro_flag "
+                            "FROM water_level_readings").fetchall()
+    for well_number, timestamp, water_level, level_flag, baro_flag in rows:
+        if (well_number, timestamp) in expected:
+            exp_level, exp_level_flag, exp_baro_flag = expected[(well_number, timestamp)]
+            assert abs(water_level - exp_level) < 1e-12
+            assert (level_flag, baro_flag) == (exp_level_flag, exp_baro_flag)
+        else:
+            assert (level_flag, baro_flag) == ('default_level', 'standard')
+
+
+def test_cancel_rolls_back():
+    data = _make_data()
+    db_path = _make_db(data)
+    engine = BulkCommitEngine(db_path)
+    engine.cancel()
+
+    try:
+        engine.apply(build_update_frame(data))
+        assert False, "expected BulkCommitCancelled"
+    except BulkCommitCancelled:
+        pass
+
+    with sqlite3.connect(db_path) as conn:
+        changed = conn.execute("SELECT COUNT(*) FROM water_level_readings WHERE baro_flag != 'standard' "
+                               "OR level_flag != 'default_level'").fetchone()[0]
+    assert changed == 0
+
+
+def test_no_modifications():
+    data = _make_data()
+    data['baro_flag_mod'] = 'standard'
+    data['level_flag_mod'] = 'default_level'
+    data['spike_flag'] = 'none'
+    assert build_update_frame(data).empty
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
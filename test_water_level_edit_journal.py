@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent water level edit journal.
+
+Checks that only changed rows are journaled (as contiguous ranges), that
+undo/redo stacks follow the append-only event log, and that a bulk commit is
+journaled in its own transaction and can be reverted and re-applied in the
+database without touching readings edited since. Session edits never reach
+the project database and the committed history per well is capped.
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers.water_level_edit_journal import (
+    EditJournal, SCOPE_SESSION, SCOPE_COMMITTED, ACTION_UNDO, ACTION_REDO, MAX_COMMITTED_BATCHES
+)
+from src.gui.handlers.water_level_bulk_commit import BulkCommitEngine, BulkCommitCancelled, build_update_frame
+from test_water_level_bulk_commit import _make_data, _make_db
+
+
+def _session_edit(journal, rows=10000, changed=(slice(100, 200), slice(5000, 5010)), method='baseline',
+                  keys=None):
+    timestamps = pd.date_range('2025-01-01', periods=rows, freq='15min')
+    before = np.linspace(100, 101, rows)
+    after = before.copy()
+    flags_before = np.array(['default_level'] * rows, dtype=object)
+    flags_after = flags_before.copy()
+    for part in changed:
+        after[part] += 0.25
+        flags_after[part] = 'level_mod'
+    return journal.record('session-1', SCOPE_SESSION, method, timestamps,
+                          {'water_level_level_corrected': before, 'level_flag_mod': flags_before},
+                          {'water_level_level_corrected': after, 'level_flag_mod': flags_after},
+                          keys=np.arange(rows) if keys is None else keys, instance_id='helper-1'), before, after
+
+
+def test_only_changed_ranges_are_stored():
+    journal = EditJournal()
+    batch_id, before, after = _session_edit(journal)
+
+    conn = journal._connect()
+    ranges = conn.execute("SELECT n_rows, start_utc, length(payload) FROM edit_journal_ranges "
+                          "WHERE batch_id = ? ORDER BY range_no", (batch_id,)).fetchall()
+    assert [r[0] for r in ranges] == [100, 10]
+    assert ranges[0][1] == '2025-01-02 01:00:00'
+    assert sum(r[2] for r in ranges) < 10000  # Far smaller than a copy of the columns
+
+    batch = journal.load(journal.undo_stack(SCOPE_SESSION, 'session-1')[0])
+    assert batch.n_rows == 110
+    assert list(batch.keys[:3]) == [100, 101, 102]
+    assert np.allclose(batch.before['water_level_level_corrected'], before[batch.keys])
+    assert np.allclose(batch.after['water_level_level_corrected'], after[batch.keys])
+    assert set(batch.after['level_flag_mod']) == {'level_mod'}
+
+
+def test_unchanged_edit_is_not_journaled():
+    journal = EditJournal()
+    assert _session_edit(journal, changed=())[0] is None
+    assert journal.undo_stack(SCOPE_SESSION, 'session-1') == []
+
+
+def test_undo_redo_stacks_and_redo_branch_discard():
+    journal = EditJournal()
+    first = _session_edit(journal, method='spike_fix')[0]
+    second = _session_edit(journal, method='baseline')[0]
+
+    assert [b.batch_id for b in journal.undo_stack(SCOPE_SESSION, 'session-1')] == [second, first]
+    journal.mark(second, ACTION_UNDO)
+    journal.mark(first, ACTION_UNDO)
+    assert [b.batch_id for b in journal.redo_stack(SCOPE_SESSION, 'session-1')] == [first, second]
+
+    journal.mark(first, ACTION_REDO)
+    assert [b.batch_id for b in journal.undo_stack(SCOPE_SESSION, 'session-1')] == [first]
+    assert [b.batch_id for b in journal.undo_stack(SCOPE_SESSION, 'session-1', instance_id='helper-1')] == [first]
+
+    # A new edit drops what is left on the redo stack
+    third = _session_edit(journal)[0]
+    assert journal.redo_stack(SCOPE_SESSION, 'session-1') == []
+    assert [b.batch_id for b in journal.undo_stack(SCOPE_SESSION, 'session-1')] == [third, first]
+
+
+def _read(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT timestamp_utc, water_level, level_flag, baro_flag FROM water_level_readings "
+                            "ORDER BY timestamp_utc").fetchall()
+
+
+def test_committed_batch_can_be_reverted_and_reapplied():
+    data = _make_data()
+    db_path = _make_db(data)
+    original = _read(db_path)
+    journal = EditJournal(db_path)
+
+    result = BulkCommitEngine(db_path, journal, 'session-1').apply(build_update_frame(data))
+    committed = _read(db_path)
+    assert len(result.journal_batches) == 1
+    batch = journal.undo_stack(SCOPE_COMMITTED, wells=['W-1'])[0]
+    assert batch.n_rows == result.rows_updated
+
+    # Someone edits one of the committed readings afterwards
+    edited_ts = committed[900][0]
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE water_level_readings SET water_level = 0 WHERE timestamp_utc = ?", (edited_ts,))
+
+    written, skipped = journal.write_committed(batch, 'before')
+    assert (written, skipped) == (result.rows_updated - 1, 1)
+    reverted = _read(db_path)
+    assert [r for r in reverted if r[0] != edited_ts] == [r for r in original if r[0] != edited_ts]
+    assert journal.undo_stack(SCOPE_COMMITTED, wells=['W-1']) == []
+
+    batch = journal.redo_stack(SCOPE_COMMITTED, wells=['W-1'])[0]
+    written, skipped = journal.write_committed(batch, 'after')
+    assert (written, skipped) == (result.rows_updated - 1, 1)
+    assert [r for r in _read(db_path) if r[0] != edited_ts] == [r for r in committed if r[0] != edited_ts]
+
+
+def test_cancelled_commit_leaves_no_journal():
+    data = _make_data()
+    db_path = _make_db(data)
+    journal = EditJournal(db_path)
+    engine = BulkCommitEngine(db_path, journal, 'session-1')
+    engine.cancel()
+    try:
+        engine.apply(build_update_frame(data))
+        assert False, "expected BulkCommitCancelled"
+    except BulkCommitCancelled:
+        pass
+    assert journal.undo_stack(SCOPE_COMMITTED, wells=['W-1']) == []
+
+
+def _journal_tables(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'edit_journal%'")}
+
+
+def test_session_edits_stay_out_of_the_project_database():
+    db_path = _make_db(_make_data())
+    journal = EditJournal(db_path)
+    batch_id = _session_edit(journal)[0]
+    journal.mark(batch_id, ACTION_UNDO)
+    assert journal.redo_stack(SCOPE_SESSION, 'session-1')[0].batch_id == batch_id
+    assert _journal_tables(db_path) == set()
+
+    # Committing, discarding or closing the dialog drops the session's edits
+    _session_edit(journal)
+    journal.clear_session('session-1')
+    assert journal.undo_stack(SCOPE_SESSION, 'session-1') == []
+    assert journal.redo_stack(SCOPE_SESSION, 'session-1') == []
+    assert journal._memory_conn.execute("SELECT COUNT(*) FROM edit_journal_ranges").fetchone() == (0,)
+
+
+def test_legacy_session_rows_are_purged_by_a_commit():
+    data = _make_data()
+    db_path = _make_db(data)
+    journal = EditJournal(db_path)
+    conn = journal._connect()
+    journal.ensure_tables(conn)
+    journal.record('old-session', SCOPE_SESSION, 'baseline', pd.date_range('2025-01-01', periods=2, freq='15min'),
+                   {'water_level': np.array([1.0, 2.0])}, {'water_level': np.array([1.5, 2.0])}, conn=conn)
+    conn.commit()
+    conn.close()
+
+    BulkCommitEngine(db_path, journal, 'session-1').apply(build_update_frame(data))
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT DISTINCT scope FROM edit_journal_batches").fetchall() == [(SCOPE_COMMITTED,)]
+        assert conn.execute("SELECT COUNT(*) FROM edit_journal_ranges r LEFT JOIN edit_journal_batches b "
+                            "USING (batch_id) WHERE b.batch_id IS NULL").fetchone() == (0,)
+
+
+def test_committed_history_is_capped_per_well():
+    journal = EditJournal(tempfile.mktemp(suffix='.db'))
+    timestamps = pd.date_range('2025-01-01', periods=3, freq='15min')
+    for i in range(MAX_COMMITTED_BATCHES + 5):
+        for well in ('W-1', 'W-2'):
+            journal.record('session-1', SCOPE_COMMITTED, 'commit', timestamps,
+                           {'water_level': np.zeros(3)}, {'water_level': np.full(3, i + 1.0)}, well_number=well)
+    for well in ('W-1', 'W-2'):
+        stack = journal.undo_stack(SCOPE_COMMITTED, wells=[well])
+        assert len(stack) == MAX_COMMITTED_BATCHES
+        assert journal.load(stack[-1]).after['water_level'][0] == 6.0
+    conn = journal._connect()
+    assert conn.execute("SELECT COUNT(DISTINCT batch_id) FROM edit_journal_ranges").fetchone() == (2 * MAX_COMMITTED_BATCHES,)
+    conn.close()
+
+
+def test_non_integer_index_keys_round_trip():
+    rows = 1000
+    labels = pd.date_range('2025-01-01', periods=rows, freq='15min').to_numpy()
+    journal = EditJournal()
+    _session_edit(journal, rows=rows, changed=(slice(10, 20),), keys=labels)
+    batch = journal.load(journal.undo_stack(SCOPE_SESSION, 'session-1')[0])
+    assert list(batch.keys) == list(labels[10:20])
+
+    names = np.array([f'row-{i}' for i in range(rows)], dtype=object)
+    _session_edit(journal, rows=rows, changed=(slice(500, 502),), keys=names)
+    batch = journal.load(journal.undo_stack(SCOPE_SESSION, 'session-1')[0])
+    assert list(batch.keys) == ['row-500', 'row-501']
+
+    try:
+        journal.record('session-1', SCOPE_COMMITTED, 'commit', labels[:1], {'water_level': np.zeros(1)},
+                       {'water_level': np.ones(1)}, keys=np.arange(1))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
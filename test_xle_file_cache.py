@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for the Drive XLE file cache.
+
+Builds synthetic Solinst XLE files, serves them from FakeDriveService and
+checks that the head/tail parse matches a full SolinstReader.read_xle parse,
+that large files are only partially downloaded, and that cached entries are
+reused until the file's md5Checksum changes.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_drive_service import FakeDriveService, FakeMediaIoBaseDownload
+from src.gui.handlers import xle_file_cache
+from src.gui.handlers.xle_file_cache import XleFileCache
+from src.gui.handlers.google_drive_data_handler import GoogleDriveDataHandler
+from src.gui.handlers.solinst_reader import SolinstReader
+
+xle_file_cache.MediaIoBaseDownload = FakeMediaIoBaseDownload
+
+
+def make_xle(location='WELL-1', serial='2123456', start=datetime(2025, 4, 1), readings=2000):
+    logs = []
+    for i in range(readings):
+        timestamp = start + timedelta(minutes=15 * i)
+        logs.append(f'<Log id="{i + 1}"><Date>{timestamp:%Y/%m/%d}</Date><Time>{timestamp:%H:%M:%S}</Time>'
+                    f'<ms>0</ms><ch1>{10 + i % 7 * 0.01:.3f}</ch1><ch2>{8.5:.3f}</ch2></Log>')
+    stop = start + timedelta(minutes=15 * (readings - 1))
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<Body_xle>
+<File_info><Company>Test</Company></File_info>
+<Instrument_info><Instrument_type>L5_LT</Instrument_type><Model_number>M10</Model_number><Serial_number>{serial}</Serial_number><Battery_level>98</Battery_level><Firmware>1.004</Firmware></Instrument_info>
+<Instrument_info_data_header><Project_ID>TEST</Project_ID><Location>{location}</Location><Sample_rate>90000</Sample_rate><Start_time>{start:%Y/%m/%d %H:%M:%S}</Start_time><Stop_time>{stop:%Y/%m/%d %H:%M:%S}</Stop_time><Num_log>{readings}</Num_log></Instrument_info_data_header>
+<Ch1_data_header><Identification>LEVEL</Identification><Unit>ft</Unit></Ch1_data_header>
+<Ch2_data_header><Identification>TEMPERATURE</Identification><Unit>°C</Unit></Ch2_data_header>
+<Data>
+{chr(10).join(logs)}
+</Data>
+</Body_xle>
+'''.encode('utf-8')
+
+
+def _cache(drive):
+    return XleFileCache(drive, tempfile.mkdtemp(prefix='xle_cache_test_'))
+
+
+def test_head_and_tail_match_a_full_parse():
+    drive = FakeDriveService()
+    content = make_xle(readings=5000)
+    file_id = drive.add_file('raw.xle', content=content)
+    file = drive.files_by_id[file_id]
+    cache = _cache(drive)
+
+    summary = cache.get_summary(file_id, file['md5Checksum'], file['size'])
+
+    path = os.path.join(cache.cache_dir, 'full.xle')
+    with open(path, 'wb') as f:
+        f.write(content)
+    df, metadata = SolinstReader().read_xle(path)
+    assert summary.start_utc == df['timestamp_utc'].min()
+    assert summary.end_utc == df['timestamp_utc'].max()
+    assert summary.first_reading == df['timestamp'].min()
+    assert summary.metadata.location == metadata.location
+    assert summary.metadata.serial_number == metadata.serial_number
+    assert summary.metadata.start_time == metadata.start_time
+    assert cache.downloaded_bytes < len(content) / 4
+
+
+def test_summaries_are_reused_until_the_content_changes():
+    drive = FakeDriveService()
+    file_id = drive.add_file('raw.xle', content=make_xle(readings=5000))
+    cache = _cache(drive)
+    file = drive.files_by_id[file_id]
+    cache.get_summary(file_id, file['md5Checksum'], file['size'])
+
+    drive.round_trips = 0
+    restarted = XleFileCache(drive, cache.cache_dir)
+    summary = restarted.get_summary(file_id, file['md5Checksum'], file['size'])
+    assert drive.round_trips == 0
+    assert summary.metadata.location == 'WELL-1'
+
+    drive.modify_file(file_id, make_xle(location='WELL-2', readings=5000))
+    file = drive.files_by_id[file_id]
+    summary = restarted.get_summary(file_id, file['md5Checksum'], file['size'])
+    assert summary.metadata.location == 'WELL-2'
+    assert len([n for n in os.listdir(cache.cache_dir) if n.endswith('.json')]) == 1
+
+
+def test_full_import_reuses_cached_bytes():
+    drive = FakeDriveService()
+    content = make_xle(readings=20)
+    file_id = drive.add_file('small.xle', content=content)
+    file = drive.files_by_id[file_id]
+    cache = _cache(drive)
+
+    # Small files are fetched whole for the summary ...
+    summary = cache.get_summary(file_id, file['md5Checksum'], file['size'])
+    assert summary.has_data and summary.last_reading == datetime(2025, 4, 1, 4, 45)
+
+    # ... and the import then needs no further download
+    drive.round_trips = 0
+    path = cache.get_local_file(file_id, file['md5Checksum'])
+    assert drive.round_trips == 0
+    with open(path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_file_without_readings():
+    drive = FakeDriveService()
+    file_id = drive.add_file('empty.xle', content=make_xle(readings=0))
+    file = drive.files_by_id[file_id]
+
+    summary = _cache(drive).get_summary(file_id, file['md5Checksum'], file['size'])
+
+    assert summary is not None and not summary.has_data
+
+
+def test_prune_keeps_summaries():
+    drive = FakeDriveService()
+    cache = _cache(drive)
+    for i in range(3):
+        file_id = drive.add_file(f'{i}.xle', content=make_xle(readings=20))
+        cache.get_summary(file_id, drive.files_by_id[file_id]['md5Checksum'])
+
+    cache.prune(0)
+
+    names = os.listdir(cache.cache_dir)
+    assert not [n for n in names if n.endswith('.xle')]
+    assert len([n for n in names if n.endswith('.json')]) == 3
+
+
+
+def test_data_folder_download_reuses_cached_bytes():
+    drive = FakeDriveService()
+    folder_id = drive.add_folder('data')
+    run_id = drive.add_folder('run_1', folder_id)
+    first_id = drive.add_file('first.xle', run_id, content=make_xle(readings=20))
+    drive.add_file('notes.txt', folder_id, content=b'notes')
+    settings = {"local_db_directory": tempfile.mkdtemp(prefix='data_folder_test_')}
+    settings_handler = MagicMock()
+    settings_handler.get_setting.side_effect = lambda key, default=None: settings.get(key, default)
+    handler = GoogleDriveDataHandler(settings_handler)
+
+    def download():
+        local_path = Path(tempfile.mkdtemp(prefix='data_folder_test_'))
+        handler._download_folder_contents(drive, folder_id, local_path)
+        return local_path
+
+    download()
+    downloaded = handler.file_cache.downloaded_bytes
+    assert downloaded > 0
+
+    # Only the file that changed is downloaded again
+    drive.modify_file(first_id, make_xle(location='WELL-2', readings=20))
+    local_path = download()
+    assert handler.file_cache.downloaded_bytes - downloaded == len(drive.contents[first_id])
+    assert (local_path / 'run_1' / 'first.xle').read_bytes() == drive.contents[first_id]
+    assert (local_path / 'notes.txt').read_bytes() == b'notes'
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
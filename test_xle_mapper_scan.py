@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the XleMapper archive scan.
+
+Checks that the header-only scan produces the same map rows as the previous
+get_file_metadata scan, that parallel and in-process scans agree, that an
+interrupted scan resumes from its checkpoint, and that duplicates are grouped
+with byte-identical copies told apart from files that only share a header.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+
+from solinst_xle_mapper import XleMapper, default_checkpoint_path
+
+from test_xle_file_cache import make_xle
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def _archive(files=12):
+    root = tempfile.mkdtemp(prefix='xle_mapper_test_')
+    for i in range(files):
+        _write(os.path.join(root, f"site{i % 3}", f"{i}.xle"),
+               make_xle(location=f"WELL-{i}", serial=f"21{i:05d}", start=datetime(2025, 1, 1) + timedelta(days=i),
+                        readings=300 + i))
+    return root
+
+
+def _legacy_entry(mapper, xle_file):
+    """Map row as built from a full get_file_metadata parse"""
+    metadata, _ = mapper.reader.get_file_metadata(xle_file)
+    duration_days = (metadata.stop_time - metadata.start_time).total_seconds() / (60 * 60 * 24)
+    return {
+        'Serial_number': metadata.serial_number,
+        'Project_ID': metadata.project_id,
+        'Location': metadata.location,
+        'Start_time': metadata.start_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'Stop_time': metadata.stop_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'Duration_days': f"{duration_days:.2f}",
+        'Logger_type': "Barologger" if mapper.reader.is_barologger(metadata) else "Levelogger",
+        'file_name': xle_file.name,
+        'file_path': str(xle_file.parent)
+    }
+
+
+def test_rows_match_full_metadata_parse():
+    root = _archive()
+    _write(os.path.join(root, 'empty.xle'), make_xle(serial='2199999', readings=0))
+    mapper = XleMapper(workers=1)
+    results = mapper.scan_directory(root)
+
+    expected = [_legacy_entry(mapper, path) for path in sorted(Path(root).rglob('*.xle'), key=str)]
+    assert results == expected
+    assert mapper.scan_stats == {'files': 13, 'scanned': 13, 'resumed': 0, 'errors': 0}
+    assert [r['file_name'] for r in mapper.scan_directory(root, recursive=False)] == ['empty.xle']
+
+
+def test_parallel_scan_matches_in_process_scan():
+    root = _archive(files=90)
+    assert XleMapper(workers=2).scan_directory(root) == XleMapper(workers=1).scan_directory(root)
+
+
+def test_interrupted_scan_resumes_from_checkpoint():
+    root = _archive(files=10)
+    output = os.path.join(tempfile.mkdtemp(), 'map.csv')
+    checkpoint = default_checkpoint_path(output)
+    mapper = XleMapper(workers=1)
+
+    def interrupt(done, total, name):
+        if done == 4:
+            raise KeyboardInterrupt
+
+    try:
+        mapper.scan_directory(root, checkpoint_path=checkpoint, progress=interrupt)
+        assert False, "scan was not interrupted"
+    except KeyboardInterrupt:
+        pass
+
+    results = mapper.scan_directory(root, checkpoint_path=checkpoint)
+    assert mapper.scan_stats['resumed'] == 4 and mapper.scan_stats['scanned'] == 6
+    assert results == XleMapper(workers=1).scan_directory(root)
+
+    # Changed and deleted files are picked up on the next run
+    os.remove(os.path.join(root, 'site0', '0.xle'))
+    changed = os.path.join(root, 'site1', '1.xle')
+    _write(changed, make_xle(serial='2177777', readings=50))
+    os.utime(changed, ns=(0, 10 ** 18))
+    results = mapper.scan_directory(root, checkpoint_path=checkpoint)
+    assert mapper.scan_stats == {'files': 9, 'scanned': 1, 'resumed': 8, 'errors': 0}
+    assert '2177777' in [r['Serial_number'] for r in results]
+
+
+def test_duplicates_separate_identical_copies():
+    root = _archive(files=6)
+    original = os.path.join(root, 'site0', '0.xle')
+    for copy in ['copy_a.xle', 'copy_b.xle']:
+        shutil.copy(original, os.path.join(root, 'site2', copy))
+    # Same header, different readings
+    content = open(original, 'rb').read().replace(b'<ch2>8.500</ch2>', b'<ch2>9.500</ch2>', 1)
+    _write(os.path.join(root, 'site1', 'edited.xle'), content)
+
+    mapper = XleMapper(workers=1)
+    results = mapper.scan_directory(root, checkpoint_path=os.path.join(tempfile.mkdtemp(), 'scan.db'))
+    duplicates = mapper.find_duplicates(results)
+
+    assert [(d['file_name'], d['is_duplicate'], d['identical_copy']) for d in duplicates] == [
+        ('0.xle', False, False), ('edited.xle', True, False), ('copy_a.xle', True, True),
+        ('copy_b.xle', True, True)]
+    assert all(d['Serial_number'] == '2100000' for d in duplicates)
+
+    output = os.path.join(tempfile.mkdtemp(), 'map.csv')
+    assert mapper.export_to_csv(results, output) == output
+    assert 'content_hash' not in open(output).readline()
+
+
+def test_grouping_is_linear_in_duplicates():
+    entries = [{'Serial_number': str(i % 50), 'Start_time': 's', 'Stop_time': 'e', 'file_name': f"{i}.xle",
+                'file_path': 'p'} for i in range(100_000)]
+    duplicates = XleMapper(workers=1).find_duplicates(entries)
+    assert len(duplicates) == 100_000
+    assert sum(1 for d in duplicates if not d['is_duplicate']) == 50
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
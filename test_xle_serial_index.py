@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for the XLE serial number index.
+
+Builds a folder tree of synthetic XLE and CSV logger files and checks that
+the header-only summaries match a full SolinstReader parse, that searches
+use the same flexible serial matching as FindXLEBySerial, and that refreshes
+only rescan new or modified files and drop deleted ones.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.gui.handlers.solinst_reader import SolinstReader
+from src.gui.handlers.xle_serial_index import XleSerialIndex, is_serial_match
+
+from test_xle_file_cache import make_xle
+
+
+def make_csv(serial='2123456', start=datetime(2025, 4, 1), readings=100):
+    lines = [f'Serial_number: {serial}', 'Project ID: TEST', 'Location: WELL-CSV', 'LEVEL UNIT: ft',
+             'Date,Time,ms,LEVEL,TEMPERATURE']
+    for i in range(readings):
+        timestamp = start + timedelta(minutes=15 * i)
+        lines.append(f"{timestamp:%Y/%m/%d},{timestamp:%H:%M:%S},0,{10 + i * 0.01:.3f},8.5")
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def _archive():
+    root = tempfile.mkdtemp(prefix='xle_index_test_')
+    _write(os.path.join(root, '2024', 'a.xle'), make_xle(serial='2123456', readings=5000))
+    _write(os.path.join(root, '2024', 'b.xle'), make_xle(serial='2099999', location='WELL-2', readings=20))
+    _write(os.path.join(root, '2025', 'deep', 'c.xle'),
+           make_xle(serial='2123456', start=datetime(2025, 6, 1), readings=300))
+    _write(os.path.join(root, 'top.xle'), make_xle(serial='L5-2123456', readings=10))
+    _write(os.path.join(root, '2025', 'WELL_2123456_logger.csv'), make_csv(readings=250))
+    _write(os.path.join(root, '2025', 'broken.xle'), b'<Body_xle><Instrument_info>')
+    return root
+
+
+def _index():
+    return XleSerialIndex(os.path.join(tempfile.mkdtemp(prefix='xle_index_db_'), 'index.db'))
+
+
+def test_serial_matching_rules():
+    assert is_serial_match('2123456', ' 2123456 ')
+    assert is_serial_match('L5-2123456', '2123456')
+    assert is_serial_match('21-23-456', '2123456')
+    assert is_serial_match('SN 2123456', 'sn-2123456')
+    assert not is_serial_match('2099999', '2123456')
+    assert not is_serial_match('', '2123456')
+
+
+def test_header_summary_matches_full_parse():
+    root = _archive()
+    index = _index()
+    index.refresh(root)
+
+    found = index.search(root, '2123456')
+    names = [entry.name for entry in found]
+    assert sorted(names) == ['WELL_2123456_logger.csv', 'a.xle', 'c.xle', 'top.xle']
+
+    reader = SolinstReader()
+    for entry in found:
+        if entry.file_type != 'XLE':
+            continue
+        df, metadata = reader.read_xle(entry.path)
+        assert entry.serial_number == metadata.serial_number
+        assert entry.location == metadata.location
+        assert entry.start_time == metadata.start_time and entry.stop_time == metadata.stop_time
+        assert entry.num_log == len(df)
+
+    csv = next(entry for entry in found if entry.file_type == 'CSV')
+    assert csv.location == 'WELL-CSV' and csv.num_log == 250
+    assert csv.start_time == datetime(2025, 4, 1)
+    assert csv.stop_time == datetime(2025, 4, 1) + timedelta(minutes=15 * 249)
+
+    # Scope and type filters
+    assert [e.name for e in index.search(root, '2123456', recursive=False)] == ['top.xle']
+    assert [e.name for e in index.search(os.path.join(root, '2025'), '2123456', file_types=['CSV'])] \
+        == ['WELL_2123456_logger.csv']
+    assert index.search(root, '7777777') == []
+
+
+def test_refresh_is_incremental():
+    root = _archive()
+    index = _index()
+    stats = index.refresh(root)
+    assert stats == {'scanned': 6, 'removed': 0, 'unchanged': 0}
+    assert index.count(root) == 6
+
+    assert index.refresh(root) == {'scanned': 0, 'removed': 0, 'unchanged': 6}
+
+    os.remove(os.path.join(root, '2024', 'b.xle'))
+    changed = os.path.join(root, 'top.xle')
+    _write(changed, make_xle(serial='2555555', readings=12))
+    os.utime(changed, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert index.refresh(root) == {'scanned': 1, 'removed': 1, 'unchanged': 4}
+    assert [e.name for e in index.search(root, '2555555')] == ['top.xle']
+    assert 'top.xle' not in [e.name for e in index.search(root, '2123456')]
+
+    # A new index on the same database keeps what was scanned
+    reopened = XleSerialIndex(index.db_path)
+    assert reopened.refresh(root)['scanned'] == 0
+
+
+def test_parallel_scan_matches_serial_scan():
+    root = tempfile.mkdtemp(prefix='xle_index_many_')
+    for i in range(80):
+        _write(os.path.join(root, f"f{i // 20}", f"{i}.xle"),
+               make_xle(serial=f"2{i % 4:06d}", start=datetime(2025, 1, 1) + timedelta(days=i), readings=50))
+
+    serial_index, parallel_index = _index(), _index()
+    progress = []
+    serial_index.refresh(root, workers=1)
+    parallel_index.refresh(root, workers=2, progress=lambda done, total: progress.append((done, total)))
+    assert progress[-1] == (80, 80)
+
+    for serial in ['2000000', '2000001', '2000003']:
+        expected = serial_index.search(root, serial)
+        assert len(expected) == 20
+        assert parallel_index.search(root, serial) == expected
+
+
+def test_cancelled_refresh_keeps_scanned_files():
+    root = _archive()
+    index = _index()
+    calls = []
+    index.refresh(root, cancelled=lambda: len(calls.append(1) or calls) > 3)
+    assert index.count(root) == 3
+    assert index.refresh(root)['scanned'] == 3
+
+
+if __name__ == '__main__':
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"All {len(tests)} tests passed")
@@ -15,6 +15,7 @@ import {
 import { listDatabases, getDatabaseInfo, refreshDatabaseCache } from '@/controllers/databases';
 import { getWells, getWell, getWellFields } from '@/controllers/wells';
 import { getWaterLevelData, getRechargeResults, getDataSummary } from '@/controllers/data';
+import { sqlitePool } from '@/services/sqlitePool';
 
 // Load environment variables
 dotenv.config();
@@ -46,7 +47,8 @@ app.get('/api/health', (req, res) => {
     success: true,
     message: 'Water Level Visualizer API is running',
     timestamp: new Date().toISOString(),
-    version: '1.0.0'
+    version: '1.0.0',
+    databaseConnections: sqlitePool.getStats()
   });
 });
 
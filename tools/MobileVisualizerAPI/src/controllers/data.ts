@@ -2,12 +2,114 @@ import { Request, Response } from 'express';
 import { GoogleDriveService } from '@/services/googleDrive';
 import { SQLiteService } from '@/services/sqlite';
 import { cacheService, CacheService } from '@/services/cache';
-import { ApiResponse, WaterLevelReading, RechargeResult, DataQueryParams } from '@/types/api';
+import {
+  chooseResolution, coarserResolutions, emptySeries, encodeSeries, julianToMs, sliceSeries, ResolutionLevel
+} from '@/services/aggregation';
+import { ApiResponse, WaterLevelReading, RechargeResult, DataQueryParams, AggregatedSeries } from '@/types/api';
 
 const googleDriveService = new GoogleDriveService();
-const sqliteService = new SQLiteService();
+
+interface CachedWaterLevelData {
+  etag: string;
+  data: WaterLevelReading[] | AggregatedSeries;
+}
+
+// Clients may keep responses but must revalidate them with the ETag
+const DATA_CACHE_CONTROL = 'private, no-cache';
+
+// Whole-history aggregates of a level, computed once per database version
+const getLevelSeries = async (
+  sqliteService: SQLiteService,
+  databaseId: string,
+  modified: string,
+  params: DataQueryParams,
+  level: ResolutionLevel
+): Promise<AggregatedSeries> => {
+  const key = `${modified}:${params.wellNumber}:${params.dataType || 'all'}:${level.name}`;
+  let series = cacheService.getResolutionLevel(databaseId, key) as AggregatedSeries | undefined;
+  if (!series) {
+    series = await sqliteService.getAggregatedLevel(params.wellNumber, params.dataType, level);
+    cacheService.setResolutionLevel(databaseId, key, series);
+  }
+  return series;
+};
+
+// Time-bucketed series of the requested range at the finest resolution within maxPoints
+const getAggregatedSeries = async (
+  sqliteService: SQLiteService,
+  databaseId: string,
+  modified: string,
+  params: DataQueryParams
+): Promise<AggregatedSeries> => {
+  const { wellNumber, dataType = 'all', maxPoints = 2000, resolution = 'auto' } = params;
+
+  const range = await sqliteService.getJulianRange(wellNumber, dataType, params.startDate, params.endDate);
+  if (!range) {
+    return emptySeries('raw', 0);
+  }
+
+  const requested = resolution === 'auto' ? chooseResolution(range.end - range.start, maxPoints) : resolution;
+  if (requested === 'raw') {
+    const raw = await sqliteService.getRawSeries(wellNumber, dataType, range.start, range.end, maxPoints);
+    if (raw) {
+      return raw;
+    }
+  }
+
+  // Step to coarser levels while the range holds more buckets than allowed
+  const startMs = julianToMs(range.start);
+  const endMs = julianToMs(range.end);
+  let series = emptySeries(requested, 0);
+  for (const level of coarserResolutions(requested)) {
+    series = sliceSeries(await getLevelSeries(sqliteService, databaseId, modified, params, level), startMs, endMs);
+    if (series.t.length <= maxPoints) {
+      break;
+    }
+  }
+  return series;
+};
+
+const sendWaterLevelData = (req: Request, res: Response, entry: CachedWaterLevelData, params: DataQueryParams): any => {
+  res.set('ETag', entry.etag);
+  res.set('Cache-Control', DATA_CACHE_CONTROL);
+  if (req.fresh) {
+    return res.status(304).end();
+  }
+
+  const format = params.format || 'rows';
+  const metadata = {
+    wellNumber: params.wellNumber,
+    dataType: params.dataType || 'all',
+    downsample: params.downsample || false,
+    dateRange: {
+      start: params.startDate,
+      end: params.endDate
+    }
+  };
+
+  if (format === 'binary') {
+    return res.type('application/octet-stream').send(encodeSeries(entry.data as AggregatedSeries));
+  }
+
+  if (format === 'columnar') {
+    const series = entry.data as AggregatedSeries;
+    return res.json({
+      success: true,
+      data: series,
+      metadata: { ...metadata, resolution: series.resolution, totalPoints: series.t.length }
+    } as ApiResponse<AggregatedSeries>);
+  }
+
+  const readings = entry.data as WaterLevelReading[];
+  return res.json({
+    success: true,
+    data: readings,
+    metadata: { ...metadata, totalPoints: readings.length }
+  } as ApiResponse<WaterLevelReading[]>);
+};
 
 export const getWaterLevelData = async (req: Request, res: Response): Promise<any> => {
+  const sqliteService = new SQLiteService();
   try {
     const { id } = req.params;
     const params = req.validatedQuery as DataQueryParams;
@@ -16,12 +118,9 @@ export const getWaterLevelData = async (req: Request, res: Response): Promise<an
     const cacheKey = CacheService.generateParamsKey(params);
     
     // Check cache first
-    const cachedData = cacheService.getWaterLevelData(id, cacheKey);
+    const cachedData = cacheService.getWaterLevelData(id, cacheKey) as CachedWaterLevelData | undefined;
     if (cachedData) {
-      return res.json({
-        success: true,
-        data: cachedData
-      } as ApiResponse<WaterLevelReading[]>);
+      return sendWaterLevelData(req, res, cachedData, params);
     }
 
     // Get database list to find the database
@@ -35,32 +134,31 @@ export const getWaterLevelData = async (req: Request, res: Response): Promise<an
       } as ApiResponse);
     }
 
-    // Download and open database
-    const filePath = await googleDriveService.downloadDatabase(id, database.name);
+    // The response only changes with the database file, so a client holding
+    // this version gets a 304 before the database is downloaded or opened
+    const etag = CacheService.generateETag(id, database.modified, cacheKey);
+    res.set('ETag', etag);
+    if (req.fresh) {
+      res.set('Cache-Control', DATA_CACHE_CONTROL);
+      return res.status(304).end();
+    }
+
+    // Only this well's rows are needed
+    const filePath = await googleDriveService.downloadWellDatabase(id, database.name, params.wellNumber, database);
     await sqliteService.openDatabase(filePath);
     
     // Get water level data
-    const waterLevelData = await sqliteService.getWaterLevelData(params);
+    const data = (params.format || 'rows') === 'rows'
+      ? await sqliteService.getWaterLevelData(params)
+      : await getAggregatedSeries(sqliteService, id, database.modified, params);
 
     // Cache the result (shorter TTL for data queries)
-    cacheService.setWaterLevelData(id, cacheKey, waterLevelData);
+    const entry: CachedWaterLevelData = { etag, data };
+    cacheService.setWaterLevelData(id, cacheKey, entry);
 
     sqliteService.closeDatabase();
 
-    res.json({
-      success: true,
-      data: waterLevelData,
-      metadata: {
-        wellNumber: params.wellNumber,
-        dataType: params.dataType || 'all',
-        totalPoints: waterLevelData.length,
-        downsample: params.downsample || false,
-        dateRange: {
-          start: params.startDate,
-          end: params.endDate
-        }
-      }
-    } as ApiResponse<WaterLevelReading[]>);
+    return sendWaterLevelData(req, res, entry, params);
 
   } catch (error) {
     console.error('Failed to get water level data:', error);
@@ -74,6 +172,7 @@ export const getWaterLevelData = async (req: Request, res: Response): Promise<an
 };
 
 export const getRechargeResults = async (req: Request, res: Response): Promise<any> => {
+  const sqliteService = new SQLiteService();
   try {
     const { id, wellNumber } = req.params;
 
@@ -97,8 +196,8 @@ export const getRechargeResults = async (req: Request, res: Response): Promise<a
       } as ApiResponse);
     }
 
-    // Download and open database
-    const filePath = await googleDriveService.downloadDatabase(id, database.name);
+    // Only this well's rows are needed
+    const filePath = await googleDriveService.downloadWellDatabase(id, database.name, wellNumber, database);
     await sqliteService.openDatabase(filePath);
     
     // Get recharge results
@@ -131,6 +230,7 @@ export const getRechargeResults = async (req: Request, res: Response): Promise<a
 };
 
 export const getDataSummary = async (req: Request, res: Response): Promise<any> => {
+  const sqliteService = new SQLiteService();
   try {
     const { id, wellNumber } = req.params;
 
@@ -155,8 +255,8 @@ export const getDataSummary = async (req: Request, res: Response): Promise<any>
       } as ApiResponse);
     }
 
-    // Download and open database
-    const filePath = await googleDriveService.downloadDatabase(id, database.name);
+    // Only this well's rows are needed
+    const filePath = await googleDriveService.downloadWellDatabase(id, database.name, wellNumber, database);
     await sqliteService.openDatabase(filePath);
     
     // Get well info
@@ -5,7 +5,6 @@ import { cacheService, CacheService } from '@/services/cache';
 import { ApiResponse, DatabaseInfo } from '@/types/api';
 
 const googleDriveService = new GoogleDriveService();
-const sqliteService = new SQLiteService();
 
 export const listDatabases = async (req: Request, res: Response): Promise<any> => {
   try {
@@ -56,6 +55,7 @@ export const listDatabases = async (req: Request, res: Response): Promise<any> =
 };
 
 export const getDatabaseInfo = async (req: Request, res: Response): Promise<any> => {
+  const sqliteService = new SQLiteService();
   try {
     const { id } = req.params;
 
@@ -80,7 +80,7 @@ export const getDatabaseInfo = async (req: Request, res: Response): Promise<any>
     }
 
     // Download and analyze database
-    const filePath = await googleDriveService.downloadDatabase(id, database.name);
+    const filePath = await googleDriveService.downloadDatabase(id, database.name, database);
     await sqliteService.openDatabase(filePath);
     
     const stats = await sqliteService.getDatabaseStats();
@@ -5,9 +5,9 @@ import { cacheService, CacheService } from '@/services/cache';
 import { ApiResponse, PaginatedResponse, Well, WellsQueryParams } from '@/types/api';
 
 const googleDriveService = new GoogleDriveService();
-const sqliteService = new SQLiteService();
 
 export const getWells = async (req: Request, res: Response): Promise<any> => {
+  const sqliteService = new SQLiteService();
   try {
     const { id } = req.params;
     const params = req.validatedQuery as WellsQueryParams;
@@ -33,7 +33,7 @@ export const getWells = async (req: Request, res: Response): Promise<any> => {
     }
 
     // Download and open database
-    const filePath = await googleDriveService.downloadDatabase(id, database.name);
+    const filePath = await googleDriveService.downloadDatabase(id, database.name, database);
     await sqliteService.openDatabase(filePath);
     
     // Get wells with pagination
@@ -58,6 +58,7 @@ export const getWells = async (req: Request, res: Response): Promise<any> => {
 };
 
 export const getWell = async (req: Request, res: Response): Promise<any> => {
+  const sqliteService = new SQLiteService();
   try {
     const { id, wellNumber } = req.params;
 
@@ -83,7 +84,7 @@ export const getWell = async (req: Request, res: Response): Promise<any> => {
     }
 
     // Download and open database
-    const filePath = await googleDriveService.downloadDatabase(id, database.name);
+    const filePath = await googleDriveService.downloadDatabase(id, database.name, database);
     await sqliteService.openDatabase(filePath);
     
     // Get specific well
@@ -119,6 +120,7 @@ export const getWell = async (req: Request, res: Response): Promise<any> => {
 };
 
 export const getWellFields = async (req: Request, res: Response): Promise<any> => {
+  const sqliteService = new SQLiteService();
   try {
     const { id } = req.params;
 
@@ -144,7 +146,7 @@ export const getWellFields = async (req: Request, res: Response): Promise<any> =
     }
 
     // Download and open database
-    const filePath = await googleDriveService.downloadDatabase(id, database.name);
+    const filePath = await googleDriveService.downloadDatabase(id, database.name, database);
     await sqliteService.openDatabase(filePath);
     
     // Get well fields
@@ -1,5 +1,6 @@
 import { Request, Response, NextFunction } from 'express';
-import { WellsQueryParams, DataQueryParams } from '@/types/api';
+import { WellsQueryParams, DataQueryParams, DataFormat } from '@/types/api';
+import { RESOLUTION_LEVELS } from '@/services/aggregation';
 
 // Validation middleware for query parameters
 export const validateWellsQuery = (req: Request, res: Response, next: NextFunction): any => {
@@ -129,6 +130,30 @@ export const validateDataQuery = (req: Request, res: Response, next: NextFunctio
     params.maxPoints = Math.min(maxPoints, 10000); // Maximum of 10,000 points
   }
 
+  // Format parameter
+  if (query.format && typeof query.format === 'string') {
+    const allowedFormats = ['rows', 'columnar', 'binary'];
+    if (!allowedFormats.includes(query.format)) {
+      return res.status(400).json({
+        success: false,
+        error: `Format must be one of: ${allowedFormats.join(', ')}`
+      });
+    }
+    params.format = query.format as DataFormat;
+  }
+
+  // Resolution parameter (aggregated formats only)
+  if (query.resolution && typeof query.resolution === 'string') {
+    const allowedResolutions = ['auto', 'raw', ...RESOLUTION_LEVELS.map(level => level.name)];
+    if (!allowedResolutions.includes(query.resolution)) {
+      return res.status(400).json({
+        success: false,
+        error: `Resolution must be one of: ${allowedResolutions.join(', ')}`
+      });
+    }
+    params.resolution = query.resolution as DataQueryParams['resolution'];
+  }
+
   req.validatedQuery = params;
   next();
 };
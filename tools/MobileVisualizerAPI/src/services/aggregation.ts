@@ -0,0 +1,119 @@
+import { AggregatedSeries, ResolutionName } from '@/types/api';
+
+// Julian day of the Unix epoch and milliseconds per day
+const UNIX_EPOCH_JULIAN = 2440587.5;
+const MS_PER_DAY = 24 * 60 * 60 * 1000;
+
+// Readings are logged every 15 minutes; used to estimate raw point counts
+export const RAW_INTERVAL_DAYS = 15 / (24 * 60);
+
+export interface ResolutionLevel {
+  name: Exclude<ResolutionName, 'raw'>;
+  days: number;
+}
+
+// Precomputed aggregate levels, from finest to coarsest
+export const RESOLUTION_LEVELS: ResolutionLevel[] = [
+  { name: '1hour', days: 1 / 24 },
+  { name: '6hour', days: 6 / 24 },
+  { name: 'daily', days: 1 },
+  { name: 'weekly', days: 7 },
+  { name: 'monthly', days: 30 }
+];
+
+// Binary series layout (little-endian): magic, uint32 point count, float64
+// bucket seconds, then the t/min/max/mean columns as float64 and the count
+// column as uint32
+export const BINARY_MAGIC = 'WLA1';
+const BINARY_HEADER_BYTES = 16;
+
+export const julianToMs = (julian: number): number => (julian - UNIX_EPOCH_JULIAN) * MS_PER_DAY;
+
+export const getResolutionLevel = (name: string): ResolutionLevel | undefined =>
+  RESOLUTION_LEVELS.find(level => level.name === name);
+
+/**
+ * Pick the finest resolution that keeps a time span under maxPoints.
+ * Returns 'raw' when the readings themselves are expected to fit.
+ */
+export function chooseResolution(spanDays: number, maxPoints: number): ResolutionName {
+  if (spanDays / RAW_INTERVAL_DAYS <= maxPoints) {
+    return 'raw';
+  }
+  const level = RESOLUTION_LEVELS.find(candidate => spanDays / candidate.days <= maxPoints);
+  return (level || RESOLUTION_LEVELS[RESOLUTION_LEVELS.length - 1]).name;
+}
+
+/**
+ * Coarser levels than the given one, for falling back when a span holds
+ * more points than expected
+ */
+export function coarserResolutions(resolution: ResolutionName): ResolutionLevel[] {
+  if (resolution === 'raw') {
+    return RESOLUTION_LEVELS;
+  }
+  return RESOLUTION_LEVELS.slice(RESOLUTION_LEVELS.findIndex(level => level.name === resolution));
+}
+
+export function emptySeries(resolution: ResolutionName, bucketSeconds: number): AggregatedSeries {
+  return { resolution, bucketSeconds, t: [], min: [], max: [], mean: [], count: [] };
+}
+
+// First index whose value is >= target (values sorted ascending)
+function lowerBound(values: number[], target: number): number {
+  let lo = 0;
+  let hi = values.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (values[mid] < target) {
+      lo = mid + 1;
+    } else {
+      hi = mid;
+    }
+  }
+  return lo;
+}
+
+/**
+ * Buckets of a whole-history level that overlap [startMs, endMs]
+ */
+export function sliceSeries(series: AggregatedSeries, startMs?: number, endMs?: number): AggregatedSeries {
+  const bucketMs = series.bucketSeconds * 1000;
+  const from = startMs === undefined ? 0 : lowerBound(series.t, bucketMs > 0 ? startMs - bucketMs + 1 : startMs);
+  const to = endMs === undefined ? series.t.length : lowerBound(series.t, endMs + 1);
+  if (from === 0 && to === series.t.length) {
+    return series;
+  }
+  return {
+    ...series,
+    t: series.t.slice(from, to),
+    min: series.min.slice(from, to),
+    max: series.max.slice(from, to),
+    mean: series.mean.slice(from, to),
+    count: series.count.slice(from, to)
+  };
+}
+
+/**
+ * Encode a series in the compact binary layout (see BINARY_MAGIC)
+ */
+export function encodeSeries(series: AggregatedSeries): Buffer {
+  const n = series.t.length;
+  const buffer = Buffer.alloc(BINARY_HEADER_BYTES + n * (4 * 8 + 4));
+  buffer.write(BINARY_MAGIC, 0, 'ascii');
+  buffer.writeUInt32LE(n, 4);
+  buffer.writeDoubleLE(series.bucketSeconds, 8);
+
+  let offset = BINARY_HEADER_BYTES;
+  for (const column of [series.t, series.min, series.max, series.mean]) {
+    for (let i = 0; i < n; i++) {
+      buffer.writeDoubleLE(column[i] ?? NaN, offset);
+      offset += 8;
+    }
+  }
+  for (let i = 0; i < n; i++) {
+    buffer.writeUInt32LE(series.count[i], offset);
+    offset += 4;
+  }
+  return buffer;
+}
@@ -1,4 +1,5 @@
 import NodeCache from 'node-cache';
+import { createHash } from 'crypto';
 import { CacheEntry } from '@/types/api';
 
 export class CacheService {
@@ -67,6 +68,17 @@ export class CacheService {
     return this.get(key);
   }
 
+  // Whole-history aggregates of a well at one resolution level
+  setResolutionLevel(databaseId: string, key: string, data: any): boolean {
+    const cacheKey = `levels:${databaseId}:${key}`;
+    return this.set(cacheKey, data, 30 * 60); // 30 minutes TTL
+  }
+
+  getResolutionLevel(databaseId: string, key: string): any {
+    const cacheKey = `levels:${databaseId}:${key}`;
+    return this.get(cacheKey);
+  }
+
   setRechargeResults(databaseId: string, wellNumber: string, data: any): boolean {
     const key = `recharge:${databaseId}:${wellNumber}`;
     return this.set(key, data, 30 * 60); // 30 minutes TTL
@@ -101,6 +113,12 @@ export class CacheService {
   static generateParamsKey(params: Record<string, any>): string {
     return JSON.stringify(params, Object.keys(params).sort());
   }
+
+  // Strong ETag for a response derived from the given parts
+  static generateETag(...parts: (string | number | undefined)[]): string {
+    const hash = createHash('sha1').update(parts.map(part => part ?? '').join('|')).digest('base64url');
+    return `"${hash}"`;
+  }
 }
 
 // Singleton instance
@@ -1,17 +1,49 @@
 import { google } from 'googleapis';
 import fs from 'fs';
 import path from 'path';
-import { Readable } from 'stream';
+import { createHash, randomUUID } from 'crypto';
 import { GoogleDriveFile, DatabaseInfo, DatabaseCache } from '@/types/api';
+import { SQLiteService } from '@/services/sqlite';
+import { sqlitePool } from '@/services/sqlitePool';
+
+// Version of a Drive file, from the file list or a metadata request
+export interface RemoteFileInfo {
+  modified: string;
+  size: number;
+  md5Checksum?: string;
+}
+
+const MAX_DOWNLOAD_ATTEMPTS = 3;
+// A download lock whose holder stopped refreshing it for this long is taken over
+const DOWNLOAD_LOCK_STALE_MS = 60 * 1000;
+const DOWNLOAD_LOCK_POLL_MS = 250;
+
+// Downloads and well extracts in progress in this process, by file and version,
+// shared by every service instance so concurrent requests wait for one download
+const inFlight: Map<string, Promise<string>> = new Map();
+
+const shareInFlight = (key: string, start: () => Promise<string>): Promise<string> => {
+  let pending = inFlight.get(key);
+  if (!pending) {
+    pending = start().finally(() => inFlight.delete(key));
+    inFlight.set(key, pending);
+  }
+  return pending;
+};
 
 export class GoogleDriveService {
   private drive: any;
   private authenticated = false;
-  private readonly tempDir = process.env.DATABASE_TEMP_DIR || path.join(__dirname, '../../temp');
-  private readonly cacheFile = path.join(__dirname, '../../cache.json');
+  // Downloaded databases, well slices and their cache entries; point it at a
+  // persistent volume to share them between instances
+  private readonly tempDir = process.env.DATABASE_CACHE_DIR || process.env.DATABASE_TEMP_DIR || path.join(__dirname, '../../temp');
   private cache: Map<string, DatabaseCache> = new Map();
 
-  constructor() {
+  constructor(drive?: any) {
+    if (drive) {
+      this.drive = drive;
+      this.authenticated = true;
+    }
     this.ensureTempDir();
     this.loadCache();
   }
@@ -20,6 +52,15 @@ export class GoogleDriveService {
     if (this.authenticated) return;
 
     try {
+      const rootUrl = process.env.GOOGLE_DRIVE_ROOT_URL;
+      if (rootUrl) {
+        // Local fake or emulator of the Drive API, no credentials needed
+        this.drive = google.drive({ version: 'v3', rootUrl });
+        this.authenticated = true;
+        console.log(`Using Google Drive API at ${rootUrl}`);
+        return;
+      }
+
       // Use service account credentials from environment
       const credentials = {
         type: 'service_account',
@@ -42,7 +83,7 @@ export class GoogleDriveService {
 
       this.drive = google.drive({ version: 'v3', auth });
       this.authenticated = true;
-      
+
       console.log('Google Drive authentication successful');
     } catch (error) {
       console.error('Google Drive authentication failed:', error);
@@ -56,28 +97,29 @@ export class GoogleDriveService {
     try {
       const response = await this.drive.files.list({
         q: "mimeType='application/vnd.sqlite3' or mimeType='application/x-sqlite3' or name contains '.db'",
-        fields: 'files(id, name, size, modifiedTime, mimeType)',
+        fields: 'files(id, name, size, modifiedTime, mimeType, md5Checksum)',
         pageSize: 100
       });
 
       const files = response.data.files || [];
-      
+
       const databases: DatabaseInfo[] = await Promise.all(
         files.map(async (file: GoogleDriveFile) => {
           const wellsCount = await this.getWellsCountFromCache(file.id);
-          
+
           return {
             id: file.id,
             name: file.name,
             size: parseInt(file.size || '0'),
             modified: file.modifiedTime,
+            md5Checksum: file.md5Checksum,
             wellsCount,
             mimeType: file.mimeType
           };
         })
       );
 
-      return databases.sort((a, b) => 
+      return databases.sort((a, b) =>
         new Date(b.modified).getTime() - new Date(a.modified).getTime()
       );
     } catch (error) {
@@ -86,78 +128,282 @@ export class GoogleDriveService {
     }
   }
 
-  async downloadDatabase(fileId: string, fileName: string): Promise<string> {
+  /**
+   * Local copy of a database, downloaded only when the Drive version differs
+   * from the cached one. Pass the version from the file list to skip the
+   * metadata request.
+   *
+   * Downloads go to a .partial file that survives failures, so an
+   * interrupted download (in this or an earlier instance) resumes with a
+   * range request. The file is checked against Drive's size and MD5 before
+   * it replaces the cached copy. Concurrent requests in this process share
+   * one download, and instances sharing the cache directory take turns
+   * through a lock file.
+   */
+  async downloadDatabase(fileId: string, fileName: string, remote?: RemoteFileInfo): Promise<string> {
     await this.authenticate();
 
-    const filePath = path.join(this.tempDir, `${fileId}.db`);
-    const cacheEntry = this.cache.get(fileId);
+    const version = await this.getVersion(fileId, fileName, remote);
+    const cached = this.getCachedFile(fileId, version.modified);
+    if (cached) {
+      console.log(`Using cached database: ${fileName}`);
+      return cached.filePath;
+    }
 
-    // Check if we have a cached version
-    if (cacheEntry && fs.existsSync(cacheEntry.filePath)) {
-      // Verify file hasn't changed on Google Drive
-      try {
-        const fileInfo = await this.drive.files.get({
-          fileId,
-          fields: 'modifiedTime, size'
-        });
-
-        if (fileInfo.data.modifiedTime === cacheEntry.lastModified) {
-          console.log(`Using cached database: ${fileName}`);
-          return cacheEntry.filePath;
-        }
-      } catch (error) {
-        console.warn('Failed to check file modification time:', error);
-      }
+    return shareInFlight(`${fileId}:${version.modified}`, () => this.fetchDatabase(fileId, fileName, version));
+  }
+
+  private async fetchDatabase(fileId: string, fileName: string, version: RemoteFileInfo): Promise<string> {
+    const filePath = path.join(this.tempDir, `${fileId}.db`);
+    const lockPath = `${filePath}.lock`;
+    try {
+      await this.acquireDownloadLock(lockPath);
+    } catch (error) {
+      console.error(`Failed to lock download of ${fileName}:`, error);
+      throw new Error(`Failed to download database: ${fileName}`);
     }
+    const refresh = setInterval(() => this.touchFile(lockPath), DOWNLOAD_LOCK_STALE_MS / 4);
 
     try {
-      console.log(`Downloading database: ${fileName}`);
-      
-      const response = await this.drive.files.get({
-        fileId,
-        alt: 'media'
-      }, { responseType: 'stream' });
-
-      const writeStream = fs.createWriteStream(filePath);
-      
-      await new Promise((resolve, reject) => {
-        response.data
-          .on('end', resolve)
-          .on('error', reject)
-          .pipe(writeStream);
-      });
+      // Another instance may have downloaded it while this one waited
+      const cached = this.getCachedFile(fileId, version.modified);
+      if (cached) {
+        return cached.filePath;
+      }
 
-      // Get file info for caching
-      const fileInfo = await this.drive.files.get({
-        fileId,
-        fields: 'modifiedTime, size'
-      });
+      console.log(`Downloading database: ${fileName}`);
+      await this.downloadFile(fileId, filePath, version);
 
-      // Update cache
-      const cacheInfo: DatabaseCache = {
+      this.setCachedFile(fileId, {
         filePath,
-        fileSize: parseInt(fileInfo.data.size || '0'),
-        lastModified: fileInfo.data.modifiedTime,
+        fileSize: version.size,
+        lastModified: version.modified,
+        md5Checksum: version.md5Checksum,
         downloadedAt: Date.now()
-      };
-
-      this.cache.set(fileId, cacheInfo);
-      this.saveCache();
+      });
 
       console.log(`Database downloaded successfully: ${fileName}`);
       return filePath;
     } catch (error) {
       console.error(`Failed to download database ${fileName}:`, error);
-      
-      // Clean up partial file
-      if (fs.existsSync(filePath)) {
-        fs.unlinkSync(filePath);
+      throw new Error(`Failed to download database: ${fileName}`);
+    } finally {
+      clearInterval(refresh);
+      this.removeFile(lockPath);
+    }
+  }
+
+  /**
+   * Database holding only one well's rows, for the per-well endpoints.
+   *
+   * Slices are cut from the full database and cached on disk for its Drive
+   * version, so once a slice exists the full database is not needed again
+   * for that well until the file changes on Drive.
+   */
+  async downloadWellDatabase(fileId: string, fileName: string, wellNumber: string, remote?: RemoteFileInfo): Promise<string> {
+    await this.authenticate();
+
+    const key = `${fileId}.well-${createHash('sha1').update(wellNumber).digest('hex').slice(0, 16)}`;
+    let version: RemoteFileInfo;
+    try {
+      version = await this.getVersion(fileId, fileName, remote);
+    } catch (error) {
+      // Drive cannot be reached and the full database is not cached
+      const cached = this.getCachedFile(key);
+      if (cached) {
+        console.warn(`Failed to check ${fileName} on Google Drive, using cached extract of well ${wellNumber}`);
+        return cached.filePath;
+      }
+      throw error;
+    }
+
+    const cached = this.getCachedFile(key, version.modified);
+    if (cached) {
+      return cached.filePath;
+    }
+
+    return shareInFlight(`${key}:${version.modified}`,
+      () => this.extractWell(fileId, fileName, wellNumber, key, version));
+  }
+
+  private async extractWell(fileId: string, fileName: string, wellNumber: string, key: string,
+                            version: RemoteFileInfo): Promise<string> {
+    const sourcePath = await this.downloadDatabase(fileId, fileName, version);
+    const slicePath = path.join(this.tempDir, `${key}.db`);
+    // Unique, as instances in separate containers may share a pid
+    const tmpPath = `${slicePath}.${randomUUID()}.tmp`;
+
+    try {
+      await SQLiteService.createWellSlice(sourcePath, tmpPath, wellNumber);
+      fs.renameSync(tmpPath, slicePath);
+    } catch (error) {
+      if (fs.existsSync(tmpPath)) {
+        fs.unlinkSync(tmpPath);
+      }
+      console.error(`Failed to extract well ${wellNumber} from ${fileName}:`, error);
+      throw new Error(`Failed to prepare data for well ${wellNumber}`);
+    }
+
+    this.setCachedFile(key, {
+      filePath: slicePath,
+      fileSize: fs.statSync(slicePath).size,
+      lastModified: version.modified,
+      downloadedAt: Date.now()
+    });
+    console.log(`Extracted well ${wellNumber} from ${fileName}`);
+    return slicePath;
+  }
+
+  // Drive version of a file, or the cached copy's version while Drive cannot be reached
+  private async getVersion(fileId: string, fileName: string, remote?: RemoteFileInfo): Promise<RemoteFileInfo> {
+    if (remote) {
+      return remote;
+    }
+    try {
+      return await this.getRemoteInfo(fileId);
+    } catch (error) {
+      const cached = this.getCachedFile(fileId);
+      if (cached) {
+        console.warn(`Failed to check ${fileName} on Google Drive, using cached copy:`, error);
+        return { modified: cached.lastModified, size: cached.fileSize, md5Checksum: cached.md5Checksum };
       }
-      
       throw new Error(`Failed to download database: ${fileName}`);
     }
   }
 
+  private async getRemoteInfo(fileId: string): Promise<RemoteFileInfo> {
+    const fileInfo = await this.drive.files.get({
+      fileId,
+      fields: 'modifiedTime, size, md5Checksum'
+    });
+
+    return {
+      modified: fileInfo.data.modifiedTime,
+      size: parseInt(fileInfo.data.size || '0'),
+      md5Checksum: fileInfo.data.md5Checksum
+    };
+  }
+
+  // Download into filePath, resuming a matching partial download
+  private async downloadFile(fileId: string, filePath: string, version: RemoteFileInfo): Promise<void> {
+    const partialPath = `${filePath}.partial`;
+    const partialInfoPath = `${partialPath}.json`;
+
+    // A partial download of another version cannot be resumed
+    const partialInfo = this.readJson(partialInfoPath);
+    if (!partialInfo || partialInfo.modified !== version.modified || partialInfo.md5Checksum !== version.md5Checksum) {
+      this.removeFile(partialPath);
+      this.writeJson(partialInfoPath, version);
+    }
+
+    const downloaded = () => fs.existsSync(partialPath) ? fs.statSync(partialPath).size : 0;
+    for (let attempt = 1; ; attempt++) {
+      try {
+        const offset = downloaded();
+        if (!version.size || offset < version.size) {
+          await this.downloadRange(fileId, partialPath, offset);
+        }
+        break;
+      } catch (error) {
+        if (attempt >= MAX_DOWNLOAD_ATTEMPTS) {
+          throw error;
+        }
+        console.warn(`Download of ${fileId} interrupted at ${downloaded()} bytes, resuming (attempt ${attempt + 1}):`, error);
+      }
+    }
+
+    try {
+      await this.verifyFile(partialPath, version);
+    } catch (error) {
+      // Corrupt data must not be resumed from
+      this.removeFile(partialPath);
+      this.removeFile(partialInfoPath);
+      throw error;
+    }
+
+    fs.renameSync(partialPath, filePath);
+    this.removeFile(partialInfoPath);
+  }
+
+  // Append the file content from offset to partialPath
+  private async downloadRange(fileId: string, partialPath: string, offset: number): Promise<void> {
+    const response = await this.drive.files.get({
+      fileId,
+      alt: 'media'
+    }, {
+      responseType: 'stream',
+      headers: offset > 0 ? { Range: `bytes=${offset}-` } : {}
+    });
+
+    // A server that ignores the range sends the whole file again
+    const append = offset > 0 && response.status === 206;
+    const writeStream = fs.createWriteStream(partialPath, { flags: append ? 'a' : 'w' });
+
+    await new Promise<void>((resolve, reject) => {
+      response.data
+        .on('error', (error: Error) => {
+          // Keep what arrived, to resume from
+          writeStream.end(() => reject(error));
+        })
+        .pipe(writeStream)
+        .on('finish', resolve)
+        .on('error', reject);
+    });
+  }
+
+  // Create the lock file, waiting while another instance holds it
+  private async acquireDownloadLock(lockPath: string): Promise<void> {
+    for (;;) {
+      try {
+        fs.writeFileSync(lockPath, String(process.pid), { flag: 'wx' });
+        return;
+      } catch (error) {
+        if ((error as NodeJS.ErrnoException).code !== 'EEXIST') {
+          throw error;
+        }
+      }
+      try {
+        if (Date.now() - fs.statSync(lockPath).mtimeMs > DOWNLOAD_LOCK_STALE_MS) {
+          console.warn(`Taking over stale download lock ${lockPath}`);
+          this.removeFile(lockPath);
+          continue;
+        }
+      } catch {
+        continue; // Released meanwhile
+      }
+      await new Promise(resolve => setTimeout(resolve, DOWNLOAD_LOCK_POLL_MS));
+    }
+  }
+
+  private touchFile(filePath: string): void {
+    try {
+      const now = new Date();
+      fs.utimesSync(filePath, now, now);
+    } catch (error) {
+      console.warn(`Failed to refresh ${filePath}:`, error);
+    }
+  }
+
+  private async verifyFile(filePath: string, version: RemoteFileInfo): Promise<void> {
+    const size = fs.statSync(filePath).size;
+    if (version.size && size !== version.size) {
+      throw new Error(`Downloaded ${size} bytes, expected ${version.size}`);
+    }
+
+    if (version.md5Checksum) {
+      const md5 = await new Promise<string>((resolve, reject) => {
+        const hash = createHash('md5');
+        fs.createReadStream(filePath)
+          .on('data', chunk => hash.update(chunk))
+          .on('end', () => resolve(hash.digest('hex')))
+          .on('error', reject);
+      });
+      if (md5 !== version.md5Checksum) {
+        throw new Error(`Checksum mismatch: ${md5}, expected ${version.md5Checksum}`);
+      }
+    }
+  }
+
   private async getWellsCountFromCache(fileId: string): Promise<number | undefined> {
     // This would be populated after the first time a database is processed
     // For now, return undefined and let the SQLite service count wells
@@ -170,11 +416,40 @@ export class GoogleDriveService {
     }
   }
 
+  // Cached copy of a file, of the given version if one is given
+  private getCachedFile(key: string, modified?: string): DatabaseCache | undefined {
+    // Another instance sharing the cache directory may have stored it
+    const entry = this.cache.get(key) || this.readJson(this.cacheEntryPath(key));
+    if (!entry || (modified !== undefined && entry.lastModified !== modified)) {
+      return undefined;
+    }
+    if (!fs.existsSync(entry.filePath) || fs.statSync(entry.filePath).size !== entry.fileSize) {
+      return undefined;
+    }
+    this.cache.set(key, entry);
+    return entry;
+  }
+
+  private setCachedFile(key: string, entry: DatabaseCache): void {
+    this.cache.set(key, entry);
+    this.writeJson(this.cacheEntryPath(key), entry);
+  }
+
+  // One entry file per cached file, so instances sharing the directory never
+  // overwrite each other's entries
+  private cacheEntryPath(key: string): string {
+    return path.join(this.tempDir, `${key}.cache.json`);
+  }
+
   private loadCache(): void {
     try {
-      if (fs.existsSync(this.cacheFile)) {
-        const cacheData = JSON.parse(fs.readFileSync(this.cacheFile, 'utf8'));
-        this.cache = new Map(Object.entries(cacheData));
+      for (const name of fs.readdirSync(this.tempDir)) {
+        if (name.endsWith('.cache.json')) {
+          const entry = this.readJson(path.join(this.tempDir, name));
+          if (entry) {
+            this.cache.set(name.slice(0, -'.cache.json'.length), entry);
+          }
+        }
       }
     } catch (error) {
       console.warn('Failed to load cache:', error);
@@ -182,12 +457,28 @@ export class GoogleDriveService {
     }
   }
 
-  private saveCache(): void {
+  private readJson(filePath: string): any {
     try {
-      const cacheData = Object.fromEntries(this.cache.entries());
-      fs.writeFileSync(this.cacheFile, JSON.stringify(cacheData, null, 2));
+      return fs.existsSync(filePath) ? JSON.parse(fs.readFileSync(filePath, 'utf8')) : undefined;
     } catch (error) {
-      console.warn('Failed to save cache:', error);
+      console.warn(`Ignoring unreadable cache file ${filePath}:`, error);
+      return undefined;
+    }
+  }
+
+  private writeJson(filePath: string, data: any): void {
+    try {
+      const tmpPath = `${filePath}.${randomUUID()}.tmp`;
+      fs.writeFileSync(tmpPath, JSON.stringify(data, null, 2));
+      fs.renameSync(tmpPath, filePath);
+    } catch (error) {
+      console.warn(`Failed to save cache file ${filePath}:`, error);
+    }
+  }
+
+  private removeFile(filePath: string): void {
+    if (fs.existsSync(filePath)) {
+      fs.unlinkSync(filePath);
     }
   }
 
@@ -196,19 +487,17 @@ export class GoogleDriveService {
     const maxAge = 24 * 60 * 60 * 1000; // 24 hours
     const now = Date.now();
 
-    for (const [fileId, cacheEntry] of this.cache.entries()) {
+    for (const [key, cacheEntry] of this.cache.entries()) {
       if (now - cacheEntry.downloadedAt > maxAge) {
         try {
-          if (fs.existsSync(cacheEntry.filePath)) {
-            fs.unlinkSync(cacheEntry.filePath);
-          }
-          this.cache.delete(fileId);
+          sqlitePool.invalidate(cacheEntry.filePath);
+          this.removeFile(cacheEntry.filePath);
+          this.removeFile(this.cacheEntryPath(key));
+          this.cache.delete(key);
         } catch (error) {
           console.warn(`Failed to clean up cached file: ${cacheEntry.filePath}`, error);
         }
       }
     }
-
-    this.saveCache();
   }
-}
\ No newline at end of file
+}
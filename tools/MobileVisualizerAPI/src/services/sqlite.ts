@@ -1,81 +1,49 @@
 import sqlite3 from 'sqlite3';
 import { promisify } from 'util';
-import { Well, WaterLevelReading, RechargeResult, WellsQueryParams, DataQueryParams, PaginatedResponse } from '@/types/api';
-
+import {
+  Well, WaterLevelReading, RechargeResult, WellsQueryParams, DataQueryParams, PaginatedResponse, AggregatedSeries
+} from '@/types/api';
+import { ResolutionLevel, emptySeries, julianToMs } from '@/services/aggregation';
+import { sqlitePool, SQLiteLease } from '@/services/sqlitePool';
+
+// Queries one database per request, on a connection borrowed from the shared
+// pool; create one instance per request
 export class SQLiteService {
   private db: sqlite3.Database | null = null;
+  private lease: SQLiteLease | null = null;
   private currentFilePath: string | null = null;
 
   async openDatabase(filePath: string): Promise<void> {
-    return new Promise((resolve, reject) => {
-      // Close existing connection if any
-      this.closeDatabase();
+    // Release existing connection if any
+    this.closeDatabase();
 
-      // Open database in read-only mode
-      this.db = new sqlite3.Database(filePath, sqlite3.OPEN_READONLY, async (err) => {
-        if (err) {
-          reject(new Error(`Failed to open database: ${err.message}`));
-          return;
-        }
-
-        this.currentFilePath = filePath;
-        
-        try {
-          // Verify database structure
-          await this.verifyDatabaseStructure();
-          console.log(`Database opened successfully: ${filePath}`);
-          resolve();
-        } catch (error) {
-          reject(error);
-        }
-      });
-    });
+    // The structure is verified once, when the pool opens the connection
+    this.lease = await sqlitePool.acquire(filePath, lease => SQLiteService.verifyDatabaseStructure(lease));
+    this.db = this.lease.db;
+    this.currentFilePath = filePath;
   }
 
   closeDatabase(): void {
-    if (this.db) {
-      this.db.close((err) => {
-        if (err) {
-          console.error('Error closing database:', err);
-        }
-      });
+    if (this.lease) {
+      this.lease.release();
+      this.lease = null;
       this.db = null;
       this.currentFilePath = null;
     }
   }
 
   private dbGet(query: string, params: any[] = []): Promise<any> {
-    return new Promise((resolve, reject) => {
-      if (!this.db) {
-        reject(new Error('Database not connected'));
-        return;
-      }
-      
-      this.db.get(query, params, (err, row) => {
-        if (err) {
-          reject(err);
-        } else {
-          resolve(row);
-        }
-      });
-    });
+    if (!this.lease) {
+      return Promise.reject(new Error('Database not connected'));
+    }
+    return this.lease.get(query, params);
   }
 
   private dbAll(query: string, params: any[] = []): Promise<any[]> {
-    return new Promise((resolve, reject) => {
-      if (!this.db) {
-        reject(new Error('Database not connected'));
-        return;
-      }
-      
-      this.db.all(query, params, (err, rows) => {
-        if (err) {
-          reject(err);
-        } else {
-          resolve(rows || []);
-        }
-      });
-    });
+    if (!this.lease) {
+      return Promise.reject(new Error('Database not connected'));
+    }
+    return this.lease.all(query, params);
   }
 
   async getWells(params: WellsQueryParams = {}): Promise<PaginatedResponse<Well>> {
@@ -222,25 +190,34 @@ export class SQLiteService {
         ORDER BY timestamp_utc ASC
       `;
 
-      // Apply downsampling if requested and data is large
+      // Downsample by keeping the lowest and highest reading of each time
+      // bucket, so peaks and troughs survive; two rows per bucket at most
       if (downsample) {
-        const countQuery = `SELECT COUNT(*) as total FROM water_level_readings WHERE ${whereClause}`;
-        const countResult = await this.dbGet(countQuery, queryParams) as { total: number };
-        
-        if (countResult.total > maxPoints) {
-          const skipFactor = Math.ceil(countResult.total / maxPoints);
-          query = `
-            SELECT * FROM (
-              SELECT 
-                id, well_number, timestamp_utc, julian_timestamp,
-                water_level, temperature, dtw, data_source,
-                baro_flag, level_flag, notes,
-                ROW_NUMBER() OVER (ORDER BY timestamp_utc) as row_num
+        const range = await this.getJulianRange(wellNumber, dataType, startDate, endDate);
+        const buckets = Math.max(1, Math.floor(maxPoints / 2));
+
+        if (range && range.end > range.start) {
+          const bucketDays = (range.end - range.start) / buckets;
+          // Bare columns of a MIN()/MAX() aggregate come from the row holding that value
+          const bucketQuery = (aggregate: string) => `
+            SELECT id FROM (
+              SELECT id, ${aggregate}(water_level)
               FROM water_level_readings 
-              WHERE ${whereClause}
-            ) WHERE row_num % ${skipFactor} = 1
+              WHERE ${whereClause} AND water_level IS NOT NULL
+              GROUP BY MIN(CAST((julian_timestamp - ?) / ? AS INTEGER), ?)
+            )
+          `;
+          query = `
+            SELECT 
+              id, well_number, timestamp_utc, julian_timestamp,
+              water_level, temperature, dtw, data_source,
+              baro_flag, level_flag, notes
+            FROM water_level_readings 
+            WHERE id IN (${bucketQuery('MIN')} UNION ALL ${bucketQuery('MAX')})
             ORDER BY timestamp_utc ASC
           `;
+          const bucketParams = [...queryParams, range.start, bucketDays, buckets - 1];
+          queryParams = [...bucketParams, ...bucketParams];
         }
       }
 
@@ -252,6 +229,134 @@ export class SQLiteService {
     }
   }
 
+  /**
+   * Julian day range of a well's readings. Given dates are used as they are,
+   * missing ends come from the first or last reading (index lookups only).
+   */
+  async getJulianRange(
+    wellNumber: string,
+    dataType: DataQueryParams['dataType'] = 'all',
+    startDate?: string,
+    endDate?: string
+  ): Promise<{ start: number; end: number } | null> {
+    if (!this.db) throw new Error('Database not connected');
+
+    const sourceFilter = dataType !== 'all' ? ' AND data_source = ?' : '';
+    const sourceParams = dataType !== 'all' ? [dataType] : [];
+
+    const range = await this.dbGet(`
+      SELECT
+        COALESCE(julianday(?), (
+          SELECT MIN(julian_timestamp) FROM water_level_readings WHERE well_number = ?${sourceFilter}
+        )) as start,
+        COALESCE(julianday(?), (
+          SELECT MAX(julian_timestamp) FROM water_level_readings WHERE well_number = ?${sourceFilter}
+        )) as end
+    `, [
+      startDate ?? null, wellNumber, ...sourceParams,
+      endDate ?? null, wellNumber, ...sourceParams
+    ]) as { start: number | null; end: number | null };
+
+    if (range.start === null || range.end === null) {
+      return null;
+    }
+    return { start: range.start, end: range.end };
+  }
+
+  /**
+   * Min/max/mean water level per time bucket over a well's whole history.
+   * Buckets are aligned to UTC midnight, so a level can be computed once and
+   * sliced for any date range.
+   */
+  async getAggregatedLevel(
+    wellNumber: string,
+    dataType: DataQueryParams['dataType'] = 'all',
+    level: ResolutionLevel
+  ): Promise<AggregatedSeries> {
+    if (!this.db) throw new Error('Database not connected');
+
+    const sourceFilter = dataType !== 'all' ? 'AND data_source = ?' : '';
+    const queryParams: any[] = [level.days, wellNumber];
+    if (dataType !== 'all') {
+      queryParams.push(dataType);
+    }
+
+    try {
+      const rows = await this.dbAll(`
+        SELECT 
+          CAST((julian_timestamp - 0.5) / ? AS INTEGER) as bucket,
+          MIN(water_level) as min, MAX(water_level) as max,
+          AVG(water_level) as mean, COUNT(*) as count
+        FROM water_level_readings 
+        WHERE well_number = ? AND water_level IS NOT NULL ${sourceFilter}
+        GROUP BY bucket
+        ORDER BY bucket
+      `, queryParams) as { bucket: number; min: number; max: number; mean: number; count: number }[];
+
+      const series = emptySeries(level.name, level.days * 24 * 60 * 60);
+      for (const row of rows) {
+        series.t.push(Math.round(julianToMs(row.bucket * level.days + 0.5)));
+        series.min.push(row.min);
+        series.max.push(row.max);
+        series.mean.push(row.mean);
+        series.count.push(row.count);
+      }
+      return series;
+    } catch (error) {
+      console.error(`Failed to aggregate water level data for well ${wellNumber}:`, error);
+      throw new Error('Failed to retrieve water level data');
+    }
+  }
+
+  /**
+   * Readings of a julian day range in series form (one reading per point).
+   * Returns null if the range holds more than limit readings.
+   */
+  async getRawSeries(
+    wellNumber: string,
+    dataType: DataQueryParams['dataType'] = 'all',
+    startJulian: number,
+    endJulian: number,
+    limit: number
+  ): Promise<AggregatedSeries | null> {
+    if (!this.db) throw new Error('Database not connected');
+
+    const sourceFilter = dataType !== 'all' ? 'AND data_source = ?' : '';
+    const queryParams: any[] = [wellNumber, startJulian, endJulian];
+    if (dataType !== 'all') {
+      queryParams.push(dataType);
+    }
+
+    try {
+      // One row past the limit tells that the range is too dense, without counting it
+      const rows = await this.dbAll(`
+        SELECT julian_timestamp, water_level
+        FROM water_level_readings 
+        WHERE well_number = ? AND julian_timestamp BETWEEN ? AND ?
+          AND water_level IS NOT NULL ${sourceFilter}
+        ORDER BY julian_timestamp ASC
+        LIMIT ?
+      `, [...queryParams, limit + 1]) as { julian_timestamp: number; water_level: number }[];
+
+      if (rows.length > limit) {
+        return null;
+      }
+
+      const series = emptySeries('raw', 0);
+      for (const row of rows) {
+        series.t.push(Math.round(julianToMs(row.julian_timestamp)));
+        series.min.push(row.water_level);
+        series.max.push(row.water_level);
+        series.mean.push(row.water_level);
+        series.count.push(1);
+      }
+      return series;
+    } catch (error) {
+      console.error(`Failed to get raw water level data for well ${wellNumber}:`, error);
+      throw new Error('Failed to retrieve water level data');
+    }
+  }
+
   async getRechargeResults(wellNumber: string): Promise<RechargeResult[]> {
     if (!this.db) throw new Error('Database not connected');
 
@@ -343,13 +448,64 @@ export class SQLiteService {
     }
   }
 
-  private async verifyDatabaseStructure(): Promise<void> {
-    if (!this.db) throw new Error('Database not connected');
+  /**
+   * Create a database at targetPath with only one well's rows: every table
+   * with a well_number column, with its indexes, filtered to wellNumber.
+   */
+  static async createWellSlice(sourcePath: string, targetPath: string, wellNumber: string): Promise<void> {
+    const db = await new Promise<sqlite3.Database>((resolve, reject) => {
+      const created = new sqlite3.Database(targetPath, sqlite3.OPEN_READWRITE | sqlite3.OPEN_CREATE, (err) => {
+        if (err) {
+          reject(new Error(`Failed to create database: ${err.message}`));
+        } else {
+          resolve(created);
+        }
+      });
+    });
+    const run = (query: string, params: any[] = []) => new Promise<void>((resolve, reject) => {
+      db.run(query, params, (err) => err ? reject(err) : resolve());
+    });
+    const all = (query: string, params: any[] = []) => new Promise<any[]>((resolve, reject) => {
+      db.all(query, params, (err, rows) => err ? reject(err) : resolve(rows));
+    });
+
+    try {
+      await run('ATTACH DATABASE ? AS source', [sourcePath]);
+
+      const tables = await all(`
+        SELECT m.name, m.sql FROM source.sqlite_master m
+        WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+          AND EXISTS (SELECT 1 FROM pragma_table_info(m.name, 'source') WHERE name = 'well_number')
+      `) as { name: string; sql: string }[];
+
+      await run('BEGIN');
+      for (const table of tables) {
+        const name = `"${table.name.replace(/"/g, '""')}"`;
+        await run(table.sql);
+        await run(`INSERT INTO main.${name} SELECT * FROM source.${name} WHERE well_number = ?`, [wellNumber]);
+      }
+
+      // Indexes are built after the rows are in
+      const indexes = await all(`
+        SELECT sql FROM source.sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL
+          AND tbl_name IN (${tables.map(() => '?').join(', ') || 'NULL'})
+      `, tables.map(table => table.name)) as { sql: string }[];
+      for (const index of indexes) {
+        await run(index.sql);
+      }
+      await run('COMMIT');
+      await run('DETACH DATABASE source');
+    } finally {
+      await new Promise<void>((resolve) => db.close(() => resolve()));
+    }
+  }
 
+  private static async verifyDatabaseStructure(lease: SQLiteLease): Promise<void> {
     const requiredTables = ['wells', 'water_level_readings'];
     
     for (const table of requiredTables) {
-      const tableExists = await this.dbGet(`
+      const tableExists = await lease.get(`
         SELECT name FROM sqlite_master 
         WHERE type='table' AND name=?
       `, [table]);
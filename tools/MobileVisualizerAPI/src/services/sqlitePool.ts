@@ -0,0 +1,283 @@
+import sqlite3 from 'sqlite3';
+import fs from 'fs';
+
+// Settings of read-only connections that stay open between requests (read
+// when a connection opens, after the environment is loaded)
+const connectionPragmas = (): string[] => [
+  'PRAGMA query_only = ON',
+  `PRAGMA mmap_size = ${parseInt(process.env.SQLITE_MMAP_SIZE || String(256 * 1024 * 1024))}`,
+  `PRAGMA cache_size = -${parseInt(process.env.SQLITE_CACHE_KB || String(32 * 1024))}`,
+  'PRAGMA temp_store = MEMORY'
+];
+
+export interface SQLitePoolOptions {
+  maxConnections?: number;
+  maxLeasesPerConnection?: number;
+  maxStatements?: number;
+}
+
+interface PooledConnection {
+  key: string;
+  filePath: string;
+  db: sqlite3.Database;
+  ready: Promise<void>;
+  // Prepared statements by SQL, least recently used first
+  statements: Map<string, sqlite3.Statement>;
+  leases: number;
+  lastUsed: number;
+  // A newer version of the file exists; close once idle
+  stale: boolean;
+}
+
+// A connection checked out for one request; release it when done
+export interface SQLiteLease {
+  readonly filePath: string;
+  readonly db: sqlite3.Database;
+  get(query: string, params?: any[]): Promise<any>;
+  all(query: string, params?: any[]): Promise<any[]>;
+  release(): void;
+}
+
+/**
+ * Keyed pool of read-only SQLite connections, one per database file version.
+ *
+ * Connections are opened (and checked by the caller's setup function) once,
+ * then shared by requests for the same file and keep their prepared
+ * statements. When all connections are in use by other files the least
+ * recently used idle one is closed; requests wait when none is idle, or when
+ * their connection already serves the maximum number of requests. A file
+ * replaced on disk (a new download) gets a new connection, and the old one
+ * is closed once its requests finish.
+ */
+export class SQLitePool {
+  private connections: Map<string, PooledConnection> = new Map();
+  private waiters: (() => void)[] = [];
+  private readonly options: SQLitePoolOptions;
+
+  constructor(options: SQLitePoolOptions = {}) {
+    this.options = options;
+  }
+
+  private get maxConnections(): number {
+    return this.options.maxConnections ?? parseInt(process.env.SQLITE_POOL_SIZE || '8');
+  }
+
+  private get maxLeasesPerConnection(): number {
+    return this.options.maxLeasesPerConnection ?? parseInt(process.env.SQLITE_POOL_MAX_ACTIVE || '4');
+  }
+
+  private get maxStatements(): number {
+    return this.options.maxStatements ?? 64;
+  }
+
+  async acquire(filePath: string, setup?: (lease: SQLiteLease) => Promise<void>): Promise<SQLiteLease> {
+    for (;;) {
+      const key = this.versionKey(filePath);
+      let connection = this.connections.get(key);
+
+      if (!connection && (this.connections.size < this.maxConnections || this.evictIdle())) {
+        this.markStale(filePath);
+        connection = this.open(key, filePath, setup);
+      }
+
+      if (connection && connection.leases < this.maxLeasesPerConnection) {
+        connection.leases++;
+        connection.lastUsed = Date.now();
+        try {
+          await connection.ready;
+        } catch (error) {
+          connection.leases--;
+          throw error;
+        }
+        return this.createLease(connection);
+      }
+
+      await new Promise<void>(resolve => this.waiters.push(resolve));
+    }
+  }
+
+  // Close connections to a file, e.g. before it is deleted
+  invalidate(filePath: string): void {
+    this.markStale(filePath);
+  }
+
+  async closeAll(): Promise<void> {
+    await Promise.all([...this.connections.values()].map(connection => this.close(connection)));
+  }
+
+  getStats() {
+    const connections = [...this.connections.values()];
+    return {
+      connections: connections.length,
+      activeLeases: connections.reduce((total, connection) => total + connection.leases, 0),
+      preparedStatements: connections.reduce((total, connection) => total + connection.statements.size, 0),
+      waiting: this.waiters.length
+    };
+  }
+
+  // The file's identity on disk, so a replaced file is not read through an old connection
+  private versionKey(filePath: string): string {
+    try {
+      const stat = fs.statSync(filePath);
+      return `${filePath}:${stat.ino}:${stat.mtimeMs}:${stat.size}`;
+    } catch (error) {
+      throw new Error(`Failed to open database: ${(error as Error).message}`);
+    }
+  }
+
+  private open(key: string, filePath: string, setup?: (lease: SQLiteLease) => Promise<void>): PooledConnection {
+    const connection = {
+      key,
+      filePath,
+      statements: new Map(),
+      leases: 0,
+      lastUsed: Date.now(),
+      stale: false
+    } as unknown as PooledConnection;
+
+    connection.ready = new Promise<void>((resolve, reject) => {
+      connection.db = new sqlite3.Database(filePath, sqlite3.OPEN_READONLY, (err) => {
+        if (err) {
+          reject(new Error(`Failed to open database: ${err.message}`));
+        } else {
+          resolve();
+        }
+      });
+    }).then(async () => {
+      for (const pragma of connectionPragmas()) {
+        await new Promise<void>((resolve, reject) => {
+          connection.db.run(pragma, (err) => err ? reject(err) : resolve());
+        });
+      }
+      if (setup) {
+        await setup(this.createLease(connection, false));
+      }
+      console.log(`Database opened successfully: ${filePath}`);
+    }).catch(async (error) => {
+      await this.close(connection);
+      throw error;
+    });
+    // Callers waiting on a failed open handle the error
+    connection.ready.catch(() => undefined);
+
+    this.connections.set(key, connection);
+    return connection;
+  }
+
+  private createLease(connection: PooledConnection, releasable = true): SQLiteLease {
+    let released = false;
+    return {
+      filePath: connection.filePath,
+      db: connection.db,
+      get: (query, params = []) => new Promise((resolve, reject) => {
+        const statement = this.prepare(connection, query);
+        // Leases share the statement and its calls run in order. Without
+        // parameters get() continues after the previous caller's row, so a
+        // reset is queued right before it
+        statement.reset();
+        statement.get(params, (err, row) => {
+          // Finish the statement so it holds no read lock between requests
+          statement.reset();
+          err ? reject(err) : resolve(row);
+        });
+      }),
+      all: (query, params = []) => new Promise((resolve, reject) => {
+        this.prepare(connection, query).all(params, (err, rows) => err ? reject(err) : resolve(rows || []));
+      }),
+      release: () => {
+        if (!releasable || released) return;
+        released = true;
+        connection.leases--;
+        connection.lastUsed = Date.now();
+        if (connection.stale && connection.leases === 0) {
+          this.close(connection);
+        }
+        this.wakeWaiters();
+      }
+    };
+  }
+
+  private prepare(connection: PooledConnection, query: string): sqlite3.Statement {
+    let statement = connection.statements.get(query);
+    if (statement) {
+      // Move to the most recently used end
+      connection.statements.delete(query);
+      connection.statements.set(query, statement);
+      return statement;
+    }
+
+    // Errors reach the callbacks of the statement's queries
+    statement = connection.db.prepare(query, (err: Error | null) => {
+      if (err && connection.statements.get(query) === statement) {
+        connection.statements.delete(query);
+      }
+    });
+    connection.statements.set(query, statement);
+
+    if (connection.statements.size > this.maxStatements) {
+      const [oldestQuery, oldest] = connection.statements.entries().next().value as [string, sqlite3.Statement];
+      connection.statements.delete(oldestQuery);
+      oldest.finalize();
+    }
+    return statement;
+  }
+
+  private markStale(filePath: string): void {
+    for (const connection of [...this.connections.values()]) {
+      if (connection.filePath === filePath) {
+        connection.stale = true;
+        if (connection.leases === 0) {
+          this.close(connection);
+        }
+      }
+    }
+  }
+
+  // Close the least recently used idle connection, if any
+  private evictIdle(): boolean {
+    let oldest: PooledConnection | undefined;
+    for (const connection of this.connections.values()) {
+      if (connection.leases === 0 && (!oldest || connection.lastUsed < oldest.lastUsed)) {
+        oldest = connection;
+      }
+    }
+    if (oldest) {
+      this.close(oldest);
+    }
+    return oldest !== undefined;
+  }
+
+  private close(connection: PooledConnection): Promise<void> {
+    if (this.connections.get(connection.key) === connection) {
+      this.connections.delete(connection.key);
+    }
+    const statements = [...connection.statements.values()];
+    connection.statements.clear();
+    this.wakeWaiters();
+
+    return new Promise<void>((resolve) => {
+      if (!connection.db) {
+        resolve();
+        return;
+      }
+      for (const statement of statements) {
+        statement.finalize();
+      }
+      connection.db.close((err) => {
+        if (err) {
+          console.error('Error closing database:', err);
+        }
+        resolve();
+      });
+    });
+  }
+
+  private wakeWaiters(): void {
+    const waiters = this.waiters;
+    this.waiters = [];
+    waiters.forEach(resolve => resolve());
+  }
+}
+
+// Singleton instance
+export const sqlitePool = new SQLitePool();
@@ -24,6 +24,7 @@ export interface DatabaseInfo {
   name: string;
   size: number;
   modified: string;
+  md5Checksum?: string;
   wellsCount?: number;
   downloadUrl?: string;
   mimeType: string;
@@ -97,6 +98,25 @@ export interface DataQueryParams {
   dataType?: 'all' | 'transducer' | 'telemetry' | 'manual';
   downsample?: boolean;
   maxPoints?: number;
+  format?: DataFormat;
+  resolution?: ResolutionName | 'auto';
+}
+
+// rows: readings as objects; columnar/binary: time-bucketed AggregatedSeries
+export type DataFormat = 'rows' | 'columnar' | 'binary';
+
+export type ResolutionName = 'raw' | '1hour' | '6hour' | 'daily' | 'weekly' | 'monthly';
+
+// Water levels per time bucket as parallel columns; t is the bucket start
+// (or reading time at raw resolution) in epoch milliseconds
+export interface AggregatedSeries {
+  resolution: ResolutionName;
+  bucketSeconds: number;
+  t: number[];
+  min: number[];
+  max: number[];
+  mean: number[];
+  count: number[];
 }
 
 export interface CacheEntry<T> {
@@ -109,6 +129,7 @@ export interface DatabaseCache {
   filePath: string;
   fileSize: number;
   lastModified: string;
+  md5Checksum?: string;
   downloadedAt: number;
 }
 
@@ -117,6 +138,7 @@ export interface GoogleDriveFile {
   name: string;
   size: string;
   modifiedTime: string;
+  md5Checksum?: string;
   mimeType: string;
   parents?: string[];
 }
\ No newline at end of file
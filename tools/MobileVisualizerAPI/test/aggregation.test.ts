@@ -0,0 +1,220 @@
+// Aggregated series against a generated database: bucketing, slicing, the
+// binary layout and response times. Run with `npm test` (Node 22.13+, which
+// ships node:sqlite for building the fixture).
+import { test, before, after } from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'node:fs';
+import os from 'node:os';
+import path from 'node:path';
+import { DatabaseSync } from 'node:sqlite';
+import { SQLiteService } from '@/services/sqlite';
+import { sqlitePool } from '@/services/sqlitePool';
+import {
+  BINARY_MAGIC, RESOLUTION_LEVELS, chooseResolution, coarserResolutions, encodeSeries, getResolutionLevel,
+  julianToMs, sliceSeries
+} from '@/services/aggregation';
+import { AggregatedSeries } from '@/types/api';
+
+// Ten years of 15-minute readings from 2015-01-01 UTC, telemetry for the last year
+const READINGS = 350000;
+const TELEMETRY_FROM = READINGS - 35040;
+const START_MS = Date.UTC(2015, 0, 1);
+const STEP_MS = 15 * 60 * 1000;
+const SPIKE_INDEX = 200000;
+const SPIKE_LEVEL = 157.2;
+
+// Response time budgets in milliseconds
+const WHOLE_HISTORY_LEVEL_MS = 2000;
+const SLICE_AND_ENCODE_MS = 20;
+const DOWNSAMPLED_ROWS_MS = 1500;
+
+const readingMs = (i: number): number => START_MS + i * STEP_MS;
+const levelAt = (i: number): number => i === SPIKE_INDEX ? SPIKE_LEVEL : 100 + 10 * Math.sin(i / 500);
+
+let directory: string;
+let service: SQLiteService;
+
+const createFixture = (filePath: string): void => {
+  const db = new DatabaseSync(filePath);
+  db.exec(`
+    CREATE TABLE wells (well_number TEXT PRIMARY KEY);
+    CREATE TABLE water_level_readings (
+      id INTEGER PRIMARY KEY, well_number TEXT, timestamp_utc TEXT, julian_timestamp REAL, water_level REAL,
+      temperature REAL, dtw REAL, data_source TEXT, baro_flag TEXT, level_flag TEXT, notes TEXT);
+    CREATE INDEX idx_readings_julian ON water_level_readings (well_number, julian_timestamp);
+    CREATE INDEX idx_readings_time ON water_level_readings (well_number, timestamp_utc);
+    INSERT INTO wells VALUES ('W1'), ('W2');
+  `);
+  const insert = db.prepare(`
+    INSERT INTO water_level_readings (well_number, timestamp_utc, julian_timestamp, water_level, data_source)
+    VALUES ('W1', ?, ?, ?, ?)
+  `);
+  db.exec('BEGIN');
+  for (let i = 0; i < READINGS; i++) {
+    const ms = readingMs(i);
+    insert.run(new Date(ms).toISOString().slice(0, 19).replace('T', ' '), ms / 86400000 + 2440587.5,
+      levelAt(i), i < TELEMETRY_FROM ? 'transducer' : 'telemetry');
+  }
+  db.exec('COMMIT');
+  db.close();
+};
+
+// Buckets computed here from the generated readings, aligned to UTC midnight
+const expectedBuckets = (bucketMs: number, last = READINGS) => {
+  const buckets = new Map<number, { min: number; max: number; sum: number; count: number }>();
+  for (let i = 0; i < last; i++) {
+    const t = Math.floor(readingMs(i) / bucketMs) * bucketMs;
+    const level = levelAt(i);
+    const bucket = buckets.get(t);
+    if (bucket) {
+      bucket.min = Math.min(bucket.min, level);
+      bucket.max = Math.max(bucket.max, level);
+      bucket.sum += level;
+      bucket.count++;
+    } else {
+      buckets.set(t, { min: level, max: level, sum: level, count: 1 });
+    }
+  }
+  return buckets;
+};
+
+const series = (t: number[]): AggregatedSeries => ({
+  resolution: 'daily',
+  bucketSeconds: 86400,
+  t,
+  min: t.map((_, i) => i),
+  max: t.map((_, i) => i + 0.5),
+  mean: t.map((_, i) => i + 0.25),
+  count: t.map((_, i) => i + 1)
+});
+
+before(async () => {
+  directory = fs.mkdtempSync(path.join(os.tmpdir(), 'aggregation-test-'));
+  const filePath = path.join(directory, 'fixture.db');
+  createFixture(filePath);
+  service = new SQLiteService();
+  await service.openDatabase(filePath);
+});
+
+after(async () => {
+  service.closeDatabase();
+  await sqlitePool.closeAll();
+  fs.rmSync(directory, { recursive: true, force: true });
+});
+
+test('levels bucket readings at UTC boundaries', async () => {
+  for (const name of ['1hour', '6hour', 'daily'] as const) {
+    const level = getResolutionLevel(name)!;
+    const bucketMs = level.days * 86400000;
+    const aggregated = await service.getAggregatedLevel('W1', 'all', level);
+    const expected = expectedBuckets(bucketMs);
+    const buckets = [...expected.values()];
+
+    assert.equal(aggregated.bucketSeconds, bucketMs / 1000, name);
+    assert.deepEqual(aggregated.t, [...expected.keys()], name);
+    assert.deepEqual(aggregated.count, buckets.map(bucket => bucket.count), name);
+    assert.deepEqual(aggregated.min, buckets.map(bucket => bucket.min), name);
+    assert.deepEqual(aggregated.max, buckets.map(bucket => bucket.max), name);
+    assert.ok(aggregated.mean.every((mean, i) => Math.abs(mean - buckets[i].sum / buckets[i].count) < 1e-9), name);
+  }
+
+  const daily = await service.getAggregatedLevel('W1', 'transducer', getResolutionLevel('daily')!);
+  assert.deepEqual(daily.t, [...expectedBuckets(86400000, TELEMETRY_FROM).keys()]);
+  assert.equal(Math.max(...daily.max), SPIKE_LEVEL);
+});
+
+test('coarse levels cover the whole history', async () => {
+  for (const name of ['weekly', 'monthly'] as const) {
+    const level = getResolutionLevel(name)!;
+    const aggregated = await service.getAggregatedLevel('W1', 'all', level);
+    assert.equal(aggregated.count.reduce((total, count) => total + count, 0), READINGS, name);
+    assert.ok(aggregated.t.every((t, i) => i === 0 || t - aggregated.t[i - 1] >= level.days * 86400000), name);
+    assert.ok(aggregated.t[0] <= START_MS && aggregated.t.at(-1)! <= readingMs(READINGS - 1), name);
+  }
+});
+
+test('resolution choice', () => {
+  assert.equal(chooseResolution(5, 2000), 'raw');
+  assert.equal(chooseResolution(365, 2000), '6hour');
+  assert.equal(chooseResolution(3650, 2000), 'weekly');
+  assert.equal(chooseResolution(1e6, 2000), 'monthly');
+  assert.equal(coarserResolutions('daily')[0].name, 'daily');
+  assert.equal(coarserResolutions('raw').length, RESOLUTION_LEVELS.length);
+});
+
+test('sliceSeries keeps the buckets overlapping the range', () => {
+  const day = 86400000;
+  const whole = series([0, 1, 2, 3, 4].map(i => START_MS + i * day));
+
+  assert.equal(sliceSeries(whole), whole);
+  assert.equal(sliceSeries(whole, START_MS, START_MS + 5 * day), whole);
+  // A start inside a bucket keeps it; a start on a boundary drops the one before
+  assert.deepEqual(sliceSeries(whole, START_MS + day + 1).t, whole.t.slice(1));
+  assert.deepEqual(sliceSeries(whole, START_MS + 2 * day).t, whole.t.slice(2));
+  assert.deepEqual(sliceSeries(whole, START_MS + 2 * day - 1).t, whole.t.slice(1));
+  // An end on a bucket start keeps that bucket
+  assert.deepEqual(sliceSeries(whole, undefined, START_MS + 3 * day).t, whole.t.slice(0, 4));
+  assert.deepEqual(sliceSeries(whole, undefined, START_MS + 3 * day - 1).t, whole.t.slice(0, 3));
+  assert.deepEqual(sliceSeries(whole, START_MS + 10 * day).t, []);
+  assert.deepEqual(sliceSeries(whole, undefined, START_MS - 1).t, []);
+
+  const middle = sliceSeries(whole, START_MS + day + 5, START_MS + 2 * day + 5);
+  assert.deepEqual(middle.count, [2, 3]);
+  assert.deepEqual(middle.mean, [1.25, 2.25]);
+
+  // Raw points are kept only inside the range
+  const raw = { ...whole, resolution: 'raw' as const, bucketSeconds: 0 };
+  assert.deepEqual(sliceSeries(raw, START_MS + 1, START_MS + 2 * day).t, whole.t.slice(1, 3));
+});
+
+test('encodeSeries writes the documented layout', () => {
+  const encoded = series([START_MS, START_MS + 86400000, START_MS + 2 * 86400000]);
+  encoded.mean[1] = undefined as unknown as number;
+  const n = encoded.t.length;
+  const buffer = encodeSeries(encoded);
+
+  assert.equal(buffer.length, 16 + n * (4 * 8 + 4));
+  assert.equal(buffer.toString('ascii', 0, 4), BINARY_MAGIC);
+  assert.equal(buffer.readUInt32LE(4), n);
+  assert.equal(buffer.readDoubleLE(8), 86400);
+  const columns = [encoded.t, encoded.min, encoded.max, encoded.mean];
+  columns.forEach((column, c) => {
+    for (let i = 0; i < n; i++) {
+      const value = buffer.readDoubleLE(16 + (c * n + i) * 8);
+      assert.ok(Object.is(value, column[i] ?? NaN), `column ${c} row ${i}`);
+    }
+  });
+  for (let i = 0; i < n; i++) {
+    assert.equal(buffer.readUInt32LE(16 + 4 * n * 8 + i * 4), encoded.count[i]);
+  }
+  assert.equal(encodeSeries(series([])).length, 16);
+});
+
+test('response times on ten years of readings', async () => {
+  let start = performance.now();
+  const daily = await service.getAggregatedLevel('W1', 'all', getResolutionLevel('daily')!);
+  const levelMs = performance.now() - start;
+  assert.ok(levelMs < WHOLE_HISTORY_LEVEL_MS, `whole-history daily level took ${levelMs.toFixed(0)}ms`);
+
+  // Later requests only slice and encode the cached level
+  start = performance.now();
+  const year = sliceSeries(daily, Date.UTC(2020, 0, 1), Date.UTC(2020, 11, 31, 23, 59));
+  const buffer = encodeSeries(year);
+  const sliceMs = performance.now() - start;
+  assert.equal(year.t.length, 366);
+  assert.equal(buffer.readUInt32LE(4), 366);
+  assert.ok(sliceMs < SLICE_AND_ENCODE_MS, `slice and encode took ${sliceMs.toFixed(1)}ms`);
+
+  start = performance.now();
+  const rows = await service.getWaterLevelData({ wellNumber: 'W1', downsample: true, maxPoints: 2000 });
+  const rowsMs = performance.now() - start;
+  assert.ok(rows.length <= 2000);
+  assert.equal(Math.max(...rows.map(row => row.water_level)), SPIKE_LEVEL);
+  assert.ok(rowsMs < DOWNSAMPLED_ROWS_MS, `downsampled rows took ${rowsMs.toFixed(0)}ms`);
+
+  const range = await service.getJulianRange('W1');
+  const raw = await service.getRawSeries('W1', 'all', range!.start, range!.start + 5, 2000);
+  assert.equal(raw!.t.length, 481);
+  assert.equal(raw!.t[0], julianToMs(range!.start));
+  assert.equal(await service.getRawSeries('W1', 'all', range!.start, range!.start + 30, 2000), null);
+});
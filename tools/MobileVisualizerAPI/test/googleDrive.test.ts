@@ -0,0 +1,221 @@
+// Database downloads against a fake Drive: resumed and verified downloads,
+// shared downloads, the download lock between instances and the cached
+// copies served while Drive is down
+import { test, before, after, beforeEach } from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'node:fs';
+import os from 'node:os';
+import path from 'node:path';
+import { createHash } from 'node:crypto';
+import { Readable } from 'node:stream';
+import { DatabaseSync } from 'node:sqlite';
+import { GoogleDriveService } from '@/services/googleDrive';
+import { sqlitePool } from '@/services/sqlitePool';
+
+const MODIFIED = '2026-01-01T00:00:00.000Z';
+
+let directory: string;
+let content: Buffer;
+let mediaRequests: number;
+// Range header of each media request, '' for none
+let ranges: string[];
+
+const metadata = () => ({
+  modifiedTime: MODIFIED,
+  size: String(content.length),
+  md5Checksum: createHash('md5').update(content).digest('hex')
+});
+
+interface FakeDriveOptions {
+  ignoreRange?: boolean;  // Answer range requests with the whole file, as some proxies do
+  failAfter?: number[];   // Drop the connection of the n-th media request after this many bytes
+  body?: Buffer;          // Served instead of the file, e.g. corrupted
+}
+
+// Serves the file in small chunks, so concurrent downloads overlap, and
+// honours Range requests with 206 responses
+const fakeDrive = (options: FakeDriveOptions = {}) => ({
+  files: {
+    get: async (params: any, requestOptions: any = {}) => {
+      if (params.alt !== 'media') {
+        return { data: metadata() };
+      }
+      const failAfter = options.failAfter?.[mediaRequests];
+      mediaRequests++;
+      const range = requestOptions.headers?.Range || '';
+      ranges.push(range);
+
+      const match = /^bytes=(\d+)-$/.exec(range);
+      const start = match && !options.ignoreRange ? Number(match[1]) : 0;
+      const body = (options.body || content).subarray(start);
+      const chunks: Buffer[] = [];
+      for (let offset = 0; offset < body.length; offset += 4096) {
+        chunks.push(body.subarray(offset, offset + 4096));
+      }
+
+      let data: Readable = Readable.from(chunks);
+      if (failAfter !== undefined) {
+        data = new Readable({ read() {} });
+        data.push(body.subarray(0, failAfter));
+        setImmediate(() => data.destroy(new Error('socket hang up')));
+      }
+      return { status: start ? 206 : 200, data };
+    }
+  }
+});
+
+const drive = fakeDrive();
+
+const offline = { files: { get: async () => { throw new Error('getaddrinfo ENOTFOUND www.googleapis.com'); } } };
+
+before(() => {
+  directory = fs.mkdtempSync(path.join(os.tmpdir(), 'google-drive-test-'));
+  process.env.DATABASE_CACHE_DIR = path.join(directory, 'cache');
+
+  const fixture = path.join(directory, 'fixture.db');
+  const db = new DatabaseSync(fixture);
+  db.exec(`
+    CREATE TABLE wells (well_number TEXT PRIMARY KEY);
+    CREATE TABLE water_level_readings (id INTEGER PRIMARY KEY, well_number TEXT, water_level REAL);
+    INSERT INTO wells VALUES ('W1'), ('W2');
+  `);
+  const insert = db.prepare('INSERT INTO water_level_readings (well_number, water_level) VALUES (?, ?)');
+  db.exec('BEGIN');
+  for (let i = 0; i < 20000; i++) {
+    insert.run(i % 2 ? 'W2' : 'W1', i);
+  }
+  db.exec('COMMIT');
+  db.close();
+  content = fs.readFileSync(fixture);
+});
+
+beforeEach(() => {
+  fs.rmSync(process.env.DATABASE_CACHE_DIR!, { recursive: true, force: true });
+  mediaRequests = 0;
+  ranges = [];
+});
+
+after(async () => {
+  await sqlitePool.closeAll();
+  fs.rmSync(directory, { recursive: true, force: true });
+});
+
+test('concurrent requests share one download', async () => {
+  const first = new GoogleDriveService(drive);
+  const second = new GoogleDriveService(drive);
+
+  const paths = await Promise.all([
+    first.downloadDatabase('F1', 'wells.db'),
+    first.downloadDatabase('F1', 'wells.db'),
+    second.downloadDatabase('F1', 'wells.db')
+  ]);
+
+  assert.equal(mediaRequests, 1);
+  assert.equal(new Set(paths).size, 1);
+  assert.ok(fs.readFileSync(paths[0]).equals(content));
+  assert.ok(!fs.existsSync(`${paths[0]}.partial`));
+  assert.ok(!fs.existsSync(`${paths[0]}.lock`));
+});
+
+test('a download locked by another instance is waited for', async () => {
+  const service = new GoogleDriveService(drive);
+  const filePath = path.join(process.env.DATABASE_CACHE_DIR!, 'F1.db');
+  const lockPath = `${filePath}.lock`;
+  fs.writeFileSync(lockPath, 'other');
+
+  const download = service.downloadDatabase('F1', 'wells.db');
+  await new Promise(resolve => setTimeout(resolve, 600));
+  assert.ok(!fs.existsSync(`${filePath}.partial`));
+
+  // The other instance finishes and releases the lock
+  fs.writeFileSync(filePath, content);
+  fs.writeFileSync(path.join(process.env.DATABASE_CACHE_DIR!, 'F1.cache.json'), JSON.stringify({
+    filePath, fileSize: content.length, lastModified: MODIFIED, downloadedAt: Date.now()
+  }));
+  fs.unlinkSync(lockPath);
+
+  assert.equal(await download, filePath);
+  assert.equal(mediaRequests, 0);
+});
+
+test('a stale download lock is taken over', async () => {
+  const service = new GoogleDriveService(drive);
+  const lockPath = path.join(process.env.DATABASE_CACHE_DIR!, 'F1.db.lock');
+  fs.writeFileSync(lockPath, 'crashed');
+  const old = new Date(Date.now() - 10 * 60 * 1000);
+  fs.utimesSync(lockPath, old, old);
+
+  const filePath = await service.downloadDatabase('F1', 'wells.db');
+  assert.equal(mediaRequests, 1);
+  assert.ok(fs.readFileSync(filePath).equals(content));
+  assert.ok(!fs.existsSync(lockPath));
+});
+
+test('cached copies are served while Drive is unreachable', async () => {
+  const online = new GoogleDriveService(drive);
+  const filePath = await online.downloadDatabase('F1', 'wells.db');
+  const slicePath = await online.downloadWellDatabase('F1', 'wells.db', 'W2');
+  await sqlitePool.closeAll();
+
+  const service = new GoogleDriveService(offline);
+  assert.equal(await service.downloadDatabase('F1', 'wells.db'), filePath);
+  assert.equal(await service.downloadWellDatabase('F1', 'wells.db', 'W2'), slicePath);
+
+  // Only the well's extract is left
+  fs.unlinkSync(filePath);
+  assert.equal(await new GoogleDriveService(offline).downloadWellDatabase('F1', 'wells.db', 'W2'), slicePath);
+  await assert.rejects(new GoogleDriveService(offline).downloadWellDatabase('F1', 'wells.db', 'W1'));
+  await assert.rejects(new GoogleDriveService(offline).downloadDatabase('F1', 'wells.db'));
+});
+
+test('an interrupted download resumes from the partial file', async () => {
+  const service = new GoogleDriveService(fakeDrive({ failAfter: [100000, 50000] }));
+
+  const filePath = await service.downloadDatabase('F1', 'wells.db');
+
+  assert.deepEqual(ranges, ['', 'bytes=100000-', 'bytes=150000-']);
+  assert.ok(fs.readFileSync(filePath).equals(content));
+  assert.ok(!fs.existsSync(`${filePath}.partial`));
+  assert.ok(!fs.existsSync(`${filePath}.partial.json`));
+});
+
+test('a partial file left by an earlier instance is resumed', async () => {
+  const failing = new GoogleDriveService(fakeDrive({ failAfter: [60000, 0, 0] }));
+  await assert.rejects(failing.downloadDatabase('F1', 'wells.db'));
+  const partialPath = path.join(process.env.DATABASE_CACHE_DIR!, 'F1.db.partial');
+  assert.equal(fs.statSync(partialPath).size, 60000);
+
+  ranges = [];
+  const filePath = await new GoogleDriveService(drive).downloadDatabase('F1', 'wells.db');
+  assert.deepEqual(ranges, ['bytes=60000-']);
+  assert.ok(fs.readFileSync(filePath).equals(content));
+});
+
+test('a server ignoring the range restarts the file', async () => {
+  const service = new GoogleDriveService(fakeDrive({ ignoreRange: true, failAfter: [100000] }));
+
+  const filePath = await service.downloadDatabase('F1', 'wells.db');
+
+  assert.deepEqual(ranges, ['', 'bytes=100000-']);
+  assert.ok(fs.readFileSync(filePath).equals(content));
+});
+
+test('a download failing its checksum is discarded', async () => {
+  const filePath = await new GoogleDriveService(drive).downloadDatabase('F1', 'wells.db');
+  const cacheEntry = path.join(process.env.DATABASE_CACHE_DIR!, 'F1.cache.json');
+  const cached = fs.readFileSync(cacheEntry, 'utf8');
+
+  // Drive has a new version, but the bytes arrive corrupted
+  const corrupted = Buffer.from(content);
+  corrupted[corrupted.length >> 1] ^= 0xff;
+  const service = new GoogleDriveService(fakeDrive({ body: corrupted }));
+  const remote = { modified: '2026-02-01T00:00:00.000Z', size: content.length, md5Checksum: metadata().md5Checksum };
+  await assert.rejects(service.downloadDatabase('F1', 'wells.db', remote), /Failed to download database/);
+
+  assert.ok(!fs.existsSync(`${filePath}.partial`));
+  assert.ok(!fs.existsSync(`${filePath}.partial.json`));
+  // The cached copy of the previous version is left as it was
+  assert.ok(fs.readFileSync(filePath).equals(content));
+  assert.equal(fs.readFileSync(cacheEntry, 'utf8'), cached);
+  assert.equal(await new GoogleDriveService(drive).downloadDatabase('F1', 'wells.db'), filePath);
+});
@@ -0,0 +1,69 @@
+// Pooled connections: leases sharing a connection and its prepared statements
+import { test, before, after } from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'node:fs';
+import os from 'node:os';
+import path from 'node:path';
+import { DatabaseSync } from 'node:sqlite';
+import { SQLitePool } from '@/services/sqlitePool';
+
+let directory: string;
+let filePath: string;
+
+before(() => {
+  directory = fs.mkdtempSync(path.join(os.tmpdir(), 'sqlite-pool-test-'));
+  filePath = path.join(directory, 'wells.db');
+  const db = new DatabaseSync(filePath);
+  db.exec(`
+    CREATE TABLE wells (well_number TEXT PRIMARY KEY);
+    INSERT INTO wells VALUES ('W1'), ('W2'), ('W3');
+  `);
+  db.close();
+});
+
+after(() => {
+  fs.rmSync(directory, { recursive: true, force: true });
+});
+
+test('concurrent gets on a shared statement each get their row', async () => {
+  const pool = new SQLitePool({ maxLeasesPerConnection: 4 });
+  const leases = await Promise.all([0, 1, 2, 3].map(() => pool.acquire(filePath)));
+  try {
+    assert.equal(pool.getStats().connections, 1);
+
+    // Without parameters, as in the unfiltered well count and the database stats
+    const counts = await Promise.all(leases.map(lease => lease.get('SELECT COUNT(*) AS count FROM wells')));
+    assert.deepEqual(counts.map(row => row?.count), [3, 3, 3, 3]);
+
+    const wells = await Promise.all(leases.map((lease, i) =>
+      lease.get('SELECT well_number FROM wells WHERE rowid = ?', [i % 3 + 1])));
+    assert.deepEqual(wells.map(row => row?.well_number), ['W1', 'W2', 'W3', 'W1']);
+
+    // The statements are reused, not prepared per request
+    assert.equal(pool.getStats().preparedStatements, 2);
+    const again = await Promise.all(leases.map(lease => lease.get('SELECT COUNT(*) AS count FROM wells')));
+    assert.deepEqual(again.map(row => row?.count), [3, 3, 3, 3]);
+  } finally {
+    leases.forEach(lease => lease.release());
+    await pool.closeAll();
+  }
+});
+
+test('a replaced file gets a new connection', async () => {
+  const pool = new SQLitePool();
+  try {
+    const first = await pool.acquire(filePath);
+    first.release();
+
+    const copy = `${filePath}.new`;
+    fs.copyFileSync(filePath, copy);
+    fs.renameSync(copy, filePath);
+
+    const second = await pool.acquire(filePath);
+    assert.equal((await second.get('SELECT COUNT(*) AS count FROM wells')).count, 3);
+    assert.equal(pool.getStats().connections, 1);
+    second.release();
+  } finally {
+    await pool.closeAll();
+  }
+});
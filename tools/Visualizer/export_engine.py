@@ -0,0 +1,386 @@
+"""
+Streaming export of well readings to CSV, Parquet or Excel files.
+
+* Readings come from the query service's ``iter_series``: the date range is
+  filtered and fixed-width downsampling aggregated in SQL, and only one
+  chunk per well is held in memory, however long the export.
+* Files are written chunk by chunk: CSV appended, Parquet as row groups
+  (pyarrow) and Excel through a write-only workbook (openpyxl), continuing
+  on a new sheet when one is full.
+* Layouts: one file per well, one long file with a well_number column, or
+  one wide file with a column per well and value, joined on the timestamp.
+* Files are written under a temporary name and renamed when complete, so a
+  cancelled or failed export leaves no partial files behind.
+"""
+
+import importlib.util
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+
+import pandas as pd
+
+from query_service import DEFAULT_CHUNK_ROWS, SERIES_COLUMNS, TIMESTAMP_FORMAT, TimeSeriesQueryService
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'xlsx': '.xlsx'}
+EXPORT_LAYOUTS = ('per_well', 'long', 'wide')
+FORMAT_DEPENDENCIES = {'parquet': 'pyarrow', 'xlsx': 'openpyxl'}
+EXCEL_MAX_ROWS = 1048576
+PARTIAL_SUFFIX = '.partial'
+
+# Downsampling choices of the visualizer's controls, as pandas frequencies
+DOWNSAMPLE_RULES = {
+    '30 Minutes': '30min', '30 Min': '30min', '30min': '30min',
+    '1 Hour': '1h', '1h': '1h',
+    '2 Hours': '2h', '2h': '2h',
+    '6 Hours': '6h', '6h': '6h',
+    '12 Hours': '12h', '12h': '12h',
+    '1 Day': '1D', '1d': '1D',
+    '1 Week': 'W-MON', '1w': 'W-MON',
+    '1 Month': 'MS', '1m': 'MS',
+}
+
+
+def downsample_rule(method: Optional[str]) -> Optional[str]:
+    """pandas frequency of a downsampling choice, or None to export the readings themselves"""
+    if not method or method in ('None', 'none', 'No Downsampling'):
+        return None
+    rule = DOWNSAMPLE_RULES.get(method)
+    if rule is None:
+        logger.warning(f"Unknown downsample method: {method}, exporting original data")
+    return rule
+
+
+def missing_dependency(export_format: str) -> Optional[str]:
+    """Name of the package a format needs that is not installed, or None"""
+    package = FORMAT_DEPENDENCIES.get(export_format)
+    if package and importlib.util.find_spec(package) is None:
+        return package
+    return None
+
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._header = True
+
+    def write(self, frame: pd.DataFrame):
+        frame.to_csv(self._file, index=False, header=self._header, date_format=TIMESTAMP_FORMAT)
+        self._header = False
+
+    def close(self, complete: bool = True):
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self._path = path
+        self._writer = None
+
+    def write(self, frame: pd.DataFrame):
+        table = self._pa.Table.from_pandas(frame, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self, complete: bool = True):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _ExcelWriter:
+    def __init__(self, path: str):
+        from openpyxl import Workbook
+        self._path = path
+        self._workbook = Workbook(write_only=True)
+        self._sheet = None
+        self._sheet_rows = 0
+
+    def write(self, frame: pd.DataFrame):
+        header = list(frame.columns)
+        values = frame.astype(object).where(frame.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self._sheet is None or self._sheet_rows >= EXCEL_MAX_ROWS:
+                number = len(self._workbook.worksheets) + 1
+                self._sheet = self._workbook.create_sheet('Data' if number == 1 else f'Data {number}')
+                self._sheet.append(header)
+                self._sheet_rows = 1
+            self._sheet.append(row)
+            self._sheet_rows += 1
+
+    def close(self, complete: bool = True):
+        # A write-only workbook is only assembled when saved
+        if complete:
+            self._workbook.save(self._path)
+
+
+class _Cancelled(Exception):
+    """Raised between chunks once an export has been cancelled"""
+
+
+_WRITERS = {'csv': _CsvWriter, 'parquet': _ParquetWriter, 'xlsx': _ExcelWriter}
+
+
+class _OutputFile:
+    """An export file written under a temporary name until it is complete"""
+
+    def __init__(self, path: str, export_format: str):
+        self.path = path
+        self.rows = 0
+        self._partial = path + PARTIAL_SUFFIX
+        self._writer = _WRITERS[export_format](self._partial)
+
+    def write(self, frame: pd.DataFrame):
+        self._writer.write(frame)
+        self.rows += len(frame)
+
+    def finish(self) -> str:
+        self._writer.close()
+        os.replace(self._partial, self.path)
+        return self.path
+
+    def discard(self):
+        try:
+            self._writer.close(complete=False)
+        except Exception as e:
+            logger.debug(f"Error closing partial export {self._partial}: {e}")
+        try:
+            os.remove(self._partial)
+        except OSError:
+            pass
+
+
+class ExportEngine:
+    """Streams the readings of selected wells from a visualizer database into export files"""
+
+    def __init__(self, db_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.query_service = TimeSeriesQueryService.for_database(db_path)
+        self.chunk_rows = chunk_rows
+
+    def export(self, wells: Sequence[str], output_dir: str, export_format: str = 'csv',
+               layout: str = 'per_well', start=None, end=None, resolution: Optional[str] = None,
+               aggregate: str = 'mean', include_manual: bool = False,
+               file_names: Optional[Dict[str, str]] = None, base_name: str = 'wells', suffix: str = '',
+               progress: Optional[Callable[[int, str], None]] = None,
+               cancelled: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        Export the readings of wells to files in output_dir.
+
+        Args:
+            wells: Wells to export, in the order they are written
+            output_dir: Directory the files are written to
+            export_format: 'csv', 'parquet' or 'xlsx'
+            layout: 'per_well' (a file per well), 'long' (one file, a well_number
+                column) or 'wide' (one file, a column per well and value)
+            start, end: Date range; a date-only end includes that whole day
+            resolution: pandas frequency to aggregate to, None for the readings themselves
+            aggregate: 'mean', 'median', 'min' or 'max' of each resolution bucket
+            include_manual: Also write manual readings, to files named ..._manual
+            file_names: Base file name of each well in the per_well layout (default: well number)
+            base_name: Base file name of the long and wide layouts
+            suffix: Appended to every base file name
+            progress: Called with (percent, message) as chunks are written
+            cancelled: Polled between chunks; the export stops once it returns True
+
+        Returns:
+            Dict with the files written, the rows exported, the wells without
+            data in the range, whether the export was cancelled and its duration.
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        if layout not in EXPORT_LAYOUTS:
+            raise ValueError(f"Unknown export layout: {layout}")
+
+        started = time.perf_counter()
+        stats = {'files': [], 'rows': 0, 'wells_exported': 0, 'wells_without_data': [], 'cancelled': False}
+        extension = EXPORT_FORMATS[export_format]
+        file_names = file_names or {}
+        options = dict(start=start, end=end, resolution=resolution, aggregate=aggregate)
+        open_file: Optional[_OutputFile] = None
+
+        def write(output, frame, name):
+            if output is None:
+                output = _OutputFile(os.path.join(output_dir, f"{name}{suffix}{extension}"), export_format)
+            output.write(frame)
+            stats['rows'] += len(frame)
+            return output
+
+        try:
+            if layout == 'wide':
+                spans = [span for span in (self._span(well, start) for well in wells) if span]
+                first = min((span[0] for span in spans), default=None)
+                last = max((span[1] for span in spans), default=None)
+                exported = set()
+                for frame, wells_in_frame in self._wide_chunks(wells, options):
+                    self._check_cancelled(cancelled)
+                    open_file = write(open_file, frame, base_name)
+                    exported.update(wells_in_frame)
+                    self._report(progress, self._fraction(frame['timestamp_utc'].iloc[-1], (first, last)),
+                                 f"Exported {stats['rows']:,} rows")
+                if open_file is not None:
+                    stats['files'].append(open_file.finish())
+                    open_file = None
+                stats['wells_exported'] = len(exported)
+                stats['wells_without_data'] = [well for well in wells if well not in exported]
+            else:
+                for index, well in enumerate(wells):
+                    self._check_cancelled(cancelled)
+                    name = file_names.get(well, well) if layout == 'per_well' else base_name
+                    span = self._span(well, start)
+                    well_rows = 0
+                    for frame in self.query_service.iter_series(well, chunk_rows=self.chunk_rows, **options):
+                        self._check_cancelled(cancelled)
+                        if layout == 'long':
+                            frame.insert(0, 'well_number', well)
+                        open_file = write(open_file, frame, name)
+                        well_rows += len(frame)
+                        fraction = self._fraction(frame['timestamp_utc'].iloc[-1], span)
+                        self._report(progress, (index + fraction) / len(wells),
+                                     f"Exporting {well} ({index + 1}/{len(wells)}): {well_rows:,} rows")
+
+                    if well_rows:
+                        stats['wells_exported'] += 1
+                    else:
+                        logger.warning(f"No data to export for well {well}")
+                        stats['wells_without_data'].append(well)
+                    if layout == 'per_well' and open_file is not None:
+                        stats['files'].append(open_file.finish())
+                        open_file = None
+                if open_file is not None:
+                    stats['files'].append(open_file.finish())
+                    open_file = None
+
+            if include_manual:
+                self._export_manual(wells, output_dir, export_format, layout, start, end,
+                                    file_names, base_name, suffix, stats, cancelled)
+            self._report(progress, 1.0, f"Exported {stats['rows']:,} rows to {len(stats['files'])} files")
+
+        except _Cancelled:
+            stats['cancelled'] = True
+            logger.info(f"Export cancelled after {stats['rows']} rows")
+        finally:
+            if open_file is not None:
+                open_file.discard()
+
+        stats['seconds'] = time.perf_counter() - started
+        logger.debug(f"PERF: exported {stats['rows']} rows of {len(wells)} wells ({layout}, {export_format}) "
+                     f"in {stats['seconds']:.2f}s")
+        return stats
+
+    def _wide_chunks(self, wells: Sequence[str], options: Dict[str, Any]) -> Iterator:
+        """
+        Frames of the wide layout in time order, and the wells with values in each.
+
+        Each well's chunks are buffered until every other well has been read
+        past the same time, so rows are complete when written and no more
+        than about one chunk per well is in memory.
+        """
+        columns = [f"{well}_{column}" for well in wells for column in SERIES_COLUMNS]
+        streams = {well: self.query_service.iter_series(well, chunk_rows=self.chunk_rows, **options)
+                   for well in wells}
+        buffers: Dict[str, pd.DataFrame] = {}
+
+        def refill(well):
+            for chunk in streams[well]:
+                if len(chunk):
+                    frame = chunk.set_index('timestamp_utc')
+                    frame.columns = [f"{well}_{column}" for column in frame.columns]
+                    if well in buffers:
+                        frame = pd.concat([buffers[well], frame])
+                    # One row per time in each well's columns
+                    buffers[well] = frame[~frame.index.duplicated(keep='last')]
+                    return
+            del streams[well]
+
+        for well in wells:
+            refill(well)
+
+        while buffers:
+            # Rows up to the earliest end of a still-streaming buffer are complete
+            ends = [buffers[well].index[-1] for well in buffers if well in streams]
+            watermark = min(ends) if ends else max(frame.index[-1] for frame in buffers.values())
+
+            parts = {}
+            for well in list(buffers):
+                frame = buffers[well]
+                ready = frame.index <= watermark
+                if ready.any():
+                    parts[well] = frame[ready]
+                remaining = frame[~ready]
+                if len(remaining):
+                    buffers[well] = remaining
+                else:
+                    del buffers[well]
+                    if well in streams:
+                        refill(well)
+
+            if parts:
+                wide = pd.concat(parts.values(), axis=1).sort_index().reindex(columns=columns)
+                yield wide.rename_axis('timestamp_utc').reset_index(), set(parts)
+
+    def _export_manual(self, wells, output_dir, export_format, layout, start, end,
+                       file_names, base_name, suffix, stats, cancelled):
+        extension = EXPORT_FORMATS[export_format]
+        combined = None
+        try:
+            for well in wells:
+                self._check_cancelled(cancelled)
+                readings = self.query_service.get_manual_readings(well, start, end)
+                if readings.empty:
+                    continue
+                if layout == 'per_well':
+                    name = file_names.get(well, well)
+                    output = _OutputFile(os.path.join(output_dir, f"{name}{suffix}_manual{extension}"),
+                                         export_format)
+                    output.write(readings)
+                    stats['files'].append(output.finish())
+                else:
+                    readings.insert(0, 'well_number', well)
+                    if combined is None:
+                        combined = _OutputFile(os.path.join(output_dir, f"{base_name}{suffix}_manual{extension}"),
+                                               export_format)
+                    combined.write(readings)
+            if combined is not None:
+                stats['files'].append(combined.finish())
+                combined = None
+        finally:
+            if combined is not None:
+                combined.discard()
+
+    def _span(self, well: str, start=None):
+        """First and last time of a well's export, to report progress by"""
+        bounds = self.query_service.get_date_bounds(well)
+        if not bounds:
+            return None
+        first, last = bounds
+        if start:
+            try:
+                first = max(first, pd.Timestamp(start))
+            except (TypeError, ValueError):
+                pass
+        return first, last
+
+    @staticmethod
+    def _fraction(timestamp, span) -> float:
+        if not span or span[0] is None or span[1] <= span[0]:
+            return 1.0
+        return min(max((timestamp - span[0]) / (span[1] - span[0]), 0.0), 1.0)
+
+    @staticmethod
+    def _report(progress, fraction: float, message: str):
+        if progress:
+            progress(int(fraction * 100), message)
+
+    @staticmethod
+    def _check_cancelled(cancelled):
+        if cancelled and cancelled():
+            raise _Cancelled()
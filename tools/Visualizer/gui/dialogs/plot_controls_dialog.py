@@ -1046,37 +1046,11 @@ class PlotControlsDialog(QDialog):
                 
             # Get the full data range for this well
             data_manager = self.parent.data_manager
-            logger.info(f"[DATE_RANGE_DEBUG] Getting data for well {well_name}")
-            df = data_manager.get_well_data(well_name)
+            logger.info(f"[DATE_RANGE_DEBUG] Getting date bounds for well {well_name}")
+            bounds = data_manager.query_service.get_date_bounds(well_name)
             
-            if df is not None and not df.empty:
-                logger.info(f"[DATE_RANGE_DEBUG] Got {len(df)} data points")
-                
-                # Check if we have timestamp_utc column
-                if 'timestamp_utc' in df.columns:
-                    # Convert to datetime if needed
-                    df['timestamp_utc'] = pd.to_datetime(df['timestamp_utc'])
-                    min_date = df['timestamp_utc'].min()
-                    max_date = df['timestamp_utc'].max()
-                    logger.info(f"[DATE_RANGE_DEBUG] Using timestamp_utc column")
-                elif hasattr(df.index, 'date') and not isinstance(df.index[0], int):
-                    # Index is already datetime
-                    min_date = df.index.min()
-                    max_date = df.index.max()
-                    logger.info(f"[DATE_RANGE_DEBUG] Using datetime index")
-                else:
-                    # Try to get date range from data manager with full data
-                    logger.info(f"[DATE_RANGE_DEBUG] Getting full data without downsampling")
-                    df_full = data_manager.get_well_data(well_name, downsample=None)
-                    if df_full is not None and not df_full.empty and 'timestamp_utc' in df_full.columns:
-                        df_full['timestamp_utc'] = pd.to_datetime(df_full['timestamp_utc'])
-                        min_date = df_full['timestamp_utc'].min()
-                        max_date = df_full['timestamp_utc'].max()
-                        logger.info(f"[DATE_RANGE_DEBUG] Got dates from full data")
-                    else:
-                        logger.error(f"[DATE_RANGE_DEBUG] Could not find datetime data")
-                        return
-                
+            if bounds:
+                min_date, max_date = bounds
                 logger.info(f"[DATE_RANGE_DEBUG] Date range: {min_date} to {max_date}")
                 
                 # Convert to QDate and update controls
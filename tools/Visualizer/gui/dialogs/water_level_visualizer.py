@@ -16,6 +16,7 @@ from PyQt5.QtWebEngineWidgets import QWebEngineView
 import numpy as np
 import time
 
+from query_service import TimeSeriesQueryService
 from ..managers.plot_handler import PlotHandler
 from ..managers.data_manager import DataManager
 from ..managers.export_manager import ExportManager
@@ -1483,17 +1484,14 @@ class WaterLevelVisualizer(QDialog):
             min_date = None
             max_date = None
             
+            query_service = TimeSeriesQueryService.for_database(self.db_path)
             for well in self.selected_wells:
                 try:
-                    # Get data for this well
-                    df = self.plot_handler.get_well_data(well, self.db_path)
+                    # First and last reading of this well, without loading its data
+                    bounds = query_service.get_date_bounds(well)
                     
-                    if not df.empty:
-                        # For consistency with the plot handler, use timestamp_utc column or index
-                        date_column = df.index if df.index.name == 'timestamp_utc' else df['timestamp_utc']
-                        
-                        well_min = date_column.min()
-                        well_max = date_column.max()
+                    if bounds:
+                        well_min, well_max = bounds
                         
                         if min_date is None or well_min < min_date:
                             min_date = well_min
@@ -1923,21 +1921,30 @@ class WaterLevelVisualizer(QDialog):
             elif hasattr(self, 'plot_controls_dialog') and self.plot_controls_dialog:
                 agg_method = self.plot_controls_dialog.aggregate_combo.currentText().lower()
             
-        # Let the export manager handle this
-        self.export_manager.export_to_csv(
+        def on_export_finished(stats):
+            # Update status
+            if not stats:
+                self.status_bar.showMessage("Data export failed")
+            elif stats.get('cancelled'):
+                self.status_bar.showMessage("Data export cancelled")
+            elif apply_downsample:
+                self.status_bar.showMessage(f"Data exported with {downsample_method} downsampling using {agg_method} method")
+            else:
+                self.status_bar.showMessage("Data exported without downsampling")
+        
+        # Let the export manager handle this; it asks for the file format and layout
+        # and writes the files in the background
+        started = self.export_manager.export_data(
             self.selected_wells, 
             self.date_range, 
             show_manual,
             apply_downsample=apply_downsample, 
             downsample_method=downsample_method,
-            agg_method=agg_method if apply_downsample else None
+            agg_method=agg_method if apply_downsample else None,
+            on_finished=on_export_finished
         )
-        
-        # Update status
-        if apply_downsample:
-            self.status_bar.showMessage(f"Data exported with {downsample_method} downsampling using {agg_method} method")
-        else:
-            self.status_bar.showMessage("Data exported without downsampling")
+        if started:
+            self.status_bar.showMessage("Exporting data...")
     
     def on_theme_changed(self, index):
         """Handle theme changes from the combo box."""
@@ -2241,6 +2248,10 @@ class WaterLevelVisualizer(QDialog):
             self.well_line_styles = {}
             self.date_range = {'start': None, 'end': None}
             
+            # Release the previous database's connections and cached series
+            if self.db_path and os.path.abspath(self.db_path) != os.path.abspath(new_db_path):
+                TimeSeriesQueryService.for_database(self.db_path).close()
+            
             # Update database references
             self.db_manager = new_db_manager
             self.db_path = str(new_db_manager.current_db)
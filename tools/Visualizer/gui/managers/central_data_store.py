@@ -1,6 +1,10 @@
 """
 Central data store for managing shared data between visualizer components.
 Prevents redundant database queries and provides a single source of truth.
+
+Well data is cached by the data manager's query service, in the same
+memory-budgeted cache as the plot handler and the other managers use, so
+the store keeps no copies of its own.
 """
 
 import logging
@@ -31,10 +35,7 @@ class CentralDataStore(QObject):
     def __init__(self, data_manager):
         super().__init__()
         self.data_manager = data_manager
-        self._cache = {}  # Cache for loaded data
-        self._cache_timestamps = {}  # Track when data was cached
-        self._cache_ttl = 300  # Cache time-to-live in seconds (5 minutes)
-        self._loading_locks = {}  # Prevent duplicate concurrent loads
+        self._cache_ttl = 300  # Wells list time-to-live in seconds (5 minutes)
         self._wells_cache = None
         self._wells_cache_time = None
         
@@ -76,30 +77,9 @@ class CentralDataStore(QObject):
         Returns:
             DataFrame with well data or None if error
         """
-        # Create cache key including parameters
-        cache_key = f"{well_id}_{date_range}_{downsample}"
-        
-        # Check cache validity
-        if not force_reload and cache_key in self._cache:
-            cache_time = self._cache_timestamps.get(cache_key, 0)
-            if time.time() - cache_time < self._cache_ttl:
-                logger.debug(f"Returning cached data for {well_id}")
-                return self._cache[cache_key].copy()
-        
-        # Prevent duplicate concurrent loads
-        lock_key = cache_key
-        if lock_key not in self._loading_locks:
-            self._loading_locks[lock_key] = threading.Lock()
-            
-        # Check if another thread is already loading this data
-        if not self._loading_locks[lock_key].acquire(blocking=False):
-            logger.debug(f"Another thread is loading {well_id}, waiting...")
-            self._loading_locks[lock_key].acquire()
-            self._loading_locks[lock_key].release()
-            
-            # Check if data was loaded by the other thread
-            if cache_key in self._cache:
-                return self._cache[cache_key].copy()
+        query_service = getattr(self.data_manager, 'query_service', None)
+        if force_reload and query_service is not None:
+            query_service.clear(well_id)
         
         try:
             # Load data from database
@@ -123,10 +103,6 @@ class CentralDataStore(QObject):
             )
             
             if df is not None and not df.empty:
-                # Cache the data
-                self._cache[cache_key] = df.copy()
-                self._cache_timestamps[cache_key] = time.time()
-                
                 # Emit signal for interested components
                 self.well_data_updated.emit(well_id, df.copy())
                 
@@ -141,32 +117,34 @@ class CentralDataStore(QObject):
             self.error_occurred.emit(f"Failed to load {well_id}: {str(e)}")
             return None
         finally:
-            self._loading_locks[lock_key].release()
             self.loading_finished.emit()
     
     def clear_cache(self, well_id: Optional[str] = None):
         """Clear cache for specific well or all wells."""
+        query_service = getattr(self.data_manager, 'query_service', None)
         if well_id:
             # Clear specific well data
-            keys_to_remove = [k for k in self._cache.keys() if k.startswith(well_id)]
-            for key in keys_to_remove:
-                del self._cache[key]
-                self._cache_timestamps.pop(key, None)
+            if query_service is not None:
+                query_service.clear(well_id)
             logger.debug(f"Cleared cache for {well_id}")
         else:
             # Clear all cache
-            self._cache.clear()
-            self._cache_timestamps.clear()
+            if query_service is not None:
+                query_service.clear()
             self._wells_cache = None
             self._wells_cache_time = None
             logger.debug("Cleared all cache")
     
     def get_cache_info(self) -> Dict[str, Any]:
         """Get information about current cache state."""
+        query_service = getattr(self.data_manager, 'query_service', None)
+        if query_service is None:
+            return {'cached_entries': 0, 'cache_size_mb': 0.0}
+        stats = query_service.cache_stats()
         return {
-            'cached_wells': len(self._cache),
-            'cache_size_mb': sum(df.memory_usage(deep=True).sum() 
-                               for df in self._cache.values()) / 1024 / 1024,
-            'oldest_cache_age': min((time.time() - t for t in self._cache_timestamps.values()), 
-                                   default=0) if self._cache_timestamps else 0
-        }
\ No newline at end of file
+            'cached_entries': stats['entries'],
+            'cache_size_mb': stats['size_mb'],
+            'cache_budget_mb': stats['budget_mb'],
+            'cache_hits': stats['hits'],
+            'cache_misses': stats['misses']
+        }
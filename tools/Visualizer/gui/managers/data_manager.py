@@ -5,6 +5,8 @@ import psutil  # Add psutil for memory detection
 import time
 from pathlib import Path
 
+from query_service import TimeSeriesQueryService
+
 logger = logging.getLogger(__name__)
 
 class DataManager:
@@ -13,8 +15,9 @@ class DataManager:
     def __init__(self, db_path):
         self.db_path = db_path
         self._db_manager = None
-        self._schema_cache = {}
         self._data_cache = {}  # Cache for frequently accessed data
+        # Shared schema lookups and cached, memory-budgeted series
+        self.query_service = TimeSeriesQueryService.for_database(db_path)
         self._initialize_db_manager()
     
     def _initialize_db_manager(self):
@@ -88,24 +91,8 @@ class DataManager:
 
     def get_table_schema(self, table_name):
         """Get cached schema for the specified table"""
-        # Try to use the db_manager's schema cache if available
-        if self._db_manager and hasattr(self._db_manager, 'get_table_schema'):
-            return self._db_manager.get_table_schema(table_name)
-        
-        # Use internal cache if available
-        if table_name in self._schema_cache:
-            return self._schema_cache[table_name]
-        
-        # Not in cache, fetch from database
         try:
-            conn = self.get_optimized_connection()
-            cursor = conn.cursor()
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns_info = cursor.fetchall()
-            column_names = [col[1] for col in columns_info]
-            self._schema_cache[table_name] = column_names
-            self.release_connection(conn)
-            return column_names
+            return self.query_service.columns(table_name)
         except Exception as e:
             logger.error(f"Error getting schema for {table_name}: {e}")
             return []
@@ -255,79 +242,22 @@ class DataManager:
             logger.error(f"Error fetching wells: {e}")
             return [], []
 
-    def get_well_data(self, well_number):
+    def get_well_data(self, well_number, start_date=None, end_date=None, downsample=None):
         """
         Fetch time series data for a specific well.
 
         Args:
             well_number (str): The well number to fetch data for.
+            start_date: Optional first date to include.
+            end_date: Optional last date to include (a date-only value includes that whole day).
+            downsample (str): Optional pandas frequency to average to (e.g. '1D').
 
         Returns:
             pd.DataFrame: A DataFrame containing the well's time series data.
         """
-        # Check cache for well data source
-        source_cache_key = f'data_source_{well_number}'
-        data_source = None
-        if source_cache_key in self._data_cache:
-            data_source = self._data_cache[source_cache_key]
-            
         try:
-            conn = self.get_optimized_connection()
-            cursor = conn.cursor()
-
-            # Determine the data source for the well if not cached
-            if not data_source:
-                cursor.execute("SELECT data_source FROM wells WHERE well_number = ?", (well_number,))
-                result = cursor.fetchone()
-                data_source = result[0] if result else 'transducer'
-                # Cache the data source for future use
-                self._data_cache[source_cache_key] = data_source
-
-            # Query the appropriate table based on the data source
-            if data_source == 'telemetry':
-                query = """
-                    SELECT timestamp_utc, water_level, temperature
-                    FROM telemetry_level_readings
-                    WHERE well_number = ?
-                    ORDER BY timestamp_utc
-                """
-            else:
-                query = """
-                    SELECT timestamp_utc, water_level, temperature
-                    FROM water_level_readings
-                    WHERE well_number = ?
-                    ORDER BY timestamp_utc
-                """
-
-            # Use optimized batch loading instead of all at once
-            try:
-                # First check how many records we'll need to load
-                count_query = f"""
-                    SELECT COUNT(*) FROM {data_source == 'telemetry' and 'telemetry_level_readings' or 'water_level_readings'}
-                    WHERE well_number = ?
-                """
-                cursor.execute(count_query, (well_number,))
-                record_count = cursor.fetchone()[0]
-                
-                if record_count > 100000:
-                    logger.info(f"Loading large dataset ({record_count} records) for well {well_number} in batches")
-                    # Use chunked reading for very large datasets
-                    df = pd.read_sql_query(query, conn, params=(well_number,), chunksize=50000)
-                    # Combine all chunks
-                    df = pd.concat(list(df))
-                else:
-                    # Standard loading for smaller datasets
-                    df = pd.read_sql_query(query, conn, params=(well_number,))
-            except Exception as e:
-                logger.error(f"Error executing optimized query: {e}")
-                # Fallback to standard query
-                df = pd.read_sql_query(query, conn, params=(well_number,))
-                
-            if not df.empty:
-                df['timestamp_utc'] = pd.to_datetime(df['timestamp_utc'])
-
-            self.release_connection(conn)
-            return df
+            return self.query_service.get_series(well_number, start=start_date, end=end_date,
+                                                 resolution=downsample)
 
         except Exception as e:
             logger.error(f"Error fetching data for well {well_number}: {e}")
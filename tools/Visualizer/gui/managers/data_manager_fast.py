@@ -5,6 +5,8 @@ import psutil
 import time
 from pathlib import Path
 
+from query_service import TimeSeriesQueryService
+
 logger = logging.getLogger(__name__)
 
 class FastDataManager:
@@ -13,8 +15,9 @@ class FastDataManager:
     def __init__(self, db_path):
         self.db_path = db_path
         self._db_manager = None
-        self._schema_cache = {}
         self._data_cache = {}
+        # Shared schema lookups and cached, memory-budgeted series
+        self.query_service = TimeSeriesQueryService.for_database(db_path)
         self._initialize_db_manager()
         # Pre-warm database connection to avoid cold start delay
         self._pre_warm_database()
@@ -91,18 +94,8 @@ class FastDataManager:
         
     def get_table_schema(self, table_name):
         """Get table schema from cache or database"""
-        if table_name in self._schema_cache:
-            return self._schema_cache[table_name]
-        
         try:
-            conn = self.get_optimized_connection()
-            cursor = conn.cursor()
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns_info = cursor.fetchall()
-            column_names = [col[1] for col in columns_info]
-            self._schema_cache[table_name] = column_names
-            self.release_connection(conn)
-            return column_names
+            return self.query_service.columns(table_name)
         except Exception as e:
             logger.error(f"Error getting schema for {table_name}: {e}")
             return []
@@ -198,84 +191,19 @@ class FastDataManager:
             return 0
 
     def get_well_data(self, well_number, start_date=None, end_date=None, downsample=None):
-        """Fast well data retrieval with optional date filtering and downsampling"""
-        import time
+        """
+        Fast well data retrieval with optional date filtering and downsampling.
+
+        The date range is filtered and fixed-width downsampling ('1h', '1D', ...)
+        averaged in SQL by the shared query service, which caches the result.
+        A date-only end_date includes that whole day.
+        """
         total_start = time.time()
-        
         try:
-            # Time the connection process
-            conn_start = time.time()
-            conn = self.get_optimized_connection()
-            conn_time = time.time() - conn_start
-            logger.info(f"[TIMING] Database connection took {conn_time:.3f} seconds")
-            
-            cursor = conn.cursor()
-
-            # Time the data source lookup
-            source_start = time.time()
-            cursor.execute("SELECT data_source FROM wells WHERE well_number = ?", (well_number,))
-            result = cursor.fetchone()
-            data_source = result[0] if result else 'transducer'
-            source_time = time.time() - source_start
-            logger.info(f"[TIMING] Data source lookup took {source_time:.3f} seconds")
-
-            # Build query with optional date filtering
-            base_query = """
-                SELECT timestamp_utc, water_level, temperature
-                FROM {table}
-                WHERE well_number = ?
-            """
-            
-            params = [well_number]
-            
-            # Add date filtering if provided
-            if start_date:
-                base_query += " AND timestamp_utc >= ?"
-                params.append(start_date)
-            if end_date:
-                base_query += " AND timestamp_utc <= ?"
-                params.append(end_date)
-                
-            base_query += " ORDER BY timestamp_utc"
-            
-            # Query appropriate table  
-            query_build_start = time.time()
-            if data_source == 'telemetry':
-                query = base_query.format(table="telemetry_level_readings")
-            else:
-                query = base_query.format(table="water_level_readings")
-            query_build_time = time.time() - query_build_start
-            logger.info(f"[TIMING] Query building took {query_build_time:.3f} seconds")
-            
-            # Time the actual SQL query execution
-            sql_start = time.time()
-            df = pd.read_sql_query(query, conn, params=params)
-            sql_time = time.time() - sql_start
-            logger.info(f"[TIMING] SQL query execution took {sql_time:.3f} seconds ({len(df)} raw rows)")
-            
-            self.release_connection(conn)
-            conn_release_time = time.time() - sql_start - sql_time
-            logger.info(f"[TIMING] Connection release took {conn_release_time:.3f} seconds")
-            
-            # Time the downsampling process
-            if downsample and len(df) > 0:
-                downsample_start = time.time()
-                original_count = len(df)
-                # Convert timestamp to datetime if not already
-                df['timestamp_utc'] = pd.to_datetime(df['timestamp_utc'])
-                df = df.set_index('timestamp_utc')
-                
-                # Downsample to the specified frequency (e.g., '1D' for daily, '1H' for hourly)
-                df = df.resample(downsample).mean()
-                df = df.reset_index()
-                
-                downsample_time = time.time() - downsample_start
-                logger.info(f"[TIMING] Downsampling took {downsample_time:.3f} seconds: {original_count} -> {len(df)} points using {downsample}")
-            elif downsample:
-                logger.info(f"[TIMING] No data to downsample")
-            
-            total_time = time.time() - total_start
-            logger.info(f"[TIMING] Total get_well_data took {total_time:.3f} seconds")
+            df = self.query_service.get_series(well_number, start=start_date, end=end_date,
+                                               resolution=downsample)
+            logger.info(f"[TIMING] Total get_well_data took {time.time() - total_start:.3f} seconds "
+                        f"({len(df)} points, downsample={downsample})")
             return df
 
         except Exception as e:
@@ -1,24 +1,82 @@
 import os
+import threading
 import pandas as pd
 from datetime import datetime
 import logging
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QLabel, QPushButton, QButtonGroup, 
-    QRadioButton, QFileDialog, QMessageBox
+    QRadioButton, QFileDialog, QMessageBox, QProgressDialog
 )
 
+from export_engine import ExportEngine, downsample_rule, missing_dependency
+
 logger = logging.getLogger(__name__)
 
+
+class ExportWorker(QThread):
+    """Worker thread running a streaming export without freezing the UI"""
+    progress = pyqtSignal(int)
+    status_update = pyqtSignal(str)
+    completed = pyqtSignal(dict)  # Export stats
+    error = pyqtSignal(str)
+
+    def __init__(self, engine, wells, output_dir, options):
+        super().__init__()
+        self.engine = engine
+        self.wells = wells
+        self.output_dir = output_dir
+        self.options = options
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Stop the export after the chunk being written"""
+        self._cancel.set()
+
+    def run(self):
+        try:
+            def report_progress(percent, message):
+                self.progress.emit(percent)
+                self.status_update.emit(message)
+
+            stats = self.engine.export(self.wells, self.output_dir, progress=report_progress,
+                                       cancelled=self._cancel.is_set, **self.options)
+            self.completed.emit(stats)
+
+        except Exception as e:
+            logger.error(f"Error exporting data: {e}", exc_info=True)
+            self.error.emit(str(e))
+
+
 class ExportManager:
     """Manages data and plot export operations."""
     
+    # (label, value) choices of the export options dialog
+    FORMAT_OPTIONS = [("CSV (.csv)", 'csv'), ("Parquet (.parquet)", 'parquet'), ("Excel (.xlsx)", 'xlsx')]
+    LAYOUT_OPTIONS = [("One file per well", 'per_well'),
+                      ("Single file, one row per well and time", 'long'),
+                      ("Single file, one column per well", 'wide')]
+    
     def __init__(self, data_manager, plot_handler):
         self.data_manager = data_manager
         self.plot_handler = plot_handler
         self.db_path = data_manager.db_path  # Store db_path for use in plot_handler calls
+        self._export_worker = None
+        self._progress_dialog = None
     
     def export_to_csv(self, selected_wells, date_range, show_manual, apply_downsample=False, downsample_method=None, agg_method=None):
-        """Export selected wells data to CSV.
+        """Export selected wells data to one CSV file per well (see export_data)."""
+        self.export_data(selected_wells, date_range, show_manual, apply_downsample=apply_downsample,
+                         downsample_method=downsample_method, agg_method=agg_method,
+                         export_format='csv', layout='per_well')
+    
+    def export_data(self, selected_wells, date_range, show_manual, apply_downsample=False, downsample_method=None,
+                    agg_method=None, export_format=None, layout=None, on_finished=None):
+        """Export selected wells data in the background.
+        
+        The date range and downsampling are applied while reading the database,
+        and files are written in chunks, so memory use stays flat however much
+        data is exported.
         
         Args:
             selected_wells (list): List of well numbers to export
@@ -27,109 +85,152 @@ class ExportManager:
             apply_downsample (bool): Whether to apply downsampling
             downsample_method (str): Downsampling method (e.g., '1 Hour', '1 Day')
             agg_method (str): Aggregation method (mean, median, min, max)
+            export_format (str): 'csv', 'parquet' or 'xlsx'; asked for when None
+            layout (str): 'per_well', 'long' or 'wide'; asked for when None
+            on_finished (callable): Called with the export stats once the export ends
+            
+        Returns:
+            bool: True if the export was started
         """
         if not selected_wells:
             QMessageBox.warning(None, "No Wells Selected", "Please select at least one well to export.")
             return
         
+        if self._export_worker is not None and self._export_worker.isRunning():
+            QMessageBox.warning(None, "Export Running", "Please wait for the current export to finish.")
+            return
+        
+        if export_format is None or layout is None:
+            options = self._ask_export_options(export_format, layout)
+            if not options:
+                return
+            export_format, layout = options
+        
+        package = missing_dependency(export_format)
+        if package:
+            QMessageBox.warning(None, "Missing Dependency",
+                                f"This export format requires the '{package}' package.\n"
+                                f"Please install it using: pip install {package}")
+            return
+        
         # Ask for output directory
         output_dir = QFileDialog.getExistingDirectory(None, "Select Output Directory")
         if not output_dir:
             return
         
-        try:
-            # Progress counter
-            total_exports = len(selected_wells)
-            success_count = 0
-            exported_files = []
-            
-            for well_number in selected_wells:
-                # Get well info to get CAE number from plot_handler instead of data_manager
-                well_info = self.plot_handler.get_well_info(well_number, self.db_path)
-                cae_number = well_info.get('cae_number', '') if well_info else ''
-                
-                # Create filename with well number and CAE number
-                filename = f"{well_number}"
-                if cae_number:
-                    filename += f" ({cae_number})"
-                
-                # Get data for the selected well
-                df = self.data_manager.get_well_data(well_number)
-                
-                # Apply date filtering
-                if not df.empty and date_range['start'] and date_range['end']:
-                    df = self.data_manager.filter_data_by_date_range(df, date_range['start'], date_range['end'])
-                
-                if df.empty:
-                    logger.warning(f"No data to export for well {well_number}")
-                    continue
-                
-                # Apply downsampling if requested
-                if apply_downsample and downsample_method and not df.empty:
-                    # Use the plot handler to apply the same downsampling as displayed in the plot
-                    try:
-                        # Add suffix to filename to indicate downsampling
-                        filename += f"_{downsample_method.replace(' ', '')}"
-                        if agg_method:
-                            filename += f"_{agg_method}"
-                            
-                        # Set the aggregation method in the plot handler temporarily
-                        original_agg_method = getattr(self.plot_handler, '_forced_agg_method', None)
-                        self.plot_handler._forced_agg_method = agg_method
-                        
-                        # Apply downsampling
-                        df = self.plot_handler.downsample_data(df, method=downsample_method)
-                        
-                        # Restore original setting
-                        if original_agg_method is not None:
-                            self.plot_handler._forced_agg_method = original_agg_method
-                        else:
-                            delattr(self.plot_handler, '_forced_agg_method')
-                            
-                    except Exception as e:
-                        logger.error(f"Error applying downsampling for export: {e}")
-                        # Continue with original data
-                
-                # Export to CSV
-                file_path = os.path.join(output_dir, f"{filename}.csv")
-                
-                # Export to CSV
-                df.to_csv(file_path, index=False)
-                exported_files.append(os.path.basename(file_path))
-                success_count += 1
-                
-                # Get manual readings too if showing them
-                if show_manual:
-                    manual_readings = self.data_manager.get_manual_readings(well_number)
-                    
-                    # Apply date filtering to manual readings
-                    if not manual_readings.empty and date_range['start'] and date_range['end']:
-                        manual_readings = self.data_manager.filter_data_by_date_range(
-                            manual_readings, date_range['start'], date_range['end']
-                        )
-                    
-                    # Export manual readings if available
-                    if not manual_readings.empty:
-                        manual_file_path = os.path.join(output_dir, f"{filename}_manual.csv")
-                        manual_readings.to_csv(manual_file_path, index=False)
-                        exported_files.append(os.path.basename(manual_file_path))
-            
+        # Name files after the well number and CAE number
+        file_names = {}
+        for well_number in selected_wells:
+            well_info = self.plot_handler.get_well_info(well_number, self.db_path)
+            cae_number = well_info.get('cae_number', '') if well_info else ''
+            file_names[well_number] = f"{well_number} ({cae_number})" if cae_number else f"{well_number}"
+        
+        # Add suffix to filenames to indicate downsampling
+        resolution = downsample_rule(downsample_method) if apply_downsample else None
+        suffix = ""
+        if resolution:
+            suffix = f"_{downsample_method.replace(' ', '')}"
+            if agg_method:
+                suffix += f"_{agg_method}"
+        
+        date_range = date_range or {}
+        options = {
+            'export_format': export_format,
+            'layout': layout,
+            'start': date_range.get('start'),
+            'end': date_range.get('end'),
+            'resolution': resolution,
+            'aggregate': agg_method or 'mean',
+            'include_manual': show_manual,
+            'file_names': file_names,
+            'base_name': f"wells_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'suffix': suffix
+        }
+        
+        self._progress_dialog = QProgressDialog("Exporting data...", "Cancel", 0, 100)
+        self._progress_dialog.setWindowTitle("Exporting Data")
+        self._progress_dialog.setWindowModality(Qt.ApplicationModal)
+        self._progress_dialog.setMinimumDuration(0)
+        self._progress_dialog.setAutoClose(False)
+        self._progress_dialog.setAutoReset(False)
+        
+        worker = ExportWorker(ExportEngine(self.db_path), list(selected_wells), output_dir, options)
+        worker.progress.connect(self._progress_dialog.setValue)
+        worker.status_update.connect(self._progress_dialog.setLabelText)
+        worker.completed.connect(lambda stats: self._on_export_finished(stats, output_dir, len(selected_wells), on_finished))
+        worker.error.connect(lambda message: self._on_export_error(message, on_finished))
+        self._progress_dialog.canceled.connect(worker.cancel)
+        self._export_worker = worker
+        worker.start()
+        return True
+    
+    def _ask_export_options(self, export_format=None, layout=None):
+        """Ask for the file format and layout of an export; None if the dialog is closed."""
+        dialog = QDialog()
+        dialog.setWindowTitle("Export Options")
+        dialog_layout = QVBoxLayout(dialog)
+        
+        groups = {}
+        for title, choices, current in (("File format:", self.FORMAT_OPTIONS, export_format or 'csv'),
+                                        ("Layout:", self.LAYOUT_OPTIONS, layout or 'per_well')):
+            dialog_layout.addWidget(QLabel(title))
+            group = QButtonGroup(dialog)
+            for i, (label, value) in enumerate(choices):
+                radio = QRadioButton(label)
+                radio.setChecked(value == current)
+                group.addButton(radio, i)
+                dialog_layout.addWidget(radio)
+            groups[title] = (group, choices)
+        
+        ok_btn = QPushButton("OK")
+        ok_btn.clicked.connect(dialog.accept)
+        dialog_layout.addWidget(ok_btn)
+        
+        if dialog.exec_() != QDialog.Accepted:
+            return None
+        
+        group, choices = groups["File format:"]
+        export_format = choices[group.checkedId()][1]
+        group, choices = groups["Layout:"]
+        layout = choices[group.checkedId()][1]
+        return export_format, layout
+    
+    def _close_progress_dialog(self):
+        if self._progress_dialog is not None:
+            self._progress_dialog.close()
+            self._progress_dialog = None
+    
+    def _on_export_finished(self, stats, output_dir, total_exports, on_finished=None):
+        """Show the result of a finished export."""
+        self._close_progress_dialog()
+        
+        exported_files = [os.path.basename(path) for path in stats['files']]
+        files_text = "\n".join(exported_files[:5])
+        if len(exported_files) > 5:
+            files_text += f"\n... and {len(exported_files) - 5} more files"
+        
+        if stats.get('cancelled'):
+            message = "Export cancelled."
+            if exported_files:
+                message += f"\n\nFiles completed before cancelling:\n{files_text}"
+            QMessageBox.information(None, "Export Cancelled", message)
+        elif stats['wells_exported'] > 0:
             # Show success message with list of exported files
-            if success_count > 0:
-                files_text = "\n".join(exported_files[:5])
-                if len(exported_files) > 5:
-                    files_text += f"\n... and {len(exported_files) - 5} more files"
-                
-                QMessageBox.information(None, "Export Successful", 
-                                      f"Successfully exported data for {success_count} out of {total_exports} wells to {output_dir}.\n\n"
-                                      f"Exported files:\n{files_text}")
-            else:
-                QMessageBox.warning(None, "Export Warning", 
-                                  f"No data found to export for the selected wells in the specified date range.")
-                
-        except Exception as e:
-            logger.error(f"Error exporting data: {e}")
-            QMessageBox.critical(None, "Export Error", f"Failed to export data: {str(e)}")
+            QMessageBox.information(None, "Export Successful", 
+                                  f"Successfully exported {stats['rows']:,} rows for {stats['wells_exported']} out of {total_exports} wells to {output_dir}.\n\n"
+                                  f"Exported files:\n{files_text}")
+        else:
+            QMessageBox.warning(None, "Export Warning", 
+                              f"No data found to export for the selected wells in the specified date range.")
+        
+        if on_finished:
+            on_finished(stats)
+    
+    def _on_export_error(self, message, on_finished=None):
+        self._close_progress_dialog()
+        QMessageBox.critical(None, "Export Error", f"Failed to export data: {message}")
+        if on_finished:
+            on_finished(None)
     
     def export_plot_image(self, figure, selected_wells):
         """Export the current plot as an image."""
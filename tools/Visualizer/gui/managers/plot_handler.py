@@ -15,6 +15,8 @@ import traceback
 import json
 import shutil
 
+from query_service import TimeSeriesQueryService
+
 logger = logging.getLogger(__name__)
 
 class PlotHandler(QObject):
@@ -931,43 +933,22 @@ class PlotHandler(QObject):
     def get_well_info(self, well_number: str, db_path: str) -> dict:
         """Get well information from database with improved error handling for schema differences."""
         try:
-            with sqlite3.connect(db_path) as conn:
-                cursor = conn.cursor()
-                
-                # First, check which columns exist in the wells table
-                cursor.execute("PRAGMA table_info(wells)")
-                columns = [col[1] for col in cursor.fetchall()]
-                
-                # Create a dynamic query based on available columns
-                available_columns = ['well_number']  # Always include well_number
-                
-                # Add optional columns if they exist
-                optional_columns = ['aquifer', 'status', 'data_source', 'latitude', 'longitude', 
-                                   'cae_number', 'caesar_number', 'wellfield', 'toc']
-                
-                for col in optional_columns:
-                    if col in columns:
-                        available_columns.append(col)
-                
-                # Create the query with only available columns
-                query = f"SELECT {', '.join(available_columns)} FROM wells WHERE well_number = ?"
-                cursor.execute(query, (well_number,))
-                result = cursor.fetchone()
-                
-                if result:
-                    # Create a dictionary with column names and values
-                    well_info = dict(zip(available_columns, result))
+            # Only the columns present in this database's wells table are selected
+            optional_columns = ['aquifer', 'status', 'data_source', 'latitude', 'longitude', 
+                               'cae_number', 'caesar_number', 'wellfield', 'toc']
+            well_info = TimeSeriesQueryService.for_database(db_path).get_well_row(well_number, optional_columns)
+            
+            if well_info:
+                # Add default values for common missing columns
+                if 'data_source' not in well_info:
+                    well_info['data_source'] = 'transducer'
+                if 'aquifer' not in well_info:
+                    well_info['aquifer'] = 'Unknown'
+                if 'status' not in well_info:
+                    well_info['status'] = 'Active'
                     
-                    # Add default values for common missing columns
-                    if 'data_source' not in well_info:
-                        well_info['data_source'] = 'transducer'
-                    if 'aquifer' not in well_info:
-                        well_info['aquifer'] = 'Unknown'
-                    if 'status' not in well_info:
-                        well_info['status'] = 'Active'
-                        
-                    return well_info
-                return None
+                return well_info
+            return None
         except Exception as e:
             logger.error(f"Error getting well info: {e}")
             return None
@@ -985,143 +966,33 @@ class PlotHandler(QObject):
             data_source = well_info.get('data_source', 'transducer')
             logger.debug(f"Well {well_number} has data source: {data_source}")
             
-            with sqlite3.connect(db_path) as conn:
-                # Check if the necessary tables exist
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = [table[0] for table in cursor.fetchall()]
-                
-                # Build date range filter if provided
-                date_filter = ""
-                params = [well_number]
+            # The date range is filtered in SQL; a date-only end includes that whole day
+            date_range = date_range or {}
+            query_service = TimeSeriesQueryService.for_database(db_path)
+            df = query_service.get_series(well_number, start=date_range.get('start'),
+                                          end=date_range.get('end'), source=data_source)
+            
+            if not df.empty:
+                table = query_service.readings_table(well_number, data_source)
+                if table == 'water_level_readings':
+                    for cae_column in ('cae_number', 'caesar_number'):
+                        if cae_column in well_info:
+                            df['cae'] = well_info[cae_column]
+                            break
+                    df['source_type'] = 'transducer'
+                else:
+                    df['source_type'] = 'telemetry'
                 
-                # Only add date filter if both start and end dates are valid
-                if date_range:
-                    # Improved validation for date parameters
-                    valid_start = False
-                    valid_end = False
-                    
-                    if date_range.get('start'):
-                        try:
-                            # Convert to string format for SQLite
-                            start_date = pd.Timestamp(date_range['start']).strftime('%Y-%m-%d %H:%M:%S')
-                            valid_start = True
-                        except (TypeError, ValueError) as e:
-                            logger.warning(f"Invalid start date: {e}")
-                    
-                    if date_range.get('end'):
-                        try:
-                            # Convert to string format for SQLite
-                            end_date = pd.Timestamp(date_range['end']).strftime('%Y-%m-%d %H:%M:%S')
-                            valid_end = True
-                        except (TypeError, ValueError) as e:
-                            logger.warning(f"Invalid end date: {e}")
-                    
-                    # Add date filter based on what's valid
-                    if valid_start and valid_end:
-                        date_filter = "AND timestamp_utc BETWEEN ? AND ?"
-                        params.extend([start_date, end_date])
-                        logger.debug(f"Using date filter: {start_date} to {end_date}")
-                    elif valid_start:
-                        date_filter = "AND timestamp_utc >= ?"
-                        params.append(start_date)
-                        logger.debug(f"Using start date filter: {start_date}")
-                    elif valid_end:
-                        date_filter = "AND timestamp_utc <= ?"
-                        params.append(end_date)
-                        logger.debug(f"Using end date filter: {end_date}")
-                    else:
-                        logger.debug("No valid date range provided, fetching all data")
+                # Set index to timestamp_utc
+                df.set_index('timestamp_utc', inplace=True)
                 
-                # Query based on data source and available tables
-                if data_source == 'telemetry' and 'telemetry_level_readings' in tables:
-                    # Check which columns exist in telemetry_level_readings
-                    cursor.execute("PRAGMA table_info(telemetry_level_readings)")
-                    columns = [col[1] for col in cursor.fetchall()]
-                    
-                    # Build a query with only existing columns
-                    select_cols = ['timestamp_utc']
-                    for col in ['water_level', 'temperature']:
-                        if col in columns:
-                            select_cols.append(col)
-                    
-                    query = f"""
-                        SELECT {', '.join(select_cols)},
-                               'telemetry' as source_type
-                        FROM telemetry_level_readings
-                        WHERE well_number = ? {date_filter}
-                        ORDER BY timestamp_utc
-                    """
-                elif 'water_level_readings' in tables:
-                    # Check which columns exist in water_level_readings
-                    cursor.execute("PRAGMA table_info(water_level_readings)")
-                    reading_columns = [col[1] for col in cursor.fetchall()]
-                    
-                    # Build a query with only existing columns
-                    select_cols = ['r.timestamp_utc']
-                    for col in ['water_level', 'temperature']:
-                        if col in reading_columns:
-                            select_cols.append(f'r.{col}')
-                    
-                    # Check if wells table has cae_number
-                    cursor.execute("PRAGMA table_info(wells)")
-                    well_columns = [col[1] for col in cursor.fetchall()]
-                    
-                    if 'cae_number' in well_columns:
-                        select_cols.append('wells.cae_number as cae')
-                    elif 'caesar_number' in well_columns:
-                        select_cols.append('wells.caesar_number as cae')
-                    
-                    query = f"""
-                        SELECT {', '.join(select_cols)},
-                               'transducer' as source_type
-                        FROM water_level_readings r
-                        JOIN wells ON r.well_number = wells.well_number
-                        WHERE r.well_number = ? {date_filter}
-                        ORDER BY r.timestamp_utc
-                    """
-                else:
-                    logger.error(f"No suitable data table found for well {well_number}")
-                    return pd.DataFrame()
+                # Add computed columns for corrections if they don't exist
+                if 'water_level_corrected' not in df.columns:
+                    df['water_level_corrected'] = df['water_level']
                 
-                # Execute query with defensive error handling
-                try:
-                    logger.debug(f"Executing query with params: {params}")
-                    df = pd.read_sql_query(query, conn, params=params)
-                except sqlite3.OperationalError as e:
-                    logger.error(f"Database query error: {e}")
-                    # Attempt an even simpler fallback query
-                    simple_query = f"""
-                        SELECT timestamp_utc, water_level
-                        FROM {"telemetry_level_readings" if data_source == 'telemetry' else "water_level_readings"}
-                        WHERE well_number = ?
-                        ORDER BY timestamp_utc
-                    """
-                    try:
-                        logger.debug("Attempting fallback query")
-                        df = pd.read_sql_query(simple_query, conn, params=[well_number])
-                    except Exception as e2:
-                        logger.error(f"Fallback query also failed: {e2}")
-                        return pd.DataFrame()
+                logger.debug(f"Retrieved {len(df)} readings for well {well_number}")
                 
-                if not df.empty:
-                    # Convert timestamp to datetime
-                    df['timestamp_utc'] = pd.to_datetime(df['timestamp_utc'])
-                    
-                    # Set index to timestamp_utc
-                    df.set_index('timestamp_utc', inplace=True)
-                    
-                    # Add default value for missing temperature column
-                    if 'temperature' not in df.columns:
-                        df['temperature'] = np.nan
-                    
-                    # Add computed columns for corrections if they don't exist
-                    if 'water_level_corrected' not in df.columns:
-                        df['water_level_corrected'] = df['water_level']
-                    
-                    logger.debug(f"Retrieved {len(df)} readings for well {well_number}")
-                    
-                return df
+            return df
                 
         except Exception as e:
             logger.error(f"Error getting well data: {e}")
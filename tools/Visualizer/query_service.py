@@ -0,0 +1,617 @@
+"""
+Time series query service shared by the visualizer's data managers, plot
+handler and central data store.
+
+* One service per database file, reached through
+  ``TimeSeriesQueryService.for_database``, so every component asking for a
+  well gets the same loaded frame.
+* Table columns and the data source of each well are looked up once.
+* Date ranges are filtered in SQL on the (well_number, timestamp_utc) index,
+  and fixed-width resolutions ('30min', '6h', '1D', ...) are averaged in SQL,
+  so only the points to be shown leave SQLite. Calendar rules ('W-MON', 'MS')
+  are resampled in pandas from the filtered rows.
+* Frames are built from NumPy arrays: a datetime64 ``timestamp_utc`` column
+  and float64 value columns.
+* Loaded frames and other cached results of all databases share one LRU
+  cache bounded by a memory budget. A database's entries are dropped when
+  its file changes or another connection commits to it (WAL-mode writes
+  included, which leave the main file untouched until a checkpoint).
+* ``iter_series`` streams the same frames in chunks, uncached, for exports.
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_BUDGET_MB = 512
+SERIES_COLUMNS = ('water_level', 'temperature')
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+SQL_AGGREGATES = {'mean': 'AVG', 'min': 'MIN', 'max': 'MAX'}
+PANDAS_AGGREGATES = ('mean', 'median', 'min', 'max')
+DEFAULT_CHUNK_ROWS = 50000
+_LEGACY_ALIASES = {'H': 'h', 'T': 'min', 'S': 's', 'L': 'ms'}
+
+# Seconds since the epoch of a reading; unixepoch() is about twice as fast where available
+_EPOCH_SECONDS = ("unixepoch(timestamp_utc)" if sqlite3.sqlite_version_info >= (3, 38, 0)
+                  else "CAST(strftime('%s', timestamp_utc) AS INTEGER)")
+
+_CONNECTION_PRAGMAS = (
+    'PRAGMA query_only = TRUE',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -65536',     # 64MB page cache
+    'PRAGMA mmap_size = 1073741824',  # 1GB memory mapping
+)
+
+
+def normalize_resolution(resolution) -> Optional[str]:
+    """A pandas frequency string, accepting the older 'H'/'T' aliases; None for no resampling"""
+    if not resolution or resolution in ('none', 'No Downsampling'):
+        return None
+    try:
+        to_offset(resolution)
+        return resolution
+    except ValueError:
+        stripped = resolution.rstrip('HTSL')
+        legacy = resolution[len(stripped):]
+        if len(legacy) == 1:
+            return stripped + _LEGACY_ALIASES[legacy]
+        raise
+
+
+def resolution_seconds(resolution) -> Optional[int]:
+    """Bucket width of a fixed resolution that divides a day evenly, or None"""
+    try:
+        resolution = normalize_resolution(resolution)
+        seconds = to_offset(resolution).nanos / 1e9 if resolution else None
+    except (ValueError, TypeError):
+        return None
+    # Buckets aligned to the epoch then match pandas' resampling from midnight
+    if not seconds or seconds != int(seconds) or seconds > 86400 or 86400 % int(seconds):
+        return None
+    return int(seconds)
+
+
+def _date_bound(value, end: bool = False) -> Optional[Tuple[str, str]]:
+    """Comparison and stored-text value of a date bound; a date-only end includes its whole day"""
+    if value is None or value == '':
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Ignoring invalid date bound {value!r}: {e}")
+        return None
+    if pd.isna(timestamp):
+        return None
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    date_only = (isinstance(value, date) and not isinstance(value, datetime)) or \
+        (isinstance(value, str) and len(value.strip()) <= 10)
+    if end and date_only:
+        return '<', (timestamp + pd.Timedelta(days=1)).strftime(TIMESTAMP_FORMAT)
+    return ('<=' if end else '>='), timestamp.strftime(TIMESTAMP_FORMAT)
+
+
+def _parse_timestamps(values: Sequence) -> np.ndarray:
+    array = np.asarray(values, dtype=object)
+    try:
+        parsed = pd.to_datetime(array, format='ISO8601')
+    except (ValueError, TypeError):
+        parsed = pd.to_datetime(array, format='mixed', errors='coerce', utc=True).tz_localize(None)
+    return parsed.values.astype('datetime64[ns]')
+
+
+def _float_column(values: Sequence) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate bytes held by a cached value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)) and value:
+        sample = value[:100]
+        per_item = sum(sys.getsizeof(item) + (sum(sys.getsizeof(v) for v in item)
+                                               if isinstance(item, (list, tuple)) else 0)
+                       for item in sample) / len(sample)
+        return sys.getsizeof(value) + int(per_item * len(value))
+    return sys.getsizeof(value)
+
+
+class _BudgetCache:
+    """LRU cache of results whose total estimated size stays within a memory budget"""
+
+    def __init__(self, budget_mb: float):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._entries: 'OrderedDict[Hashable, Tuple[float, int, Any]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, max_age: Optional[float] = None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (max_age is not None and time.time() - entry[0] >= max_age):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, value: Any):
+        size = _estimate_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.budget:
+                logger.debug(f"Not caching {key[:3]}: {size / 1e6:.1f}MB exceeds the memory budget")
+                return
+            self._entries[key] = (time.time(), size, value)
+            self._bytes += size
+            self._evict()
+
+    def set_budget(self, budget_mb: float):
+        with self._lock:
+            self.budget = int(budget_mb * 1024 * 1024)
+            self._evict()
+
+    def discard(self, matches: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if matches(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_mb': self._bytes / 1024 / 1024,
+                'budget_mb': self.budget / 1024 / 1024,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _evict(self):
+        while self._bytes > self.budget and self._entries:
+            key, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            logger.debug(f"Evicted {key[:3]} ({size / 1e6:.1f}MB) from the query cache")
+
+
+# One budget for every database the visualizer opens
+_cache = _BudgetCache(DEFAULT_MEMORY_BUDGET_MB)
+
+
+def set_memory_budget(budget_mb: float):
+    """Change the memory budget of the shared query cache"""
+    _cache.set_budget(budget_mb)
+
+
+class TimeSeriesQueryService:
+    """Read-only, cached queries of one visualizer database"""
+
+    _services: Dict[str, 'TimeSeriesQueryService'] = {}
+    _services_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db_path) -> 'TimeSeriesQueryService':
+        """The shared service of a database file"""
+        key = os.path.abspath(str(db_path))
+        with cls._services_lock:
+            service = cls._services.get(key)
+            if service is None:
+                service = cls._services[key] = cls(key)
+            return service
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._generation = 0
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._tables: Optional[List[str]] = None
+        self._columns: Dict[str, List[str]] = {}
+        self._sources: Optional[Dict[str, str]] = None
+        self._monitor: Optional[sqlite3.Connection] = None
+        self._version = self._file_version()
+
+    # Connections and invalidation
+
+    def _file_version(self) -> Tuple:
+        """The file's mtime and size, and the data version seen by the monitor connection"""
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return 0, 0, None
+        return stat.st_mtime_ns, stat.st_size, self._data_version()
+
+    def _data_version(self) -> Optional[int]:
+        """
+        PRAGMA data_version of a connection kept open for it.
+
+        The value changes whenever another connection commits, so writes that
+        only reach the -wal file are noticed as well.
+        """
+        with self._lock:
+            try:
+                if self._monitor is None:
+                    self._monitor = self._open()
+                return self._monitor.execute('PRAGMA data_version').fetchone()[0]
+            except sqlite3.Error as e:
+                logger.debug(f"Could not read data_version of {self.db_path}: {e}")
+                return None
+
+    def _check_version(self):
+        """Forget everything known about the database once its contents have changed"""
+        if self._file_version() != self._version:
+            logger.info(f"Database changed on disk, clearing cached queries: {self.db_path}")
+            self.close()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True,
+                               check_same_thread=False)
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'generation', None) == self._generation:
+            return conn
+        conn = self._open()
+        self._local.conn = conn
+        self._local.generation = self._generation
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def execute(self, query: str, params: Sequence = ()) -> List[tuple]:
+        """Rows of a query, on this thread's read-only connection"""
+        self._check_version()
+        start = time.perf_counter()
+        rows = self._connection().execute(query, tuple(params)).fetchall()
+        logger.debug(f"PERF: query returned {len(rows)} rows in {(time.perf_counter() - start) * 1000:.2f}ms")
+        return rows
+
+    def close(self):
+        """Close the connections and drop this database's cached results"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.debug(f"Error closing query connection: {e}")
+            self._connections.clear()
+            if self._monitor is not None:
+                self._monitor.close()  # Reopened below, in case the file was replaced
+                self._monitor = None
+            # Connections held by other threads are reopened on their next query
+            self._generation += 1
+            self._tables = None
+            self._columns.clear()
+            self._sources = None
+            self._version = self._file_version()
+        _cache.discard(lambda key: key[0] == self.db_path)
+
+    # Cached results
+
+    def remember(self, key: Tuple, loader: Callable[[], Any], max_age: Optional[float] = None) -> Any:
+        """
+        Result of loader, cached under key in the shared memory-budgeted cache.
+
+        Concurrent calls for the same key run loader once. Results are shared,
+        so callers must not modify them (series are returned as copies).
+        """
+        self._check_version()
+        full_key = (self.db_path,) + tuple(key)
+        entry = _cache.get(full_key, max_age)
+        if entry is not None:
+            return entry[2]
+
+        with self._lock:
+            loading = self._loading.setdefault(full_key, threading.Lock())
+        try:
+            with loading:
+                entry = _cache.get(full_key, max_age)
+                if entry is not None:
+                    return entry[2]
+                value = loader()
+                _cache.put(full_key, value)
+                return value
+        finally:
+            with self._lock:
+                self._loading.pop(full_key, None)
+
+    def clear(self, well_number: Optional[str] = None) -> int:
+        """Drop cached results of one well, or of the whole database"""
+        if well_number is None:
+            return _cache.discard(lambda key: key[0] == self.db_path)
+        return _cache.discard(lambda key: key[0] == self.db_path and len(key) > 2 and key[2] == well_number)
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        return _cache.stats()
+
+    # Schema
+
+    def tables(self) -> List[str]:
+        self._check_version()
+        if self._tables is None:
+            self._tables = [row[0] for row in self.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        return self._tables
+
+    def columns(self, table_name: str) -> List[str]:
+        """Column names of a table (empty if it does not exist)"""
+        self._check_version()
+        if table_name not in self._columns:
+            if table_name not in self.tables():
+                return []
+            escaped = table_name.replace('"', '""')
+            self._columns[table_name] = [row[1] for row in self.execute(f'PRAGMA table_info("{escaped}")')]
+        return self._columns[table_name]
+
+    def well_source(self, well_number: str) -> str:
+        """Data source of a well ('transducer' unless the wells table says otherwise)"""
+        self._check_version()
+        if self._sources is None:
+            sources = {}
+            if 'data_source' in self.columns('wells'):
+                sources = {well: source for well, source in
+                           self.execute("SELECT well_number, data_source FROM wells") if source}
+            self._sources = sources
+        return self._sources.get(well_number, 'transducer')
+
+    def readings_table(self, well_number: str, source: Optional[str] = None) -> str:
+        source = source or self.well_source(well_number)
+        if source == 'telemetry' and 'telemetry_level_readings' in self.tables():
+            return 'telemetry_level_readings'
+        return 'water_level_readings'
+
+    def get_well_row(self, well_number: str, columns: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """The wells row of a well, limited to the columns that exist"""
+        available = self.columns('wells')
+        selected = ['well_number'] + [c for c in columns if c in available and c != 'well_number']
+
+        def load():
+            rows = self.execute(f"SELECT {', '.join(selected)} FROM wells WHERE well_number = ?", (well_number,))
+            return dict(zip(selected, rows[0])) if rows else None
+
+        row = self.remember(('well_row', well_number, tuple(selected)), load)
+        return dict(row) if row else None
+
+    # Time series
+
+    def get_date_bounds(self, well_number: str, source: Optional[str] = None
+                        ) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """First and last reading time of a well, without loading its readings"""
+        table = self.readings_table(well_number, source)
+
+        def load():
+            rows = self.execute(f"SELECT MIN(timestamp_utc), MAX(timestamp_utc) FROM {table} WHERE well_number = ?",
+                                (well_number,))
+            if not rows or rows[0][0] is None:
+                return None
+            first, last = _parse_timestamps([rows[0][0], rows[0][1]])
+            return pd.Timestamp(first), pd.Timestamp(last)
+
+        return self.remember(('bounds', well_number, table), load)
+
+    def get_series(self, well_number: str, start=None, end=None, resolution=None,
+                   columns: Sequence[str] = SERIES_COLUMNS, source: Optional[str] = None,
+                   aggregate: str = 'mean') -> pd.DataFrame:
+        """
+        Readings of a well in time order.
+
+        Args:
+            well_number: Well to read
+            start: First time to include (date, datetime or string)
+            end: Last time to include; a date without a time includes that whole day
+            resolution: pandas frequency to aggregate to (e.g. '1h', '1D', 'W-MON');
+                None or 'none' returns the readings themselves
+            columns: Value columns; columns missing from the table are returned as NaN
+            source: 'telemetry' or 'transducer' (default: the well's data source)
+            aggregate: 'mean', 'median', 'min' or 'max' of each resolution bucket
+                (medians are computed in pandas)
+
+        Returns:
+            DataFrame with a datetime64 timestamp_utc column and float64 value
+            columns, a copy the caller may modify. Aggregated frames have one
+            row per bucket, NaN where a bucket holds no readings.
+        """
+        table = self.readings_table(well_number, source)
+        columns = tuple(columns)
+        resolution = normalize_resolution(resolution)
+        start_bound = _date_bound(start)
+        end_bound = _date_bound(end, end=True)
+        key = ('series', well_number, table, columns, start_bound, end_bound, resolution, aggregate)
+        frame = self.remember(key, lambda: self._load_series(
+            well_number, table, columns, start_bound, end_bound, resolution, aggregate))
+        return frame.copy()
+
+    def get_manual_readings(self, well_number: str, start=None, end=None) -> pd.DataFrame:
+        """Manual readings of a well in time order, filtered to the date range in SQL (not cached)"""
+        available = self.columns('manual_level_readings')
+        if not {'measurement_date_utc', 'water_level'} <= set(available):
+            return pd.DataFrame({'measurement_date_utc': np.array([], dtype='datetime64[ns]'),
+                                 'water_level': np.array([], dtype=np.float64)})
+
+        where = ["well_number = ?"]
+        params: List[Any] = [well_number]
+        for bound in (_date_bound(start), _date_bound(end, end=True)):
+            if bound:
+                where.append(f"measurement_date_utc {bound[0]} ?")
+                params.append(bound[1])
+        rows = self.execute(f"""
+            SELECT measurement_date_utc, water_level
+            FROM manual_level_readings
+            WHERE {' AND '.join(where)}
+            ORDER BY measurement_date_utc
+        """, params)
+        fields = list(zip(*rows)) if rows else [[], []]
+        return pd.DataFrame({'measurement_date_utc': _parse_timestamps(fields[0]),
+                             'water_level': _float_column(fields[1])})
+
+    def iter_series(self, well_number: str, start=None, end=None, resolution=None,
+                    columns: Sequence[str] = SERIES_COLUMNS, source: Optional[str] = None,
+                    aggregate: str = 'mean', chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        The frame get_series returns, in consecutive chunks of about chunk_rows rows.
+
+        Rows are fetched from a cursor as they are consumed and nothing is
+        cached, so memory use does not grow with the length of the series.
+        """
+        table = self.readings_table(well_number, source)
+        columns = tuple(columns)
+        resolution = normalize_resolution(resolution)
+        seconds = resolution_seconds(resolution) if aggregate in SQL_AGGREGATES else None
+        query, params, selected = self._series_query(
+            well_number, table, columns, _date_bound(start), _date_bound(end, end=True), seconds, aggregate)
+
+        if seconds:
+            step = pd.Timedelta(seconds=seconds)
+            previous = None
+            for rows in self._fetch_chunks(query, params, chunk_rows):
+                frame = self._build_frame(rows, selected, columns, bucket_seconds=seconds)
+                # Continue the bucket grid across chunks, so empty buckets are kept
+                first = frame['timestamp_utc'].iloc[0] if previous is None else previous + step
+                previous = frame['timestamp_utc'].iloc[-1]
+                grid = pd.date_range(first, previous, freq=step)
+                yield frame.set_index('timestamp_utc').reindex(grid).rename_axis('timestamp_utc').reset_index()
+            return
+
+        if not resolution:
+            for rows in self._fetch_chunks(query, params, chunk_rows):
+                yield self._build_frame(rows, selected, columns)
+            return
+
+        how = aggregate if aggregate in PANDAS_AGGREGATES else 'mean'
+        carry = None
+        for rows in self._fetch_chunks(query, params, chunk_rows):
+            frame = self._build_frame(rows, selected, columns).set_index('timestamp_utc')
+            if carry is not None:
+                frame = pd.concat([carry, frame])
+            # The last bucket may continue in the next chunk; hold its rows back
+            codes = frame.groupby(pd.Grouper(freq=resolution)).ngroup().to_numpy()
+            in_last = codes == codes[-1]
+            carry = frame[in_last]
+            resampled = getattr(frame.resample(resolution), how)()
+            if len(resampled) > 1:
+                yield resampled.iloc[:-1].reset_index()
+        if carry is not None and len(carry):
+            yield getattr(carry.resample(resolution), how)().reset_index()
+
+    def _fetch_chunks(self, query: str, params: Sequence, chunk_rows: int) -> Iterator[List[tuple]]:
+        self._check_version()
+        cursor = self._connection().execute(query, tuple(params))
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+
+    def _series_query(self, well_number, table, columns, start_bound, end_bound, seconds,
+                      aggregate) -> Tuple[str, List[Any], List[str]]:
+        """SQL, parameters and selected columns of a well's readings, averaged into buckets when seconds is given"""
+        available = self.columns(table)
+        selected = [c for c in columns if c in available]
+
+        where = ["well_number = ?"]
+        params: List[Any] = [well_number]
+        for bound in (start_bound, end_bound):
+            if bound:
+                where.append(f"timestamp_utc {bound[0]} ?")
+                params.append(bound[1])
+        where_clause = ' AND '.join(where)
+
+        if seconds:
+            func = SQL_AGGREGATES.get(aggregate, 'AVG')
+            values = ''.join(f", {func}({c})" for c in selected)
+            query = f"""
+                SELECT {_EPOCH_SECONDS} / {seconds} AS bucket{values}
+                FROM {table}
+                WHERE {where_clause}
+                GROUP BY bucket
+                HAVING bucket IS NOT NULL
+                ORDER BY bucket
+            """
+        else:
+            values = ''.join(f", {c}" for c in selected)
+            query = f"""
+                SELECT timestamp_utc{values}
+                FROM {table}
+                WHERE {where_clause}
+                ORDER BY timestamp_utc
+            """
+        return query, params, selected
+
+    def _load_series(self, well_number, table, columns, start_bound, end_bound, resolution, aggregate) -> pd.DataFrame:
+        started = time.perf_counter()
+        seconds = resolution_seconds(resolution) if aggregate in SQL_AGGREGATES else None
+        query, params, selected = self._series_query(
+            well_number, table, columns, start_bound, end_bound, seconds, aggregate)
+        rows = self.execute(query, params)
+
+        if seconds:
+            frame = self._build_frame(rows, selected, columns, bucket_seconds=seconds)
+            if len(frame) > 1:
+                # One row per bucket over the range, as pandas' resample gives
+                grid = pd.date_range(frame['timestamp_utc'].iloc[0], frame['timestamp_utc'].iloc[-1],
+                                     freq=pd.Timedelta(seconds=seconds))
+                frame = frame.set_index('timestamp_utc').reindex(grid).rename_axis('timestamp_utc').reset_index()
+        else:
+            frame = self._build_frame(rows, selected, columns)
+            if resolution and not frame.empty:
+                # Calendar rules and medians are resampled here
+                resampled = frame.set_index('timestamp_utc').resample(resolution)
+                frame = getattr(resampled, aggregate if aggregate in PANDAS_AGGREGATES else 'mean')().reset_index()
+
+        logger.debug(f"PERF: loaded {len(frame)} points of {well_number} from {table} "
+                     f"(resolution {resolution or 'raw'}) in {(time.perf_counter() - started) * 1000:.2f}ms")
+        return frame
+
+    @staticmethod
+    def _build_frame(rows: List[tuple], selected: Sequence[str], columns: Sequence[str],
+                     bucket_seconds: Optional[int] = None) -> pd.DataFrame:
+        if rows:
+            fields = list(zip(*rows))
+            if bucket_seconds:
+                timestamps = (np.asarray(fields[0], dtype=np.int64) * bucket_seconds).astype('datetime64[s]')
+                timestamps = timestamps.astype('datetime64[ns]')
+            else:
+                timestamps = _parse_timestamps(fields[0])
+            values = {name: _float_column(fields[i + 1]) for i, name in enumerate(selected)}
+        else:
+            timestamps = np.array([], dtype='datetime64[ns]')
+            values = {name: np.array([], dtype=np.float64) for name in selected}
+
+        data = {'timestamp_utc': timestamps}
+        for name in columns:
+            data[name] = values.get(name, np.full(len(timestamps), np.nan))
+        return pd.DataFrame(data)
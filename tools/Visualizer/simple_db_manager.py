@@ -9,6 +9,8 @@ import os
 import threading
 import functools
 
+from query_service import TimeSeriesQueryService
+
 logger = logging.getLogger(__name__)
 
 class SimpleDatabaseManager:
@@ -20,9 +22,6 @@ class SimpleDatabaseManager:
         self._thread_local = threading.local()
         # Create connection pool with smaller size for better resource usage
         self._connection_pool = queue.Queue(maxsize=3)  # Reduced pool size
-        self._schema_cache = {}  # Cache for schema information
-        self._query_cache = {}   # Cache for frequently accessed query results
-        self._cache_lock = threading.RLock()  # Lock for thread-safe cache access
         self._thread_connections = {}  # Track connections by thread ID
         
         # Debug database
@@ -33,6 +32,9 @@ class SimpleDatabaseManager:
         # Skip size check to improve startup time
         if not db_exists:
             raise ValueError(f"Database file does not exist: {db_path}")
+
+        # Schema and cached query results, shared with the other components reading this database
+        self.query_service = TimeSeriesQueryService.for_database(db_path)
             
         # For deferred init, just prepare without full loading
         if deferred_init:
@@ -52,30 +54,13 @@ class SimpleDatabaseManager:
             logger.error(f"Database validation failed: {e}")
             raise ValueError(f"Invalid or corrupt database: {e}")
     
-    def _cache_table_schema(self, table_name):
-        """Cache table schema information to avoid repeated queries"""
-        try:
-            if not self.conn:
-                # Lazily initialize connection if needed
-                self.conn = self._create_connection()
-                
-            cursor = self.conn.cursor()
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns_info = cursor.fetchall()
-            column_names = [col[1] for col in columns_info]
-            self._schema_cache[table_name] = column_names
-            logger.debug(f"Cached schema for table {table_name}: {column_names}")
-        except Exception as e:
-            logger.error(f"Error caching schema for {table_name}: {e}")
-    
     def get_table_schema(self, table_name):
         """Get table schema from cache or database"""
-        if table_name in self._schema_cache:
-            return self._schema_cache[table_name]
-        
-        # Not in cache, fetch and store
-        self._cache_table_schema(table_name)
-        return self._schema_cache.get(table_name, [])
+        try:
+            return self.query_service.columns(table_name)
+        except Exception as e:
+            logger.error(f"Error reading schema for {table_name}: {e}")
+            return []
 
     def configure_connection(self, conn, minimal=False):
         """
@@ -188,31 +173,9 @@ class SimpleDatabaseManager:
             @functools.wraps(func)
             def wrapper(*args, **kwargs):
                 # Create a cache key from function name and arguments
-                key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-                
-                with self._cache_lock:
-                    # Check if we have a cached result
-                    if key in self._query_cache:
-                        cache_time, result = self._query_cache[key]
-                        age = time.time() - cache_time
-                        
-                        # Return cached result if still valid
-                        if age < max_age_seconds:
-                            logger.debug(f"Cache hit for query: {key[:100]}...")
-                            return result
-                
-                # Execute the function to get fresh result
-                result = func(*args, **kwargs)
-                
-                # Cache the result
-                with self._cache_lock:
-                    self._query_cache[key] = (time.time(), result)
-                    
-                    # Log cache size periodically
-                    if len(self._query_cache) % 10 == 0:
-                        logger.debug(f"Query cache contains {len(self._query_cache)} entries")
-                
-                return result
+                key = ('query', func.__name__, str(args), str(kwargs))
+                return self.query_service.remember(key, lambda: func(*args, **kwargs),
+                                                   max_age=max_age_seconds)
             return wrapper
         return decorator
                 
@@ -230,18 +193,11 @@ class SimpleDatabaseManager:
         Returns:
             Query results
         """
-        # For quick caching of simple queries
+        # Cached results live in the shared, memory-budgeted query cache
         if cache:
-            cache_key = f"query:{query}:{str(params)}"
-            
-            with self._cache_lock:
-                if cache_key in self._query_cache:
-                    cache_time_saved, result = self._query_cache[cache_key]
-                    age = time.time() - cache_time_saved
-                    
-                    if age < cache_time:
-                        logger.debug(f"Cache hit for direct query")
-                        return result
+            cache_key = ('query', query, str(params), fetch_all)
+            return self.query_service.remember(
+                cache_key, lambda: self.execute_query(query, params, fetch_all), max_age=cache_time)
         
         # Get a connection from the pool
         conn = self.get_connection()
@@ -262,11 +218,6 @@ class SimpleDatabaseManager:
             elapsed = (time.time() - start_time) * 1000
             logger.debug(f"Query executed in {elapsed:.2f}ms: {query[:100]}...")
             
-            # Cache the result if requested
-            if cache:
-                with self._cache_lock:
-                    self._query_cache[cache_key] = (time.time(), result)
-            
             return result
             
         finally:
@@ -338,12 +289,9 @@ class SimpleDatabaseManager:
         except Exception as e:
             logger.error(f"Error closing main connection: {e}")
         
-        # Clear caches
-        with self._cache_lock:
-            cache_size = len(self._query_cache)
-            self._query_cache.clear()
-            self._schema_cache.clear()
-            logger.debug(f"Cleared {cache_size} query cache entries")
+        # Drop this database's cached results
+        cache_size = self.query_service.clear()
+        logger.debug(f"Cleared {cache_size} query cache entries")
         
         end_time = time.time()
         logger.debug(f"Database connection cleanup completed in {(end_time-start_time)*1000:.2f}ms")
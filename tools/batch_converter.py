@@ -0,0 +1,265 @@
+"""
+Batch Converter
+
+Shared engine behind the Solinst format converters (CSV to XLE, LEV to XLE and
+the XLE unit converter), used by their GUI workers and command lines.
+
+* Files are converted in a process pool. At most two tasks per worker are in
+  flight, so memory stays bounded however many files a folder holds, and
+  results are reported as each file finishes.
+* Outputs are written to a temporary file next to the target and moved into
+  place when complete, so an interrupted or failed conversion never leaves a
+  truncated XLE file.
+* Converted files whose output is newer than the source are skipped unless
+  forced.
+* Every file gets a result (converted, unchanged, up to date or failed with
+  its error), which can be saved as a CSV report.
+
+``XmlStreamWriter`` writes XLE documents in the layout of minidom's
+``toprettyxml(indent="    ")`` while taking the readings from an iterator,
+so neither the full element tree nor the document string is built.
+"""
+
+import csv
+import os
+import time
+import logging
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TASKS_PER_WORKER = 2
+
+# Result statuses
+CONVERTED = 'converted'
+UNCHANGED = 'unchanged'    # Nothing to convert (e.g. already in feet)
+UP_TO_DATE = 'up_to_date'  # Output newer than the source
+FAILED = 'failed'
+
+
+def default_workers() -> int:
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def find_files(root: str, suffix: str, recursive: bool = True) -> List[str]:
+    """Files under root with the suffix (case-insensitive), sorted"""
+    suffix = suffix.lower()
+    found = []
+    for folder, dirs, files in os.walk(root):
+        found.extend(os.path.join(folder, name) for name in files if name.lower().endswith(suffix))
+        if not recursive:
+            break
+    return sorted(found)
+
+
+def is_up_to_date(source: str, output: Optional[str]) -> bool:
+    """Whether the output file exists and is not older than the source"""
+    try:
+        return bool(output) and os.path.isfile(output) and os.path.getmtime(output) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+@contextmanager
+def atomic_output(path: str, mode: str = 'w', encoding: Optional[str] = 'utf-8'):
+    """Open a temporary file that replaces path only once it is completely written"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode, encoding=encoding if 'b' not in mode else None) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _escape(text: str, attribute: bool = False) -> str:
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    if attribute:
+        text = text.replace('"', '&quot;')
+    return text
+
+
+class XmlStreamWriter:
+    """Writes elements in the layout of minidom's toprettyxml, one element at a time"""
+
+    def __init__(self, stream, indent: str = '    '):
+        self.stream = stream
+        self.indent = indent
+
+    def _open_tag(self, elem: ET.Element) -> str:
+        attrs = ''.join(f' {name}="{_escape(str(value), True)}"' for name, value in elem.attrib.items())
+        return f"<{elem.tag}{attrs}"
+
+    def write_element(self, elem: ET.Element, level: int = 0,
+                      streamed: Optional[Dict[str, Iterator[ET.Element]]] = None):
+        """Write elem; elements named in streamed take their children from those iterators"""
+        pad = self.indent * level
+        write = self.stream.write
+        if elem.text:
+            # Text-only elements stay on one line, as in toprettyxml
+            write(f"{pad}{self._open_tag(elem)}>{_escape(elem.text)}</{elem.tag}>\n")
+            return
+        children = iter(streamed[elem.tag]) if streamed and elem.tag in streamed else iter(elem)
+        first = next(children, None)
+        if first is None:
+            write(f"{pad}{self._open_tag(elem)}/>\n")
+            return
+        write(f"{pad}{self._open_tag(elem)}>\n")
+        self.write_element(first, level + 1, streamed)
+        for child in children:
+            self.write_element(child, level + 1, streamed)
+        write(f"{pad}</{elem.tag}>\n")
+
+    def write_document(self, root: ET.Element, streamed: Optional[Dict[str, Iterator[ET.Element]]] = None):
+        """Write the XML declaration and root, as toprettyxml does"""
+        self.stream.write('<?xml version="1.0" ?>\n')
+        self.write_element(root, 0, streamed)
+
+
+@dataclass
+class FileResult:
+    source: str
+    status: str
+    output: Optional[str] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+@dataclass
+class BatchReport:
+    results: List[FileResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    cancelled: bool = False
+
+    def count(self, status: str) -> int:
+        return sum(1 for result in self.results if result.status == status)
+
+    @property
+    def outputs(self) -> List[str]:
+        """Files written by this run"""
+        return [result.output for result in self.results if result.status == CONVERTED]
+
+    @property
+    def failures(self) -> List[FileResult]:
+        return [result for result in self.results if result.status == FAILED]
+
+    def summary(self) -> str:
+        return (f"{len(self.results)} files in {self.elapsed:.1f}s: {self.count(CONVERTED)} converted, "
+                f"{self.count(UP_TO_DATE)} up to date, {self.count(UNCHANGED)} unchanged, "
+                f"{self.count(FAILED)} failed")
+
+    def write_csv(self, path: str) -> str:
+        """Per-file report: source, status, output, error, seconds"""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['source', 'status', 'output', 'error', 'seconds'])
+            for result in self.results:
+                writer.writerow([result.source, result.status, result.output or '', result.error or '',
+                                 f"{result.seconds:.3f}"])
+        return path
+
+
+def _run_task(task: Callable[[str], Optional[str]], source: str) -> FileResult:
+    """Run one conversion, turning exceptions into a failed result (runs in the workers)"""
+    start = time.perf_counter()
+    try:
+        output = task(source)
+        status = CONVERTED if output else UNCHANGED
+        return FileResult(source, status, output, seconds=time.perf_counter() - start)
+    except Exception as e:
+        return FileResult(source, FAILED, error=str(e) or type(e).__name__, seconds=time.perf_counter() - start)
+
+
+def convert_batch(task: Callable[[str], Optional[str]], sources: List[str],
+                  output_for: Optional[Callable[[str], str]] = None,
+                  force: bool = False,
+                  workers: Optional[int] = None,
+                  progress: Optional[Callable[[int, int, FileResult], None]] = None,
+                  cancelled: Optional[Callable[[], bool]] = None) -> BatchReport:
+    """
+    Convert files with task, a module-level function returning the written path
+    (or None when there was nothing to convert).
+
+    Args:
+        task: Conversion of one file; must be picklable for the process pool
+        sources: Files to convert
+        output_for: Output path of a source, used to skip sources whose output is up to date
+        force: Convert even if the output is up to date
+        workers: Worker processes (1 converts in this process)
+        progress: Called with (files done, total files, result) as each file finishes
+        cancelled: Polled between files; pending files are not started once it returns True
+
+    Returns:
+        BatchReport with one result per processed file
+    """
+    start = time.perf_counter()
+    workers = workers or default_workers()
+    report = BatchReport()
+    total = len(sources)
+
+    def record(result: FileResult):
+        report.results.append(result)
+        if result.status == FAILED:
+            logger.error(f"Error converting {result.source}: {result.error}")
+        if progress:
+            progress(len(report.results), total, result)
+
+    pending = []
+    for source in sources:
+        output = output_for(source) if output_for else None
+        if not force and output and is_up_to_date(source, output):
+            record(FileResult(source, UP_TO_DATE, output))
+        else:
+            pending.append(source)
+
+    if workers <= 1 or len(pending) < 2:
+        for source in pending:
+            if cancelled and cancelled():
+                report.cancelled = True
+                break
+            record(_run_task(task, source))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            queue = iter(pending)
+            in_flight = set()
+            while True:
+                # Keep a bounded number of tasks submitted
+                while len(in_flight) < workers * TASKS_PER_WORKER and not report.cancelled:
+                    if cancelled and cancelled():
+                        report.cancelled = True
+                        break
+                    source = next(queue, None)
+                    if source is None:
+                        break
+                    in_flight.add(executor.submit(_run_task, task, source))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future.result())
+
+    report.elapsed = time.perf_counter() - start
+    logger.info(f"Batch conversion: {report.summary()}")
+    return report
+
+
+def add_batch_arguments(parser):
+    """Command line options shared by the converters"""
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Worker processes (default: number of CPUs, up to 8)')
+    parser.add_argument('--report', help='Write a per-file CSV report to this path')
+
+
+def print_report(report: BatchReport, report_path: Optional[str] = None):
+    """Print the outcome of a command line batch"""
+    print(report.summary())
+    for failure in report.failures:
+        print(f" ! {failure.source}: {failure.error}")
+    if report_path:
+        print(f"Report saved to: {report.write_csv(report_path)}")
@@ -2,11 +2,11 @@ import os
 import sys
 import re
 import csv
-import xml.dom.minidom
+import argparse
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import logging
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from datetime import datetime
 
 # GUI imports
@@ -15,9 +15,24 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QCheckBox, QProgressBar, QMessageBox, QGroupBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
+sys.path.append(str(Path(__file__).parent))
+from batch_converter import (CONVERTED, BatchReport, XmlStreamWriter, add_batch_arguments, atomic_output,
+                             convert_batch, find_files, print_report)
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
+
+def xle_path_for(csv_file_path: str) -> str:
+    """Converted file: same name, .xle extension"""
+    return str(Path(csv_file_path).with_suffix('.xle'))
+
+
+def convert_csv_file(csv_file_path: str) -> str:
+    """Batch task converting one file (runs in the worker processes)"""
+    return CsvToXleConverter().convert_file(csv_file_path)
+
+
 class CsvToXleConverter:
     """
     Converts CSV format files with water level data to .xle XML format
@@ -27,33 +42,24 @@ class CsvToXleConverter:
         """Initialize converter"""
         pass
         
-    def scan_and_convert(self, root_dir: str, recursive: bool = True) -> List[str]:
+    def scan_and_convert(self, root_dir: str, recursive: bool = True, **batch_options) -> List[str]:
         """
         Scans directory for .csv files and converts them to .xle
         
         Args:
             root_dir: Directory to scan
             recursive: Whether to scan subfolders
+            batch_options: workers, force, progress and cancelled for convert_batch
             
         Returns:
             List of converted file paths
         """
-        converted_files = []
-        root_path = Path(root_dir)
-        
-        # Determine the pattern for file discovery
-        pattern = "**/*.csv" if recursive else "*.csv"
-        
-        # Find all .csv files
-        for csv_file in root_path.glob(pattern):
-            try:
-                xle_file = self.convert_file(str(csv_file))
-                converted_files.append(xle_file)
-                logger.info(f"Converted {csv_file} to {xle_file}")
-            except Exception as e:
-                logger.error(f"Error converting {csv_file}: {e}")
-                
-        return converted_files
+        return self.convert_folder(root_dir, recursive, **batch_options).outputs
+    
+    def convert_folder(self, root_dir: str, recursive: bool = True, **batch_options) -> BatchReport:
+        """Convert the .csv files of a folder in parallel, skipping those already converted"""
+        csv_files = find_files(root_dir, '.csv', recursive)
+        return convert_batch(convert_csv_file, csv_files, output_for=xle_path_for, **batch_options)
         
     def convert_file(self, csv_file_path: str) -> str:
         """
@@ -68,16 +74,13 @@ class CsvToXleConverter:
         # Parse the .csv file
         parsed_data = self._parse_csv_file(csv_file_path)
         
-        # Create XML content
-        xml_content = self._create_xle_content(parsed_data)
+        # Create the header elements; readings are generated while writing
+        root, logs = self._create_xle_tree(parsed_data)
         
-        # Format the XML with proper indentation for readability
-        pretty_xml = xml.dom.minidom.parseString(xml_content).toprettyxml(indent="    ")
-        
-        # Save as .xle file (same name, different extension)
-        xle_file_path = str(Path(csv_file_path).with_suffix('.xle'))
-        with open(xle_file_path, 'w', encoding='utf-8') as f:
-            f.write(pretty_xml)
+        # Save as .xle file (same name, different extension), formatted for readability
+        xle_file_path = xle_path_for(csv_file_path)
+        with atomic_output(xle_file_path) as f:
+            XmlStreamWriter(f).write_document(root, {'Data': logs})
         
         return xle_file_path
         
@@ -260,15 +263,16 @@ class CsvToXleConverter:
             logger.error(f"Error parsing CSV file {file_path}: {e}")
             raise
         
-    def _create_xle_content(self, parsed_data: Dict) -> str:
+    def _create_xle_tree(self, parsed_data: Dict) -> Tuple[ET.Element, Iterator[ET.Element]]:
         """
-        Create XML content for .xle file from parsed data
+        Create the .xle document from parsed data
         
         Args:
             parsed_data: Dictionary with parsed CSV data
             
         Returns:
-            XML content as string
+            Root element with an empty Data element, and a generator of its
+            Log elements
         """
         # Create root element
         root = ET.Element("Body_xle")
@@ -294,11 +298,11 @@ class CsvToXleConverter:
         
         # Get metadata from parsed data
         metadata = parsed_data.get('metadata', {})
-        print(f"Using metadata for XML creation: {metadata}")
+        logger.debug(f"Using metadata for XML creation: {metadata}")
         
         # Get serial number from metadata if available
         serial_number = metadata.get('Serial number', '')
-        print(f"Serial number: {serial_number}")
+        logger.debug(f"Serial number: {serial_number}")
         
         ET.SubElement(instrument_info, "Instrument_type").text = "L5_LT"
         ET.SubElement(instrument_info, "Model_number").text = "M10"
@@ -314,7 +318,7 @@ class CsvToXleConverter:
         # Get project ID and location from metadata
         project_id = metadata.get('Project ID', '')
         location = metadata.get('Location', '')
-        print(f"Project ID: {project_id}, Location: {location}")
+        logger.debug(f"Project ID: {project_id}, Location: {location}")
         
         ET.SubElement(data_header, "Project_ID").text = project_id
         ET.SubElement(data_header, "Location").text = location
@@ -420,11 +424,14 @@ class CsvToXleConverter:
         ET.SubElement(ch2_header, "Parameters")
         
         # Add Data section
-        data_elem = ET.SubElement(root, "Data")
+        ET.SubElement(root, "Data")
         
-        # Add Log entries
+        return root, self._iter_log_elements(data_points)
+    
+    def _iter_log_elements(self, data_points: List[Dict]) -> Iterator[ET.Element]:
+        """Log elements of the Data section, one at a time"""
         for point in data_points:
-            log_entry = ET.SubElement(data_elem, "Log")
+            log_entry = ET.Element("Log")
             log_entry.set("id", str(point['id']))
             
             # Parse and format date
@@ -456,9 +463,7 @@ class CsvToXleConverter:
             
             # Temperature data (ch2) - ensure it's populated
             ET.SubElement(log_entry, "ch2").text = point['temperature']
-        
-        # Convert ElementTree to string
-        return ET.tostring(root, encoding='unicode')
+            yield log_entry
     
     def _format_time(self, time_str: str) -> str:
         """
@@ -553,33 +558,23 @@ class ConverterWorker(QThread):
         self.folder_path = folder_path
         self.recursive = recursive
         self.converter = CsvToXleConverter()
+        self._cancel_requested = False
+        
+    def cancel(self):
+        """Start no further files; the ones being converted are finished"""
+        self._cancel_requested = True
+    
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested
         
     def run(self):
         try:
             # Update status about starting the scan
             self.file_progress.emit("Scanning for CSV files...")
-            
-            # First count the total number of files to process
-            self.file_progress.emit("Counting files in directory...")
-            total_files = 0
-            pattern = "**/*.csv" if self.recursive else "*.csv"
-            
-            # Show progress while counting
-            scan_count = 0
-            scan_dirs = set()
-            for csv_file in Path(self.folder_path).glob(pattern):
-                total_files += 1
-                # Update status every 10 files found
-                if total_files % 10 == 0:
-                    self.file_progress.emit(f"Found {total_files} CSV files so far...")
-                
-                # Keep track of unique directories
-                parent_dir = str(csv_file.parent)
-                if parent_dir not in scan_dirs:
-                    scan_dirs.add(parent_dir)
-                    scan_count += 1
-                    if scan_count % 5 == 0:  # Every 5 directories
-                        self.file_progress.emit(f"Scanning directory {scan_count}: {os.path.basename(parent_dir)}")
+            csv_files = find_files(self.folder_path, '.csv', self.recursive)
+            total_files = len(csv_files)
+            scan_dirs = {os.path.dirname(path) for path in csv_files}
             
             # Finished counting
             self.status_update.emit(f"Found {total_files} CSV files in {len(scan_dirs)} directories", total_files)
@@ -587,29 +582,19 @@ class ConverterWorker(QThread):
             if total_files == 0:
                 self.finished.emit([])
                 return
-                
-            # Modified converter method to support progress updates
-            converted_files = []
-            current_count = 0
             
-            for csv_file in Path(self.folder_path).glob(pattern):
-                try:
-                    # Update progress information
-                    self.file_progress.emit(f"Converting: {csv_file.name}")
-                    
-                    # Convert the file
-                    xle_file = self.converter.convert_file(str(csv_file))
-                    converted_files.append(xle_file)
-                    
-                    # Update progress percentage
-                    current_count += 1
-                    progress_percent = int((current_count / total_files) * 100)
-                    self.progress.emit(progress_percent)
-                    
-                except Exception as e:
-                    self.error.emit(f"Error converting {csv_file}: {str(e)}")
+            def progress(done, total, result):
+                self.file_progress.emit(f"Converted ({done}/{total}): {os.path.basename(result.source)}")
+                self.progress.emit(int((done / total) * 100))
+            
+            # Convert across worker processes; files converted before are skipped
+            report = convert_batch(convert_csv_file, csv_files, output_for=xle_path_for, progress=progress,
+                                   cancelled=lambda: self._cancel_requested)
             
-            self.finished.emit(converted_files)
+            self.finished.emit(report.outputs)
+            if report.failures:
+                self.error.emit(f"{len(report.failures)} file(s) could not be converted:\n" +
+                                "\n".join(f"{r.source}: {r.error}" for r in report.failures[:10]))
             
         except Exception as e:
             self.error.emit(f"Conversion error: {str(e)}")
@@ -668,6 +653,12 @@ class CsvToXleConverterApp(QMainWindow):
         convert_btn.clicked.connect(self.start_conversion)
         main_layout.addWidget(convert_btn)
         
+        # Stops the running conversion after the files in progress
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_conversion)
+        main_layout.addWidget(self.cancel_btn)
+        
         # Status area
         self.status_label = QLabel("Select a folder containing CSV files to begin")
         self.status_label.setAlignment(Qt.AlignCenter)
@@ -711,8 +702,16 @@ class CsvToXleConverterApp(QMainWindow):
         self.worker.status_update.connect(self.update_status)
         
         # Start conversion
+        self.cancel_btn.setEnabled(True)
         self.worker.start()
         
+    def cancel_conversion(self):
+        """Ask the worker to stop starting new files"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.status_label.setText("Cancelling after the files in progress...")
+        
     def update_progress(self, value):
         """Update the progress bar"""
         self.progress_bar.setValue(value)
@@ -728,7 +727,11 @@ class CsvToXleConverterApp(QMainWindow):
     def conversion_finished(self, converted_files):
         """Handle completion of conversion"""
         count = len(converted_files)
+        self.cancel_btn.setEnabled(False)
         
+        if self.worker.cancel_requested:
+            self.status_label.setText(f"Conversion cancelled. Converted {count} files.")
+            return
         if count == 0:
             self.status_label.setText("No CSV files found in the selected folder.")
         else:
@@ -747,35 +750,48 @@ class CsvToXleConverterApp(QMainWindow):
         
     def show_error(self, error_message):
         """Display error message"""
+        self.cancel_btn.setEnabled(False)
         QMessageBox.critical(self, "Conversion Error", error_message)
         self.status_label.setText("Conversion failed. See error message.")
+    
+    def closeEvent(self, event):
+        """Stop a running conversion before the window closes"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.blockSignals(True)
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
 
 def process_command_line():
     """Process command line arguments for batch processing"""
     if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        parser = argparse.ArgumentParser(prog='csv_to_xle_converter.py --batch',
+                                         description='Convert Solinst CSV exports to XLE files.')
+        parser.add_argument('folder', nargs='?', help='Folder containing CSV files')
+        parser.add_argument('recursive', nargs='?', default='true', help='Include subfolders (true/false)')
+        parser.add_argument('--force', action='store_true', help='Convert files whose XLE is up to date')
+        add_batch_arguments(parser)
+        args = parser.parse_args(sys.argv[2:])
+        
         # Check if we have a folder specified
-        if len(sys.argv) > 2:
-            folder = sys.argv[2]
-            recursive = True  # Default to recursive
-            
-            # Check for recursive flag
-            if len(sys.argv) > 3 and sys.argv[3].lower() == 'false':
-                recursive = False
+        if args.folder:
+            recursive = args.recursive.lower() != 'false'
                 
             # Process the folder
-            print(f"Batch processing folder: {folder} (recursive={recursive})")
+            print(f"Batch processing folder: {args.folder} (recursive={recursive})")
             converter = CsvToXleConverter()
             try:
-                converted = converter.scan_and_convert(folder, recursive)
-                print(f"Successfully converted {len(converted)} files")
+                report = converter.convert_folder(args.folder, recursive, workers=args.workers, force=args.force)
+                print(f"Successfully converted {report.count(CONVERTED)} files")
+                print_report(report, args.report)
                 return True
             except Exception as e:
                 print(f"Error during batch conversion: {e}")
                 return True
         else:
             print("Error: No folder specified for batch conversion")
-            print("Usage: csv_to_xle_converter.py --batch <folder> [recursive]")
+            print("Usage: csv_to_xle_converter.py --batch <folder> [recursive] [--force] [--workers N] [--report FILE]")
             return True
     
     return False
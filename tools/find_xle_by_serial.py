@@ -4,7 +4,7 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QLineEdit, QLabel, QCheckBox, QProgressDialog,
                            QTabWidget, QSizePolicy, QDialog, QRadioButton,
                            QButtonGroup, QHeaderView)
-from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtCore import Qt, QPoint, QThread, pyqtSignal
 import sys
 from pathlib import Path
 import logging
@@ -26,6 +26,7 @@ import shutil
 # Import SolinstReader from parent directory
 sys.path.append(str(Path(__file__).parent.parent))
 from src.gui.handlers.solinst_reader import SolinstReader
+from src.gui.handlers.xle_serial_index import XleSerialIndex, is_serial_match
 
 logger = logging.getLogger(__name__)
 
@@ -266,12 +267,37 @@ class CheckBoxHeader(QHeaderView):
         self.is_checked = state == Qt.Checked
         self.parent.toggle_all_checkboxes(state)
 
+class IndexRefreshWorker(QThread):
+    """Refreshes the serial index of a folder off the GUI thread"""
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, db_path: str, folder: str, recursive: bool, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.folder = folder
+        self.recursive = recursive
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        index = XleSerialIndex(self.db_path)
+        try:
+            index.refresh(self.folder, self.recursive, progress=self.progress.emit,
+                          cancelled=lambda: self._cancelled)
+        except Exception as e:
+            logger.error(f"Error indexing {self.folder}: {e}")
+        finally:
+            index.close()
+
 class FindXLEBySerial(QMainWindow):
     def __init__(self):
         super().__init__()
         self.solinst_reader = SolinstReader()
         self.found_files: List[Dict] = []  # Store found files data
-        self.plot_data_dict = {}  # Store data for plotting
+        self.plot_data_dict = {}  # Readings of plotted files, loaded on demand
+        self.serial_index = XleSerialIndex()
         self.setup_ui()
         
     def setup_ui(self):
@@ -424,6 +450,8 @@ class FindXLEBySerial(QMainWindow):
         self.tab_widget.addTab(self.table_tab, "Table")
         self.tab_widget.addTab(self.plot_tab, "Plot")
         
+        self.tab_widget.currentChanged.connect(lambda index: self.update_plot_with_filtered_data())
+        
         layout.addWidget(self.tab_widget)
         
     def select_folder(self):
@@ -462,188 +490,74 @@ class FindXLEBySerial(QMainWindow):
         # Determine file types to search for based on radio button selection
         file_types = []
         if self.xle_radio.isChecked() or self.both_radio.isChecked():
-            file_types.append("*.xle")
+            file_types.append("XLE")
         if self.csv_radio.isChecked() or self.both_radio.isChecked():
-            file_types.append("*.csv")
+            file_types.append("CSV")
         
-        # Get all matching files in folder (and subfolders if checked)
+        # Bring the index for this folder up to date in the background; only new
+        # or modified files are scanned, and only their headers are read
+        progress = QProgressDialog("Indexing files...", "Cancel", 0, 0, self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setWindowTitle("Searching Files")
+        progress.setMinimumDuration(500)
+        
+        worker = IndexRefreshWorker(self.serial_index.db_path, folder, self.include_subfolders.isChecked(), self)
+        progress.canceled.connect(worker.cancel)
+        worker.progress.connect(lambda done, total: (progress.setMaximum(total), progress.setValue(done),
+                                                     progress.setLabelText(f"Indexing files... {done} of {total}")))
+        worker.finished.connect(progress.close)
+        worker.finished.connect(lambda: self.show_search_results(folder, serial_number, file_types))
+        worker.finished.connect(worker.deleteLater)
+        self.search_btn.setEnabled(False)
+        worker.start()
+        
+    def show_search_results(self, folder: str, serial_number: str, file_types: List[str]):
+        """List the indexed files matching the serial number"""
+        self.search_btn.setEnabled(True)
         folder_path = Path(folder)
-        all_files = []
+        recursive = self.include_subfolders.isChecked()
+        file_types_str = " and ".join(f".{ft.lower()}" for ft in file_types)
         
-        for file_type in file_types:
-            if self.include_subfolders.isChecked():
-                all_files.extend(list(folder_path.rglob(file_type)))
-            else:
-                all_files.extend(list(folder_path.glob(file_type)))
-            
-        if not all_files:
-            file_types_str = " and ".join([ft.replace("*", "") for ft in file_types])
+        if not self.serial_index.count(folder, recursive, file_types):
             QMessageBox.information(
                 self, 
                 "No Files Found", 
                 f"No {file_types_str} files found in the selected folder."
             )
             return
-            
-        # Create progress dialog
-        progress = QProgressDialog("Searching files...", "Cancel", 0, len(all_files), self)
-        progress.setWindowModality(Qt.WindowModal)
-        progress.setWindowTitle("Searching Files")
-        progress.setMinimumDuration(0)  # Show immediately
         
-        found_count = 0
-        
-        for i, file_path in enumerate(all_files):
-            if progress.wasCanceled():
-                break
-                
-            progress.setValue(i)
-            progress.setLabelText(f"Searching: {file_path.name}")
-            QApplication.processEvents()
+        for entry in self.serial_index.search(folder, serial_number, recursive, file_types):
+            start_date = entry.start_time.strftime('%Y-%m-%d') if entry.start_time else "Not available"
+            end_date = entry.stop_time.strftime('%Y-%m-%d') if entry.stop_time else "Not available"
             
+            # Calculate relative path
             try:
-                # Process file based on extension
-                if file_path.suffix.lower() == '.xle':
-                    # Read XLE file using existing method
-                    data, metadata = self.solinst_reader.read_xle(file_path)
-                    
-                    # More flexible serial number matching
-                    file_serial = metadata.serial_number.strip() if metadata.serial_number else ""
-                    
-                    # Check if this file matches the search criteria
-                    if self.is_serial_match(file_serial, serial_number):
-                        found_count += 1
-                        
-                        # Get dates directly from metadata - they're already parsed in SolinstReader
-                        start_date = "Not available"
-                        end_date = "Not available"
-                        
-                        # Format start_time if available
-                        if hasattr(metadata, 'start_time') and metadata.start_time:
-                            try:
-                                start_date = metadata.start_time.strftime('%Y-%m-%d')
-                            except Exception as e:
-                                logger.debug(f"Error formatting start_time: {e}")
-                        
-                        # Format stop_time if available
-                        if hasattr(metadata, 'stop_time') and metadata.stop_time:
-                            try:
-                                end_date = metadata.stop_time.strftime('%Y-%m-%d')
-                            except Exception as e:
-                                logger.debug(f"Error formatting stop_time: {e}")
-                        
-                        # Calculate relative path
-                        try:
-                            relative_path = str(file_path.relative_to(folder_path))
-                        except ValueError:
-                            # Handle case where file might not be relative to the folder
-                            relative_path = str(file_path)
-                        
-                        # Create a key for this time range for deduplication
-                        time_range_key = f"{start_date}_to_{end_date}"
-                        
-                        # Store data for plotting
-                        if not data.empty:
-                            self.plot_data_dict[file_path.name] = data
-                        
-                        # Create file data record
-                        file_data = {
-                            'file_path': str(file_path),
-                            'file_name': file_path.name,
-                            'location': metadata.location or "",
-                            'serial_number': file_serial,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'time_range_key': time_range_key,  # Store the time range key for filtering
-                            'reading_count': metadata.num_log if hasattr(metadata, 'num_log') else len(data),
-                            'relative_path': relative_path,
-                            'model': metadata.instrument_type or "",  # Add model field back
-                            'is_compensated': "compensated" in file_path.name.lower(),  # Flag compensated files
-                            'file_type': 'XLE'  # Add file type field
-                        }
-                        
-                        # Add to all found files list
-                        self.all_found_files.append(file_data)
-                
-                elif file_path.suffix.lower() == '.csv':
-                    # Read CSV file using our new method
-                    data, metadata_dict = self.read_csv_file(file_path)
-                    
-                    # Get serial from metadata
-                    file_serial = metadata_dict.get('serial_number', '').strip()
-                    
-                    # Check if this file matches the search criteria with more flexible matching
-                    if self.is_serial_match(file_serial, serial_number):
-                        found_count += 1
-                        
-                        # Get dates from metadata
-                        start_date = "Not available"
-                        end_date = "Not available"
-                        
-                        # Format start_time if available
-                        if metadata_dict.get('start_time'):
-                            try:
-                                start_date = metadata_dict['start_time'].strftime('%Y-%m-%d')
-                            except Exception as e:
-                                logger.debug(f"Error formatting start_time: {e}")
-                        
-                        # Format stop_time if available
-                        if metadata_dict.get('stop_time'):
-                            try:
-                                end_date = metadata_dict['stop_time'].strftime('%Y-%m-%d')
-                            except Exception as e:
-                                logger.debug(f"Error formatting stop_time: {e}")
-                        
-                        # Calculate relative path
-                        try:
-                            relative_path = str(file_path.relative_to(folder_path))
-                        except ValueError:
-                            # Handle case where file might not be relative to the folder
-                            relative_path = str(file_path)
-                        
-                        # Create a key for this time range for deduplication
-                        time_range_key = f"{start_date}_to_{end_date}"
-                        
-                        # Store data for plotting
-                        if data is not None and not data.empty:
-                            self.plot_data_dict[file_path.name] = data
-                        
-                        # Create file data record
-                        file_data = {
-                            'file_path': str(file_path),
-                            'file_name': file_path.name,
-                            'location': metadata_dict.get('location', ""),
-                            'serial_number': file_serial,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'time_range_key': time_range_key,  # Store the time range key for filtering
-                            'reading_count': metadata_dict.get('num_log', 0),
-                            'relative_path': relative_path,
-                            'model': metadata_dict.get('instrument_type', ""),
-                            'is_compensated': "compensated" in file_path.name.lower(),  # Flag compensated files
-                            'file_type': 'CSV'  # Add file type field
-                        }
-                        
-                        # Add to all found files list
-                        self.all_found_files.append(file_data)
-                    
-            except Exception as e:
-                logger.warning(f"Error reading file {file_path}: {e}")
-                # Log more detailed error information for debugging
-                import traceback
-                logger.debug(f"Detailed error: {traceback.format_exc()}")
-                # Continue with next file
-        
-        progress.setValue(len(all_files))
-        
-        # Display all files initially
+                relative_path = str(Path(entry.path).relative_to(folder_path.absolute()))
+            except ValueError:
+                # Handle case where file might not be relative to the folder
+                relative_path = entry.path
+            
+            self.all_found_files.append({
+                'file_path': entry.path,
+                'file_name': entry.name,
+                'location': entry.location,
+                'serial_number': entry.serial_number,
+                'start_date': start_date,
+                'end_date': end_date,
+                'time_range_key': f"{start_date}_to_{end_date}",  # Store the time range key for filtering
+                'reading_count': entry.num_log,
+                'relative_path': relative_path,
+                'model': entry.model,
+                'is_compensated': "compensated" in entry.name.lower(),  # Flag compensated files
+                'file_type': entry.file_type
+            })
+        found_count = len(self.all_found_files)
+        
+        # Display all files initially; readings are only loaded when plotted
         self.display_file_list(self.all_found_files)
-        
-        # Plot the data
-        self.plot_canvas.plot_data(self.plot_data_dict)
+        self.update_plot_with_filtered_data()
         
         # Show message with results
-        file_types_str = " and ".join([ft.replace("*", "") for ft in file_types])
         if found_count == 0:
             QMessageBox.information(
                 self, 
@@ -1010,18 +924,37 @@ class FindXLEBySerial(QMainWindow):
 
     def update_plot_with_filtered_data(self):
         """Update the plot to show only the filtered files"""
+        # Readings are read from disk only while the Plot tab is shown
+        if self.tab_widget.currentIndex() != 1:
+            return
         if not self.found_files:
+            self.plot_canvas.plot_data({})
             return
             
+        # Load the files that have not been plotted yet
+        to_load = [file_data for file_data in self.found_files if file_data['file_name'] not in self.plot_data_dict]
+        progress = None
+        if len(to_load) > 1:
+            progress = QProgressDialog("Loading readings...", "Cancel", 0, len(to_load), self)
+            progress.setWindowModality(Qt.WindowModal)
+            progress.setWindowTitle("Loading Plot Data")
+            progress.setMinimumDuration(500)
+        for i, file_data in enumerate(to_load):
+            if progress:
+                if progress.wasCanceled():
+                    break
+                progress.setValue(i)
+                QApplication.processEvents()
+            self.plot_data_dict[file_data['file_name']] = self.load_readings(file_data)
+        if progress:
+            progress.setValue(len(to_load))
+        
         # Create a new plot data dictionary with only the filtered files
         filtered_plot_data = {}
         for file_data in self.found_files:
-            file_path = file_data['file_path']
-            file_name = file_data['file_name']
-            
-            # If we have this file in our original plot data, add it to filtered data
-            if file_name in self.plot_data_dict:
-                filtered_plot_data[file_name] = self.plot_data_dict[file_name]
+            data = self.plot_data_dict.get(file_data['file_name'])
+            if data is not None and not data.empty:
+                filtered_plot_data[file_data['file_name']] = data
         
         # Update the plot with the filtered data
         self.plot_canvas.plot_data(filtered_plot_data)
@@ -1030,6 +963,19 @@ class FindXLEBySerial(QMainWindow):
         if hasattr(self, 'status_message') and hasattr(self, 'status_label'):
             self.status_label.setText(self.status_message)
 
+    def load_readings(self, file_data: Dict) -> pd.DataFrame:
+        """Full readings of one found file (empty if it cannot be read)"""
+        file_path = Path(file_data['file_path'])
+        try:
+            if file_data['file_type'] == 'XLE':
+                data, _ = self.solinst_reader.read_xle(file_path)
+            else:
+                data, _ = self.read_csv_file(file_path)
+        except Exception as e:
+            logger.warning(f"Error reading file {file_path}: {e}")
+            data = None
+        return data if data is not None else pd.DataFrame()
+
     def read_csv_file(self, file_path: Path) -> Tuple[Optional[pd.DataFrame], dict]:
         """Read a CSV file in the specified format and return dataframe and metadata.
         
@@ -1275,37 +1221,7 @@ class FindXLEBySerial(QMainWindow):
 
     def is_serial_match(self, file_serial: str, search_serial: str) -> bool:
         """More flexible serial number matching"""
-        if not file_serial or not search_serial:
-            return False
-            
-        # Standardize and clean serial numbers
-        file_serial = file_serial.strip().upper()
-        search_serial = search_serial.strip().upper()
-        
-        # Direct equality check
-        if file_serial == search_serial:
-            return True
-            
-        # Check if one contains the other
-        if search_serial in file_serial or file_serial in search_serial:
-            return True
-            
-        # Remove non-alphanumeric characters and check again
-        import re
-        clean_file_serial = re.sub(r'\W+', '', file_serial)
-        clean_search_serial = re.sub(r'\W+', '', search_serial)
-        
-        if clean_file_serial == clean_search_serial:
-            return True
-            
-        # Check if the numeric parts match
-        file_digits = ''.join(c for c in file_serial if c.isdigit())
-        search_digits = ''.join(c for c in search_serial if c.isdigit())
-        
-        if file_digits and search_digits and (file_digits == search_digits):
-            return True
-            
-        return False
+        return is_serial_match(file_serial, search_serial)
 
 def main():
     app = QApplication(sys.argv)
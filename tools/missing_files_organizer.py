@@ -18,6 +18,7 @@ sys.path.append(str(Path(__file__).parent.parent / "src" / "gui" / "handlers"))
 from solinst_reader import SolinstReader
 from solinst_xle_mapper import XleMapper
 from style_handler import StyleHandler
+from deployment_index import DeploymentIndex
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -29,11 +30,12 @@ class FileComparisonWorker(QThread):
     finished = pyqtSignal(list, list, list)  # new_files, duplicate_files, orphaned_files
     error = pyqtSignal(str)
     
-    def __init__(self, input_csv: Path, existing_csv: Path, transducer_locations: List[Dict[str, Any]]):
+    def __init__(self, input_csv: Path, existing_csv: Path, deployment_index: DeploymentIndex):
         super().__init__()
         self.input_csv = input_csv
         self.existing_csv = existing_csv
-        self.transducer_locations = transducer_locations
+        self.deployment_index = deployment_index
+        self.ambiguous_files: List[Dict[str, Any]] = []  # Files overlapping deployments in several wells
         
     def run(self):
         try:
@@ -96,13 +98,15 @@ class FileComparisonWorker(QThread):
             else:
                 # Check if it's a transducer file and find well number
                 if file['Logger_type'] != 'Barologger':
-                    well_number = self._find_well_for_time_range(
+                    deployments = self.deployment_index.find_deployments(
                         file['Serial_number'],
                         file['Start_time'],
                         file['Stop_time']
                     )
-                    if well_number:
+                    if deployments:
                         new_files.append(file)
+                        if len({d.well_number for d in deployments}) > 1:
+                            self.ambiguous_files.append(file)
                     else:
                         orphaned_files.append(file)
                 else:
@@ -110,64 +114,6 @@ class FileComparisonWorker(QThread):
         
         return new_files, duplicate_files, orphaned_files
 
-    def _find_well_for_time_range(self, serial_number: str, start_time: str, stop_time: str) -> Optional[str]:
-        """Find the well number for a transducer based on time range"""
-        if not start_time or not stop_time or not serial_number:
-            logger.warning("Missing required time range or serial number data")
-            return None
-            
-        try:
-            file_start = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
-            file_end = datetime.strptime(stop_time, '%Y-%m-%d %H:%M:%S')
-            
-            logger.info(f"\nLooking for well for transducer {serial_number}")
-            logger.info(f"File time range: {file_start} to {file_end}")
-            
-            # Find all locations for this serial number
-            locations = []
-            for loc in self.transducer_locations:
-                try:
-                    # Use lowercase keys from the CSV
-                    loc_serial = loc.get('serial_number', '')
-                    if loc_serial == serial_number:
-                        locations.append(loc)
-                except Exception as e:
-                    logger.error(f"Error processing location: {e}")
-                    continue
-            
-            logger.info(f"Found {len(locations)} locations for this transducer")
-            
-            for location in locations:
-                try:
-                    # Use lowercase keys from the CSV
-                    start_date = location.get('start_date', '')
-                    end_date = location.get('end_date', '')
-                    
-                    if not start_date:
-                        logger.error("Missing start date in location")
-                        continue
-                                
-                    loc_start = datetime.strptime(start_date, '%Y-%m-%d %H:%M:%S')
-                    # Handle NULL end_date (transducer still in well)
-                    loc_end = (datetime.strptime(end_date, '%Y-%m-%d %H:%M:%S') 
-                              if end_date else datetime.max)
-                    
-                    # Check if file time range overlaps with location period
-                    if (file_start <= loc_end and file_end >= loc_start):
-                        # Use lowercase key from the CSV
-                        well_number = location.get('well_number', '')
-                        logger.info(f"Found matching well: {well_number}")
-                        return well_number
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Error processing location dates: {e}")
-                    continue
-            
-            logger.info("No matching well found")
-            return None
-        except Exception as e:
-            logger.error(f"Error in _find_well_for_time_range: {e}")
-            return None
-
 class FileCopyWorker(QThread):
     """Worker thread for copying new files to their destination"""
     progress = pyqtSignal(int)
@@ -177,11 +123,11 @@ class FileCopyWorker(QThread):
     
     def __init__(self, new_files: List[Dict[str, Any]], 
                  source_folder: Path,
-                 transducer_locations: List[Dict[str, Any]]):
+                 deployment_index: DeploymentIndex):
         super().__init__()
         self.new_files = new_files
         self.source_folder = source_folder
-        self.transducer_locations = transducer_locations
+        self.deployment_index = deployment_index
         
     def run(self):
         try:
@@ -202,7 +148,7 @@ class FileCopyWorker(QThread):
                     dest_path = missing_files_dir / 'barologger' / file['Serial_number']
                 else:
                     # For transducers, find the well based on time range
-                    well_number = self._find_well_for_time_range(
+                    well_number = self.deployment_index.find_well(
                         file['Serial_number'],
                         file['Start_time'],
                         file['Stop_time']
@@ -245,64 +191,6 @@ class FileCopyWorker(QThread):
             logger.error(f"Error copying files: {e}")
             self.error.emit(str(e))
     
-    def _find_well_for_time_range(self, serial_number: str, start_time: str, stop_time: str) -> Optional[str]:
-        """Find the well number for a transducer based on time range"""
-        if not start_time or not stop_time or not serial_number:
-            logger.warning("Missing required time range or serial number data")
-            return None
-            
-        try:
-            file_start = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
-            file_end = datetime.strptime(stop_time, '%Y-%m-%d %H:%M:%S')
-            
-            logger.info(f"\nLooking for well for transducer {serial_number}")
-            logger.info(f"File time range: {file_start} to {file_end}")
-            
-            # Find all locations for this serial number
-            locations = []
-            for loc in self.transducer_locations:
-                try:
-                    # Use lowercase keys from the CSV
-                    loc_serial = loc.get('serial_number', '')
-                    if loc_serial == serial_number:
-                        locations.append(loc)
-                except Exception as e:
-                    logger.error(f"Error processing location: {e}")
-                    continue
-            
-            logger.info(f"Found {len(locations)} locations for this transducer")
-            
-            for location in locations:
-                try:
-                    # Use lowercase keys from the CSV
-                    start_date = location.get('start_date', '')
-                    end_date = location.get('end_date', '')
-                    
-                    if not start_date:
-                        logger.error("Missing start date in location")
-                        continue
-                                
-                    loc_start = datetime.strptime(start_date, '%Y-%m-%d %H:%M:%S')
-                    # Handle NULL end_date (transducer still in well)
-                    loc_end = (datetime.strptime(end_date, '%Y-%m-%d %H:%M:%S') 
-                              if end_date else datetime.max)
-                    
-                    # Check if file time range overlaps with location period
-                    if (file_start <= loc_end and file_end >= loc_start):
-                        # Use lowercase key from the CSV
-                        well_number = location.get('well_number', '')
-                        logger.info(f"Found matching well: {well_number}")
-                        return well_number
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Error processing location dates: {e}")
-                    continue
-            
-            logger.info("No matching well found")
-            return None
-        except Exception as e:
-            logger.error(f"Error in _find_well_for_time_range: {e}")
-            return None
-
 class MissingFilesOrganizerApp(QMainWindow):
     """GUI Application for organizing missing XLE files"""
     def __init__(self):
@@ -367,12 +255,12 @@ class MissingFilesOrganizerApp(QMainWindow):
         # Transducer locations CSV
         locations_layout = QHBoxLayout()
         locations_layout.setContentsMargins(0, 0, 0, 0)  # Remove margins from inner layout
-        locations_label = QLabel("Transducer Locations CSV:")
+        locations_label = QLabel("Transducer Locations (CSV or database):")
         self.locations_path = QLineEdit()
         self.locations_path.setPlaceholderText("Select transducer locations CSV file...")
         locations_select_btn = QPushButton("Browse")
         locations_select_btn.setStyleSheet(StyleHandler.get_secondary_button_style())
-        locations_select_btn.clicked.connect(lambda: self.select_file(self.locations_path, "CSV Files (*.csv)"))
+        locations_select_btn.clicked.connect(lambda: self.select_file(self.locations_path, "Locations (*.csv *.db);;CSV Files (*.csv);;Databases (*.db)"))
         
         locations_layout.addWidget(locations_label)
         locations_layout.addWidget(self.locations_path, 1)
@@ -438,7 +326,7 @@ class MissingFilesOrganizerApp(QMainWindow):
         self.new_files = None
         self.duplicate_files = None
         self.orphaned_files = None
-        self.transducer_locations = None
+        self.deployment_index = None
         
         # Worker threads
         self.comparison_worker = None
@@ -465,8 +353,12 @@ class MissingFilesOrganizerApp(QMainWindow):
             QMessageBox.warning(self, "Missing Input", "Please select a transducer locations CSV file.")
             return
         
-        # Read transducer locations data
-        self.transducer_locations = self._read_csv(self.locations_path.text())
+        # Index transducer deployments once for all files
+        try:
+            self.deployment_index = DeploymentIndex.load(self.locations_path.text())
+        except Exception as e:
+            self.show_error(f"Error reading transducer locations: {e}")
+            return
         
         # Reset UI
         self.progress_bar.setValue(0)
@@ -477,7 +369,7 @@ class MissingFilesOrganizerApp(QMainWindow):
         self.comparison_worker = FileComparisonWorker(
             Path(self.input_csv_path.text()),
             Path(self.existing_csv_path.text()),
-            self.transducer_locations
+            self.deployment_index
         )
         
         # Connect signals
@@ -506,7 +398,7 @@ class MissingFilesOrganizerApp(QMainWindow):
         self.copy_worker = FileCopyWorker(
             self.new_files,
             source_folder,
-            self.transducer_locations
+            self.deployment_index
         )
         
         # Connect signals
@@ -575,6 +467,28 @@ class MissingFilesOrganizerApp(QMainWindow):
                 results_text += f"- {file['file_name']} ({file['Logger_type']} {file['Serial_number']})\n"
                 results_text += f"  Time range: {file['Start_time']} to {file['Stop_time']}\n"
         
+        ambiguous_files = self.comparison_worker.ambiguous_files if self.comparison_worker else []
+        if ambiguous_files:
+            results_text += "\nAmbiguous Files (time range overlaps deployments in several wells, first listed is used):\n"
+            for file in ambiguous_files:
+                wells = [d.well_number for d in self.deployment_index.find_deployments(
+                    file['Serial_number'], file['Start_time'], file['Stop_time'])]
+                results_text += f"- {file['file_name']} ({file['Serial_number']}): {', '.join(wells)}\n"
+        
+        overlaps = self.deployment_index.overlaps()
+        if overlaps:
+            results_text += f"\nOverlapping Deployments ({len(overlaps)}):\n"
+            for overlap in overlaps:
+                results_text += (f"- {overlap['serial_number']}: {overlap['well_number']} and "
+                                 f"{overlap['other_well_number']} from {overlap['start']} to {overlap['end']}\n")
+        
+        gaps = self.deployment_index.gaps()
+        if gaps:
+            results_text += f"\nDeployment Gaps ({len(gaps)}):\n"
+            for gap in gaps:
+                results_text += (f"- {gap['serial_number']}: between {gap['after_well_number']} and "
+                                 f"{gap['before_well_number']} from {gap['start']} to {gap['end']}\n")
+        
         self.results_text.setText(results_text)
         
         # Enable copy button if there are new files
@@ -604,7 +518,7 @@ def process_command_line():
     parser = argparse.ArgumentParser(description='Organize missing XLE files.')
     parser.add_argument('--csv', help='XLE Map CSV file path')
     parser.add_argument('--folder', help='Folder containing XLE files')
-    parser.add_argument('--locations', required=True, help='Transducer locations CSV file path')
+    parser.add_argument('--locations', required=True, help='Transducer locations CSV file or database path')
     parser.add_argument('--db-folder', required=True, help='Existing database folder path')
     
     if len(sys.argv) > 1:
@@ -1,11 +1,11 @@
 import os
 import sys
 import re
-import xml.dom.minidom
+import argparse
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import logging
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from datetime import datetime
 
 # GUI imports
@@ -14,9 +14,24 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QCheckBox, QProgressBar, QMessageBox, QGroupBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
+sys.path.append(str(Path(__file__).parent))
+from batch_converter import (BatchReport, XmlStreamWriter, add_batch_arguments, atomic_output, convert_batch,
+                             find_files, print_report)
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
+
+def xle_path_for(lev_file_path: str) -> str:
+    """Converted file: same name, .xle extension"""
+    return str(Path(lev_file_path).with_suffix('.xle'))
+
+
+def convert_lev_file(lev_file_path: str) -> str:
+    """Batch task converting one file (runs in the worker processes)"""
+    return LevToXleConverter().convert_file(lev_file_path)
+
+
 class LevToXleConverter:
     """
     Converts Solinst .lev format files to .xle XML format
@@ -38,33 +53,24 @@ class LevToXleConverter:
         # Patterns for extracting key-value pairs
         self.kv_pattern = re.compile(r'^\s*([^=]+)=(.*)$', re.MULTILINE)
         
-    def scan_and_convert(self, root_dir: str, recursive: bool = True) -> List[str]:
+    def scan_and_convert(self, root_dir: str, recursive: bool = True, **batch_options) -> List[str]:
         """
         Scans directory for .lev files and converts them to .xle
         
         Args:
             root_dir: Directory to scan
             recursive: Whether to scan subfolders
+            batch_options: workers, force, progress and cancelled for convert_batch
             
         Returns:
             List of converted file paths
         """
-        converted_files = []
-        root_path = Path(root_dir)
-        
-        # Determine the pattern for file discovery
-        pattern = "**/*.lev" if recursive else "*.lev"
-        
-        # Find all .lev files
-        for lev_file in root_path.glob(pattern):
-            try:
-                xle_file = self.convert_file(str(lev_file))
-                converted_files.append(xle_file)
-                logger.info(f"Converted {lev_file} to {xle_file}")
-            except Exception as e:
-                logger.error(f"Error converting {lev_file}: {e}")
-                
-        return converted_files
+        return self.convert_folder(root_dir, recursive, **batch_options).outputs
+    
+    def convert_folder(self, root_dir: str, recursive: bool = True, **batch_options) -> BatchReport:
+        """Convert the .lev files of a folder in parallel, skipping those already converted"""
+        lev_files = find_files(root_dir, '.lev', recursive)
+        return convert_batch(convert_lev_file, lev_files, output_for=xle_path_for, **batch_options)
         
     def convert_file(self, lev_file_path: str) -> str:
         """
@@ -79,16 +85,13 @@ class LevToXleConverter:
         # Parse the .lev file
         parsed_data = self._parse_lev_file(lev_file_path)
         
-        # Create XML content
-        xml_content = self._create_xle_content(parsed_data)
+        # Create the header elements; readings are generated while writing
+        root, logs = self._create_xle_tree(parsed_data)
         
-        # Format the XML with proper indentation for readability
-        pretty_xml = xml.dom.minidom.parseString(xml_content).toprettyxml(indent="    ")
-        
-        # Save as .xle file (same name, different extension)
-        xle_file_path = str(Path(lev_file_path).with_suffix('.xle'))
-        with open(xle_file_path, 'w', encoding='utf-8') as f:
-            f.write(pretty_xml)
+        # Save as .xle file (same name, different extension), formatted for readability
+        xle_file_path = xle_path_for(lev_file_path)
+        with atomic_output(xle_file_path) as f:
+            XmlStreamWriter(f).write_document(root, {'Data': logs})
         
         return xle_file_path
         
@@ -178,15 +181,16 @@ class LevToXleConverter:
             'sections': parsed_sections
         }
         
-    def _create_xle_content(self, parsed_data: Dict) -> str:
+    def _create_xle_tree(self, parsed_data: Dict) -> Tuple[ET.Element, Iterator[ET.Element]]:
         """
-        Create XML content for .xle file from parsed data
+        Create the .xle document from parsed data
         
         Args:
             parsed_data: Dictionary with parsed .lev data
             
         Returns:
-            XML content as string
+            Root element with an empty Data element, and a generator of its
+            Log elements
         """
         # Create root element
         root = ET.Element("Body_xle")
@@ -346,46 +350,47 @@ class LevToXleConverter:
         ET.SubElement(ch2_header, "Parameters")
         
         # Add Data section
-        data_elem = ET.SubElement(root, "Data")
-        
-        # Add Log entries
-        if isinstance(data_section, dict) and 'points' in data_section:
-            for point in data_section['points']:
-                log_entry = ET.SubElement(data_elem, "Log")
-                log_entry.set("id", str(point['id']))
-                
-                ET.SubElement(log_entry, "Date").text = point['date']
-                ET.SubElement(log_entry, "Time").text = point['time']
-                ET.SubElement(log_entry, "ms").text = "0"
-                
-                # Convert units if needed
-                pressure_value = point['ch1']
-                if ch1_unit == 'm':
-                    # Convert meters to feet
-                    try:
-                        value_m = float(pressure_value)
-                        value_ft = value_m * 3.28084  # Meters to feet conversion
-                        pressure_value = f"{value_ft:.6f}"  # Format with 6 decimal places
-                    except (ValueError, TypeError):
-                        # If conversion fails, keep original value
-                        pass
-                elif ch1_unit == 'kpa':
-                    # Convert kPa to psi
-                    try:
-                        value_kpa = float(pressure_value)
-                        value_psi = value_kpa * 0.145038  # kPa to PSI conversion
-                        pressure_value = f"{value_psi:.6f}"  # Format with 6 decimal places
-                    except (ValueError, TypeError):
-                        # If conversion fails, keep original value
-                        pass
-                        
-                ET.SubElement(log_entry, "ch1").text = pressure_value
-                
-                # Always keep temperature in Celsius - no conversion in LEV files
-                ET.SubElement(log_entry, "ch2").text = point['ch2']
+        ET.SubElement(root, "Data")
         
-        # Convert ElementTree to string
-        return ET.tostring(root, encoding='unicode')
+        points = data_section['points'] if isinstance(data_section, dict) and 'points' in data_section else []
+        return root, self._iter_log_elements(points, ch1_unit)
+    
+    def _iter_log_elements(self, points: List[Dict], ch1_unit: str) -> Iterator[ET.Element]:
+        """Log elements of the Data section, one at a time"""
+        for point in points:
+            log_entry = ET.Element("Log")
+            log_entry.set("id", str(point['id']))
+            
+            ET.SubElement(log_entry, "Date").text = point['date']
+            ET.SubElement(log_entry, "Time").text = point['time']
+            ET.SubElement(log_entry, "ms").text = "0"
+            
+            # Convert units if needed
+            pressure_value = point['ch1']
+            if ch1_unit == 'm':
+                # Convert meters to feet
+                try:
+                    value_m = float(pressure_value)
+                    value_ft = value_m * 3.28084  # Meters to feet conversion
+                    pressure_value = f"{value_ft:.6f}"  # Format with 6 decimal places
+                except (ValueError, TypeError):
+                    # If conversion fails, keep original value
+                    pass
+            elif ch1_unit == 'kpa':
+                # Convert kPa to psi
+                try:
+                    value_kpa = float(pressure_value)
+                    value_psi = value_kpa * 0.145038  # kPa to PSI conversion
+                    pressure_value = f"{value_psi:.6f}"  # Format with 6 decimal places
+                except (ValueError, TypeError):
+                    # If conversion fails, keep original value
+                    pass
+                    
+            ET.SubElement(log_entry, "ch1").text = pressure_value
+            
+            # Always keep temperature in Celsius - no conversion in LEV files
+            ET.SubElement(log_entry, "ch2").text = point['ch2']
+            yield log_entry
 
 
 class ConverterWorker(QThread):
@@ -401,33 +406,23 @@ class ConverterWorker(QThread):
         self.folder_path = folder_path
         self.recursive = recursive
         self.converter = LevToXleConverter()
+        self._cancel_requested = False
+        
+    def cancel(self):
+        """Start no further files; the ones being converted are finished"""
+        self._cancel_requested = True
+    
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested
         
     def run(self):
         try:
             # Update status about starting the scan
             self.file_progress.emit("Scanning for LEV files...")
-            
-            # First count the total number of files to process
-            self.file_progress.emit("Counting files in directory...")
-            total_files = 0
-            pattern = "**/*.lev" if self.recursive else "*.lev"
-            
-            # Show progress while counting
-            scan_count = 0
-            scan_dirs = set()
-            for lev_file in Path(self.folder_path).glob(pattern):
-                total_files += 1
-                # Update status every 10 files found
-                if total_files % 10 == 0:
-                    self.file_progress.emit(f"Found {total_files} LEV files so far...")
-                
-                # Keep track of unique directories
-                parent_dir = str(lev_file.parent)
-                if parent_dir not in scan_dirs:
-                    scan_dirs.add(parent_dir)
-                    scan_count += 1
-                    if scan_count % 5 == 0:  # Every 5 directories
-                        self.file_progress.emit(f"Scanning directory {scan_count}: {os.path.basename(parent_dir)}")
+            lev_files = find_files(self.folder_path, '.lev', self.recursive)
+            total_files = len(lev_files)
+            scan_dirs = {os.path.dirname(path) for path in lev_files}
             
             # Finished counting
             self.status_update.emit(f"Found {total_files} LEV files in {len(scan_dirs)} directories", total_files)
@@ -436,29 +431,19 @@ class ConverterWorker(QThread):
                 self.file_progress.emit("No LEV files found.")
                 self.finished.emit([])
                 return
-                
-            # Modified converter method to support progress updates
-            converted_files = []
-            current_count = 0
             
-            for lev_file in Path(self.folder_path).glob(pattern):
-                try:
-                    # Update progress information
-                    self.file_progress.emit(f"Converting ({current_count+1}/{total_files}): {lev_file.name}")
-                    
-                    # Convert the file
-                    xle_file = self.converter.convert_file(str(lev_file))
-                    converted_files.append(xle_file)
-                    
-                    # Update progress percentage
-                    current_count += 1
-                    progress_percent = int((current_count / total_files) * 100)
-                    self.progress.emit(progress_percent)
-                    
-                except Exception as e:
-                    self.error.emit(f"Error converting {lev_file}: {str(e)}")
+            def progress(done, total, result):
+                self.file_progress.emit(f"Converted ({done}/{total}): {os.path.basename(result.source)}")
+                self.progress.emit(int((done / total) * 100))
             
-            self.finished.emit(converted_files)
+            # Convert across worker processes; files converted before are skipped
+            report = convert_batch(convert_lev_file, lev_files, output_for=xle_path_for, progress=progress,
+                                   cancelled=lambda: self._cancel_requested)
+            
+            self.finished.emit(report.outputs)
+            if report.failures:
+                self.error.emit(f"{len(report.failures)} file(s) could not be converted:\n" +
+                                "\n".join(f"{r.source}: {r.error}" for r in report.failures[:10]))
             
         except Exception as e:
             import traceback
@@ -534,6 +519,12 @@ class LevToXleConverterApp(QMainWindow):
         convert_btn.clicked.connect(self.start_conversion)
         main_layout.addWidget(convert_btn)
         
+        # Stops the running conversion after the files in progress
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_conversion)
+        main_layout.addWidget(self.cancel_btn)
+        
         # Store the selected folder path
         self.folder_path = None
         
@@ -574,8 +565,16 @@ class LevToXleConverterApp(QMainWindow):
         self.worker.status_update.connect(self.update_file_count)
         
         # Start conversion
+        self.cancel_btn.setEnabled(True)
         self.worker.start()
         
+    def cancel_conversion(self):
+        """Ask the worker to stop starting new files"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.status_label.setText("Cancelling after the files in progress...")
+        
     def update_progress(self, value):
         """Update the progress bar"""
         self.progress_bar.setValue(value)
@@ -595,7 +594,11 @@ class LevToXleConverterApp(QMainWindow):
     def conversion_finished(self, converted_files):
         """Handle completion of conversion"""
         count = len(converted_files)
+        self.cancel_btn.setEnabled(False)
         
+        if self.worker.cancel_requested:
+            self.status_label.setText(f"Conversion cancelled. Converted {count} files.")
+            return
         if count == 0:
             self.status_label.setText("No .lev files found in the selected folder.")
         else:
@@ -614,22 +617,37 @@ class LevToXleConverterApp(QMainWindow):
         
     def show_error(self, error_message):
         """Display error message"""
+        self.cancel_btn.setEnabled(False)
         QMessageBox.critical(self, "Conversion Error", error_message)
         self.status_label.setText("Conversion failed. See error message.")
+    
+    def closeEvent(self, event):
+        """Stop a running conversion before the window closes"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.blockSignals(True)
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
 
 # Command-line interface handling
 def process_command_line():
     """Process command line arguments if script is run directly"""
     if len(sys.argv) > 1:
-        directory = sys.argv[1]
-        recursive = True if len(sys.argv) <= 2 or sys.argv[2].lower() == 'true' else False
+        parser = argparse.ArgumentParser(description='Convert Solinst .lev files to XLE files.')
+        parser.add_argument('directory', help='Folder containing LEV files')
+        parser.add_argument('recursive', nargs='?', default='true', help='Include subfolders (true/false)')
+        parser.add_argument('--force', action='store_true', help='Convert files whose XLE is up to date')
+        add_batch_arguments(parser)
+        args = parser.parse_args()
+        recursive = args.recursive.lower() == 'true'
         
         converter = LevToXleConverter()
-        converted = converter.scan_and_convert(directory, recursive)
-        print(f"Converted {len(converted)} files:")
-        for file in converted:
+        report = converter.convert_folder(args.directory, recursive, workers=args.workers, force=args.force)
+        print(f"Converted {len(report.outputs)} files:")
+        for file in report.outputs:
             print(f" - {file}")
+        print_report(report, args.report)
         return True
     return False
 
@@ -1,326 +1,495 @@
 import os
 import sys
+import json
+import time
+import hashlib
 import logging
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Tuple, Any
-import matplotlib.pyplot as plt
+from types import SimpleNamespace
+from typing import List, Dict, Tuple, Any, Optional, Callable
+from matplotlib import cm
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import matplotlib.dates as mdates
-from datetime import datetime
-import pandas as pd
 import numpy as np
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                           QHBoxLayout, QPushButton, QFileDialog, QLabel, 
-                           QProgressBar, QMessageBox)
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                           QHBoxLayout, QPushButton, QFileDialog, QLabel,
+                           QProgressBar, QMessageBox, QCheckBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 # Import the SolinstReader from its location
 sys.path.append(str(Path(__file__).parent.parent / "src" / "gui" / "handlers"))
 from solinst_reader import SolinstReader
 
+sys.path.append(str(Path(__file__).parent))
+from batch_converter import atomic_output, default_workers
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Organized folders and the logger type of their plots
+LOGGER_FOLDERS = {
+    'Barologgers': 'Barologger',
+    'Leveloggers': 'Levelogger'
+}
+
+FIGSIZE = (12, 8)
+DPI = 100
+COLORS = cm.tab10.colors  # Color cycle for plots
+
+# Bump when the plot layout changes so existing plots are redrawn
+RENDER_VERSION = 1
+# Bump when the cached series change so cached files are re-read
+SERIES_CACHE_VERSION = 1
+
+CACHE_DIR_NAME = ".cache"
+MANIFEST_NAME = "plot_manifest.json"
+
+
+def decimate_min_max(x: np.ndarray, y: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a series to the minimum and maximum of each of `buckets` runs of
+    consecutive points, kept in time order, so spikes and drops still show
+    at the resolution of the plot. Short series are returned unchanged.
+    """
+    n = len(y)
+    if n <= 2 * buckets:
+        return x, y
+    size = -(-n // buckets)
+    rows = -(-n // size)
+    values = np.asarray(y, dtype=float)
+    missing = np.isnan(values)
+    # Padding and missing values are never picked over real readings
+    low = np.full(rows * size, np.inf)
+    low[:n] = np.where(missing, np.inf, values)
+    high = np.full(rows * size, -np.inf)
+    high[:n] = np.where(missing, -np.inf, values)
+    offsets = np.arange(rows) * size
+    picks = np.column_stack([offsets + low.reshape(rows, size).argmin(axis=1),
+                             offsets + high.reshape(rows, size).argmax(axis=1)])
+    picks = np.unique(np.concatenate(([0], picks.ravel(), [n - 1])))
+    return x[picks], y[picks]
+
+
+def series_cache_dir(plots_dir: Path, folder: str, serial_number: str) -> Path:
+    """Where the parsed series of a serial number folder are cached"""
+    return plots_dir / CACHE_DIR_NAME / folder / serial_number
+
+
+def load_series(xle_file: Path, reader: SolinstReader,
+                cache_dir: Optional[Path] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    Timestamps, plotted values and logger details of an XLE file, read from
+    the cache when the file has not changed since it was cached.
+
+    Returns:
+        Tuple of (series, whether it came from the cache)
+    """
+    stat = xle_file.stat()
+    cache_file = cache_dir / f"{xle_file.name}.npz" if cache_dir else None
+
+    if cache_file and cache_file.exists():
+        try:
+            with np.load(cache_file) as cached:
+                if (int(cached['version']) == SERIES_CACHE_VERSION and int(cached['size']) == stat.st_size
+                        and int(cached['mtime_ns']) == stat.st_mtime_ns):
+                    return {
+                        'timestamps': cached['timestamps'],
+                        'values': cached['values'],
+                        'instrument_type': str(cached['instrument_type']),
+                        'model_number': str(cached['model_number']),
+                        'level_unit': str(cached['level_unit'])
+                    }, True
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable series cache {cache_file}: {e}")
+
+    df, metadata = reader.read_xle(xle_file)
+    series = {
+        'timestamps': df['timestamp'].to_numpy(dtype='datetime64[ns]'),
+        'values': df['pressure'].to_numpy(dtype=float),
+        'instrument_type': metadata.instrument_type or "",
+        'model_number': metadata.model_number or "",
+        'level_unit': metadata.level_unit or ""
+    }
+
+    if cache_file:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_output(str(cache_file), 'wb') as f:
+                np.savez(f, version=SERIES_CACHE_VERSION, size=stat.st_size, mtime_ns=stat.st_mtime_ns, **series)
+        except Exception as e:
+            logger.warning(f"Could not cache series of {xle_file}: {e}")
+
+    return series, False
+
+
+def plot_fingerprint(serial_dir: Path, logger_type: str) -> str:
+    """Identifies the inputs of a plot: its XLE files with their sizes and modification times"""
+    parts = [str(RENDER_VERSION), logger_type]
+    for xle_file in sorted(serial_dir.glob("*.xle")):
+        stat = xle_file.stat()
+        parts.append(f"{xle_file.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.md5("|".join(parts).encode('utf-8')).hexdigest()
+
+
+def render_serial_plot(serial_dir: Path, output_path: Path, logger_type: str,
+                       cache_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Generate plot for a single serial number directory
+
+    Draws on a headless Agg canvas, so it can run in worker processes.
+
+    Args:
+        serial_dir: Directory containing XLE files for a serial number
+        output_path: Where to save the plot
+        logger_type: "Barologger" or "Levelogger"
+        cache_dir: Directory for cached series of the files (None to read every file)
+
+    Returns:
+        Dictionary with plot generation results
+    """
+    start = time.perf_counter()
+    reader = SolinstReader()
+
+    # Find all XLE files in the directory
+    xle_files = sorted(serial_dir.glob("*.xle"))
+
+    if not xle_files:
+        logger.warning(f"No XLE files found in {serial_dir}")
+        return {
+            'success': False,
+            'error': "No XLE files found",
+            'files_processed': 0,
+            'files_plotted': 0,
+            'failed_files': [],
+            'seconds': time.perf_counter() - start
+        }
+
+    # Track file processing results
+    result = {
+        'success': True,
+        'files_processed': len(xle_files),
+        'files_plotted': 0,
+        'failed_files': [],
+        'cached_files': 0,
+        'points_read': 0,
+        'points_drawn': 0
+    }
+
+    loaded = []
+    for i, xle_file in enumerate(xle_files):
+        try:
+            series, from_cache = load_series(xle_file, reader, cache_dir)
+            result['cached_files'] += from_cache
+            if len(series['values']) == 0:
+                result['failed_files'].append({
+                    'file': xle_file.name,
+                    'error': "No valid data points"
+                })
+                continue
+            loaded.append((i, xle_file, series))
+        except Exception as e:
+            result['failed_files'].append({
+                'file': xle_file.name,
+                'error': str(e)
+            })
+            logger.error(f"Error plotting file {xle_file}: {e}")
+
+    # Confirm the logger type from the first file
+    unit = ""
+    if loaded:
+        first = loaded[0][2]
+        unit = first['level_unit']
+        is_baro = reader.is_barologger(SimpleNamespace(
+            instrument_type=first['instrument_type'],
+            model_number=first['model_number'],
+            level_unit=first['level_unit']
+        ))
+        corrected_logger_type = "Barologger" if is_baro else "Levelogger"
+        if corrected_logger_type != logger_type:
+            logger.warning(f"Logger type mismatch! Directory suggests {logger_type} but file indicates {corrected_logger_type}")
+            logger_type = corrected_logger_type
+
+    # Figure and axes on a headless canvas
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    ax.set_title(f"{logger_type} {serial_dir.name} - Pressure Data", fontsize=14)
+    ax.set_xlabel("Date", fontsize=12)
+    if logger_type == "Barologger":
+        ax.set_ylabel(f"Barometric Pressure ({unit or 'psi'})", fontsize=12)
+    else:
+        ax.set_ylabel(f"Water Level ({unit or 'ft'})", fontsize=12)
+
+    # Two points per pixel column of the plot width is enough for any file
+    buckets = int(FIGSIZE[0] * DPI)
+    first_time, last_time = None, None
+
+    for i, xle_file, series in loaded:
+        timestamps, values = series['timestamps'], series['values']
+        start_time, end_time = timestamps.min(), timestamps.max()
+        label = (f"{xle_file.name} ({np.datetime_as_string(start_time, unit='D')} "
+                 f"to {np.datetime_as_string(end_time, unit='D')})")
+
+        x, y = decimate_min_max(timestamps, values, buckets)
+        ax.plot(x, y, label=label, color=COLORS[i % len(COLORS)], alpha=0.8, linewidth=1.5)
+
+        first_time = start_time if first_time is None else min(first_time, start_time)
+        last_time = end_time if last_time is None else max(last_time, end_time)
+        result['points_read'] += len(values)
+        result['points_drawn'] += len(y)
+        result['files_plotted'] += 1
+
+    if first_time is not None:
+        ax.set_xlim(first_time, last_time)
+
+    # Format the date axis nicely
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    fig.autofmt_xdate()  # Rotate date labels
+
+    if loaded:
+        ax.legend(loc='best', fontsize=10)
+    ax.grid(True, linestyle='--', alpha=0.6)
+
+    # Replace the previous plot only once the new one is complete
+    fig.tight_layout()
+    with atomic_output(str(output_path), 'wb') as f:
+        fig.savefig(f, format='png')
+
+    result['seconds'] = time.perf_counter() - start
+    logger.debug(f"PERF: Plotted {serial_dir.name} ({result['points_drawn']} of {result['points_read']} points) "
+                 f"in {result['seconds'] * 1000:.2f}ms")
+    return result
+
+
 class PlotGenerator:
-    """Generates pressure plots from organized XLE files"""
-    
-    def __init__(self):
-        """Initialize plot generator"""
+    """
+    Generates pressure plots from organized XLE files
+
+    Serial number folders are plotted in parallel worker processes. Plots
+    whose XLE files have not changed since they were drawn are skipped
+    (tracked in plots/plot_manifest.json), and the series parsed from each
+    file are cached under plots/.cache so changed folders only re-read
+    their new or modified files.
+    """
+
+    def __init__(self, workers: Optional[int] = None, use_cache: bool = True):
+        """
+        Initialize plot generator
+
+        Args:
+            workers: Worker processes (1 plots in this process)
+            use_cache: Cache the series parsed from each file
+        """
         self.reader = SolinstReader()
-        self.colors = plt.cm.tab10.colors  # Color cycle for plots
-        
-    def generate_plots(self, input_dir: str) -> Dict[str, Any]:
+        self.colors = COLORS
+        self.workers = workers or default_workers()
+        self.use_cache = use_cache
+
+    @staticmethod
+    def find_serial_dirs(input_dir: str) -> List[Tuple[str, str, Path]]:
+        """(folder, logger type, serial directory) for every serial number folder"""
+        input_path = Path(input_dir)
+        found = []
+        for folder, logger_type in LOGGER_FOLDERS.items():
+            logger_dir = input_path / folder
+            if logger_dir.exists():
+                found.extend((folder, logger_type, d) for d in sorted(logger_dir.iterdir()) if d.is_dir())
+        return found
+
+    def generate_plots(self, input_dir: str, force: bool = False,
+                       progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
         """
         Generate plots for all serial number folders
-        
+
         Args:
             input_dir: Path to organized files directory
-            
+            force: Redraw plots whose files have not changed
+            progress: Called with (plots done, total plots, description) as each plot finishes
+
         Returns:
             Statistics about plots generated
         """
+        start = time.perf_counter()
         input_path = Path(input_dir)
-        
+
         # Create plots directory structure
         plots_dir = input_path / "plots"
         plots_dir.mkdir(exist_ok=True)
-        
-        baro_plots_dir = plots_dir / "Barologgers"
-        level_plots_dir = plots_dir / "Leveloggers"
-        
-        baro_plots_dir.mkdir(exist_ok=True)
-        level_plots_dir.mkdir(exist_ok=True)
-        
+        for folder in LOGGER_FOLDERS:
+            (plots_dir / folder).mkdir(exist_ok=True)
+
         # Track statistics
         stats = {
             'barologger_plots': 0,
             'levelogger_plots': 0,
+            'plots_skipped': 0,
             'files_processed': 0,
             'errors': 0,
+            'elapsed': 0.0,
+            'workers': self.workers,
             'report': {
                 'barologgers': {},
                 'leveloggers': {}
             }
         }
-        
-        # Process Barologgers
-        baro_dir = input_path / "Barologgers"
-        if baro_dir.exists():
-            for serial_dir in baro_dir.iterdir():
-                if serial_dir.is_dir():
-                    serial_number = serial_dir.name
-                    try:
-                        result = self._generate_serial_plot(serial_dir, baro_plots_dir / f"{serial_dir.name}.png", "Barologger")
-                        stats['barologger_plots'] += 1
-                        stats['files_processed'] += result['files_processed']
-                        stats['errors'] += len(result['failed_files'])
-                        stats['report']['barologgers'][serial_number] = result
-                        logger.info(f"Generated plot for Barologger {serial_dir.name}")
-                    except Exception as e:
-                        stats['errors'] += 1
-                        stats['report']['barologgers'][serial_number] = {
-                            'success': False,
-                            'error': str(e),
-                            'files_processed': 0,
-                            'files_plotted': 0,
-                            'failed_files': []
-                        }
-                        logger.error(f"Error generating plot for {serial_dir}: {e}")
-        
-        # Process Leveloggers
-        level_dir = input_path / "Leveloggers"
-        if level_dir.exists():
-            for serial_dir in level_dir.iterdir():
-                if serial_dir.is_dir():
-                    serial_number = serial_dir.name
+
+        manifest_path = plots_dir / MANIFEST_NAME
+        manifest = self._load_manifest(manifest_path)
+        serial_dirs = self.find_serial_dirs(input_dir)
+        total = len(serial_dirs)
+        done = 0
+
+        def record(folder, logger_type, serial_dir, result=None, error=None):
+            nonlocal done
+            serial_number = serial_dir.name
+            report = stats['report'][folder.lower()]
+            if error is not None:
+                stats['errors'] += 1
+                report[serial_number] = {
+                    'success': False,
+                    'error': error,
+                    'files_processed': 0,
+                    'files_plotted': 0,
+                    'failed_files': []
+                }
+                logger.error(f"Error generating plot for {serial_dir}: {error}")
+            elif result.get('skipped'):
+                stats['plots_skipped'] += 1
+                report[serial_number] = result
+            else:
+                stats[f"{logger_type.lower()}_plots"] += 1
+                stats['files_processed'] += result['files_processed']
+                stats['errors'] += len(result['failed_files'])
+                report[serial_number] = result
+                logger.info(f"Generated plot for {logger_type} {serial_number}")
+            done += 1
+            if progress:
+                progress(done, total, f"{logger_type} {serial_number}")
+
+        # Plots whose files are unchanged are kept
+        pending = []
+        for folder, logger_type, serial_dir in serial_dirs:
+            key = f"{folder}/{serial_dir.name}"
+            output_path = plots_dir / folder / f"{serial_dir.name}.png"
+            try:
+                fingerprint = plot_fingerprint(serial_dir, logger_type)
+            except OSError as e:
+                record(folder, logger_type, serial_dir, error=str(e))
+                continue
+            previous = manifest.get(key)
+            if not force and previous and previous['fingerprint'] == fingerprint and output_path.exists():
+                record(folder, logger_type, serial_dir, dict(previous['result'], skipped=True, seconds=0.0))
+                continue
+            cache_dir = series_cache_dir(plots_dir, folder, serial_dir.name) if self.use_cache else None
+            pending.append((key, fingerprint, folder, logger_type, serial_dir,
+                            (serial_dir, output_path, logger_type, cache_dir)))
+
+        def finished(job, result):
+            key, fingerprint = job[:2]
+            if result.get('success'):
+                manifest[key] = {'fingerprint': fingerprint, 'result': result}
+            else:
+                manifest.pop(key, None)
+            record(*job[2:5], result)
+
+        if self.workers <= 1 or len(pending) < 2:
+            for job in pending:
+                try:
+                    finished(job, render_serial_plot(*job[5]))
+                except Exception as e:
+                    manifest.pop(job[0], None)
+                    record(*job[2:5], error=str(e))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+                futures = {executor.submit(render_serial_plot, *job[5]): job for job in pending}
+                for future in as_completed(futures):
+                    job = futures[future]
                     try:
-                        result = self._generate_serial_plot(serial_dir, level_plots_dir / f"{serial_dir.name}.png", "Levelogger")
-                        stats['levelogger_plots'] += 1
-                        stats['files_processed'] += result['files_processed']
-                        stats['errors'] += len(result['failed_files'])
-                        stats['report']['leveloggers'][serial_number] = result
-                        logger.info(f"Generated plot for Levelogger {serial_dir.name}")
+                        finished(job, future.result())
                     except Exception as e:
-                        stats['errors'] += 1
-                        stats['report']['leveloggers'][serial_number] = {
-                            'success': False,
-                            'error': str(e),
-                            'files_processed': 0,
-                            'files_plotted': 0,
-                            'failed_files': []
-                        }
-                        logger.error(f"Error generating plot for {serial_dir}: {e}")
-        
+                        manifest.pop(job[0], None)
+                        record(*job[2:5], error=str(e))
+
+        self._save_manifest(manifest, manifest_path)
+        stats['elapsed'] = time.perf_counter() - start
+
         # Generate report file
         self._generate_report_file(stats, plots_dir / "plot_report.txt")
-        
+        logger.debug(f"PERF: Generated {total - stats['plots_skipped']} plots, skipped {stats['plots_skipped']} "
+                     f"in {stats['elapsed'] * 1000:.2f}ms")
+
         return stats
-    
+
+    def _load_manifest(self, manifest_path: Path) -> Dict[str, Any]:
+        """Fingerprints and results of previously drawn plots"""
+        if not manifest_path.exists():
+            return {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest.get('plots', {}) if manifest.get('version') == RENDER_VERSION else {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable plot manifest {manifest_path}: {e}")
+            return {}
+
+    def _save_manifest(self, manifest: Dict[str, Any], manifest_path: Path):
+        try:
+            with atomic_output(str(manifest_path)) as f:
+                json.dump({'version': RENDER_VERSION, 'plots': manifest}, f, indent=1)
+        except Exception as e:
+            logger.error(f"Error saving plot manifest {manifest_path}: {e}")
+
     def _generate_report_file(self, stats: Dict[str, Any], output_path: Path):
         """Generate a detailed report file"""
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write("SOLINST XLE PLOTTING REPORT\n")
             f.write("==========================\n\n")
-            
+
             f.write(f"Total plots generated: {stats['barologger_plots'] + stats['levelogger_plots']}\n")
             f.write(f"Barologger plots: {stats['barologger_plots']}\n")
             f.write(f"Levelogger plots: {stats['levelogger_plots']}\n")
+            f.write(f"Plots unchanged (skipped): {stats.get('plots_skipped', 0)}\n")
             f.write(f"Total files processed: {stats['files_processed']}\n")
-            f.write(f"Files with errors: {stats['errors']}\n\n")
-            
-            # Barologger details
-            f.write("BAROLOGGER DETAILS\n")
-            f.write("-----------------\n")
-            for serial, result in stats['report']['barologgers'].items():
-                f.write(f"\nSerial Number: {serial}\n")
-                if result.get('success', False):
-                    f.write(f"  Status: Success\n")
-                    f.write(f"  Files processed: {result['files_processed']}\n")
-                    f.write(f"  Files successfully plotted: {result['files_plotted']}\n")
-                    f.write(f"  Files failed: {len(result['failed_files'])}\n")
-                    if result['failed_files']:
-                        f.write("  Failed files:\n")
-                        for failed in result['failed_files']:
-                            f.write(f"    - {failed['file']}: {failed['error']}\n")
-                else:
-                    f.write(f"  Status: Failed\n")
-                    f.write(f"  Error: {result.get('error', 'Unknown error')}\n")
-            
-            # Levelogger details
-            f.write("\nLEVELOGGER DETAILS\n")
-            f.write("------------------\n")
-            for serial, result in stats['report']['leveloggers'].items():
-                f.write(f"\nSerial Number: {serial}\n")
-                if result.get('success', False):
-                    f.write(f"  Status: Success\n")
-                    f.write(f"  Files processed: {result['files_processed']}\n")
-                    f.write(f"  Files successfully plotted: {result['files_plotted']}\n")
-                    f.write(f"  Files failed: {len(result['failed_files'])}\n")
-                    if result['failed_files']:
-                        f.write("  Failed files:\n")
-                        for failed in result['failed_files']:
-                            f.write(f"    - {failed['file']}: {failed['error']}\n")
-                else:
-                    f.write(f"  Status: Failed\n")
-                    f.write(f"  Error: {result.get('error', 'Unknown error')}\n")
-    
-    def _generate_serial_plot(self, serial_dir: Path, output_path: Path, logger_type: str) -> Dict[str, Any]:
-        """
-        Generate plot for a single serial number directory
-        
-        Args:
-            serial_dir: Directory containing XLE files for a serial number
-            output_path: Where to save the plot
-            logger_type: "Barologger" or "Levellogger"
-            
-        Returns:
-            Dictionary with plot generation results
-        """
-        # Find all XLE files in the directory
-        xle_files = list(serial_dir.glob("*.xle"))
-        
-        if not xle_files:
-            logger.warning(f"No XLE files found in {serial_dir}")
-            return {
-                'success': False,
-                'error': "No XLE files found",
-                'files_processed': 0,
-                'files_plotted': 0,
-                'failed_files': []
-            }
-            
-        # DEBUG: Print information about the logger type determination
-        logger.info(f"Processing directory: {serial_dir}")
-        logger.info(f"Initial logger_type passed to function: {logger_type}")
-        
-        # Try to verify the logger type by checking the first file
-        try:
-            first_file = xle_files[0]
-            first_metadata, _ = self.reader.get_file_metadata(first_file)
-            
-            # DEBUG: Print metadata details
-            logger.info(f"First file metadata:")
-            logger.info(f"  - Instrument Type: '{first_metadata.instrument_type}'")
-            logger.info(f"  - Model Number: '{first_metadata.model_number}'")
-            
-            # Strip whitespace from model for debugging display
-            model_stripped = first_metadata.model_number.strip() if first_metadata.model_number else ""
-            logger.info(f"  - Model Number (stripped): '{model_stripped}'")
-            
-            # Check if the reader thinks it's a barologger
-            is_baro = self.reader.is_barologger(first_metadata)
-            logger.info(f"  - Reader classification - is_barologger(): {is_baro}")
-            
-            # Check if model is in BAROLOGGER_TYPES for debugging
-            model_in_baro_types = False
-            if first_metadata.instrument_type in self.reader.BAROLOGGER_TYPES:
-                valid_models = self.reader.BAROLOGGER_TYPES[first_metadata.instrument_type]
-                model_in_baro_types = any(model_stripped.startswith(valid_model) for valid_model in valid_models)
-                logger.info(f"  - Model starts with a known barologger model: {model_in_baro_types}")
-                logger.info(f"  - Valid baro models for this instrument: {valid_models}")
-            else:
-                logger.info(f"  - Instrument type not in known BAROLOGGER_TYPES")
-            
-            # Confirm logger_type based on file analysis
-            corrected_logger_type = "Barologger" if is_baro else "Levellogger"
-            
-            if corrected_logger_type != logger_type:
-                logger.warning(f"Logger type mismatch! Directory suggests {logger_type} but file indicates {corrected_logger_type}")
-                # Use the corrected type for the plot
-                logger_type = corrected_logger_type
-        except Exception as e:
-            logger.error(f"Error checking logger type: {e}")
-            # Continue with the original logger_type if there was an error
-        
-        # Figure and axes
-        fig, ax = plt.subplots(figsize=(12, 8), dpi=100)
-        
-        # Generate a title
-        serial_number = serial_dir.name
-        title = f"{logger_type} {serial_number} - Pressure Data"
-        ax.set_title(title, fontsize=14)
-        
-        # Configure axes
-        ax.set_xlabel("Date", fontsize=12)
-        
-        # Determine y-axis label based on logger type
-        if logger_type == "Barologger":
-            ax.set_ylabel("Barometric Pressure (kPa)", fontsize=12)
-        else:
-            ax.set_ylabel("Water Level (m)", fontsize=12)
-            
-        # Track min/max dates for x-axis limits
-        all_dates = []
-        
-        # Track file processing results
-        result = {
-            'success': True,
-            'files_processed': len(xle_files),
-            'files_plotted': 0,
-            'failed_files': []
-        }
-        
-        # Process each file, add to plot with different colors
-        for i, xle_file in enumerate(xle_files):
-            try:
-                # Load data
-                df, metadata = self.reader.read_xle(xle_file)
-                
-                # Skip empty dataframes
-                if df.empty:
-                    result['failed_files'].append({
-                        'file': xle_file.name,
-                        'error': "No valid data points"
-                    })
-                    continue
-                
-                # Use a cycling color from the color map
-                color = self.colors[i % len(self.colors)]
-                
-                # Format the label to include date range
-                start_date = df['timestamp'].min().strftime('%Y-%m-%d')
-                end_date = df['timestamp'].max().strftime('%Y-%m-%d')
-                label = f"{xle_file.name} ({start_date} to {end_date})"
-                
-                # Plot the data
-                ax.plot(df['timestamp'], df['pressure'], label=label, color=color, alpha=0.8, linewidth=1.5)
-                
-                # Collect dates for x-axis limits
-                all_dates.extend(df['timestamp'].tolist())
-                
-                # Count successful plot
-                result['files_plotted'] += 1
-                
-                logger.info(f"Added {xle_file.name} to plot")
-                
-            except Exception as e:
-                result['failed_files'].append({
-                    'file': xle_file.name,
-                    'error': str(e)
-                })
-                logger.error(f"Error plotting file {xle_file}: {e}")
-        
-        # Format the x-axis
-        if all_dates:
-            ax.set_xlim(min(all_dates), max(all_dates))
-            
-        # Format the date axis nicely
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-        fig.autofmt_xdate()  # Rotate date labels
-        
-        # Add legend
-        ax.legend(loc='best', fontsize=10)
-        
-        # Add grid for readability
-        ax.grid(True, linestyle='--', alpha=0.6)
-        
-        # Save the figure
-        plt.tight_layout()
-        plt.savefig(output_path)
-        plt.close(fig)  # Close to prevent memory leaks
-        
-        return result
+            f.write(f"Files with errors: {stats['errors']}\n")
+            f.write(f"Elapsed time: {stats.get('elapsed', 0.0):.1f}s with {stats.get('workers', 1)} worker(s)\n\n")
+
+            # Slowest plots first, for finding folders that need attention
+            timed = [(result['seconds'], f"{kind[:-1].capitalize()} {serial}")
+                     for kind, results in stats['report'].items() for serial, result in results.items()
+                     if result.get('seconds') and not result.get('skipped')]
+            if timed:
+                f.write("SLOWEST PLOTS\n")
+                f.write("-------------\n")
+                for seconds, name in sorted(timed, reverse=True)[:10]:
+                    f.write(f"  {seconds:.2f}s  {name}\n")
+                f.write("\n")
+
+            for title, key in [("BAROLOGGER DETAILS\n-----------------\n", 'barologgers'),
+                               ("\nLEVELOGGER DETAILS\n------------------\n", 'leveloggers')]:
+                f.write(title)
+                for serial, result in stats['report'][key].items():
+                    f.write(f"\nSerial Number: {serial}\n")
+                    if result.get('success', False):
+                        f.write(f"  Status: {'Unchanged (skipped)' if result.get('skipped') else 'Success'}\n")
+                        f.write(f"  Files processed: {result['files_processed']}\n")
+                        f.write(f"  Files successfully plotted: {result['files_plotted']}\n")
+                        f.write(f"  Files failed: {len(result['failed_files'])}\n")
+                        if not result.get('skipped') and 'seconds' in result:
+                            f.write(f"  Time: {result['seconds']:.2f}s "
+                                    f"({result.get('cached_files', 0)} files from cache, "
+                                    f"{result.get('points_drawn', 0)} of {result.get('points_read', 0)} points drawn)\n")
+                        if result['failed_files']:
+                            f.write("  Failed files:\n")
+                            for failed in result['failed_files']:
+                                f.write(f"    - {failed['file']}: {failed['error']}\n")
+                    else:
+                        f.write(f"  Status: Failed\n")
+                        f.write(f"  Error: {result.get('error', 'Unknown error')}\n")
 
 
 class PlotGeneratorWorker(QThread):
@@ -329,136 +498,33 @@ class PlotGeneratorWorker(QThread):
     status_update = pyqtSignal(str)
     finished = pyqtSignal(dict)  # Stats dictionary
     error = pyqtSignal(str)
-    
-    def __init__(self, input_dir):
+
+    def __init__(self, input_dir, force=False):
         super().__init__()
         self.input_dir = input_dir
+        self.force = force
         self.generator = PlotGenerator()
-        
+
     def run(self):
         try:
             self.status_update.emit("Scanning directory structure...")
-            
-            # Count total number of serial dirs for progress tracking
-            input_path = Path(self.input_dir)
-            baro_dir = input_path / "Barologgers"
-            level_dir = input_path / "Levelloggers"
-            
-            serial_dirs = []
-            
-            if baro_dir.exists():
-                serial_dirs.extend([d for d in baro_dir.iterdir() if d.is_dir()])
-                
-            if level_dir.exists():
-                serial_dirs.extend([d for d in level_dir.iterdir() if d.is_dir()])
-            
-            total_dirs = len(serial_dirs)
-            
+
+            total_dirs = len(self.generator.find_serial_dirs(self.input_dir))
             if total_dirs == 0:
                 self.error.emit("No Barologger or Levelogger folders found in the input directory")
                 return
-                
+
             self.status_update.emit(f"Found {total_dirs} serial number folders to process")
-            
-            # Create stats tracker with report
-            stats = {
-                'barologger_plots': 0,
-                'levelogger_plots': 0,
-                'files_processed': 0,
-                'errors': 0,
-                'report': {
-                    'barologgers': {},
-                    'leveloggers': {}
-                }
-            }
-            
-            # Create output directory structure
-            plots_dir = input_path / "plots"
-            plots_dir.mkdir(exist_ok=True)
-            
-            baro_plots_dir = plots_dir / "Barologgers"
-            level_plots_dir = plots_dir / "Levelloggers"
-            
-            baro_plots_dir.mkdir(exist_ok=True)
-            level_plots_dir.mkdir(exist_ok=True)
-            
-            # Process each serial number directory
-            processed = 0
-            
-            # Process Barologgers
-            if baro_dir.exists():
-                for serial_dir in baro_dir.iterdir():
-                    if serial_dir.is_dir():
-                        serial_number = serial_dir.name
-                        self.status_update.emit(f"Processing Barologger {serial_dir.name}...")
-                        
-                        try:
-                            result = self.generator._generate_serial_plot(
-                                serial_dir, 
-                                baro_plots_dir / f"{serial_dir.name}.png", 
-                                "Barologger"
-                            )
-                            stats['barologger_plots'] += 1
-                            stats['files_processed'] += result['files_processed']
-                            stats['errors'] += len(result['failed_files'])
-                            stats['report']['barologgers'][serial_number] = result
-                            logger.info(f"Generated plot for Barologger {serial_dir.name}")
-                        except Exception as e:
-                            stats['errors'] += 1
-                            stats['report']['barologgers'][serial_number] = {
-                                'success': False,
-                                'error': str(e),
-                                'files_processed': 0,
-                                'files_plotted': 0,
-                                'failed_files': []
-                            }
-                            logger.error(f"Error generating plot for {serial_dir}: {e}")
-                            
-                        # Update progress
-                        processed += 1
-                        progress_percent = int((processed / total_dirs) * 100)
-                        self.progress.emit(progress_percent)
-            
-            # Process Levelloggers
-            if level_dir.exists():
-                for serial_dir in level_dir.iterdir():
-                    if serial_dir.is_dir():
-                        serial_number = serial_dir.name
-                        self.status_update.emit(f"Processing Levellogger {serial_dir.name}...")
-                        
-                        try:
-                            result = self.generator._generate_serial_plot(
-                                serial_dir, 
-                                level_plots_dir / f"{serial_dir.name}.png", 
-                                "Levellogger"
-                            )
-                            stats['levelogger_plots'] += 1
-                            stats['files_processed'] += result['files_processed']
-                            stats['errors'] += len(result['failed_files'])
-                            stats['report']['leveloggers'][serial_number] = result
-                            logger.info(f"Generated plot for Levellogger {serial_dir.name}")
-                        except Exception as e:
-                            stats['errors'] += 1
-                            stats['report']['leveloggers'][serial_number] = {
-                                'success': False,
-                                'error': str(e),
-                                'files_processed': 0,
-                                'files_plotted': 0,
-                                'failed_files': []
-                            }
-                            logger.error(f"Error generating plot for {serial_dir}: {e}")
-                            
-                        # Update progress
-                        processed += 1
-                        progress_percent = int((processed / total_dirs) * 100)
-                        self.progress.emit(progress_percent)
-            
-            # Generate report file
-            self.generator._generate_report_file(stats, plots_dir / "plot_report.txt")
-                
+
+            def report_progress(done, total, name):
+                self.status_update.emit(f"Processed {name} ({done}/{total})")
+                self.progress.emit(int((done / total) * 100))
+
+            stats = self.generator.generate_plots(self.input_dir, force=self.force, progress=report_progress)
+
             # Return the final stats
             self.finished.emit(stats)
-            
+
         except Exception as e:
             import traceback
             logger.error(f"Plot generation error: {e}\n{traceback.format_exc()}")
@@ -504,6 +570,10 @@ class PlotGeneratorApp(QMainWindow):
         self.progress_bar.setValue(0)
         main_layout.addWidget(self.progress_bar)
         
+        # Redraw plots whose files have not changed
+        self.force_checkbox = QCheckBox("Redraw unchanged plots")
+        main_layout.addWidget(self.force_checkbox)
+        
         # Generate button
         generate_btn = QPushButton("Generate Plots")
         generate_btn.clicked.connect(self.start_plot_generation)
@@ -525,15 +595,12 @@ class PlotGeneratorApp(QMainWindow):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder with Organized XLE Files")
         if folder:
             # Check if it has the expected structure
-            has_barologger = (Path(folder) / "Barologgers").exists()
-            has_levellogger = (Path(folder) / "Levelloggers").exists()
-            
-            if not (has_barologger or has_levellogger):
+            if not any((Path(folder) / name).exists() for name in LOGGER_FOLDERS):
                 QMessageBox.warning(
                     self,
                     "Invalid Folder Structure",
                     "The selected folder does not have the expected structure.\n\n"
-                    "It should contain 'Barologgers' and/or 'Levelloggers' subfolders."
+                    "It should contain 'Barologgers' and/or 'Leveloggers' subfolders."
                 )
                 return
                 
@@ -554,7 +621,7 @@ class PlotGeneratorApp(QMainWindow):
         self.result_label.setText("Generating plots...")
         
         # Create and start worker thread
-        self.worker = PlotGeneratorWorker(self.folder_path)
+        self.worker = PlotGeneratorWorker(self.folder_path, force=self.force_checkbox.isChecked())
         
         # Connect signals
         self.worker.progress.connect(self.update_progress)
@@ -578,6 +645,7 @@ class PlotGeneratorApp(QMainWindow):
         baro_count = stats['barologger_plots']
         level_count = stats['levelogger_plots']
         error_count = stats['errors']
+        skipped_count = stats.get('plots_skipped', 0)
         
         self.result_label.setText(f"Plot generation complete. Generated {baro_count + level_count} plots.")
         self.progress_bar.setValue(100)
@@ -585,8 +653,13 @@ class PlotGeneratorApp(QMainWindow):
         # Show a message box with the results
         message = f"Successfully generated {baro_count + level_count} plots:\n\n" + \
                   f"- {baro_count} Barologger plots\n" + \
-                  f"- {level_count} Levellogger plots\n\n"
+                  f"- {level_count} Levelogger plots\n\n"
                   
+        if skipped_count > 0:
+            message += f"{skipped_count} plots were unchanged and kept.\n\n"
+            
+        message += f"Finished in {stats.get('elapsed', 0.0):.1f} seconds.\n\n"
+        
         if error_count > 0:
             message += f"There were {error_count} errors during processing.\n\n"
             
@@ -605,19 +678,25 @@ def process_command_line():
     """Process command line arguments if script is run directly"""
     parser = argparse.ArgumentParser(description='Generate plots from organized XLE files.')
     parser.add_argument('input_dir', help='Directory containing organized XLE files')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Worker processes (default: number of CPUs, up to 8)')
+    parser.add_argument('--force', action='store_true', help='Redraw plots whose files have not changed')
+    parser.add_argument('--no-cache', action='store_true', help='Read every file instead of using cached series')
     
     if len(sys.argv) > 1:
         args = parser.parse_args()
         
-        generator = PlotGenerator()
+        generator = PlotGenerator(workers=args.workers, use_cache=not args.no_cache)
         
         try:
             print(f"Generating plots from {args.input_dir}...")
-            stats = generator.generate_plots(args.input_dir)
+            stats = generator.generate_plots(args.input_dir, force=args.force)
             
-            print(f"Successfully generated {stats['barologger_plots'] + stats['levellogger_plots']} plots:")
+            print(f"Successfully generated {stats['barologger_plots'] + stats['levelogger_plots']} plots "
+                  f"in {stats['elapsed']:.1f}s:")
             print(f"- {stats['barologger_plots']} Barologger plots")
-            print(f"- {stats['levelogger_plots']} Levellogger plots")
+            print(f"- {stats['levelogger_plots']} Levelogger plots")
+            print(f"- {stats['plots_skipped']} unchanged plots skipped")
             
             if stats['errors'] > 0:
                 print(f"There were {stats['errors']} errors during processing.")
@@ -638,11 +717,6 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, 
                         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     
-    # Set up matplotlib backend for headless environments if needed
-    if not os.environ.get('DISPLAY') and not sys.platform.startswith('win') and not sys.platform == 'darwin':
-        import matplotlib
-        matplotlib.use('Agg')
-    
     # Check if we should run command line mode
     if not process_command_line():
         # No command line arguments, start GUI
@@ -3,7 +3,7 @@ import sys
 import logging
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import argparse
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QPushButton, QFileDialog, QLabel, 
@@ -14,9 +14,19 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal
 sys.path.append(str(Path(__file__).parent.parent / "src" / "gui" / "handlers"))
 from solinst_reader import SolinstReader
 
+sys.path.append(str(Path(__file__).parent))
+from batch_converter import (CONVERTED, FAILED, UNCHANGED, BatchReport, add_batch_arguments, atomic_output,
+                             convert_batch, find_files, print_report)
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
+
+def convert_units_file(file_path: str) -> Optional[str]:
+    """Batch task converting one file in place; None if it was already in feet"""
+    return file_path if UnitConverter().convert_file(Path(file_path)) else None
+
+
 class UnitConverter:
     """Converts XLE files from meters to feet"""
     
@@ -27,40 +37,32 @@ class UnitConverter:
         """Initialize unit converter"""
         self.reader = SolinstReader()
     
-    def convert_directory(self, directory: str, recursive: bool = True) -> Dict[str, int]:
+    def convert_directory(self, directory: str, recursive: bool = True, **batch_options) -> Dict[str, int]:
         """
         Scan directory for XLE files and convert units where needed
         
         Args:
             directory: Directory to scan
             recursive: Whether to include subdirectories
+            batch_options: workers, progress and cancelled for convert_batch
             
         Returns:
             Statistics about converted files
         """
-        directory_path = Path(directory)
-        pattern = "**/*.xle" if recursive else "*.xle"
-        
-        stats = {
-            'total': 0,
-            'converted': 0,
-            'already_ft': 0,
-            'errors': 0
+        return self.stats(self.convert_folder(directory, recursive, **batch_options))
+    
+    def convert_folder(self, directory: str, recursive: bool = True, **batch_options) -> BatchReport:
+        """Convert the XLE files of a folder in parallel; files already in feet are left untouched"""
+        return convert_batch(convert_units_file, find_files(directory, '.xle', recursive), **batch_options)
+    
+    @staticmethod
+    def stats(report: BatchReport) -> Dict[str, int]:
+        return {
+            'total': len(report.results),
+            'converted': report.count(CONVERTED),
+            'already_ft': report.count(UNCHANGED),
+            'errors': report.count(FAILED)
         }
-        
-        for xle_file in directory_path.glob(pattern):
-            stats['total'] += 1
-            try:
-                was_converted = self.convert_file(xle_file)
-                if was_converted:
-                    stats['converted'] += 1
-                else:
-                    stats['already_ft'] += 1
-            except Exception as e:
-                logger.error(f"Error converting {xle_file}: {e}")
-                stats['errors'] += 1
-        
-        return stats
     
     def convert_file(self, file_path: Path) -> bool:
         """
@@ -78,11 +80,11 @@ class UnitConverter:
         
         # Find the Ch1_data_header element and check unit
         ch1_header = root.find('.//Ch1_data_header')
-        if not ch1_header:
+        if ch1_header is None:
             raise ValueError(f"Invalid XLE file structure: missing Ch1_data_header")
         
         unit_elem = ch1_header.find('Unit')
-        if not unit_elem:
+        if unit_elem is None:
             raise ValueError(f"Invalid XLE file structure: missing Unit element")
         
         # Check if already in feet (case insensitive)
@@ -96,7 +98,7 @@ class UnitConverter:
         
         # Convert data
         data_elem = root.find('.//Data')
-        if not data_elem:
+        if data_elem is None:
             raise ValueError(f"Invalid XLE file structure: missing Data element")
         
         # Update the unit to feet
@@ -113,8 +115,9 @@ class UnitConverter:
                 except (ValueError, TypeError):
                     logger.warning(f"Could not convert value '{ch1_elem.text}' to float")
         
-        # Write back the modified XML
-        tree.write(file_path, encoding='utf-8', xml_declaration=True)
+        # Write back the modified XML, replacing the original only once complete
+        with atomic_output(str(file_path), 'wb') as f:
+            tree.write(f, encoding='utf-8', xml_declaration=True)
         logger.info(f"Converted {file_path.name} from meters to feet")
         return True
 
@@ -131,12 +134,22 @@ class ConverterWorker(QThread):
         self.folder_path = folder_path
         self.recursive = recursive
         self.converter = UnitConverter()
+        self._cancel_requested = False
+        
+    def cancel(self):
+        """Start no further files; the ones being converted are finished"""
+        self._cancel_requested = True
+    
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested
         
     def run(self):
         try:
             # First count total files to process for progress tracking
             self.file_progress.emit("Scanning for XLE files...")
-            total_files = sum(1 for _ in Path(self.folder_path).glob('**/*.xle' if self.recursive else '*.xle'))
+            xle_files = find_files(self.folder_path, '.xle', self.recursive)
+            total_files = len(xle_files)
             
             if total_files == 0:
                 self.error.emit("No XLE files found in the selected folder")
@@ -144,44 +157,20 @@ class ConverterWorker(QThread):
                 
             self.file_progress.emit(f"Found {total_files} XLE files to process")
             
-            # Keep track of processed files for manual progress updates
-            processed = 0
-            stats = {
-                'total': 0,
-                'converted': 0,
-                'already_ft': 0,
-                'errors': 0
-            }
-            
-            # Process files with progress tracking
-            pattern = "**/*.xle" if self.recursive else "*.xle"
-            for xle_file in Path(self.folder_path).glob(pattern):
-                try:
-                    # Update progress info
-                    processed += 1
-                    self.file_progress.emit(f"Processing {processed}/{total_files}: {xle_file.name}")
-                    progress_percent = int((processed / total_files) * 100)
-                    self.progress.emit(progress_percent)
-                    
-                    # Perform conversion
-                    stats['total'] += 1
-                    try:
-                        was_converted = self.converter.convert_file(xle_file)
-                        if was_converted:
-                            stats['converted'] += 1
-                            self.file_progress.emit(f"Converted {xle_file.name} from meters to feet")
-                        else:
-                            stats['already_ft'] += 1
-                            self.file_progress.emit(f"Skipped {xle_file.name} - already in feet")
-                    except Exception as e:
-                        logger.error(f"Error converting {xle_file}: {e}")
-                        stats['errors'] += 1
-                        self.file_progress.emit(f"Error processing {xle_file.name}: {str(e)}")
-                        
-                except Exception as e:
-                    self.error.emit(f"Error processing {xle_file.name}: {str(e)}")
+            def progress(done, total, result):
+                name = os.path.basename(result.source)
+                if result.status == CONVERTED:
+                    self.file_progress.emit(f"Converted {name} from meters to feet ({done}/{total})")
+                elif result.status == UNCHANGED:
+                    self.file_progress.emit(f"Skipped {name} - already in feet ({done}/{total})")
+                else:
+                    self.file_progress.emit(f"Error processing {name}: {result.error}")
+                self.progress.emit(int((done / total) * 100))
             
-            self.finished.emit(stats)
+            # Convert across worker processes
+            report = convert_batch(convert_units_file, xle_files, progress=progress,
+                                   cancelled=lambda: self._cancel_requested)
+            self.finished.emit(UnitConverter.stats(report))
                 
         except Exception as e:
             import traceback
@@ -251,6 +240,12 @@ class UnitConverterApp(QMainWindow):
         convert_btn.clicked.connect(self.start_conversion)
         main_layout.addWidget(convert_btn)
         
+        # Stops the running conversion after the files in progress
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_conversion)
+        main_layout.addWidget(self.cancel_btn)
+        
         # Status area
         self.status_label = QLabel("Select a folder containing XLE files to begin")
         self.status_label.setAlignment(Qt.AlignCenter)
@@ -305,8 +300,16 @@ class UnitConverterApp(QMainWindow):
         self.worker.error.connect(self.show_error)
         
         # Start conversion
+        self.cancel_btn.setEnabled(True)
         self.worker.start()
         
+    def cancel_conversion(self):
+        """Ask the worker to stop starting new files"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.status_label.setText("Cancelling after the files in progress...")
+        
     def update_progress(self, value):
         """Update the progress bar"""
         self.progress_bar.setValue(value)
@@ -321,7 +324,11 @@ class UnitConverterApp(QMainWindow):
         converted = stats['converted']
         already_ft = stats['already_ft']
         errors = stats['errors']
+        self.cancel_btn.setEnabled(False)
         
+        if self.worker.cancel_requested:
+            self.status_label.setText(f"Conversion cancelled. Processed {total} files, {converted} converted.")
+            return
         status_text = f"Conversion complete. Processed {total} files."
         self.status_label.setText(status_text)
         self.progress_bar.setValue(100)
@@ -336,8 +343,17 @@ class UnitConverterApp(QMainWindow):
         
     def show_error(self, error_message):
         """Display error message"""
+        self.cancel_btn.setEnabled(False)
         QMessageBox.critical(self, "Conversion Error", error_message)
         self.status_label.setText("Conversion failed. See error message.")
+    
+    def closeEvent(self, event):
+        """Stop a running conversion before the window closes"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.blockSignals(True)
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
 
 def process_command_line():
@@ -345,6 +361,7 @@ def process_command_line():
     parser = argparse.ArgumentParser(description='Convert XLE water level units from meters to feet.')
     parser.add_argument('input_dir', help='Directory containing XLE files')
     parser.add_argument('--recursive', '-r', action='store_true', help='Include subdirectories')
+    add_batch_arguments(parser)
     
     if len(sys.argv) > 1:
         args = parser.parse_args()
@@ -353,12 +370,14 @@ def process_command_line():
         
         try:
             print(f"Scanning {args.input_dir} for XLE files...")
-            stats = converter.convert_directory(args.input_dir, args.recursive)
+            report = converter.convert_folder(args.input_dir, args.recursive, workers=args.workers)
+            stats = converter.stats(report)
             
             print(f"Processed {stats['total']} XLE files:")
             print(f"- {stats['converted']} files converted from meters to feet")
             print(f"- {stats['already_ft']} files already in feet (not modified)")
             print(f"- {stats['errors']} files with errors")
+            print_report(report, args.report)
             
         except Exception as e:
             print(f"Error: {e}")
@@ -1,10 +1,15 @@
 import os
 import sys
 import csv
+import json
+import hashlib
 import logging
+import sqlite3
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from datetime import datetime, timedelta
 import argparse
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QPushButton, QFileDialog, QLabel, 
@@ -14,64 +19,266 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal
 # Import the SolinstReader from its location
 sys.path.append(str(Path(__file__).parent.parent / "src" / "gui" / "handlers"))
 from solinst_reader import SolinstReader
+sys.path.append(str(Path(__file__).parent.parent))
+from src.gui.handlers.xle_serial_index import list_files, read_xle_fragments
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+PARALLEL_MIN_FILES = 64  # Smaller scans run in-process
+SCAN_CHUNK = 32          # Files per worker task
+COMMIT_EVERY = 500       # Scanned files per checkpoint commit
+HASH_BLOCK = 1 << 20
+
+_worker_reader = None
+
+
+def _reader() -> SolinstReader:
+    """One SolinstReader per worker process"""
+    global _worker_reader
+    if _worker_reader is None:
+        _worker_reader = SolinstReader()
+    return _worker_reader
+
+
+def read_header_metadata(xle_file: Path, reader: SolinstReader):
+    """Metadata of an XLE file from its first and last kilobytes, with header times as logged"""
+    try:
+        metadata, _, _, offset = reader.read_xle_bounds(*read_xle_fragments(str(xle_file), xle_file.stat().st_size))
+        # read_xle_bounds converts to UTC; the map lists the times of the header like get_file_metadata
+        metadata.start_time -= timedelta(hours=offset)
+        metadata.stop_time -= timedelta(hours=offset)
+        return metadata
+    except Exception as e:
+        logger.debug(f"Header parse of {xle_file} failed, parsing the whole file: {e}")
+        metadata, _ = reader.get_file_metadata(xle_file)
+        return metadata
+
+
+def build_entry(xle_file: Path, reader: SolinstReader) -> Dict[str, Any]:
+    """Map row of one XLE file"""
+    metadata = read_header_metadata(xle_file, reader)
+    
+    # Calculate duration in days
+    duration_days = (metadata.stop_time - metadata.start_time).total_seconds() / (60 * 60 * 24)
+    
+    # Determine if it's a barologger or levelogger
+    logger_type = "Barologger" if reader.is_barologger(metadata) else "Levelogger"
+    
+    return {
+        'Serial_number': metadata.serial_number,
+        'Project_ID': metadata.project_id,
+        'Location': metadata.location,
+        'Start_time': metadata.start_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'Stop_time': metadata.stop_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'Duration_days': f"{duration_days:.2f}", # Add duration column with 2 decimal places
+        'Logger_type': logger_type,  # Add logger type column
+        'file_name': xle_file.name,
+        'file_path': str(xle_file.parent)  # Store only the directory path, not the full file path
+    }
+
+
+def _scan_batch(paths: List[str]) -> List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """(path, entry, error) for each file; runs in the worker processes"""
+    reader = _reader()
+    scanned = []
+    for path in paths:
+        try:
+            scanned.append((path, build_entry(Path(path), reader), None))
+        except Exception as e:
+            scanned.append((path, None, str(e) or type(e).__name__))
+    return scanned
+
+
+def file_md5(path: str) -> str:
+    """md5 of the file contents (the checksum Google Drive reports as md5Checksum)"""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+def _hash_batch(paths: List[str]) -> List[Tuple[str, Optional[str]]]:
+    hashes = []
+    for path in paths:
+        try:
+            hashes.append((path, file_md5(path)))
+        except OSError as e:
+            logger.error(f"Error hashing {path}: {e}")
+            hashes.append((path, None))
+    return hashes
+
+
+def _run_batches(func: Callable, items: List, workers: int):
+    """Yield the results of func over chunks of items, in a process pool for larger inputs"""
+    chunks = [items[i:i + SCAN_CHUNK] for i in range(0, len(items), SCAN_CHUNK)]
+    if len(items) < PARALLEL_MIN_FILES or workers <= 1:
+        for chunk in chunks:
+            yield func(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, chunks)
+
+
+def default_checkpoint_path(output_file: str) -> str:
+    """Checkpoint database kept next to the map file"""
+    return f"{os.path.splitext(output_file)[0]}_scan.db"
+
+
+class ScanCheckpoint:
+    """Scanned files of an archive, so an interrupted or repeated scan only reads new or changed files"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scanned (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                entry TEXT,
+                error TEXT,
+                content_hash TEXT
+            )
+        """)
+        self._conn.commit()
+    
+    def load(self) -> Dict[str, tuple]:
+        """path -> (size, mtime_ns, entry, error, content_hash)"""
+        return {row[0]: (row[1], row[2], json.loads(row[3]) if row[3] else None, row[4], row[5])
+                for row in self._conn.execute("SELECT path, size, mtime_ns, entry, error, content_hash FROM scanned")}
+    
+    def save(self, rows: List[tuple]):
+        """Store (path, size, mtime_ns, entry, error) rows, clearing any previous hash"""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scanned (path, size, mtime_ns, entry, error) VALUES (?, ?, ?, ?, ?)",
+                [(path, size, mtime, json.dumps(entry) if entry else None, error)
+                 for path, size, mtime, entry, error in rows])
+    
+    def save_hashes(self, hashes: List[Tuple[str, str]]):
+        with self._conn:
+            self._conn.executemany("UPDATE scanned SET content_hash = ? WHERE path = ?",
+                                   [(content_hash, path) for path, content_hash in hashes])
+    
+    def prune(self, keep: Dict[str, Any]):
+        """Forget files that are no longer in the archive"""
+        stale = [(path,) for path in self.load() if path not in keep]
+        with self._conn:
+            self._conn.executemany("DELETE FROM scanned WHERE path = ?", stale)
+    
+    def close(self):
+        self._conn.close()
+
+
 class XleMapper:
     """Maps XLE files in a directory structure and extracts metadata"""
     
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
         """Initialize mapper"""
         self.reader = SolinstReader()
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.scan_stats: Dict[str, int] = {}
         
-    def scan_directory(self, directory: str, recursive: bool = True) -> List[Dict[str, Any]]:
+    def scan_directory(self, directory: str, recursive: bool = True,
+                       checkpoint_path: Optional[str] = None,
+                       progress: Optional[Callable[[int, int, str], None]] = None) -> List[Dict[str, Any]]:
         """
         Scan directory for XLE files and extract metadata
         
+        Only the header and the first and last readings of each file are read,
+        in a process pool for large archives. With a checkpoint, files already
+        scanned (same size and modification time) are taken from it and new
+        results are committed as they arrive, so an interrupted scan resumes
+        where it stopped.
+        
         Args:
             directory: Directory to scan
             recursive: Whether to include subdirectories
+            checkpoint_path: SQLite file recording scanned files (optional)
+            progress: Called with (files done, total files, file name)
             
         Returns:
-            List of dictionaries with extracted metadata
+            List of dictionaries with extracted metadata, ordered by path; files
+            that may be byte-identical copies carry a 'content_hash'
         """
-        directory_path = Path(directory)
-        pattern = "**/*.xle" if recursive else "*.xle"
-        
-        results = []
+        files = list_files(directory, recursive, suffixes=('.xle',))
+        checkpoint = ScanCheckpoint(checkpoint_path) if checkpoint_path else None
         
-        for xle_file in directory_path.glob(pattern):
+        try:
+            known = checkpoint.load() if checkpoint else {}
+            scanned = {path: known[path] for path, stat in files.items()
+                       if path in known and known[path][:2] == stat}
+            pending = sorted(path for path in files if path not in scanned)
+            total = len(files)
+            done = len(scanned)
+            if scanned:
+                logger.info(f"Resuming: {done} of {total} files already scanned")
+            
+            batch = []
             try:
-                # Get file metadata using SolinstReader
-                metadata, _ = self.reader.get_file_metadata(xle_file)
-                
-                # Calculate duration in days
-                duration_days = (metadata.stop_time - metadata.start_time).total_seconds() / (60 * 60 * 24)
-                
-                # Determine if it's a barologger or levelogger
-                logger_type = "Barologger" if self.reader.is_barologger(metadata) else "Levelogger"
-                
-                # Create entry with required fields
-                entry = {
-                    'Serial_number': metadata.serial_number,
-                    'Project_ID': metadata.project_id,
-                    'Location': metadata.location,
-                    'Start_time': metadata.start_time.strftime('%Y-%m-%d %H:%M:%S'),
-                    'Stop_time': metadata.stop_time.strftime('%Y-%m-%d %H:%M:%S'),
-                    'Duration_days': f"{duration_days:.2f}", # Add duration column with 2 decimal places
-                    'Logger_type': logger_type,  # Add logger type column
-                    'file_name': xle_file.name,
-                    'file_path': str(xle_file.parent)  # Store only the directory path, not the full file path
-                }
-                
-                results.append(entry)
-                logger.info(f"Processed {xle_file.name}")
-                
-            except Exception as e:
-                logger.error(f"Error processing {xle_file}: {e}")
-        
-        return results
+                for results in _run_batches(_scan_batch, pending, self.workers):
+                    for path, entry, error in results:
+                        size, mtime = files[path]
+                        scanned[path] = (size, mtime, entry, error, None)
+                        batch.append((path, size, mtime, entry, error))
+                        done += 1
+                        if error:
+                            logger.error(f"Error processing {path}: {error}")
+                        if progress:
+                            progress(done, total, os.path.basename(path))
+                    if checkpoint and len(batch) >= COMMIT_EVERY:
+                        checkpoint.save(batch)
+                        batch.clear()
+            finally:
+                # Keep what was scanned if the run is interrupted
+                if checkpoint:
+                    checkpoint.save(batch)
+            if checkpoint:
+                checkpoint.prune(files)
+            
+            results = []
+            hashes = {}
+            for path in sorted(scanned):
+                entry = scanned[path][2]
+                if entry:
+                    results.append(entry)
+                    if scanned[path][4]:
+                        hashes[path] = scanned[path][4]
+            
+            self.scan_stats = {'files': total, 'scanned': len(pending), 'resumed': total - len(pending),
+                               'errors': sum(1 for row in scanned.values() if row[3])}
+            self._hash_duplicate_candidates(results, files, hashes, checkpoint)
+            return results
+        finally:
+            if checkpoint:
+                checkpoint.close()
+    
+    def _hash_duplicate_candidates(self, results: List[Dict[str, Any]], files: Dict[str, Tuple[int, int]],
+                                   hashes: Dict[str, str], checkpoint: Optional[ScanCheckpoint]):
+        """Hash the files that share a duplicate key and a size with another file"""
+        groups = defaultdict(list)
+        for entry in results:
+            path = os.path.join(entry['file_path'], entry['file_name'])
+            groups[(self._duplicate_key(entry), files[path][0])].append((path, entry))
+        
+        candidates = [(path, entry) for members in groups.values() if len(members) > 1 for path, entry in members]
+        to_hash = [path for path, _ in candidates if path not in hashes]
+        if to_hash:
+            logger.info(f"Hashing {len(to_hash)} possible duplicate copies")
+            new_hashes = [item for results in _run_batches(_hash_batch, to_hash, self.workers)
+                          for item in results if item[1]]
+            hashes.update(new_hashes)
+            if checkpoint:
+                checkpoint.save_hashes(new_hashes)
+        for path, entry in candidates:
+            if path in hashes:
+                entry['content_hash'] = hashes[path]
+    
+    @staticmethod
+    def _duplicate_key(entry: Dict[str, Any]) -> tuple:
+        return entry['Serial_number'], entry['Start_time'], entry['Stop_time']
     
     def export_to_csv(self, results: List[Dict[str, Any]], output_file: str) -> str:
         """
@@ -95,7 +302,7 @@ class XleMapper:
         
         # Write to CSV
         with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=columns)
+            writer = csv.DictWriter(csvfile, fieldnames=columns, extrasaction='ignore')
             writer.writeheader()
             
             for entry in results:
@@ -108,55 +315,37 @@ class XleMapper:
         """
         Find duplicate files based on serial number, start time, and stop time
         
+        Files are grouped in one pass; each group lists its first file as the
+        original followed by the duplicates. A duplicate whose content hash
+        matches the original is a byte-identical copy, otherwise it only
+        shares the header.
+        
         Args:
             results: List of metadata dictionaries
             
         Returns:
             List of dictionaries with duplicate file information
         """
-        # Create lookup dictionary for fast duplicate finding
-        # Use a tuple of (serial_number, start_time, stop_time) as the key
-        file_index = {}
-        duplicates = []
-        
+        groups = defaultdict(list)
         for entry in results:
-            # Create a key based on the unique identifying fields
-            key = (entry['Serial_number'], entry['Start_time'], entry['Stop_time'])
-            
-            # If we've seen this combination before, it's a duplicate
-            if key in file_index:
-                # Get the original file
-                original = file_index[key]
-                
-                # Add both files to duplicates list if this is the first duplicate
-                if len([d for d in duplicates if d['key'] == key]) == 0:
-                    duplicates.append({
-                        'key': key,
-                        'Serial_number': original['Serial_number'],
-                        'Start_time': original['Start_time'], 
-                        'Stop_time': original['Stop_time'],
-                        'file_name': original['file_name'],
-                        'file_path': original['file_path'],
-                        'is_duplicate': False  # The original file
-                    })
-                
-                # Add the current duplicate
+            groups[self._duplicate_key(entry)].append(entry)
+        
+        duplicates = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            original_hash = members[0].get('content_hash')
+            for i, entry in enumerate(members):
                 duplicates.append({
-                    'key': key,
                     'Serial_number': entry['Serial_number'],
                     'Start_time': entry['Start_time'],
                     'Stop_time': entry['Stop_time'],
                     'file_name': entry['file_name'],
                     'file_path': entry['file_path'],
-                    'is_duplicate': True  # Marked as duplicate
+                    'is_duplicate': i > 0,  # The first file is the original
+                    'identical_copy': i > 0 and original_hash is not None
+                                      and entry.get('content_hash') == original_hash
                 })
-            else:
-                # First time seeing this combination
-                file_index[key] = entry
-        
-        # Remove the temporary 'key' field used for grouping
-        for entry in duplicates:
-            entry.pop('key', None)
             
         return duplicates
     
@@ -177,7 +366,7 @@ class XleMapper:
             
         # Define column order for the CSV
         columns = ['Serial_number', 'Start_time', 'Stop_time', 
-                   'file_name', 'file_path', 'is_duplicate']
+                   'file_name', 'file_path', 'is_duplicate', 'identical_copy']
         
         # Write to CSV
         with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
@@ -207,77 +396,20 @@ class MapperWorker(QThread):
         
     def run(self):
         try:
-            # First count total files to process for progress tracking
-            total_files = sum(1 for _ in Path(self.folder_path).glob('**/*.xle' if self.recursive else '*.xle'))
-            
-            if total_files == 0:
-                self.error.emit("No XLE files found in the selected folder")
-                return
-                
-            self.file_progress.emit(f"Found {total_files} XLE files to process")
-            
-            # Keep track of processed files for manual progress updates
-            processed = 0
-            
             # Function to update progress during scan
-            def progress_callback(file_name):
-                nonlocal processed
-                processed += 1
-                self.file_progress.emit(f"Processing: {file_name}")
-                progress_percent = int((processed / total_files) * 100)
-                self.progress.emit(progress_percent)
-            
-            # Patch the scan_directory method to include progress updates
-            original_scan = self.mapper.scan_directory
-            
-            def scan_with_progress(directory, recursive):
-                directory_path = Path(directory)
-                pattern = "**/*.xle" if recursive else "*.xle"
-                
-                results = []
-                
-                for xle_file in directory_path.glob(pattern):
-                    try:
-                        # Get file metadata
-                        metadata, _ = self.mapper.reader.get_file_metadata(xle_file)
-                        
-                        # Calculate duration in days
-                        duration_days = (metadata.stop_time - metadata.start_time).total_seconds() / (60 * 60 * 24)
-                        
-                        # Determine if it's a barologger or levelogger
-                        logger_type = "Barologger" if self.mapper.reader.is_barologger(metadata) else "Levelogger"
-                        
-                        # Create entry with required fields
-                        entry = {
-                            'Serial_number': metadata.serial_number,
-                            'Project_ID': metadata.project_id,
-                            'Location': metadata.location,
-                            'Start_time': metadata.start_time.strftime('%Y-%m-%d %H:%M:%S'),
-                            'Stop_time': metadata.stop_time.strftime('%Y-%m-%d %H:%M:%S'),
-                            'Duration_days': f"{duration_days:.2f}", # Add duration column with 2 decimal places
-                            'Logger_type': logger_type,  # Add logger type column
-                            'file_name': xle_file.name,
-                            'file_path': str(xle_file.parent)  # Store only the directory path, not the full file path
-                        }
-                        
-                        results.append(entry)
-                        
-                        # Update progress
-                        progress_callback(xle_file.name)
-                        
-                    except Exception as e:
-                        self.error.emit(f"Error processing {xle_file.name}: {str(e)}")
-                
-                return results
-                
-            # Replace method temporarily
-            self.mapper.scan_directory = scan_with_progress
+            def progress_callback(done, total, file_name):
+                if done == 1 or done == total or done % 25 == 0:
+                    self.file_progress.emit(f"Processing: {file_name} ({done} of {total})")
+                    self.progress.emit(int((done / total) * 100))
             
-            # Scan directory and get metadata
-            results = self.mapper.scan_directory(self.folder_path, self.recursive)
+            # Scan directory and get metadata, resuming from an earlier run of the same output
+            results = self.mapper.scan_directory(self.folder_path, self.recursive,
+                                                 checkpoint_path=default_checkpoint_path(self.output_path),
+                                                 progress=progress_callback)
             
-            # Restore original method
-            self.mapper.scan_directory = original_scan
+            if not self.mapper.scan_stats.get('files'):
+                self.error.emit("No XLE files found in the selected folder")
+                return
             
             # Export to CSV
             if results:
@@ -492,15 +624,29 @@ def process_command_line():
     parser.add_argument('input_dir', help='Directory containing XLE files')
     parser.add_argument('--output', '-o', help='Output CSV file path', default='xle_map.csv')
     parser.add_argument('--recursive', '-r', action='store_true', help='Include subdirectories')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Worker processes for scanning (default: number of CPUs, up to 8)')
+    parser.add_argument('--checkpoint', help='Scan checkpoint database (default: next to the output file)')
+    parser.add_argument('--restart', action='store_true', help='Discard the checkpoint and rescan every file')
     
     if len(sys.argv) > 1:
         args = parser.parse_args()
         
-        mapper = XleMapper()
+        mapper = XleMapper(workers=args.workers)
+        checkpoint_path = args.checkpoint or default_checkpoint_path(args.output)
+        if args.restart and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        
+        def progress(done, total, file_name):
+            if done % 1000 == 0 or done == total:
+                print(f"  {done} of {total} files scanned")
         
         try:
             print(f"Scanning {args.input_dir} for XLE files...")
-            results = mapper.scan_directory(args.input_dir, args.recursive)
+            results = mapper.scan_directory(args.input_dir, args.recursive,
+                                            checkpoint_path=checkpoint_path, progress=progress)
+            if mapper.scan_stats.get('resumed'):
+                print(f"Reused {mapper.scan_stats['resumed']} files from {checkpoint_path}")
             
             if results:
                 # Export main results
@@ -513,13 +659,17 @@ def process_command_line():
                 duplicates = mapper.find_duplicates(results)
                 if duplicates:
                     mapper.export_duplicates_to_csv(duplicates, duplicates_path)
-                    print(f"Found {len(duplicates)} duplicate entries")
+                    identical = sum(1 for d in duplicates if d['identical_copy'])
+                    print(f"Found {len(duplicates)} duplicate entries ({identical} byte-identical copies)")
                     print(f"Duplicates saved to: {duplicates_path}")
                 else:
                     print("No duplicate files found")
             else:
                 print("No XLE files found or all files had errors")
                 
+        except KeyboardInterrupt:
+            print(f"Interrupted; run again to resume from {checkpoint_path}")
+            return True
         except Exception as e:
             print(f"Error: {e}")
             return False